@@ -30,6 +30,39 @@ app.conf.beat_schedule = {
         'schedule': 60.0 * 60.0 * 6.0,  # Every 6 hours
         'options': {'queue': 'cleanup'}
     },
+    'flush-latency-sketches': {
+        'task': 'faktury.tasks.flush_latency_sketches',
+        'schedule': 60.0,  # Every minute
+        'options': {'queue': 'monitoring'}
+    },
+    'cleanup-latency-sketches': {
+        'task': 'faktury.tasks.cleanup_latency_sketches',
+        'schedule': 60.0 * 60.0 * 24.0,  # Daily
+        'options': {'queue': 'cleanup'}
+    },
+    'rollup-ocr-statistics': {
+        'task': 'faktury.tasks.rollup_ocr_statistics_task',
+        'schedule': 60.0 * 60.0 * 24.0,  # Daily
+        'options': {'queue': 'cleanup'}
+    },
+    'rollup-company-metrics': {
+        'task': 'faktury.tasks.rollup_company_metrics_task',
+        'schedule': 60.0 * 60.0 * 24.0,  # Daily
+        'options': {'queue': 'cleanup'}
+    },
+    'dispatch-pending-ocr-results': {
+        'task': 'faktury.tasks.batch_process_pending_ocr_results',
+        'schedule': 60.0,  # Every minute, tops the queue up to the in-flight cap
+    },
+    'resume-stalled-system-broadcasts': {
+        'task': 'faktury.tasks.resume_stalled_system_broadcasts',
+        'schedule': 60.0 * 10.0,  # Every 10 minutes
+    },
+    'reconcile-unread-counters': {
+        'task': 'faktury.tasks.reconcile_unread_counters_task',
+        'schedule': 60.0 * 60.0,  # Hourly, corrects drift of the cached counters
+        'options': {'queue': 'cleanup'}
+    },
 }
 
 # Configure task routing
@@ -37,6 +70,8 @@ app.conf.task_routes = {
     'faktury.tasks.process_ocr_document': {'queue': 'ocr'},
     'faktury.tasks.cleanup_old_documents': {'queue': 'cleanup'},
     'faktury.tasks.cleanup_failed_documents': {'queue': 'cleanup'},
+    'faktury.tasks.flush_latency_sketches': {'queue': 'monitoring'},
+    'faktury.tasks.cleanup_latency_sketches': {'queue': 'cleanup'},
 }
 
 @app.task(bind=True)
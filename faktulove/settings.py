@@ -511,6 +511,13 @@ PADDLEOCR_CONFIG = {
     }
 }
 
+# Ensemble OCR service used by the Celery OCR tasks (keyword arguments of EnsembleOCRService)
+ENSEMBLE_OCR_CONFIG = {
+    # Engines run in pre-forked child processes that are killed after timeout_per_engine
+    'use_sandbox': os.getenv('OCR_PROCESS_SANDBOX', 'True').lower() in ('true', '1', 'yes', 'on'),
+    'timeout_per_engine': int(os.getenv('OCR_ENGINE_TIMEOUT', '30')),
+}
+
 # File Upload Configuration
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024   # 10MB
@@ -643,6 +650,69 @@ CELERY_TASK_ROUTES = {
     'faktury.tasks.paddleocr_memory_cleanup': {'queue': 'cleanup'},
 }
 
+# Pending OCR backlog dispatch (faktury.services.ocr_dispatcher)
+OCR_DISPATCH_CONFIG = {
+    'chunk_size': int(os.getenv('OCR_DISPATCH_CHUNK_SIZE', '10')),  # results per chunk task
+    'max_in_flight': int(os.getenv('OCR_DISPATCH_MAX_IN_FLIGHT', '200')),  # dispatched but unfinished results
+    'page_size': int(os.getenv('OCR_DISPATCH_PAGE_SIZE', '1000')),  # keyset page when reading the backlog
+    'lock_timeout': 300,
+    # claims older than this belong to lost chunks and return to the backlog
+    'claim_timeout': int(os.getenv('OCR_DISPATCH_CLAIM_TIMEOUT', '1800')),
+}
+
+# System broadcasts to all users (faktury.services.system_broadcast)
+SYSTEM_BROADCAST_CONFIG = {
+    'mode': os.getenv('SYSTEM_BROADCAST_MODE', 'fan_out'),  # 'fan_out' or 'receipts'
+    'batch_size': int(os.getenv('SYSTEM_BROADCAST_BATCH_SIZE', '1000')),  # messages per bulk insert
+    'time_budget': 30,  # seconds per task run before it enqueues a continuation
+}
+
+# Bulk invoice corrections and duplicates (faktury.services.invoice_cloning)
+INVOICE_CLONING_CONFIG = {
+    'batch_size': int(os.getenv('INVOICE_CLONING_BATCH_SIZE', '500')),  # source invoices per bulk insert
+    'async_threshold': int(os.getenv('INVOICE_CLONING_ASYNC_THRESHOLD', '100')),  # larger selections run in Celery
+}
+
+# Incremental backups in a content-addressed chunk store (faktury.services.backup_store)
+BACKUP_CONFIG = {
+    'chunk_size': 4 * 1024 * 1024,  # bytes per deduplicated chunk
+    'workers': int(os.getenv('BACKUP_WORKERS', '4')),  # threads chunking, verifying and restoring files
+    'compression_level': int(os.getenv('BACKUP_COMPRESSION_LEVEL', '3')),  # zstd level, gzip when zstandard is missing
+}
+
+RETENTION_CONFIG = {
+    'batch_size': 2000,  # rows deleted per transaction
+    'sleep': float(os.getenv('RETENTION_SLEEP', '0.05')),  # seconds between batches, writers get the tables
+    'file_workers': 4,  # threads removing files of deleted uploads
+    'days': {},  # retention period per policy name, e.g. {'health_records': 14}
+}
+
+# Company registry lookups by NIP/REGON (faktury.services.registry_lookup)
+REGISTRY_LOOKUP_CONFIG = {
+    # Complete imported companies and OCR sellers by NIP; needs a backend with real NIP data
+    'enabled': os.getenv('REGISTRY_LOOKUP_ENABLED', 'False').lower() == 'true',
+    'backend': os.getenv('REGISTRY_LOOKUP_BACKEND', 'faktury.services.registry_lookup.GUSBackend'),
+    'ttl': 30 * 24 * 3600,  # seconds a found company is served from the lookup table
+    'negative_ttl': 24 * 3600,  # seconds an unknown number is not asked for again
+    'workers': int(os.getenv('REGISTRY_LOOKUP_WORKERS', '8')),  # concurrent registry requests of a batch
+    'stub_path': os.getenv('REGISTRY_STUB_PATH'),  # SQLite file of SQLiteRegistryBackend
+}
+
+# Company statistics and company access (faktury.services.company_metrics)
+COMPANY_METRICS_CONFIG = {
+    'use_rollup': os.getenv('COMPANY_METRICS_USE_ROLLUP', 'False').lower() == 'true',  # closed months from CompanyMetricsRollup
+    'access_timeout': 3600,  # seconds the companies a user may access are cached
+}
+
+# Namespaced cache of faktury.cache_utils
+CACHE_NAMESPACE_CONFIG = {
+    'timeout': 300,  # seconds a cached value is fresh
+    'stale_timeout': 60,  # seconds a value past its timeout is served while one caller recomputes it
+    'lock_timeout': 10,  # seconds other callers wait at most for a value being computed
+    'poll_interval': 0.05,  # seconds between checks while waiting
+    'wait_factor': 2,  # waits end after this many times the computation took last time
+}
+
 # ============================================================================
 # REST FRAMEWORK CONFIGURATION
 # ============================================================================
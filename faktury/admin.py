@@ -1,9 +1,9 @@
-import datetime
 from import_export import resources, fields
 from import_export.admin import ImportExportModelAdmin
 from django.contrib import admin
 from django import forms
 from django.contrib import messages
+from django.http import StreamingHttpResponse
 from django.utils.html import format_html
 from .models import (
     Kontrahent, Faktura, Produkt, PozycjaFaktury, Firma, UserProfile, Partnerstwo,
@@ -14,6 +14,8 @@ from .admin_widgets import (
     InvoiceStatusWidget, CompanySelectWidget
 )
 from .services.admin_enhancement_service import admin_enhancement_service
+from .services.invoice_cloning import DUPLIKAT, KOREKTA, clone_invoices, should_clone_async
+from .services.invoice_pdf_service import get_invoice_pdf_service
 
 
 class FirmaAdminForm(forms.ModelForm):
@@ -225,7 +227,7 @@ class FakturaAdmin(admin.ModelAdmin):
     list_filter = ('typ_dokumentu', 'status', 'manual_verification_required', 'ocr_extracted_at')
     search_fields = ['numer', 'sprzedawca__nazwa', 'nabywca__nazwa']
     readonly_fields = ['ocr_confidence', 'ocr_processing_time', 'ocr_extracted_at', 'source_document']
-    actions = ['stwórz_korektę', 'bulk_mark_paid', 'bulk_mark_sent', 'bulk_export_pdf']
+    actions = ['stworz_korekte', 'stworz_duplikat', 'bulk_mark_paid', 'bulk_mark_sent', 'bulk_export_pdf']
     
     fieldsets = (
         ('Podstawowe informacje', {
@@ -264,72 +266,32 @@ class FakturaAdmin(admin.ModelAdmin):
     status_badge.short_description = 'Status'
     status_badge.allow_tags = True
 
+    def _clone(self, request, queryset, mode):
+        invoice_ids = list(queryset.values_list('pk', flat=True))
+        if should_clone_async(len(invoice_ids)):
+            from .tasks import clone_invoices_task
+            clone_invoices_task.delay(request.user.id, invoice_ids, mode)
+            messages.info(
+                request,
+                f'Tworzenie {len(invoice_ids)} dokumentów zostało zlecone. Otrzymasz powiadomienie, gdy będą gotowe.'
+            )
+            return
+        clones = clone_invoices(invoice_ids, mode)
+        messages.success(request, f'Utworzono {len(clones)} dokumentów')
+
     def stworz_korekte(self, request, queryset):
-        for faktura in queryset:
-        # Generuj nowy numer dla korekty
-            today = datetime.date.today()
-            ostatnia_korekta = Faktura.objects.filter(
-            user=faktura.user,
-            data_wystawienia__year=today.year,
-            data_wystawienia__month=today.month,
-            typ_dokumentu='KOR',
-        ).order_by('-numer').first()
-
-        if ostatnia_korekta:
-            try:
-                ostatni_numer = int(ostatnia_korekta.numer.split('/')[1])
-                numer_korekty = f"KOR/{ostatni_numer + 1:02d}/{today.month:02d}/{today.year}"
-            except (ValueError, IndexError):
-                liczba_korekt = Faktura.objects.filter(
-                    user=faktura.user,
-                    data_wystawienia__year=today.year,
-                    data_wystawienia__month=today.month,
-                    typ_dokumentu='KOR'
-                ).count()
-                numer_korekty = f"KOR/{liczba_korekt + 1:02d}/{today.month:02d}/{today.year}"
-        else:
-            numer_korekty = f"KOR/01/{today.month:02d}/{today.year}"
-
-        # Utwórz nową Fakturę (korektę)
-        korekta = Faktura.objects.create(
-            user=faktura.user,
-            typ_dokumentu='KOR',
-            dokument_podstawowy=faktura,
-            numer=numer_korekty,  # Użyj wygenerowanego numeru
-            data_wystawienia=datetime.date.today(),  # Data wystawienia korekty
-            data_sprzedazy=faktura.data_sprzedazy,
-            miejsce_wystawienia=faktura.miejsce_wystawienia,
-            sprzedawca=faktura.sprzedawca,
-            nabywca=faktura.nabywca,
-            typ_faktury=faktura.typ_faktury,
-            zwolnienie_z_vat=faktura.zwolnienie_z_vat,
-            powod_zwolnienia=faktura.powod_zwolnienia,
-            sposob_platnosci=faktura.sposob_platnosci,
-            termin_platnosci=faktura.termin_platnosci,
-            waluta=faktura.waluta,
-            wystawca=faktura.wystawca,
-            odbiorca=faktura.odbiorca,
-            uwagi=faktura.uwagi,
-            auto_numer=faktura.auto_numer,
-            wlasny_numer=faktura.wlasny_numer,
-        )
+        """Bulk action to create correction invoices"""
+        self._clone(request, queryset, KOREKTA)
+    stworz_korekte.short_description = "Utwórz korekty"
 
-        # Skopiuj pozycje faktury
-        for pozycja in faktura.pozycjafaktury_set.all():
-            PozycjaFaktury.objects.create(
-                faktura=korekta,
-                nazwa=pozycja.nazwa,
-                ilosc=pozycja.ilosc,
-                jednostka=pozycja.jednostka,
-                cena_netto=pozycja.cena_netto,
-                vat=pozycja.vat,
-                rabat=pozycja.rabat,
-                rabat_typ=pozycja.rabat_typ,
-            )
+    def stworz_duplikat(self, request, queryset):
+        """Bulk action to create duplicate invoices"""
+        self._clone(request, queryset, DUPLIKAT)
+    stworz_duplikat.short_description = "Utwórz duplikaty"
     
     def bulk_mark_paid(self, request, queryset):
         """Bulk action to mark invoices as paid"""
-        updated = queryset.update(status='paid')
+        updated = queryset.update_status('paid')
         messages.success(
             request, 
             f'Oznaczono {updated} faktur jako opłacone'
@@ -338,7 +300,7 @@ class FakturaAdmin(admin.ModelAdmin):
     
     def bulk_mark_sent(self, request, queryset):
         """Bulk action to mark invoices as sent"""
-        updated = queryset.update(status='sent')
+        updated = queryset.update_status('sent')
         messages.success(
             request, 
             f'Oznaczono {updated} faktur jako wysłane'
@@ -347,11 +309,21 @@ class FakturaAdmin(admin.ModelAdmin):
     
     def bulk_export_pdf(self, request, queryset):
         """Bulk action to export invoices as PDF"""
-        # This would need PDF generation implementation
-        messages.info(
-            request, 
-            f'Eksport PDF dla {queryset.count()} faktur zostanie wkrótce zaimplementowany'
-        )
+        pdf_service = get_invoice_pdf_service()
+        invoice_ids = list(queryset.values_list('pk', flat=True))
+        if pdf_service.should_render_async(len(invoice_ids)):
+            from .tasks import generate_invoice_pdf_archive_task
+            generate_invoice_pdf_archive_task.delay(request.user.id, invoice_ids, any_owner=True)
+            messages.info(
+                request,
+                f'Generowanie {len(invoice_ids)} faktur PDF zostało zlecone. Otrzymasz powiadomienie, gdy archiwum będzie gotowe.'
+            )
+            return None
+
+        faktury = queryset.select_related('sprzedawca', 'nabywca').prefetch_related('pozycjafaktury_set')
+        response = StreamingHttpResponse(pdf_service.iter_zip(faktury), content_type='application/zip')
+        response['Content-Disposition'] = 'attachment; filename="faktury.zip"'
+        return response
     bulk_export_pdf.short_description = "Eksportuj jako PDF"
 
 
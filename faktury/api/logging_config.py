@@ -12,6 +12,8 @@ from django.conf import settings
 from django.utils.deprecation import MiddlewareMixin
 import time
 
+from faktury.services.latency_sketch import record_latency
+
 
 class APILoggingFormatter(logging.Formatter):
     """
@@ -98,6 +100,9 @@ class APIRequestLoggingMiddleware(MiddlewareMixin):
         # Log response
         self._log_response(request, response, request_id, response_time)
         
+        # Record latency in the per-route quantile sketch
+        record_latency('http_request', self._get_route(request), response_time)
+        
         return response
     
     def _generate_request_id(self):
@@ -196,6 +201,13 @@ class APIRequestLoggingMiddleware(MiddlewareMixin):
         except Exception as e:
             self.logger.error(f"Error logging response: {e}")
     
+    def _get_route(self, request):
+        """Get the URL pattern of the request, keeping sketch keys low-cardinality."""
+        resolver_match = getattr(request, 'resolver_match', None)
+        if resolver_match is None:
+            return 'unmatched'
+        return resolver_match.route or resolver_match.view_name or 'unmatched'
+    
     def _get_client_ip(self, request):
         """Get client IP address from request."""
         x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
@@ -266,10 +266,10 @@ class OCRResultListSerializer(BaseSerializer):
     - Confidence level classification
     
     **Performance Optimizations**:
-    - Uses select_related for efficient database queries
-    - Minimal field selection to reduce response size
-    - Computed fields cached where possible
-    - Optimized for pagination with large datasets
+    - setup_queryset() loads only scalar columns; extracted_data and
+      raw_text are never read for list rows
+    - Invoice number, seller and total come from precomputed summary columns
+    - Optimized for keyset pagination with large datasets
     
     **Computed Fields**:
     - `has_faktura`: Boolean indicating if invoice was created
@@ -285,6 +285,16 @@ class OCRResultListSerializer(BaseSerializer):
     has_faktura = serializers.SerializerMethodField()
     needs_review = serializers.SerializerMethodField()
     confidence_level = serializers.CharField(read_only=True)
+    invoice_number = serializers.CharField(source='summary_invoice_number', read_only=True)
+    seller_name = serializers.CharField(source='summary_seller_name', read_only=True)
+    total_amount = serializers.DecimalField(source='summary_total', max_digits=15, decimal_places=2, read_only=True)
+    
+    # Columns loaded for list rows; the large JSON and text columns stay deferred
+    queryset_fields = (
+        'id', 'created_at', 'processing_status', 'confidence_score', 'processing_time', 'faktura_id',
+        'summary_invoice_number', 'summary_seller_name', 'summary_total',
+        'document__id', 'document__original_filename', 'document__upload_timestamp', 'faktura__id',
+    )
     
     class Meta:
         model = OCRResult
@@ -298,12 +308,20 @@ class OCRResultListSerializer(BaseSerializer):
             'has_faktura',
             'needs_review',
             'created_at',
-            'processing_time'
+            'processing_time',
+            'invoice_number',
+            'seller_name',
+            'total_amount',
         ]
     
+    @classmethod
+    def setup_queryset(cls, queryset):
+        """Load only the columns list rows need."""
+        return queryset.select_related('document', 'faktura').only(*cls.queryset_fields)
+    
     def get_has_faktura(self, obj):
         """Check if OCR result has associated Faktura."""
-        return obj.faktura is not None
+        return obj.faktura_id is not None
     
     def get_needs_review(self, obj):
         """Check if result needs human review based on confidence."""
@@ -1,6 +1,7 @@
 """
 Base API views for the OCR REST API.
 """
+import base64
 import logging
 import time
 from datetime import datetime
@@ -8,8 +9,10 @@ from rest_framework import generics, status
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.throttling import UserRateThrottle
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from django.db.models import Q
 from django.core.exceptions import PermissionDenied, ValidationError
 from django.http import Http404
@@ -1248,6 +1251,7 @@ class OCRResultsPagination(PageNumberPagination):
     
     def get_paginated_response(self, data):
         """Custom paginated response format."""
+        has_next = self.page.has_next()
         return Response({
             'results': data,
             'pagination': {
@@ -1255,8 +1259,91 @@ class OCRResultsPagination(PageNumberPagination):
                 'page': self.page.number,
                 'page_size': len(data),
                 'total_pages': self.page.paginator.num_pages,
-                'has_next': self.page.has_next(),
+                'has_next': has_next,
                 'has_previous': self.page.has_previous(),
+                # Lets clients continue with keyset pagination from this page
+                'next_cursor': OCRResultsCursorPagination.encode_cursor(self.page.object_list[-1]) if has_next else None,
+            }
+        })
+
+
+class OCRResultsCursorPagination(BasePagination):
+    """
+    Keyset pagination for OCR results, newest first.
+    
+    The cursor encodes (created_at, id) of the last result of a page and the
+    next page filters on it, so deep pages cost the same index range scan as
+    the first one instead of an OFFSET over every earlier row. There is no
+    total count; clients follow `next_cursor` until `has_next` is false.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    ordering = ('-created_at', '-id')
+    invalid_cursor_message = 'Invalid cursor'
+    
+    def get_page_size(self, request):
+        """Requested page size, capped at max_page_size."""
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(page_size, self.max_page_size) if page_size > 0 else self.page_size
+    
+    @staticmethod
+    def encode_cursor(ocr_result):
+        """Opaque cursor pointing after the given result."""
+        position = f'{ocr_result.created_at.isoformat()}|{ocr_result.pk}'
+        return base64.urlsafe_b64encode(position.encode()).decode()
+    
+    def decode_cursor(self, request):
+        """(created_at, id) from the request cursor, None for the first page."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            created_at, pk = base64.urlsafe_b64decode(encoded.encode()).decode().split('|')
+            return datetime.fromisoformat(created_at), int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        """Fetch one row past the page to know whether another page follows."""
+        self.request = request
+        page_size = self.get_page_size(request)
+        position = self.decode_cursor(request)
+        
+        queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            created_at, pk = position
+            # The redundant created_at bound turns the OR into an index range scan
+            queryset = queryset.filter(created_at__lte=created_at).filter(
+                Q(created_at__lt=created_at) | Q(id__lt=pk)
+            )
+        
+        rows = list(queryset[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        self.has_previous = position is not None
+        self.page = rows[:page_size]
+        self.next_cursor = self.encode_cursor(self.page[-1]) if self.has_next else None
+        return self.page
+    
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+    
+    def get_paginated_response(self, data):
+        """Same envelope as OCRResultsPagination, without page numbers and count."""
+        return Response({
+            'results': data,
+            'pagination': {
+                'page_size': len(data),
+                'has_next': self.has_next,
+                'has_previous': self.has_previous,
+                'next_cursor': self.next_cursor,
+                'next': self.get_next_link(),
             }
         })
 
@@ -1282,6 +1369,12 @@ class OCRResultsPagination(PageNumberPagination):
                 description='Number of results per page (max 100)',
                 examples=[OpenApiExample('20 per page', value=20)]
             ),
+            OpenApiParameter(
+                name='cursor',
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                description='Keyset pagination cursor (empty for the first page, then next_cursor)',
+            ),
             OpenApiParameter(
                 name='date_from',
                 type=OpenApiTypes.DATE,
@@ -1389,6 +1482,8 @@ class OCRResultsListAPIView(BaseListAPIView, APICachingMixin):
     - Maximum page size: 100 results
     - Use `page` parameter for navigation
     - Use `page_size` parameter to control results per page
+    - Pass `cursor` (empty for the first page, then `next_cursor`) for keyset
+      pagination, which stays fast on deep pages but reports no total count
     
     **Response Data**:
     - List of OCR results with summary information
@@ -1402,22 +1497,14 @@ class OCRResultsListAPIView(BaseListAPIView, APICachingMixin):
     
     **Performance Notes**:
     - Uses database indexes for efficient filtering
-    - Includes select_related for optimized queries
+    - Loads only the list columns; extracted_data and raw_text stay deferred
     - Response times typically under 100ms for standard queries
     """
-    queryset = OCRResult.objects.select_related(
-        'document', 
-        'document__user',
-        'faktura', 
-        'faktura__sprzedawca',
-        'faktura__nabywca'
-    ).prefetch_related(
-        'ocrvalidation',
-        'ocrvalidation__validated_by'
-    ).all()
+    queryset = OCRResultListSerializer.setup_queryset(OCRResult.objects.all())
     serializer_class = OCRResultListSerializer
     throttle_classes = [OCRAPIThrottle]
     pagination_class = OCRResultsPagination
+    cursor_pagination_class = OCRResultsCursorPagination
     
     # Caching settings
     cache_timeout = 180  # 3 minutes for list view (data changes more frequently)
@@ -1436,8 +1523,18 @@ class OCRResultsListAPIView(BaseListAPIView, APICachingMixin):
         queryset = self._apply_status_filter(queryset)
         queryset = self._apply_search_filter(queryset)
         
-        # Order by creation date (newest first)
-        return queryset.order_by('-created_at')
+        # Order by creation date (newest first), id breaks ties
+        return queryset.order_by('-created_at', '-id')
+    
+    @property
+    def paginator(self):
+        """Keyset paginator when a `cursor` is passed, page numbers otherwise."""
+        if not hasattr(self, '_paginator'):
+            if self.cursor_pagination_class.cursor_query_param in self.request.query_params:
+                self._paginator = self.cursor_pagination_class()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
     
     def _apply_date_filters(self, queryset):
         """Apply date range filtering."""
@@ -1546,6 +1643,9 @@ class OCRResultsListAPIView(BaseListAPIView, APICachingMixin):
                 message="OCR results retrieved successfully"
             )
             
+        except NotFound:
+            # Invalid cursor, rendered by the regular exception handler
+            raise
         except Exception as e:
             logger.error(f"Error retrieving OCR results: {str(e)}", exc_info=True)
             return self.error_response(
@@ -1,10 +1,61 @@
 """
 Cache utilities for improved performance
+
+Cached values live in namespaces, a scope (``user_stats``,
+``user_invoices``...) of one user or a global scope. Every namespace has a
+generation stored in the cache and embedded in its keys, so invalidating a
+namespace is a single INCR of its generation: keys of older generations are
+never read again and expire with their timeout. Keys of a user scope embed
+the user generation as well, invalidating all scopes of the user at once.
+
+Values are stored with the time they stay fresh. Past it they are served
+stale for ``stale_timeout`` while one caller, holding a lock, recomputes
+them, and on a miss callers wait for the lock holder instead of all
+computing the same value, for about as long as the holder is expected to
+take. When the cache is unavailable (a Redis outage with
+``IGNORE_EXCEPTIONS``), values are computed directly. Hits, stale hits and
+misses are counted per scope in the process.
 """
-from django.core.cache import cache
-from django.conf import settings
+import functools
 import hashlib
+import inspect
 import json
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models.query import ModelIterable
+
+DEFAULT_CONFIG = {
+    'timeout': 300,
+    'stale_timeout': 60,
+    'lock_timeout': 10,
+    'poll_interval': 0.05,
+    'wait_factor': 2,
+}
+
+GENERATION_KEY = 'cache_generation:{namespace}'
+
+_stats = defaultdict(Counter)
+_stats_lock = threading.Lock()
+
+# Seconds the last computation of a scope took in this process
+_compute_times: Dict[str, float] = {}
+
+
+def get_config() -> Dict:
+    return {**DEFAULT_CONFIG, **getattr(settings, 'CACHE_NAMESPACE_CONFIG', {})}
+
+
+def _key_default(value):
+    """JSON form of key arguments, model instances by their primary key"""
+    if isinstance(value, models.Model):
+        return f'{value._meta.label}:{value.pk}'
+    return str(value)
 
 
 def get_cache_key(prefix, *args, **kwargs):
@@ -15,68 +66,246 @@ def get_cache_key(prefix, *args, **kwargs):
         'args': args,
         'kwargs': kwargs
     }
-    key_string = json.dumps(key_data, sort_keys=True)
+    key_string = json.dumps(key_data, sort_keys=True, default=_key_default)
     key_hash = hashlib.md5(key_string.encode()).hexdigest()
     return f"{prefix}:{key_hash}"
 
 
-def cache_user_stats(user, timeout=300):
+def _generation_namespaces(scope: str, user_id=None) -> List[str]:
+    if user_id is None:
+        return [scope]
+    return [f'user:{user_id}', f'{scope}:{user_id}']
+
+
+def get_generations(namespaces: Iterable[str]) -> List[int]:
+    """Current generations of namespaces, one cache round trip when all are set"""
+    keys = [GENERATION_KEY.format(namespace=namespace) for namespace in namespaces]
+    found = cache.get_many(keys)
+    generations = []
+    for key in keys:
+        generation = found.get(key)
+        if generation is None:
+            # Start from the clock so keys written before an eviction are never read again
+            generation = time.time_ns()
+            if not cache.add(key, generation, None):
+                generation = cache.get(key, generation)
+        generations.append(generation)
+    return generations
+
+
+def namespaced_key(scope: str, key: str, user_id=None) -> str:
+    """Cache key of ``key`` in the current generation of a scope, of one user or global"""
+    generations = '.'.join(str(generation) for generation in get_generations(_generation_namespaces(scope, user_id)))
+    if user_id is None:
+        return f'{scope}:{generations}:{key}'
+    return f'{scope}:{user_id}:{generations}:{key}'
+
+
+def _bump(namespace: str):
+    key = GENERATION_KEY.format(namespace=namespace)
+
+    def bump():
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+
+    transaction.on_commit(bump)
+
+
+def invalidate_user_cache(user, scope: Optional[str] = None):
     """
-    Cache user statistics for dashboard
+    Invalidate all cache for a specific user, or one scope of it
+
+    Takes effect once the current transaction commits.
+    """
+    user_id = getattr(user, 'pk', user)
+    _bump(f'user:{user_id}' if scope is None else f'{scope}:{user_id}')
+
+
+def invalidate_scope(scope: str):
+    """Invalidate a global scope once the current transaction commits"""
+    _bump(scope)
+
+
+def _record(scope: str, outcome: str):
+    with _stats_lock:
+        _stats[scope][outcome] += 1
+
+
+def get_cache_stats() -> Dict[str, Dict[str, int]]:
+    """Hits, stale hits and misses per scope counted in this process"""
+    with _stats_lock:
+        return {
+            scope: {outcome: counts[outcome] for outcome in ('hits', 'stale_hits', 'misses')}
+            for scope, counts in _stats.items()
+        }
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        _stats.clear()
+        _compute_times.clear()
+
+
+def _compute(scope: str, key: str, lock_key: Optional[str], compute: Callable[[], Any], timeout: int,
+             stale_timeout: int):
+    try:
+        started = time.monotonic()
+        value = compute()
+        _compute_times[scope] = time.monotonic() - started
+        cache.set(key, (value, time.time() + timeout), timeout + stale_timeout)
+        return value
+    finally:
+        if lock_key:
+            cache.delete(lock_key)
+
+
+def get_or_compute(scope: str, key: str, compute: Callable[[], Any], user_id=None, timeout: Optional[int] = None,
+                   stale_timeout: Optional[int] = None):
+    """
+    Value of ``key`` in a namespace, computed by ``compute`` when missing or stale
+
+    Args:
+        scope: Scope of the namespace, e.g. 'user_stats'
+        key: Key within the namespace
+        compute: Function returning the value
+        user_id: User of the namespace, None for a global scope
+        timeout: Seconds the value is fresh
+        stale_timeout: Seconds a value past ``timeout`` is served while it is recomputed
+
+    Returns:
+        The cached or computed value
+    """
+    config = get_config()
+    timeout = config['timeout'] if timeout is None else timeout
+    stale_timeout = config['stale_timeout'] if stale_timeout is None else stale_timeout
+    full_key = namespaced_key(scope, key, user_id)
+    lock_key = f'{full_key}:lock'
+    # The lock holds the seconds its holder expects to compute, unknown until the scope was computed once
+    expected = _compute_times.get(scope, config['lock_timeout'])
+
+    entry = cache.get(full_key)
+    if entry is not None:
+        value, fresh_until = entry
+        if time.time() < fresh_until:
+            _record(scope, 'hits')
+            return value
+        if not cache.add(lock_key, expected, config['lock_timeout']):
+            # Another caller is recomputing it
+            _record(scope, 'stale_hits')
+            return value
+        _record(scope, 'misses')
+        return _compute(scope, full_key, lock_key, compute, timeout, stale_timeout)
+
+    locked = cache.add(lock_key, expected, config['lock_timeout'])
+    if locked is None:
+        # django_redis with IGNORE_EXCEPTIONS returns None when Redis is down, there is nobody to wait for
+        _record(scope, 'misses')
+        return _compute(scope, full_key, None, compute, timeout, stale_timeout)
+    if locked:
+        _record(scope, 'misses')
+        return _compute(scope, full_key, lock_key, compute, timeout, stale_timeout)
+
+    # Wait for the caller holding the lock rather than computing the same value, while it
+    # holds the lock and at most about as long as it expects to compute
+    found = cache.get_many([full_key, lock_key])
+    holder_expects = found.get(lock_key, config['lock_timeout'])
+    wait = max(config['poll_interval'], holder_expects * config['wait_factor'])
+    deadline = time.time() + min(config['lock_timeout'], wait)
+    while full_key not in found and lock_key in found and time.time() < deadline:
+        time.sleep(config['poll_interval'])
+        found = cache.get_many([full_key, lock_key])
+    if full_key in found:
+        _record(scope, 'hits')
+        return found[full_key][0]
+    _record(scope, 'misses')
+    return _compute(scope, full_key, None, compute, timeout, stale_timeout)
+
+
+def cached(scope: str, user: Optional[str] = None, timeout: Optional[int] = None,
+           stale_timeout: Optional[int] = None):
+    """
+    Cache results of a function in a namespace, keyed by its arguments
+
+    Args:
+        scope: Scope of the namespace, e.g. 'user_invoices'
+        user: Name of the argument holding the user, or user id, whose
+            namespace the results live in; None for a global scope
+        timeout: Seconds a result is fresh
+        stale_timeout: Seconds a result past ``timeout`` is served while it is recomputed
+
+    Example:
+        @cached('user_invoices', user='user')
+        def overdue_invoices(user, days):
+            ...
     """
     def decorator(func):
+        signature = inspect.signature(func)
+        name = f'{func.__module__}.{func.__qualname__}'
+
+        @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            cache_key = get_cache_key('user_stats', user.id)
-            result = cache.get(cache_key)
-            
-            if result is None:
-                result = func(*args, **kwargs)
-                cache.set(cache_key, result, timeout)
-            
-            return result
+            # Keyed by the bound arguments, positional and keyword calls share results
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            user_id = None if user is None else getattr(bound.arguments[user], 'pk', bound.arguments[user])
+            return get_or_compute(
+                scope, get_cache_key(name, dict(bound.arguments)), lambda: func(*args, **kwargs), user_id=user_id,
+                timeout=timeout, stale_timeout=stale_timeout
+            )
         return wrapper
     return decorator
 
 
-def invalidate_user_cache(user):
+def cache_user_stats(user, timeout=300):
     """
-    Invalidate all cache for a specific user
+    Cache user statistics for dashboard
     """
-    patterns = [
-        f"user_stats:{user.id}:*",
-        f"user_invoices:{user.id}:*",
-        f"user_contractors:{user.id}:*",
-        f"user_products:{user.id}:*",
-    ]
-    
-    for pattern in patterns:
-        try:
-            cache.delete_pattern(pattern)
-        except AttributeError:
-            # If cache backend doesn't support delete_pattern
-            pass
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return get_or_compute(
+                'user_stats', get_cache_key(func.__qualname__, *args, **kwargs), lambda: func(*args, **kwargs),
+                user_id=user.id, timeout=timeout
+            )
+        return wrapper
+    return decorator
 
 
 class CachedQuerySet:
     """
     Wrapper for caching querysets
+
+    Only field values are cached, the rows of ``values()`` querysets as
+    they are and the concrete fields of model querysets, from which the
+    instances are rebuilt. Annotations and related objects loaded with
+    ``select_related`` or ``prefetch_related`` are not cached.
     """
-    def __init__(self, queryset, cache_key, timeout=300):
+    def __init__(self, queryset, cache_key, timeout=300, user=None, scope='querysets'):
         self.queryset = queryset
         self.cache_key = cache_key
         self.timeout = timeout
-    
+        self.user_id = getattr(user, 'pk', user)
+        self.scope = scope
+
+    def _values(self):
+        if self.queryset._iterable_class is not ModelIterable:
+            return {'fields': None, 'rows': list(self.queryset)}
+        fields = [field.attname for field in self.queryset.model._meta.concrete_fields]
+        return {'fields': fields, 'rows': list(self.queryset.values_list(*fields))}
+
     def get_cached_result(self):
         """
         Get cached result or execute query
         """
-        result = cache.get(self.cache_key)
-        
-        if result is None:
-            result = list(self.queryset)
-            cache.set(self.cache_key, result, self.timeout)
-        
-        return result
+        cached_values = get_or_compute(
+            self.scope, self.cache_key, self._values, user_id=self.user_id, timeout=self.timeout
+        )
+        if cached_values['fields'] is None:
+            return cached_values['rows']
+        model, db = self.queryset.model, self.queryset.db
+        return [model.from_db(db, cached_values['fields'], row) for row in cached_values['rows']]
 
 
 def cache_frequently_accessed_data():
@@ -3,7 +3,8 @@ def unread_wiadomosci_count(request):
     Dodaje do kontekstu liczbę nieprzeczytanych wiadomości użytkownika.
     """
     if request.user.is_authenticated:
-        unread = request.user.odebrane_wiadomosci.filter(przeczytana=False).count()
+        from .services.unread_counters import MESSAGES, get_unread_count
+        unread = get_unread_count(request.user.pk, MESSAGES)
     else:
         unread = 0
     return {'unread_wiadomosci_count': unread}
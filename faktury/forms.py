@@ -1,7 +1,7 @@
 from django import forms
 from .models import (User, Faktura, Partnerstwo, PozycjaFaktury, Kontrahent,
                      Firma, Produkt, UserProfile, Zespol, CzlonekZespolu,
-                     Wiadomosc, Zadanie, ZadanieUzytkownika, FakturaCykliczna)
+                     Wiadomosc, Zadanie, ZadanieUzytkownika, FakturaCykliczna, SystemBroadcast)
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserCreationForm
 # from django.contrib.auth.models import User # User jest już importowany w models.py
@@ -418,8 +418,9 @@ class KpForm(FakturaForm):
 
 class SystemowaWiadomoscForm(forms.ModelForm):
     class Meta:
-        model = Wiadomosc
-        fields = ['temat', 'tresc']
+        model = SystemBroadcast
+        fields = ['temat', 'tresc', 'mode']
+        labels = {'mode': "Sposób dostarczenia"}
         widgets = {
             'tresc': forms.Textarea(attrs={'rows': 5, 'class': 'form-control'}),
         }
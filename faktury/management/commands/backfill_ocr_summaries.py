@@ -0,0 +1,51 @@
+"""
+Django management command to fill the OCR result list summary columns
+(invoice number, seller, gross total) from extracted_data
+"""
+
+from django.core.management.base import BaseCommand
+
+from faktury.models import OCRResult
+
+
+class Command(BaseCommand):
+    help = 'Fill the list summary columns of OCR results saved before they existed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Results updated per query (default: 1000)'
+        )
+
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Recompute every result, not only those with empty summaries'
+        )
+
+    def handle(self, *args, **options):
+        queryset = OCRResult.objects.only('id', 'extracted_data').order_by('pk')
+        if not options['all']:
+            queryset = queryset.filter(summary_invoice_number='', summary_seller_name='', summary_total__isnull=True)
+
+        batch_size = options['batch_size']
+        batch = []
+        updated = 0
+        for ocr_result in queryset.iterator(chunk_size=batch_size):
+            ocr_result.refresh_summary()
+            batch.append(ocr_result)
+            if len(batch) >= batch_size:
+                updated += self._flush(batch, batch_size)
+        if batch:
+            updated += self._flush(batch, batch_size)
+
+        self.stdout.write(self.style.SUCCESS(f'Updated summaries of {updated} OCR results'))
+
+    @staticmethod
+    def _flush(batch, batch_size):
+        OCRResult.objects.bulk_update(batch, OCRResult.SUMMARY_FIELDS, batch_size=batch_size)
+        count = len(batch)
+        batch.clear()
+        return count
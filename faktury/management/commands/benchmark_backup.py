@@ -0,0 +1,157 @@
+"""
+Management command to benchmark incremental media backups.
+
+Builds a synthetic media tree of random (incompressible, like scanned
+PDFs and images) files in a temporary directory and backs it up several
+times, rewriting a share of the files between runs:
+
+- legacy: ``shutil.copytree`` of the whole tree and a second walk for its
+  size, as the previous ``create_backup`` did on every run;
+- chunked: ``MaintenanceService.create_backup`` with the chunk store, where
+  unchanged files are neither read nor stored again.
+
+Reports time and bytes written for the first and the last run. The
+temporary directory is removed at the end.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from faktury.services.maintenance_service import MaintenanceService
+
+
+def tree_size(root):
+    return sum(os.path.getsize(os.path.join(dirpath, name)) for dirpath, _, names in os.walk(root) for name in names)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark legacy and chunked media backups over repeated runs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--media-mb',
+            type=int,
+            default=20480,
+            help='Size of the synthetic media tree in MiB (default: 20480)'
+        )
+
+        parser.add_argument(
+            '--file-kb',
+            type=int,
+            default=512,
+            help='Size of each media file in KiB (default: 512)'
+        )
+
+        parser.add_argument(
+            '--runs',
+            type=int,
+            default=10,
+            help='Backups taken of the tree (default: 10)'
+        )
+
+        parser.add_argument(
+            '--changed-percent',
+            type=float,
+            default=1.0,
+            help='Share of files rewritten between runs (default: 1.0)'
+        )
+
+        parser.add_argument(
+            '--format',
+            choices=['table', 'json'],
+            default='table',
+            help='Output format (default: table)'
+        )
+
+    def handle(self, *args, **options):
+        tmp = tempfile.mkdtemp(prefix='benchmark-backup-')
+        try:
+            media_root = os.path.join(tmp, 'media')
+            paths = self._create_tree(media_root, options)
+            report = [
+                self._run('legacy', tmp, media_root, paths, options),
+                self._run('chunked', tmp, media_root, paths, options),
+            ]
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+        if options['format'] == 'json':
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self._output_table(report)
+
+    @staticmethod
+    def _create_tree(media_root, options):
+        """Files spread over directories of 100, like upload_to date folders"""
+        file_size = options['file_kb'] * 1024
+        count = max(1, options['media_mb'] * 1024 // options['file_kb'])
+        paths = []
+        for i in range(count):
+            path = os.path.join(media_root, 'faktury', f'{i // 100:05d}', f'{i:07d}.pdf')
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(os.urandom(file_size))
+            paths.append(path)
+        return paths
+
+    @staticmethod
+    def _rewrite(paths, run, options):
+        """Rewrite a different slice of the files before every run after the first"""
+        changed = int(len(paths) * options['changed_percent'] / 100)
+        start = (run * changed) % len(paths)
+        for path in (paths * 2)[start:start + changed]:
+            with open(path, 'wb') as f:
+                f.write(os.urandom(options['file_kb'] * 1024))
+
+    def _run(self, mode, tmp, media_root, paths, options):
+        backup_directory = os.path.join(tmp, f'backups-{mode}')
+        service = None
+        runs = []
+        with override_settings(MEDIA_ROOT=media_root, BACKUP_DIRECTORY=backup_directory):
+            for run in range(options['runs']):
+                if run:
+                    self._rewrite(paths, run, options)
+                start = time.perf_counter()
+                if mode == 'legacy':
+                    target = os.path.join(backup_directory, f'run-{run}')
+                    shutil.copytree(media_root, target)
+                    written = tree_size(target)
+                else:
+                    service = service or MaintenanceService()
+                    result = service.create_backup(f'run-{run}', ['media_files'])
+                    if result['status'] != 'success':
+                        raise RuntimeError(result['errors'])
+                    written = result['backup_size']
+                runs.append({'seconds': time.perf_counter() - start, 'bytes': written})
+
+        return {
+            'mode': mode,
+            'media_bytes': tree_size(media_root),
+            'runs': options['runs'],
+            'first_seconds': runs[0]['seconds'],
+            'first_bytes': runs[0]['bytes'],
+            'last_seconds': runs[-1]['seconds'],
+            'last_bytes': runs[-1]['bytes'],
+            'total_bytes': tree_size(backup_directory),
+        }
+
+    def _output_table(self, report):
+        """Output report as a table"""
+        self.stdout.write(self.style.SUCCESS('\n=== Backup Benchmark ===\n'))
+        mib = 1024 * 1024
+        self.stdout.write(
+            f"{'mode':<10}{'media':>12}{'first':>11}{'first written':>16}"
+            f"{'last':>11}{'last written':>15}{'on disk':>14}"
+        )
+        for row in report:
+            self.stdout.write(
+                f"{row['mode']:<10}{row['media_bytes'] / mib:>8.1f} MiB{row['first_seconds']:>9.2f} s"
+                f"{row['first_bytes'] / mib:>12.1f} MiB{row['last_seconds']:>9.2f} s"
+                f"{row['last_bytes'] / mib:>11.1f} MiB{row['total_bytes'] / mib:>10.1f} MiB"
+            )
@@ -0,0 +1,190 @@
+"""
+Management command to benchmark user cache invalidation.
+
+Fills a cache with keys of many users in the four user scopes and
+invalidates the cache of one user:
+
+- delete_pattern: the previous ``invalidate_user_cache``, deleting the
+  user's keys by wildcard patterns. django-redis SCANs the whole keyspace
+  for them; on the local memory cache, which has no ``delete_pattern``, the
+  same scan is done over its keys;
+- generation: ``invalidate_user_cache`` bumping the user's generation, one
+  INCR whatever the number of keys.
+
+Reads of existing keys are timed as well, plain and through the namespace
+generations. Runs on a local memory cache unless ``--configured-cache`` is
+given, which needs a backend with ``delete_pattern``. The benchmark keys
+are deleted at the end.
+"""
+
+import fnmatch
+import json
+import re
+import time
+import uuid
+from unittest.mock import patch
+
+from django.core.cache import cache as configured_cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+
+from faktury import cache_utils
+
+SCOPES = ('user_stats', 'user_invoices', 'user_contractors', 'user_products')
+
+
+class Command(BaseCommand):
+    help = 'Benchmark pattern and generation based user cache invalidation'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keys',
+            type=int,
+            default=1_000_000,
+            help='Cached keys of all users (default: 1000000)'
+        )
+
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=10_000,
+            help='Users the keys belong to (default: 10000)'
+        )
+
+        parser.add_argument(
+            '--reads',
+            type=int,
+            default=10_000,
+            help='Timed reads per mode (default: 10000)'
+        )
+
+        parser.add_argument(
+            '--configured-cache',
+            action='store_true',
+            help='Use the configured default cache instead of a local memory cache'
+        )
+
+        parser.add_argument(
+            '--format',
+            choices=['table', 'json'],
+            default='table',
+            help='Output format (default: table)'
+        )
+
+    def handle(self, *args, **options):
+        if options['configured_cache']:
+            backend = configured_cache
+            if not hasattr(backend, 'delete_pattern'):
+                raise CommandError('The configured cache has no delete_pattern')
+        else:
+            backend = LocMemCache(f'benchmark-namespaces-{uuid.uuid4().hex}', {
+                'OPTIONS': {'MAX_ENTRIES': 4 * options['keys'] + 1000}
+            })
+        prefix = f'bench{uuid.uuid4().hex[:8]}'
+        per_user = max(1, options['keys'] // options['users'])
+        user_id = f'{prefix}-0'
+
+        report = []
+        with patch.object(cache_utils, 'cache', backend):
+            try:
+                self._fill(backend, prefix, options['users'], per_user)
+                report.append(self._delete_pattern(backend, prefix, user_id, options))
+                report.append(self._generation(backend, prefix, user_id, options))
+            finally:
+                self._cleanup(backend, prefix, options['configured_cache'])
+
+        if options['format'] == 'json':
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self._output_table(report)
+
+    @staticmethod
+    def _fill(backend, prefix, users, per_user):
+        """Keys of every user in every scope, as the pattern-based scheme wrote them"""
+        value = {'total': 123, 'rows': list(range(10))}
+        for user in range(users):
+            user_id = f'{prefix}-{user}'
+            backend.set_many({
+                f'{SCOPES[index % len(SCOPES)]}:{user_id}:{index}': value for index in range(per_user)
+            }, 3600)
+
+        # Namespaced keys of the user read in the generation mode
+        namespaces = {scope: cache_utils.namespaced_key(scope, '', f'{prefix}-1') for scope in SCOPES}
+        backend.set_many({
+            f'{namespaces[SCOPES[index % len(SCOPES)]]}{index}': (value, time.time() + 3600)
+            for index in range(per_user)
+        }, 3600)
+
+    def _delete_pattern(self, backend, prefix, user_id, options):
+        patterns = [f'{scope}:{user_id}:*' for scope in SCOPES]
+        start = time.perf_counter()
+        if hasattr(backend, 'delete_pattern'):
+            deleted = sum(backend.delete_pattern(pattern) or 0 for pattern in patterns)
+            scanned = None
+        else:
+            # The keyspace scan of delete_pattern over the local memory cache keys
+            matcher = re.compile('|'.join(fnmatch.translate(backend.make_key(pattern)) for pattern in patterns))
+            keys = list(backend._cache)
+            scanned = len(keys)
+            deleted = 0
+            for key in keys:
+                if matcher.match(key):
+                    del backend._cache[key]
+                    del backend._expire_info[key]
+                    deleted += 1
+        invalidate = time.perf_counter() - start
+
+        per_user = max(1, options['keys'] // options['users'])
+        start = time.perf_counter()
+        for index in range(options['reads']):
+            index %= per_user
+            backend.get(f'{SCOPES[index % len(SCOPES)]}:{prefix}-1:{index}')
+        read = time.perf_counter() - start
+        return self._row('delete_pattern', options, scanned, deleted, invalidate, read)
+
+    def _generation(self, backend, prefix, user_id, options):
+        # Invalidating another user leaves the namespaced keys read below valid
+        start = time.perf_counter()
+        # Outside a transaction the bump runs at once
+        cache_utils.invalidate_user_cache(user_id)
+        invalidate = time.perf_counter() - start
+
+        per_user = max(1, options['keys'] // options['users'])
+        start = time.perf_counter()
+        for index in range(options['reads']):
+            index %= per_user
+            backend.get(cache_utils.namespaced_key(SCOPES[index % len(SCOPES)], str(index), f'{prefix}-1'))
+        read = time.perf_counter() - start
+        return self._row('generation', options, 1, None, invalidate, read)
+
+    @staticmethod
+    def _row(mode, options, operations, deleted, invalidate, read):
+        return {
+            'mode': mode,
+            'keys': options['keys'],
+            'operations': operations,
+            'deleted': deleted,
+            'invalidate_ms': invalidate * 1000,
+            'read_us': read / options['reads'] * 1_000_000,
+        }
+
+    @staticmethod
+    def _cleanup(backend, prefix, configured):
+        if configured:
+            for scope in SCOPES:
+                backend.delete_pattern(f'{scope}:{prefix}-*')
+            backend.delete_pattern(f'{cache_utils.GENERATION_KEY.format(namespace="")}*{prefix}-*')
+        else:
+            backend.clear()
+
+    def _output_table(self, report):
+        """Output report as a table"""
+        self.stdout.write(self.style.SUCCESS('\n=== Cache Namespaces Benchmark ===\n'))
+        self.stdout.write(f"{'mode':<16}{'keys':>10}{'scanned':>10}{'deleted':>9}{'invalidate':>14}{'read':>12}")
+        for row in report:
+            scanned = '-' if row['operations'] is None else row['operations']
+            deleted = '-' if row['deleted'] is None else row['deleted']
+            self.stdout.write(
+                f"{row['mode']:<16}{row['keys']:>10}{scanned:>10}{deleted:>9}"
+                f"{row['invalidate_ms']:>11.3f} ms{row['read_us']:>9.1f} us"
+            )
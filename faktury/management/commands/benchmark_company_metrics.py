@@ -0,0 +1,239 @@
+"""
+Management command to benchmark company statistics and company access.
+
+Creates a company with partnerships to other companies and invoices spread
+over the last year, then lists the user's companies, checks access to every
+partner and to as many companies outside the partnerships, and computes the
+company statistics, as the company dashboard does:
+
+- legacy: one query per access check and statistic, revenue summed from
+  ``suma_brutto`` of every paid invoice, as the previous
+  CompanyManagementService did;
+- cold: CompanyManagementService with an empty company access cache;
+- warm: the same with the company access cached;
+- rollup: warm, with closed months read from CompanyMetricsRollup.
+
+Company access is cached in a local memory cache unless
+``--configured-cache`` is given. Reports time and queries per mode.
+Everything the benchmark created is deleted at the end.
+"""
+
+import datetime
+import json
+import random
+import time
+import uuid
+from contextlib import nullcontext
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+from django.db import connection, models
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from faktury.models import Faktura, Firma, Kontrahent, Partnerstwo, PozycjaFaktury
+from faktury.services.company_management_service import CompanyManagementService
+from faktury.services.company_metrics import get_config, invalidate_company_access, month_start, rollup_company_metrics
+
+USERNAME_PREFIX = 'benchmark-company-'
+
+
+class Command(BaseCommand):
+    help = 'Benchmark per-query and aggregated company statistics and cached company access'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--partnerships',
+            type=int,
+            default=50,
+            help='Active partnerships of the company (default: 50)'
+        )
+
+        parser.add_argument(
+            '--invoices',
+            type=int,
+            default=20_000,
+            help='Invoices of the company over the last year (default: 20000)'
+        )
+
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=10,
+            help='Dashboard requests per mode (default: 10)'
+        )
+
+        parser.add_argument(
+            '--configured-cache',
+            action='store_true',
+            help='Cache company access in the configured default cache instead of a local memory cache'
+        )
+
+        parser.add_argument(
+            '--format',
+            choices=['table', 'json'],
+            default='table',
+            help='Output format (default: table)'
+        )
+
+    def handle(self, *args, **options):
+        self._cleanup()
+        firma, partners, outsiders = self._create_fixture(options['partnerships'], options['invoices'])
+        service = CompanyManagementService()
+        access_cache = nullcontext() if options['configured_cache'] else patch(
+            'faktury.services.company_metrics.cache', LocMemCache(f'benchmark-company-{uuid.uuid4().hex}', {})
+        )
+        report = []
+        try:
+            with access_cache:
+                for mode in ('legacy', 'cold', 'warm', 'rollup'):
+                    if mode == 'rollup':
+                        month = month_start(timezone.localdate())
+                        for _ in range(13):
+                            month = month_start(month - datetime.timedelta(days=1))
+                            rollup_company_metrics(month)
+                    report.append(self._run(mode, service, firma, partners + outsiders, options))
+        finally:
+            self._cleanup()
+
+        if options['format'] == 'json':
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self._output_table(report)
+
+    def _run(self, mode, service, firma, companies, options):
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(None)
+            return execute(sql, params, many, context)
+
+        config = {**get_config(), 'use_rollup': mode == 'rollup'}
+        with connection.execute_wrapper(count), override_settings(COMPANY_METRICS_CONFIG=config):
+            start = time.perf_counter()
+            for _ in range(options['requests']):
+                if mode == 'legacy':
+                    accessible = self._legacy_companies(firma.user)
+                    allowed = sum(self._legacy_access(firma.user, company_id) for company_id in companies)
+                    stats = self._legacy_statistics(firma)
+                else:
+                    if mode == 'cold':
+                        invalidate_company_access(firma.user_id)
+                    accessible = service.get_user_companies(firma.user)
+                    allowed = sum(service.user_has_company_access(firma.user, company_id) for company_id in companies)
+                    stats = service.get_company_statistics(firma)
+            elapsed = time.perf_counter() - start
+        return {
+            'mode': mode,
+            'partnerships': options['partnerships'],
+            'invoices': options['invoices'],
+            'requests': options['requests'],
+            'queries': len(queries),
+            'seconds': elapsed,
+            'companies': len(accessible),
+            'allowed': allowed,
+            'total_revenue': str(stats['total_revenue']),
+        }
+
+    @staticmethod
+    def _create_fixture(partnerships, invoices):
+        firmy = []
+        for index in range(2 * partnerships + 1):
+            user = User.objects.create_user(username=f'{USERNAME_PREFIX}{index}')
+            firmy.append(Firma(
+                user=user, nazwa=f'Benchmark company {index}', nip=f'99{index:08d}', ulica='Główna',
+                numer_domu='1', kod_pocztowy='00-001', miejscowosc='Warszawa'
+            ))
+        Firma.objects.bulk_create(firmy)
+        firma, partners, outsiders = firmy[0], firmy[1:partnerships + 1], firmy[partnerships + 1:]
+        Partnerstwo.objects.bulk_create([
+            Partnerstwo(firma1=firma, firma2=partner) if index % 2 else Partnerstwo(firma1=partner, firma2=firma)
+            for index, partner in enumerate(partners)
+        ])
+        nabywca = Kontrahent.objects.create(
+            user=firma.user, nazwa='Klient', ulica='Główna', numer_domu='1', kod_pocztowy='00-001',
+            miejscowosc='Warszawa'
+        )
+
+        rng = random.Random(0)
+        today = datetime.date.today()
+        batch = 5000
+        for start in range(0, invoices, batch):
+            faktury = []
+            for i in range(start, min(start + batch, invoices)):
+                issued = today - datetime.timedelta(days=rng.randrange(365))
+                faktury.append(Faktura(
+                    user=firma.user, numer=f'BENCH/{i}', data_wystawienia=issued, data_sprzedazy=issued,
+                    termin_platnosci=issued, miejsce_wystawienia='Warszawa', sprzedawca=firma, nabywca=nabywca,
+                    typ_faktury='koszt' if i % 10 == 9 else 'sprzedaz', status=rng.choice(['wystawiona', 'oplacona']),
+                ))
+            Faktura.objects.bulk_create(faktury, batch_size=batch)
+            PozycjaFaktury.objects.bulk_create([
+                PozycjaFaktury(faktura=faktura, nazwa='Usługa', jednostka='szt',
+                               cena_netto=Decimal(rng.randrange(100, 100000)) / 100, ilosc=Decimal(rng.randrange(1, 5)),
+                               vat=rng.choice(['23', '8', 'zw']))
+                for faktura in faktury
+            ], batch_size=batch)
+        return firma, [partner.pk for partner in partners], [outsider.pk for outsider in outsiders]
+
+    @staticmethod
+    def _legacy_access(user, company_id):
+        """The previous CompanyManagementService.user_has_company_access"""
+        if Firma.objects.filter(id=company_id, user=user).exists():
+            return True
+        user_company = Firma.objects.filter(user=user).first()
+        return bool(user_company) and Partnerstwo.objects.filter(
+            models.Q(firma1=user_company, firma2_id=company_id) | models.Q(firma1_id=company_id, firma2=user_company),
+            aktywne=True
+        ).exists()
+
+    @staticmethod
+    def _legacy_companies(user):
+        """The previous CompanyManagementService.get_user_companies"""
+        user_company = Firma.objects.filter(user=user).first()
+        companies = [user_company.pk]
+        for partnership in Partnerstwo.objects.filter(
+            models.Q(firma1=user_company) | models.Q(firma2=user_company), aktywne=True
+        ).select_related('firma1', 'firma2'):
+            companies.append((partnership.firma2 if partnership.firma1 == user_company else partnership.firma1).pk)
+        return companies
+
+    @staticmethod
+    def _legacy_statistics(company):
+        """The previous CompanyManagementService.get_company_statistics"""
+        stats = {
+            'total_invoices': Faktura.objects.filter(sprzedawca=company).count(),
+            'total_sales': Faktura.objects.filter(sprzedawca=company, typ_faktury='sprzedaz').count(),
+            'total_costs': Faktura.objects.filter(user=company.user, typ_faktury='koszt').count(),
+            'active_partnerships': Partnerstwo.objects.filter(
+                models.Q(firma1=company) | models.Q(firma2=company), aktywne=True
+            ).count(),
+            'total_contractors': Kontrahent.objects.filter(user=company.user).count(),
+        }
+        stats['total_revenue'] = sum(
+            (invoice.suma_brutto for invoice in Faktura.objects.filter(
+                sprzedawca=company, typ_faktury='sprzedaz', status='oplacona'
+            )),
+            Decimal('0.00')
+        )
+        return stats
+
+    @staticmethod
+    def _cleanup():
+        faktury = list(Faktura.objects.filter(user__username__startswith=USERNAME_PREFIX).values_list('pk', flat=True))
+        for start in range(0, len(faktury), 5000):
+            Faktura.objects.filter(pk__in=faktury[start:start + 5000]).delete()
+        User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+
+    def _output_table(self, report):
+        """Output report as a table"""
+        self.stdout.write(self.style.SUCCESS('\n=== Company Metrics Benchmark ===\n'))
+        self.stdout.write(f"{'mode':<8}{'requests':>10}{'queries':>9}{'time':>11}{'companies':>11}{'allowed':>9}{'revenue':>16}")
+        for row in report:
+            self.stdout.write(
+                f"{row['mode']:<8}{row['requests']:>10}{row['queries']:>9}{row['seconds']:>9.2f} s"
+                f"{row['companies']:>11}{row['allowed']:>9}{row['total_revenue']:>16}"
+            )
@@ -0,0 +1,155 @@
+"""
+Management command to benchmark Faktura creation from OCR results.
+
+Creates a temporary user with synthetic OCR results (a few recurring
+suppliers, configurable line items per invoice) and creates invoices from
+them one at a time with ``FakturaCreator.create_from_ocr`` and in batches
+with ``FakturaCreator.create_many_from_ocr``, reporting throughput and
+queries per invoice. Everything is created inside a transaction that is
+rolled back at the end.
+"""
+
+import json
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from faktury.models import DocumentUpload, Firma, OCRResult
+from faktury.services.ocr_integration import FakturaCreator
+
+
+class Command(BaseCommand):
+    help = 'Benchmark single and batched Faktura creation from OCR results'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--invoices',
+            type=int,
+            default=200,
+            help='Number of OCR results per mode (default: 200)'
+        )
+
+        parser.add_argument(
+            '--lines',
+            type=int,
+            default=60,
+            help='Line items per invoice (default: 60)'
+        )
+
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='OCR results per create_many_from_ocr call (default: 50)'
+        )
+
+        parser.add_argument(
+            '--suppliers',
+            type=int,
+            default=10,
+            help='Number of distinct suppliers (default: 10)'
+        )
+
+        parser.add_argument(
+            '--format',
+            choices=['table', 'json'],
+            default='table',
+            help='Output format (default: table)'
+        )
+
+    def handle(self, *args, **options):
+        report = []
+
+        with transaction.atomic():
+            user = self._create_user()
+
+            for mode in ('single', 'batched'):
+                ocr_results = self._create_ocr_results(user, mode, options)
+                creator = FakturaCreator(User.objects.get(pk=user.pk))
+
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    if mode == 'single':
+                        created = [creator.create_from_ocr(ocr_result) for ocr_result in ocr_results]
+                    else:
+                        created = []
+                        for i in range(0, len(ocr_results), options['batch_size']):
+                            batch = ocr_results[i:i + options['batch_size']]
+                            created += creator.create_many_from_ocr(batch)['created']
+                    elapsed = time.perf_counter() - start
+
+                report.append({
+                    'mode': mode,
+                    'invoices': len(created),
+                    'lines_per_invoice': options['lines'],
+                    'seconds': elapsed,
+                    'invoices_per_second': len(created) / elapsed if elapsed else 0.0,
+                    'queries_per_invoice': len(queries) / len(created) if created else 0.0,
+                })
+
+            transaction.set_rollback(True)
+
+        if options['format'] == 'json':
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self._output_table(report)
+
+    @staticmethod
+    def _create_user():
+        suffix = uuid.uuid4().hex[:12]
+        user = User.objects.create_user(username=f'benchmark-{suffix}')
+        Firma.objects.create(
+            user=user, nazwa='Benchmark', nip=f'99{suffix[:8]}', ulica='Testowa',
+            numer_domu='1', kod_pocztowy='00-001', miejscowosc='Warszawa'
+        )
+        return user
+
+    @staticmethod
+    def _create_ocr_results(user, mode, options):
+        """Synthetic OCR results, created without the signals that would process them"""
+        documents = DocumentUpload.objects.bulk_create([
+            DocumentUpload(user=user, original_filename=f'{mode}-{i}.pdf', file_path=f'/tmp/{mode}-{i}.pdf',
+                           file_size=1, content_type='application/pdf', processing_status='processing')
+            for i in range(options['invoices'])
+        ])
+        OCRResult.objects.bulk_create([
+            OCRResult(
+                document=document,
+                raw_text='',
+                confidence_score=95.0,
+                processing_time=1.0,
+                processing_status='processing',
+                extracted_data={
+                    'numer_faktury': f'FV/{mode}/{i + 1}/2025',
+                    'data_wystawienia': '2025-01-15',
+                    'data_sprzedazy': '2025-01-15',
+                    'sprzedawca_nazwa': f'Dostawca {i % options["suppliers"]} Sp. z o.o.',
+                    'sprzedawca_nip': f'52600{i % options["suppliers"]:05d}',
+                    'sprzedawca_ulica': 'Dostawcza',
+                    'sprzedawca_numer_domu': '10',
+                    'sprzedawca_kod_pocztowy': '11-111',
+                    'sprzedawca_miejscowosc': 'Kraków',
+                    'nabywca_nazwa': 'Benchmark',
+                    'pozycje': [
+                        {'nazwa': f'Usługa {line}', 'ilosc': '1', 'jednostka': 'szt', 'cena_netto': '10,00', 'vat': '23'}
+                        for line in range(1, options['lines'] + 1)
+                    ],
+                },
+            )
+            for i, document in enumerate(documents)
+        ])
+        return list(OCRResult.objects.filter(document__in=documents).order_by('pk'))
+
+    def _output_table(self, report):
+        """Output report as a table"""
+        self.stdout.write(self.style.SUCCESS('\n=== Faktura Creation Benchmark ===\n'))
+        self.stdout.write(f"{'mode':<10}{'invoices':>10}{'lines':>7}{'time':>11}{'invoices/s':>12}{'queries/inv':>13}")
+        for row in report:
+            self.stdout.write(
+                f"{row['mode']:<10}{row['invoices']:>10}{row['lines_per_invoice']:>7}"
+                f"{row['seconds']:>9.2f} s{row['invoices_per_second']:>12.1f}{row['queries_per_invoice']:>13.1f}"
+            )
@@ -0,0 +1,177 @@
+"""
+Management command to benchmark feature flag evaluation.
+
+Compares the per-flag cache lookup used before flag snapshots (one cache
+call per flag, a database query on every miss) with evaluation against the
+in-memory snapshot, reporting latency and cache/query counts per request.
+"""
+
+import json
+import time
+from datetime import datetime
+
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from faktury.services.feature_flag_service import FeatureFlagService
+
+
+class CountingCache:
+    """Cache proxy counting backend calls"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.calls = 0
+
+    def __getattr__(self, name):
+        attr = getattr(self.backend, name)
+        if not callable(attr):
+            return attr
+
+        def counted(*args, **kwargs):
+            self.calls += 1
+            return attr(*args, **kwargs)
+        return counted
+
+
+def legacy_user_flags(service, cache, user_id):
+    """Evaluate all flags with a cache lookup per flag (pre-snapshot behaviour)"""
+    flags_status = {}
+    for flag_name in service.all_flags:
+        cache_key = f"{service.CACHE_PREFIX}_config_{flag_name}"
+        config = cache.get(cache_key)
+        if config is None:
+            config = dict(service.all_flags.get(flag_name, {}))
+            try:
+                from faktury.models import FeatureFlag
+                db_flag = FeatureFlag.objects.filter(name=flag_name).first()
+                if db_flag:
+                    config.update({
+                        "enabled": db_flag.enabled,
+                        "rollout_percentage": db_flag.rollout_percentage,
+                        "start_date": db_flag.start_date,
+                        "end_date": db_flag.end_date
+                    })
+            except Exception:
+                pass
+            cache.set(cache_key, config, service.CACHE_TIMEOUT)
+
+        bucket = service.get_user_bucket(user_id)
+        flags_status[flag_name] = service._evaluate(config, bucket, datetime.now())
+    return flags_status
+
+
+class Command(BaseCommand):
+    help = 'Benchmark feature flag evaluation: per-flag cache lookups vs in-memory snapshot'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--flags',
+            type=int,
+            default=50,
+            help='Number of flags to evaluate (default: 50)'
+        )
+
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=1000,
+            help='Number of simulated requests, one per user (default: 1000)'
+        )
+
+        parser.add_argument(
+            '--cache-alias',
+            type=str,
+            help='Django cache alias to use (default: private local-memory cache)'
+        )
+
+        parser.add_argument(
+            '--format',
+            choices=['table', 'json'],
+            default='table',
+            help='Output format (default: table)'
+        )
+
+    def handle(self, *args, **options):
+        backend = (
+            caches[options['cache_alias']] if options['cache_alias']
+            else LocMemCache('benchmark_feature_flags', {})
+        )
+        backend.clear()
+
+        flags = {
+            f"BENCHMARK_FLAG_{i:03d}": {
+                "name": f"Benchmark flag {i}",
+                "category": "benchmark",
+                "enabled": True,
+                "rollout_percentage": (i * 7) % 101
+            }
+            for i in range(options['flags'])
+        }
+        user_ids = range(1, options['users'] + 1)
+
+        counting_cache = CountingCache(backend)
+        service = FeatureFlagService(cache_backend=counting_cache)
+        service.all_flags = flags
+
+        before = self._measure(
+            lambda user_id: legacy_user_flags(service, counting_cache, user_id),
+            user_ids, counting_cache
+        )
+        after = self._measure(
+            lambda user_id: service.get_user_flags(user_id=user_id),
+            user_ids, counting_cache
+        )
+
+        for user_id in (1, options['users']):
+            if legacy_user_flags(service, backend, user_id) != service.get_user_flags(user_id=user_id):
+                self.stderr.write(self.style.ERROR(f"Results differ for user {user_id}"))
+
+        report = {
+            'flags': len(flags),
+            'users': len(user_ids),
+            'before': before,
+            'after': after,
+            'speedup': before['per_request_ms'] / after['per_request_ms'] if after['per_request_ms'] else None
+        }
+
+        if options['format'] == 'json':
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self._output_table(report)
+
+    def _measure(self, evaluate, user_ids, counting_cache):
+        """Evaluate all flags once per user, collecting latency and call counts"""
+        counting_cache.calls = 0
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            for user_id in user_ids:
+                evaluate(user_id)
+            elapsed = time.perf_counter() - start
+
+        requests = len(user_ids)
+        return {
+            'total_seconds': elapsed,
+            'per_request_ms': elapsed / requests * 1000,
+            'cache_calls': counting_cache.calls,
+            'cache_calls_per_request': counting_cache.calls / requests,
+            'queries': len(queries),
+        }
+
+    def _output_table(self, report):
+        """Output report as a table"""
+        self.stdout.write(self.style.SUCCESS(
+            f"\n=== Feature Flag Evaluation ({report['flags']} flags x {report['users']} users) ===\n"
+        ))
+        self.stdout.write(f"{'':<22}{'per request':>14}{'cache calls/req':>18}{'queries':>10}")
+        for label in ('before', 'after'):
+            row = report[label]
+            self.stdout.write(
+                f"{label:<22}{row['per_request_ms']:>11.3f} ms"
+                f"{row['cache_calls_per_request']:>18.2f}{row['queries']:>10}"
+            )
+        if report['speedup']:
+            self.stdout.write(f"\nSpeedup: {report['speedup']:.1f}x")
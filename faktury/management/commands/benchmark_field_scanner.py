@@ -0,0 +1,183 @@
+"""
+Management command to benchmark the precompiled Polish field scanner.
+
+Generates synthetic invoice texts (varying currencies, date formats, company
+forms and letter case) and compares scanning every raw pattern string with
+``re`` separately, as the extractors did, with the shared scanner. Times raw
+candidate scans and the full ``InvoiceFieldExtractor`` and ``PolishPatterns``
+extraction, and checks that both paths produce identical results.
+"""
+
+import json
+import random
+import re
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from faktury.services.invoice_field_extractor import InvoiceFieldExtractor
+from faktury.services.polish_field_scanner import INVOICE_FIELD_PATTERNS, POLISH_MONTHS, POLISH_PATTERNS, FieldScanner
+from faktury.services.polish_patterns import PolishPatterns
+
+
+COMPANY_FORMS = ('Sp. z o.o.', 'S.A.', 'Spółka Akcyjna', 'P.P.H.U.', 'Spółka Jawna')
+CITIES = ('Warszawa', 'Kraków', 'Gdańsk', 'Poznań', 'Łódź', 'Wrocław')
+
+
+class PerPatternScanner(FieldScanner):
+    """Baseline scanning every raw pattern string with ``re`` separately"""
+
+    def patterns(self, family, text=None):
+        return self.families[family]
+
+    def matches(self, text, family):
+        return [(p.pattern, list(re.finditer(p.pattern, text, re.IGNORECASE))) for p in self.families[family]]
+
+    def findall(self, text, family):
+        return [(p.pattern, re.findall(p.pattern, text, re.IGNORECASE)) for p in self.families[family]]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the precompiled Polish field scanner against per-pattern scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--documents',
+            type=int,
+            default=1000,
+            help='Number of synthetic invoice texts (default: 1000)'
+        )
+
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Random seed (default: 42)'
+        )
+
+        parser.add_argument(
+            '--format',
+            choices=['table', 'json'],
+            default='table',
+            help='Output format (default: table)'
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        texts = [self._generate_text(rng, i) for i in range(options['documents'])]
+
+        baseline = PerPatternScanner(INVOICE_FIELD_PATTERNS)
+        scanner = FieldScanner(INVOICE_FIELD_PATTERNS, cache_size=0)
+
+        naive_extractor, extractor = InvoiceFieldExtractor(), InvoiceFieldExtractor()
+        naive_extractor.scanner = baseline
+        extractor.scanner = scanner
+
+        naive_patterns, patterns = PolishPatterns(), PolishPatterns()
+        naive_patterns.scanner = PerPatternScanner(POLISH_PATTERNS)
+        patterns.scanner = FieldScanner(POLISH_PATTERNS, cache_size=0)
+
+        def scan_all_text(target, text):
+            return [
+                [[(m.span(), m.groups()) for m in found] for _, found in target.matches(text, family)]
+                for family in INVOICE_FIELD_PATTERNS
+            ]
+
+        def scan_all(target):
+            return [scan_all_text(target, text) for text in texts]
+
+        def rescan_all(target):
+            # Two consumers of every text, e.g. the early-stop field check and the full extraction
+            return [scan_all_text(target, text) + scan_all_text(target, text) for text in texts]
+
+        def extract_all(target):
+            return [target.extract_fields(text) for text in texts]
+
+        def extract_patterns(target):
+            return [
+                {name: sorted(values) for name, values in target.extract_all_patterns(text).items()}
+                for text in texts
+            ]
+
+        report = []
+        for name, run, slow, fast in (
+            ('candidate_scan', scan_all, baseline, scanner),
+            ('candidate_rescan', rescan_all, baseline, FieldScanner(INVOICE_FIELD_PATTERNS)),
+            ('invoice_field_extractor', extract_all, naive_extractor, extractor),
+            ('polish_patterns', extract_patterns, naive_patterns, patterns),
+        ):
+            expected, per_pattern_seconds = self._timed(lambda: run(slow))
+            actual, scanner_seconds = self._timed(lambda: run(fast))
+            if actual != expected:
+                raise CommandError(f'{name}: scanner results differ from per-pattern scans')
+
+            report.append({
+                'benchmark': name,
+                'documents': len(texts),
+                'per_pattern_ms_per_doc': per_pattern_seconds * 1000 / len(texts),
+                'scanner_ms_per_doc': scanner_seconds * 1000 / len(texts),
+                'speedup': per_pattern_seconds / scanner_seconds if scanner_seconds else 0.0,
+                'identical': True,
+            })
+
+        if options['format'] == 'json':
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self._output_table(report)
+
+    @staticmethod
+    def _timed(func):
+        start = time.perf_counter()
+        result = func()
+        return result, time.perf_counter() - start
+
+    @staticmethod
+    def _generate_text(rng, index):
+        """Synthetic invoice text with randomized formats"""
+        currency = rng.choice(('zł', 'PLN', 'złotych'))
+        day, month, year = rng.randint(1, 28), rng.randint(1, 12), rng.choice((2023, 2024, 2025))
+        if rng.random() < 0.3:
+            issue_date = f'{day} {POLISH_MONTHS[month - 1]} {year}'
+        else:
+            issue_date = rng.choice((f'{day:02d}.{month:02d}.{year}', f'{year}-{month:02d}-{day:02d}'))
+
+        lines = [
+            f'Faktura VAT Nr FV/{year}/{month:02d}/{index + 1}',
+            f'Data wystawienia: {issue_date}',
+            f'Termin płatności: {rng.choice((7, 14, 30))} dni',
+            '',
+            'Sprzedawca:',
+            f'Firma {rng.choice("ABCDEFGH")}{index} {rng.choice(COMPANY_FORMS)}',
+            f'ul. Testowa {rng.randint(1, 200)}',
+            f'{rng.randint(10, 99)}-{rng.randint(100, 999)} {rng.choice(CITIES)}',
+            f'NIP: {rng.randint(100, 999)}-{rng.randint(100, 999)}-{rng.randint(10, 99)}-{rng.randint(10, 99)}',
+            '',
+            'Nabywca:',
+            f'Klient {index} {rng.choice(COMPANY_FORMS)}',
+            f'{rng.randint(10, 99)}-{rng.randint(100, 999)} {rng.choice(CITIES)}',
+            '',
+        ]
+        total = 0
+        for item in range(1, rng.randint(2, 8)):
+            amount = rng.randint(10, 5000)
+            total += amount
+            lines.append(f'{item}. Usługa {item} {rng.randint(1, 10)} szt {amount},00 {currency} {rng.choice((23, 8, 5))}% VAT')
+        lines += [
+            '',
+            f'Razem do zapłaty: {total:,}'.replace(',', ' ') + f',00 {currency}',
+            'Konto: PL 61 ' + ' '.join(str(rng.randint(1000, 9999)) for _ in range(6)),
+        ]
+
+        text = '\n'.join(lines)
+        return text.upper() if rng.random() < 0.1 else text
+
+    def _output_table(self, report):
+        """Output report as a table"""
+        self.stdout.write(self.style.SUCCESS('\n=== Polish Field Scanner Benchmark ===\n'))
+        self.stdout.write(f"{'benchmark':<26}{'docs':>6}{'per-pattern':>14}{'scanner':>12}{'speedup':>9}{'identical':>11}")
+        for row in report:
+            self.stdout.write(
+                f"{row['benchmark']:<26}{row['documents']:>6}"
+                f"{row['per_pattern_ms_per_doc']:>11.3f} ms{row['scanner_ms_per_doc']:>9.3f} ms"
+                f"{row['speedup']:>8.2f}x{'yes' if row['identical'] else 'no':>11}"
+            )
@@ -0,0 +1,123 @@
+"""
+Management command to benchmark web worker cold start.
+
+Measures the time and memory needed for django.setup() plus URL loading in a
+fresh interpreter and reports heavy OCR/PDF libraries that got imported.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Libraries that must only be loaded by OCR/PDF workers, never by the web tier
+HEAVY_MODULES = (
+    'cv2', 'numpy', 'scipy', 'skimage', 'pdf2image', 'torch', 'easyocr',
+    'paddleocr', 'paddle', 'pytesseract', 'weasyprint', 'sklearn',
+)
+
+PROBE_SCRIPT = """
+import json, resource, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+setup_time = time.perf_counter() - start
+from django.urls import get_resolver
+get_resolver().url_patterns
+total_time = time.perf_counter() - start
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == 'darwin':
+    rss_kb //= 1024
+print(json.dumps({
+    'setup_seconds': setup_time,
+    'total_seconds': total_time,
+    'max_rss_mb': rss_kb / 1024,
+    'modules': len(sys.modules),
+    'heavy_modules': sorted(m for m in %r if m in sys.modules),
+}))
+"""
+
+
+class Command(BaseCommand):
+    help = 'Benchmark cold start time and memory of django.setup() plus URL loading'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--runs',
+            type=int,
+            default=3,
+            help='Number of fresh interpreter runs (default: 3)'
+        )
+
+        parser.add_argument(
+            '--format',
+            choices=['table', 'json'],
+            default='table',
+            help='Output format (default: table)'
+        )
+
+        parser.add_argument(
+            '--fail-on-heavy',
+            action='store_true',
+            help='Exit with an error if heavy libraries are imported'
+        )
+
+    def handle(self, *args, **options):
+        runs = [self._run_probe() for _ in range(max(1, options['runs']))]
+
+        report = {
+            'runs': len(runs),
+            'setup_seconds': min(run['setup_seconds'] for run in runs),
+            'total_seconds': min(run['total_seconds'] for run in runs),
+            'max_rss_mb': min(run['max_rss_mb'] for run in runs),
+            'modules': runs[-1]['modules'],
+            'heavy_modules': runs[-1]['heavy_modules'],
+        }
+
+        if options['format'] == 'json':
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self._output_table(report)
+
+        if options['fail_on_heavy'] and report['heavy_modules']:
+            raise CommandError(
+                f"Heavy modules imported during web startup: {', '.join(report['heavy_modules'])}"
+            )
+
+    def _run_probe(self):
+        """Run django.setup() and URL loading in a fresh interpreter"""
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get(
+            'DJANGO_SETTINGS_MODULE', 'faktulove.settings'
+        ))
+        completed = subprocess.run(
+            [sys.executable, '-c', PROBE_SCRIPT % (HEAVY_MODULES,)],
+            cwd=str(settings.BASE_DIR),
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if completed.returncode != 0:
+            raise CommandError(f"Startup probe failed:\n{completed.stderr}")
+
+        # Settings may print to stdout; the report is the last line
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+
+    def _output_table(self, report):
+        """Output report as a table"""
+        self.stdout.write(self.style.SUCCESS('\n=== Web Worker Cold Start ===\n'))
+        self.stdout.write(f"Runs:                 {report['runs']} (best shown)")
+        self.stdout.write(f"django.setup():       {report['setup_seconds']:.3f}s")
+        self.stdout.write(f"setup + URL loading:  {report['total_seconds']:.3f}s")
+        self.stdout.write(f"Peak RSS:             {report['max_rss_mb']:.1f} MB")
+        self.stdout.write(f"Loaded modules:       {report['modules']}")
+
+        if report['heavy_modules']:
+            self.stdout.write(self.style.WARNING(
+                f"Heavy modules loaded: {', '.join(report['heavy_modules'])}"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS('No heavy OCR/PDF modules loaded'))
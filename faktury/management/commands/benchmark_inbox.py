@@ -0,0 +1,205 @@
+"""
+Management command to benchmark the message inbox and unread counts.
+
+Creates a synthetic fixture of messages for one user, spread over the
+partner, team and system tabs with some replies, and times:
+
+- the previous list view reads: every tab loaded unbounded, and a page
+  with ``replies_count`` called per row;
+- keyset pages of the tab feeds, shallow and deep, with annotated reply
+  counts;
+- the unread count as a COUNT query and from the cached counter, kept in a
+  local-memory cache unless --configured-cache is given.
+
+Reports queries, rows loaded and milliseconds per operation. Everything is
+created inside a transaction that is rolled back at the end.
+"""
+
+import datetime
+import json
+import time
+import uuid
+from contextlib import nullcontext
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from faktury.models import Wiadomosc
+from faktury.services.inbox import encode_cursor, inbox_page
+from faktury.services.unread_counters import MESSAGES, count_unread, get_unread_count
+
+TAB_TYPES = ('partner', 'zespol', 'system')
+
+
+def legacy_unbounded(user):
+    """The previous list view: four unbounded querysets"""
+    querysets = [
+        Wiadomosc.objects.filter(odbiorca_user=user, typ_wiadomosci=typ).select_related('autor').order_by('-data_wyslania')
+        for typ in TAB_TYPES
+    ]
+    querysets.append(Wiadomosc.objects.filter(autor=user).select_related('odbiorca_user').order_by('-data_wyslania'))
+    return sum(len(list(queryset)) for queryset in querysets)
+
+
+def legacy_page(user, offset, page_size):
+    """An OFFSET page of the partner tab with replies_count per row"""
+    rows = Wiadomosc.objects.filter(odbiorca_user=user, typ_wiadomosci='partner').order_by('-data_wyslania', '-id')
+    rows = list(rows[offset:offset + page_size])
+    return [(row.pk, row.replies_count) for row in rows]
+
+
+def keyset_page(user, cursor, page_size):
+    page = inbox_page(user, 'partner', cursor, page_size)
+    return [(row.pk, row.replies_count) for row in page.messages]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark inbox pages and unread counts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--messages',
+            type=int,
+            default=100000,
+            help='Messages received by the user (default: 100000)'
+        )
+
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            default=20,
+            help='Messages per page (default: 20)'
+        )
+
+        parser.add_argument(
+            '--deep-page',
+            type=int,
+            default=1000,
+            help='Page number of the deep page (default: 1000)'
+        )
+
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Runs per measurement (default: 3)'
+        )
+
+        parser.add_argument(
+            '--configured-cache',
+            action='store_true',
+            help='Keep counters in the configured cache (Redis) instead of local memory'
+        )
+
+        parser.add_argument(
+            '--format',
+            choices=['table', 'json'],
+            default='table',
+            help='Output format (default: table)'
+        )
+
+    def handle(self, *args, **options):
+        report = []
+        page_size = options['page_size']
+
+        with transaction.atomic():
+            user = self._create_fixture(options)
+
+            queries, seconds, rows = self._measure(lambda: legacy_unbounded(user), 1)
+            report.append(self._row('list_all_tabs_unbounded', queries, rows, seconds))
+
+            for page in (1, options['deep_page']):
+                offset = (page - 1) * page_size
+                cursor = None
+                if offset:
+                    # Cursor of the last row of the previous page, as a client would hold it
+                    previous = Wiadomosc.objects.filter(odbiorca_user=user, typ_wiadomosci='partner')
+                    cursor = encode_cursor(previous.order_by('-data_wyslania', '-id')[offset - 1])
+
+                results = set()
+                for mode, run in (
+                    (f'page_{page}_offset_replies_count', lambda: legacy_page(user, offset, page_size)),
+                    (f'page_{page}_keyset_annotated', lambda: keyset_page(user, cursor, page_size)),
+                ):
+                    queries, seconds, result = self._measure(run, options['repeat'])
+                    results.add(tuple(result))
+                    report.append(self._row(mode, queries, len(result), seconds))
+                if len(results) != 1:
+                    raise CommandError(f'page {page}: results differ between modes')
+
+            queries, seconds, expected = self._measure(lambda: count_unread(MESSAGES, user.pk), options['repeat'])
+            report.append(self._row('unread_count_query', queries, 1, seconds))
+            counter_cache = nullcontext() if options['configured_cache'] else patch(
+                'faktury.services.unread_counters.cache', LocMemCache(f'benchmark-inbox-{uuid.uuid4().hex}', {})
+            )
+            with counter_cache:
+                get_unread_count(user.pk, MESSAGES)
+                queries, seconds, count = self._measure(lambda: get_unread_count(user.pk, MESSAGES), options['repeat'])
+            if count != expected:
+                raise CommandError(f'cached unread count {count} differs from {expected}')
+            report.append(self._row('unread_count_cached', queries, 1, seconds))
+
+            transaction.set_rollback(True)
+
+        if options['format'] == 'json':
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self._output_table(report)
+
+    @staticmethod
+    def _row(operation, queries, rows, seconds):
+        return {'operation': operation, 'queries': queries, 'rows': rows, 'ms': seconds * 1000}
+
+    @staticmethod
+    def _measure(run, repeat):
+        best = None
+        for _ in range(repeat):
+            reset_queries()  # the fixture fills the bounded query log
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                result = run()
+                elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return len(queries), best, result
+
+    def _create_fixture(self, options):
+        """Messages over three tabs, a tenth of partner messages with two replies"""
+        prefix = uuid.uuid4().hex[:8]
+        user = User.objects.create_user(username=f'benchmark-{prefix}')
+        partner = User.objects.create_user(username=f'benchmark-{prefix}-partner')
+        start = timezone.now().replace(microsecond=0)
+
+        batch_size = 5000
+        for offset in range(0, options['messages'], batch_size):
+            count = min(batch_size, options['messages'] - offset)
+            rows = Wiadomosc.objects.bulk_create([
+                Wiadomosc(
+                    autor=partner, odbiorca_user=user, temat=f'Wiadomość {offset + i}', tresc='Treść ' * 40,
+                    typ_wiadomosci=TAB_TYPES[0 if (offset + i) % 10 < 8 else (offset + i) % 10 - 7],
+                    przeczytana=(offset + i) % 3 == 0,
+                )
+                for i in range(count)
+            ])
+            Wiadomosc.objects.bulk_create([
+                Wiadomosc(autor=user, odbiorca_user=partner, temat='Re', tresc='Odpowiedź', wiadomosc_nadrzedna=row)
+                for row in rows[::10] for _ in range(2)
+            ])
+            # data_wyslania is auto_now_add, so spread the rows over the past afterwards
+            for low in range(0, count, 100):
+                timestamp = start - datetime.timedelta(minutes=(offset + low) // 100)
+                Wiadomosc.objects.filter(
+                    pk__gte=rows[low].pk, pk__lte=rows[min(low + 100, count) - 1].pk
+                ).update(data_wyslania=timestamp)
+        return user
+
+    def _output_table(self, report):
+        """Output report as a table"""
+        self.stdout.write(self.style.SUCCESS('\n=== Inbox Benchmark ===\n'))
+        self.stdout.write(f"{'operation':<34}{'queries':>9}{'rows':>9}{'time':>13}")
+        for row in report:
+            self.stdout.write(f"{row['operation']:<34}{row['queries']:>9}{row['rows']:>9}{row['ms']:>10.2f} ms")
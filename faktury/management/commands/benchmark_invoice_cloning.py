@@ -0,0 +1,193 @@
+"""
+Management command to benchmark bulk invoice corrections.
+
+Creates a temporary user with synthetic invoices (configurable positions
+per invoice) and clones them into corrections twice:
+
+- per row, as the previous admin action did: a number query per invoice,
+  ``Faktura.objects.create`` and one ``create()`` per position;
+- with ``clone_invoices``: batched reads, block numbering and
+  ``bulk_create``.
+
+Reports time, throughput and queries per invoice. Everything is created
+inside a transaction that is rolled back at the end.
+"""
+
+import datetime
+import json
+import time
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from faktury.models import Faktura, Firma, Kontrahent, PozycjaFaktury
+from faktury.services.invoice_cloning import KOREKTA, clone_invoices, number_sequence
+
+
+class QueryCounter:
+    """Execute wrapper counting queries, unlike the query log it is not bounded"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def legacy_corrections(faktury):
+    """The previous admin action, applied to every invoice of the selection"""
+    created = 0
+    for faktura in faktury:
+        today = datetime.date.today()
+        ostatnia_korekta = Faktura.objects.filter(
+            user=faktura.user_id,
+            data_wystawienia__year=today.year,
+            data_wystawienia__month=today.month,
+            typ_dokumentu='KOR',
+        ).order_by('-numer').first()
+        ostatni_numer = number_sequence(ostatnia_korekta.numer) if ostatnia_korekta else 0
+
+        korekta = Faktura.objects.create(
+            user_id=faktura.user_id,
+            typ_dokumentu='KOR',
+            dokument_podstawowy=faktura,
+            numer=f"KOR/{ostatni_numer + 1:02d}/{today.month:02d}/{today.year}",
+            data_wystawienia=today,
+            data_sprzedazy=faktura.data_sprzedazy,
+            miejsce_wystawienia=faktura.miejsce_wystawienia,
+            sprzedawca_id=faktura.sprzedawca_id,
+            nabywca_id=faktura.nabywca_id,
+            typ_faktury=faktura.typ_faktury,
+            sposob_platnosci=faktura.sposob_platnosci,
+            termin_platnosci=faktura.termin_platnosci,
+            waluta=faktura.waluta,
+            uwagi=faktura.uwagi,
+        )
+        for pozycja in faktura.pozycjafaktury_set.all():
+            PozycjaFaktury.objects.create(
+                faktura=korekta,
+                nazwa=pozycja.nazwa,
+                ilosc=pozycja.ilosc,
+                jednostka=pozycja.jednostka,
+                cena_netto=pozycja.cena_netto,
+                vat=pozycja.vat,
+                rabat=pozycja.rabat,
+                rabat_typ=pozycja.rabat_typ,
+            )
+        created += 1
+    return created
+
+
+class Command(BaseCommand):
+    help = 'Benchmark per-row and bulk invoice corrections'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--invoices',
+            type=int,
+            default=1000,
+            help='Number of invoices to correct (default: 1000)'
+        )
+
+        parser.add_argument(
+            '--positions',
+            type=int,
+            default=20,
+            help='Positions per invoice (default: 20)'
+        )
+
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Invoices per clone_invoices batch (default: 500)'
+        )
+
+        parser.add_argument(
+            '--format',
+            choices=['table', 'json'],
+            default='table',
+            help='Output format (default: table)'
+        )
+
+    def handle(self, *args, **options):
+        report = []
+
+        with transaction.atomic():
+            faktury = self._create_fixture(options)
+            ids = [faktura.pk for faktura in faktury]
+
+            for mode in ('per_row', 'clone_invoices'):
+                queries = QueryCounter()
+                with transaction.atomic():
+                    with connection.execute_wrapper(queries):
+                        start = time.perf_counter()
+                        if mode == 'per_row':
+                            created = legacy_corrections(Faktura.objects.filter(pk__in=ids).order_by('pk'))
+                        else:
+                            created = len(clone_invoices(ids, KOREKTA, batch_size=options['batch_size']))
+                        elapsed = time.perf_counter() - start
+
+                    positions = PozycjaFaktury.objects.filter(faktura__dokument_podstawowy__in=ids).count()
+                    if positions != created * options['positions']:
+                        raise CommandError(f'{mode}: {positions} positions copied')
+                    transaction.set_rollback(True)
+
+                report.append({
+                    'mode': mode,
+                    'invoices': created,
+                    'positions_per_invoice': options['positions'],
+                    'seconds': elapsed,
+                    'invoices_per_second': created / elapsed if elapsed else 0.0,
+                    'queries': queries.count,
+                    'queries_per_invoice': queries.count / created if created else 0.0,
+                })
+
+            transaction.set_rollback(True)
+
+        if options['format'] == 'json':
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self._output_table(report)
+
+    @staticmethod
+    def _create_fixture(options):
+        """Invoices of one user with identical position lists"""
+        suffix = uuid.uuid4().hex[:12]
+        user = User.objects.create_user(username=f'benchmark-{suffix}')
+        firma = Firma.objects.create(
+            user=user, nazwa='Benchmark', nip=f'99{suffix[:8]}', ulica='Testowa',
+            numer_domu='1', kod_pocztowy='00-001', miejscowosc='Warszawa'
+        )
+        kontrahent = Kontrahent.objects.create(
+            user=user, nazwa='Nabywca', nip=f'98{suffix[:8]}', ulica='Inna',
+            numer_domu='2', kod_pocztowy='11-111', miejscowosc='Kraków'
+        )
+        today = datetime.date.today()
+        faktury = Faktura.objects.bulk_create([
+            Faktura(
+                user=user, sprzedawca=firma, nabywca=kontrahent, numer=f'FV/{i + 1:02d}/{today.month:02d}/{today.year}',
+                data_sprzedazy=today, termin_platnosci=today, miejsce_wystawienia='Warszawa'
+            )
+            for i in range(options['invoices'])
+        ], batch_size=1000)
+        PozycjaFaktury.objects.bulk_create([
+            PozycjaFaktury(faktura=faktura, nazwa=f'Usługa {line}', ilosc=Decimal('1'), jednostka='szt',
+                           cena_netto=Decimal('100.00'), vat='23')
+            for faktura in faktury for line in range(options['positions'])
+        ], batch_size=5000)
+        return faktury
+
+    def _output_table(self, report):
+        """Output report as a table"""
+        self.stdout.write(self.style.SUCCESS('\n=== Invoice Cloning Benchmark ===\n'))
+        self.stdout.write(f"{'mode':<16}{'invoices':>10}{'positions':>11}{'time':>11}{'invoices/s':>12}{'queries':>9}{'queries/inv':>13}")
+        for row in report:
+            self.stdout.write(
+                f"{row['mode']:<16}{row['invoices']:>10}{row['positions_per_invoice']:>11}{row['seconds']:>9.2f} s"
+                f"{row['invoices_per_second']:>12.1f}{row['queries']:>9}{row['queries_per_invoice']:>13.2f}"
+            )
@@ -0,0 +1,150 @@
+"""
+Management command to benchmark latency quantile sketches.
+
+Generates synthetic log-normal latencies spread over per-minute sketches and
+compares exact percentiles (sorting the full sample list, as the rollout
+monitor did with ``statistics.quantiles``) with percentiles answered by
+merging the per-minute sketches, reporting time, memory and relative error.
+"""
+
+import json
+import math
+import random
+import statistics
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from faktury.services.latency_sketch import DEFAULT_RELATIVE_ACCURACY, LatencySketch
+
+
+QUANTILES = (0.50, 0.95, 0.99)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark mergeable latency sketches against exact quantiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--samples',
+            type=int,
+            default=1_000_000,
+            help='Number of synthetic latency samples (default: 1000000)'
+        )
+
+        parser.add_argument(
+            '--minutes',
+            type=int,
+            default=60,
+            help='Number of per-minute sketches the samples are spread over (default: 60)'
+        )
+
+        parser.add_argument(
+            '--accuracy',
+            type=float,
+            default=DEFAULT_RELATIVE_ACCURACY,
+            help=f'Relative accuracy of the sketches (default: {DEFAULT_RELATIVE_ACCURACY})'
+        )
+
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Random seed (default: 42)'
+        )
+
+        parser.add_argument(
+            '--format',
+            choices=['table', 'json'],
+            default='table',
+            help='Output format (default: table)'
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        samples = [rng.lognormvariate(math.log(120), 0.8) for _ in range(options['samples'])]
+        per_minute = math.ceil(len(samples) / options['minutes'])
+
+        exact, exact_stats = self._measure(lambda: self._exact_quantiles(samples))
+
+        minute_sketches, build_stats = self._measure(lambda: [
+            self._build_sketch(samples[i:i + per_minute], options['accuracy'])
+            for i in range(0, len(samples), per_minute)
+        ])
+        serialized = [sketch.to_dict() for sketch in minute_sketches]
+
+        def merge():
+            merged = LatencySketch(options['accuracy'])
+            for data in serialized:
+                merged.merge(LatencySketch.from_dict(data))
+            return {q: merged.quantile(q) for q in QUANTILES}
+
+        estimated, merge_stats = self._measure(merge)
+
+        report = {
+            'samples': len(samples),
+            'minutes': len(minute_sketches),
+            'relative_accuracy': options['accuracy'],
+            'stored_bytes_per_minute': sum(len(json.dumps(d)) for d in serialized) / len(serialized),
+            'exact': exact_stats,
+            'sketch_build': build_stats,
+            'sketch_merge': merge_stats,
+            'quantiles': {
+                f"p{round(q * 100)}": {
+                    'exact': exact[q],
+                    'estimate': estimated[q],
+                    'relative_error': abs(estimated[q] - exact[q]) / exact[q],
+                }
+                for q in QUANTILES
+            },
+        }
+
+        if options['format'] == 'json':
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self._output_table(report)
+
+    @staticmethod
+    def _exact_quantiles(samples):
+        cut_points = statistics.quantiles(samples, n=100, method='inclusive')
+        return {0.50: statistics.median(samples), 0.95: cut_points[94], 0.99: cut_points[98]}
+
+    @staticmethod
+    def _build_sketch(samples, accuracy):
+        sketch = LatencySketch(accuracy)
+        sketch.add_many(samples)
+        return sketch
+
+    @staticmethod
+    def _measure(func):
+        """Run a function, returning its result with duration and peak traced memory"""
+        tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            result = func()
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return result, {'seconds': elapsed, 'peak_memory_kb': peak / 1024}
+
+    def _output_table(self, report):
+        """Output report as a table"""
+        self.stdout.write(self.style.SUCCESS(
+            f"\n=== Latency Sketch Benchmark ({report['samples']:,} samples, "
+            f"{report['minutes']} minute sketches, accuracy {report['relative_accuracy']:.2%}) ===\n"
+        ))
+        self.stdout.write(f"{'':<28}{'time':>12}{'peak memory':>16}")
+        for label, key in (('exact (sort all samples)', 'exact'),
+                           ('build minute sketches', 'sketch_build'),
+                           ('merge window sketches', 'sketch_merge')):
+            row = report[key]
+            self.stdout.write(f"{label:<28}{row['seconds']:>10.3f} s{row['peak_memory_kb']:>13.0f} KB")
+
+        self.stdout.write(f"\nStored sketch size: {report['stored_bytes_per_minute']:.0f} bytes per minute\n")
+        self.stdout.write(f"{'':<8}{'exact':>12}{'estimate':>12}{'error':>10}")
+        for label, row in report['quantiles'].items():
+            self.stdout.write(
+                f"{label:<8}{row['exact']:>12.2f}{row['estimate']:>12.2f}{row['relative_error']:>10.2%}"
+            )
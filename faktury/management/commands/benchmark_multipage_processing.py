@@ -0,0 +1,159 @@
+"""
+Management command to benchmark multi-page document processing.
+
+Generates synthetic invoices as 1-, 5- and 20-page PDFs (header on the first
+page, line items on the middle pages, totals on the last page) and processes
+them with the installed OCR engines in three modes: first page only (the
+previous behaviour), pages one at a time, and pages fanned out over a bounded
+worker pool. Reports wall-clock time and accuracy against the ground truth:
+invoice number, total amount and the share of line items found in the text.
+"""
+
+import io
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image, ImageDraw, ImageFont
+
+from faktury.services.document_pages import count_pages
+from faktury.services.document_processor import DocumentProcessor
+
+
+ITEMS_PER_PAGE = 12
+
+
+class Command(BaseCommand):
+    help = 'Benchmark page-level fan-out of multi-page document processing'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pages',
+            type=int,
+            nargs='+',
+            default=[1, 5, 20],
+            help='Page counts of the generated PDFs (default: 1 5 20)'
+        )
+
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Page workers for the fan-out mode (default: 4)'
+        )
+
+        parser.add_argument(
+            '--early-stop',
+            action='store_true',
+            help='Also benchmark fan-out with cancellation once required fields are found'
+        )
+
+        parser.add_argument(
+            '--format',
+            choices=['table', 'json'],
+            default='table',
+            help='Output format (default: table)'
+        )
+
+    def handle(self, *args, **options):
+        modes = {
+            'first_page': {'max_pages': 1},
+            'sequential': {'max_page_workers': 1},
+            'fan_out': {'max_page_workers': options['workers']},
+        }
+        if options['early_stop']:
+            modes['fan_out_early_stop'] = {'max_page_workers': options['workers'], 'stop_when_fields_found': True}
+
+        processors = {}
+        for mode, kwargs in modes.items():
+            processor = DocumentProcessor(enable_caching=False, **kwargs)
+            if not processor.initialize():
+                raise CommandError('No OCR engines could be initialized')
+            processors[mode] = processor
+
+        report = []
+        for page_count in options['pages']:
+            pdf, truth = self._generate_invoice(page_count)
+            try:
+                count_pages(pdf, 'application/pdf')
+            except Exception as e:
+                raise CommandError(f'PDF rendering is not available (poppler is required): {e}')
+
+            for mode, processor in processors.items():
+                start = time.perf_counter()
+                result = processor.process_invoice(pdf, 'application/pdf', document_id=f'benchmark-{page_count}')
+                elapsed = time.perf_counter() - start
+
+                report.append({
+                    'pages': page_count,
+                    'mode': mode,
+                    'seconds': elapsed,
+                    'success': result.success,
+                    **self._accuracy(result, truth),
+                })
+
+        if options['format'] == 'json':
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self._output_table(report)
+
+    def _generate_invoice(self, page_count):
+        """Render a synthetic invoice PDF and its ground truth"""
+        font = ImageFont.load_default(size=36)
+        number = f'FV/{page_count}/2025'
+        # Line items go on the middle pages (or the only page of short documents)
+        item_pages = list(range(2, page_count)) or [page_count]
+        items = [f'Pozycja {i:03d}' for i in range(1, ITEMS_PER_PAGE * len(item_pages) + 1)]
+        total = sum(range(1, len(items) + 1)) * 10
+
+        pages = []
+        for page_number in range(1, page_count + 1):
+            lines = []
+            if page_number == 1:
+                lines += [f'Faktura VAT nr {number}', 'Data wystawienia: 15.01.2025',
+                          'Sprzedawca NIP: 123-456-32-18', '']
+            if page_number in item_pages:
+                first = item_pages.index(page_number) * ITEMS_PER_PAGE
+                for i, item in enumerate(items[first:first + ITEMS_PER_PAGE], start=first + 1):
+                    lines.append(f'{item}   1 szt   {i * 10},00 zł')
+            if page_number == page_count:
+                lines += ['', f'Razem do zapłaty: {total},00 zł']
+
+            page = Image.new('RGB', (2480, 3508), 'white')
+            draw = ImageDraw.Draw(page)
+            for row, line in enumerate(lines):
+                draw.text((150, 150 + row * 70), line, fill='black', font=font)
+            pages.append(page)
+
+        output = io.BytesIO()
+        pages[0].save(output, format='PDF', save_all=True, append_images=pages[1:], resolution=300)
+        return output.getvalue(), {'numer_faktury': number, 'total_amount': float(total), 'items': items}
+
+    @staticmethod
+    def _accuracy(result, truth):
+        """Compare extracted fields and OCR text with the ground truth"""
+        fields = result.extracted_data.get('extracted_fields', {})
+        text = result.raw_ocr_results[0]['raw_text'] if result.raw_ocr_results else ''
+
+        def value(name):
+            field = fields.get(name)
+            return getattr(field, 'value', field)
+
+        found_items = sum(1 for item in truth['items'] if item in text)
+        return {
+            'invoice_number_correct': value('numer_faktury') == truth['numer_faktury'],
+            'total_correct': value('total_amount') == truth['total_amount'],
+            'item_recall': found_items / len(truth['items']),
+        }
+
+    def _output_table(self, report):
+        """Output report as a table"""
+        self.stdout.write(self.style.SUCCESS('\n=== Multi-page Document Processing Benchmark ===\n'))
+        self.stdout.write(f"{'pages':>6}  {'mode':<20}{'time':>10}{'number':>9}{'total':>8}{'items':>9}")
+        for row in report:
+            self.stdout.write(
+                f"{row['pages']:>6}  {row['mode']:<20}{row['seconds']:>8.2f} s"
+                f"{'yes' if row['invoice_number_correct'] else 'no':>9}"
+                f"{'yes' if row['total_correct'] else 'no':>8}"
+                f"{row['item_recall']:>9.0%}"
+            )
@@ -0,0 +1,195 @@
+"""
+Management command to benchmark dispatch of pending OCR backlogs.
+
+Creates a skewed synthetic backlog (one user with a large backlog, several
+users with a few pending results each) and drains it through a fake broker
+that records every published message, once with the previous loop calling
+``process_ocr_result_task.delay`` per result and once with
+``OCRBacklogDispatcher``. Reports enqueue time, broker messages, and how
+many results were queued before every light user's last result (fairness).
+Everything is created inside a transaction that is rolled back at the end.
+"""
+
+import json
+import time
+import uuid
+from unittest.mock import patch
+
+from celery import Task, group
+from django.contrib.auth.models import User
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from faktury.models import DocumentUpload, OCRResult
+from faktury.services.ocr_dispatcher import OCRBacklogDispatcher
+from faktury.tasks import process_ocr_result_task
+
+
+class FakeBroker:
+    """Records published messages, optionally sleeping to model publish latency"""
+
+    def __init__(self, publish_seconds):
+        self.publish_seconds = publish_seconds
+        self.messages = 0
+        self.order = []
+
+    def publish(self, ocr_result_ids):
+        if self.publish_seconds:
+            time.sleep(self.publish_seconds)
+        self.messages += 1
+        self.order += ocr_result_ids
+
+    def send_task(self, task, args=None, *rest, **kwargs):
+        self.publish(list(args))
+
+    def send_group(self, signature, *args, **kwargs):
+        for task in signature.tasks:
+            self.publish(list(task.args[0]))
+
+
+class Command(BaseCommand):
+    help = 'Benchmark per-result and chunked, fair dispatch of pending OCR results'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--heavy',
+            type=int,
+            default=5000,
+            help='Pending results of the heavy user (default: 5000)'
+        )
+
+        parser.add_argument(
+            '--light-users',
+            type=int,
+            default=20,
+            help='Number of users with small backlogs (default: 20)'
+        )
+
+        parser.add_argument(
+            '--light',
+            type=int,
+            default=5,
+            help='Pending results per light user (default: 5)'
+        )
+
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=10,
+            help='Results per chunk task (default: 10)'
+        )
+
+        parser.add_argument(
+            '--max-in-flight',
+            type=int,
+            default=200,
+            help='In-flight cap of the dispatcher (default: 200)'
+        )
+
+        parser.add_argument(
+            '--publish-ms',
+            type=float,
+            default=0.2,
+            help='Simulated broker latency per message in ms (default: 0.2)'
+        )
+
+        parser.add_argument(
+            '--format',
+            choices=['table', 'json'],
+            default='table',
+            help='Output format (default: table)'
+        )
+
+    def handle(self, *args, **options):
+        report = []
+
+        with transaction.atomic():
+            light_users = self._create_backlog(options)
+            light_ids = set(
+                OCRResult.objects.filter(document__user__in=light_users).values_list('pk', flat=True)
+            )
+
+            for mode in ('per_result', 'dispatcher'):
+                OCRResult.objects.filter(pk__in=self._backlog_ids).update(processing_status='pending')
+                broker = FakeBroker(options['publish_ms'] / 1000)
+                start = time.perf_counter()
+                runs = self._per_result(broker) if mode == 'per_result' else self._dispatcher(broker, options)
+                elapsed = time.perf_counter() - start
+
+                last_light = max(i for i, pk in enumerate(broker.order) if pk in light_ids) + 1
+                report.append({
+                    'mode': mode,
+                    'results': len(broker.order),
+                    'runs': runs,
+                    'messages': broker.messages,
+                    'enqueue_seconds': elapsed,
+                    'queued_before_light_users_done': last_light,
+                })
+
+            transaction.set_rollback(True)
+
+        if options['format'] == 'json':
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self._output_table(report)
+
+    def _create_backlog(self, options):
+        """Light users upload while the heavy user's import is half done"""
+        suffix = uuid.uuid4().hex[:8]
+        heavy = User.objects.create_user(username=f'benchmark-heavy-{suffix}')
+        light_users = [
+            User.objects.create_user(username=f'benchmark-light-{suffix}-{i}')
+            for i in range(options['light_users'])
+        ]
+        half = options['heavy'] // 2
+        owners = (
+            [heavy] * half
+            + [user for user in light_users for _ in range(options['light'])]
+            + [heavy] * (options['heavy'] - half)
+        )
+
+        # bulk_create skips the upload and OCR result signals that would start processing
+        documents = DocumentUpload.objects.bulk_create([
+            DocumentUpload(user=user, original_filename=f'{i}.pdf', file_path=f'/tmp/{i}.pdf', file_size=1,
+                           content_type='application/pdf', processing_status='processing')
+            for i, user in enumerate(owners)
+        ], batch_size=500)
+        OCRResult.objects.bulk_create([
+            OCRResult(document=document, raw_text='', extracted_data={}, confidence_score=95.0,
+                      processing_time=1.0, processing_status='pending')
+            for document in documents
+        ], batch_size=500)
+        self._backlog_ids = list(OCRResult.objects.filter(document__in=documents).values_list('pk', flat=True))
+        return light_users
+
+    @staticmethod
+    def _per_result(broker):
+        """The previous batch task: one delay() per pending result"""
+        with patch.object(Task, 'apply_async', autospec=True, side_effect=broker.send_task):
+            for ocr_result in OCRResult.objects.filter(processing_status='pending').select_related('document', 'document__user'):
+                process_ocr_result_task.delay(ocr_result.id)
+        return 1
+
+    def _dispatcher(self, broker, options):
+        """Dispatcher runs until the backlog is drained, finishing every queued result between runs"""
+        cache_backend = LocMemCache(f'benchmark-ocr-dispatch-{uuid.uuid4().hex}', {})
+        dispatcher = OCRBacklogDispatcher(
+            chunk_size=options['chunk_size'], max_in_flight=options['max_in_flight'], cache_backend=cache_backend
+        )
+        runs = 0
+        with patch.object(group, 'apply_async', autospec=True, side_effect=broker.send_group):
+            while dispatcher.dispatch().queued:
+                runs += 1
+                OCRResult.objects.filter(processing_status='processing').update(processing_status='completed')
+        return runs
+
+    def _output_table(self, report):
+        """Output report as a table"""
+        self.stdout.write(self.style.SUCCESS('\n=== OCR Backlog Dispatch Benchmark ===\n'))
+        self.stdout.write(f"{'mode':<12}{'results':>9}{'runs':>6}{'messages':>10}{'enqueue':>12}{'light done after':>18}")
+        for row in report:
+            self.stdout.write(
+                f"{row['mode']:<12}{row['results']:>9}{row['runs']:>6}{row['messages']:>10}"
+                f"{row['enqueue_seconds']:>10.2f} s{row['queued_before_light_users_done']:>18}"
+            )
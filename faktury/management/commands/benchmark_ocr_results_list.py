@@ -0,0 +1,194 @@
+"""
+Management command to benchmark pages of the OCR results list.
+
+Creates a synthetic fixture of OCR results for one user, with realistic
+extracted_data and raw_text payloads, and times a shallow and a deep page:
+
+- with the previous queryset (full rows, seller and buyer joins, validation
+  prefetch) and OFFSET pagination;
+- with the slim list projection and OFFSET pagination;
+- with the slim list projection and keyset pagination on (created_at, id).
+
+Reports queries and milliseconds per page and checks that all modes return
+the same results. Everything is created inside a transaction that is rolled
+back at the end.
+"""
+
+import datetime
+import json
+import random
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries, transaction
+from django.db.models import Q
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from faktury.api.serializers import OCRResultListSerializer
+from faktury.models import DocumentUpload, OCRResult
+
+
+def legacy_page(user, offset, page_size):
+    """The previous list queryset, paged with OFFSET"""
+    queryset = OCRResult.objects.select_related(
+        'document', 'document__user', 'faktura', 'faktura__sprzedawca', 'faktura__nabywca'
+    ).prefetch_related(
+        'ocrvalidation', 'ocrvalidation__validated_by'
+    ).filter(document__user=user).order_by('-created_at', '-id')
+    return [row['id'] for row in OCRResultListSerializer(queryset[offset:offset + page_size], many=True).data]
+
+
+def slim_page(user, offset, page_size):
+    queryset = OCRResultListSerializer.setup_queryset(OCRResult.objects.filter(document__user=user))
+    queryset = queryset.order_by('-created_at', '-id')
+    return [row['id'] for row in OCRResultListSerializer(queryset[offset:offset + page_size], many=True).data]
+
+
+def keyset_page(user, position, page_size):
+    queryset = OCRResultListSerializer.setup_queryset(OCRResult.objects.filter(document__user=user))
+    queryset = queryset.order_by('-created_at', '-id')
+    if position is not None:
+        created_at, pk = position
+        queryset = queryset.filter(created_at__lte=created_at).filter(Q(created_at__lt=created_at) | Q(id__lt=pk))
+    rows = list(queryset[:page_size + 1])
+    return [row['id'] for row in OCRResultListSerializer(rows[:page_size], many=True).data]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark OFFSET and keyset pages of the OCR results list'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=1000000,
+            help='OCR results in the fixture (default: 1000000)'
+        )
+
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            default=20,
+            help='Results per page (default: 20)'
+        )
+
+        parser.add_argument(
+            '--deep-page',
+            type=int,
+            default=1000,
+            help='Page number of the deep page (default: 1000)'
+        )
+
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Runs per measurement (default: 3)'
+        )
+
+        parser.add_argument(
+            '--format',
+            choices=['table', 'json'],
+            default='table',
+            help='Output format (default: table)'
+        )
+
+    def handle(self, *args, **options):
+        report = []
+        page_size = options['page_size']
+
+        with transaction.atomic():
+            user = self._create_fixture(options)
+
+            for page in (1, options['deep_page']):
+                offset = (page - 1) * page_size
+                position = None
+                if offset:
+                    # Cursor of the last row of the previous page, as a client would hold it
+                    previous = OCRResult.objects.filter(document__user=user).order_by('-created_at', '-id')
+                    previous = previous.values_list('created_at', 'id')[offset - 1]
+                    position = tuple(previous)
+
+                results = set()
+                for mode, run in (
+                    ('full_rows_offset', lambda: legacy_page(user, offset, page_size)),
+                    ('slim_offset', lambda: slim_page(user, offset, page_size)),
+                    ('slim_keyset', lambda: keyset_page(user, position, page_size)),
+                ):
+                    queries, seconds, result = self._measure(run, options['repeat'])
+                    results.add(tuple(result))
+                    report.append({
+                        'page': page,
+                        'mode': mode,
+                        'rows': options['rows'],
+                        'queries': queries,
+                        'ms_per_page': seconds * 1000,
+                    })
+                if len(results) != 1:
+                    raise CommandError(f'page {page}: results differ between modes')
+
+            transaction.set_rollback(True)
+
+        if options['format'] == 'json':
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self._output_table(report)
+
+    @staticmethod
+    def _measure(run, repeat):
+        best = None
+        for _ in range(repeat):
+            reset_queries()  # the fixture fills the bounded query log
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                result = run()
+                elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return len(queries), best, result
+
+    def _create_fixture(self, options):
+        """Results with extracted data and text, a hundred sharing each timestamp"""
+        rng = random.Random(42)
+        user = User.objects.create_user(username=f'benchmark-{uuid.uuid4().hex[:8]}')
+        raw_text = 'Faktura VAT ' * 150
+        positions = [{'nazwa': f'Pozycja {i}', 'ilosc': 1, 'cena_netto': '100.00', 'vat': '23'} for i in range(10)]
+        start = timezone.now().replace(microsecond=0)
+
+        batch_size = 5000
+        for offset in range(0, options['rows'], batch_size):
+            count = min(batch_size, options['rows'] - offset)
+            # bulk_create skips the upload and OCR result signals that would start processing
+            documents = DocumentUpload.objects.bulk_create([
+                DocumentUpload(user=user, original_filename=f'{offset + i}.pdf', file_path=f'/tmp/{offset + i}.pdf',
+                               file_size=1, content_type='application/pdf', processing_status='completed')
+                for i in range(count)
+            ])
+            results = []
+            for i, document in enumerate(documents):
+                result = OCRResult(
+                    document=document, raw_text=raw_text, confidence_score=rng.uniform(40, 100),
+                    processing_time=rng.uniform(0.5, 10), processing_status='completed',
+                    extracted_data={'numer_faktury': f'FV/{offset + i}', 'sprzedawca': {'nazwa': 'ACME Sp. z o.o.'},
+                                    'suma_brutto': '1230.00', 'pozycje': positions},
+                )
+                result.refresh_summary()
+                results.append(result)
+            ids = [result.pk for result in OCRResult.objects.bulk_create(results)]
+
+            # created_at is auto_now_add, so spread the rows over the past afterwards
+            for low in range(0, count, 100):
+                timestamp = start - datetime.timedelta(minutes=(offset + low) // 100)
+                OCRResult.objects.filter(pk__gte=ids[low], pk__lte=ids[min(low + 100, count) - 1]).update(created_at=timestamp)
+        return user
+
+    def _output_table(self, report):
+        """Output report as a table"""
+        self.stdout.write(self.style.SUCCESS('\n=== OCR Results List Benchmark ===\n'))
+        self.stdout.write(f"{'page':>6}  {'mode':<18}{'rows':>9}{'queries':>9}{'time':>13}")
+        for row in report:
+            self.stdout.write(
+                f"{row['page']:>6}  {row['mode']:<18}{row['rows']:>9}{row['queries']:>9}{row['ms_per_page']:>10.1f} ms"
+            )
@@ -0,0 +1,231 @@
+"""
+Management command to benchmark the shared OCR statistics queries.
+
+Creates a synthetic fixture of uploaded documents with OCR results spread
+over the last days for several users, and times:
+
+- the dashboard statistics of the busiest user, with the previous
+  per-status ``count()`` queries and with ``OCRStatistics``;
+- the all-users ocr_stats report, from raw rows and from daily rollups.
+
+Reports queries and milliseconds per run and checks that all paths agree.
+Everything is created inside a transaction that is rolled back at the end.
+"""
+
+import datetime
+import json
+import random
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries, transaction
+from django.db.models import Avg, Count, Q
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from faktury.models import DocumentUpload, OCRResult
+from faktury.services.ocr_statistics import OCRStatistics, rollup_ocr_statistics
+from faktury.views_modules.dashboard_views import get_ocr_chart_data, get_ocr_statistics
+
+
+STATUSES = ('completed',) * 7 + ('failed', 'processing', 'uploaded')
+
+
+def legacy_dashboard(user, start_date):
+    """The previous dashboard queries: one count() per status and per confidence band"""
+    documents = DocumentUpload.objects.filter(user=user, upload_timestamp__gte=start_date)
+    ocr_results = OCRResult.objects.filter(document__user=user, created_at__gte=start_date)
+
+    stats = {
+        'total_documents': documents.count(),
+        'completed_documents': documents.filter(processing_status='completed').count(),
+        'failed_documents': documents.filter(processing_status='failed').count(),
+        'processing_documents': documents.filter(processing_status='processing').count(),
+    }
+    if ocr_results.exists():
+        stats.update(ocr_results.aggregate(
+            avg_confidence=Avg('confidence_score'),
+            high_confidence=Count('id', filter=Q(confidence_score__gte=95)),
+            auto_created=Count('id', filter=Q(faktura__isnull=False)),
+        ))
+        stats.update(ocr_results.aggregate(avg_processing_time=Avg('processing_time')))
+    stats['total_ocr_results'] = ocr_results.count()
+
+    daily = list(documents.extra(select={'day': 'date(upload_timestamp)'}).values('day').annotate(
+        uploads=Count('id'),
+        completed=Count('id', filter=Q(processing_status='completed')),
+        failed=Count('id', filter=Q(processing_status='failed')),
+    ).order_by('day'))
+    bands = [
+        ocr_results.filter(confidence_score__gte=95).count(),
+        ocr_results.filter(confidence_score__gte=80, confidence_score__lt=95).count(),
+        ocr_results.filter(confidence_score__gte=60, confidence_score__lt=80).count(),
+        ocr_results.filter(confidence_score__lt=60).count(),
+    ]
+    return stats['total_documents'], stats['completed_documents'], sum(row['uploads'] for row in daily), bands
+
+
+def layer_dashboard(user, start_date, use_rollup):
+    statistics = OCRStatistics(start_date, user=user, use_rollup=use_rollup)
+    stats = get_ocr_statistics(user, statistics=statistics)
+    charts = get_ocr_chart_data(user, statistics=statistics)
+    return (
+        stats['total_documents'], stats['completed_documents'],
+        sum(row['uploads'] for row in charts['daily_uploads']),
+        [count for _, count in charts['confidence_distribution']],
+    )
+
+
+def layer_report(start_date, use_rollup):
+    statistics = OCRStatistics(start_date, use_rollup=use_rollup)
+    documents, results = statistics.documents, statistics.results
+    statistics.validations
+    statistics.errors()
+    return (
+        documents['total'], documents['completed'], len(documents['daily']), results['total'],
+        sorted(results['confidence_bands'].items()), statistics.top_users(),
+    )
+
+
+class Command(BaseCommand):
+    help = 'Benchmark OCR statistics queries on a synthetic fixture'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=500000,
+            help='Uploaded documents in the fixture, each with an OCR result (default: 500000)'
+        )
+
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=50,
+            help='Number of users (default: 50)'
+        )
+
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=90,
+            help='Days the fixture and the report cover (default: 90)'
+        )
+
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Runs per measurement (default: 3)'
+        )
+
+        parser.add_argument(
+            '--format',
+            choices=['table', 'json'],
+            default='table',
+            help='Output format (default: table)'
+        )
+
+    def handle(self, *args, **options):
+        report = []
+        now = timezone.now()
+        report_start = now - datetime.timedelta(days=options['days'])
+        dashboard_start = now - datetime.timedelta(days=30)
+
+        with transaction.atomic():
+            heavy_user = self._create_fixture(options)
+
+            start = time.perf_counter()
+            today = timezone.localdate()
+            for days_ago in range(1, options['days'] + 1):
+                rollup_ocr_statistics(today - datetime.timedelta(days=days_ago))
+            rollup_seconds = time.perf_counter() - start
+
+            for section, runs in (
+                ('dashboard', (
+                    ('per_status_counts', lambda: legacy_dashboard(heavy_user, dashboard_start)),
+                    ('statistics_layer', lambda: layer_dashboard(heavy_user, dashboard_start, False)),
+                    ('with_rollups', lambda: layer_dashboard(heavy_user, dashboard_start, True)),
+                )),
+                ('report', (
+                    ('statistics_layer', lambda: layer_report(report_start, False)),
+                    ('with_rollups', lambda: layer_report(report_start, True)),
+                )),
+            ):
+                results = set()
+                for mode, run in runs:
+                    queries, seconds, result = self._measure(run, options['repeat'])
+                    results.add(json.dumps(result, default=str))
+                    report.append({
+                        'section': section,
+                        'mode': mode,
+                        'rows': options['rows'],
+                        'queries': queries,
+                        'ms_per_run': seconds * 1000,
+                    })
+                if len(results) != 1:
+                    raise CommandError(f'{section}: statistics differ between modes')
+
+            transaction.set_rollback(True)
+
+        if options['format'] == 'json':
+            self.stdout.write(json.dumps({'rollup_seconds': rollup_seconds, 'runs': report}, indent=2))
+        else:
+            self._output_table(report, rollup_seconds)
+
+    @staticmethod
+    def _measure(run, repeat):
+        best = None
+        for _ in range(repeat):
+            reset_queries()  # the fixture fills the bounded query log
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                result = run()
+                elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return len(queries), best, result
+
+    def _create_fixture(self, options):
+        """Documents with OCR results, a fifth of them from the first user"""
+        rng = random.Random(42)
+        suffix = uuid.uuid4().hex[:8]
+        users = [User.objects.create_user(username=f'benchmark-{suffix}-{i}') for i in range(options['users'])]
+        today_start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+        batch_size = 5000
+        for offset in range(0, options['rows'], batch_size):
+            count = min(batch_size, options['rows'] - offset)
+            owners = [users[0] if rng.random() < 0.2 else rng.choice(users) for _ in range(count)]
+            # bulk_create skips the upload and OCR result signals that would start processing
+            documents = DocumentUpload.objects.bulk_create([
+                DocumentUpload(user=user, original_filename=f'{offset + i}.pdf', file_path=f'/tmp/{offset + i}.pdf',
+                               file_size=1, content_type='application/pdf', processing_status=rng.choice(STATUSES))
+                for i, user in enumerate(owners)
+            ])
+            OCRResult.objects.bulk_create([
+                OCRResult(document=document, raw_text='', extracted_data={}, confidence_score=rng.uniform(40, 100),
+                          processing_time=rng.uniform(0.5, 10), processing_status='completed')
+                for document in documents
+            ])
+
+        # Spread the rows over the last days, the newest ones on today
+        first_pk = DocumentUpload.objects.filter(user__in=users).order_by('pk').values_list('pk', flat=True).first()
+        per_day = options['rows'] // options['days'] + 1
+        for days_ago in range(options['days']):
+            low = first_pk + days_ago * per_day
+            timestamp = today_start - datetime.timedelta(days=days_ago) + datetime.timedelta(minutes=rng.randint(0, 60))
+            DocumentUpload.objects.filter(pk__gte=low, pk__lt=low + per_day).update(upload_timestamp=timestamp)
+            OCRResult.objects.filter(document_id__gte=low, document_id__lt=low + per_day).update(created_at=timestamp)
+        return users[0]
+
+    def _output_table(self, report, rollup_seconds):
+        """Output report as a table"""
+        self.stdout.write(self.style.SUCCESS('\n=== OCR Statistics Benchmark ===\n'))
+        self.stdout.write(f'Rolling up all closed days: {rollup_seconds:.2f} s\n')
+        self.stdout.write(f"{'section':<11}{'mode':<19}{'rows':>9}{'queries':>9}{'time':>13}")
+        for row in report:
+            self.stdout.write(
+                f"{row['section']:<11}{row['mode']:<19}{row['rows']:>9}{row['queries']:>9}{row['ms_per_run']:>10.1f} ms"
+            )
@@ -0,0 +1,199 @@
+"""
+Management command to benchmark partnership analytics.
+
+Creates two partner companies with invoices in both directions spread over
+the last year and computes their partnership details and transaction
+tracking:
+
+- legacy: ``suma_brutto`` of every invoice, one items query each, summed in
+  Python and grouped by month in a second loop, as the previous
+  PartnershipManager did;
+- cold: PartnershipManager with the grouped per-direction queries and an
+  empty rollup cache;
+- warm: the same with the partnership rollup cached.
+
+Rollups are cached in a local memory cache unless ``--configured-cache``
+is given. Reports time and queries per mode. Everything the benchmark
+created is deleted at the end.
+"""
+
+import datetime
+import json
+import random
+import time
+import uuid
+from contextlib import nullcontext
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+from django.db import connection, models
+
+from faktury.models import Faktura, Firma, Kontrahent, Partnerstwo, PozycjaFaktury
+from faktury.services.partnership_manager import PartnershipManager
+
+USERNAME = 'benchmark-partner-{index}'
+
+
+class Command(BaseCommand):
+    help = 'Benchmark per-invoice and grouped partnership analytics'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--invoices',
+            type=int,
+            default=100_000,
+            help='Invoices between the partners, both directions (default: 100000)'
+        )
+
+        parser.add_argument(
+            '--items',
+            type=int,
+            default=3,
+            help='Items per invoice (default: 3)'
+        )
+
+        parser.add_argument(
+            '--configured-cache',
+            action='store_true',
+            help='Cache rollups in the configured default cache instead of a local memory cache'
+        )
+
+        parser.add_argument(
+            '--format',
+            choices=['table', 'json'],
+            default='table',
+            help='Output format (default: table)'
+        )
+
+    def handle(self, *args, **options):
+        self._cleanup()
+        partnership = self._create_fixture(options['invoices'], options['items'])
+        manager = PartnershipManager()
+        rollup_cache = nullcontext() if options['configured_cache'] else patch(
+            'faktury.services.partnership_analytics.cache', LocMemCache(f'benchmark-partnership-{uuid.uuid4().hex}', {})
+        )
+        report = []
+        try:
+            with rollup_cache:
+                report = [self._run(mode, manager, partnership, options) for mode in ('legacy', 'cold', 'warm')]
+        finally:
+            self._cleanup()
+
+        if options['format'] == 'json':
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self._output_table(report)
+
+    def _run(self, mode, manager, partnership, options):
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            # CaptureQueriesContext keeps only the last 9000 queries
+            queries.append(None)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count):
+            start = time.perf_counter()
+            if mode == 'legacy':
+                details, tracking = self._legacy(partnership)
+            else:
+                details = manager.get_partnership_details(partnership)
+                tracking = manager.track_partner_transactions(partnership)
+            elapsed = time.perf_counter() - start
+        return {
+            'mode': mode,
+            'invoices': options['invoices'],
+            'queries': len(queries),
+            'seconds': elapsed,
+            'total_value': str(details['total_value']),
+            'net_balance': str(tracking['balance']['net_balance']),
+            'months': len(tracking['monthly_breakdown']),
+        }
+
+    @staticmethod
+    def _create_fixture(invoices, items):
+        firmy = []
+        for index in range(2):
+            user = User.objects.create_user(username=USERNAME.format(index=index))
+            firmy.append(Firma.objects.create(
+                user=user, nazwa=f'Benchmark partner {index}', nip=f'52602502{index}4', ulica='Główna',
+                numer_domu='1', kod_pocztowy='00-001', miejscowosc='Warszawa'
+            ))
+        nabywcy = [
+            Kontrahent.objects.create(
+                user=firmy[index].user, nazwa=firmy[1 - index].nazwa, nip=firmy[1 - index].nip, ulica='Główna',
+                numer_domu='1', kod_pocztowy='00-001', miejscowosc='Warszawa', firma=firmy[1 - index]
+            )
+            for index in range(2)
+        ]
+
+        rng = random.Random(0)
+        today = datetime.date.today()
+        batch = 5000
+        for start in range(0, invoices, batch):
+            faktury = []
+            for i in range(start, min(start + batch, invoices)):
+                seller = i % 2
+                issued = today - datetime.timedelta(days=rng.randrange(365))
+                faktury.append(Faktura(
+                    user=firmy[seller].user, numer=f'BENCH/{i}', data_wystawienia=issued, data_sprzedazy=issued,
+                    termin_platnosci=issued, miejsce_wystawienia='Warszawa', sprzedawca=firmy[seller],
+                    nabywca=nabywcy[seller], typ_faktury='koszt' if i % 10 == 9 else 'sprzedaz',
+                    status=rng.choice(['wystawiona', 'oplacona']),
+                ))
+            Faktura.objects.bulk_create(faktury, batch_size=batch)
+            PozycjaFaktury.objects.bulk_create([
+                PozycjaFaktury(faktura=faktura, nazwa='Usługa', jednostka='szt',
+                               cena_netto=Decimal(rng.randrange(100, 100000)) / 100, ilosc=Decimal(rng.randrange(1, 5)),
+                               vat=rng.choice(['23', '8', 'zw']))
+                for faktura in faktury
+                for _ in range(items)
+            ], batch_size=batch)
+        return Partnerstwo.objects.create(firma1=firmy[0], firma2=firmy[1])
+
+    @staticmethod
+    def _legacy(partnership):
+        """The previous get_partnership_details and track_partner_transactions sums"""
+        firma1, firma2 = partnership.firma1, partnership.firma2
+        company1_sales = Faktura.objects.filter(sprzedawca=firma1, nabywca__firma=firma2, typ_faktury='sprzedaz')
+        company2_sales = Faktura.objects.filter(sprzedawca=firma2, nabywca__firma=firma1, typ_faktury='sprzedaz')
+        company1_total = sum(invoice.suma_brutto for invoice in company1_sales)
+        company2_total = sum(invoice.suma_brutto for invoice in company2_sales)
+        all_transactions = Faktura.objects.filter(
+            models.Q(sprzedawca=firma1, nabywca__firma=firma2) | models.Q(sprzedawca=firma2, nabywca__firma=firma1)
+        )
+        sum(invoice.suma_brutto for invoice in all_transactions)
+        details = {'total_value': company1_total + company2_total}
+
+        date_from, date_to = datetime.date.today() - datetime.timedelta(days=365), datetime.date.today()
+        totals, months = [], {}
+        for direction, (seller, buyer) in enumerate(((firma1, firma2), (firma2, firma1))):
+            faktury = Faktura.objects.filter(
+                sprzedawca=seller, nabywca__firma=buyer, data_wystawienia__range=[date_from, date_to]
+            ).order_by('-data_wystawienia')
+            totals.append(sum(invoice.suma_brutto for invoice in faktury))
+            for invoice in faktury:
+                month = months.setdefault(invoice.data_wystawienia.strftime('%Y-%m'), [Decimal('0.00')] * 2)
+                month[direction] += invoice.suma_brutto
+        tracking = {'balance': {'net_balance': totals[0] - totals[1]}, 'monthly_breakdown': sorted(months)}
+        return details, tracking
+
+    @staticmethod
+    def _cleanup():
+        faktury = list(Faktura.objects.filter(user__username__startswith='benchmark-partner-').values_list('pk', flat=True))
+        for start in range(0, len(faktury), 5000):
+            Faktura.objects.filter(pk__in=faktury[start:start + 5000]).delete()
+        User.objects.filter(username__in=[USERNAME.format(index=index) for index in range(2)]).delete()
+
+    def _output_table(self, report):
+        """Output report as a table"""
+        self.stdout.write(self.style.SUCCESS('\n=== Partnership Analytics Benchmark ===\n'))
+        self.stdout.write(f"{'mode':<8}{'invoices':>10}{'queries':>9}{'time':>11}{'total value':>18}{'net balance':>18}")
+        for row in report:
+            self.stdout.write(
+                f"{row['mode']:<8}{row['invoices']:>10}{row['queries']:>9}{row['seconds']:>9.2f} s"
+                f"{row['total_value']:>18}{row['net_balance']:>18}"
+            )
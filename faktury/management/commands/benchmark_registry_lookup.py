@@ -0,0 +1,144 @@
+"""
+Management command to benchmark company registry lookups.
+
+Loads a local SQLite stub registry that answers every lookup after a fixed
+latency, like GUS, and looks up a list of NIPs in which a share of the
+entries repeats earlier ones, as in a contractor import:
+
+- legacy: one backend lookup per NIP, one after another, as the previous
+  per-contractor GUSService calls;
+- cold: ``lookup_many`` on an empty lookup table, deduplicated and fetched
+  with bounded concurrency;
+- warm: ``lookup_many`` again, answered from the lookup table.
+
+Half of the unique NIPs are known to the stub registry, the rest are cached
+as unknown. Reports time and registry requests per mode. Lookup table rows
+of the benchmark NIPs are deleted at the end.
+"""
+
+import json
+import random
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from faktury.models import RegistryLookup
+from faktury.services.registry_lookup import NIP, SQLiteRegistryBackend, get_config, lookup_many
+
+
+class CountingBackend(SQLiteRegistryBackend):
+    """Stub registry counting the requests it answers"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    def lookup(self, kind, number):
+        with self.lock:
+            self.requests += 1
+        return super().lookup(kind, number)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark sequential and cached, batched registry lookups'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--nips',
+            type=int,
+            default=10_000,
+            help='NIPs looked up (default: 10000)'
+        )
+
+        parser.add_argument(
+            '--repeat-percent',
+            type=float,
+            default=30.0,
+            help='Share of NIPs repeating earlier ones (default: 30.0)'
+        )
+
+        parser.add_argument(
+            '--latency-ms',
+            type=float,
+            default=5.0,
+            help='Latency of every registry request in milliseconds (default: 5.0)'
+        )
+
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Concurrent registry requests of a batch (default: REGISTRY_LOOKUP_CONFIG)'
+        )
+
+        parser.add_argument(
+            '--format',
+            choices=['table', 'json'],
+            default='table',
+            help='Output format (default: table)'
+        )
+
+    def handle(self, *args, **options):
+        unique = max(1, round(options['nips'] * (1 - options['repeat_percent'] / 100)))
+        numbers = [f'99{i:08d}' for i in range(unique)]
+        rng = random.Random(0)
+        nips = numbers + [rng.choice(numbers) for _ in range(options['nips'] - unique)]
+        rng.shuffle(nips)
+
+        backend = CountingBackend(delay=options['latency_ms'] / 1000)
+        backend.load([
+            {'nip': number, 'nazwa': f'Firma {number}', 'ulica': 'Testowa', 'numer_domu': '1',
+             'kod_pocztowy': '00-001', 'miejscowosc': 'Warszawa', 'kraj': 'Polska'}
+            for number in numbers[::2]
+        ])
+        config = get_config()
+        if options['workers'] is not None:
+            config['workers'] = options['workers']
+
+        self._delete_entries(numbers)
+        report = []
+        try:
+            with override_settings(REGISTRY_LOOKUP_CONFIG=config):
+                for mode in ('legacy', 'cold', 'warm'):
+                    backend.requests = 0
+                    start = time.perf_counter()
+                    if mode == 'legacy':
+                        found = sum(1 for nip in nips if backend.lookup(NIP, nip) is not None)
+                    else:
+                        results = lookup_many(NIP, nips, backend)
+                        found = sum(1 for nip in nips if results.get(nip) is not None)
+                    elapsed = time.perf_counter() - start
+                    report.append({
+                        'mode': mode,
+                        'nips': len(nips),
+                        'unique': unique,
+                        'found': found,
+                        'requests': backend.requests,
+                        'seconds': elapsed,
+                        'nips_per_second': len(nips) / elapsed if elapsed else 0.0,
+                    })
+        finally:
+            self._delete_entries(numbers)
+
+        if options['format'] == 'json':
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self._output_table(report)
+
+    @staticmethod
+    def _delete_entries(numbers):
+        for start in range(0, len(numbers), 500):
+            RegistryLookup.objects.filter(kind=NIP, number__in=numbers[start:start + 500]).delete()
+
+    def _output_table(self, report):
+        """Output report as a table"""
+        self.stdout.write(self.style.SUCCESS('\n=== Registry Lookup Benchmark ===\n'))
+        self.stdout.write(f"{'mode':<8}{'nips':>8}{'unique':>8}{'found':>8}{'requests':>10}{'time':>11}{'nips/s':>10}")
+        for row in report:
+            self.stdout.write(
+                f"{row['mode']:<8}{row['nips']:>8}{row['unique']:>8}{row['found']:>8}{row['requests']:>10}"
+                f"{row['seconds']:>9.2f} s{row['nips_per_second']:>10.0f}"
+            )
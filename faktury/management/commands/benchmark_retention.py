@@ -0,0 +1,195 @@
+"""
+Management command to benchmark retention cleanup.
+
+Fills SystemHealthMetric with expired rows and deletes them twice:
+
+- legacy: ``count()`` and ``delete()`` in one transaction, as the previous
+  ``cleanup_old_data`` did;
+- batched: ``run_policy`` with primary key batches, a short transaction
+  per batch and a pause between batches.
+
+While each cleanup runs, a writer thread inserts a row every few
+milliseconds through its own connection and records how long inserts
+wait and how many fail. Reports deletion time and writer latency; on
+SQLite the single long transaction may itself fail against the writer,
+which is reported as well.
+
+Batches must commit, so the rows are really written; everything the
+benchmark created is deleted at the end.
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, transaction
+from django.utils import timezone
+
+from faktury.models import RetentionCheckpoint, SystemHealthMetric
+from faktury.services.retention import RetentionPolicy, get_config, run_policy
+
+COMPONENT = 'benchmark-retention'
+WRITER_COMPONENT = 'benchmark-retention-writer'
+POLICY = 'benchmark_retention'
+
+
+class Writer(threading.Thread):
+    """Inserts rows until stopped, recording the latency of every insert"""
+
+    def __init__(self, interval):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.latencies = []
+        self.failures = 0
+
+    def run(self):
+        try:
+            while not self.stopped.is_set():
+                start = time.perf_counter()
+                try:
+                    SystemHealthMetric.objects.create(component=WRITER_COMPONENT, status='healthy', response_time=0)
+                    self.latencies.append(time.perf_counter() - start)
+                except Exception:
+                    self.failures += 1
+                self.stopped.wait(self.interval)
+        finally:
+            connection.close()
+
+    def report(self):
+        latencies = sorted(self.latencies)
+        return {
+            'writer_inserts': len(latencies),
+            'writer_failures': self.failures,
+            'writer_p99_ms': latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0.0,
+            'writer_max_ms': latencies[-1] * 1000 if latencies else 0.0,
+        }
+
+
+class Command(BaseCommand):
+    help = 'Benchmark single-transaction and batched retention cleanup'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=5_000_000,
+            help='Expired rows to delete (default: 5000000)'
+        )
+
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Rows per batch (default: RETENTION_CONFIG)'
+        )
+
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=None,
+            help='Seconds between batches (default: RETENTION_CONFIG)'
+        )
+
+        parser.add_argument(
+            '--writer-interval',
+            type=float,
+            default=0.005,
+            help='Seconds between inserts of the writer thread, 0 without writer (default: 0.005)'
+        )
+
+        parser.add_argument(
+            '--format',
+            choices=['table', 'json'],
+            default='table',
+            help='Output format (default: table)'
+        )
+
+    def handle(self, *args, **options):
+        config = get_config()
+        for name in ('batch_size', 'sleep'):
+            if options[name] is not None:
+                config[name] = options[name]
+        policy = RetentionPolicy(POLICY, SystemHealthMetric, 'timestamp', days=30, filters={'component': COMPONENT})
+
+        report = []
+        try:
+            for mode in ('legacy', 'batched'):
+                self._create_fixture(options['rows'])
+                writer = Writer(options['writer_interval'])
+                if options['writer_interval'] > 0:
+                    writer.start()
+                start = time.perf_counter()
+                error = ''
+                if mode == 'legacy':
+                    try:
+                        deleted = self._legacy_cleanup()
+                    except OperationalError as e:
+                        # The long transaction loses against the writer on SQLite
+                        deleted, error = 0, str(e)
+                else:
+                    with ThreadPoolExecutor(max_workers=1) as file_pool:
+                        deleted = run_policy(policy, timezone.now() - timedelta(days=30), file_pool, config)['deleted']
+                elapsed = time.perf_counter() - start
+                writer.stopped.set()
+                if writer.is_alive():
+                    writer.join()
+                # Rows a failed cleanup left behind would be counted by the next mode
+                SystemHealthMetric.objects.filter(component=COMPONENT).delete()
+
+                report.append({
+                    'mode': mode,
+                    'rows': deleted,
+                    'seconds': elapsed,
+                    'rows_per_second': deleted / elapsed if elapsed else 0.0,
+                    'error': error,
+                    **writer.report(),
+                })
+        finally:
+            SystemHealthMetric.objects.filter(component__in=[COMPONENT, WRITER_COMPONENT]).delete()
+            RetentionCheckpoint.objects.filter(policy=POLICY).delete()
+
+        if options['format'] == 'json':
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self._output_table(report)
+
+    @staticmethod
+    def _create_fixture(rows):
+        timestamp = timezone.now() - timedelta(days=100)
+        batch = 50_000
+        for start in range(0, rows, batch):
+            SystemHealthMetric.objects.bulk_create([
+                SystemHealthMetric(component=COMPONENT, status='healthy', response_time=0.1, timestamp=timestamp)
+                for _ in range(min(batch, rows - start))
+            ], batch_size=batch)
+
+    @staticmethod
+    def _legacy_cleanup():
+        """The previous cleanup_old_data step for health records"""
+        with transaction.atomic():
+            expired = SystemHealthMetric.objects.filter(
+                component=COMPONENT, timestamp__lt=timezone.now() - timedelta(days=30)
+            )
+            count = expired.count()
+            expired.delete()
+        return count
+
+    def _output_table(self, report):
+        """Output report as a table"""
+        self.stdout.write(self.style.SUCCESS('\n=== Retention Benchmark ===\n'))
+        self.stdout.write(
+            f"{'mode':<10}{'rows':>10}{'time':>11}{'rows/s':>11}"
+            f"{'inserts':>9}{'failed':>8}{'p99 wait':>12}{'max wait':>12}"
+        )
+        for row in report:
+            self.stdout.write(
+                f"{row['mode']:<10}{row['rows']:>10}{row['seconds']:>9.2f} s{row['rows_per_second']:>11.0f}"
+                f"{row['writer_inserts']:>9}{row['writer_failures']:>8}"
+                f"{row['writer_p99_ms']:>9.1f} ms{row['writer_max_ms']:>9.1f} ms"
+            )
+            if row['error']:
+                self.stdout.write(self.style.ERROR(f"  {row['mode']} failed: {row['error']}"))
@@ -0,0 +1,180 @@
+"""
+Management command to benchmark system broadcast delivery.
+
+Creates a synthetic fixture of active users and sends a system message to
+all of them:
+
+- with the previous per-recipient ``Wiadomosc.objects.create`` loop, timed
+  on a sample of recipients and extrapolated to all of them;
+- in fan-out mode, writing the copies with ``bulk_create`` in batches as the
+  Celery task does;
+- in receipts mode, writing a single broadcast row.
+
+Reports rows written, queries and seconds per mode, and the time to read
+one recipient's system messages afterwards. Everything is created inside a
+transaction that is rolled back at the end.
+"""
+
+import json
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries, transaction
+from django.test.utils import CaptureQueriesContext
+
+from faktury.models import SystemBroadcast, Wiadomosc
+from faktury.services.system_broadcast import run_fan_out, start_broadcast, system_messages
+
+
+def legacy_send(autor, recipient_ids):
+    """The previous view body: one INSERT per recipient"""
+    for user_id in recipient_ids:
+        Wiadomosc.objects.create(
+            autor=autor, odbiorca_user_id=user_id, temat='Benchmark', tresc='Treść', typ_wiadomosci='system'
+        )
+    return len(recipient_ids)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark fan-out and receipts delivery of system broadcasts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=100000,
+            help='Active users receiving the broadcast (default: 100000)'
+        )
+
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Messages per bulk insert in fan-out mode (default: 1000)'
+        )
+
+        parser.add_argument(
+            '--legacy-sample',
+            type=int,
+            default=2000,
+            help='Recipients written with the per-row loop before extrapolating (default: 2000)'
+        )
+
+        parser.add_argument(
+            '--format',
+            choices=['table', 'json'],
+            default='table',
+            help='Output format (default: table)'
+        )
+
+        parser.add_argument(
+            '--skip-legacy',
+            action='store_true',
+            help='Skip the per-row loop'
+        )
+
+    def handle(self, *args, **options):
+        report = []
+
+        with transaction.atomic():
+            autor, recipient_ids = self._create_fixture(options)
+            reader = User.objects.get(pk=recipient_ids[len(recipient_ids) // 2])
+
+            if not options['skip_legacy']:
+                sample = recipient_ids[:options['legacy_sample']]
+                sid = transaction.savepoint()
+                queries, seconds, written = self._measure(lambda: legacy_send(autor, sample))
+                transaction.savepoint_rollback(sid)
+                scale = len(recipient_ids) / max(len(sample), 1)
+                report.append(self._row('per_row_create', len(recipient_ids), round(written * scale),
+                                        round(queries * scale), seconds * scale, None, extrapolated=True))
+
+            def fan_out():
+                broadcast = start_broadcast(autor, 'Benchmark', 'Treść', SystemBroadcast.MODE_FAN_OUT)
+                return run_fan_out(broadcast.pk, batch_size=options['batch_size'], time_budget=3600)
+
+            sid = transaction.savepoint()
+            queries, seconds, broadcast = self._measure(fan_out)
+            if broadcast.delivered != len(recipient_ids):
+                raise CommandError(f'fan-out delivered {broadcast.delivered} of {len(recipient_ids)} messages')
+            inbox = self._inbox_ms(reader)
+            report.append(self._row('fan_out', len(recipient_ids), broadcast.delivered + 1, queries, seconds, inbox))
+            transaction.savepoint_rollback(sid)
+
+            queries, seconds, broadcast = self._measure(
+                lambda: start_broadcast(autor, 'Benchmark', 'Treść', SystemBroadcast.MODE_RECEIPTS)
+            )
+            if broadcast.total_recipients != len(recipient_ids):
+                raise CommandError(f'receipts broadcast counted {broadcast.total_recipients} recipients')
+            inbox = self._inbox_ms(reader)
+            report.append(self._row('receipts', len(recipient_ids), 1, queries, seconds, inbox))
+
+            transaction.set_rollback(True)
+
+        if options['format'] == 'json':
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self._output_table(report)
+
+    @staticmethod
+    def _row(mode, recipients, rows_written, queries, seconds, inbox_ms, extrapolated=False):
+        return {
+            'mode': mode,
+            'recipients': recipients,
+            'rows_written': rows_written,
+            'queries': queries,
+            'seconds': seconds,
+            'inbox_ms': inbox_ms,
+            'extrapolated': extrapolated,
+        }
+
+    @staticmethod
+    def _measure(run):
+        reset_queries()  # the fixture fills the bounded query log
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            result = run()
+            elapsed = time.perf_counter() - start
+        return len(queries), elapsed, result
+
+    def _inbox_ms(self, user, repeat=5):
+        """Best time to read a recipient's merged system messages"""
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            rows = system_messages(user, limit=20)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        if not rows:
+            raise CommandError('the reader has no system messages')
+        return best * 1000
+
+    def _create_fixture(self, options):
+        """Active users and a staff author"""
+        prefix = uuid.uuid4().hex[:8]
+        autor = User.objects.create_user(username=f'benchmark-{prefix}-admin', is_staff=True)
+        users = User.objects.bulk_create([
+            User(username=f'benchmark-{prefix}-{i}') for i in range(options['users'])
+        ], batch_size=5000)
+        recipient_ids = sorted(user.pk for user in users)
+        # Recipients are all active users other than the author, so count those outside the fixture too
+        others = User.objects.filter(is_active=True).exclude(pk=autor.pk).exclude(pk__in=recipient_ids)
+        return autor, recipient_ids + list(others.values_list('pk', flat=True))
+
+    def _output_table(self, report):
+        """Output report as a table"""
+        self.stdout.write(self.style.SUCCESS('\n=== System Broadcast Benchmark ===\n'))
+        self.stdout.write(
+            f"{'mode':<16}{'recipients':>11}{'rows':>9}{'queries':>9}{'time':>12}{'inbox':>12}"
+        )
+        for row in report:
+            inbox = f"{row['inbox_ms']:>9.2f} ms" if row['inbox_ms'] is not None else f"{'-':>12}"
+            marker = ' *' if row['extrapolated'] else ''
+            self.stdout.write(
+                f"{row['mode']:<16}{row['recipients']:>11}{row['rows_written']:>9}{row['queries']:>9}"
+                f"{row['seconds']:>10.2f} s{inbox}{marker}"
+            )
+        if any(row['extrapolated'] for row in report):
+            self.stdout.write('* extrapolated from --legacy-sample recipients')
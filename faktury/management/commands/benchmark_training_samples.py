@@ -0,0 +1,158 @@
+"""
+Management command to benchmark the training sample store.
+
+Compares the legacy layout (one JSON file per sample, globbed and parsed on
+every call) with the indexed SQLite sample store for loading, filtering and
+exporting synthetic samples.
+"""
+
+import json
+import random
+import shutil
+import tempfile
+import time
+from dataclasses import asdict
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from faktury.services.training_data_collector import TrainingDataCollector, TrainingSample
+
+
+ENGINES = ['paddleocr', 'tesseract', 'easyocr']
+DOCUMENT_TYPES = ['faktura_vat', 'korekta', 'proforma', 'paragon']
+
+
+def make_sample(index, rng):
+    """Build a synthetic invoice training sample"""
+    confidence = rng.uniform(80.0, 100.0)
+    return TrainingSample(
+        sample_id=f"sample_{index:08d}",
+        original_text=f"FAKTURA VAT nr FV/{index}/2025\nSprzedawca: Firma {index % 500} Sp. z o.o.\n" * 8,
+        extracted_data={
+            'numer_faktury': f"FV/{index}/2025",
+            'nip_sprzedawcy': f"{rng.randrange(10**9, 10**10)}",
+            'kwota_brutto': f"{rng.uniform(10, 10000):.2f}",
+        },
+        confidence_score=confidence,
+        human_rating=rng.randint(1, 10) if index % 3 == 0 else None,
+        collection_date=datetime(2025, 1, 1) + timedelta(minutes=index),
+        anonymized=True,
+        quality_score=rng.random(),
+        tags=['high_confidence', f"confidence_{int(confidence)}"],
+        engine=rng.choice(ENGINES),
+        document_type=rng.choice(DOCUMENT_TYPES),
+    )
+
+
+def legacy_load(collection_dir):
+    """Load all samples the way the JSON-file collector did"""
+    samples = []
+    for sample_type in ('high_confidence', 'human_validated'):
+        for sample_file in (Path(collection_dir) / sample_type).glob('*.json'):
+            with open(sample_file, 'r', encoding='utf-8') as f:
+                samples.append(TrainingSample(**json.load(f)))
+    return samples
+
+
+class Command(BaseCommand):
+    help = 'Benchmark load, filter and export time of the training sample store'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=str,
+            default='10000,100000',
+            help='Comma separated sample counts (default: 10000,100000)'
+        )
+
+        parser.add_argument(
+            '--format',
+            choices=['table', 'json'],
+            default='table',
+            help='Output format (default: table)'
+        )
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        results = [self._benchmark(size) for size in sizes]
+
+        if options['format'] == 'json':
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            self._output_table(results)
+
+    def _benchmark(self, size):
+        """Benchmark one dataset size in a temporary directory"""
+        rng = random.Random(size)
+        samples = [make_sample(i, rng) for i in range(size)]
+        work_dir = tempfile.mkdtemp(prefix='training_samples_')
+        try:
+            legacy_dir = Path(work_dir) / 'legacy'
+            (legacy_dir / 'high_confidence').mkdir(parents=True)
+            for sample in samples:
+                with open(legacy_dir / 'high_confidence' / f"{sample.sample_id}.json", 'w', encoding='utf-8') as f:
+                    json.dump(asdict(sample), f, indent=2, default=str)
+
+            collector = TrainingDataCollector(collection_dir=str(Path(work_dir) / 'store'), privacy_enabled=False)
+            start = time.perf_counter()
+            collector.store.append_many((sample, 'high_confidence') for sample in samples)
+            ingest = time.perf_counter() - start
+            del samples
+
+            timings = {'size': size, 'store_ingest_seconds': ingest}
+
+            start = time.perf_counter()
+            legacy_samples = legacy_load(legacy_dir)
+            timings['legacy_load_seconds'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            legacy_matches = [
+                s for s in legacy_samples
+                if s.engine == 'paddleocr' and s.document_type == 'faktura_vat' and s.confidence_score >= 95.0
+            ]
+            timings['legacy_filter_seconds'] = timings['legacy_load_seconds'] + time.perf_counter() - start
+
+            start = time.perf_counter()
+            with open(Path(work_dir) / 'legacy_export.json', 'w', encoding='utf-8') as f:
+                json.dump({'samples': [asdict(s) for s in legacy_samples]}, f, indent=2, default=str)
+            timings['legacy_export_seconds'] = timings['legacy_load_seconds'] + time.perf_counter() - start
+            del legacy_samples
+
+            start = time.perf_counter()
+            loaded = sum(1 for _ in collector.store.iter_samples())
+            timings['store_load_seconds'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            matches = sum(1 for _ in collector.store.iter_samples(
+                engine='paddleocr', document_type='faktura_vat', min_confidence=95.0
+            ))
+            timings['store_filter_seconds'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            collector.export_training_dataset(format='json', output_file='benchmark_export')
+            timings['store_export_seconds'] = time.perf_counter() - start
+
+            timings['matches'] = matches
+            if loaded != size or matches != len(legacy_matches):
+                self.stderr.write(self.style.ERROR(
+                    f"Result mismatch for {size} samples: loaded {loaded}, "
+                    f"matches {matches} vs {len(legacy_matches)}"
+                ))
+            return timings
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _output_table(self, results):
+        """Output results as a table"""
+        self.stdout.write(self.style.SUCCESS('\n=== Training Sample Store ===\n'))
+        self.stdout.write(f"{'samples':>10}{'operation':>12}{'JSON files':>14}{'sample store':>16}")
+        for result in results:
+            for operation in ('load', 'filter', 'export'):
+                self.stdout.write(
+                    f"{result['size']:>10}{operation:>12}"
+                    f"{result[f'legacy_{operation}_seconds']:>12.2f} s"
+                    f"{result[f'store_{operation}_seconds']:>14.2f} s"
+                )
+            self.stdout.write(f"{'':>10}{'ingest':>12}{'':>14}{result['store_ingest_seconds']:>14.2f} s")
@@ -0,0 +1,49 @@
+"""
+Django management command to migrate OCR training samples from JSON files
+into the indexed training sample store
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from faktury.services.training_sample_store import TrainingSampleStore
+
+
+class Command(BaseCommand):
+    help = 'Import training samples saved as one JSON file per sample into the sample store'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--collection-dir',
+            type=str,
+            default='training_data',
+            help='Training data collection directory (default: training_data)'
+        )
+
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Samples inserted per transaction (default: 1000)'
+        )
+
+        parser.add_argument(
+            '--remove-json',
+            action='store_true',
+            help='Delete JSON sample files once they are stored'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            store = TrainingSampleStore(options['collection_dir'])
+            imported = store.migrate_json_directory(
+                options['collection_dir'],
+                batch_size=options['batch_size'],
+                force=True,
+                remove_files=options['remove_json']
+            )
+        except Exception as e:
+            raise CommandError(f'Training sample migration failed: {e}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {imported} samples, store now holds {store.count()} samples"
+        ))
@@ -2,13 +2,11 @@
 Management command to display OCR processing statistics.
 """
 
-from django.core.management.base import BaseCommand
-from django.db.models import Count, Avg, Min, Max, Q
-from django.utils import timezone
-from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
 import json
 
-from faktury.models import DocumentUpload, OCRResult, OCRValidation, OCRProcessingLog
+from faktury.services.ocr_statistics import DOCUMENT_STATUSES, OCRStatistics
 
 
 class Command(BaseCommand):
@@ -34,37 +32,28 @@ class Command(BaseCommand):
             type=str,
             help='Show statistics for specific user (username)'
         )
+        
+        parser.add_argument(
+            '--no-rollup',
+            action='store_true',
+            help='Compute closed days from raw rows instead of daily rollups'
+        )
 
     def handle(self, *args, **options):
         days = options['days']
         output_format = options['format']
         username = options['user']
         
-        # Calculate date range
-        end_date = timezone.now()
-        start_date = end_date - timedelta(days=days)
-        
-        # Base querysets
-        documents_qs = DocumentUpload.objects.filter(
-            upload_timestamp__gte=start_date
-        )
-        results_qs = OCRResult.objects.filter(
-            created_at__gte=start_date
-        )
-        validations_qs = OCRValidation.objects.filter(
-            validation_timestamp__gte=start_date
-        )
-        
-        # Filter by user if specified
+        user = None
         if username:
-            documents_qs = documents_qs.filter(user__username=username)
-            results_qs = results_qs.filter(document__user__username=username)
-            validations_qs = validations_qs.filter(validated_by__username=username)
+            user = User.objects.filter(username=username).first()
+            if user is None:
+                raise CommandError(f'User "{username}" does not exist')
+        
+        statistics = OCRStatistics.last_days(days, user=user, use_rollup=not options['no_rollup'])
         
         # Collect statistics
-        stats = self._collect_statistics(
-            documents_qs, results_qs, validations_qs, start_date, end_date
-        )
+        stats = self._collect_statistics(statistics)
         
         # Output results
         if output_format == 'json':
@@ -72,117 +61,47 @@ class Command(BaseCommand):
         else:
             self._output_table(stats, days, username)
 
-    def _collect_statistics(self, documents_qs, results_qs, validations_qs, start_date, end_date):
+    def _collect_statistics(self, statistics):
         """Collect comprehensive OCR statistics"""
-        
-        # Document statistics
-        total_documents = documents_qs.count()
-        
-        document_stats = documents_qs.aggregate(
-            completed=Count('id', filter=Q(processing_status='completed')),
-            failed=Count('id', filter=Q(processing_status='failed')),
-            processing=Count('id', filter=Q(processing_status='processing')),
-            uploaded=Count('id', filter=Q(processing_status='uploaded')),
-        )
-        
-        # OCR results statistics
-        total_results = results_qs.count()
-        
-        if total_results > 0:
-            results_stats = results_qs.aggregate(
-                avg_confidence=Avg('confidence_score'),
-                min_confidence=Min('confidence_score'),
-                max_confidence=Max('confidence_score'),
-                avg_processing_time=Avg('processing_time'),
-                min_processing_time=Min('processing_time'),
-                max_processing_time=Max('processing_time'),
-                high_confidence=Count('id', filter=Q(confidence_score__gte=95)),
-                medium_confidence=Count('id', filter=Q(confidence_score__gte=80, confidence_score__lt=95)),
-                low_confidence=Count('id', filter=Q(confidence_score__lt=80)),
-                with_invoice=Count('id', filter=Q(faktura__isnull=False)),
-            )
-        else:
-            results_stats = {
-                'avg_confidence': 0,
-                'min_confidence': 0,
-                'max_confidence': 0,
-                'avg_processing_time': 0,
-                'min_processing_time': 0,
-                'max_processing_time': 0,
-                'high_confidence': 0,
-                'medium_confidence': 0,
-                'low_confidence': 0,
-                'with_invoice': 0,
-            }
-        
-        # Validation statistics
-        total_validations = validations_qs.count()
-        
-        if total_validations > 0:
-            validation_stats = validations_qs.aggregate(
-                avg_accuracy=Avg('accuracy_rating'),
-                min_accuracy=Min('accuracy_rating'),
-                max_accuracy=Max('accuracy_rating'),
-                avg_time_spent=Avg('time_spent_minutes'),
-                total_corrections=Count('id', filter=Q(corrections_made__isnull=False)),
-            )
-        else:
-            validation_stats = {
-                'avg_accuracy': 0,
-                'min_accuracy': 0,
-                'max_accuracy': 0,
-                'avg_time_spent': 0,
-                'total_corrections': 0,
-            }
-        
-        # User statistics
-        user_stats = documents_qs.values('user__username').annotate(
-            document_count=Count('id'),
-            completed_count=Count('id', filter=Q(processing_status='completed')),
-        ).order_by('-document_count')[:10]
-        
-        # Daily statistics
-        daily_stats = documents_qs.extra(
-            select={'day': 'date(upload_timestamp)'}
-        ).values('day').annotate(
-            uploads=Count('id'),
-            completed=Count('id', filter=Q(processing_status='completed')),
-        ).order_by('day')
-        
-        # Error statistics
-        error_logs = OCRProcessingLog.objects.filter(
-            timestamp__gte=start_date,
-            level__in=['ERROR', 'CRITICAL']
-        )
-        
-        error_stats = {
-            'total_errors': error_logs.count(),
-            'error_types': list(error_logs.values('message').annotate(
-                count=Count('id')
-            ).order_by('-count')[:5])
-        }
+        documents = statistics.documents
+        results = statistics.results
+        bands = results['confidence_bands']
+        validations = dict(statistics.validations)
+        errors = statistics.errors(limit=5)
         
         return {
             'period': {
-                'start_date': start_date.date(),
-                'end_date': end_date.date(),
-                'days': (end_date - start_date).days,
+                'start_date': statistics.start.date(),
+                'end_date': statistics.end.date(),
+                'days': (statistics.end - statistics.start).days,
             },
             'documents': {
-                'total': total_documents,
-                **document_stats,
+                'total': documents['total'],
+                **{status: documents[status] for status in DOCUMENT_STATUSES},
             },
             'results': {
-                'total': total_results,
-                **results_stats,
+                'total': results['total'],
+                'avg_confidence': results['avg_confidence'],
+                'min_confidence': results['min_confidence'],
+                'max_confidence': results['max_confidence'],
+                'avg_processing_time': results['avg_processing_time'],
+                'min_processing_time': results['min_processing_time'],
+                'max_processing_time': results['max_processing_time'],
+                'high_confidence': bands['95-100%'],
+                'medium_confidence': bands['80-94%'],
+                'low_confidence': bands['60-79%'] + bands['<60%'],
+                'with_invoice': results['with_invoice'],
             },
-            'validations': {
-                'total': total_validations,
-                **validation_stats,
+            'validations': validations,
+            'users': statistics.top_users(limit=10),
+            'daily': [
+                {'day': row['day'], 'uploads': row['uploads'], 'completed': row['completed']}
+                for row in documents['daily']
+            ],
+            'errors': {
+                'total_errors': errors['total_errors'],
+                'error_types': errors['error_types'],
             },
-            'users': list(user_stats),
-            'daily': list(daily_stats),
-            'errors': error_stats,
         }
 
     def _output_table(self, stats, days, username):
@@ -1,7 +1,8 @@
 """
 Management command for system backup and restore operations.
 
-Provides backup creation, restoration, and backup management functionality.
+Provides backup creation, restoration, verification, and backup management
+functionality.
 """
 
 import logging
@@ -12,9 +13,16 @@ from faktury.services.maintenance_service import MaintenanceService
 
 logger = logging.getLogger(__name__)
 
+# --components choices -> MaintenanceService backup components
+COMPONENTS = {
+    'database': 'database',
+    'media': 'media_files',
+    'config': 'configuration',
+}
+
 
 class Command(BaseCommand):
-    help = 'Manage system backups (create, restore, list)'
+    help = 'Manage system backups (create, restore, verify, list)'
 
     def add_arguments(self, parser):
         subparsers = parser.add_subparsers(dest='action', help='Backup actions')
@@ -47,6 +55,14 @@ class Command(BaseCommand):
             help='Confirm restoration (required for safety)'
         )
         
+        # Verify backup
+        verify_parser = subparsers.add_parser('verify', help='Check every stored chunk of a backup')
+        verify_parser.add_argument(
+            'backup_name',
+            type=str,
+            help='Name of backup to verify'
+        )
+        
         # List backups
         list_parser = subparsers.add_parser('list', help='List available backups')
         list_parser.add_argument(
@@ -79,6 +95,8 @@ class Command(BaseCommand):
                 self._create_backup(maintenance_service, options)
             elif action == 'restore':
                 self._restore_backup(maintenance_service, options)
+            elif action == 'verify':
+                self._verify_backup(maintenance_service, options)
             elif action == 'list':
                 self._list_backups(maintenance_service, options)
             elif action == 'delete':
@@ -86,7 +104,7 @@ class Command(BaseCommand):
             else:
                 self.stdout.write(
                     self.style.ERROR(
-                        "Please specify an action: create, restore, list, or delete"
+                        "Please specify an action: create, restore, verify, list, or delete"
                     )
                 )
                 return
@@ -108,7 +126,8 @@ class Command(BaseCommand):
         self.stdout.write(f"Components: {', '.join(components)}")
         
         try:
-            backup_results = maintenance_service.create_backup(backup_name)
+            selected = None if 'all' in components else [COMPONENTS[component] for component in components]
+            backup_results = maintenance_service.create_backup(backup_name, selected)
             
             if backup_results['status'] == 'success':
                 self.stdout.write(
@@ -119,6 +138,7 @@ class Command(BaseCommand):
                 
                 self.stdout.write(f"Backup path: {backup_results['backup_path']}")
                 self.stdout.write(f"Backup size: {self._format_size(backup_results['backup_size'])}")
+                self.stdout.write(f"Files backed up: {self._format_size(backup_results['total_size'])}")
                 self.stdout.write(f"Components: {', '.join(backup_results['components'])}")
                 
             else:
@@ -181,6 +201,23 @@ class Command(BaseCommand):
                 self.style.ERROR(f"Backup restoration failed: {e}")
             )
 
+    def _verify_backup(self, maintenance_service, options):
+        """Verify a backup."""
+        backup_name = options['backup_name']
+        self.stdout.write(f"Verifying backup: {backup_name}")
+        
+        verify_results = maintenance_service.verify_backup(backup_name)
+        
+        if verify_results['status'] == 'success':
+            self.stdout.write(
+                self.style.SUCCESS(f"Backup is intact: {verify_results['checked_chunks']} chunks checked")
+            )
+        else:
+            for error in verify_results['errors']:
+                self.stdout.write(self.style.ERROR(f"  Error: {error}"))
+            for digest in verify_results['corrupt_chunks'][:20]:
+                self.stdout.write(self.style.ERROR(f"  Chunk: {digest}"))
+
     def _list_backups(self, maintenance_service, options):
         """List available backups."""
         self.stdout.write("Available backups:")
@@ -227,20 +264,19 @@ class Command(BaseCommand):
         self.stdout.write(f"Deleting backup: {backup_name}")
         
         try:
-            import os
-            import shutil
-            
-            backup_path = os.path.join(maintenance_service.backup_directory, backup_name)
+            delete_results = maintenance_service.delete_backup(backup_name)
             
-            if os.path.exists(backup_path):
-                shutil.rmtree(backup_path)
+            if delete_results['status'] == 'success':
                 self.stdout.write(
                     self.style.SUCCESS(f"Backup deleted successfully: {backup_name}")
                 )
-            else:
                 self.stdout.write(
-                    self.style.ERROR(f"Backup not found: {backup_name}")
+                    f"Unreferenced chunks removed: {delete_results['removed_chunks']} "
+                    f"({self._format_size(delete_results['freed_space'])})"
                 )
+            else:
+                for error in delete_results['errors']:
+                    self.stdout.write(self.style.ERROR(f"  Error: {error}"))
                 
         except Exception as e:
             self.stdout.write(
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-18 21:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('faktury', '0036_add_security_models'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='faktura',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, null=True, verbose_name='Data aktualizacji'),
+        ),
+    ]
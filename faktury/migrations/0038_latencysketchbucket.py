@@ -0,0 +1,34 @@
+# Generated by Django 4.2.23 on 2026-10-18 21:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('faktury', '0037_faktura_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LatencySketchBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(max_length=50, verbose_name='Metryka')),
+                ('key', models.CharField(max_length=200, verbose_name='Klucz')),
+                ('minute', models.DateTimeField(verbose_name='Minuta')),
+                ('count', models.BigIntegerField(default=0, verbose_name='Liczba pomiarów')),
+                ('sketch', models.JSONField(default=dict, help_text='Serializowany LatencySketch', verbose_name='Szkic kwantyli')),
+            ],
+            options={
+                'verbose_name': 'Szkic opóźnień',
+                'verbose_name_plural': 'Szkice opóźnień',
+                'ordering': ['-minute'],
+                'indexes': [models.Index(fields=['metric', 'minute'], name='faktury_lat_metric_986841_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='latencysketchbucket',
+            constraint=models.UniqueConstraint(fields=('metric', 'key', 'minute'), name='unique_latency_sketch_minute'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.23 on 2026-10-18 22:15
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('faktury', '0038_latencysketchbucket'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OCRStatisticsRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Dzień')),
+                ('uploads', models.PositiveIntegerField(default=0, verbose_name='Przesłane dokumenty')),
+                ('completed', models.PositiveIntegerField(default=0, verbose_name='Zakończone')),
+                ('failed', models.PositiveIntegerField(default=0, verbose_name='Błędy')),
+                ('processing', models.PositiveIntegerField(default=0, verbose_name='W przetwarzaniu')),
+                ('uploaded', models.PositiveIntegerField(default=0, verbose_name='Oczekujące')),
+                ('results', models.PositiveIntegerField(default=0, verbose_name='Wyniki OCR')),
+                ('with_invoice', models.PositiveIntegerField(default=0, verbose_name='Z fakturą')),
+                ('confidence_sum', models.FloatField(default=0, verbose_name='Suma pewności')),
+                ('min_confidence', models.FloatField(blank=True, null=True, verbose_name='Minimalna pewność')),
+                ('max_confidence', models.FloatField(blank=True, null=True, verbose_name='Maksymalna pewność')),
+                ('processing_time_sum', models.FloatField(default=0, verbose_name='Suma czasu przetwarzania')),
+                ('min_processing_time', models.FloatField(blank=True, null=True, verbose_name='Minimalny czas przetwarzania')),
+                ('max_processing_time', models.FloatField(blank=True, null=True, verbose_name='Maksymalny czas przetwarzania')),
+                ('confidence_bands', models.JSONField(default=dict, help_text='Liczba wyników OCR w każdym przedziale pewności', verbose_name='Przedziały pewności')),
+                ('created_at', models.DateTimeField(auto_now=True, verbose_name='Data utworzenia')),
+                ('user', models.ForeignKey(blank=True, help_text='Puste dla sumy wszystkich użytkowników', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ocr_statistics_rollups', to=settings.AUTH_USER_MODEL, verbose_name='Użytkownik')),
+            ],
+            options={
+                'verbose_name': 'Dzienne statystyki OCR',
+                'verbose_name_plural': 'Dzienne statystyki OCR',
+                'ordering': ['-day'],
+                'indexes': [models.Index(fields=['user', 'day'], name='faktury_ocr_user_id_142cd2_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='ocrstatisticsrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'user'), name='unique_ocr_statistics_rollup_day_user'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.23 on 2026-10-18 22:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('faktury', '0039_ocrstatisticsrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ocrresult',
+            name='summary_invoice_number',
+            field=models.CharField(blank=True, default='', max_length=100, verbose_name='Numer faktury (podsumowanie)'),
+        ),
+        migrations.AddField(
+            model_name='ocrresult',
+            name='summary_seller_name',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='Sprzedawca (podsumowanie)'),
+        ),
+        migrations.AddField(
+            model_name='ocrresult',
+            name='summary_total',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=15, null=True, verbose_name='Kwota brutto (podsumowanie)'),
+        ),
+        migrations.AddIndex(
+            model_name='ocrresult',
+            index=models.Index(fields=['-created_at', '-id'], name='ocr_result_created_id_idx'),
+        ),
+    ]
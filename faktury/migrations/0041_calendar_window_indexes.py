@@ -0,0 +1,21 @@
+# Generated by Django 4.2.23 on 2026-10-18 22:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('faktury', '0040_ocrresult_list_summary_and_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='faktura',
+            index=models.Index(fields=['user', 'termin_platnosci'], name='faktury_fak_user_id_1d37fa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='zadanieuzytkownika',
+            index=models.Index(fields=['user', 'termin_wykonania'], name='faktury_zad_user_id_7c9d09_idx'),
+        ),
+    ]
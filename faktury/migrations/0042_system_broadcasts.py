@@ -0,0 +1,86 @@
+# Generated by Django 4.2.23 on 2026-10-18 22:46
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('faktury', '0041_calendar_window_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BroadcastReceipt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('read_at', models.DateTimeField(auto_now_add=True, verbose_name='Data odczytu')),
+            ],
+            options={
+                'verbose_name': 'Potwierdzenie odczytu',
+                'verbose_name_plural': 'Potwierdzenia odczytu',
+            },
+        ),
+        migrations.CreateModel(
+            name='SystemBroadcast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('temat', models.CharField(max_length=255, verbose_name='Temat')),
+                ('tresc', models.TextField(verbose_name='Treść')),
+                ('mode', models.CharField(choices=[('fan_out', 'Kopia dla każdego odbiorcy'), ('receipts', 'Jedna wiadomość z potwierdzeniami odczytu')], default='fan_out', max_length=10, verbose_name='Tryb')),
+                ('status', models.CharField(choices=[('pending', 'Oczekuje'), ('running', 'W trakcie'), ('completed', 'Zakończone'), ('failed', 'Błąd')], default='pending', max_length=10, verbose_name='Status')),
+                ('max_recipient_id', models.PositiveIntegerField(default=0, verbose_name='Ostatni identyfikator odbiorcy')),
+                ('total_recipients', models.PositiveIntegerField(default=0, verbose_name='Liczba odbiorców')),
+                ('delivered', models.PositiveIntegerField(default=0, verbose_name='Dostarczono')),
+                ('last_recipient_id', models.PositiveIntegerField(default=0, help_text='Identyfikator ostatniego odbiorcy, któremu zapisano wiadomość', verbose_name='Punkt kontrolny')),
+                ('error_message', models.TextField(blank=True, verbose_name='Błąd')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Data utworzenia')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Data aktualizacji')),
+                ('completed_at', models.DateTimeField(blank=True, null=True, verbose_name='Data zakończenia')),
+            ],
+            options={
+                'verbose_name': 'Rozgłoszenie systemowe',
+                'verbose_name_plural': 'Rozgłoszenia systemowe',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='wiadomosc',
+            index=models.Index(fields=['odbiorca_user', 'typ_wiadomosci', 'data_wyslania'], name='wiadomosc_inbox_tab_idx'),
+        ),
+        migrations.AddField(
+            model_name='systembroadcast',
+            name='autor',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='system_broadcasts', to=settings.AUTH_USER_MODEL, verbose_name='Autor'),
+        ),
+        migrations.AddField(
+            model_name='broadcastreceipt',
+            name='broadcast',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='receipts', to='faktury.systembroadcast', verbose_name='Rozgłoszenie'),
+        ),
+        migrations.AddField(
+            model_name='broadcastreceipt',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='broadcast_receipts', to=settings.AUTH_USER_MODEL, verbose_name='Użytkownik'),
+        ),
+        migrations.AddField(
+            model_name='wiadomosc',
+            name='broadcast',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='wiadomosci', to='faktury.systembroadcast', verbose_name='Rozgłoszenie systemowe'),
+        ),
+        migrations.AddIndex(
+            model_name='systembroadcast',
+            index=models.Index(fields=['status', 'updated_at'], name='faktury_sys_status_9b7ed9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='systembroadcast',
+            index=models.Index(fields=['mode', 'status', 'created_at'], name='faktury_sys_mode_804b4d_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='broadcastreceipt',
+            constraint=models.UniqueConstraint(fields=('user', 'broadcast'), name='unique_broadcast_receipt_user'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.23 on 2026-10-18 23:14
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('faktury', '0042_system_broadcasts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RetentionCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('policy', models.CharField(max_length=50, unique=True, verbose_name='Polityka')),
+                ('status', models.CharField(choices=[('running', 'W trakcie'), ('completed', 'Zakończone'), ('failed', 'Błąd')], default='running', max_length=10, verbose_name='Status')),
+                ('last_pk', models.BigIntegerField(default=0, help_text='Klucz ostatniego usuniętego wiersza', verbose_name='Punkt kontrolny')),
+                ('deleted', models.BigIntegerField(default=0, verbose_name='Usunięto')),
+                ('batches', models.PositiveIntegerField(default=0, verbose_name='Liczba partii')),
+                ('error_message', models.TextField(blank=True, verbose_name='Błąd')),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Data rozpoczęcia')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Data aktualizacji')),
+                ('completed_at', models.DateTimeField(blank=True, null=True, verbose_name='Data zakończenia')),
+            ],
+            options={
+                'verbose_name': 'Punkt kontrolny retencji',
+                'verbose_name_plural': 'Punkty kontrolne retencji',
+                'ordering': ['policy'],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.23 on 2026-10-18 23:37
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('faktury', '0043_retention_checkpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistryLookup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('nip', 'NIP'), ('regon', 'REGON')], max_length=5, verbose_name='Rodzaj numeru')),
+                ('number', models.CharField(max_length=14, verbose_name='Numer')),
+                ('found', models.BooleanField(default=True, verbose_name='Znaleziono')),
+                ('data', models.JSONField(blank=True, default=dict, verbose_name='Dane firmy')),
+                ('fetched_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Data pobrania')),
+                ('expires_at', models.DateTimeField(verbose_name='Data wygaśnięcia')),
+            ],
+            options={
+                'verbose_name': 'Wynik wyszukiwania w rejestrze',
+                'verbose_name_plural': 'Wyniki wyszukiwania w rejestrze',
+                'indexes': [models.Index(fields=['expires_at'], name='faktury_reg_expires_0eab84_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='registrylookup',
+            constraint=models.UniqueConstraint(fields=('kind', 'number'), name='registry_lookup_kind_number'),
+        ),
+    ]
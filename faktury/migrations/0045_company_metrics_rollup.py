@@ -0,0 +1,36 @@
+# Generated by Django 4.2.23 on 2026-10-19 00:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('faktury', '0044_registry_lookup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompanyMetricsRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='Pierwszy dzień miesiąca', verbose_name='Miesiąc')),
+                ('total_invoices', models.PositiveIntegerField(default=0, verbose_name='Wystawione faktury')),
+                ('total_sales', models.PositiveIntegerField(default=0, verbose_name='Faktury sprzedaży')),
+                ('total_costs', models.PositiveIntegerField(default=0, verbose_name='Faktury kosztowe')),
+                ('total_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=15, verbose_name='Przychód z opłaconych faktur')),
+                ('created_at', models.DateTimeField(auto_now=True, verbose_name='Data utworzenia')),
+                ('firma', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='metrics_rollups', to='faktury.firma', verbose_name='Firma')),
+            ],
+            options={
+                'verbose_name': 'Miesięczne statystyki firmy',
+                'verbose_name_plural': 'Miesięczne statystyki firm',
+                'ordering': ['-month'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='companymetricsrollup',
+            constraint=models.UniqueConstraint(fields=('firma', 'month'), name='unique_company_metrics_rollup_firma_month'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.23 on 2026-10-19 01:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('faktury', '0045_company_metrics_rollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ocrresult',
+            name='dispatched_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Data wysłania do przetwarzania'),
+        ),
+        migrations.AddIndex(
+            model_name='ocrresult',
+            index=models.Index(fields=['processing_status', 'dispatched_at'], name='ocr_result_dispatch_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.23 on 2026-10-19 01:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('faktury', '0046_ocr_result_dispatch_claim'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='firma',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, null=True, verbose_name='Data aktualizacji'),
+        ),
+        migrations.AddField(
+            model_name='kontrahent',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, null=True, verbose_name='Data aktualizacji'),
+        ),
+    ]
@@ -8,9 +8,10 @@ from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import ValidationError
 from django.db.models import Q
+from django.db.models.functions import Coalesce, Round
 import logging
 from django.db import transaction
-from decimal import Decimal, ROUND_HALF_UP
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
 from django.utils import timezone
 from typing import Dict
 logger = logging.getLogger(__name__)
@@ -41,6 +42,7 @@ class Firma(models.Model):
     miejscowosc = models.CharField(max_length=255)
     kraj = models.CharField(max_length=255, default="Polska")
     logo = models.ImageField(upload_to='logos/', blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, null=True, verbose_name="Data aktualizacji")
 
     class Meta:
         indexes = [
@@ -172,6 +174,12 @@ class Wiadomosc(models.Model):
         default='normalny'
     )
     zalaczniki = models.JSONField(default=list, blank=True)  # Store file attachments info
+    
+    # System broadcast this copy was fanned out from
+    broadcast = models.ForeignKey(
+        'SystemBroadcast', on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='wiadomosci', verbose_name="Rozgłoszenie systemowe"
+    )
 
     def __str__(self):
         if self.typ_wiadomosci == 'zespol':
@@ -185,6 +193,8 @@ class Wiadomosc(models.Model):
             models.Index(fields=['odbiorca_user', 'przeczytana']),
             models.Index(fields=['typ_wiadomosci', 'data_wyslania']),
             models.Index(fields=['autor', 'data_wyslania']),
+            # Inbox tab of one user; fan-out broadcasts put a row per user in the system tab
+            models.Index(fields=['odbiorca_user', 'typ_wiadomosci', 'data_wyslania'], name='wiadomosc_inbox_tab_idx'),
         ]
     
     def save(self, *args, **kwargs):
@@ -213,9 +223,18 @@ class Wiadomosc(models.Model):
         """Check if this message is a reply"""
         return self.wiadomosc_nadrzedna is not None
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Read state as loaded, so the unread counter signals see what changed
+        instance._loaded_przeczytana = instance.__dict__.get('przeczytana')
+        return instance
+    
     @property
     def replies_count(self):
-        """Count replies to this message"""
+        """Count replies to this message, annotated by the inbox feeds"""
+        if hasattr(self, 'liczba_odpowiedzi'):
+            return self.liczba_odpowiedzi
         return self.odpowiedzi.count()
     
     def mark_as_read(self):
@@ -289,6 +308,7 @@ class Kontrahent(models.Model):
     adres_korespondencyjny_miejscowosc = models.CharField(max_length=255, blank=True, null=True)
     adres_korespondencyjny_kraj = models.CharField(max_length=255, blank=True, null=True, default="Polska")
     dodatkowy_opis = models.TextField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, null=True, verbose_name="Data aktualizacji")
 
     class Meta:
         constraints = [
@@ -330,11 +350,63 @@ class Produkt(models.Model):
     def __str__(self):
         return self.nazwa
 
+AMOUNT_FIELD = models.DecimalField(max_digits=15, decimal_places=2)
+VAT_MULTIPLIERS = {'23': Decimal('1.23'), '8': Decimal('1.08'), '5': Decimal('1.05')}
+
+
+def pozycja_brutto_expression(prefix=''):
+    """
+    Database expression for the unsigned gross value of an invoice item
+
+    Mirrors PozycjaFaktury.wartosc_brutto: the discount is applied to the
+    unit price, netto and brutto are each rounded to grosze half away from
+    zero. Percentages are multiplied by 0.01 rather than divided by 100,
+    which SQLite would do in integer arithmetic for whole-number discounts.
+    `prefix` is the lookup path to the item fields, '' in PozycjaFaktury
+    querysets and 'pozycjafaktury__' from Faktura.
+    """
+    def field(name):
+        return models.F(prefix + name)
+
+    def decimal(expression):
+        return models.ExpressionWrapper(expression, output_field=AMOUNT_FIELD)
+
+    cena = models.Case(
+        models.When(
+            Q(**{prefix + 'rabat_typ': 'procent'}) & Q(**{prefix + 'rabat__isnull': False}),
+            then=decimal(field('cena_netto') * (models.Value(Decimal('1')) - field('rabat') * models.Value(Decimal('0.01')))),
+        ),
+        models.When(
+            Q(**{prefix + 'rabat_typ': 'kwota'}) & Q(**{prefix + 'rabat__isnull': False}),
+            then=decimal(field('cena_netto') - field('rabat')),
+        ),
+        default=field('cena_netto'),
+        output_field=AMOUNT_FIELD,
+    )
+    netto = Round(decimal(cena * field('ilosc')), 2, output_field=AMOUNT_FIELD)
+    multiplier = models.Case(
+        *[models.When(**{prefix + 'vat': rate}, then=models.Value(value)) for rate, value in VAT_MULTIPLIERS.items()],
+        default=models.Value(Decimal('1')),
+        output_field=AMOUNT_FIELD,
+    )
+    return Round(decimal(netto * multiplier), 2, output_field=AMOUNT_FIELD)
+
+
 class FakturaQuerySet(models.QuerySet):
     def with_related(self):
         """Fetch faktury with related objects to avoid N+1 queries"""
         return self.select_related('nabywca', 'sprzedawca', 'user').prefetch_related('pozycjafaktury_set')
     
+    def with_gross_total(self):
+        """Annotate gross_total, the suma_brutto of each faktura computed in the database"""
+        items = PozycjaFaktury.objects.filter(faktura=models.OuterRef('pk')).order_by().values('faktura')
+        items = items.annotate(total=models.Sum(pozycja_brutto_expression())).values('total')
+        total = Coalesce(models.Subquery(items, output_field=AMOUNT_FIELD), models.Value(Decimal('0.00')),
+                         output_field=AMOUNT_FIELD)
+        sign = models.Case(models.When(typ_faktury='koszt', then=models.Value(Decimal('-1'))),
+                           default=models.Value(Decimal('1')), output_field=AMOUNT_FIELD)
+        return self.annotate(gross_total=models.ExpressionWrapper(total * sign, output_field=AMOUNT_FIELD))
+    
     def for_user(self, user):
         """Filter faktury for specific user"""
         return self.filter(user=user)
@@ -354,6 +426,25 @@ class FakturaQuerySet(models.QuerySet):
     def nieoplacone(self):
         """Filter unpaid invoices"""
         return self.exclude(status='oplacona')
+    
+    def update_status(self, status):
+        """
+        Set the status of the faktury with one query
+        
+        update() sends no save signals, so the updated_at timestamp and the
+        calendar and partnership versions they maintain are updated here.
+        """
+        from .services.calendar_feed import bump_calendar_version
+        from .services.partnership_analytics import bump_partnership_version
+        
+        with transaction.atomic():
+            owners = set(self.order_by().values_list('user_id', 'sprzedawca_id').distinct())
+            updated = self.update(status=status, updated_at=timezone.now())
+            for user_id in {user_id for user_id, _ in owners}:
+                bump_calendar_version(user_id)
+            for firma_id in {firma_id for _, firma_id in owners}:
+                bump_partnership_version(firma_id)
+        return updated
 
 
 class FakturaManager(models.Manager):
@@ -363,6 +454,9 @@ class FakturaManager(models.Manager):
     def with_related(self):
         return self.get_queryset().with_related()
     
+    def with_gross_total(self):
+        return self.get_queryset().with_gross_total()
+    
     def for_user(self, user):
         return self.get_queryset().for_user(user)
     
@@ -474,6 +568,7 @@ class Faktura(models.Model):
     auto_numer = models.BooleanField(default=True, verbose_name="Automatyczna numeracja")
     wlasny_numer = models.CharField(max_length=50, blank=True, null=True, verbose_name="Własny numer faktury")
     kp = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='powiazana_faktury')
+    updated_at = models.DateTimeField(auto_now=True, null=True, verbose_name="Data aktualizacji")
     
     # OCR Integration Fields
     source_document = models.ForeignKey(
@@ -506,6 +601,82 @@ class Faktura(models.Model):
         if self.typ_dokumentu == 'KOR' and not self.dokument_podstawowy:
             raise ValidationError("Korekta wymaga wskazania dokumentu podstawowego")
         
+    def ksieguj_u_partnera(self):
+        """Copy the invoice as a cost invoice to a partner company with auto-accounting"""
+        if not (self.nabywca and self.nabywca.firma):
+            return
+        try:
+            partnerstwo = Partnerstwo.objects.filter(
+            (Q(firma1=self.sprzedawca, firma2=self.nabywca.firma) | Q(firma1=self.nabywca.firma, firma2=self.sprzedawca)) &
+            Q(aktywne=True) &
+            Q(auto_ksiegowanie=True)
+            ).first()
+
+            if partnerstwo:
+                firma_odbiorcy = partnerstwo.firma2 if partnerstwo.firma1 == self.sprzedawca else partnerstwo.firma1
+                
+                try:
+                    nabywca_kontrahent = Kontrahent.objects.get(
+                        user=firma_odbiorcy.user,
+                        nip=self.sprzedawca.nip
+                    )
+                except Kontrahent.DoesNotExist:
+                    nabywca_kontrahent = Kontrahent.objects.create(
+                        user=firma_odbiorcy.user,
+                        nazwa=self.sprzedawca.nazwa,
+                        nip=self.sprzedawca.nip,
+                        ulica=self.sprzedawca.ulica,
+                        numer_domu=self.sprzedawca.numer_domu,
+                        kod_pocztowy=self.sprzedawca.kod_pocztowy,
+                        miejscowosc=self.sprzedawca.miejscowosc,
+                        czy_firma=True
+                    )  
+                except Kontrahent.MultipleObjectsReturned:
+                    nabywca_kontrahent = Kontrahent.objects.filter(
+                        user=firma_odbiorcy.user,
+                        nip=self.sprzedawca.nip
+                    ).first()
+                    logger.warning(f"Znaleziono duplikaty kontrahenta NIP: {self.sprzedawca.nip}, używam pierwszego: ID {nabywca_kontrahent.id}")     
+                    
+                    
+                
+                if not Faktura.objects.filter(user=firma_odbiorcy.user, numer=self.numer).exists():
+                    with transaction.atomic():
+                        kopia_faktury = Faktura.objects.create(
+                            user=firma_odbiorcy.user,
+                            numer=self.numer,
+                            typ_dokumentu=self.typ_dokumentu,
+                            data_wystawienia=self.data_wystawienia,
+                            data_sprzedazy=self.data_sprzedazy,
+                            miejsce_wystawienia=self.miejsce_wystawienia,
+                            sprzedawca=self.nabywca.firma,
+                            nabywca=nabywca_kontrahent,
+                            typ_faktury='koszt',
+                            sposob_platnosci=self.sposob_platnosci,
+                            termin_platnosci=self.termin_platnosci,
+                            status='wystawiona',
+                            waluta=self.waluta,
+                            uwagi=f"Auto-księgowanie z {self.sprzedawca.nazwa}"
+                        )
+                        
+                        # Skopiuj pozycje
+                        for pozycja in self.pozycjafaktury_set.all():
+                            PozycjaFaktury.objects.create(
+                                faktura=kopia_faktury,
+                                nazwa=pozycja.nazwa,
+                                ilosc=pozycja.ilosc,
+                                jednostka=pozycja.jednostka,
+                                cena_netto=pozycja.cena_netto,
+                                vat=pozycja.vat,
+                                rabat=pozycja.rabat,
+                                rabat_typ=pozycja.rabat_typ
+                            )
+                    logger.info(f"Utworzono auto-księgowanie dla faktury {self.numer}")
+
+        except Exception as e:
+            logger.error(f"Błąd auto-księgowania faktury {self.numer}: {str(e)}", exc_info=True)
+            raise
+
     def save(self, *args, **kwargs):
         if self.auto_numer and not self.wlasny_numer and not self.numer:
             today = datetime.date.today()
@@ -534,78 +705,7 @@ class Faktura(models.Model):
             self.numer = self.wlasny_numer
         super().save(*args, **kwargs) # Zachowaj super().save() dla standardowego zachowania zapisu
     
-        if self.nabywca and self.nabywca.firma:
-            try:
-                partnerstwo = Partnerstwo.objects.filter(
-                (Q(firma1=self.sprzedawca, firma2=self.nabywca.firma) | Q(firma1=self.nabywca.firma, firma2=self.sprzedawca)) &
-                Q(aktywne=True) &
-                Q(auto_ksiegowanie=True)
-                ).first()
-
-                if partnerstwo:
-                    firma_odbiorcy = partnerstwo.firma2 if partnerstwo.firma1 == self.sprzedawca else partnerstwo.firma1
-                
-                    try:
-                        nabywca_kontrahent = Kontrahent.objects.get(
-                            user=firma_odbiorcy.user,
-                            nip=self.sprzedawca.nip
-                        )
-                    except Kontrahent.DoesNotExist:
-                        nabywca_kontrahent = Kontrahent.objects.create(
-                            user=firma_odbiorcy.user,
-                            nazwa=self.sprzedawca.nazwa,
-                            nip=self.sprzedawca.nip,
-                            ulica=self.sprzedawca.ulica,
-                            numer_domu=self.sprzedawca.numer_domu,
-                            kod_pocztowy=self.sprzedawca.kod_pocztowy,
-                            miejscowosc=self.sprzedawca.miejscowosc,
-                            czy_firma=True
-                        )  
-                    except Kontrahent.MultipleObjectsReturned:
-                        nabywca_kontrahent = Kontrahent.objects.filter(
-                            user=firma_odbiorcy.user,
-                            nip=self.sprzedawca.nip
-                        ).first()
-                        logger.warning(f"Znaleziono duplikaty kontrahenta NIP: {self.sprzedawca.nip}, używam pierwszego: ID {nabywca_kontrahent.id}")     
-                    
-                    
-                
-                    if not Faktura.objects.filter(user=firma_odbiorcy.user, numer=self.numer).exists():
-                        with transaction.atomic():
-                            kopia_faktury = Faktura.objects.create(
-                                user=firma_odbiorcy.user,
-                                numer=self.numer,
-                                typ_dokumentu=self.typ_dokumentu,
-                                data_wystawienia=self.data_wystawienia,
-                                data_sprzedazy=self.data_sprzedazy,
-                                miejsce_wystawienia=self.miejsce_wystawienia,
-                                sprzedawca=self.nabywca.firma,
-                                nabywca=nabywca_kontrahent,
-                                typ_faktury='koszt',
-                                sposob_platnosci=self.sposob_platnosci,
-                                termin_platnosci=self.termin_platnosci,
-                                status='wystawiona',
-                                waluta=self.waluta,
-                                uwagi=f"Auto-księgowanie z {self.sprzedawca.nazwa}"
-                            )
-                        
-                            # Skopiuj pozycje
-                            for pozycja in self.pozycjafaktury_set.all():
-                                PozycjaFaktury.objects.create(
-                                    faktura=kopia_faktury,
-                                    nazwa=pozycja.nazwa,
-                                    ilosc=pozycja.ilosc,
-                                    jednostka=pozycja.jednostka,
-                                    cena_netto=pozycja.cena_netto,
-                                    vat=pozycja.vat,
-                                    rabat=pozycja.rabat,
-                                    rabat_typ=pozycja.rabat_typ
-                                )
-                        logger.info(f"Utworzono auto-księgowanie dla faktury {self.numer}")
-
-            except Exception as e:
-                logger.error(f"Błąd auto-księgowania faktury {self.numer}: {str(e)}", exc_info=True)
-                raise
+        self.ksieguj_u_partnera()
 
         faktura_cykliczna = models.ForeignKey(
         'FakturaCykliczna',
@@ -632,6 +732,7 @@ class Faktura(models.Model):
     class Meta:
         indexes = [
             models.Index(fields=['user', 'data_wystawienia']),
+            models.Index(fields=['user', 'termin_platnosci']),
             models.Index(fields=['user', 'typ_faktury']),
             models.Index(fields=['numer']),
             models.Index(fields=['status']),
@@ -891,6 +992,9 @@ class ZadanieUzytkownika(models.Model):
 
     class Meta:
         ordering = ['termin_wykonania']
+        indexes = [
+            models.Index(fields=['user', 'termin_wykonania']),
+        ]
 
 def validate_korekta(self):
     if self.typ_dokumentu == 'KOR':
@@ -1230,6 +1334,8 @@ class OCRResult(models.Model):
     )
     error_message = models.TextField(blank=True, null=True, verbose_name="Komunikat błędu")
     auto_created_faktura = models.BooleanField(default=False, verbose_name="Automatycznie utworzona faktura")
+    # Set when the backlog dispatcher claims the result; stale claims are returned to the backlog
+    dispatched_at = models.DateTimeField(null=True, blank=True, verbose_name="Data wysłania do przetwarzania")
     
     # Detailed confidence scores for different fields
     field_confidence = models.JSONField(
@@ -1327,6 +1433,19 @@ class OCRResult(models.Model):
         verbose_name="Koszt przetwarzania"
     )
     
+    # List summary precomputed from extracted_data, so lists never load the JSON
+    summary_invoice_number = models.CharField(
+        max_length=100, blank=True, default='', verbose_name="Numer faktury (podsumowanie)"
+    )
+    summary_seller_name = models.CharField(
+        max_length=255, blank=True, default='', verbose_name="Sprzedawca (podsumowanie)"
+    )
+    summary_total = models.DecimalField(
+        max_digits=15, decimal_places=2, null=True, blank=True, verbose_name="Kwota brutto (podsumowanie)"
+    )
+    
+    SUMMARY_FIELDS = ('summary_invoice_number', 'summary_seller_name', 'summary_total')
+    
     class Meta:
         verbose_name = "Wynik OCR"
         verbose_name_plural = "Wyniki OCR"
@@ -1343,6 +1462,10 @@ class OCRResult(models.Model):
             models.Index(fields=['ocr_engine']),
             models.Index(fields=['cost_per_processing']),
             models.Index(fields=['vendor_independent', 'google_cloud_replaced']),
+            # Keyset pagination of result lists on (created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='ocr_result_created_id_idx'),
+            # Live and stale claims of the backlog dispatcher
+            models.Index(fields=['processing_status', 'dispatched_at'], name='ocr_result_dispatch_idx'),
             # Note: Compound index with related fields is created in migration 0024
         ]
     
@@ -1352,6 +1475,13 @@ class OCRResult(models.Model):
     def save(self, *args, **kwargs):
         """Override save to handle automatic faktura creation"""
         is_new = self.pk is None
+        
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'extracted_data' in update_fields:
+            self.refresh_summary()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | set(self.SUMMARY_FIELDS)
+        
         super().save(*args, **kwargs)
         
         # Trigger automatic processing for new OCR results
@@ -1360,6 +1490,29 @@ class OCRResult(models.Model):
             # The post_save signal will handle the processing
             pass
     
+    def refresh_summary(self):
+        """Copy invoice number, seller and gross total from extracted_data to the summary columns"""
+        data = self.extracted_data if isinstance(self.extracted_data, dict) else {}
+        
+        seller = data.get('sprzedawca')
+        seller_name = (
+            data.get('sprzedawca_nazwa')
+            or (seller.get('nazwa') if isinstance(seller, dict) else seller)
+            or data.get('supplier_name')
+        )
+        
+        total = data.get('suma_brutto', data.get('total_amount'))
+        try:
+            total = Decimal(str(total).replace('\xa0', '').replace(' ', '').replace(',', '.')).quantize(Decimal('0.01'))
+            if not total.is_finite():
+                total = None
+        except (InvalidOperation, ValueError):
+            total = None
+        
+        self.summary_invoice_number = str(data.get('numer_faktury') or data.get('invoice_number') or '')[:100]
+        self.summary_seller_name = str(seller_name or '')[:255]
+        self.summary_total = total if total is not None and abs(total) < Decimal('1e13') else None
+    
     @property
     def needs_human_review(self):
         """Check if result needs human review based on confidence"""
@@ -2676,6 +2829,130 @@ class SystemHealthMetric(models.Model):
         return self.status == 'healthy'
 
 
+class LatencySketchBucket(models.Model):
+    """Per-minute latency quantile sketch for a metric and key (route, OCR engine)"""
+    
+    metric = models.CharField(
+        max_length=50,
+        verbose_name="Metryka"
+    )
+    key = models.CharField(
+        max_length=200,
+        verbose_name="Klucz"
+    )
+    minute = models.DateTimeField(
+        verbose_name="Minuta"
+    )
+    count = models.BigIntegerField(
+        default=0,
+        verbose_name="Liczba pomiarów"
+    )
+    sketch = models.JSONField(
+        default=dict,
+        verbose_name="Szkic kwantyli",
+        help_text="Serializowany LatencySketch"
+    )
+    
+    class Meta:
+        verbose_name = "Szkic opóźnień"
+        verbose_name_plural = "Szkice opóźnień"
+        ordering = ['-minute']
+        constraints = [
+            models.UniqueConstraint(fields=['metric', 'key', 'minute'], name='unique_latency_sketch_minute'),
+        ]
+        indexes = [
+            models.Index(fields=['metric', 'minute']),
+        ]
+    
+    def __str__(self):
+        return f"{self.metric}/{self.key}: {self.count} @ {self.minute.strftime('%Y-%m-%d %H:%M')}"
+
+
+class OCRStatisticsRollup(models.Model):
+    """Daily OCR statistics of a closed day, per user and for all users (user empty)"""
+    
+    day = models.DateField(verbose_name="Dzień")
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='ocr_statistics_rollups',
+        verbose_name="Użytkownik",
+        help_text="Puste dla sumy wszystkich użytkowników"
+    )
+    
+    # Documents uploaded on the day
+    uploads = models.PositiveIntegerField(default=0, verbose_name="Przesłane dokumenty")
+    completed = models.PositiveIntegerField(default=0, verbose_name="Zakończone")
+    failed = models.PositiveIntegerField(default=0, verbose_name="Błędy")
+    processing = models.PositiveIntegerField(default=0, verbose_name="W przetwarzaniu")
+    uploaded = models.PositiveIntegerField(default=0, verbose_name="Oczekujące")
+    
+    # OCR results created on the day
+    results = models.PositiveIntegerField(default=0, verbose_name="Wyniki OCR")
+    with_invoice = models.PositiveIntegerField(default=0, verbose_name="Z fakturą")
+    confidence_sum = models.FloatField(default=0, verbose_name="Suma pewności")
+    min_confidence = models.FloatField(null=True, blank=True, verbose_name="Minimalna pewność")
+    max_confidence = models.FloatField(null=True, blank=True, verbose_name="Maksymalna pewność")
+    processing_time_sum = models.FloatField(default=0, verbose_name="Suma czasu przetwarzania")
+    min_processing_time = models.FloatField(null=True, blank=True, verbose_name="Minimalny czas przetwarzania")
+    max_processing_time = models.FloatField(null=True, blank=True, verbose_name="Maksymalny czas przetwarzania")
+    confidence_bands = models.JSONField(
+        default=dict,
+        verbose_name="Przedziały pewności",
+        help_text="Liczba wyników OCR w każdym przedziale pewności"
+    )
+    
+    created_at = models.DateTimeField(auto_now=True, verbose_name="Data utworzenia")
+    
+    class Meta:
+        verbose_name = "Dzienne statystyki OCR"
+        verbose_name_plural = "Dzienne statystyki OCR"
+        ordering = ['-day']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'user'], name='unique_ocr_statistics_rollup_day_user'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'day']),
+        ]
+    
+    def __str__(self):
+        return f"{self.day}: {self.user or 'wszyscy'} ({self.uploads} dokumentów, {self.results} wyników)"
+
+
+class CompanyMetricsRollup(models.Model):
+    """Monthly invoice statistics of a company for a closed month"""
+
+    month = models.DateField(verbose_name="Miesiąc", help_text="Pierwszy dzień miesiąca")
+    firma = models.ForeignKey(
+        Firma,
+        on_delete=models.CASCADE,
+        related_name='metrics_rollups',
+        verbose_name="Firma"
+    )
+
+    total_invoices = models.PositiveIntegerField(default=0, verbose_name="Wystawione faktury")
+    total_sales = models.PositiveIntegerField(default=0, verbose_name="Faktury sprzedaży")
+    total_costs = models.PositiveIntegerField(default=0, verbose_name="Faktury kosztowe")
+    total_revenue = models.DecimalField(
+        max_digits=15, decimal_places=2, default=0, verbose_name="Przychód z opłaconych faktur"
+    )
+
+    created_at = models.DateTimeField(auto_now=True, verbose_name="Data utworzenia")
+
+    class Meta:
+        verbose_name = "Miesięczne statystyki firmy"
+        verbose_name_plural = "Miesięczne statystyki firm"
+        ordering = ['-month']
+        constraints = [
+            models.UniqueConstraint(fields=['firma', 'month'], name='unique_company_metrics_rollup_firma_month'),
+        ]
+
+    def __str__(self):
+        return f"{self.month:%Y-%m}: {self.firma} ({self.total_invoices} faktur)"
+
+
 # ============================================================================
 # SECURITY AND AUDIT MODELS
 # ============================================================================
@@ -3022,6 +3299,77 @@ class DataRetentionPolicy(models.Model):
         return timezone.now() > expiry_date
 
 
+
+class RetentionCheckpoint(models.Model):
+    """
+    Progress of a retention policy run
+    
+    Rows are deleted in primary key order, each batch committing together
+    with the last deleted key, so an interrupted run resumes after it.
+    """
+    
+    STATUS_CHOICES = [
+        ('running', 'W trakcie'),
+        ('completed', 'Zakończone'),
+        ('failed', 'Błąd'),
+    ]
+    
+    policy = models.CharField(max_length=50, unique=True, verbose_name="Polityka")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='running', verbose_name="Status")
+    last_pk = models.BigIntegerField(
+        default=0, verbose_name="Punkt kontrolny",
+        help_text="Klucz ostatniego usuniętego wiersza"
+    )
+    deleted = models.BigIntegerField(default=0, verbose_name="Usunięto")
+    batches = models.PositiveIntegerField(default=0, verbose_name="Liczba partii")
+    error_message = models.TextField(blank=True, verbose_name="Błąd")
+    
+    started_at = models.DateTimeField(default=timezone.now, verbose_name="Data rozpoczęcia")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Data aktualizacji")
+    completed_at = models.DateTimeField(null=True, blank=True, verbose_name="Data zakończenia")
+    
+    class Meta:
+        verbose_name = "Punkt kontrolny retencji"
+        verbose_name_plural = "Punkty kontrolne retencji"
+        ordering = ['policy']
+    
+    def __str__(self):
+        return f"{self.policy}: {self.get_status_display()}, {self.deleted} usuniętych"
+
+class RegistryLookup(models.Model):
+    """
+    Cached company registry lookup by NIP or REGON
+    
+    Found companies are kept for the lookup TTL, numbers the registry does
+    not know for the shorter negative TTL, so repeated lookups of the same
+    number, by any user, do not reach the registry again.
+    """
+    
+    KIND_CHOICES = [
+        ('nip', 'NIP'),
+        ('regon', 'REGON'),
+    ]
+    
+    kind = models.CharField(max_length=5, choices=KIND_CHOICES, verbose_name="Rodzaj numeru")
+    number = models.CharField(max_length=14, verbose_name="Numer")
+    found = models.BooleanField(default=True, verbose_name="Znaleziono")
+    data = models.JSONField(default=dict, blank=True, verbose_name="Dane firmy")
+    fetched_at = models.DateTimeField(default=timezone.now, verbose_name="Data pobrania")
+    expires_at = models.DateTimeField(verbose_name="Data wygaśnięcia")
+    
+    class Meta:
+        verbose_name = "Wynik wyszukiwania w rejestrze"
+        verbose_name_plural = "Wyniki wyszukiwania w rejestrze"
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'number'], name='registry_lookup_kind_number'),
+        ]
+        indexes = [
+            models.Index(fields=['expires_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.number}: {'znaleziono' if self.found else 'brak'}"
+
 class ComplianceReport(models.Model):
     """
     Store compliance reports for auditing purposes
@@ -3114,4 +3462,90 @@ class ComplianceReport(models.Model):
         ]
     
     def __str__(self):
-        return f"{self.get_report_type_display()}: {self.title} ({self.created_at.strftime('%Y-%m-%d')})"
\ No newline at end of file
+        return f"{self.get_report_type_display()}: {self.title} ({self.created_at.strftime('%Y-%m-%d')})"
+
+
+class SystemBroadcast(models.Model):
+    """
+    System message sent to every active user
+    
+    In fan-out mode a background task copies it into one Wiadomosc per
+    recipient, in batches, recording the last recipient id as checkpoint.
+    In receipts mode it stays a single row that inboxes merge in at read
+    time, with a BroadcastReceipt per user who has read it.
+    """
+    
+    MODE_FAN_OUT = 'fan_out'
+    MODE_RECEIPTS = 'receipts'
+    MODE_CHOICES = [
+        (MODE_FAN_OUT, 'Kopia dla każdego odbiorcy'),
+        (MODE_RECEIPTS, 'Jedna wiadomość z potwierdzeniami odczytu'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Oczekuje'),
+        ('running', 'W trakcie'),
+        ('completed', 'Zakończone'),
+        ('failed', 'Błąd'),
+    ]
+    
+    autor = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='system_broadcasts', verbose_name="Autor"
+    )
+    temat = models.CharField(max_length=255, verbose_name="Temat")
+    tresc = models.TextField(verbose_name="Treść")
+    mode = models.CharField(max_length=10, choices=MODE_CHOICES, default=MODE_FAN_OUT, verbose_name="Tryb")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', verbose_name="Status")
+    
+    # Recipients are active users other than the author with id up to max_recipient_id
+    max_recipient_id = models.PositiveIntegerField(default=0, verbose_name="Ostatni identyfikator odbiorcy")
+    total_recipients = models.PositiveIntegerField(default=0, verbose_name="Liczba odbiorców")
+    delivered = models.PositiveIntegerField(default=0, verbose_name="Dostarczono")
+    last_recipient_id = models.PositiveIntegerField(
+        default=0, verbose_name="Punkt kontrolny",
+        help_text="Identyfikator ostatniego odbiorcy, któremu zapisano wiadomość"
+    )
+    error_message = models.TextField(blank=True, verbose_name="Błąd")
+    
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Data utworzenia")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Data aktualizacji")
+    completed_at = models.DateTimeField(null=True, blank=True, verbose_name="Data zakończenia")
+    
+    class Meta:
+        verbose_name = "Rozgłoszenie systemowe"
+        verbose_name_plural = "Rozgłoszenia systemowe"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'updated_at']),
+            models.Index(fields=['mode', 'status', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.temat} ({self.get_status_display()}, {self.delivered}/{self.total_recipients})"
+    
+    @property
+    def progress(self):
+        """Delivered share of recipients in percent"""
+        if not self.total_recipients:
+            return 100.0 if self.status == 'completed' else 0.0
+        return round(100.0 * self.delivered / self.total_recipients, 1)
+
+
+class BroadcastReceipt(models.Model):
+    """Read receipt of a receipts-mode SystemBroadcast"""
+    
+    broadcast = models.ForeignKey(
+        SystemBroadcast, on_delete=models.CASCADE, related_name='receipts', verbose_name="Rozgłoszenie"
+    )
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='broadcast_receipts', verbose_name="Użytkownik")
+    read_at = models.DateTimeField(auto_now_add=True, verbose_name="Data odczytu")
+    
+    class Meta:
+        verbose_name = "Potwierdzenie odczytu"
+        verbose_name_plural = "Potwierdzenia odczytu"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'broadcast'], name='unique_broadcast_receipt_user'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user} przeczytał {self.broadcast_id}"
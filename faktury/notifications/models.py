@@ -31,6 +31,13 @@ class Notification(models.Model):
     def __str__(self):
         return f"{self.user.username}: {self.title}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Read state as loaded, so the unread counter signals see what changed
+        instance._loaded_is_read = instance.__dict__.get('is_read')
+        return instance
+    
     def mark_as_read(self):
         """Mark notification as read"""
         self.is_read = True
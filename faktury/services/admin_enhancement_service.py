@@ -428,7 +428,7 @@ class AdminEnhancementService:
         
         def bulk_mark_invoices_paid(modeladmin, request, queryset):
             """Bulk action to mark invoices as paid"""
-            updated = queryset.update(status='paid')
+            updated = queryset.update_status('paid')
             messages.success(
                 request, 
                 f'Oznaczono {updated} faktur jako opłacone'
@@ -437,7 +437,7 @@ class AdminEnhancementService:
         
         def bulk_mark_invoices_sent(modeladmin, request, queryset):
             """Bulk action to mark invoices as sent"""
-            updated = queryset.update(status='sent')
+            updated = queryset.update_status('sent')
             messages.success(
                 request, 
                 f'Oznaczono {updated} faktur jako wysłane'
@@ -13,6 +13,8 @@ import json
 from dataclasses import dataclass
 from enum import Enum
 
+from .polish_field_scanner import advanced_polish_scanner
+
 logger = logging.getLogger(__name__)
 
 
@@ -104,65 +106,19 @@ class AdvancedPolishInvoiceProcessor:
             ]
         }
         
-        # Enhanced Polish date patterns with comprehensive format support
-        self.date_patterns = [
-            # Standard formats
-            r'\b(\d{1,2})[.\-/](\d{1,2})[.\-/](\d{4})\b',  # DD.MM.YYYY, DD-MM-YYYY, DD/MM/YYYY
-            r'\b(\d{4})[.\-/](\d{1,2})[.\-/](\d{1,2})\b',  # YYYY.MM.DD, YYYY-MM-DD, YYYY/MM/DD
-            r'\b(\d{1,2})\s+(stycznia|lutego|marca|kwietnia|maja|czerwca|lipca|sierpnia|września|października|listopada|grudnia)\s+(\d{4})\b',  # DD month YYYY
-            # Labeled dates
-            r'(?:Data\s+wystawienia|Data\s+sprzedaży|Termin\s+płatności|Data\s+odbioru)[-:\s]*(\d{1,2}[.\-/]\d{1,2}[.\-/]\d{2,4})',
-            r'(?:Wystawiono|Sprzedano|Płatność|Odbioru)[-:\s]*(\d{1,2}[.\-/]\d{1,2}[.\-/]\d{2,4})',
-            # Short year formats
-            r'\b(\d{1,2})[.\-/](\d{1,2})[.\-/](\d{2})\b',  # DD.MM.YY
-            r'\b(\d{2})[.\-/](\d{1,2})[.\-/](\d{4})\b',    # YY.MM.YYYY
-        ]
+        # Date, VAT rate, currency and invoice number patterns, compiled once by the shared scanner
+        self.scanner = advanced_polish_scanner
+        patterns = self.scanner.pattern_strings()
+        self.date_patterns = patterns['dates']
+        self.vat_rate_patterns = patterns['vat_rates']
+        self.currency_patterns = patterns['currency']
+        self.invoice_patterns = patterns['invoice_numbers']
         
         # Polish month names mapping
         self.polish_months = {
             'stycznia': 1, 'lutego': 2, 'marca': 3, 'kwietnia': 4, 'maja': 5, 'czerwca': 6,
             'lipca': 7, 'sierpnia': 8, 'września': 9, 'października': 10, 'listopada': 11, 'grudnia': 12
         }
-        
-        # Enhanced VAT rate patterns
-        self.vat_rate_patterns = [
-            r'(\d{1,2}[,\.]\d{1,2})\s*%?\s*VAT',
-            r'VAT\s*(\d{1,2}[,\.]\d{1,2})\s*%?',
-            r'(\d{1,2}[,\.]\d{1,2})\s*%?\s*podatku',
-            r'podatek\s*(\d{1,2}[,\.]\d{1,2})\s*%?',
-            r'stawka\s*(\d{1,2}[,\.]\d{1,2})\s*%?',
-            r'(\d{1,2}[,\.]\d{1,2})\s*%?\s*stawka',
-            # Special VAT cases
-            r'(zw|ZW)\s*[-–]\s*zwolniony',
-            r'(np|NP)\s*[-–]\s*nie\s+podlega',
-            r'(oo|OO)\s*[-–]\s*odwrotne\s+obciążenie',
-            r'zwolniony\s+z\s+VAT',
-            r'nie\s+podlega\s+VAT',
-            r'odwrotne\s+obciążenie'
-        ]
-        
-        # Enhanced currency patterns for Polish zloty
-        self.currency_patterns = [
-            r'([\d\s,]+)\s*(?:zł|PLN|złoty|złotych)',
-            r'(?:suma|kwota|netto|brutto|VAT|razem|do\s+zapłaty)[:\s]*([\d\s,]+)\s*(?:zł|PLN)?',
-            r'([\d\s,]+)\s*(?:EUR|€|euro)',
-            r'([\d\s,]+)\s*(?:USD|\$|dolar)',
-            r'([\d\s,]+)\s*(?:GBP|£|funt)',
-            r'([\d\s,]+)\s*(?:CHF|frank)'
-        ]
-        
-        # Enhanced invoice number patterns
-        self.invoice_patterns = [
-            r'(?:faktur[ay]?|invoice)\s*(?:nr|nr\.|numer|number)?[.:\s]*([a-zA-Z0-9\/\-_]+)',
-            r'FV[/\-]?(\d+[/\-]\d+)',
-            r'(\d{2,4}[/\-]\d{2,4}[/\-]\d{2,4})',
-            r'Nr\s*(?:faktury|invoice)[.:\s]*([a-zA-Z0-9\/\-_]+)',
-            r'(?:Numer|Number)\s*(?:faktury|invoice)[.:\s]*([a-zA-Z0-9\/\-_]+)',
-            r'FAK\s*(\d+)',
-            r'INV\s*(\d+)',
-            r'(\d{4}\/\d{2}\/\d+)',
-            r'(\d{2}\/\d{4}\/\d+)'
-        ]
 
     def validate_nip_advanced(self, nip: str) -> Dict[str, Any]:
         """
@@ -350,8 +306,8 @@ class AdvancedPolishInvoiceProcessor:
             confidence = 0.0
             
             # Standard formats
-            for pattern in self.date_patterns:
-                match = re.search(pattern, date_str, re.IGNORECASE)
+            for pattern in self.scanner.patterns('dates'):
+                match = pattern.regex.search(date_str)
                 if match:
                     groups = match.groups()
                     
@@ -593,29 +549,28 @@ class AdvancedPolishInvoiceProcessor:
             }
             
             # Extract NIP numbers with validation
-            nip_matches = re.findall(r'\b\d{3}[\-\s]?\d{3}[\-\s]?\d{2}[\-\s]?\d{2}\b', text)
-            for nip in nip_matches:
-                nip_clean = re.sub(r'[^\d]', '', nip)
-                if len(nip_clean) == 10:
-                    validation = self.validate_nip_advanced(nip_clean)
-                    results['nip_numbers'].append({
-                        'value': nip_clean,
-                        'original': nip,
-                        'validation': validation
-                    })
+            for pattern, nip_matches in self.scanner.findall(text, 'nip'):
+                for nip in nip_matches:
+                    nip_clean = re.sub(r'[^\d]', '', nip)
+                    if len(nip_clean) == 10:
+                        validation = self.validate_nip_advanced(nip_clean)
+                        results['nip_numbers'].append({
+                            'value': nip_clean,
+                            'original': nip,
+                            'validation': validation
+                        })
             
             # Extract REGON numbers with validation
-            regon_matches = re.findall(r'\b\d{9}\b|\b\d{14}\b', text)
-            for regon in regon_matches:
-                validation = self.validate_regon_advanced(regon)
-                results['regon_numbers'].append({
-                    'value': regon,
-                    'validation': validation
-                })
+            for pattern, regon_matches in self.scanner.findall(text, 'regon'):
+                for regon in regon_matches:
+                    validation = self.validate_regon_advanced(regon)
+                    results['regon_numbers'].append({
+                        'value': regon,
+                        'validation': validation
+                    })
             
             # Extract VAT rates with validation
-            for pattern in self.vat_rate_patterns:
-                matches = re.findall(pattern, text, re.IGNORECASE)
+            for pattern, matches in self.scanner.findall(text, 'vat_rates'):
                 for match in matches:
                     validation = self.validate_vat_rate_polish(match)
                     results['vat_rates'].append({
@@ -624,8 +579,7 @@ class AdvancedPolishInvoiceProcessor:
                     })
             
             # Extract dates with comprehensive parsing
-            for pattern in self.date_patterns:
-                matches = re.findall(pattern, text, re.IGNORECASE)
+            for pattern, matches in self.scanner.findall(text, 'dates'):
                 for match in matches:
                     if isinstance(match, tuple):
                         date_str = '.'.join(match)
@@ -638,8 +592,7 @@ class AdvancedPolishInvoiceProcessor:
                     })
             
             # Extract currency amounts
-            for pattern in self.currency_patterns:
-                matches = re.findall(pattern, text, re.IGNORECASE)
+            for pattern, matches in self.scanner.findall(text, 'currency'):
                 for match in matches:
                     results['currency_amounts'].append({
                         'value': match.strip(),
@@ -647,8 +600,7 @@ class AdvancedPolishInvoiceProcessor:
                     })
             
             # Extract invoice numbers
-            for pattern in self.invoice_patterns:
-                matches = re.findall(pattern, text, re.IGNORECASE)
+            for pattern, matches in self.scanner.findall(text, 'invoice_numbers'):
                 for match in matches:
                     results['invoice_numbers'].append({
                         'value': match,
@@ -0,0 +1,172 @@
+"""
+Windowed calendar feed of invoices and personal tasks
+
+Only rows with a date inside the requested [start, end) window are read,
+as ``.values()`` projections; the gross total of invoices is one annotated
+subquery instead of a positions query per invoice. Every user has a data
+version in the cache, bumped after any change to their invoices, invoice
+items or tasks is committed, so feed responses can carry an ETag and
+unchanged windows are answered with 304 Not Modified.
+"""
+
+import datetime
+import time
+from decimal import Decimal
+from typing import Dict, List, Tuple
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
+
+from faktury.models import Faktura, ZadanieUzytkownika
+
+# Window served when the client sends no range, about one month view
+DEFAULT_WINDOW_DAYS = 42
+MAX_WINDOW_DAYS = 400
+
+CALENDAR_VERSION_KEY = 'calendar_version:{user_id}'
+
+INVOICE_FIELDS = ('id', 'numer', 'data_wystawienia', 'termin_platnosci', 'status')
+GROSZ = Decimal('0.01')
+
+
+def parse_window(params, today=None) -> Tuple[datetime.date, datetime.date]:
+    """
+    [start, end) dates from FullCalendar's `start`/`end` parameters
+
+    Accepts dates and ISO datetimes. Without both parameters a window of
+    DEFAULT_WINDOW_DAYS around today is used. Raises ValueError for
+    malformed, reversed or too long ranges.
+    """
+    start, end = params.get('start'), params.get('end')
+    if not start and not end:
+        today = today or timezone.localdate()
+        window = datetime.timedelta(days=DEFAULT_WINDOW_DAYS)
+        return today - window, today + window
+    if not start or not end:
+        raise ValueError('Start and end dates required')
+
+    try:
+        start = datetime.datetime.fromisoformat(start.replace('Z', '+00:00')).date()
+        end = datetime.datetime.fromisoformat(end.replace('Z', '+00:00')).date()
+    except ValueError:
+        raise ValueError('Invalid date format')
+    if end <= start:
+        raise ValueError('End date must be after start date')
+    if (end - start).days > MAX_WINDOW_DAYS:
+        raise ValueError(f'Date range longer than {MAX_WINDOW_DAYS} days')
+    return start, end
+
+
+def in_window(field: str, start: datetime.date, end: datetime.date) -> Q:
+    return Q(**{f'{field}__gte': start, f'{field}__lt': end})
+
+
+def invoice_rows(user, start, end, gross_total=False):
+    """Invoices issued or due inside the window, as dicts"""
+    queryset = Faktura.objects.for_user(user).filter(
+        in_window('data_wystawienia', start, end) | in_window('termin_platnosci', start, end)
+    )
+    fields = INVOICE_FIELDS
+    if gross_total:
+        queryset = queryset.with_gross_total()
+        fields += ('gross_total',)
+    return queryset.order_by('data_wystawienia', 'id').values(*fields)
+
+
+def task_rows(user, start, end):
+    """Personal tasks due inside the window, as dicts"""
+    return ZadanieUzytkownika.objects.filter(
+        in_window('termin_wykonania', start, end), user=user
+    ).order_by('termin_wykonania', 'id').values('id', 'opis', 'termin_wykonania', 'wykonane')
+
+
+def calendar_events(user, start, end) -> List[Dict]:
+    """FullCalendar events: invoice issue dates, payment deadlines and tasks inside the window"""
+    events = []
+    for faktura in invoice_rows(user, start, end):
+        url = reverse('szczegoly_faktury', args=[faktura['id']])
+        if start <= faktura['data_wystawienia'] < end:
+            events.append({
+                'title': f"Faktura {faktura['numer']}",
+                'start': faktura['data_wystawienia'].isoformat(),
+                'url': url,
+                'color': '#3788d8',
+                'type': 'faktura'
+            })
+        termin = faktura['termin_platnosci']
+        if termin and start <= termin < end:
+            events.append({
+                'title': f"Termin płatności - {faktura['numer']}",
+                'start': termin.isoformat(),
+                'url': url,
+                'color': '#f39c12' if faktura['status'] != 'oplacona' else '#27ae60',
+                'type': 'termin_platnosci'
+            })
+
+    for zadanie in task_rows(user, start, end):
+        events.append({
+            'title': zadanie['opis'],
+            'start': zadanie['termin_wykonania'].isoformat(),
+            'color': '#e74c3c' if not zadanie['wykonane'] else '#27ae60',
+            'type': 'zadanie'
+        })
+    return events
+
+
+def calendar_data(user, start, end) -> Dict:
+    """Invoices with gross totals and tasks inside the window"""
+    return {
+        'faktury': [
+            {
+                'id': faktura['id'],
+                'numer': faktura['numer'],
+                'data_wystawienia': faktura['data_wystawienia'].isoformat(),
+                'termin_platnosci': faktura['termin_platnosci'].isoformat() if faktura['termin_platnosci'] else None,
+                'status': faktura['status'],
+                'suma_brutto': str(faktura['gross_total'].quantize(GROSZ)),
+            }
+            for faktura in invoice_rows(user, start, end, gross_total=True)
+        ],
+        'zadania': [
+            {
+                'id': zadanie['id'],
+                'opis': zadanie['opis'],
+                'termin_wykonania': zadanie['termin_wykonania'].isoformat(),
+                'wykonane': zadanie['wykonane'],
+            }
+            for zadanie in task_rows(user, start, end)
+        ],
+        'events': [],
+        'range': {'start': start.isoformat(), 'end': end.isoformat()},
+    }
+
+
+def get_calendar_version(user_id) -> int:
+    """Current calendar data version of a user"""
+    key = CALENDAR_VERSION_KEY.format(user_id=user_id)
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock so ETags issued before an eviction never match again
+        version = time.time_ns()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_calendar_version(user_id):
+    """Invalidate the calendar ETags of a user once the current transaction commits"""
+    def bump():
+        key = CALENDAR_VERSION_KEY.format(user_id=user_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+
+    transaction.on_commit(bump)
+
+
+def calendar_etag(user_id, feed: str, start, end) -> str:
+    return f'"{feed}-{user_id}-{get_calendar_version(user_id)}-{start.isoformat()}-{end.isoformat()}"'
@@ -11,6 +11,7 @@ from django.utils import timezone
 from datetime import datetime, timedelta
 
 from ..models import Firma, Kontrahent, Partnerstwo, Faktura, UserProfile
+from .company_metrics import accessible_company_ids, company_access, company_statistics
 
 logger = logging.getLogger(__name__)
 
@@ -205,23 +206,7 @@ class CompanyManagementService:
         Check if user has access to specific company
         """
         try:
-            # Check if user owns the company
-            if Firma.objects.filter(id=company_id, user=user).exists():
-                return True
-            
-            # Check if user has partnership access to company
-            user_company = Firma.objects.filter(user=user).first()
-            if user_company:
-                partnership_exists = Partnerstwo.objects.filter(
-                    models.Q(firma1=user_company, firma2_id=company_id) |
-                    models.Q(firma1_id=company_id, firma2=user_company),
-                    aktywne=True
-                ).exists()
-                
-                if partnership_exists:
-                    return True
-            
-            return False
+            return int(company_id) in accessible_company_ids(user.pk)
             
         except Exception as e:
             self.logger.error(f"Error checking company access: {str(e)}")
@@ -234,32 +219,27 @@ class CompanyManagementService:
         companies = []
         
         try:
-            # Get user's own company
-            user_company = Firma.objects.filter(user=user).first()
-            if user_company:
-                companies.append({
-                    'id': user_company.id,
-                    'nazwa': user_company.nazwa,
-                    'nip': user_company.nip,
-                    'is_owner': True,
-                    'access_type': 'owner'
-                })
-                
-                # Get companies through partnerships
-                partnerships = Partnerstwo.objects.filter(
-                    models.Q(firma1=user_company) | models.Q(firma2=user_company),
-                    aktywne=True
-                ).select_related('firma1', 'firma2')
-                
-                for partnership in partnerships:
-                    partner_company = partnership.firma2 if partnership.firma1 == user_company else partnership.firma1
+            access = company_access(user.pk)
+            if access['own'] is None:
+                return companies
+            
+            firmy = {
+                firma['id']: firma
+                for firma in Firma.objects.filter(
+                    pk__in=[access['own'], *access['partners']]
+                ).values('id', 'nazwa', 'nip')
+            }
+            # The cached access may outlive a deleted company
+            if access['own'] in firmy:
+                companies.append({**firmy[access['own']], 'is_owner': True, 'access_type': 'owner'})
+            
+            for firma_id, typ_partnerstwa in access['partners'].items():
+                if firma_id in firmy:
                     companies.append({
-                        'id': partner_company.id,
-                        'nazwa': partner_company.nazwa,
-                        'nip': partner_company.nip,
+                        **firmy[firma_id],
                         'is_owner': False,
                         'access_type': 'partnership',
-                        'partnership_type': partnership.typ_partnerstwa
+                        'partnership_type': typ_partnerstwa
                     })
             
         except Exception as e:
@@ -303,37 +283,7 @@ class CompanyManagementService:
         Get statistics for a company
         """
         try:
-            stats = {
-                'total_invoices': Faktura.objects.filter(sprzedawca=company).count(),
-                'total_sales': Faktura.objects.filter(
-                    sprzedawca=company, 
-                    typ_faktury='sprzedaz'
-                ).count(),
-                'total_costs': Faktura.objects.filter(
-                    user=company.user,
-                    typ_faktury='koszt'
-                ).count(),
-                'active_partnerships': Partnerstwo.objects.filter(
-                    models.Q(firma1=company) | models.Q(firma2=company),
-                    aktywne=True
-                ).count(),
-                'total_contractors': Kontrahent.objects.filter(user=company.user).count(),
-            }
-            
-            # Calculate revenue (this would need proper calculation)
-            revenue_invoices = Faktura.objects.filter(
-                sprzedawca=company,
-                typ_faktury='sprzedaz',
-                status='oplacona'
-            )
-            
-            total_revenue = Decimal('0.00')
-            for invoice in revenue_invoices:
-                total_revenue += invoice.suma_brutto
-            
-            stats['total_revenue'] = total_revenue
-            
-            return stats
+            return company_statistics(company)
             
         except Exception as e:
             self.logger.error(f"Error getting company statistics: {str(e)}")
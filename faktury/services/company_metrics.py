@@ -0,0 +1,208 @@
+"""
+Company statistics and company access of users
+
+Statistics are computed with conditional aggregation, one query per model:
+invoice counts are ``Count(filter=Q(...))`` columns of one Faktura
+aggregate and the revenue is one PozycjaFaktury sum of
+``pozycja_brutto_expression``. With ``COMPANY_METRICS_CONFIG['use_rollup']``
+closed months are read from CompanyMetricsRollup rows written nightly by
+``rollup_company_metrics`` and only months without a rollup are aggregated
+from the invoices.
+
+The companies a user may access, their own and those of active
+partnerships, are cached per user and dropped when a Firma or Partnerstwo
+of the user changes, so access checks on every request read no rows.
+"""
+
+import datetime
+import logging
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from faktury.models import (
+    AMOUNT_FIELD, CompanyMetricsRollup, Faktura, Firma, Kontrahent, Partnerstwo, PozycjaFaktury,
+    pozycja_brutto_expression
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG = {
+    'use_rollup': False,
+    'access_timeout': 3600,
+}
+
+ACCESS_KEY = 'company_access:{user_id}'
+INVOICE_METRICS = ('total_invoices', 'total_sales', 'total_costs', 'total_revenue')
+
+ZERO = Decimal('0.00')
+
+
+def get_config() -> Dict:
+    return {**DEFAULT_CONFIG, **getattr(settings, 'COMPANY_METRICS_CONFIG', {})}
+
+
+def month_start(day: datetime.date) -> datetime.date:
+    return day.replace(day=1)
+
+
+def next_month(month: datetime.date) -> datetime.date:
+    return (month + datetime.timedelta(days=32)).replace(day=1)
+
+
+def _month_ranges(months: List[datetime.date]) -> List[tuple]:
+    """[start, end) date ranges covering the months, contiguous months merged"""
+    ranges = []
+    for month in sorted(months):
+        if ranges and ranges[-1][1] == month:
+            ranges[-1][1] = next_month(month)
+        else:
+            ranges.append([month, next_month(month)])
+    return [tuple(r) for r in ranges]
+
+
+def _outside(ranges: List[tuple], field: str = 'data_wystawienia') -> Q:
+    """Condition excluding rows whose date falls into one of the ranges"""
+    if not ranges:
+        return Q()
+    return ~reduce(or_, (Q(**{f'{field}__gte': start, f'{field}__lt': end}) for start, end in ranges))
+
+
+def invoice_metrics(company: Firma, exclude_months: Optional[List[datetime.date]] = None) -> Dict:
+    """
+    Invoice counts and paid sales revenue of a company, one query per model
+
+    Invoices issued in ``exclude_months`` are left out, those months come
+    from rollups.
+    """
+    outside = _outside(_month_ranges(exclude_months or []))
+    own_sales = Q(sprzedawca=company)
+    costs = Q(user_id=company.user_id, typ_faktury='koszt')
+
+    counts = Faktura.objects.filter(own_sales | costs).filter(outside).aggregate(
+        total_invoices=Count('pk', filter=own_sales),
+        total_sales=Count('pk', filter=own_sales & Q(typ_faktury='sprzedaz')),
+        total_costs=Count('pk', filter=costs),
+    )
+    revenue = PozycjaFaktury.objects.filter(
+        faktura__sprzedawca=company, faktura__typ_faktury='sprzedaz', faktura__status='oplacona'
+    ).filter(_outside(_month_ranges(exclude_months or []), 'faktura__data_wystawienia')).aggregate(
+        total=Coalesce(Sum(pozycja_brutto_expression()), Value(ZERO), output_field=AMOUNT_FIELD)
+    )['total']
+    return {**counts, 'total_revenue': revenue.quantize(ZERO)}
+
+
+def company_statistics(company: Firma, use_rollup: Optional[bool] = None) -> Dict:
+    """Statistics of the company dashboard and company list"""
+    if use_rollup is None:
+        use_rollup = get_config()['use_rollup']
+
+    if use_rollup:
+        rollups = list(CompanyMetricsRollup.objects.filter(firma=company).values('month', *INVOICE_METRICS))
+        stats = invoice_metrics(company, [rollup['month'] for rollup in rollups])
+        for rollup in rollups:
+            for name in INVOICE_METRICS:
+                stats[name] += rollup[name]
+    else:
+        stats = invoice_metrics(company)
+
+    stats['active_partnerships'] = Partnerstwo.objects.filter(
+        Q(firma1=company) | Q(firma2=company), aktywne=True
+    ).count()
+    stats['total_contractors'] = Kontrahent.objects.filter(user_id=company.user_id).count()
+    return stats
+
+
+def rollup_company_metrics(month: datetime.date) -> int:
+    """
+    Write the rollup rows of a closed month for all companies, replacing existing ones
+
+    Args:
+        month: Any day of the month to roll up, before the current month
+
+    Returns:
+        int: Rollup rows written, one per company with invoices in the month
+    """
+    month = month_start(month)
+    if month >= month_start(timezone.localdate()):
+        raise ValueError(f"Cannot roll up {month:%Y-%m}, only closed months can be rolled up")
+
+    in_month = Q(data_wystawienia__gte=month, data_wystawienia__lt=next_month(month))
+    rows = {}
+
+    def row(firma_id):
+        return rows.setdefault(firma_id, {name: 0 for name in INVOICE_METRICS})
+
+    for sales in (
+        Faktura.objects.filter(in_month).values('sprzedawca_id').annotate(
+            total_invoices=Count('pk'), total_sales=Count('pk', filter=Q(typ_faktury='sprzedaz'))
+        ).order_by()
+    ):
+        row(sales.pop('sprzedawca_id')).update(sales)
+
+    firma_by_user = dict(Firma.objects.values_list('user_id', 'pk'))
+    for costs in (
+        Faktura.objects.filter(in_month, typ_faktury='koszt').values('user_id')
+        .annotate(total_costs=Count('pk')).order_by()
+    ):
+        if costs['user_id'] in firma_by_user:
+            row(firma_by_user[costs['user_id']])['total_costs'] = costs['total_costs']
+
+    for revenue in (
+        PozycjaFaktury.objects.filter(
+            faktura__data_wystawienia__gte=month, faktura__data_wystawienia__lt=next_month(month),
+            faktura__typ_faktury='sprzedaz', faktura__status='oplacona'
+        ).values('faktura__sprzedawca_id').annotate(total=Sum(pozycja_brutto_expression())).order_by()
+    ):
+        row(revenue['faktura__sprzedawca_id'])['total_revenue'] = revenue['total'].quantize(ZERO)
+
+    with transaction.atomic():
+        CompanyMetricsRollup.objects.filter(month=month).delete()
+        CompanyMetricsRollup.objects.bulk_create([
+            CompanyMetricsRollup(month=month, firma_id=firma_id, **metrics) for firma_id, metrics in rows.items()
+        ])
+
+    logger.info(f"Rolled up company metrics of {month:%Y-%m}: {len(rows)} companies")
+    return len(rows)
+
+
+def company_access(user_id) -> Dict:
+    """
+    Companies a user may access, cached per user
+
+    Returns the id of the user's own company (None without one) and the
+    partnership type of every company in an active partnership with it.
+    """
+    key = ACCESS_KEY.format(user_id=user_id)
+    access = cache.get(key)
+    if access is None:
+        own = Firma.objects.filter(user_id=user_id).values_list('pk', flat=True).first()
+        partners = {}
+        if own is not None:
+            for firma1_id, firma2_id, typ in Partnerstwo.objects.filter(
+                Q(firma1_id=own) | Q(firma2_id=own), aktywne=True
+            ).values_list('firma1_id', 'firma2_id', 'typ_partnerstwa').order_by('pk'):
+                partners.setdefault(firma2_id if firma1_id == own else firma1_id, typ)
+        access = {'own': own, 'partners': partners}
+        cache.set(key, access, get_config()['access_timeout'])
+    return access
+
+
+def accessible_company_ids(user_id) -> frozenset:
+    access = company_access(user_id)
+    return frozenset(access['partners']) | ({access['own']} if access['own'] is not None else set())
+
+
+def invalidate_company_access(*user_ids):
+    """Drop the cached company access of users once the current transaction commits"""
+    keys = [ACCESS_KEY.format(user_id=user_id) for user_id in set(user_ids) if user_id is not None]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
@@ -5,6 +5,7 @@ Provides comprehensive data export/import capabilities with Polish formatting an
 
 import csv
 import json
+import re
 import io
 import zipfile
 import tempfile
@@ -42,6 +43,7 @@ from django.utils import timezone
 from django.contrib.auth.models import User
 
 from faktury.models import Faktura, Kontrahent, Firma, PozycjaFaktury, Produkt
+from faktury.services.registry_lookup import enrich_companies
 
 logger = logging.getLogger(__name__)
 
@@ -334,6 +336,11 @@ class DataExportImportService:
             else:
                 raise ValueError(f"Nieobsługiwany format: {format_type}")
             
+            if data_type == 'companies':
+                # Rows with only a NIP get their name and address from the registry, in one batch
+                self._update_progress(progress_callback_id, 20, "Uzupełnianie danych z rejestru...")
+                enrich_companies(data)
+            
             self._update_progress(progress_callback_id, 30, "Walidacja danych...")
             
             # Validate data
@@ -1076,7 +1083,7 @@ class DataExportImportService:
             
             # Validate postal code
             if row.get('kod_pocztowy'):
-                if not row['kod_pocztowy'].match(r'^\d{2}-\d{3}$'):
+                if not re.match(r'^\d{2}-\d{3}$', row['kod_pocztowy']):
                     warnings.append(f"Wiersz {i}: Nieprawidłowy format kodu pocztowego")
         
         return errors, warnings
@@ -13,9 +13,28 @@ from django.core.cache import cache
 from django.utils import timezone
 from django.db.models import Avg, Count, Q
 from faktury.models import OCRResult, DocumentUpload
+from faktury.services.latency_sketch import latency_recorder
 
 logger = logging.getLogger(__name__)
 
+# Processor versions that are not real OCR runs
+NON_ENGINE_VERSIONS = ['', 'mock']
+
+
+def ocr_engine_group(processor_version: Optional[str]) -> str:
+    """
+    Engine group an OCR result is compared under
+
+    Must agree with ``DeploymentMonitoringService.ENGINE_GROUP_FILTERS``, since
+    OCR latency sketches are recorded under the group name.
+    """
+    version = (processor_version or '').lower()
+    if 'google' in version:
+        return 'google_cloud'
+    if version in NON_ENGINE_VERSIONS:
+        return 'other'
+    return 'opensource'
+
 
 class DeploymentMonitoringService:
     """Service for monitoring OCR deployment metrics"""
@@ -32,6 +51,12 @@ class DeploymentMonitoringService:
         'max_error_rate': 0.05,       # 5%
     }
     
+    # Processor version filters of the engine groups returned by ocr_engine_group
+    ENGINE_GROUP_FILTERS = {
+        'google_cloud': Q(processor_version__icontains='google'),
+        'opensource': ~Q(processor_version__icontains='google') & ~Q(processor_version__in=NON_ENGINE_VERSIONS),
+    }
+    
     # Alert thresholds
     ALERT_THRESHOLDS = {
         'critical_error_rate': 0.10,   # 10%
@@ -158,63 +183,55 @@ class DeploymentMonitoringService:
         end_time = timezone.now()
         start_time = end_time - timedelta(hours=time_window_hours)
         
-        # Query results by engine type
-        google_cloud_results = OCRResult.objects.filter(
-            created_at__gte=start_time,
-            created_at__lte=end_time,
-            processor_version__icontains='google'
-        )
+        # Engine groups compared in a single conditional aggregate query
+        completed = Q(processing_status='completed')
+        
+        aggregates = {}
+        for name, engine_q in self.ENGINE_GROUP_FILTERS.items():
+            aggregates.update({
+                f'{name}_total': Count('id', filter=engine_q),
+                f'{name}_successful': Count('id', filter=engine_q & completed & Q(confidence_score__gte=0.80)),
+                f'{name}_failed': Count('id', filter=engine_q & Q(processing_status__in=['failed', 'error'])),
+                f'{name}_avg_confidence': Avg('confidence_score', filter=engine_q & completed),
+                f'{name}_avg_processing_time': Avg(
+                    'processing_time', filter=engine_q & completed & Q(processing_time__isnull=False)
+                ),
+            })
         
-        opensource_results = OCRResult.objects.filter(
+        totals = OCRResult.objects.filter(
             created_at__gte=start_time,
-            created_at__lte=end_time,
-            processor_version__in=['tesseract', 'easyocr', 'composite']
-        )
+            created_at__lte=end_time
+        ).aggregate(**aggregates)
         
-        def calculate_engine_metrics(queryset, engine_name):
-            """Calculate metrics for a specific engine"""
-            total = queryset.count()
+        def calculate_engine_metrics(name):
+            """Calculate metrics for a specific engine group"""
+            total = totals[f'{name}_total']
             if total == 0:
                 return {
                     'total': 0,
                     'success_rate': 0,
                     'avg_confidence': 0,
                     'avg_processing_time': 0,
+                    'p50_processing_time': 0,
+                    'p95_processing_time': 0,
                     'error_rate': 0
                 }
             
-            successful = queryset.filter(
-                processing_status='completed',
-                confidence_score__gte=0.80
-            ).count()
-            
-            failed = queryset.filter(
-                processing_status__in=['failed', 'error']
-            ).count()
-            
-            avg_confidence = queryset.filter(
-                processing_status='completed'
-            ).aggregate(Avg('confidence_score'))['confidence_score__avg'] or 0
-            
-            processing_times = list(
-                queryset.filter(
-                    processing_status='completed',
-                    processing_time__isnull=False
-                ).values_list('processing_time', flat=True)
-            )
-            
-            avg_processing_time = sum(processing_times) / max(len(processing_times), 1)
+            # Processing time percentiles from the per-minute OCR latency sketches (ms)
+            sketch = latency_recorder.window('ocr_processing', start_time, end_time, keys=[name])
             
             return {
                 'total': total,
-                'success_rate': successful / total,
-                'avg_confidence': avg_confidence,
-                'avg_processing_time': avg_processing_time,
-                'error_rate': failed / total
+                'success_rate': totals[f'{name}_successful'] / total,
+                'avg_confidence': totals[f'{name}_avg_confidence'] or 0,
+                'avg_processing_time': totals[f'{name}_avg_processing_time'] or 0,
+                'p50_processing_time': sketch.quantile(0.50) / 1000,
+                'p95_processing_time': sketch.quantile(0.95) / 1000,
+                'error_rate': totals[f'{name}_failed'] / total
             }
         
-        google_metrics = calculate_engine_metrics(google_cloud_results, 'google_cloud')
-        opensource_metrics = calculate_engine_metrics(opensource_results, 'opensource')
+        google_metrics = calculate_engine_metrics('google_cloud')
+        opensource_metrics = calculate_engine_metrics('opensource')
         
         # Calculate comparison
         comparison = {
@@ -13,7 +13,7 @@ from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
 
 # Import Ensemble OCR Service
-from .ensemble_ocr_service import EnsembleOCRService
+from .ensemble_ocr_service import get_ensemble_ocr_service
 
 logger = logging.getLogger(__name__)
 
@@ -42,11 +42,8 @@ class DocumentAIService:
     def _initialize_ensemble_ocr(self):
         """Initialize Ensemble OCR Service"""
         try:
-            # Get ensemble configuration
-            ensemble_config = getattr(settings, 'ENSEMBLE_OCR_CONFIG', {})
-            
-            # Initialize ensemble OCR service
-            self.ensemble_service = EnsembleOCRService(**ensemble_config)
+            # Process-wide ensemble OCR service configured by ENSEMBLE_OCR_CONFIG
+            self.ensemble_service = get_ensemble_ocr_service()
             
             # Set service type
             self.service_type = 'ensemble_ocr'
@@ -0,0 +1,149 @@
+"""
+Document Pages
+
+Lazy page access for multi-page documents. PDF pages are rasterized one at a
+time when a page is rendered, so a worker pool can render, preprocess and OCR
+pages concurrently without holding every page of a long document in memory.
+
+Page texts are merged in page order with the character span of every page
+recorded, so positions found in the merged text map back to their page.
+"""
+
+import bisect
+import io
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from PIL import Image
+from pdf2image import convert_from_bytes, pdfinfo_from_bytes
+
+logger = logging.getLogger(__name__)
+
+PDF_MIME_TYPE = 'application/pdf'
+PAGE_SEPARATOR = '\n'
+
+
+@dataclass
+class DocumentPage:
+    """Single page of a document, rendered on demand"""
+    number: int  # 1-based page number
+    _render: Callable[[], Image.Image]
+
+    def render(self) -> Image.Image:
+        """Rasterize the page as an RGB image"""
+        return self._render()
+
+
+def count_pages(file_content: bytes, mime_type: str) -> int:
+    """Number of pages (PDF pages or image frames) of a document"""
+    if mime_type == PDF_MIME_TYPE:
+        return int(pdfinfo_from_bytes(file_content)['Pages'])
+
+    with Image.open(io.BytesIO(file_content)) as image:
+        return getattr(image, 'n_frames', 1)
+
+
+def iter_document_pages(file_content: bytes, mime_type: str, dpi: int = 300,
+                        page_count: Optional[int] = None,
+                        max_pages: Optional[int] = None) -> Iterator[DocumentPage]:
+    """
+    Iterate over the pages of a document without rasterizing them
+
+    Args:
+        file_content: Raw document content
+        mime_type: MIME type of the document
+        dpi: Resolution PDF pages are rendered at
+        page_count: Known page count (counted when omitted)
+        max_pages: Only yield the first pages of the document
+
+    Yields:
+        DocumentPage instances in page order
+    """
+    if page_count is None:
+        page_count = count_pages(file_content, mime_type)
+    if max_pages is not None:
+        page_count = min(page_count, max_pages)
+
+    render = _render_pdf_page if mime_type == PDF_MIME_TYPE else _render_frame
+    for number in range(1, page_count + 1):
+        yield DocumentPage(number, lambda number=number: render(file_content, number, dpi))
+
+
+def _render_pdf_page(file_content: bytes, number: int, dpi: int) -> Image.Image:
+    images = convert_from_bytes(
+        file_content,
+        dpi=dpi,
+        fmt='RGB',
+        first_page=number,
+        last_page=number,
+        use_pdftocairo=True
+    )
+    if not images:
+        raise ValueError(f"PDF page {number} could not be rendered")
+    return images[0]
+
+
+def _render_frame(file_content: bytes, number: int, dpi: int) -> Image.Image:
+    image = Image.open(io.BytesIO(file_content))
+    image.seek(number - 1)
+    return image.convert('RGB')
+
+
+def merge_page_texts(texts: Iterable[str]) -> Tuple[str, List[Dict[str, int]]]:
+    """
+    Join page texts in order, recording the span of every page
+
+    Empty pages get an empty span and add no separator, so the merged text
+    has no blank lines introduced by the merge.
+
+    Returns:
+        Tuple of merged text and a list of {'page', 'start', 'end'} spans
+    """
+    parts, page_offsets = [], []
+    position = 0
+
+    for number, text in enumerate(texts, start=1):
+        text = text or ''
+        if text and parts:
+            position += len(PAGE_SEPARATOR)
+        page_offsets.append({'page': number, 'start': position, 'end': position + len(text)})
+        if text:
+            parts.append(text)
+            position += len(text)
+
+    return PAGE_SEPARATOR.join(parts), page_offsets
+
+
+def page_for_offset(page_offsets: List[Dict[str, int]], position: int) -> Optional[int]:
+    """Page number containing a character position of the merged text"""
+    starts = [span['start'] for span in page_offsets]
+    index = bisect.bisect_right(starts, position) - 1
+
+    while index >= 0:
+        span = page_offsets[index]
+        if span['start'] <= position < span['end']:
+            return span['page']
+        if span['end'] > span['start']:
+            return None
+        index -= 1  # skip empty pages sharing the start position
+    return None
+
+
+def field_pages(extracted_fields: Dict[str, Any], page_offsets: List[Dict[str, int]]) -> Dict[str, Any]:
+    """
+    Map extracted fields to the pages their values were found on
+
+    Returns:
+        Field name to page number (or list of page numbers for multi-valued fields)
+    """
+    pages = {}
+    for name, value in extracted_fields.items():
+        if isinstance(value, list):
+            pages[name] = [
+                page_for_offset(page_offsets, item.position[0])
+                for item in value if hasattr(item, 'position')
+            ]
+        elif hasattr(value, 'position'):
+            pages[name] = page_for_offset(page_offsets, value.position[0])
+    return pages
@@ -10,21 +10,29 @@ Enhanced with performance optimization features:
 - Performance profiling and bottleneck identification
 - Optimized image preprocessing with adaptive profiles
 - Parallel processing for multiple document formats
+- Page-level fan-out: multi-page documents are rasterized lazily and every
+  page is preprocessed and OCR'd on a bounded worker pool, with page results
+  merged in order before field extraction
 """
 
 import logging
 import time
 import asyncio
-from concurrent.futures import ThreadPoolExecutor, as_completed, Future
+import hashlib
+import itertools
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED, Future
 from typing import Dict, Any, Optional, List, Tuple, Union
 from dataclasses import dataclass, field
 from enum import Enum
 from decimal import Decimal
+import io
 import json
 import traceback
 
 from .ocr_engine_service import OCREngineService, OCREngineFactory, OCREngineType, DocumentType, OCREngineSelector
 from .image_preprocessor import ImagePreprocessor
+from .document_pages import count_pages, iter_document_pages, merge_page_texts, field_pages, DocumentPage
 from .optimized_image_preprocessor import OptimizedImagePreprocessor
 from .confidence_calculator import ConfidenceCalculator
 from .invoice_field_extractor import InvoiceFieldExtractor
@@ -35,6 +43,9 @@ from .ocr_engine_optimizer import ocr_optimizer, OptimizationStrategy
 
 logger = logging.getLogger(__name__)
 
+# Header and totals fields every invoice must yield
+REQUIRED_FIELDS = ('numer_faktury', 'total_amount')
+
 
 class ProcessingStage(Enum):
     """Stages of document processing pipeline"""
@@ -116,7 +127,10 @@ class DocumentProcessor:
                  fallback_enabled: bool = True,
                  enable_performance_optimization: bool = True,
                  enable_caching: bool = True,
-                 optimization_strategy: OptimizationStrategy = OptimizationStrategy.BALANCED):
+                 optimization_strategy: OptimizationStrategy = OptimizationStrategy.BALANCED,
+                 max_page_workers: Optional[int] = None,
+                 max_pages: Optional[int] = None,
+                 stop_when_fields_found: bool = False):
         """
         Initialize Document Processor with performance optimizations
         
@@ -129,6 +143,10 @@ class DocumentProcessor:
             enable_performance_optimization: Enable performance optimizations
             enable_caching: Enable intelligent caching
             optimization_strategy: OCR optimization strategy
+            max_page_workers: Maximum number of pages processed at a time (default: max_workers)
+            max_pages: Only process the first pages of a document
+            stop_when_fields_found: Cancel remaining pages once the processed pages
+                contain all required header and totals fields
         """
         self.max_workers = max_workers
         self.enable_parallel_processing = enable_parallel_processing
@@ -138,6 +156,9 @@ class DocumentProcessor:
         self.enable_performance_optimization = enable_performance_optimization
         self.enable_caching = enable_caching
         self.optimization_strategy = optimization_strategy
+        self.max_page_workers = max(1, max_page_workers or max_workers)
+        self.max_pages = max_pages
+        self.stop_when_fields_found = stop_when_fields_found
         
         # Initialize processing components with optimization
         if enable_performance_optimization:
@@ -265,18 +286,18 @@ class DocumentProcessor:
                     {"validation_errors": validation_step.metadata}
                 )
             
-            # Stage 2: Image Preprocessing
+            # Stage 2: Page planning (pages are rasterized and preprocessed lazily during OCR)
             preprocessing_step = self._execute_stage(
                 ProcessingStage.PREPROCESSING,
-                self._preprocess_document,
+                self._plan_pages,
                 file_content, mime_type
             )
             processing_steps.append(preprocessing_step)
             
+            page_count = None
             if preprocessing_step.status == ProcessingStatus.FAILED:
                 if self.fallback_enabled:
                     logger.warning("Preprocessing failed, using original document")
-                    preprocessed_images = [file_content]
                     preprocessing_step.status = ProcessingStatus.SKIPPED
                 else:
                     raise DocumentProcessingError(
@@ -284,14 +305,21 @@ class DocumentProcessor:
                         ProcessingStage.PREPROCESSING
                     )
             else:
-                preprocessed_images = preprocessing_step.metadata.get('processed_images', [file_content])
+                page_count = preprocessing_step.metadata.get('pages_planned')
             
-            # Stage 3: OCR Processing (parallel or sequential)
-            ocr_step = self._execute_stage(
-                ProcessingStage.OCR_PROCESSING,
-                self._process_with_ocr_engines,
-                preprocessed_images, mime_type
-            )
+            # Stage 3: Per-page preprocessing and OCR processing
+            if page_count:
+                ocr_step = self._execute_stage(
+                    ProcessingStage.OCR_PROCESSING,
+                    self._process_pages,
+                    file_content, mime_type, page_count
+                )
+            else:
+                ocr_step = self._execute_stage(
+                    ProcessingStage.OCR_PROCESSING,
+                    self._process_with_ocr_engines,
+                    [file_content], mime_type
+                )
             processing_steps.append(ocr_step)
             
             if ocr_step.status == ProcessingStatus.FAILED:
@@ -534,28 +562,199 @@ class DocumentProcessor:
             'validation_passed': True
         }
     
-    def _preprocess_document(self, file_content: bytes, mime_type: str) -> Dict[str, Any]:
-        """Preprocess document for optimal OCR"""
+    def _plan_pages(self, file_content: bytes, mime_type: str) -> Dict[str, Any]:
+        """Count document pages; pages are rasterized and preprocessed lazily during OCR"""
         try:
-            processed_images = self.image_preprocessor.preprocess_document(file_content, mime_type)
-            preprocessing_info = self.image_preprocessor.get_preprocessing_info(file_content, mime_type)
+            page_count = count_pages(file_content, mime_type)
+            if page_count < 1:
+                raise ValueError("Document has no pages")
+            
+            pages_planned = min(page_count, self.max_pages) if self.max_pages else page_count
             
             return {
-                'processed_images': processed_images,
-                'preprocessing_info': preprocessing_info,
-                'images_count': len(processed_images)
+                'page_count': page_count,
+                'pages_planned': pages_planned,
+                'preprocessing_info': {
+                    'page_count': page_count,
+                    'pages_planned': pages_planned,
+                    'page_workers': min(self.max_page_workers, pages_planned),
+                    'preprocessor': type(self.image_preprocessor).__name__
+                }
             }
             
         except Exception as e:
             logger.error(f"Preprocessing failed: {e}")
             raise
     
+    def _process_pages(self, file_content: bytes, mime_type: str, page_count: int) -> Dict[str, Any]:
+        """
+        Preprocess and OCR document pages on a bounded worker pool
+        
+        At most ``max_page_workers`` pages are rendered and processed at a time.
+        Page results are merged in page order as soon as all earlier pages are
+        done; with ``stop_when_fields_found`` the remaining pages are cancelled
+        once the merged pages contain all required header and totals fields.
+        """
+        engines = [engine for engine in self.ocr_engines if engine.is_initialized]
+        if not engines:
+            raise RuntimeError("No initialized OCR engines available")
+        
+        # Engines only run in parallel for single pages; pages are the unit of parallelism otherwise
+        parallel_engines = self.enable_parallel_processing and page_count == 1 and len(engines) > 1
+        page_workers = min(self.max_page_workers, page_count)
+        
+        pages = iter_document_pages(file_content, mime_type, page_count=page_count)
+        # Preprocessed pages are cached by document digest and page number
+        document_digest = hashlib.sha256(file_content).hexdigest()
+        page_results: List[List[Dict[str, Any]]] = []
+        completed: Dict[int, List[Dict[str, Any]]] = {}
+        stopped_early = False
+        
+        executor = ThreadPoolExecutor(max_workers=page_workers)
+        try:
+            in_flight = {
+                executor.submit(self._process_page, page, engines, parallel_engines, document_digest)
+                for page in itertools.islice(pages, page_workers)
+            }
+            
+            while in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    number, engine_results = future.result()
+                    completed[number] = engine_results
+                
+                # Merge pages in order as soon as all earlier pages are done
+                merged_before = len(page_results)
+                while len(page_results) + 1 in completed:
+                    engine_results = completed.pop(len(page_results) + 1)
+                    for engine_name, result in engine_results:
+                        self._update_engine_stats(engine_name, result or {}, result is not None)
+                    page_results.append([result for _, result in engine_results if result])
+                
+                if (self.stop_when_fields_found and len(page_results) > merged_before
+                        and len(page_results) < page_count and self._required_fields_found(page_results)):
+                    stopped_early = True
+                    logger.info(f"Required fields found after {len(page_results)} of {page_count} pages, "
+                               f"cancelling remaining pages")
+                    break
+                
+                for page in itertools.islice(pages, len(done)):
+                    in_flight.add(executor.submit(self._process_page, page, engines, parallel_engines, document_digest))
+        finally:
+            executor.shutdown(wait=not stopped_early, cancel_futures=True)
+        
+        if not any(page_results):
+            raise RuntimeError("No valid OCR results obtained")
+        
+        best_pages = [
+            max(results, key=lambda r: r.get('confidence_score', 0.0)) if results else None
+            for results in page_results
+        ]
+        ocr_results = []
+        for engine in engines:
+            engine_pages = [
+                next((r for r in results if r.get('engine_name') == engine.engine_name), None)
+                for results in page_results
+            ]
+            if any(engine_pages):
+                ocr_results.append(self._merge_page_results(engine_pages))
+        
+        return {
+            'ocr_results': ocr_results,
+            'best_result': self._merge_page_results(best_pages),
+            'engines_used': [r.get('engine_name', 'unknown') for r in ocr_results],
+            'total_engines': len(engines),
+            'page_workers': page_workers,
+            'pages_processed': len(page_results),
+            'pages_skipped': page_count - len(page_results),
+            'stopped_early': stopped_early
+        }
+    
+    def _process_page(self, page: DocumentPage, engines: List[OCREngineService], parallel_engines: bool,
+                      document_digest: Optional[str] = None) -> Tuple[int, List[Tuple[str, Optional[Dict[str, Any]]]]]:
+        """
+        Render, preprocess and OCR a single page, returning (page number, [(engine name, result)])
+        
+        With a ``document_digest`` and a caching preprocessor, a page preprocessed
+        before is read from the preprocessing cache instead of being rendered again.
+        """
+        page_cache = getattr(self.image_preprocessor, 'cache', None) if document_digest else None
+        try:
+            image_content = page_cache.get_page(document_digest, page.number) if page_cache else None
+            if image_content is None:
+                image = page.render()
+                try:
+                    image_content = self.image_preprocessor.preprocess_page(image)
+                    if page_cache:
+                        page_cache.put_page(document_digest, page.number, image_content)
+                except Exception as e:
+                    if not self.fallback_enabled:
+                        raise
+                    logger.warning(f"Preprocessing of page {page.number} failed, using rendered page: {e}")
+                    output = io.BytesIO()
+                    image.save(output, format='PNG')
+                    image_content = output.getvalue()
+        except Exception as e:
+            logger.error(f"Page {page.number} could not be prepared for OCR: {e}")
+            return page.number, []
+        
+        if parallel_engines:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(engines))) as executor:
+                results = list(executor.map(
+                    lambda engine: self._safe_ocr_process(engine, image_content, 'image/png'), engines
+                ))
+        else:
+            results = [self._safe_ocr_process(engine, image_content, 'image/png') for engine in engines]
+        
+        engine_results = []
+        for engine, result in zip(engines, results):
+            if result:
+                result['engine_name'] = engine.engine_name
+                result['page'] = page.number
+            engine_results.append((engine.engine_name, result))
+        return page.number, engine_results
+    
+    def _merge_page_results(self, page_results: List[Optional[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Merge per-page OCR results into one result with page-aware text offsets"""
+        present = [r for r in page_results if r]
+        raw_text, page_offsets = merge_page_texts(r.get('raw_text', '') if r else '' for r in page_results)
+        
+        # Pages contribute to the confidence in proportion to their text length
+        weights = [max(len(r.get('raw_text', '')), 1) for r in present]
+        confidence = sum(
+            r.get('confidence_score', 0.0) * weight for r, weight in zip(present, weights)
+        ) / sum(weights)
+        
+        merged = dict(present[0]) if len(page_results) == 1 else {}
+        merged.update({
+            'raw_text': raw_text,
+            'confidence_score': confidence,
+            'engine_name': Counter(r.get('engine_name') for r in present).most_common(1)[0][0],
+            'page_engines': [r.get('engine_name') if r else None for r in page_results],
+            'page_offsets': page_offsets,
+            'page_count': len(page_results),
+            'processing_time': sum(r.get('processing_time', 0.0) for r in present)
+        })
+        return merged
+    
+    def _required_fields_found(self, page_results: List[List[Dict[str, Any]]]) -> bool:
+        """Check whether the merged pages contain all required header and totals fields"""
+        best_pages = [
+            max(results, key=lambda r: r.get('confidence_score', 0.0)) if results else None
+            for results in page_results
+        ]
+        if not any(best_pages):
+            return False
+        
+        text = self.field_extractor._preprocess_text(self._merge_page_results(best_pages)['raw_text'])
+        fields = self.field_extractor._extract_basic_fields(text)
+        return all(fields.get(name) for name in REQUIRED_FIELDS)
+    
     def _process_with_ocr_engines(self, processed_images: List[bytes], mime_type: str) -> Dict[str, Any]:
-        """Process document with multiple OCR engines"""
+        """Process a document that could not be split into pages with multiple OCR engines"""
         if not processed_images:
             raise ValueError("No processed images available")
         
-        # Use first image for now (multi-page support can be added later)
         image_content = processed_images[0]
         
         # Select appropriate engines based on document type
@@ -656,6 +855,17 @@ class DocumentProcessor:
             
             extraction_result = self.field_extractor.extract_fields(raw_text, confidence_data)
             
+            # Field positions refer to the preprocessed text; map them back through the preprocessed page spans
+            page_offsets = ocr_result.get('page_offsets')
+            if page_offsets:
+                _, preprocessed_offsets = merge_page_texts(
+                    self.field_extractor._preprocess_text(raw_text[span['start']:span['end']])
+                    for span in page_offsets
+                )
+                extraction_result['field_pages'] = field_pages(
+                    extraction_result.get('extracted_fields', {}), preprocessed_offsets
+                )
+            
             return {
                 'extracted_data': extraction_result,
                 'extraction_method': 'pattern_matching',
@@ -699,11 +909,10 @@ class DocumentProcessor:
         }
         
         # Check for required fields
-        required_fields = ['numer_faktury', 'total_amount']
         fields_data = extracted_data.get('extracted_fields', {})
         
         missing_fields = []
-        for field in required_fields:
+        for field in REQUIRED_FIELDS:
             if field not in fields_data or not fields_data[field]:
                 missing_fields.append(field)
         
@@ -729,9 +938,11 @@ class DocumentProcessor:
             'line_items': extracted_data.get('line_items', []),
             'seller_info': extracted_data.get('seller_info'),
             'buyer_info': extracted_data.get('buyer_info'),
+            'field_pages': extracted_data.get('field_pages', {}),
             'confidence_analysis': confidence_result,
             'processing_metadata': {
                 'ocr_engines_used': len(ocr_results),
+                'pages_processed': max((r.get('page_count', 1) for r in ocr_results), default=0),
                 'preprocessing_applied': bool(preprocessing_info),
                 'extraction_method': 'composite_pipeline'
             }
@@ -829,6 +1040,7 @@ class DocumentProcessor:
                 'initialized_engines': len(self.ocr_engines),
                 'parallel_processing_enabled': self.enable_parallel_processing,
                 'max_workers': self.max_workers,
+                'max_page_workers': self.max_page_workers,
                 'confidence_threshold': self.confidence_threshold
             }
         }
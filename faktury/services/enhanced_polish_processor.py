@@ -12,6 +12,8 @@ from datetime import datetime
 from typing import Dict, List, Any, Optional, Tuple
 from decimal import Decimal, InvalidOperation
 
+from .polish_field_scanner import enhanced_polish_scanner
+
 logger = logging.getLogger(__name__)
 
 
@@ -25,11 +27,7 @@ class EnhancedPolishProcessor:
     POLISH_VAT_RATES = [0, 5, 8, 23]
     
     # Polish date format patterns
-    DATE_PATTERNS = [
-        r'\b(\d{1,2})[.\-/](\d{1,2})[.\-/](\d{4})\b',  # DD.MM.YYYY, DD-MM-YYYY, DD/MM/YYYY
-        r'\b(\d{4})[.\-/](\d{1,2})[.\-/](\d{1,2})\b',  # YYYY.MM.DD, YYYY-MM-DD, YYYY/MM/DD
-        r'\b(\d{1,2})\s+(stycznia|lutego|marca|kwietnia|maja|czerwca|lipca|sierpnia|września|października|listopada|grudnia)\s+(\d{4})\b',  # DD month YYYY
-    ]
+    DATE_PATTERNS = enhanced_polish_scanner.pattern_strings()['dates']
     
     # Polish month names mapping
     POLISH_MONTHS = {
@@ -38,14 +36,12 @@ class EnhancedPolishProcessor:
     }
     
     # Currency patterns for Polish zloty
-    CURRENCY_PATTERNS = [
-        r'(\d+(?:[,\.]\d{2})?)\s*(?:zł|PLN|złotych)',  # Amount with currency
-        r'(?:suma|kwota|netto|brutto|VAT)[:\s]*(\d+[,\.]\d{2})',  # Labeled amounts
-    ]
+    CURRENCY_PATTERNS = enhanced_polish_scanner.pattern_strings()['currency']
     
     def __init__(self):
         """Initialize the Enhanced Polish Processor."""
         self.logger = logging.getLogger(__name__)
+        self.scanner = enhanced_polish_scanner
         
     def extract_polish_invoice_fields(self, text: str, ocr_boxes: List[Dict] = None) -> Dict[str, Any]:
         """
@@ -153,15 +149,9 @@ class EnhancedPolishProcessor:
         if not text:
             return []
             
-        nip_patterns = [
-            r'NIP[:\s]*(\d{3}[-\s]?\d{3}[-\s]?\d{2}[-\s]?\d{2})',  # NIP: 123-456-78-90
-            r'NIP[:\s]*(\d{10})',  # NIP: 1234567890
-        ]
-        
         found_nips = []
         
-        for pattern in nip_patterns:
-            matches = re.finditer(pattern, text, re.IGNORECASE | re.MULTILINE)
+        for pattern, matches in self.scanner.matches(text, 'nip'):
             for match in matches:
                 nip_candidate = re.sub(r'[-\s]', '', match.group(1))
                 if self.validate_nip(nip_candidate):
@@ -236,17 +226,9 @@ class EnhancedPolishProcessor:
         Returns:
             List of valid REGON numbers found
         """
-        regon_patterns = [
-            r'REGON[:\s]*(\d{9})',  # 9-digit REGON
-            r'REGON[:\s]*(\d{14})',  # 14-digit REGON
-            r'(?:^|\s)(\d{9})(?:\s|$)',  # Standalone 9 digits (context-dependent)
-            r'(?:^|\s)(\d{14})(?:\s|$)',  # Standalone 14 digits (context-dependent)
-        ]
-        
         found_regons = []
         
-        for pattern in regon_patterns:
-            matches = re.finditer(pattern, text, re.IGNORECASE | re.MULTILINE)
+        for pattern, matches in self.scanner.matches(text, 'regon'):
             for match in matches:
                 regon_candidate = match.group(1)
                 if self.validate_regon(regon_candidate):
@@ -303,15 +285,9 @@ class EnhancedPolishProcessor:
         Returns:
             List of KRS numbers found
         """
-        krs_patterns = [
-            r'KRS[:\s]*(\d{10})',  # KRS: 1234567890
-            r'(?:Sąd|Sadu|Rejestru)[^0-9]*(\d{10})',  # Court register context
-        ]
-        
         found_krs = []
         
-        for pattern in krs_patterns:
-            matches = re.finditer(pattern, text, re.IGNORECASE | re.MULTILINE)
+        for pattern, matches in self.scanner.matches(text, 'krs'):
             for match in matches:
                 krs_candidate = match.group(1)
                 if self.validate_krs(krs_candidate):
@@ -351,8 +327,7 @@ class EnhancedPolishProcessor:
         """
         found_dates = []
         
-        for pattern in self.DATE_PATTERNS:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
+        for pattern, matches in self.scanner.matches(text, 'dates'):
             for match in matches:
                 date_str = self.parse_polish_date(match)
                 if date_str and date_str not in found_dates:
@@ -413,16 +388,9 @@ class EnhancedPolishProcessor:
         Returns:
             List of valid Polish VAT rates found
         """
-        vat_patterns = [
-            r'(\d{1,2})%\s*VAT',  # XX% VAT
-            r'VAT\s*(\d{1,2})%',  # VAT XX%
-            r'(\d{1,2})\s*%',  # XX% (context-dependent)
-        ]
-        
         found_rates = []
         
-        for pattern in vat_patterns:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
+        for pattern, matches in self.scanner.matches(text, 'vat_rates'):
             for match in matches:
                 try:
                     rate = int(match.group(1))
@@ -445,8 +413,7 @@ class EnhancedPolishProcessor:
         """
         found_amounts = []
         
-        for pattern in self.CURRENCY_PATTERNS:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
+        for pattern, matches in self.scanner.matches(text, 'currency'):
             for match in matches:
                 amount_str = match.group(1)
                 standardized_amount = self.standardize_amount(amount_str)
@@ -491,16 +458,9 @@ class EnhancedPolishProcessor:
         Returns:
             Invoice number or None if not found
         """
-        invoice_patterns = [
-            r'(?:Faktura|FV|F)\s*(?:nr\.?|numer|#)\s*([A-Z0-9/\-\.]+)',  # Faktura nr. XXX
-            r'(?:Faktura|FV|F)[:\s]+([A-Z0-9/\-\.]+)',  # Faktura: XXX
-            r'Nr\s*faktury[:\s]+([A-Z0-9/\-\.]+)',  # Nr faktury: XXX
-            r'Nr[:\s]+([A-Z0-9/\-\.]+)',  # Nr: XXX (more specific)
-        ]
-        
-        for pattern in invoice_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
+        for pattern, matches in self.scanner.matches(text, 'invoice_numbers'):
+            if matches:
+                match = matches[0]
                 candidate = match.group(1).strip()
                 # Filter out obvious non-invoice numbers
                 if len(candidate) >= 3 and not candidate.upper() in ['VAT', 'NIP', 'KRS', 'FAKTURY']:
@@ -6,7 +6,7 @@ This example demonstrates how to use the EnhancedPolishProcessor
 for extracting and validating Polish invoice data.
 """
 
-from enhanced_polish_processor import EnhancedPolishProcessor
+from faktury.services.enhanced_polish_processor import EnhancedPolishProcessor
 
 
 def main():
@@ -19,6 +19,7 @@ from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError
 from .paddle_ocr_service import PaddleOCRService
 from .easy_ocr_service import EasyOCRService
 from .local_ocr_service import LocalOCRService
+from .ocr_execution_sandbox import OCRExecutionSandbox, SandboxConfig
 
 logger = logging.getLogger(__name__)
 
@@ -68,7 +69,9 @@ class EnsembleOCRService:
                  engine_config: Dict[str, Any] = None,
                  voting_threshold: float = 0.8,
                  timeout_per_engine: int = 30,
-                 max_workers: int = 3):
+                 max_workers: int = 3,
+                 use_sandbox: bool = True,
+                 sandbox_memory_limit_mb: Optional[float] = 2048.0):
         """
         Initialize Ensemble OCR Service
         
@@ -77,6 +80,9 @@ class EnsembleOCRService:
             voting_threshold: Confidence threshold for voting algorithm
             timeout_per_engine: Timeout per engine in seconds
             max_workers: Maximum number of concurrent workers
+            use_sandbox: Run engines in pre-forked child processes that are
+                killed when they exceed ``timeout_per_engine``
+            sandbox_memory_limit_mb: Memory limit per sandbox child
         """
         self.engine_config = engine_config or {}
         self.voting_threshold = voting_threshold
@@ -95,6 +101,18 @@ class EnsembleOCRService:
         
         # Initialize engines
         self._initialize_engines()
+        
+        # Engines are forked into the sandbox children after initialization
+        self.sandbox = None
+        if use_sandbox:
+            self.sandbox = OCRExecutionSandbox(
+                SandboxConfig(
+                    workers=max_workers,
+                    timeout=timeout_per_engine,
+                    memory_limit_mb=sandbox_memory_limit_mb
+                ),
+                targets=self.engines
+            )
     
     def _initialize_engines(self) -> None:
         """Initialize all available OCR engines"""
@@ -226,8 +244,10 @@ class EnsembleOCRService:
         """
         engine_results = []
         
-        # Process engines in priority order with timeout
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+        # Process engines in priority order with timeout. The executor is shut down
+        # without waiting, so an engine stuck past its timeout does not block the caller.
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
             # Submit tasks for all engines
             future_to_engine = {}
             for engine_name, engine in self.engines.items():
@@ -235,42 +255,57 @@ class EnsembleOCRService:
                 future_to_engine[future] = engine_name
             
             # Collect results with timeout
-            for future in as_completed(future_to_engine, timeout=self.timeout_per_engine * len(self.engines)):
-                engine_name = future_to_engine[future]
-                try:
-                    result = future.result(timeout=self.timeout_per_engine)
-                    if result:
-                        engine_results.append(result)
-                        logger.info(f"Engine {engine_name} completed successfully")
-                except TimeoutError:
-                    logger.warning(f"Engine {engine_name} timed out")
-                    engine_results.append(EngineResult(
-                        engine_name=engine_name,
-                        extracted_data={},
-                        confidence_score=0.0,
-                        processing_time=self.timeout_per_engine,
-                        engine_metadata={},
-                        raw_ocr_results=None,
-                        preprocessing_applied=[],
-                        fallback_used=False,
-                        error_message="Processing timeout"
-                    ))
-                except Exception as e:
-                    logger.error(f"Engine {engine_name} failed: {e}")
-                    engine_results.append(EngineResult(
-                        engine_name=engine_name,
-                        extracted_data={},
-                        confidence_score=0.0,
-                        processing_time=0.0,
-                        engine_metadata={},
-                        raw_ocr_results=None,
-                        preprocessing_applied=[],
-                        fallback_used=False,
-                        error_message=str(e)
-                    ))
+            finished = set()
+            try:
+                for future in as_completed(future_to_engine, timeout=self.timeout_per_engine * len(self.engines)):
+                    finished.add(future)
+                    engine_name = future_to_engine[future]
+                    try:
+                        result = future.result(timeout=self.timeout_per_engine)
+                        if result:
+                            engine_results.append(result)
+                            logger.info(f"Engine {engine_name} completed successfully")
+                    except TimeoutError:
+                        logger.warning(f"Engine {engine_name} timed out")
+                        engine_results.append(self._timeout_result(engine_name))
+                    except Exception as e:
+                        logger.error(f"Engine {engine_name} failed: {e}")
+                        engine_results.append(EngineResult(
+                            engine_name=engine_name,
+                            extracted_data={},
+                            confidence_score=0.0,
+                            processing_time=0.0,
+                            engine_metadata={},
+                            raw_ocr_results=None,
+                            preprocessing_applied=[],
+                            fallback_used=False,
+                            error_message=str(e)
+                        ))
+            except TimeoutError:
+                for future, engine_name in future_to_engine.items():
+                    if future not in finished:
+                        logger.warning(f"Engine {engine_name} timed out")
+                        future.cancel()
+                        engine_results.append(self._timeout_result(engine_name))
+        finally:
+            executor.shutdown(wait=False)
         
         return engine_results
     
+    def _timeout_result(self, engine_name: str) -> EngineResult:
+        """Create result entry for an engine that exceeded its timeout"""
+        return EngineResult(
+            engine_name=engine_name,
+            extracted_data={},
+            confidence_score=0.0,
+            processing_time=self.timeout_per_engine,
+            engine_metadata={},
+            raw_ocr_results=None,
+            preprocessing_applied=[],
+            fallback_used=False,
+            error_message="Processing timeout"
+        )
+    
     def _process_with_engine(self, engine_name: str, engine: Any, file_content: bytes, mime_type: str) -> Optional[EngineResult]:
         """
         Process document with a single engine
@@ -288,7 +323,10 @@ class EnsembleOCRService:
             start_time = time.time()
             
             # Process with engine
-            result = engine.process_invoice(file_content, mime_type)
+            if self.sandbox is not None:
+                result = self.sandbox.call(engine_name, 'process_invoice', file_content, mime_type)
+            else:
+                result = engine.process_invoice(file_content, mime_type)
             
             processing_time = time.time() - start_time
             
@@ -457,6 +495,12 @@ class EnsembleOCRService:
             'accuracy_target': 0.95
         }
     
+    def shutdown(self):
+        """Stop the sandbox children"""
+        if self.sandbox is not None:
+            self.sandbox.shutdown()
+            self.sandbox = None
+    
     def get_engine_status(self) -> Dict[str, Any]:
         """Get status of all engines"""
         status = {}
@@ -479,3 +523,23 @@ class EnsembleOCRService:
                 }
         
         return status
+
+
+_ensemble_service: Optional[EnsembleOCRService] = None
+_ensemble_service_lock = threading.Lock()
+
+
+def get_ensemble_ocr_service() -> EnsembleOCRService:
+    """
+    Get the process-wide ensemble OCR service configured by ENSEMBLE_OCR_CONFIG
+
+    One service per (Celery worker) process keeps the engines and their
+    sandbox children warm between tasks instead of forking new ones per task.
+    """
+    global _ensemble_service
+    if _ensemble_service is None:
+        with _ensemble_service_lock:
+            if _ensemble_service is None:
+                from django.conf import settings
+                _ensemble_service = EnsembleOCRService(**getattr(settings, 'ENSEMBLE_OCR_CONFIG', {}))
+    return _ensemble_service
@@ -1,11 +1,19 @@
 """
 Feature Flag Service for Design System Integration
 Manages feature flags for gradual rollout and A/B testing
+
+Flag checks are evaluated against a process-local, immutable snapshot of all
+flags. The snapshot is reloaded only when the shared version key in the cache
+changes, and that key is read at most once every ``REFRESH_INTERVAL`` seconds.
 """
 
 import json
 import logging
-from typing import Dict, List, Any, Optional
+import threading
+import time
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Dict, List, Any, Mapping, Optional
 from datetime import datetime, timedelta
 from django.core.cache import cache
 from django.conf import settings
@@ -14,11 +22,21 @@ import hashlib
 
 logger = logging.getLogger(__name__)
 
+
+@dataclass(frozen=True)
+class FeatureFlagSnapshot:
+    """Immutable view of all flag configurations at a given version"""
+    version: Optional[int]
+    flags: Mapping[str, Mapping[str, Any]]
+    loaded_at: float = field(default_factory=time.monotonic)
+
 class FeatureFlagService:
     """Service for managing feature flags during rollout"""
     
     CACHE_PREFIX = "feature_flag"
     CACHE_TIMEOUT = 300  # 5 minutes
+    VERSION_CACHE_KEY = f"{CACHE_PREFIX}_version"
+    REFRESH_INTERVAL = 5  # seconds between version checks
     
     # Design System Feature Flags
     DESIGN_SYSTEM_FLAGS = {
@@ -112,56 +130,120 @@ class FeatureFlagService:
         }
     }
     
-    def __init__(self):
+    def __init__(self, cache_backend=None, refresh_interval: Optional[float] = None):
         self.all_flags = {**self.DESIGN_SYSTEM_FLAGS, **self.POLISH_BUSINESS_FLAGS}
+        self.cache = cache_backend or cache
+        self.refresh_interval = (
+            refresh_interval if refresh_interval is not None
+            else getattr(settings, 'FEATURE_FLAG_REFRESH_INTERVAL', self.REFRESH_INTERVAL)
+        )
+        
+        self._snapshot: Optional[FeatureFlagSnapshot] = None
+        self._version_checked_at = 0.0
+        self._lock = threading.Lock()
     
     def get_user_hash(self, user_id: int) -> str:
         """Generate consistent hash for user-based rollout"""
         user_string = f"{user_id}_{settings.SECRET_KEY}"
         return hashlib.md5(user_string.encode()).hexdigest()
     
+    def get_user_bucket(self, user_id: int) -> int:
+        """Get the rollout bucket (0-99) of a user"""
+        # Use first 8 characters of hash to get a number 0-99
+        return int(self.get_user_hash(user_id)[:8], 16) % 100
+    
     def is_user_in_rollout(self, user_id: int, percentage: int) -> bool:
         """Determine if user is included in rollout percentage"""
         if percentage >= 100:
             return True
         if percentage <= 0:
             return False
+        
+        return self.get_user_bucket(user_id) < percentage
+    
+    def _get_version(self) -> Optional[int]:
+        """Read the shared flag version, initializing it if missing"""
+        version = self.cache.get(self.VERSION_CACHE_KEY)
+        if version is None:
+            # Time-based seed, so a flushed cache never repeats an old version
+            self.cache.add(self.VERSION_CACHE_KEY, time.time_ns() // 1000, None)
+            version = self.cache.get(self.VERSION_CACHE_KEY)
+        return version
+    
+    def bump_version(self):
+        """Signal all processes to reload their flag snapshot"""
+        try:
+            self.cache.incr(self.VERSION_CACHE_KEY)
+        except ValueError:
+            self.cache.add(self.VERSION_CACHE_KEY, time.time_ns() // 1000, None)
+        except Exception as e:
+            logger.warning(f"Could not bump feature flag version: {e}")
+        
+        with self._lock:
+            self._snapshot = None
+            self._version_checked_at = 0.0
+    
+    def _load_snapshot(self, version: Optional[int]) -> FeatureFlagSnapshot:
+        """Load all flag configurations with a single database query"""
+        configs = {name: dict(config) for name, config in self.all_flags.items()}
+        
+        # Override with any database settings
+        try:
+            from faktury.models import FeatureFlag
+            for db_flag in FeatureFlag.objects.filter(name__in=list(configs)):
+                configs[db_flag.name].update({
+                    "enabled": db_flag.enabled,
+                    "rollout_percentage": db_flag.rollout_percentage,
+                    "start_date": db_flag.start_date,
+                    "end_date": db_flag.end_date
+                })
+        except Exception as e:
+            logger.warning(f"Could not load flags from database: {e}")
+        
+        return FeatureFlagSnapshot(
+            version=version,
+            flags=MappingProxyType({
+                name: MappingProxyType(config) for name, config in configs.items()
+            })
+        )
+    
+    def get_snapshot(self) -> FeatureFlagSnapshot:
+        """
+        Get the current flag snapshot
+        
+        The shared version key is checked at most once per refresh interval;
+        the snapshot is reloaded only when the version changed. Without a
+        working cache, the snapshot is reloaded after CACHE_TIMEOUT.
+        """
+        now = time.monotonic()
+        snapshot = self._snapshot
+        if snapshot is not None and now - self._version_checked_at < self.refresh_interval:
+            return snapshot
+        
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and now - self._version_checked_at < self.refresh_interval:
+                return snapshot
             
-        user_hash = self.get_user_hash(user_id)
-        # Use first 8 characters of hash to get a number 0-99
-        hash_number = int(user_hash[:8], 16) % 100
-        return hash_number < percentage
+            version = self._get_version()
+            stale = (
+                snapshot is None
+                or version != snapshot.version
+                or (version is None and now - snapshot.loaded_at > self.CACHE_TIMEOUT)
+            )
+            if stale:
+                snapshot = self._load_snapshot(version)
+                self._snapshot = snapshot
+            self._version_checked_at = now
+            return snapshot
     
     def get_flag_config(self, flag_name: str) -> Optional[Dict[str, Any]]:
         """Get configuration for a specific flag"""
-        cache_key = f"{self.CACHE_PREFIX}_config_{flag_name}"
-        config = cache.get(cache_key)
-        
-        if config is None:
-            # Get from database or use default
-            config = self.all_flags.get(flag_name, {})
-            
-            # Override with any database settings
-            try:
-                from faktury.models import FeatureFlag
-                db_flag = FeatureFlag.objects.filter(name=flag_name).first()
-                if db_flag:
-                    config.update({
-                        "enabled": db_flag.enabled,
-                        "rollout_percentage": db_flag.rollout_percentage,
-                        "start_date": db_flag.start_date,
-                        "end_date": db_flag.end_date
-                    })
-            except Exception as e:
-                logger.warning(f"Could not load flag from database: {e}")
-            
-            cache.set(cache_key, config, self.CACHE_TIMEOUT)
-        
-        return config
+        config = self.get_snapshot().flags.get(flag_name)
+        return dict(config) if config is not None else {}
     
-    def is_flag_enabled(self, flag_name: str, user: Optional[User] = None, user_id: Optional[int] = None) -> bool:
-        """Check if a feature flag is enabled for a user"""
-        config = self.get_flag_config(flag_name)
+    def _evaluate(self, config: Mapping[str, Any], bucket: Optional[int], now: datetime) -> bool:
+        """Evaluate a flag configuration for a user rollout bucket"""
         if not config:
             return False
         
@@ -170,7 +252,6 @@ class FeatureFlagService:
             return False
         
         # Check date range if specified
-        now = datetime.now()
         start_date = config.get("start_date")
         end_date = config.get("end_date")
         
@@ -186,14 +267,24 @@ class FeatureFlagService:
         if rollout_percentage <= 0:
             return False
         
-        # Determine user ID
+        # No user context, use global percentage
+        if bucket is None:
+            return False
+        
+        return bucket < rollout_percentage
+    
+    def _resolve_bucket(self, user: Optional[User], user_id: Optional[int]) -> Optional[int]:
         if user:
             user_id = user.id
-        elif user_id is None:
-            # No user context, use global percentage
-            return rollout_percentage >= 100
+        return self.get_user_bucket(user_id) if user_id is not None else None
+    
+    def is_flag_enabled(self, flag_name: str, user: Optional[User] = None, user_id: Optional[int] = None) -> bool:
+        """Check if a feature flag is enabled for a user"""
+        config = self.get_snapshot().flags.get(flag_name)
+        if not config:
+            return False
         
-        return self.is_user_in_rollout(user_id, rollout_percentage)
+        return self._evaluate(config, self._resolve_bucket(user, user_id), datetime.now())
     
     def enable_flag(self, flag_name: str, percentage: int = 100, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None) -> bool:
         """Enable a feature flag"""
@@ -220,9 +311,8 @@ class FeatureFlagService:
                     flag.end_date = end_date
                 flag.save()
             
-            # Clear cache
-            cache_key = f"{self.CACHE_PREFIX}_config_{flag_name}"
-            cache.delete(cache_key)
+            # Reload snapshots in all processes
+            self.bump_version()
             
             logger.info(f"Feature flag {flag_name} enabled for {percentage}% of users")
             return True
@@ -242,9 +332,8 @@ class FeatureFlagService:
                 flag.rollout_percentage = 0
                 flag.save()
             
-            # Clear cache
-            cache_key = f"{self.CACHE_PREFIX}_config_{flag_name}"
-            cache.delete(cache_key)
+            # Reload snapshots in all processes
+            self.bump_version()
             
             logger.info(f"Feature flag {flag_name} disabled")
             return True
@@ -274,10 +363,8 @@ class FeatureFlagService:
                 rollout_percentage=0
             )
             
-            # Clear cache for all flags
-            for flag_name in flags_to_disable:
-                cache_key = f"{self.CACHE_PREFIX}_config_{flag_name}"
-                cache.delete(cache_key)
+            # Reload snapshots in all processes
+            self.bump_version()
             
             logger.info(f"Disabled {len(flags_to_disable)} feature flags" + 
                        (f" in category {category}" if category else ""))
@@ -289,12 +376,15 @@ class FeatureFlagService:
     
     def get_user_flags(self, user: Optional[User] = None, user_id: Optional[int] = None) -> Dict[str, bool]:
         """Get all feature flags status for a user"""
-        flags_status = {}
-        
-        for flag_name in self.all_flags.keys():
-            flags_status[flag_name] = self.is_flag_enabled(flag_name, user, user_id)
+        snapshot = self.get_snapshot()
+        # User hash is the same for every flag, compute it once
+        bucket = self._resolve_bucket(user, user_id)
+        now = datetime.now()
         
-        return flags_status
+        return {
+            flag_name: self._evaluate(snapshot.flags.get(flag_name), bucket, now)
+            for flag_name in self.all_flags.keys()
+        }
     
     def get_flag_statistics(self) -> Dict[str, Any]:
         """Get statistics about feature flag usage"""
@@ -348,9 +438,9 @@ class FeatureFlagService:
         
         # Check cache connectivity
         try:
-            cache.set("test_key", "test_value", 10)
-            cache.get("test_key")
-            cache.delete("test_key")
+            self.cache.set("test_key", "test_value", 10)
+            self.cache.get("test_key")
+            self.cache.delete("test_key")
             validation_results["checks"].append("✓ Cache connectivity")
         except Exception as e:
             validation_results["errors"].append(f"✗ Cache connectivity: {e}")
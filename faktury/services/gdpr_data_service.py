@@ -1,19 +1,32 @@
 """
 GDPR Data Service for FaktuLove
 Handles user data export, import, and deletion according to GDPR requirements
+
+Data exports are streamed into a ZIP archive on disk: every model is read
+with ``QuerySet.iterator()`` and written as JSON Lines or CSV parts, and
+uploaded documents are copied in chunks, so memory use does not depend on
+the size of the account. Progress is checkpointed after every part, which
+lets an interrupted export (e.g. a retried Celery task) resume where it
+stopped instead of starting over.
 """
 
+import base64
+import csv
+import io
 import json
 import logging
-import zipfile
-import tempfile
 import os
+import re
+import tempfile
+import uuid
+import zipfile
 from datetime import datetime
-from typing import Dict, List, Optional, Any, IO
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Any, IO, Tuple
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.core.serializers import serialize
-from django.core.files.base import ContentFile
-from django.http import HttpResponse
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone
 from django.db import transaction
 from django.core.exceptions import ValidationError
@@ -21,415 +34,474 @@ from django.core.exceptions import ValidationError
 
 logger = logging.getLogger(__name__)
 
+EXPORT_FORMATS = ('jsonl', 'csv')
+EXPORT_NAME_RE = re.compile(r'^gdpr_export_[0-9a-f]{32}\.zip$')
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class GDPRExportWriter:
+    """
+    Resumable, streaming writer of GDPR export archives
+
+    Sections are written as numbered part entries of at most ``part_rows``
+    rows. After each part the archive is closed, which writes a valid central
+    directory, and a checkpoint is stored next to it with the per-section
+    progress and the central directory bytes. When a writer is created for an
+    archive that has a checkpoint, the archive is truncated to the last
+    committed entry, its central directory is restored and sections continue
+    after their checkpointed primary keys.
+    """
+
+    def __init__(self, path, part_rows: int = 10000, commit_bytes: int = 64 * 1024 * 1024):
+        """
+        Initialize export writer
+
+        Args:
+            path: Archive path on the local filesystem
+            part_rows: Rows (or document files) per committed part
+            commit_bytes: Copied document bytes after which progress is committed
+        """
+        self.path = Path(path)
+        self.checkpoint_path = self.path.with_name(self.path.name + '.checkpoint')
+        self.part_rows = part_rows
+        self.commit_bytes = commit_bytes
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.resumed = False
+        self.sections = self._restore()
+        self._zip = self._open()
+        self._entry = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # Checkpoints
+
+    def _open(self) -> zipfile.ZipFile:
+        return zipfile.ZipFile(self.path, 'a', zipfile.ZIP_DEFLATED, allowZip64=True)
+
+    def _restore(self) -> Dict[str, Dict[str, Any]]:
+        """Roll the archive back to its last checkpoint, or start a new one"""
+        if self.checkpoint_path.exists() and self.path.exists():
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                checkpoint = json.load(f)
+
+            with open(self.path, 'r+b') as archive:
+                archive.truncate(checkpoint['data_size'])
+                archive.seek(checkpoint['data_size'])
+                archive.write(base64.b64decode(checkpoint['directory']))
+
+            self.resumed = True
+            logger.info(f"Resuming GDPR export {self.path.name} from checkpoint")
+            return checkpoint['sections']
+
+        self.path.unlink(missing_ok=True)
+        self.checkpoint_path.unlink(missing_ok=True)
+        return {}
+
+    def _commit(self):
+        """Close the archive and record the committed state"""
+        self._zip.close()
+
+        with zipfile.ZipFile(self.path) as archive:
+            # Offset of the central directory, i.e. the end of committed entries
+            data_size = archive.start_dir
+        with open(self.path, 'rb') as archive:
+            archive.seek(data_size)
+            directory = archive.read()
+
+        checkpoint = {
+            'sections': self.sections,
+            'data_size': data_size,
+            'directory': base64.b64encode(directory).decode('ascii'),
+        }
+        tmp_path = self.checkpoint_path.with_name(self.checkpoint_path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+        self._zip = self._open()
+
+    def _section(self, section: str) -> Dict[str, Any]:
+        return self.sections.setdefault(
+            section, {'last_pk': None, 'parts': 0, 'rows': 0, 'done': False}
+        )
+
+    # Writing
+
+    def write_json(self, section: str, data: Dict[str, Any]) -> None:
+        """Write a single JSON document as ``<section>.json``"""
+        state = self._section(section)
+        if state['done']:
+            return
+
+        self._zip.writestr(
+            f"{section}.json",
+            json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False, indent=2).encode('utf-8')
+        )
+        state.update(rows=1, done=True)
+        self._commit()
+
+    def write_rows(self, section: str, fetch: Callable[[Optional[int]], Iterable[Dict[str, Any]]],
+                   fieldnames: List[str], format: str = 'jsonl') -> int:
+        """
+        Stream the rows of a section into ``<section>/<section>_NNNN.<format>`` parts
+
+        Args:
+            section: Section name
+            fetch: Callable returning rows ordered by their ``id`` key, starting
+                after the given primary key (None for the first call)
+            fieldnames: CSV columns
+            format: 'jsonl' or 'csv'
+
+        Returns:
+            Number of rows in the section
+        """
+        state = self._section(section)
+        if state['done']:
+            return state['rows']
+
+        write_row = None
+        part_rows = 0
+        for row in fetch(state['last_pk']):
+            if write_row is None:
+                state['parts'] += 1
+                write_row = self._open_part(section, state['parts'], fieldnames, format)
+
+            write_row(row)
+            state['rows'] += 1
+            state['last_pk'] = row['id']
+            part_rows += 1
+
+            if part_rows >= self.part_rows:
+                self._close_entry()
+                self._commit()
+                write_row = None
+                part_rows = 0
+
+        self._close_entry()
+        state['done'] = True
+        self._commit()
+        return state['rows']
+
+    def _open_part(self, section: str, part: int, fieldnames: List[str], format: str) -> Callable:
+        """Open a part entry and return its row writer"""
+        name = f"{section}/{section}_{part:04d}.{format}"
+        self._entry = io.TextIOWrapper(
+            self._zip.open(name, 'w', force_zip64=True), encoding='utf-8', newline=''
+        )
+        stream = self._entry
+
+        if format == 'csv':
+            writer = csv.DictWriter(stream, fieldnames=fieldnames, extrasaction='ignore')
+            writer.writeheader()
+            return lambda row: writer.writerow({key: _csv_value(value) for key, value in row.items()})
+
+        return lambda row: stream.write(
+            json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+        )
+
+    def write_files(self, section: str,
+                    fetch: Callable[[Optional[int]], Iterable[Tuple[int, str, Callable[[], IO[bytes]]]]]) -> int:
+        """
+        Stream copies of files into the archive
+
+        Args:
+            section: Section name
+            fetch: Callable returning ``(pk, entry name, opener)`` tuples ordered
+                by pk, starting after the given primary key
+
+        Returns:
+            Number of copied files
+        """
+        state = self._section(section)
+        if state['done']:
+            return state['rows']
+
+        pending_files = pending_bytes = 0
+        for pk, name, opener in fetch(state['last_pk']):
+            try:
+                source = opener()
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping missing file {name} in GDPR export: {e}")
+                state['last_pk'] = pk
+                continue
+
+            with source:
+                self._entry = self._zip.open(f"{section}/{name}", 'w', force_zip64=True)
+                while True:
+                    chunk = source.read(COPY_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    self._entry.write(chunk)
+                    pending_bytes += len(chunk)
+                self._close_entry()
+
+            state['rows'] += 1
+            state['last_pk'] = pk
+            pending_files += 1
+
+            if pending_files >= self.part_rows or pending_bytes >= self.commit_bytes:
+                self._commit()
+                pending_files = pending_bytes = 0
+
+        state['done'] = True
+        self._commit()
+        return state['rows']
+
+    def _close_entry(self):
+        if self._entry is not None:
+            self._entry.close()
+            self._entry = None
+
+    def counts(self) -> Dict[str, int]:
+        """Rows written per section"""
+        return {section: state['rows'] for section, state in self.sections.items()}
+
+    def finish(self, readme: str) -> Dict[str, int]:
+        """
+        Add the README, close the archive and drop the checkpoint
+
+        Returns:
+            Rows written per section
+        """
+        self._zip.writestr('README.txt', readme.encode('utf-8'))
+        self._zip.close()
+        self._zip = None
+        self.checkpoint_path.unlink(missing_ok=True)
+        return self.counts()
+
+    def close(self):
+        """
+        Close the archive without committing
+
+        Entries written after the last checkpoint are discarded when the
+        export is resumed.
+        """
+        if self._zip is None:
+            return
+        self._close_entry()
+        self._zip.close()
+        self._zip = None
+
+
+def _csv_value(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, cls=DjangoJSONEncoder, ensure_ascii=False)
+    return value
+
+
+def new_export_name() -> str:
+    """Generate a name for a new export archive"""
+    return f"gdpr_export_{uuid.uuid4().hex}.zip"
+
+
+def export_path(user_id: int, name: str) -> Path:
+    """Path of a user's export archive; rejects names not created by the service"""
+    if not EXPORT_NAME_RE.match(name):
+        raise ValueError(f"Invalid GDPR export name: {name}")
+    root = getattr(settings, 'GDPR_EXPORT_ROOT', os.path.join(settings.BASE_DIR, 'gdpr_exports'))
+    return Path(root) / str(user_id) / name
+
 
 class GDPRDataService:
     """
     Service for handling GDPR data requests
     """
     
+    EXPORT_CHUNK_SIZE = 2000
+    
     def __init__(self):
         self.export_logger = logging.getLogger('gdpr_export')
     
-    def export_user_data(self, user: User, format: str = 'json') -> Dict[str, Any]:
+    def export_user_data(self, user: User, format: str = 'jsonl', path=None,
+                         chunk_size: Optional[int] = None, part_rows: int = 10000) -> Dict[str, Any]:
         """
         Export all user data in compliance with GDPR Article 20 (Right to data portability)
         
+        The data is streamed into a ZIP archive on disk. If an interrupted
+        export left a checkpoint for ``path``, the export resumes from it.
+        
         Args:
             user: User whose data to export
-            format: Export format ('json', 'csv', 'xml')
+            format: Format of tabular sections ('jsonl' or 'csv')
+            path: Archive path (default: new archive in the user's export directory)
+            chunk_size: Rows fetched from the database per query
+            part_rows: Rows per archive part, i.e. checkpoint interval
             
         Returns:
             Dictionary containing export information
         """
+        if format not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {format}")
+        
+        path = Path(path) if path else export_path(user.id, new_export_name())
+        chunk_size = chunk_size or self.EXPORT_CHUNK_SIZE
+        
         try:
-            export_data = {
-                'export_info': {
+            with GDPRExportWriter(path, part_rows=part_rows) as writer:
+                export_info = {
                     'user_id': user.id,
                     'username': user.username,
                     'export_date': timezone.now().isoformat(),
                     'format': format,
-                    'gdpr_article': 'Article 20 - Right to data portability'
-                },
-                'personal_data': self._export_personal_data(user),
-                'business_data': self._export_business_data(user),
-                'document_data': self._export_document_data(user),
-                'system_data': self._export_system_data(user),
-                'audit_data': self._export_audit_data(user)
-            }
+                    'gdpr_article': 'Article 20 - Right to data portability',
+                    'resumed': writer.resumed,
+                }
+                
+                writer.write_json('personal_data', self._export_personal_data(user))
+                
+                for section, queryset, fields in self._export_sections(user):
+                    writer.write_rows(
+                        section, self._row_fetcher(queryset, fields, chunk_size), fields, format
+                    )
+                
+                writer.write_files('documents', self._document_fetcher(user, chunk_size))
+                
+                export_info['rows'] = writer.counts()
+                export_info['path'] = str(path)
+                writer.finish(self._create_export_readme(user, export_info))
             
             # Log the export
-            self._log_data_export(user, export_data)
+            self._log_data_export(user, export_info)
             
-            return export_data
+            return export_info
             
         except Exception as e:
             logger.error(f"Error exporting user data for user {user.id}: {e}")
             raise
     
+    def start_export(self, user: User, format: str = 'jsonl') -> str:
+        """
+        Schedule a background data export
+        
+        Returns:
+            Archive name, resolved with ``export_path``
+        """
+        from faktury.tasks import export_user_data_task
+        
+        if format not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {format}")
+        
+        name = new_export_name()
+        export_user_data_task.delay(user.id, name, format)
+        return name
+    
     def _export_personal_data(self, user: User) -> Dict[str, Any]:
-        """Export personal data"""
-        personal_data = {
+        """Export personal account, profile and company data"""
+        from faktury.models import Firma, UserProfile
+        
+        return {
             'user_account': {
                 'id': user.id,
                 'username': user.username,
                 'email': user.email,
                 'first_name': user.first_name,
                 'last_name': user.last_name,
-                'date_joined': user.date_joined.isoformat(),
-                'last_login': user.last_login.isoformat() if user.last_login else None,
+                'date_joined': user.date_joined,
+                'last_login': user.last_login,
                 'is_active': user.is_active,
                 'is_staff': user.is_staff,
                 'is_superuser': user.is_superuser
-            }
+            },
+            'profile': UserProfile.objects.filter(user=user).values('imie', 'nazwisko', 'telefon', 'avatar').first(),
+            'company': Firma.objects.filter(user=user).values().first(),
         }
-        
-        # User profile data
-        if hasattr(user, 'userprofile'):
-            profile = user.userprofile
-            personal_data['profile'] = {
-                'imie': profile.imie,
-                'nazwisko': profile.nazwisko,
-                'telefon': profile.telefon,
-                'avatar': profile.avatar.url if profile.avatar else None
-            }
-        
-        return personal_data
-    
-    def _export_business_data(self, user: User) -> Dict[str, Any]:
-        """Export business-related data"""
-        business_data = {}
-        
-        # Company data
-        if hasattr(user, 'firma'):
-            company = user.firma
-            business_data['company'] = {
-                'id': company.id,
-                'nazwa': company.nazwa,
-                'nip': company.nip,
-                'regon': company.regon,
-                'ulica': company.ulica,
-                'numer_domu': company.numer_domu,
-                'numer_mieszkania': company.numer_mieszkania,
-                'kod_pocztowy': company.kod_pocztowy,
-                'miejscowosc': company.miejscowosc,
-                'kraj': company.kraj,
-                'logo': company.logo.url if company.logo else None
-            }
-        
-        # Contractors
-        from faktury.models import Kontrahent
-        contractors = Kontrahent.objects.filter(user=user)
-        business_data['contractors'] = []
-        
-        for contractor in contractors:
-            business_data['contractors'].append({
-                'id': contractor.id,
-                'nazwa': contractor.nazwa,
-                'nip': contractor.nip,
-                'regon': contractor.regon,
-                'adres': contractor.adres,
-                'kod_pocztowy': contractor.kod_pocztowy,
-                'miejscowosc': contractor.miejscowosc,
-                'kraj': contractor.kraj,
-                'telefon': contractor.telefon,
-                'email': contractor.email,
-                'is_own_company': contractor.is_own_company
-            })
-        
-        # Products
-        from faktury.models import Produkt
-        products = Produkt.objects.filter(user=user)
-        business_data['products'] = []
-        
-        for product in products:
-            business_data['products'].append({
-                'id': product.id,
-                'nazwa': product.nazwa,
-                'opis': product.opis,
-                'cena_netto': str(product.cena_netto),
-                'stawka_vat': str(product.stawka_vat),
-                'jednostka': product.jednostka,
-                'kod_produktu': product.kod_produktu,
-                'kategoria': product.kategoria
-            })
-        
-        return business_data
-    
-    def _export_document_data(self, user: User) -> Dict[str, Any]:
-        """Export document-related data"""
-        document_data = {}
-        
-        # Invoices
-        from faktury.models import Faktura, PozycjaFaktury
-        invoices = Faktura.objects.filter(user=user)
-        document_data['invoices'] = []
-        
-        for invoice in invoices:
-            invoice_data = {
-                'id': invoice.id,
-                'numer': invoice.numer,
-                'typ_dokumentu': invoice.typ_dokumentu,
-                'data_wystawienia': invoice.data_wystawienia.isoformat() if invoice.data_wystawienia else None,
-                'data_sprzedazy': invoice.data_sprzedazy.isoformat() if invoice.data_sprzedazy else None,
-                'termin_platnosci': invoice.termin_platnosci.isoformat() if invoice.termin_platnosci else None,
-                'sposob_platnosci': invoice.sposob_platnosci,
-                'status': invoice.status,
-                'kwota_netto': str(invoice.kwota_netto),
-                'kwota_vat': str(invoice.kwota_vat),
-                'kwota_brutto': str(invoice.kwota_brutto),
-                'uwagi': invoice.uwagi,
-                'kontrahent_id': invoice.kontrahent.id if invoice.kontrahent else None,
-                'positions': []
-            }
-            
-            # Invoice positions
-            positions = PozycjaFaktury.objects.filter(faktura=invoice)
-            for position in positions:
-                invoice_data['positions'].append({
-                    'id': position.id,
-                    'nazwa': position.nazwa,
-                    'ilosc': str(position.ilosc),
-                    'jednostka': position.jednostka,
-                    'cena_netto': str(position.cena_netto),
-                    'stawka_vat': str(position.stawka_vat),
-                    'wartosc_netto': str(position.wartosc_netto),
-                    'wartosc_vat': str(position.wartosc_vat),
-                    'wartosc_brutto': str(position.wartosc_brutto)
-                })
-            
-            document_data['invoices'].append(invoice_data)
-        
-        # Recurring invoices
-        from faktury.models import FakturaCykliczna
-        recurring_invoices = FakturaCykliczna.objects.filter(user=user)
-        document_data['recurring_invoices'] = []
-        
-        for recurring in recurring_invoices:
-            document_data['recurring_invoices'].append({
-                'id': recurring.id,
-                'nazwa': recurring.nazwa,
-                'cykl': recurring.cykl,
-                'data_rozpoczecia': recurring.data_rozpoczecia.isoformat() if recurring.data_rozpoczecia else None,
-                'data_zakonczenia': recurring.data_zakonczenia.isoformat() if recurring.data_zakonczenia else None,
-                'aktywna': recurring.aktywna,
-                'szablon_faktury_id': recurring.szablon_faktury.id if recurring.szablon_faktury else None
-            })
-        
-        return document_data
     
-    def _export_system_data(self, user: User) -> Dict[str, Any]:
-        """Export system-related data"""
-        system_data = {}
-        
-        # Teams and partnerships
-        from faktury.models import Zespol, CzlonekZespolu, Partnerstwo
-        
-        # Teams where user is a member
-        team_memberships = CzlonekZespolu.objects.filter(user=user)
-        system_data['team_memberships'] = []
-        
-        for membership in team_memberships:
-            system_data['team_memberships'].append({
-                'team_id': membership.zespol.id,
-                'team_name': membership.zespol.nazwa,
-                'role': membership.rola,
-                'joined_date': membership.data_dolaczenia.isoformat() if membership.data_dolaczenia else None
-            })
-        
-        # Partnerships
-        partnerships = Partnerstwo.objects.filter(
-            models.Q(firma1__user=user) | models.Q(firma2__user=user)
-        )
-        system_data['partnerships'] = []
-        
-        for partnership in partnerships:
-            system_data['partnerships'].append({
-                'id': partnership.id,
-                'typ_partnerstwa': partnership.typ_partnerstwa,
-                'data_rozpoczecia': partnership.data_rozpoczecia.isoformat() if partnership.data_rozpoczecia else None,
-                'data_zakonczenia': partnership.data_zakonczenia.isoformat() if partnership.data_zakonczenia else None,
-                'aktywne': partnership.aktywne,
-                'firma1_id': partnership.firma1.id,
-                'firma2_id': partnership.firma2.id
-            })
-        
-        # Messages
-        from faktury.models import Wiadomosc
-        messages = Wiadomosc.objects.filter(
-            models.Q(nadawca=user) | models.Q(odbiorca=user)
+    def _export_sections(self, user: User) -> List[Tuple[str, Any, List[str]]]:
+        """Tabular export sections as (name, queryset, fields)"""
+        from faktury.models import (
+            CzlonekZespolu, DocumentUpload, Faktura, FakturaCykliczna, Kontrahent,
+            OCRResult, Partnerstwo, PozycjaFaktury, Produkt, SecurityAuditLog, Wiadomosc
         )
-        system_data['messages'] = []
-        
-        for message in messages:
-            system_data['messages'].append({
-                'id': message.id,
-                'tytul': message.tytul,
-                'tresc': message.tresc,
-                'data_wyslania': message.data_wyslania.isoformat(),
-                'przeczytana': message.przeczytana,
-                'typ_wiadomosci': message.typ_wiadomosci,
-                'nadawca_id': message.nadawca.id if message.nadawca else None,
-                'odbiorca_id': message.odbiorca.id if message.odbiorca else None
-            })
         
-        return system_data
+        def fields(model, exclude=()):
+            return [field.attname for field in model._meta.concrete_fields if field.attname not in exclude]
+        
+        return [
+            ('contractors', Kontrahent.objects.filter(user=user), fields(Kontrahent)),
+            ('products', Produkt.objects.filter(user=user), fields(Produkt)),
+            ('invoices', Faktura.objects.filter(user=user), fields(Faktura)),
+            ('invoice_items', PozycjaFaktury.objects.filter(faktura__user=user), fields(PozycjaFaktury)),
+            ('recurring_invoices', FakturaCykliczna.objects.filter(oryginalna_faktura__user=user),
+             fields(FakturaCykliczna)),
+            ('team_memberships', CzlonekZespolu.objects.filter(user=user), fields(CzlonekZespolu)),
+            ('partnerships', Partnerstwo.objects.filter(
+                models.Q(firma1__user=user) | models.Q(firma2__user=user)
+            ), fields(Partnerstwo)),
+            ('messages', Wiadomosc.objects.filter(
+                models.Q(autor=user) | models.Q(nadawca_user=user) | models.Q(odbiorca_user=user)
+            ), fields(Wiadomosc)),
+            ('security_logs', SecurityAuditLog.objects.filter(user=user),
+             fields(SecurityAuditLog, exclude=('encrypted_details', 'session_key'))),
+            ('document_uploads', DocumentUpload.objects.filter(user=user), fields(DocumentUpload)),
+            ('ocr_results', OCRResult.objects.filter(document__user=user), fields(OCRResult)),
+        ]
     
-    def _export_audit_data(self, user: User) -> Dict[str, Any]:
-        """Export audit and security data"""
-        audit_data = {}
-        
-        # Security audit logs
-        from faktury.models import SecurityAuditLog
-        audit_logs = SecurityAuditLog.objects.filter(user=user).order_by('-timestamp')[:100]  # Last 100 entries
-        audit_data['security_logs'] = []
-        
-        for log in audit_logs:
-            audit_data['security_logs'].append({
-                'id': log.id,
-                'action': log.action,
-                'resource_type': log.resource_type,
-                'resource_id': log.resource_id,
-                'timestamp': log.timestamp.isoformat(),
-                'ip_address': log.ip_address,
-                'success': log.success,
-                'risk_level': log.risk_level
-            })
-        
-        # OCR processing data
-        from faktury.models import DocumentUpload, OCRResult
-        
-        # Document uploads
-        uploads = DocumentUpload.objects.filter(user=user)
-        audit_data['document_uploads'] = []
-        
-        for upload in uploads:
-            audit_data['document_uploads'].append({
-                'id': upload.id,
-                'original_filename': upload.original_filename,
-                'file_size': upload.file_size,
-                'mime_type': upload.mime_type,
-                'upload_timestamp': upload.upload_timestamp.isoformat(),
-                'processing_status': upload.processing_status
-            })
-        
-        # OCR results
-        ocr_results = OCRResult.objects.filter(document__user=user)
-        audit_data['ocr_results'] = []
-        
-        for result in ocr_results:
-            audit_data['ocr_results'].append({
-                'id': result.id,
-                'confidence_score': float(result.confidence_score),
-                'processing_time': float(result.processing_time),
-                'engine_used': result.engine_used,
-                'created_at': result.created_at.isoformat(),
-                'document_id': result.document.id
-            })
-        
-        return audit_data
+    @staticmethod
+    def _row_fetcher(queryset, fields: List[str], chunk_size: int) -> Callable:
+        """Build a fetch callable streaming rows after a primary key"""
+        def fetch(last_pk):
+            rows = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+            return rows.order_by('pk').values(*fields).iterator(chunk_size=chunk_size)
+        return fetch
     
-    def create_data_export_file(self, user: User, format: str = 'json') -> tuple:
+    @staticmethod
+    def _document_fetcher(user: User, chunk_size: int) -> Callable:
+        """Build a fetch callable streaming uploaded document files after a primary key"""
+        from faktury.models import DocumentUpload
+        
+        def opener(file_path):
+            if os.path.isabs(file_path):
+                return lambda: open(file_path, 'rb')
+            return lambda: default_storage.open(file_path, 'rb')
+        
+        def fetch(last_pk):
+            documents = DocumentUpload.objects.filter(user=user).exclude(file_path='')
+            if last_pk is not None:
+                documents = documents.filter(pk__gt=last_pk)
+            rows = documents.order_by('pk').values_list('id', 'original_filename', 'file_path')
+            for pk, original_filename, file_path in rows.iterator(chunk_size=chunk_size):
+                name = f"{pk}_{os.path.basename(original_filename) or 'document'}"
+                yield pk, name, opener(file_path)
+        return fetch
+    
+    def create_data_export_file(self, user: User, format: str = 'jsonl') -> tuple:
         """
-        Create a downloadable file with user's data
+        Create a downloadable archive with user's data
         
         Args:
             user: User whose data to export
-            format: Export format
+            format: Format of tabular sections ('jsonl' or 'csv')
             
         Returns:
-            Tuple of (file_content, filename, content_type)
+            Tuple of (file object, filename, content_type); the caller closes the file
         """
         try:
-            export_data = self.export_user_data(user, format)
-            
-            if format == 'json':
-                content = json.dumps(export_data, indent=2, ensure_ascii=False)
-                filename = f'gdpr_export_{user.username}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
-                content_type = 'application/json'
-            
-            elif format == 'zip':
-                # Create ZIP file with multiple formats
-                temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.zip')
-                
-                with zipfile.ZipFile(temp_file.name, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                    # Add JSON export
-                    json_content = json.dumps(export_data, indent=2, ensure_ascii=False)
-                    zip_file.writestr('data_export.json', json_content.encode('utf-8'))
-                    
-                    # Add CSV exports for tabular data
-                    self._add_csv_to_zip(zip_file, export_data)
-                    
-                    # Add README
-                    readme_content = self._create_export_readme(user, export_data)
-                    zip_file.writestr('README.txt', readme_content.encode('utf-8'))
-                
-                with open(temp_file.name, 'rb') as f:
-                    content = f.read()
-                
-                os.unlink(temp_file.name)  # Clean up temp file
-                
-                filename = f'gdpr_export_{user.username}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.zip'
-                content_type = 'application/zip'
+            tmp_dir = tempfile.mkdtemp()
+            path = Path(tmp_dir) / new_export_name()
+            self.export_user_data(user, format, path=path)
             
-            else:
-                raise ValueError(f"Unsupported export format: {format}")
+            content = open(path, 'rb')
+            os.unlink(path)  # Clean up temp file once the handle is open
+            os.rmdir(tmp_dir)
             
-            return content, filename, content_type
+            filename = f'gdpr_export_{user.username}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.zip'
+            return content, filename, 'application/zip'
             
         except Exception as e:
             logger.error(f"Error creating export file for user {user.id}: {e}")
             raise
     
-    def _add_csv_to_zip(self, zip_file: zipfile.ZipFile, export_data: Dict) -> None:
-        """Add CSV files to ZIP export"""
-        import csv
-        import io
-        
-        # Export invoices as CSV
-        if export_data.get('document_data', {}).get('invoices'):
-            csv_buffer = io.StringIO()
-            writer = csv.writer(csv_buffer)
-            
-            # Header
-            writer.writerow([
-                'ID', 'Numer', 'Typ', 'Data wystawienia', 'Data sprzedaży',
-                'Termin płatności', 'Status', 'Kwota netto', 'Kwota VAT', 'Kwota brutto'
-            ])
-            
-            # Data
-            for invoice in export_data['document_data']['invoices']:
-                writer.writerow([
-                    invoice['id'], invoice['numer'], invoice['typ_dokumentu'],
-                    invoice['data_wystawienia'], invoice['data_sprzedazy'],
-                    invoice['termin_platnosci'], invoice['status'],
-                    invoice['kwota_netto'], invoice['kwota_vat'], invoice['kwota_brutto']
-                ])
-            
-            zip_file.writestr('invoices.csv', csv_buffer.getvalue().encode('utf-8'))
-        
-        # Export contractors as CSV
-        if export_data.get('business_data', {}).get('contractors'):
-            csv_buffer = io.StringIO()
-            writer = csv.writer(csv_buffer)
-            
-            # Header
-            writer.writerow([
-                'ID', 'Nazwa', 'NIP', 'REGON', 'Adres', 'Kod pocztowy',
-                'Miejscowość', 'Telefon', 'Email'
-            ])
-            
-            # Data
-            for contractor in export_data['business_data']['contractors']:
-                writer.writerow([
-                    contractor['id'], contractor['nazwa'], contractor['nip'],
-                    contractor['regon'], contractor['adres'], contractor['kod_pocztowy'],
-                    contractor['miejscowosc'], contractor['telefon'], contractor['email']
-                ])
-            
-            zip_file.writestr('contractors.csv', csv_buffer.getvalue().encode('utf-8'))
-    
-    def _create_export_readme(self, user: User, export_data: Dict) -> str:
+    def _create_export_readme(self, user: User, export_info: Dict) -> str:
         """Create README file for data export"""
+        extension = export_info['format']
+        summary = '\n'.join(
+            f"- {section}: {rows}" for section, rows in export_info['rows'].items()
+        )
         readme = f"""
 GDPR Data Export for {user.username}
 =====================================
@@ -442,23 +514,21 @@ This export contains all personal data associated with your account
 in compliance with the General Data Protection Regulation (GDPR).
 
 Files included:
-- data_export.json: Complete data export in JSON format
-- invoices.csv: Invoice data in CSV format
-- contractors.csv: Contractor data in CSV format
+- personal_data.json: Account, profile and company data
+- <section>/<section>_NNNN.{extension}: Records of each data category,
+  split into numbered parts ({'one JSON object per line' if extension == 'jsonl' else 'CSV with a header row'})
+- documents/: Copies of uploaded documents
 - README.txt: This file
 
 Data categories included:
 - Personal account information
-- Business data (company, contractors, products)
-- Document data (invoices, recurring invoices)
+- Business data (contractors, products)
+- Document data (invoices, invoice items, recurring invoices, uploaded documents)
 - System data (teams, partnerships, messages)
 - Audit data (security logs, OCR processing)
 
 Data summary:
-- Invoices: {len(export_data.get('document_data', {}).get('invoices', []))}
-- Contractors: {len(export_data.get('business_data', {}).get('contractors', []))}
-- Products: {len(export_data.get('business_data', {}).get('products', []))}
-- Security logs: {len(export_data.get('audit_data', {}).get('security_logs', []))}
+{summary}
 
 If you have any questions about this export or your data rights,
 please contact our support team.
@@ -620,7 +690,7 @@ https://gdpr.eu/what-is-gdpr/
                 profile.avatar.delete()
             profile.save()
     
-    def _log_data_export(self, user: User, export_data: Dict) -> None:
+    def _log_data_export(self, user: User, export_info: Dict) -> None:
         """Log data export for audit purposes"""
         try:
             from faktury.services.security_service import SecurityService
@@ -632,8 +702,9 @@ https://gdpr.eu/what-is-gdpr/
                 resource_type='user',
                 resource_id=str(user.id),
                 details={
-                    'export_format': export_data['export_info']['format'],
-                    'data_categories': list(export_data.keys()),
+                    'export_format': export_info['format'],
+                    'data_categories': list(export_info['rows']),
+                    'resumed': export_info['resumed'],
                     'gdpr_article': 'Article 20'
                 },
                 success=True
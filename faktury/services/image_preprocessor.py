@@ -78,6 +78,12 @@ class ImagePreprocessor:
             logger.error(f"Preprocessing failed: {str(e)}")
             raise
     
+    def preprocess_page(self, image: Image.Image) -> bytes:
+        """Apply the preprocessing pipeline to a single rendered page"""
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        return self._apply_preprocessing_pipeline(image)
+    
     def _process_pdf(self, file_content: bytes) -> List[Image.Image]:
         """Convert PDF to images"""
         try:
@@ -0,0 +1,102 @@
+"""
+Per-tab message inbox feeds
+
+Each tab is a keyset-paginated feed ordered by (data_wyslania, id), newest
+first, so a page costs one indexed range read however many messages a user
+has. Thread reply counts are annotated by a correlated subquery, which is
+only evaluated for the rows of the page. Cursors are opaque strings of the
+last row's position.
+"""
+
+import base64
+import datetime
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from faktury.models import Wiadomosc
+from faktury.services.unread_counters import MESSAGES, adjust_unread
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Tab name -> (label, messages of the tab are received by the user)
+TABS = {
+    'partner': ('Od partnerów', True),
+    'zespol': ('Zespołowe', True),
+    'system': ('Systemowe', True),
+    'wyslane': ('Wysłane', False),
+}
+
+
+@dataclass
+class InboxPage:
+    """One page of a tab feed"""
+    tab: str
+    messages: List[Wiadomosc] = field(default_factory=list)
+    next_cursor: Optional[str] = None
+
+
+def encode_cursor(wiadomosc) -> str:
+    """Opaque cursor pointing after the given message"""
+    position = f'{wiadomosc.data_wyslania.isoformat()}|{wiadomosc.pk}'
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    """(data_wyslania, id) of a cursor, raises ValueError if it does not decode"""
+    try:
+        sent, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.datetime.fromisoformat(sent), int(pk)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ValueError('Invalid cursor')
+
+
+def replies_count_subquery():
+    """Number of direct replies of the outer message"""
+    replies = Wiadomosc.objects.filter(wiadomosc_nadrzedna=OuterRef('pk')).order_by().values('wiadomosc_nadrzedna')
+    return Coalesce(
+        Subquery(replies.annotate(count=Count('pk')).values('count'), output_field=IntegerField()),
+        Value(0)
+    )
+
+
+def tab_queryset(user, tab: str):
+    """Messages of a tab, newest first, with reply counts annotated as ``liczba_odpowiedzi``"""
+    if tab not in TABS:
+        raise ValueError(f'Unknown inbox tab: {tab}')
+    if TABS[tab][1]:
+        queryset = Wiadomosc.objects.filter(odbiorca_user=user, typ_wiadomosci=tab).select_related('autor')
+    else:
+        queryset = Wiadomosc.objects.filter(autor=user).select_related('odbiorca_user')
+    return queryset.annotate(liczba_odpowiedzi=replies_count_subquery()).order_by('-data_wyslania', '-id')
+
+
+def inbox_page(user, tab: str, cursor: Optional[str] = None, page_size: int = DEFAULT_PAGE_SIZE) -> InboxPage:
+    """
+    Page of a tab feed after ``cursor``, in one query
+
+    Raises ValueError for unknown tabs and cursors that do not decode.
+    """
+    page_size = min(max(page_size, 1), MAX_PAGE_SIZE)
+    queryset = tab_queryset(user, tab)
+    if cursor:
+        sent, pk = decode_cursor(cursor)
+        queryset = queryset.filter(data_wyslania__lte=sent).filter(Q(data_wyslania__lt=sent) | Q(id__lt=pk))
+
+    rows = list(queryset[:page_size + 1])
+    page = InboxPage(tab=tab, messages=rows[:page_size])
+    if len(rows) > page_size:
+        page.next_cursor = encode_cursor(page.messages[-1])
+    return page
+
+
+def mark_read(user, message_ids) -> int:
+    """Mark the given received messages read, returns how many were unread"""
+    updated = Wiadomosc.objects.filter(
+        odbiorca_user=user, przeczytana=False, pk__in=list(message_ids)
+    ).update(przeczytana=True)
+    adjust_unread(user.pk, MESSAGES, -updated)
+    return updated
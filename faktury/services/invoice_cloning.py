@@ -0,0 +1,221 @@
+"""
+Bulk invoice corrections and duplicates
+
+Clones a selection of invoices in one transaction. Source invoices are
+read in id batches; each batch costs one query for the invoices, one for
+their positions, one allocating a block of numbers per (owner, document
+type) and two ``bulk_create`` inserts (more when the database splits a
+large insert), however many invoices and positions it holds. Numbers
+continue after the highest number of the current month, which includes
+the clones of earlier batches.
+
+``bulk_create`` skips ``Faktura.save`` and its signals:
+
+- numbering is replaced by the block allocation;
+- auto-accounting to partner companies runs after commit, only for clones
+  whose buyer is a partner company with auto-accounting enabled;
+- calendar feed versions are bumped once per owner instead of per row;
+- OCR linking and the updated_at bump on position changes do not apply to
+  new invoices without a source document.
+
+Large selections are cloned by ``clone_invoices_task``.
+"""
+
+import datetime
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import QuerySet
+
+from faktury.cache_utils import invalidate_user_cache
+from faktury.models import Faktura, Partnerstwo, PozycjaFaktury
+from faktury.services.calendar_feed import bump_calendar_version
+from faktury.services.partnership_analytics import bump_partnership_version
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG = {
+    'batch_size': 500,
+    'async_threshold': 100,
+}
+
+KOREKTA = 'korekta'
+DUPLIKAT = 'duplikat'
+MODES = (KOREKTA, DUPLIKAT)
+
+# Fields set for the clone instead of copied from the source invoice
+NOT_COPIED = {
+    'id', 'numer', 'typ_dokumentu', 'data_wystawienia', 'status', 'kwota_oplacona', 'auto_numer', 'wlasny_numer',
+    'dokument_podstawowy', 'kp', 'faktura_zrodlowa', 'auto_ksiegowana', 'updated_at', 'source_document',
+    'ocr_confidence', 'manual_verification_required', 'ocr_processing_time', 'ocr_extracted_at',
+}
+POSITION_FIELDS = ('nazwa', 'ilosc', 'jednostka', 'cena_netto', 'vat', 'rabat', 'rabat_typ')
+
+
+def get_config() -> Dict:
+    return {**DEFAULT_CONFIG, **getattr(settings, 'INVOICE_CLONING_CONFIG', {})}
+
+
+def should_clone_async(count: int) -> bool:
+    """Check whether a selection is large enough for a background job"""
+    threshold = get_config()['async_threshold']
+    return threshold > 0 and count > threshold
+
+
+def copied_fields() -> List[str]:
+    return [
+        field.attname for field in Faktura._meta.concrete_fields
+        if field.name not in NOT_COPIED
+    ]
+
+
+def number_sequence(numer: str) -> int:
+    """Sequence part of an automatic number (``TYP/NN/MM/YYYY``), 0 if it has none"""
+    try:
+        return int(numer.split('/')[1])
+    except (ValueError, IndexError):
+        return 0
+
+
+def allocate_numbers(groups: Dict[Tuple[int, str], int], today: datetime.date) -> Dict[Tuple[int, str], Iterator[str]]:
+    """
+    Allocate consecutive numbers for (user id, document type) groups
+
+    Numbering follows ``Faktura.save``: ``TYP/NN/MM/YYYY`` continuing the
+    current month's sequence. All groups are read with one query.
+
+    Args:
+        groups: Count of numbers needed per (user id, document type)
+        today: Issue date of the new invoices
+
+    Returns:
+        Numbers per group, in allocation order
+    """
+    if not groups:
+        return {}
+    user_ids = {user_id for user_id, _ in groups}
+    types = {typ for _, typ in groups}
+    used = Faktura.objects.filter(
+        user_id__in=user_ids,
+        typ_dokumentu__in=types,
+        data_wystawienia__year=today.year,
+        data_wystawienia__month=today.month,
+    ).order_by().values_list('user_id', 'typ_dokumentu', 'numer')
+
+    last = defaultdict(int)
+    counts = defaultdict(int)
+    for user_id, typ, numer in used:
+        last[user_id, typ] = max(last[user_id, typ], number_sequence(numer))
+        counts[user_id, typ] += 1
+
+    numbers = {}
+    for (user_id, typ), count in groups.items():
+        # Numbers that do not parse still take a place in the sequence, as in Faktura.save
+        start = max(last[user_id, typ], counts[user_id, typ]) + 1
+        numbers[user_id, typ] = iter([
+            f"{typ}/{sequence:02d}/{today.month:02d}/{today.year}" for sequence in range(start, start + count)
+        ])
+    return numbers
+
+
+def _partner_pairs(sources) -> set:
+    """(seller, buyer company) pairs of the batch with active auto-accounting partnerships"""
+    pairs = {(zrodlo.sprzedawca_id, zrodlo.nabywca.firma_id) for zrodlo in sources if zrodlo.nabywca.firma_id}
+    if not pairs:
+        return set()
+    firm_ids = {firm_id for pair in pairs for firm_id in pair}
+    partnerships = Partnerstwo.objects.filter(
+        firma1_id__in=firm_ids, firma2_id__in=firm_ids, aktywne=True, auto_ksiegowanie=True
+    ).values_list('firma1_id', 'firma2_id')
+    linked = set()
+    for firma1_id, firma2_id in partnerships:
+        linked.update({(firma1_id, firma2_id), (firma2_id, firma1_id)})
+    return pairs & linked
+
+
+def _clone_type(zrodlo, mode: str) -> str:
+    return 'KOR' if mode == KOREKTA else zrodlo.typ_dokumentu
+
+
+def _clone_batch(sources, mode, today, fields) -> List[Faktura]:
+    groups = defaultdict(int)
+    for zrodlo in sources:
+        groups[zrodlo.user_id, _clone_type(zrodlo, mode)] += 1
+    numbers = allocate_numbers(groups, today)
+
+    pozycje = defaultdict(list)
+    for pozycja in PozycjaFaktury.objects.filter(faktura_id__in=[zrodlo.pk for zrodlo in sources]).order_by('pk'):
+        pozycje[pozycja.faktura_id].append(pozycja)
+
+    clones = []
+    for zrodlo in sources:
+        typ = _clone_type(zrodlo, mode)
+        clone = Faktura(
+            **{field: getattr(zrodlo, field) for field in fields},
+            typ_dokumentu=typ,
+            numer=next(numbers[zrodlo.user_id, typ]),
+            data_wystawienia=today,
+            dokument_podstawowy_id=zrodlo.pk if mode == KOREKTA else None,
+        )
+        clone.nabywca = zrodlo.nabywca
+        clones.append(clone)
+    Faktura.objects.bulk_create(clones)
+
+    PozycjaFaktury.objects.bulk_create([
+        PozycjaFaktury(faktura_id=clone.pk, **{field: getattr(pozycja, field) for field in POSITION_FIELDS})
+        for zrodlo, clone in zip(sources, clones)
+        for pozycja in pozycje[zrodlo.pk]
+    ])
+
+    partner_pairs = _partner_pairs(sources)
+    for clone in clones:
+        if (clone.sprzedawca_id, clone.nabywca.firma_id) in partner_pairs:
+            transaction.on_commit(clone.ksieguj_u_partnera)
+    return clones
+
+
+def clone_invoices(faktury: Iterable, mode: str = KOREKTA, batch_size: Optional[int] = None) -> List[Faktura]:
+    """
+    Clone invoices into corrections or duplicates in one transaction
+
+    Corrections are ``KOR`` documents pointing to their source through
+    ``dokument_podstawowy``; duplicates keep the source document type. Both
+    are issued today with fresh automatic numbers and copies of the source
+    positions.
+
+    Args:
+        faktury: Invoices, invoice ids or a queryset of invoices to clone
+        mode: 'korekta' or 'duplikat'
+        batch_size: Source invoices read and inserted together
+
+    Returns:
+        Created invoices, in source id order
+    """
+    if mode not in MODES:
+        raise ValueError(f'Unknown clone mode: {mode}')
+    batch_size = batch_size or get_config()['batch_size']
+    if isinstance(faktury, QuerySet):
+        faktury = faktury.values_list('pk', flat=True)
+    ids = sorted({getattr(faktura, 'pk', faktura) for faktura in faktury})
+    today = datetime.date.today()
+    fields = copied_fields()
+
+    with transaction.atomic():
+        clones = []
+        for start in range(0, len(ids), batch_size):
+            sources = list(
+                Faktura.objects.filter(pk__in=ids[start:start + batch_size]).select_related('nabywca').order_by('pk')
+            )
+            clones += _clone_batch(sources, mode, today, fields)
+
+        for user_id in {clone.user_id for clone in clones}:
+            bump_calendar_version(user_id)
+            invalidate_user_cache(user_id, 'user_stats')
+        for firma_id in {clone.sprzedawca_id for clone in clones}:
+            bump_partnership_version(firma_id)
+
+    logger.info(f"Cloned {len(clones)} invoices as {mode}")
+    return clones
@@ -15,6 +15,8 @@ from dataclasses import dataclass, field
 from enum import Enum
 import json
 
+from .polish_field_scanner import invoice_field_scanner
+
 logger = logging.getLogger(__name__)
 
 
@@ -92,6 +94,7 @@ class InvoiceFieldExtractor:
     """
     
     def __init__(self):
+        self.scanner = invoice_field_scanner
         self.polish_patterns = self._initialize_polish_patterns()
         self.validation_rules = self._initialize_validation_rules()
         self.extraction_stats = {
@@ -184,67 +187,8 @@ class InvoiceFieldExtractor:
             }
     
     def _initialize_polish_patterns(self) -> Dict[str, List[str]]:
-        """Initialize Polish-specific regex patterns for field extraction"""
-        return {
-            'invoice_numbers': [
-                r'(?:Faktura|FV|F|Nr|Numer)[-:\s]*([A-Z]*\d+[/\-]\d+[/\-]\d+)',
-                r'(?:Faktura\s+VAT\s+Nr|FAKTURA\s+VAT\s+Nr)[-:\s]*([A-Z0-9/\-]+)',
-                r'(?:Faktura|FV|F|Nr|Numer)[-:\s]*([A-Z]*\d+)',
-                r'([A-Z]*\d+[/\-]\d+[/\-]\d+)',
-                r'(?:Faktura\s+VAT|FV)[-:\s]*([A-Z0-9/\-]+)',
-                r'(?:Nr\s+faktury|Numer\s+faktury)[-:\s]*([A-Z0-9/\-]+)',
-                r'([A-Z]{2,4}[/\-]\d+[/\-]\d{2,4})',
-            ],
-            'dates': [
-                r'(\d{2})[.-/](\d{2})[.-/](\d{4})',
-                r'(\d{4})[.-/](\d{2})[.-/](\d{2})',
-                r'(\d{1,2})\s+(stycznia|lutego|marca|kwietnia|maja|czerwca|lipca|sierpnia|września|października|listopada|grudnia)\s+(\d{4})',
-                r'(?:dnia\s+)?(\d{1,2})[.-/](\d{1,2})[.-/](\d{4})',
-                r'(\d{2})\.(\d{2})\.(\d{2})',
-                r'(?:Data\s+wystawienia|Data\s+sprzedaży|Termin\s+płatności)[-:\s]*(\d{1,2}[.-/]\d{1,2}[.-/]\d{2,4})',
-            ],
-            'amounts': [
-                r'(\d+(?:\s?\d{3})*[,.]?\d*)\s*zł',
-                r'(\d+(?:\s?\d{3})*[,.]?\d*)\s*PLN',
-                r'PLN\s*(\d+(?:\s?\d{3})*[,.]?\d*)',
-                r'(\d+(?:\s?\d{3})*[,.]?\d*)\s*złotych?',
-                r'(?:Suma|Razem|Łącznie|Do\s+zapłaty)[-:\s]*(\d+(?:\s?\d{3})*[,.]?\d*)\s*(?:zł|PLN)',
-                r'(\d+(?:\s?\d{3})*[,.]?\d*)\s*gr',
-            ],
-            'nip_numbers': [
-                r'(?:NIP|VAT)[-:\s]*(\d{3}[-\s]?\d{3}[-\s]?\d{2}[-\s]?\d{2})',
-                r'PL\s*(\d{10})',
-                r'(?:Identyfikator\s+podatkowy|Nr\s+VAT)[-:\s]*(\d{10})',
-                r'(\d{3}[-\s]*\d{3}[-\s]*\d{2}[-\s]*\d{2})',
-            ],
-            'company_names': [
-                r'([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s\-&.,"()0-9]+?)\s*(Sp(?:ółka)?\.?\s*z\s*o\.?o\.?)',
-                r'([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s\-&.,"()0-9]+?)\s*(S\.?A\.?)',
-                r'([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s\-&.,"()0-9]+?)\s*(Spółka\s*Akcyjna)',
-                r'([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s\-&.,"()0-9]+?)\s*(P\.?P\.?H\.?U?\.?)',
-                r'(?:Sprzedawca|Nabywca|Firma)[-:\s]*([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s\-&.,"()0-9]{3,50})',
-            ],
-            'addresses': [
-                r'(\d{2}-\d{3})\s+([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s]+)',
-                r'ul\.\s*([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s]+)\s*(\d+[a-zA-Z]?(?:/\d+)?)',
-                r'(?:al\.|aleja)\s*([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s]+)\s*(\d+[a-zA-Z]?)',
-                r'(?:pl\.|plac)\s*([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s]+)\s*(\d+[a-zA-Z]?)',
-            ],
-            'vat_rates': [
-                r'(\d+)%\s*VAT',
-                r'VAT\s*(\d+)%',
-                r'(\d+)\s*proc\.?\s*VAT',
-                r'stawka\s*VAT\s*(\d+)%',
-                r'(\d+),(\d+)%\s*VAT',
-                r'zwolnione\s*z\s*VAT',
-                r'0%\s*VAT',
-            ],
-            'bank_accounts': [
-                r'PL\s*(\d{2}\s*\d{4}\s*\d{4}\s*\d{4}\s*\d{4}\s*\d{4}\s*\d{4})',
-                r'(?:Nr\s+konta|Numer\s+konta|Konto)[-:\s]*PL\s*(\d{26})',
-                r'(\d{2}\s*\d{4}\s*\d{4}\s*\d{4}\s*\d{4}\s*\d{4}\s*\d{4})',
-            ]
-        }
+        """Polish-specific regex patterns for field extraction (compiled by the shared scanner)"""
+        return self.scanner.pattern_strings()
     
     def _initialize_validation_rules(self) -> Dict[str, Any]:
         """Initialize validation rules for extracted fields"""
@@ -334,8 +278,7 @@ class InvoiceFieldExtractor:
         """Extract invoice numbers using multiple patterns"""
         found_numbers = []
         
-        for pattern in self.polish_patterns['invoice_numbers']:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
+        for pattern, matches in self.scanner.matches(text, 'invoice_numbers'):
             for match in matches:
                 invoice_number = match.group(1) if match.groups() else match.group(0)
                 
@@ -369,8 +312,7 @@ class InvoiceFieldExtractor:
             'września': '09', 'października': '10', 'listopada': '11', 'grudnia': '12'
         }
         
-        for pattern in self.polish_patterns['dates']:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
+        for pattern, matches in self.scanner.matches(text, 'dates'):
             for match in matches:
                 try:
                     date_str = None
@@ -436,8 +378,7 @@ class InvoiceFieldExtractor:
         amount_fields = {}
         found_amounts = []
         
-        for pattern in self.polish_patterns['amounts']:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
+        for pattern, matches in self.scanner.matches(text, 'amounts'):
             for match in matches:
                 try:
                     amount_str = match.group(1) if match.groups() else match.group(0)
@@ -486,8 +427,7 @@ class InvoiceFieldExtractor:
         nip_fields = {}
         found_nips = []
         
-        for pattern in self.polish_patterns['nip_numbers']:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
+        for pattern, matches in self.scanner.matches(text, 'nip_numbers'):
             for match in matches:
                 nip_str = match.group(1) if match.groups() else match.group(0)
                 clean_nip = re.sub(r'[^\d]', '', nip_str)
@@ -527,8 +467,7 @@ class InvoiceFieldExtractor:
         """Extract VAT rates from text"""
         found_rates = []
         
-        for pattern in self.polish_patterns['vat_rates']:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
+        for pattern, matches in self.scanner.matches(text, 'vat_rates'):
             for match in matches:
                 if 'zwolnione' in match.group(0).lower():
                     vat_rate = 'zw'
@@ -564,8 +503,7 @@ class InvoiceFieldExtractor:
         """Extract bank account numbers (IBAN)"""
         found_accounts = []
         
-        for pattern in self.polish_patterns['bank_accounts']:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
+        for pattern, matches in self.scanner.matches(text, 'bank_accounts'):
             for match in matches:
                 account_str = match.group(1) if match.groups() else match.group(0)
                 clean_account = re.sub(r'[^\d]', '', account_str)
@@ -666,8 +604,8 @@ class InvoiceFieldExtractor:
         
         # Extract NIP
         nip_match = None
-        for pattern in self.polish_patterns['nip_numbers']:
-            match = re.search(pattern, section_text, re.IGNORECASE)
+        for scan_pattern in self.scanner.patterns('nip_numbers', section_text):
+            match = scan_pattern.regex.search(section_text)
             if match:
                 nip_str = match.group(1) if match.groups() else match.group(0)
                 clean_nip = re.sub(r'[^\d]', '', nip_str)
@@ -699,8 +637,8 @@ class InvoiceFieldExtractor:
     
     def _extract_company_name(self, text: str) -> Optional[str]:
         """Extract company name using Polish business entity patterns"""
-        for pattern in self.polish_patterns['company_names']:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for scan_pattern in self.scanner.patterns('company_names', text):
+            match = scan_pattern.regex.search(text)
             if match:
                 if len(match.groups()) >= 2:
                     return f"{match.group(1).strip()} {match.group(2).strip()}"
@@ -729,10 +667,10 @@ class InvoiceFieldExtractor:
             address_info['miejscowosc'] = postal_match.group(2).strip()
         
         # Extract street and house number
-        for pattern in self.polish_patterns['addresses']:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for scan_pattern in self.scanner.patterns('addresses', text):
+            match = scan_pattern.regex.search(text)
             if match:
-                if 'ul.' in pattern or 'al.' in pattern or 'pl.' in pattern:
+                if 'ul.' in scan_pattern.pattern or 'al.' in scan_pattern.pattern or 'pl.' in scan_pattern.pattern:
                     address_info['ulica'] = match.group(1).strip()
                     address_info['numer_domu'] = match.group(2).strip()
                     break
@@ -0,0 +1,307 @@
+"""
+Invoice PDF Rendering Service
+
+This module renders invoice PDFs outside of the request thread's critical
+path. HTML is rendered from the Django template in the calling process and
+converted to PDF by a pool of worker processes that keep WeasyPrint, its
+fonts and stylesheets loaded between renders. Rendered PDFs are cached by a
+content fingerprint (``updated_at`` stamps of the invoice, seller and buyer
+plus template version),
+bulk ZIP archives are streamed entry by entry, and large selections can be
+handed over to a Celery job.
+"""
+
+import hashlib
+import io
+import logging
+import os
+import re
+import tempfile
+import threading
+import uuid
+import zipfile
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.template.loader import get_template, render_to_string
+
+from .ocr_execution_sandbox import get_process_context
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_NAME = 'faktury/faktura_pdf.html'
+CACHE_KEY_PREFIX = 'invoice_pdf'
+ARCHIVE_DIR = 'pdf_archives'
+ARCHIVE_NAME_RE = re.compile(r'^faktury_[0-9a-f]{32}\.zip$')
+
+_worker_font_config = None
+
+
+def _init_render_worker():
+    """Load WeasyPrint and its font configuration once per worker process"""
+    global _worker_font_config
+    from weasyprint.text.fonts import FontConfiguration
+    _worker_font_config = FontConfiguration()
+
+
+def render_html_to_pdf(html_string: str, base_url: Optional[str] = None) -> bytes:
+    """Convert rendered invoice HTML to PDF bytes"""
+    from weasyprint import HTML  # Imported lazily: loads Pango/Cairo
+    return HTML(string=html_string, base_url=base_url).write_pdf(font_config=_worker_font_config)
+
+
+def _render_job(job: Tuple[str, Optional[str]]) -> bytes:
+    return render_html_to_pdf(*job)
+
+
+class _ZipStream(io.RawIOBase):
+    """Write-only, non-seekable buffer drained while a ZIP archive is written"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class InvoicePDFService:
+    """
+    Render invoice PDFs with a warm worker pool and a fingerprint cache
+    """
+
+    def __init__(self,
+                 workers: Optional[int] = None,
+                 async_threshold: Optional[int] = None,
+                 cache_timeout: Optional[int] = None,
+                 cache_alias: str = 'default',
+                 template_name: str = TEMPLATE_NAME):
+        """
+        Initialize PDF service
+
+        Args:
+            workers: Render worker processes (0 renders in the calling process)
+            async_threshold: Selections larger than this are rendered by Celery
+            cache_timeout: Lifetime of cached PDFs in seconds
+            cache_alias: Django cache used for rendered PDFs
+            template_name: Invoice PDF template
+        """
+        self.workers = workers if workers is not None else getattr(
+            settings, 'INVOICE_PDF_WORKERS', min(4, os.cpu_count() or 1)
+        )
+        self.async_threshold = async_threshold if async_threshold is not None else getattr(
+            settings, 'INVOICE_PDF_ASYNC_THRESHOLD', 50
+        )
+        self.cache_timeout = cache_timeout if cache_timeout is not None else getattr(
+            settings, 'INVOICE_PDF_CACHE_TIMEOUT', 24 * 3600
+        )
+        self.cache_alias = cache_alias
+        self.template_name = template_name
+
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._template_version = None
+
+        self.stats = {
+            'rendered': 0,
+            'cache_hits': 0,
+            'cache_misses': 0
+        }
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    @property
+    def template_version(self) -> str:
+        """Version of the PDF template (setting override or hash of its source)"""
+        if self._template_version is None:
+            version = getattr(settings, 'INVOICE_PDF_TEMPLATE_VERSION', None)
+            if not version:
+                template = get_template(self.template_name).template
+                version = hashlib.sha256(template.source.encode('utf-8')).hexdigest()[:16]
+            self._template_version = version
+        return self._template_version
+
+    def fingerprint(self, faktura) -> Optional[str]:
+        """
+        Get content fingerprint of an invoice PDF
+
+        The seller and buyer are printed on the invoice, so their stamps are
+        part of the fingerprint; load them with ``select_related`` when
+        fingerprinting many invoices. Returns None for invoices without an
+        ``updated_at`` stamp (rows created before the field existed); those
+        are always rendered. Companies not saved since they got the stamp
+        count as unchanged until their next save.
+        """
+        if faktura.updated_at is None:
+            return None
+        stamps = [
+            party.updated_at.isoformat() if party.updated_at else ''
+            for party in (faktura.sprzedawca, faktura.nabywca)
+        ]
+        key = f"{faktura.pk}:{faktura.updated_at.isoformat()}:{':'.join(stamps)}:{self.template_version}"
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+    def _cache_key(self, fingerprint: str) -> str:
+        return f"{CACHE_KEY_PREFIX}:{fingerprint}"
+
+    def _get_cached(self, fingerprint: Optional[str]) -> Optional[bytes]:
+        if fingerprint is None:
+            return None
+        pdf = self.cache.get(self._cache_key(fingerprint))
+        if pdf is None:
+            self.stats['cache_misses'] += 1
+        else:
+            self.stats['cache_hits'] += 1
+        return pdf
+
+    def _set_cached(self, fingerprint: Optional[str], pdf: bytes):
+        if fingerprint is not None:
+            self.cache.set(self._cache_key(fingerprint), pdf, self.cache_timeout)
+
+    def render_html(self, faktura) -> str:
+        """Render invoice PDF template to HTML"""
+        return render_to_string(self.template_name, {'faktura': faktura})
+
+    @staticmethod
+    def get_filename(faktura) -> str:
+        """File name of an invoice PDF"""
+        return f"faktura_{faktura.numer}.pdf"
+
+    def render(self, faktura, base_url: Optional[str] = None) -> bytes:
+        """
+        Render a single invoice PDF
+
+        Args:
+            faktura: Faktura instance
+            base_url: Base URL for relative links in the template
+
+        Returns:
+            PDF content
+        """
+        fingerprint = self.fingerprint(faktura)
+        pdf = self._get_cached(fingerprint)
+        if pdf is None:
+            # Rendered by the pool too, so WeasyPrint never loads into web workers
+            pdf = next(self._render_jobs([(self.render_html(faktura), base_url)]))
+            self.stats['rendered'] += 1
+            self._set_cached(fingerprint, pdf)
+        return pdf
+
+    def render_many(self, faktury: Iterable, base_url: Optional[str] = None) -> Iterator[Tuple[object, bytes]]:
+        """
+        Render PDFs of several invoices, yielding them in input order
+
+        Cached PDFs are served directly; the remaining invoices are rendered
+        in parallel by the worker pool.
+        """
+        faktury = list(faktury)
+        fingerprints = [self.fingerprint(faktura) for faktura in faktury]
+        cached = [self._get_cached(fingerprint) for fingerprint in fingerprints]
+
+        misses = [i for i, pdf in enumerate(cached) if pdf is None]
+        jobs = [(self.render_html(faktury[i]), base_url) for i in misses]
+        rendered = self._render_jobs(jobs)
+
+        for i, faktura in enumerate(faktury):
+            pdf = cached[i]
+            if pdf is None:
+                pdf = next(rendered)
+                self.stats['rendered'] += 1
+                self._set_cached(fingerprints[i], pdf)
+            yield faktura, pdf
+
+    def _render_jobs(self, jobs: List[Tuple[str, Optional[str]]]) -> Iterator[bytes]:
+        """Render HTML jobs in order, in the worker pool when worthwhile"""
+        if jobs and self.workers > 0:
+            pool = self._get_pool()
+            if pool is not None:
+                return pool.imap(_render_job, jobs, chunksize=1)
+        return (_render_job(job) for job in jobs)
+
+    def _get_pool(self):
+        """Lazily start the render worker pool"""
+        with self._pool_lock:
+            if self._pool is None:
+                try:
+                    context = get_process_context()
+                    self._pool = context.Pool(processes=self.workers, initializer=_init_render_worker)
+                except (OSError, ValueError, AssertionError) as e:
+                    logger.warning(f"PDF render pool unavailable ({e}), rendering in process")
+                    return None
+            return self._pool
+
+    def iter_zip(self, faktury: Iterable, base_url: Optional[str] = None) -> Iterator[bytes]:
+        """
+        Stream a ZIP archive with the PDFs of the given invoices
+
+        Each chunk is yielded as soon as its PDF is rendered, so the archive is
+        never held in memory as a whole.
+        """
+        stream = _ZipStream()
+        # PDFs are already compressed, deflating them again only costs CPU
+        with zipfile.ZipFile(stream, 'w', zipfile.ZIP_STORED) as archive:
+            for faktura, pdf in self.render_many(faktury, base_url):
+                archive.writestr(self.get_filename(faktura), pdf)
+                yield stream.drain()
+        yield stream.drain()
+
+    def save_zip_archive(self, user_id: int, faktury: Iterable, base_url: Optional[str] = None) -> str:
+        """
+        Write a ZIP archive of invoice PDFs to storage
+
+        Returns:
+            Archive name, resolved with ``archive_path``
+        """
+        name = f"faktury_{uuid.uuid4().hex}.zip"
+        with tempfile.TemporaryFile() as tmp:
+            for chunk in self.iter_zip(faktury, base_url):
+                tmp.write(chunk)
+            tmp.seek(0)
+            default_storage.save(archive_path(user_id, name), File(tmp))
+        return name
+
+    def should_render_async(self, count: int) -> bool:
+        """Check whether a selection is large enough for a background job"""
+        return self.async_threshold > 0 and count > self.async_threshold
+
+    def shutdown(self):
+        """Stop render worker processes"""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.terminate()
+                self._pool.join()
+                self._pool = None
+
+
+def archive_path(user_id: int, name: str) -> str:
+    """Storage path of a user's PDF archive; rejects names not created by the service"""
+    if not ARCHIVE_NAME_RE.match(name):
+        raise ValueError(f"Invalid PDF archive name: {name}")
+    return f"{ARCHIVE_DIR}/{user_id}/{name}"
+
+
+_pdf_service: Optional[InvoicePDFService] = None
+_pdf_service_lock = threading.Lock()
+
+
+def get_invoice_pdf_service() -> InvoicePDFService:
+    """Get the process-wide invoice PDF service"""
+    global _pdf_service
+    if _pdf_service is None:
+        with _pdf_service_lock:
+            if _pdf_service is None:
+                _pdf_service = InvoicePDFService()
+    return _pdf_service
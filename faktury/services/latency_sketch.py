@@ -0,0 +1,386 @@
+"""
+Latency Sketches
+
+Mergeable quantile sketches for latency monitoring. ``LatencySketch`` keeps
+counts in logarithmic buckets (the DDSketch / HDR histogram scheme), so every
+quantile estimate is within a fixed relative error of the exact value and two
+sketches merge by adding their bucket counts.
+
+``LatencySketchRecorder`` aggregates measurements in-process into one sketch
+per metric, key (route, OCR engine group) and minute. Every few seconds the
+pending sketches are handed to the shared cache as one batch, which costs a
+request an INCR and a SET but no database writes; the periodic
+``flush_latency_sketches`` task merges the batches into
+``LatencySketchBucket`` rows. Percentiles for any window are answered by
+merging the per-minute sketches of the window instead of loading raw samples.
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+MIN_TRACKED_VALUE = 1e-3
+
+# Batches of pending sketches handed from recording processes to the flush task
+BATCH_SEQUENCE_KEY = 'latency_sketch:batch_seq'
+BATCH_FLUSHED_KEY = 'latency_sketch:batch_flushed'
+BATCH_SEEN_KEY = 'latency_sketch:batch_seen'
+BATCH_KEY = 'latency_sketch:batch:{slot}'
+BATCH_TIMEOUT = 3600
+
+
+class LatencySketch:
+    """Log-bucket quantile sketch with bounded relative error"""
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY):
+        """
+        Initialize sketch
+
+        Args:
+            relative_accuracy: Maximum relative error of quantile estimates
+        """
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+
+        self.buckets: Counter = Counter()
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _index(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _value(self, index: int) -> float:
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def add(self, value: float, count: int = 1):
+        """Add a non-negative measurement"""
+        if value < 0:
+            raise ValueError("Latency sketches only track non-negative values")
+
+        if value < MIN_TRACKED_VALUE:
+            self.zero_count += count
+        else:
+            self.buckets[self._index(value)] += count
+
+        self.count += count
+        self.total += value * count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def add_many(self, values: Iterable[float]):
+        """Add measurements in bulk"""
+        log_gamma = self._log_gamma
+        indexes = Counter()
+        zero_count = count = 0
+        total = 0.0
+        low, high = self.min, self.max
+
+        for value in values:
+            if value < 0:
+                raise ValueError("Latency sketches only track non-negative values")
+            if value < MIN_TRACKED_VALUE:
+                zero_count += 1
+            else:
+                indexes[math.ceil(math.log(value) / log_gamma)] += 1
+            count += 1
+            total += value
+            if value < low:
+                low = value
+            if value > high:
+                high = value
+
+        self.buckets.update(indexes)
+        self.zero_count += zero_count
+        self.count += count
+        self.total += total
+        self.min, self.max = low, high
+
+    def merge(self, other: 'LatencySketch'):
+        """Merge another sketch with the same accuracy into this one"""
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+
+        self.buckets.update(other.buckets)
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a quantile
+
+        Args:
+            q: Quantile between 0 and 1
+
+        Returns:
+            Estimated value (0.0 for an empty sketch)
+        """
+        if not 0 <= q <= 1:
+            raise ValueError("Quantile must be between 0 and 1")
+        if not self.count:
+            return 0.0
+
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return max(self.min, 0.0)
+
+        seen = self.zero_count
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                return min(max(self._value(index), self.min), self.max)
+        return self.max
+
+    def percentiles(self) -> Dict[str, float]:
+        """P50, P95, P99 and average"""
+        return {
+            "p50": self.quantile(0.50),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "avg": self.mean,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize to a JSON-compatible dict"""
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'buckets': {str(index): count for index, count in self.buckets.items()},
+            'zero_count': self.zero_count,
+            'count': self.count,
+            'total': self.total,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'LatencySketch':
+        """Deserialize a sketch created with ``to_dict``"""
+        sketch = cls(data.get('relative_accuracy', DEFAULT_RELATIVE_ACCURACY))
+        sketch.buckets = Counter({int(index): count for index, count in data.get('buckets', {}).items()})
+        sketch.zero_count = data.get('zero_count', 0)
+        sketch.count = data.get('count', 0)
+        sketch.total = data.get('total', 0.0)
+        if sketch.count:
+            sketch.min = data['min']
+            sketch.max = data['max']
+        return sketch
+
+
+def _minute(timestamp: datetime) -> datetime:
+    return timestamp.replace(second=0, microsecond=0)
+
+
+class LatencySketchRecorder:
+    """Aggregates measurements into per-minute sketches stored in the database"""
+
+    def __init__(self, flush_interval: float = 10.0,
+                 relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY, cache_backend=None):
+        """
+        Initialize recorder
+
+        Args:
+            flush_interval: Seconds between hand-offs of pending sketches to the cache
+            relative_accuracy: Relative accuracy of recorded sketches
+            cache_backend: Cache the batches are handed off through
+        """
+        self.flush_interval = flush_interval
+        self.relative_accuracy = relative_accuracy
+        self.cache = cache_backend or cache
+
+        self._pending: Dict[Tuple[str, str, datetime], LatencySketch] = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def record(self, metric: str, key: str, value: float, timestamp: Optional[datetime] = None):
+        """
+        Record a measurement
+
+        Args:
+            metric: Metric name, e.g. 'http_request' or 'ocr_processing'
+            key: Low-cardinality dimension such as a route or OCR engine
+            value: Measured latency in milliseconds
+            timestamp: Time of the measurement (default: now)
+        """
+        minute = _minute(timestamp or timezone.now())
+        with self._lock:
+            sketch = self._pending.get((metric, key, minute))
+            if sketch is None:
+                sketch = self._pending[(metric, key, minute)] = LatencySketch(self.relative_accuracy)
+            sketch.add(value)
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+
+        if due:
+            self.hand_off()
+
+    def _take_pending(self) -> Dict[Tuple[str, str, datetime], LatencySketch]:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        return pending
+
+    def hand_off(self) -> int:
+        """
+        Hand pending sketches to the cache as one batch for ``flush_batches``
+
+        Returns:
+            Number of per-minute sketches handed off
+        """
+        pending = self._take_pending()
+        if not pending:
+            return 0
+
+        batch = [
+            [metric, key, minute.isoformat(), sketch.to_dict()]
+            for (metric, key, minute), sketch in pending.items()
+        ]
+        try:
+            self.cache.add(BATCH_SEQUENCE_KEY, 0, None)
+            slot = self.cache.incr(BATCH_SEQUENCE_KEY)
+            self.cache.set(BATCH_KEY.format(slot=slot), batch, BATCH_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Failed to hand off {len(batch)} latency sketches: {e}")
+            return 0
+        return len(batch)
+
+    def flush_batches(self) -> int:
+        """
+        Merge the batches handed off by all processes into the database
+
+        Batches are numbered from a shared sequence. A slot whose batch is not
+        stored yet, because its writer is between INCR and SET, is retried on
+        the next run and given up after that.
+
+        Returns:
+            Number of per-minute sketches written
+        """
+        sequence = int(self.cache.get(BATCH_SEQUENCE_KEY) or 0)
+        flushed = int(self.cache.get(BATCH_FLUSHED_KEY) or 0)
+        seen = int(self.cache.get(BATCH_SEEN_KEY) or 0)
+        keys = {BATCH_KEY.format(slot=slot): slot for slot in range(flushed + 1, sequence + 1)}
+        batches = self.cache.get_many(list(keys))
+
+        pending: Dict[Tuple[str, str, datetime], LatencySketch] = {}
+        for batch in batches.values():
+            for metric, key, minute, data in batch:
+                sketch = LatencySketch.from_dict(data)
+                existing = pending.setdefault((metric, key, datetime.fromisoformat(minute)), sketch)
+                if existing is not sketch:
+                    existing.merge(sketch)
+        written = self._store(pending)
+
+        self.cache.delete_many(list(batches))
+        retry = [slot for key, slot in keys.items() if key not in batches and slot > seen]
+        self.cache.set(BATCH_FLUSHED_KEY, min(retry) - 1 if retry else sequence, None)
+        self.cache.set(BATCH_SEEN_KEY, sequence, None)
+        return written
+
+    def flush(self) -> int:
+        """
+        Merge this process's pending sketches into the database
+
+        Returns:
+            Number of per-minute sketches written
+        """
+        return self._store(self._take_pending())
+
+    def _store(self, pending: Dict[Tuple[str, str, datetime], LatencySketch]) -> int:
+        from faktury.models import LatencySketchBucket
+
+        written = 0
+        for (metric, key, minute), sketch in pending.items():
+            try:
+                with transaction.atomic():
+                    bucket, created = LatencySketchBucket.objects.select_for_update().get_or_create(
+                        metric=metric, key=key, minute=minute,
+                        defaults={'count': sketch.count, 'sketch': sketch.to_dict()}
+                    )
+                    if not created:
+                        merged = LatencySketch.from_dict(bucket.sketch)
+                        merged.merge(sketch)
+                        bucket.count = merged.count
+                        bucket.sketch = merged.to_dict()
+                        bucket.save(update_fields=['count', 'sketch'])
+                written += 1
+            except Exception as e:
+                logger.warning(f"Failed to store latency sketch {metric}/{key} for {minute}: {e}")
+        return written
+
+    def window(self, metric: str, start: datetime, end: datetime,
+               keys: Optional[Iterable[str]] = None,
+               key_contains: Optional[str] = None) -> LatencySketch:
+        """
+        Merge the per-minute sketches of a time window
+
+        The window is resolved to whole minutes, including the minutes
+        containing ``start`` and ``end``.
+
+        Args:
+            metric: Metric name
+            start: Window start
+            end: Window end
+            keys: Only merge these keys
+            key_contains: Only merge keys containing this text (case-insensitive)
+
+        Returns:
+            Merged sketch
+        """
+        from faktury.models import LatencySketchBucket
+
+        self.flush()
+
+        buckets = LatencySketchBucket.objects.filter(
+            metric=metric, minute__gte=_minute(start), minute__lte=end
+        )
+        if keys is not None:
+            buckets = buckets.filter(key__in=list(keys))
+        if key_contains:
+            buckets = buckets.filter(key__icontains=key_contains)
+
+        merged = LatencySketch(self.relative_accuracy)
+        for data in buckets.values_list('sketch', flat=True).iterator():
+            merged.merge(LatencySketch.from_dict(data))
+        return merged
+
+    @staticmethod
+    def purge_older_than(cutoff: datetime) -> int:
+        """Delete per-minute sketches older than the cutoff"""
+        from faktury.models import LatencySketchBucket
+
+        deleted, _ = LatencySketchBucket.objects.filter(minute__lt=cutoff).delete()
+        return deleted
+
+
+# Global instance
+latency_recorder = LatencySketchRecorder()
+
+
+def record_latency(metric: str, key: str, value: float, timestamp: Optional[datetime] = None):
+    """Record a latency measurement in milliseconds, never raising"""
+    try:
+        latency_recorder.record(metric, key or 'unknown', value, timestamp)
+    except Exception as e:
+        logger.debug(f"Failed to record latency for {metric}/{key}: {e}")
@@ -8,25 +8,34 @@ and maintenance mode functionality.
 import os
 import shutil
 import logging
+import sqlite3
 import subprocess
+import tempfile
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterator, List, Any, Optional, Tuple
 from django.db import connection, transaction
 from django.core.management import call_command
 from django.core.cache import cache
 from django.conf import settings
 from django.utils import timezone
 from django.db.models import Count, Q
-from django.core.files.storage import default_storage
 from io import StringIO
 
 from faktury.models import (
-    Faktura, OCRResult, DocumentUpload, SystemHealth, 
-    UserActivityLog, Notification
+    Faktura, OCRResult, DocumentUpload, SystemHealthMetric
 )
+from faktury.services.backup_store import (
+    CHUNK_DIR, MANIFEST_FORMAT, ChunkStore, copy_sqlite, get_config as get_backup_config,
+    manifest_chunks, prune_chunks, read_manifest, replace_directory, restore_files,
+    snapshot_files, verify_chunks, walk_files, write_atomic, write_manifest
+)
+from faktury.services.retention import run_retention
 
 logger = logging.getLogger(__name__)
 
+BACKUP_COMPONENTS = ('database', 'media_files', 'configuration')
+LATEST_POINTER = '.latest'
+
 
 class MaintenanceService:
     """Service for system maintenance and optimization."""
@@ -36,7 +45,13 @@ class MaintenanceService:
         self.backup_directory = getattr(settings, 'BACKUP_DIRECTORY', '/tmp/faktulove_backups')
         
     def cleanup_old_data(self, days_to_keep: int = 90) -> Dict[str, Any]:
-        """Clean up old data from the database."""
+        """
+        Clean up old data from the database.
+
+        Runs the retention policies (see ``retention``): expired rows are
+        deleted in short per-batch transactions, so concurrent writers are
+        not blocked for the whole cleanup.
+        """
         cleanup_results = {
             'status': 'success',
             'cleaned_items': {},
@@ -44,66 +59,15 @@ class MaintenanceService:
             'total_freed_space': 0
         }
         
-        cutoff_date = timezone.now() - timedelta(days=days_to_keep)
-        
         try:
-            with transaction.atomic():
-                # Clean up old OCR results
-                old_ocr_results = OCRResult.objects.filter(
-                    created_at__lt=cutoff_date,
-                    confidence_score__lt=0.3  # Only clean up low-confidence results
-                )
-                ocr_count = old_ocr_results.count()
-                old_ocr_results.delete()
-                cleanup_results['cleaned_items']['ocr_results'] = ocr_count
-                
-                # Clean up old system health records (keep last 30 days)
-                health_cutoff = timezone.now() - timedelta(days=30)
-                old_health_records = SystemHealth.objects.filter(
-                    timestamp__lt=health_cutoff
-                )
-                health_count = old_health_records.count()
-                old_health_records.delete()
-                cleanup_results['cleaned_items']['health_records'] = health_count
-                
-                # Clean up old user activity logs (keep last 60 days)
-                activity_cutoff = timezone.now() - timedelta(days=60)
-                old_activity_logs = UserActivityLog.objects.filter(
-                    timestamp__lt=activity_cutoff
-                )
-                activity_count = old_activity_logs.count()
-                old_activity_logs.delete()
-                cleanup_results['cleaned_items']['activity_logs'] = activity_count
-                
-                # Clean up old notifications (keep last 30 days)
-                notification_cutoff = timezone.now() - timedelta(days=30)
-                old_notifications = Notification.objects.filter(
-                    created_at__lt=notification_cutoff,
-                    is_read=True
-                )
-                notification_count = old_notifications.count()
-                old_notifications.delete()
-                cleanup_results['cleaned_items']['notifications'] = notification_count
-                
-                # Clean up orphaned document uploads
-                orphaned_uploads = DocumentUpload.objects.filter(
-                    uploaded_at__lt=cutoff_date,
-                    processing_status='failed'
-                )
-                upload_count = orphaned_uploads.count()
-                
-                # Delete associated files
-                for upload in orphaned_uploads:
-                    try:
-                        if upload.file and default_storage.exists(upload.file.name):
-                            default_storage.delete(upload.file.name)
-                    except Exception as e:
-                        logger.warning(f"Failed to delete file {upload.file.name}: {e}")
-                
-                orphaned_uploads.delete()
-                cleanup_results['cleaned_items']['orphaned_uploads'] = upload_count
-                
-                logger.info(f"Database cleanup completed: {cleanup_results['cleaned_items']}")
+            results = run_retention(days_to_keep)
+            cleanup_results['cleaned_items'] = results['cleaned_items']
+            cleanup_results['total_freed_space'] = results['freed_space']
+            cleanup_results['errors'] = results['errors']
+            if results['errors']:
+                cleanup_results['status'] = 'error'
+            
+            logger.info(f"Database cleanup completed: {cleanup_results['cleaned_items']}")
                 
         except Exception as e:
             cleanup_results['status'] = 'error'
@@ -179,48 +143,70 @@ class MaintenanceService:
         except Exception as e:
             results['errors'].append(f"SQLite optimization error: {str(e)}")
     
-    def create_backup(self, backup_name: Optional[str] = None) -> Dict[str, Any]:
-        """Create system backup."""
+    def create_backup(self, backup_name: Optional[str] = None,
+                      components: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Create an incremental system backup.
+
+        Database, media and configuration files are stored in the shared
+        chunk store (see ``backup_store``) and the snapshot directory only
+        holds the manifest. Files unchanged since the previous snapshot are
+        neither read nor stored again.
+        """
         if not backup_name:
             backup_name = f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        components = components or list(BACKUP_COMPONENTS)
         
         backup_results = {
             'status': 'success',
             'backup_name': backup_name,
             'backup_path': '',
             'backup_size': 0,
+            'total_size': 0,
             'components': [],
             'errors': []
         }
         
         try:
-            # Create backup directory
             backup_path = os.path.join(self.backup_directory, backup_name)
+            if read_manifest(backup_path):
+                raise Exception(f"Backup {backup_name} already exists")
             os.makedirs(backup_path, exist_ok=True)
             backup_results['backup_path'] = backup_path
             
-            # Backup database
-            db_backup_path = self._backup_database(backup_path)
-            if db_backup_path:
-                backup_results['components'].append('database')
-            
-            # Backup media files
-            media_backup_path = self._backup_media_files(backup_path)
-            if media_backup_path:
-                backup_results['components'].append('media_files')
-            
-            # Backup configuration files
-            config_backup_path = self._backup_configuration(backup_path)
-            if config_backup_path:
-                backup_results['components'].append('configuration')
-            
-            # Create backup manifest
-            self._create_backup_manifest(backup_path, backup_results)
-            
-            # Calculate backup size
-            backup_results['backup_size'] = self._calculate_directory_size(backup_path)
-            
-            logger.info(f"Backup created successfully: {backup_name}")
+            config = get_backup_config()
+            store = self._chunk_store(config)
+            previous = self._latest_manifest() or {}
+            
+            files = {}
+            stored_size = 0
+            for component, backup in (
+                ('database', self._backup_database),
+                ('media_files', self._backup_media_files),
+                ('configuration', self._backup_configuration),
+            ):
+                if component not in components:
+                    continue
+                previous_entries = {entry['path']: entry for entry in previous.get('files', {}).get(component, [])}
+                stored = backup(store, previous_entries, config)
+                if stored is None:
+                    continue
+                files[component], written = stored
+                stored_size += written
+                backup_results['components'].append(component)
+            
+            # The manifest is written last, a snapshot without one is incomplete
+            manifest = self._create_backup_manifest(backup_results, files, stored_size)
+            manifest_size = write_manifest(backup_path, manifest)
+            write_atomic(os.path.join(self.backup_directory, LATEST_POINTER), backup_name.encode())
+            
+            backup_results['backup_size'] = stored_size + manifest_size
+            backup_results['total_size'] = manifest['total_size']
+            
+            logger.info(
+                f"Backup created successfully: {backup_name} "
+                f"({stored_size} new bytes for {manifest['total_size']} bytes of files)"
+            )
             
         except Exception as e:
             backup_results['status'] = 'error'
@@ -229,30 +215,75 @@ class MaintenanceService:
             
         return backup_results
     
-    def _backup_database(self, backup_path: str) -> Optional[str]:
-        """Backup database to specified path."""
+    def _chunk_store(self, config: Dict) -> ChunkStore:
+        return ChunkStore(os.path.join(self.backup_directory, CHUNK_DIR), config['compression_level'])
+    
+    def _latest_manifest(self) -> Optional[Dict]:
+        """Manifest of the most recent chunked snapshot, the base of the next one"""
+        try:
+            with open(os.path.join(self.backup_directory, LATEST_POINTER), 'r') as f:
+                manifest = read_manifest(os.path.join(self.backup_directory, f.read().strip()))
+            if manifest:
+                return manifest
+        except (OSError, ValueError):
+            pass
+        
+        # The latest snapshot was deleted, fall back to the newest remaining one
+        latest = None
+        for backup_name, manifest in self._manifests():
+            if manifest.get('format') == MANIFEST_FORMAT and (
+                latest is None or manifest['created_at'] > latest['created_at']
+            ):
+                latest = manifest
+        return latest
+    
+    def _manifests(self) -> Iterator:
+        """(name, manifest) of every backup with a manifest"""
+        if not os.path.exists(self.backup_directory):
+            return
+        for backup_name in sorted(os.listdir(self.backup_directory)):
+            backup_path = os.path.join(self.backup_directory, backup_name)
+            if backup_name.startswith('.') or not os.path.isdir(backup_path):
+                continue
+            try:
+                manifest = read_manifest(backup_path)
+            except ValueError:
+                logger.warning(f"Unreadable backup manifest in {backup_name}")
+                continue
+            if manifest:
+                yield backup_name, manifest
+    
+    def _backup_database(self, store: ChunkStore, previous: Dict, config: Dict) -> Optional[Tuple[List, int]]:
+        """Store a consistent database snapshot in the chunk store."""
         try:
             db_config = settings.DATABASES['default']
             db_engine = db_config['ENGINE']
             
-            if 'postgresql' in db_engine:
-                return self._backup_postgresql(backup_path, db_config)
-            elif 'sqlite' in db_engine:
-                return self._backup_sqlite(backup_path, db_config)
-            else:
-                logger.warning(f"Database backup not implemented for {db_engine}")
-                return None
+            with tempfile.TemporaryDirectory(dir=self.backup_directory) as tmp:
+                if 'postgresql' in db_engine:
+                    backup_file = self._backup_postgresql(tmp, db_config)
+                elif 'sqlite' in db_engine:
+                    backup_file = self._backup_sqlite(tmp, db_config)
+                else:
+                    logger.warning(f"Database backup not implemented for {db_engine}")
+                    return None
+                
+                # A fresh dump never matches the previous entry by modification time
+                return snapshot_files(
+                    store, [(backup_file, os.path.basename(backup_file))], {}, config['chunk_size'], 1
+                )
                 
         except Exception as e:
             logger.error(f"Database backup failed: {e}")
             return None
     
     def _backup_postgresql(self, backup_path: str, db_config: Dict) -> str:
-        """Backup PostgreSQL database."""
-        backup_file = os.path.join(backup_path, 'database.sql')
+        """Backup PostgreSQL database in pg_dump's compressed custom format."""
+        backup_file = os.path.join(backup_path, 'database.dump')
         
         cmd = [
             'pg_dump',
+            '-Fc',
             '-h', db_config.get('HOST', 'localhost'),
             '-p', str(db_config.get('PORT', 5432)),
             '-U', db_config['USER'],
@@ -272,66 +303,72 @@ class MaintenanceService:
             raise Exception(f"pg_dump failed: {result.stderr}")
     
     def _backup_sqlite(self, backup_path: str, db_config: Dict) -> str:
-        """Backup SQLite database."""
-        source_db = db_config['NAME']
+        """Backup SQLite database with the online backup API."""
         backup_file = os.path.join(backup_path, 'database.sqlite3')
         
-        shutil.copy2(source_db, backup_file)
+        source = self._sqlite_connection()
+        try:
+            copy_sqlite(source, backup_file)
+        finally:
+            source.close()
         return backup_file
     
-    def _backup_media_files(self, backup_path: str) -> Optional[str]:
-        """Backup media files."""
+    def _sqlite_connection(self) -> sqlite3.Connection:
+        """Separate connection to the SQLite database, for the backup API"""
+        if connection.in_atomic_block:
+            # The other connection would wait for this transaction forever
+            raise Exception("SQLite backup and restore cannot run inside a transaction")
+        params = connection.get_connection_params()
+        return sqlite3.connect(params['database'], uri=params.get('uri', False))
+    
+    def _backup_media_files(self, store: ChunkStore, previous: Dict, config: Dict) -> Optional[Tuple[List, int]]:
+        """Store media files in the chunk store."""
         try:
             media_root = getattr(settings, 'MEDIA_ROOT', None)
             if not media_root or not os.path.exists(media_root):
                 return None
             
-            media_backup_path = os.path.join(backup_path, 'media')
-            shutil.copytree(media_root, media_backup_path)
-            return media_backup_path
+            return snapshot_files(
+                store, walk_files(media_root), previous, config['chunk_size'], config['workers']
+            )
             
         except Exception as e:
             logger.error(f"Media files backup failed: {e}")
             return None
     
-    def _backup_configuration(self, backup_path: str) -> Optional[str]:
-        """Backup configuration files."""
+    def _backup_configuration(self, store: ChunkStore, previous: Dict, config: Dict) -> Optional[Tuple[List, int]]:
+        """Store configuration files in the chunk store."""
         try:
-            config_backup_path = os.path.join(backup_path, 'config')
-            os.makedirs(config_backup_path, exist_ok=True)
-            
-            # Backup settings files
             config_files = [
                 'faktulove/settings.py',
                 '.env',
                 'requirements.txt'
             ]
             
-            for config_file in config_files:
-                if os.path.exists(config_file):
-                    shutil.copy2(config_file, config_backup_path)
-            
-            return config_backup_path
+            return snapshot_files(
+                store,
+                [(config_file, config_file) for config_file in config_files if os.path.exists(config_file)],
+                previous, config['chunk_size'], 1
+            )
             
         except Exception as e:
             logger.error(f"Configuration backup failed: {e}")
             return None
     
-    def _create_backup_manifest(self, backup_path: str, backup_info: Dict):
-        """Create backup manifest file."""
-        manifest = {
+    def _create_backup_manifest(self, backup_info: Dict, files: Dict, stored_size: int) -> Dict:
+        """Create backup manifest."""
+        return {
+            'format': MANIFEST_FORMAT,
             'backup_name': backup_info['backup_name'],
             'created_at': datetime.now().isoformat(),
             'components': backup_info['components'],
             'django_version': getattr(settings, 'DJANGO_VERSION', 'unknown'),
             'python_version': f"{os.sys.version_info.major}.{os.sys.version_info.minor}",
-            'database_engine': settings.DATABASES['default']['ENGINE']
+            'database_engine': settings.DATABASES['default']['ENGINE'],
+            'total_size': sum(entry['size'] for entries in files.values() for entry in entries),
+            'stored_size': stored_size,
+            'files': files,
         }
-        
-        manifest_path = os.path.join(backup_path, 'manifest.json')
-        with open(manifest_path, 'w') as f:
-            import json
-            json.dump(manifest, f, indent=2)
     
     def _calculate_directory_size(self, directory: str) -> int:
         """Calculate total size of directory in bytes."""
@@ -342,7 +379,70 @@ class MaintenanceService:
                 total_size += os.path.getsize(filepath)
         return total_size
     
-    def restore_backup(self, backup_name: str) -> Dict[str, Any]:
+    def verify_backup(self, backup_name: str) -> Dict[str, Any]:
+        """Check every chunk of a backup in parallel."""
+        verify_results = {
+            'status': 'success',
+            'backup_name': backup_name,
+            'checked_chunks': 0,
+            'corrupt_chunks': [],
+            'errors': []
+        }
+        
+        try:
+            manifest = read_manifest(os.path.join(self.backup_directory, backup_name))
+            if not manifest or manifest.get('format') != MANIFEST_FORMAT:
+                raise Exception(f"Backup {backup_name} has no chunk manifest")
+            
+            config = get_backup_config()
+            digests = manifest_chunks(manifest)
+            corrupt = verify_chunks(self._chunk_store(config), digests, config['workers'])
+            verify_results['checked_chunks'] = len(digests)
+            verify_results['corrupt_chunks'] = corrupt
+            if corrupt:
+                verify_results['status'] = 'error'
+                verify_results['errors'].append(f"{len(corrupt)} chunks are missing or corrupt")
+                
+        except Exception as e:
+            verify_results['status'] = 'error'
+            verify_results['errors'].append(f"Backup verification failed: {str(e)}")
+            logger.error(f"Backup verification failed: {e}")
+            
+        return verify_results
+    
+    def delete_backup(self, backup_name: str) -> Dict[str, Any]:
+        """Delete a backup and the chunks no other backup refers to."""
+        delete_results = {
+            'status': 'success',
+            'backup_name': backup_name,
+            'removed_chunks': 0,
+            'freed_space': 0,
+            'errors': []
+        }
+        
+        try:
+            backup_path = os.path.join(self.backup_directory, backup_name)
+            if backup_name.startswith('.') or not os.path.isdir(backup_path):
+                raise Exception(f"Backup {backup_name} not found")
+            shutil.rmtree(backup_path)
+            
+            referenced = set()
+            for _, manifest in self._manifests():
+                referenced |= manifest_chunks(manifest)
+            removed, freed = prune_chunks(self._chunk_store(get_backup_config()), referenced)
+            delete_results['removed_chunks'] = removed
+            delete_results['freed_space'] = freed
+            
+            logger.info(f"Backup deleted: {backup_name}, {removed} unreferenced chunks removed")
+            
+        except Exception as e:
+            delete_results['status'] = 'error'
+            delete_results['errors'].append(f"Backup deletion failed: {str(e)}")
+            logger.error(f"Backup deletion failed: {e}")
+            
+        return delete_results
+    
+    def restore_backup(self, backup_name: str, components: Optional[List[str]] = None) -> Dict[str, Any]:
         """Restore system from backup."""
         restore_results = {
             'status': 'success',
@@ -358,22 +458,33 @@ class MaintenanceService:
                 raise Exception(f"Backup {backup_name} not found")
             
             # Load backup manifest
-            manifest_path = os.path.join(backup_path, 'manifest.json')
-            if os.path.exists(manifest_path):
-                with open(manifest_path, 'r') as f:
-                    import json
-                    manifest = json.load(f)
-            else:
+            manifest = read_manifest(backup_path)
+            if not manifest:
                 raise Exception("Backup manifest not found")
             
+            components = components or manifest['components']
+            chunked = manifest.get('format') == MANIFEST_FORMAT
+            config = get_backup_config()
+            store = self._chunk_store(config) if chunked else None
+            
             # Restore database
-            if 'database' in manifest['components']:
-                if self._restore_database(backup_path):
+            if 'database' in manifest['components'] and 'database' in components:
+                if chunked:
+                    with tempfile.TemporaryDirectory(dir=self.backup_directory) as tmp:
+                        restore_files(store, manifest['files']['database'], tmp, 1)
+                        restored = self._restore_database(tmp)
+                else:
+                    restored = self._restore_database(backup_path)
+                if restored:
                     restore_results['restored_components'].append('database')
             
             # Restore media files
-            if 'media_files' in manifest['components']:
-                if self._restore_media_files(backup_path):
+            if 'media_files' in manifest['components'] and 'media_files' in components:
+                if chunked:
+                    restored = self._restore_media_chunks(store, manifest['files']['media_files'], config)
+                else:
+                    restored = self._restore_media_files(backup_path)
+                if restored:
                     restore_results['restored_components'].append('media_files')
             
             logger.info(f"Backup restored successfully: {backup_name}")
@@ -404,20 +515,23 @@ class MaintenanceService:
             return False
     
     def _restore_postgresql(self, backup_path: str, db_config: Dict) -> bool:
-        """Restore PostgreSQL database."""
-        backup_file = os.path.join(backup_path, 'database.sql')
-        
-        if not os.path.exists(backup_file):
-            return False
+        """Restore PostgreSQL database from a custom format or plain SQL dump."""
+        dump_file = os.path.join(backup_path, 'database.dump')
+        sql_file = os.path.join(backup_path, 'database.sql')
         
-        cmd = [
-            'psql',
+        connection_args = [
             '-h', db_config.get('HOST', 'localhost'),
             '-p', str(db_config.get('PORT', 5432)),
             '-U', db_config['USER'],
             '-d', db_config['NAME'],
-            '-f', backup_file
         ]
+        if os.path.exists(dump_file):
+            cmd = ['pg_restore', '--clean', '--if-exists', '--no-owner'] + connection_args + [dump_file]
+        elif os.path.exists(sql_file):
+            # Backups made before the custom format
+            cmd = ['psql'] + connection_args + ['-f', sql_file]
+        else:
+            return False
         
         env = os.environ.copy()
         env['PGPASSWORD'] = db_config['PASSWORD']
@@ -426,18 +540,43 @@ class MaintenanceService:
         return result.returncode == 0
     
     def _restore_sqlite(self, backup_path: str, db_config: Dict) -> bool:
-        """Restore SQLite database."""
+        """Restore SQLite database through the online backup API."""
         backup_file = os.path.join(backup_path, 'database.sqlite3')
         
         if not os.path.exists(backup_file):
             return False
         
-        target_db = db_config['NAME']
-        shutil.copy2(backup_file, target_db)
+        # Writing pages through a connection instead of replacing the file
+        # keeps open connections from reading a half-copied database
+        target = self._sqlite_connection()
+        source = sqlite3.connect(backup_file)
+        try:
+            source.backup(target)
+        finally:
+            source.close()
+            target.close()
         return True
     
+    def _restore_media_chunks(self, store: ChunkStore, entries: List[Dict], config: Dict) -> bool:
+        """Reassemble media files from the chunk store and swap them in."""
+        try:
+            media_root = getattr(settings, 'MEDIA_ROOT', None)
+            if not media_root:
+                return False
+            
+            staging = f"{os.path.normpath(media_root)}.restore"
+            shutil.rmtree(staging, ignore_errors=True)
+            os.makedirs(staging)
+            restore_files(store, entries, staging, config['workers'])
+            replace_directory(staging, media_root)
+            return True
+            
+        except Exception as e:
+            logger.error(f"Media files restore failed: {e}")
+            return False
+    
     def _restore_media_files(self, backup_path: str) -> bool:
-        """Restore media files from backup."""
+        """Restore media files from a backup made before the chunk store."""
         try:
             media_backup_path = os.path.join(backup_path, 'media')
             
@@ -471,11 +610,11 @@ class MaintenanceService:
             for backup_name in os.listdir(self.backup_directory):
                 backup_path = os.path.join(self.backup_directory, backup_name)
                 
-                if os.path.isdir(backup_path):
+                if os.path.isdir(backup_path) and not backup_name.startswith('.'):
                     backup_info = {
                         'name': backup_name,
                         'path': backup_path,
-                        'size': self._calculate_directory_size(backup_path),
+                        'size': 0,
                         'created_at': datetime.fromtimestamp(
                             os.path.getctime(backup_path)
                         ).isoformat(),
@@ -483,15 +622,20 @@ class MaintenanceService:
                     }
                     
                     # Load manifest if available
-                    manifest_path = os.path.join(backup_path, 'manifest.json')
-                    if os.path.exists(manifest_path):
-                        try:
-                            with open(manifest_path, 'r') as f:
-                                import json
-                                manifest = json.load(f)
-                                backup_info.update(manifest)
-                        except Exception:
-                            pass
+                    manifest = None
+                    try:
+                        manifest = read_manifest(backup_path)
+                    except Exception:
+                        pass
+                    
+                    if manifest and manifest.get('format') == MANIFEST_FORMAT:
+                        # Chunked snapshots share storage, their size is what they added
+                        manifest.pop('files', None)
+                        backup_info['size'] = manifest['stored_size']
+                    else:
+                        backup_info['size'] = self._calculate_directory_size(backup_path)
+                    if manifest:
+                        backup_info.update(manifest)
                     
                     backups.append(backup_info)
             
@@ -586,7 +730,7 @@ class MaintenanceService:
             }
             
             # Performance information
-            recent_health = SystemHealth.objects.filter(
+            recent_health = SystemHealthMetric.objects.filter(
                 timestamp__gte=timezone.now() - timedelta(hours=1)
             ).aggregate(
                 avg_response_time=models.Avg('response_time'),
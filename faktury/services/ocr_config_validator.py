@@ -5,6 +5,7 @@ This module provides validation and startup checks for the OCR system
 to ensure proper configuration and availability of required services.
 """
 
+import importlib.util
 import logging
 import os
 import requests
@@ -358,6 +359,20 @@ class OCRConfigValidator:
         except Exception as e:
             self.errors.append(f"Error validating environment variables: {e}")
     
+    @staticmethod
+    def _require_module(module_name: str):
+        """
+        Check that a module is installed without importing it
+        
+        Importing cv2/paddleocr/easyocr here would load them into every web worker.
+        """
+        try:
+            spec = importlib.util.find_spec(module_name)
+        except (ImportError, ValueError):
+            spec = None
+        if spec is None:
+            raise ImportError(f"No module named '{module_name}'")
+    
     def _validate_dependencies(self):
         """Validate that required dependencies are available"""
         try:
@@ -371,7 +386,7 @@ class OCRConfigValidator:
             
             for module_name, description in required_modules:
                 try:
-                    __import__(module_name)
+                    self._require_module(module_name)
                     self.info.append(f"Required dependency available: {module_name}")
                 except ImportError:
                     self.errors.append(f"Missing required dependency: {module_name} ({description})")
@@ -394,7 +409,7 @@ class OCRConfigValidator:
             
             for module_name, description in optional_modules:
                 try:
-                    __import__(module_name)
+                    self._require_module(module_name)
                     self.info.append(f"Optional dependency available: {module_name}")
                 except ImportError:
                     self.warnings.append(f"Optional dependency not available: {module_name} ({description})")
@@ -407,7 +422,7 @@ class OCRConfigValidator:
             
             for module_name, description in deprecated_modules:
                 try:
-                    __import__(module_name)
+                    self._require_module(module_name)
                     self.warnings.append(f"Deprecated dependency still installed: {module_name} ({description})")
                 except ImportError:
                     self.info.append(f"Deprecated dependency properly removed: {module_name}")
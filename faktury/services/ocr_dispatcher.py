@@ -0,0 +1,206 @@
+"""
+Fair, chunked dispatch of pending OCR results to Celery
+
+Pending OCR results are read with keyset pagination, interleaved round-robin
+across users so a single large backlog cannot starve other users, and sent as
+one ``group`` of chunk tasks. Dispatched results are claimed as 'processing'
+with a ``dispatched_at`` timestamp. The number of live claims caps how many
+results are queued at once, so every run only tops the queue up to
+``max_in_flight``. Claims older than ``claim_timeout`` belong to chunks that
+were lost (killed worker, dropped broker message) and are returned to the
+backlog at the start of each run.
+"""
+
+import logging
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from celery import group
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from faktury.models import OCRResult
+
+logger = logging.getLogger(__name__)
+
+LOCK_CACHE_KEY = 'ocr_dispatch:lock'
+
+DEFAULT_CONFIG = {
+    'chunk_size': 10,
+    'max_in_flight': 200,
+    'page_size': 1000,
+    'lock_timeout': 300,
+    'claim_timeout': 1800,
+}
+
+
+def round_robin(queues: Dict[int, deque], limit: int) -> List[int]:
+    """Take one item per queue in turn until ``limit`` items or all queues are drained"""
+    queues = OrderedDict((key, queue) for key, queue in queues.items() if queue)
+    selected = []
+    while queues and len(selected) < limit:
+        for key in list(queues):
+            selected.append(queues[key].popleft())
+            if not queues[key]:
+                del queues[key]
+            if len(selected) >= limit:
+                break
+    return selected
+
+
+@dataclass
+class DispatchResult:
+    """Outcome of one dispatcher run"""
+    total_found: int = 0
+    queued: int = 0
+    chunks: int = 0
+    in_flight: int = 0
+    reaped: int = 0
+    users: int = 0
+    throttled: bool = False
+    per_user: Dict[int, int] = field(default_factory=dict)
+
+
+class OCRBacklogDispatcher:
+    """
+    Dispatch pending OCR results in fair, bounded chunks
+
+    Args:
+        chunk_size: OCR results processed by one chunk task
+        max_in_flight: Dispatched results allowed to be unfinished at once
+        page_size: Rows read per keyset page
+        claim_timeout: Seconds after which an unfinished claim is returned to the backlog
+        cache_backend: Cache holding the run lock
+    """
+
+    def __init__(self, chunk_size: Optional[int] = None, max_in_flight: Optional[int] = None,
+                 page_size: Optional[int] = None, claim_timeout: Optional[int] = None, cache_backend=None):
+        config = {**DEFAULT_CONFIG, **getattr(settings, 'OCR_DISPATCH_CONFIG', {})}
+        self.chunk_size = max(chunk_size or config['chunk_size'], 1)
+        self.max_in_flight = max_in_flight if max_in_flight is not None else config['max_in_flight']
+        self.page_size = max(page_size or config['page_size'], 1)
+        self.claim_timeout = claim_timeout if claim_timeout is not None else config['claim_timeout']
+        self.lock_timeout = config['lock_timeout']
+        self.cache = cache_backend or cache
+
+    def claims(self):
+        """Results claimed by the dispatcher and not finished yet"""
+        return OCRResult.objects.filter(processing_status='processing', dispatched_at__isnull=False)
+
+    def in_flight(self) -> int:
+        """Dispatched results not finished yet"""
+        return self.claims().count()
+
+    def reap(self) -> int:
+        """Return claims older than ``claim_timeout`` to the backlog, their chunks were lost"""
+        cutoff = timezone.now() - timedelta(seconds=self.claim_timeout)
+        reaped = self.claims().filter(dispatched_at__lt=cutoff).update(processing_status='pending', dispatched_at=None)
+        if reaped:
+            logger.warning(f"Returned {reaped} OCR results claimed before {cutoff.isoformat()} to the backlog")
+        return reaped
+
+    def iter_pending(self):
+        """Yield (ocr_result_id, user_id) of pending results in id order, one keyset page at a time"""
+        last_id = 0
+        while True:
+            page = list(
+                OCRResult.objects
+                .filter(processing_status='pending', pk__gt=last_id)
+                .order_by('pk')
+                .values_list('pk', 'document__user_id')[:self.page_size]
+            )
+            yield from page
+            if len(page) < self.page_size:
+                return
+            last_id = page[-1][0]
+
+    def select(self, capacity: int):
+        """
+        Pick up to ``capacity`` pending results, round-robin across users
+
+        Users take turns in order of their oldest pending result and each
+        user's results keep their id order. At most ``capacity`` ids are kept
+        per user, so memory stays bounded however skewed the backlog is.
+
+        Returns:
+            tuple: (selected ids, {id: user_id}, total pending results)
+        """
+        queues: Dict[int, deque] = OrderedDict()
+        owners = {}
+        total = 0
+        for ocr_result_id, user_id in self.iter_pending():
+            total += 1
+            queue = queues.setdefault(user_id, deque())
+            if len(queue) < capacity:
+                queue.append(ocr_result_id)
+                owners[ocr_result_id] = user_id
+
+        selected = round_robin(queues, capacity)
+        return selected, {pk: owners[pk] for pk in selected}, total
+
+    def build_group(self, ocr_result_ids: List[int]) -> group:
+        """Group of chunk task signatures, chunks keep the round-robin order"""
+        from faktury.tasks import process_ocr_result_chunk_task
+
+        return group(
+            process_ocr_result_chunk_task.si(ocr_result_ids[i:i + self.chunk_size])
+            for i in range(0, len(ocr_result_ids), self.chunk_size)
+        )
+
+    def dispatch(self) -> DispatchResult:
+        """Top the queue up to ``max_in_flight`` with pending results"""
+        result = DispatchResult()
+        if not self.cache.add(LOCK_CACHE_KEY, 1, self.lock_timeout):
+            logger.info("OCR dispatch already running, skipping")
+            result.throttled = True
+            result.in_flight = self.in_flight()
+            return result
+
+        try:
+            result.reaped = self.reap()
+            in_flight = self.in_flight()
+            capacity = self.max_in_flight - in_flight
+            result.in_flight = in_flight
+            if capacity <= 0:
+                result.throttled = True
+                result.total_found = OCRResult.objects.filter(processing_status='pending').count()
+                return result
+
+            selected, owners, result.total_found = self.select(capacity)
+            result.throttled = result.total_found > len(selected)
+            if not selected:
+                return result
+
+            # Claim the results so the next run does not dispatch them again
+            claimed_at = timezone.now()
+            for i in range(0, len(selected), self.page_size):
+                OCRResult.objects.filter(
+                    pk__in=selected[i:i + self.page_size], processing_status='pending'
+                ).update(processing_status='processing', dispatched_at=claimed_at)
+
+            result.in_flight = in_flight + len(selected)
+            signature = self.build_group(selected)
+            try:
+                signature.apply_async()
+            except Exception:
+                self._unclaim(selected)
+                raise
+
+            result.queued = len(selected)
+            result.chunks = len(signature.tasks)
+            for user_id in owners.values():
+                result.per_user[user_id] = result.per_user.get(user_id, 0) + 1
+            result.users = len(result.per_user)
+            return result
+        finally:
+            self.cache.delete(LOCK_CACHE_KEY)
+
+    def _unclaim(self, ocr_result_ids: List[int]):
+        """Return results to the backlog after a failed enqueue"""
+        for i in range(0, len(ocr_result_ids), self.page_size):
+            OCRResult.objects.filter(
+                pk__in=ocr_result_ids[i:i + self.page_size], processing_status='processing'
+            ).update(processing_status='pending', dispatched_at=None)
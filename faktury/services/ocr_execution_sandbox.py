@@ -0,0 +1,406 @@
+"""
+OCR Execution Sandbox
+
+This module runs OCR engine calls in pre-forked child processes, so that a
+single bad document cannot hang or crash the calling worker. Every call gets
+a real wall-clock timeout (the child is killed, not signalled), children run
+under a memory rlimit and are respawned automatically after a timeout, a
+crash or a configured number of tasks. Retries can be executed with
+progressively degraded processing parameters.
+
+Unlike ``signal.alarm`` based timeouts, the sandbox works from any thread,
+including Celery worker threads and ``ThreadPoolExecutor`` workers.
+"""
+
+import logging
+import multiprocessing
+import pickle
+import queue
+import signal
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .paddle_ocr_exceptions import (
+    PaddleOCRMemoryError,
+    PaddleOCRProcessingError,
+    PaddleOCRTimeoutError,
+)
+from .paddle_ocr_timeout_handler import DegradationLevel, TimeoutResult, TimeoutStrategy
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SandboxConfig:
+    """Sandbox configuration"""
+    workers: int = 2
+    timeout: float = 60.0
+    # Address space a child may allocate on top of its forked baseline (None = unlimited)
+    memory_limit_mb: Optional[float] = 2048.0
+    max_tasks_per_child: int = 100
+    degradation_levels: List[DegradationLevel] = field(default_factory=lambda: [
+        DegradationLevel.REDUCE_QUALITY,
+        DegradationLevel.REDUCE_FEATURES,
+        DegradationLevel.MINIMAL_PROCESSING
+    ])
+
+
+def get_process_context():
+    """
+    Get the multiprocessing context used to fork worker processes
+
+    Celery prefork pool workers are daemonic processes, which the standard
+    library does not allow to have children; billiard (Celery's fork of
+    multiprocessing) does, so it is used there when available.
+    """
+    if multiprocessing.current_process().daemon:
+        try:
+            import billiard
+            return billiard.get_context('fork')
+        except ImportError:
+            pass
+
+    start_methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('fork' if 'fork' in start_methods else None)
+
+
+def _apply_memory_limit(memory_limit_mb: Optional[float]):
+    """Limit the address space of the current (child) process"""
+    if not memory_limit_mb:
+        return
+
+    try:
+        import resource
+    except ImportError:  # pragma: no cover - not available on Windows
+        return
+
+    baseline = 0
+    try:
+        import psutil
+        baseline = psutil.Process().memory_info().vms
+    except Exception:
+        pass
+
+    limit = int(baseline + memory_limit_mb * 1024 * 1024)
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ValueError, OSError) as e:
+        logger.warning(f"Could not apply sandbox memory limit: {e}")
+
+
+def _sandbox_child_main(conn, targets: Dict[str, Any], memory_limit_mb: Optional[float]):
+    """Main loop of a sandbox child process"""
+    # Children are controlled by the parent only
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    _apply_memory_limit(memory_limit_mb)
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            break
+        if message is None:
+            break
+
+        target, method, args, kwargs = message
+        try:
+            if isinstance(target, str):
+                obj = targets[target]
+                func = getattr(obj, method) if method else obj
+            else:
+                func = target
+            response = (True, func(*args, **kwargs))
+        except BaseException as e:
+            response = (False, e)
+
+        try:
+            conn.send(response)
+        except Exception as e:
+            # Result or exception could not be pickled
+            conn.send((False, RuntimeError(f"Sandbox could not return result: {e!r}")))
+
+
+class _SandboxProcess:
+    """Single pre-forked sandbox child with its control pipe"""
+
+    def __init__(self, context, targets: Dict[str, Any], memory_limit_mb: Optional[float]):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_sandbox_child_main,
+            args=(child_conn, targets, memory_limit_mb),
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.tasks_done = 0
+
+    def is_alive(self) -> bool:
+        return self.process.is_alive()
+
+    def stop(self, kill: bool = False):
+        """Stop the child, killing it immediately when requested"""
+        try:
+            if kill:
+                self.process.kill()
+            else:
+                try:
+                    self.conn.send(None)
+                except Exception:
+                    pass
+                self.process.join(timeout=2.0)
+                if self.process.is_alive():
+                    self.process.kill()
+            self.process.join(timeout=2.0)
+        finally:
+            self.conn.close()
+
+
+class OCRExecutionSandbox:
+    """
+    Pool of pre-forked child processes executing OCR calls with hard limits
+
+    Calls are either picklable callables (module-level functions) or methods of
+    named ``targets``. Targets are handed to the children when they are forked,
+    so heavy engines are loaded once and stay warm between calls.
+    """
+
+    def __init__(self,
+                 config: Optional[SandboxConfig] = None,
+                 targets: Optional[Dict[str, Any]] = None):
+        """
+        Initialize sandbox and fork worker processes
+
+        Args:
+            config: Sandbox configuration
+            targets: Named objects (e.g. OCR engines) callable in the children
+        """
+        self.config = config or SandboxConfig()
+        self.targets = dict(targets or {})
+
+        self._context = get_process_context()
+
+        self._idle: 'queue.Queue[_SandboxProcess]' = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self.stats = {
+            'total_calls': 0,
+            'successful_calls': 0,
+            'failed_calls': 0,
+            'timeouts': 0,
+            'crashes': 0,
+            'respawns': 0,
+            'degraded_successes': 0
+        }
+
+        for _ in range(self.config.workers):
+            self._idle.put(self._spawn())
+
+        logger.info(f"OCR execution sandbox started with {self.config.workers} workers")
+
+    def _spawn(self) -> _SandboxProcess:
+        return _SandboxProcess(self._context, self.targets, self.config.memory_limit_mb)
+
+    def _respawn(self, worker: _SandboxProcess, kill: bool) -> _SandboxProcess:
+        worker.stop(kill=kill)
+        with self._lock:
+            self.stats['respawns'] += 1
+        return self._spawn()
+
+    def _record(self, stat: str):
+        with self._lock:
+            self.stats[stat] += 1
+
+    @staticmethod
+    def can_execute(func: Callable) -> bool:
+        """Check whether a callable can be sent to a sandbox child"""
+        try:
+            pickle.dumps(func)
+            return True
+        except Exception:
+            return False
+
+    def execute(self, func: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        Execute a picklable callable in a sandbox child
+
+        Args:
+            func: Module-level function (or other picklable callable)
+            timeout: Wall-clock timeout in seconds (uses config default if None)
+
+        Returns:
+            Return value of the call
+
+        Raises:
+            PaddleOCRTimeoutError: Call did not finish in time; the child was killed
+            PaddleOCRMemoryError: Call exceeded the memory limit
+            PaddleOCRProcessingError: Child process crashed
+        """
+        return self._run((func, None, args, kwargs), timeout, getattr(func, '__name__', repr(func)))
+
+    def call(self, target: str, method: Optional[str], *args,
+             timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        Call a method of a named target inside a sandbox child
+
+        Args:
+            target: Name of the target registered at construction
+            method: Method name (None calls the target itself)
+            timeout: Wall-clock timeout in seconds (uses config default if None)
+        """
+        if target not in self.targets:
+            raise ValueError(f"Unknown sandbox target: {target}")
+        operation = f"{target}.{method}" if method else target
+        return self._run((target, method, args, kwargs), timeout, operation)
+
+    def _run(self, message: Tuple, timeout: Optional[float], operation: str) -> Any:
+        if self._closed:
+            raise RuntimeError("OCR execution sandbox is shut down")
+
+        timeout = timeout or self.config.timeout
+        self._record('total_calls')
+
+        worker = self._idle.get()
+        start_time = time.time()
+        try:
+            if not worker.is_alive():
+                worker = self._respawn(worker, kill=True)
+
+            try:
+                worker.conn.send(message)
+            except (pickle.PicklingError, TypeError, AttributeError) as e:
+                self._record('failed_calls')
+                raise ValueError(f"Sandbox call {operation} is not picklable: {e}")
+
+            if not worker.conn.poll(timeout):
+                elapsed = time.time() - start_time
+                self._record('timeouts')
+                self._record('failed_calls')
+                worker = self._respawn(worker, kill=True)
+                raise PaddleOCRTimeoutError(
+                    f"Operation {operation} timed out after {elapsed:.2f}s",
+                    timeout_seconds=timeout,
+                    elapsed_seconds=elapsed,
+                    operation=operation
+                )
+
+            try:
+                success, payload = worker.conn.recv()
+            except (EOFError, OSError) as e:
+                worker.process.join(timeout=1.0)
+                exitcode = worker.process.exitcode
+                self._record('crashes')
+                self._record('failed_calls')
+                worker = self._respawn(worker, kill=True)
+                raise PaddleOCRProcessingError(
+                    f"Sandbox worker crashed during {operation} (exit code {exitcode})",
+                    processing_stage='sandbox',
+                    details={'exitcode': exitcode},
+                    original_error=e
+                )
+
+            worker.tasks_done += 1
+            if worker.tasks_done >= self.config.max_tasks_per_child:
+                worker = self._respawn(worker, kill=False)
+
+            if success:
+                self._record('successful_calls')
+                return payload
+
+            self._record('failed_calls')
+            if isinstance(payload, MemoryError):
+                raise PaddleOCRMemoryError(
+                    f"Operation {operation} exceeded sandbox memory limit",
+                    memory_limit_mb=self.config.memory_limit_mb,
+                    original_error=payload
+                )
+            raise payload
+        finally:
+            if self._closed:
+                worker.stop()
+            else:
+                self._idle.put(worker)
+
+    def execute_with_degradation(self,
+                                 func: Callable,
+                                 *args,
+                                 timeout: Optional[float] = None,
+                                 degrade: Optional[Callable[[tuple, dict, DegradationLevel], Tuple[tuple, dict]]] = None,
+                                 **kwargs) -> TimeoutResult:
+        """
+        Execute a callable, retrying with degraded parameters after a timeout or crash
+
+        The first attempt uses the original arguments. Each retry applies the
+        next configured ``DegradationLevel`` through ``degrade`` (by default the
+        level value is passed as the ``degradation_level`` keyword argument).
+
+        Returns:
+            TimeoutResult describing the final attempt
+        """
+        degrade = degrade or _pass_degradation_level
+        start_time = time.time()
+        levels: List[Optional[DegradationLevel]] = [None] + list(self.config.degradation_levels)
+        last_error: Optional[Exception] = None
+
+        for level in levels:
+            call_args, call_kwargs = (args, kwargs) if level is None else degrade(args, kwargs, level)
+            try:
+                result = self.execute(func, *call_args, timeout=timeout, **call_kwargs)
+            except (PaddleOCRTimeoutError, PaddleOCRMemoryError, PaddleOCRProcessingError) as e:
+                last_error = e
+                if level is not None:
+                    logger.warning(f"Degraded attempt ({level.value}) failed: {e}")
+                continue
+
+            if level is not None:
+                self._record('degraded_successes')
+            return TimeoutResult(
+                success=True,
+                result=result,
+                elapsed_time=time.time() - start_time,
+                timeout_occurred=isinstance(last_error, PaddleOCRTimeoutError),
+                degradation_applied=level,
+                strategy_used=TimeoutStrategy.GRACEFUL,
+                error=None
+            )
+
+        return TimeoutResult(
+            success=False,
+            result=None,
+            elapsed_time=time.time() - start_time,
+            timeout_occurred=isinstance(last_error, PaddleOCRTimeoutError),
+            degradation_applied=levels[-1],
+            strategy_used=TimeoutStrategy.GRACEFUL,
+            error=last_error
+        )
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get sandbox statistics"""
+        with self._lock:
+            stats = self.stats.copy()
+        stats.update({
+            'workers': self.config.workers,
+            'idle_workers': self._idle.qsize(),
+            'timeout': self.config.timeout,
+            'memory_limit_mb': self.config.memory_limit_mb
+        })
+        return stats
+
+    def shutdown(self):
+        """Stop all sandbox children"""
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            worker.stop()
+        logger.info("OCR execution sandbox shut down")
+
+
+def _pass_degradation_level(args: tuple, kwargs: dict, level: DegradationLevel) -> Tuple[tuple, dict]:
+    """Default degradation: pass the level value as ``degradation_level`` keyword"""
+    return args, dict(kwargs, degradation_level=level.value)
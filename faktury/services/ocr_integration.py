@@ -12,14 +12,19 @@ from decimal import Decimal, InvalidOperation
 from datetime import datetime, date, timedelta
 from typing import Dict, Any, Optional, Tuple, List
 from django.db import transaction, models
+from django.db.models import Value
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 
-from ..models import OCRResult, Faktura, Kontrahent, Firma, PozycjaFaktury, OCRValidation
+from ..cache_utils import invalidate_user_cache
+from ..models import DocumentUpload, OCRResult, Faktura, Kontrahent, Firma, PozycjaFaktury, OCRValidation
 from .status_sync_service import StatusSyncService, StatusSyncError
+from .calendar_feed import bump_calendar_version
+from .partnership_analytics import bump_partnership_version
+from .registry_lookup import COMPANY_FIELDS, enrich_companies, enrichment_enabled
 from .ocr_service_factory import get_ocr_service
-from .ocr_fallback_handler import OCRFallbackHandler, ManualReviewQueue
 from .ocr_security_service import (
     get_file_encryption_service,
     get_ocr_auth_service,
@@ -423,35 +428,15 @@ class FakturaCreator:
             OCRIntegrationError: If creation fails
         """
         try:
+            # Validate and normalize data format for internal processing
+            engine_type, normalized_data = self._validate_and_normalize(ocr_result)
+            
+            # Registry requests run before the transaction, so they never hold it open
+            completion, = self._registry_completions([normalized_data])
+            
             with transaction.atomic():
-                extracted_data = ocr_result.extracted_data
-                
-                # Detect OCR engine type from processor version
-                engine_type = self._detect_engine_type(ocr_result)
-                
-                # Enhanced validation with engine-specific handling
-                is_valid, errors = OCRDataValidator.validate_ocr_data(
-                    extracted_data, 
-                    ocr_result.confidence_score,
-                    engine_type
-                )
-                
-                # Apply processing strategy
-                strategy_config = self.strategies.get(self.processing_strategy, self.strategies['standard'])
-                
-                if not is_valid:
-                    if ocr_result.confidence_score < strategy_config['min_confidence']:
-                        raise OCRIntegrationError(f"Błędy walidacji (niska pewność {ocr_result.confidence_score:.1f}%): {'; '.join(errors)}")
-                    elif strategy_config['require_all_fields']:
-                        raise OCRIntegrationError(f"Błędy walidacji (tryb ścisły): {'; '.join(errors)}")
-                    else:
-                        logger.warning(f"Proceeding with validation errors due to {self.processing_strategy} strategy: {'; '.join(errors)}")
-                
-                # Normalize data format for internal processing
-                normalized_data = self._normalize_extracted_data(extracted_data, engine_type)
-                
                 # Get or create kontrahent with enhanced data handling
-                kontrahent = self._get_or_create_kontrahent_enhanced(normalized_data, engine_type)
+                kontrahent = self._get_or_create_kontrahent_enhanced(normalized_data, engine_type, completion)
                 
                 # Get user's company
                 try:
@@ -493,6 +478,239 @@ class FakturaCreator:
             
             raise OCRIntegrationError(f"Nie udało się utworzyć faktury: {str(e)}")
     
+    def create_many_from_ocr(self, ocr_results: List[OCRResult]) -> Dict[str, Any]:
+        """
+        Create Faktury for a batch of OCR results with shared lookups
+        
+        Kontrahenci are resolved from a single NIP lookup for the whole batch,
+        and invoices, positions, OCR result links and document statuses are
+        written with bulk queries in one transaction, so the number of queries
+        does not grow with the number of line items. If the batched write
+        fails, it is rolled back and every result is created on its own with
+        create_from_ocr.
+        
+        Args:
+            ocr_results: OCRResult instances
+            
+        Returns:
+            Dict with 'created' Faktury (in input order) and 'failed' entries
+            ({'ocr_result_id', 'error'}) for results that could not be created
+        """
+        created, failed, prepared = [], [], []
+        
+        try:
+            firma = self.user.firma
+        except Firma.DoesNotExist:
+            firma = None
+        
+        for ocr_result in ocr_results:
+            try:
+                if firma is None:
+                    raise OCRIntegrationError("Użytkownik nie ma przypisanej firmy")
+                engine_type, normalized_data = self._validate_and_normalize(ocr_result)
+                prepared.append((ocr_result, engine_type, normalized_data))
+            except Exception as e:
+                logger.error(f"Failed to create Faktura from OCR result {ocr_result.id}: {str(e)}")
+                self._handle_creation_error(ocr_result, e)
+                failed.append({'ocr_result_id': ocr_result.id, 'error': f"Nie udało się utworzyć faktury: {str(e)}"})
+        
+        if prepared:
+            # Registry requests run before the transaction, so they never hold it open
+            completions = self._registry_completions([data for _, _, data in prepared])
+            try:
+                with transaction.atomic():
+                    created = self._create_batch(prepared, firma, completions)
+                    # bulk_create sends no signals, so the versions are bumped here
+                    bump_calendar_version(self.user.id)
+                    bump_partnership_version(firma.pk)
+                    invalidate_user_cache(self.user.id, 'user_stats')
+            except Exception as e:
+                logger.error(f"Batched Faktura creation failed, creating {len(prepared)} invoices one by one: {str(e)}", exc_info=True)
+                for ocr_result, _, _ in prepared:
+                    ocr_result.refresh_from_db()
+                    try:
+                        created.append(self.create_from_ocr(ocr_result))
+                    except OCRIntegrationError as error:
+                        failed.append({'ocr_result_id': ocr_result.id, 'error': str(error)})
+        
+        logger.info(f"Created {len(created)} Faktury from {len(ocr_results)} OCR results ({len(failed)} failed)")
+        return {'created': created, 'failed': failed}
+    
+    def _validate_and_normalize(self, ocr_result: OCRResult) -> Tuple[str, Dict[str, Any]]:
+        """
+        Validate OCR data against the processing strategy and normalize it
+        
+        Returns:
+            Tuple of engine type and normalized data
+            
+        Raises:
+            OCRIntegrationError: If validation fails under the processing strategy
+        """
+        extracted_data = ocr_result.extracted_data
+        
+        # Detect OCR engine type from processor version
+        engine_type = self._detect_engine_type(ocr_result)
+        
+        # Enhanced validation with engine-specific handling
+        is_valid, errors = OCRDataValidator.validate_ocr_data(
+            extracted_data, 
+            ocr_result.confidence_score,
+            engine_type
+        )
+        
+        # Apply processing strategy
+        strategy_config = self.strategies.get(self.processing_strategy, self.strategies['standard'])
+        
+        if not is_valid:
+            if ocr_result.confidence_score < strategy_config['min_confidence']:
+                raise OCRIntegrationError(f"Błędy walidacji (niska pewność {ocr_result.confidence_score:.1f}%): {'; '.join(errors)}")
+            elif strategy_config['require_all_fields']:
+                raise OCRIntegrationError(f"Błędy walidacji (tryb ścisły): {'; '.join(errors)}")
+            else:
+                logger.warning(f"Proceeding with validation errors due to {self.processing_strategy} strategy: {'; '.join(errors)}")
+        
+        return engine_type, self._normalize_extracted_data(extracted_data, engine_type)
+    
+    def _create_batch(self, prepared: List[Tuple[OCRResult, str, Dict[str, Any]]], firma: Firma,
+                      completions: Optional[List[Dict[str, str]]] = None) -> List[Faktura]:
+        """Write Faktury for validated OCR results with bulk queries"""
+        kontrahenci = self._resolve_kontrahenci([data for _, _, data in prepared], completions)
+        
+        generated_numbers = []
+        
+        def generate_number(firma):
+            number = self._generate_invoice_number(firma, offset=len(generated_numbers))
+            generated_numbers.append(number)
+            return number
+        
+        faktury = []
+        for (ocr_result, engine_type, data), kontrahent in zip(prepared, kontrahenci):
+            faktura = self._build_faktura(data, firma, kontrahent, ocr_result, engine_type, generate_number)
+            self._apply_ocr_metadata(faktura, ocr_result, engine_type)
+            faktury.append(faktura)
+        
+        # Invoices to kontrahenci linked to a Firma go through Faktura.save() for partner auto-booking
+        Faktura.objects.bulk_create([faktura for faktura in faktury if not faktura.nabywca.firma_id])
+        for faktura in faktury:
+            if faktura.nabywca.firma_id:
+                faktura.save(force_insert=True)
+        
+        PozycjaFaktury.objects.bulk_create([
+            position
+            for faktura, (_, _, data) in zip(faktury, prepared)
+            for position in self._build_positions(faktura, data.get('pozycje', []))
+        ])
+        self._touch_faktury(faktury)
+        
+        ocr_results = [ocr_result for ocr_result, _, _ in prepared]
+        for ocr_result, faktura in zip(ocr_results, faktury):
+            ocr_result.faktura = faktura
+            ocr_result.auto_created_faktura = True
+            ocr_result.processing_status = 'completed'
+        OCRResult.objects.bulk_update(ocr_results, ['faktura', 'auto_created_faktura', 'processing_status'])
+        
+        # Same transition StatusSyncService.sync_document_status makes for completed OCR results
+        document_status = StatusSyncService.OCR_TO_DOCUMENT_STATUS_MAP['completed']
+        DocumentUpload.objects.filter(
+            pk__in=[ocr_result.document_id for ocr_result in ocr_results]
+        ).exclude(processing_status=document_status).update(
+            processing_status=document_status,
+            processing_completed_at=Coalesce('processing_completed_at', Value(timezone.now()))
+        )
+        
+        return faktury
+    
+    def _registry_completions(self, normalized_data: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+        """
+        Registry data completing the sellers that are not kontrahenci yet
+        
+        Sellers with a NIP and incomplete OCR data are looked up in one batch.
+        Returns, per invoice, the seller fields the registry filled in.
+        """
+        completions = [{} for _ in normalized_data]
+        if not enrichment_enabled():
+            return completions
+        
+        seller_data = [self._kontrahent_data(data) for data in normalized_data]
+        nips = {data['nip'] for data in seller_data if data['nip']}
+        if not nips:
+            return completions
+        
+        known = set(Kontrahent.objects.filter(user=self.user, nip__in=nips).values_list('nip', flat=True))
+        new_sellers = [(i, data) for i, data in enumerate(seller_data) if data['nip'] and data['nip'] not in known]
+        original = {i: dict(data) for i, data in new_sellers}
+        enrich_companies([data for _, data in new_sellers])
+        
+        for i, data in new_sellers:
+            completions[i] = {
+                name: data[name] for name in COMPANY_FIELDS if data.get(name) and not original[i].get(name)
+            }
+        return completions
+    
+    def _resolve_kontrahenci(self, normalized_data: List[Dict[str, Any]],
+                             completions: Optional[List[Dict[str, str]]] = None) -> List[Kontrahent]:
+        """
+        Get or create the kontrahent of every invoice of a batch
+        
+        Existing kontrahenci are loaded with one query by NIP; name lookups run
+        only for sellers without a NIP match, once per name. Sellers repeated
+        within the batch share one new kontrahent, and new and updated
+        kontrahenci are written with one bulk query each. New sellers are
+        completed with the registry data of ``_registry_completions``.
+        """
+        seller_data = [self._kontrahent_data(data) for data in normalized_data]
+        
+        by_nip = {}
+        nips = {data['nip'] for data in seller_data if data['nip']}
+        if nips:
+            for kontrahent in Kontrahent.objects.filter(user=self.user, nip__in=nips).order_by('pk'):
+                by_nip.setdefault(kontrahent.nip, kontrahent)
+        
+        for data, completion in zip(seller_data, completions or []):
+            if data['nip'] not in by_nip:
+                data.update(completion)
+        
+        # Sellers without a NIP match fall back to the partial name match of _find_kontrahent_by_name
+        prefixes = {data['nazwa'][:20] for data in seller_data if data['nazwa'] and data['nip'] not in by_nip}
+        by_name = self._find_kontrahenci_by_names(prefixes) if prefixes else {}
+        
+        new_kontrahenci, changed_fields = [], {}
+        kontrahenci = []
+        
+        for data in seller_data:
+            kontrahent = by_nip.get(data['nip']) if data['nip'] else None
+            
+            if not kontrahent and data['nazwa']:
+                prefix = data['nazwa'][:20].lower()
+                kontrahent = by_name.get(prefix) or next(
+                    (new for new in new_kontrahenci if prefix in new.nazwa.lower()), None
+                )
+            
+            if kontrahent:
+                changed = self._fill_kontrahent_data(kontrahent, data)
+                if changed and kontrahent.pk:
+                    changed_fields.setdefault(kontrahent.pk, (kontrahent, set()))[1].update(changed)
+            else:
+                kontrahent = Kontrahent(**self._new_kontrahent_kwargs(data))
+                new_kontrahenci.append(kontrahent)
+            
+            if data['nip'] and kontrahent.nip == data['nip']:
+                by_nip.setdefault(data['nip'], kontrahent)
+            kontrahenci.append(kontrahent)
+        
+        Kontrahent.objects.bulk_create(new_kontrahenci)
+        if changed_fields:
+            # bulk_update skips auto_now, and the stamp is part of the invoice PDF fingerprint
+            now = timezone.now()
+            for kontrahent, _ in changed_fields.values():
+                kontrahent.updated_at = now
+            Kontrahent.objects.bulk_update(
+                [kontrahent for kontrahent, _ in changed_fields.values()],
+                sorted(set().union(*(fields for _, fields in changed_fields.values()))) + ['updated_at']
+            )
+        
+        return kontrahenci
+    
     def _detect_engine_type(self, ocr_result: OCRResult) -> str:
         """Detect OCR engine type from processor version or other metadata"""
         processor_version = ocr_result.processor_version or ''
@@ -590,7 +808,7 @@ class FakturaCreator:
                     'ilosc': item.get('quantity', '1'),
                     'jednostka': item.get('unit', 'szt'),
                     'cena_netto': item.get('unit_price', '0'),
-                    'vat': item.get('vat_rate', '23%'),
+                    'vat': item.get('vat_rate', '23'),
                     'wartosc_netto': item.get('net_amount', '0'),
                     'wartosc_brutto': item.get('gross_amount', '0')
                 }
@@ -598,22 +816,10 @@ class FakturaCreator:
         
         return converted
     
-    def _get_or_create_kontrahent_enhanced(self, normalized_data: Dict[str, Any], engine_type: str) -> Kontrahent:
+    def _get_or_create_kontrahent_enhanced(self, normalized_data: Dict[str, Any], engine_type: str,
+                                           completion: Optional[Dict[str, str]] = None) -> Kontrahent:
         """Enhanced kontrahent creation with better data handling"""
-        sprzedawca_data = {
-            'nazwa': normalized_data.get('sprzedawca_nazwa', ''),
-            'nip': self._clean_nip(normalized_data.get('sprzedawca_nip', '')),
-            'ulica': normalized_data.get('sprzedawca_ulica', ''),
-            'numer_domu': normalized_data.get('sprzedawca_numer_domu', ''),
-            'kod_pocztowy': normalized_data.get('sprzedawca_kod_pocztowy', ''),
-            'miejscowosc': normalized_data.get('sprzedawca_miejscowosc', ''),
-            'kraj': normalized_data.get('sprzedawca_kraj', 'Polska'),
-        }
-        
-        # Handle address parsing from single field if needed
-        if not sprzedawca_data['ulica'] and normalized_data.get('supplier_address'):
-            parsed_address = self._parse_address(normalized_data['supplier_address'])
-            sprzedawca_data.update(parsed_address)
+        sprzedawca_data = self._kontrahent_data(normalized_data)
         
         # Try to find existing kontrahent by NIP first, then by name
         existing_kontrahent = None
@@ -625,11 +831,7 @@ class FakturaCreator:
             ).first()
         
         if not existing_kontrahent and sprzedawca_data['nazwa']:
-            # Try to find by similar name
-            existing_kontrahent = Kontrahent.objects.filter(
-                user=self.user,
-                nazwa__icontains=sprzedawca_data['nazwa'][:20]  # Partial match
-            ).first()
+            existing_kontrahent = self._find_kontrahent_by_name(sprzedawca_data['nazwa'])
         
         if existing_kontrahent:
             logger.info(f"Found existing Kontrahent: {existing_kontrahent.nazwa}")
@@ -637,16 +839,59 @@ class FakturaCreator:
             self._update_kontrahent_data(existing_kontrahent, sprzedawca_data)
             return existing_kontrahent
         
-        # Create new kontrahent
-        kontrahent = Kontrahent.objects.create(
-            user=self.user,
-            czy_firma=True,
-            **{k: v for k, v in sprzedawca_data.items() if v}  # Only non-empty values
-        )
+        # Create new kontrahent, completing incomplete OCR data from the registry
+        sprzedawca_data.update(completion or {})
+        kontrahent = Kontrahent.objects.create(**self._new_kontrahent_kwargs(sprzedawca_data))
         
         logger.info(f"Created new Kontrahent: {kontrahent.nazwa}")
         return kontrahent
     
+    def _kontrahent_data(self, normalized_data: Dict[str, Any]) -> Dict[str, str]:
+        """Seller data of normalized OCR data in Kontrahent field names"""
+        sprzedawca_data = {
+            'nazwa': normalized_data.get('sprzedawca_nazwa', ''),
+            'nip': self._clean_nip(normalized_data.get('sprzedawca_nip', '')),
+            'ulica': normalized_data.get('sprzedawca_ulica', ''),
+            'numer_domu': normalized_data.get('sprzedawca_numer_domu', ''),
+            'kod_pocztowy': normalized_data.get('sprzedawca_kod_pocztowy', ''),
+            'miejscowosc': normalized_data.get('sprzedawca_miejscowosc', ''),
+            'kraj': normalized_data.get('sprzedawca_kraj', 'Polska'),
+        }
+        
+        # Handle address parsing from single field if needed
+        if not sprzedawca_data['ulica'] and normalized_data.get('supplier_address'):
+            parsed_address = self._parse_address(normalized_data['supplier_address'])
+            sprzedawca_data.update(parsed_address)
+        
+        return sprzedawca_data
+    
+    def _find_kontrahent_by_name(self, nazwa: str) -> Optional[Kontrahent]:
+        """Find a kontrahent with a similar name"""
+        return Kontrahent.objects.filter(
+            user=self.user,
+            nazwa__icontains=nazwa[:20]  # Partial match
+        ).first()
+    
+    def _find_kontrahenci_by_names(self, prefixes: set) -> Dict[str, Kontrahent]:
+        """First kontrahent (by pk) matching each name prefix, keyed by the lower-cased prefix"""
+        query = models.Q()
+        for prefix in prefixes:
+            query |= models.Q(nazwa__icontains=prefix)
+        
+        matches = {}
+        for kontrahent in Kontrahent.objects.filter(query, user=self.user).order_by('pk'):
+            for prefix in prefixes:
+                if prefix.lower() in kontrahent.nazwa.lower():
+                    matches.setdefault(prefix.lower(), kontrahent)
+        return matches
+    
+    def _new_kontrahent_kwargs(self, sprzedawca_data: Dict[str, str]) -> Dict[str, Any]:
+        return {
+            'user': self.user,
+            'czy_firma': True,
+            **{k: v for k, v in sprzedawca_data.items() if v}  # Only non-empty values
+        }
+    
     def _clean_nip(self, nip_str: str) -> str:
         """Clean NIP number format"""
         if not nip_str:
@@ -686,20 +931,31 @@ class FakturaCreator:
     
     def _update_kontrahent_data(self, kontrahent: Kontrahent, new_data: Dict[str, str]):
         """Update existing kontrahent with new data if fields are empty"""
-        updated = False
+        if self._fill_kontrahent_data(kontrahent, new_data):
+            kontrahent.save()
+            logger.info(f"Updated Kontrahent {kontrahent.nazwa} with new data")
+    
+    def _fill_kontrahent_data(self, kontrahent: Kontrahent, new_data: Dict[str, str]) -> List[str]:
+        """Fill empty kontrahent fields with new data, returning the changed field names"""
+        changed = []
         
         for field, value in new_data.items():
             if value and not getattr(kontrahent, field, None):
                 setattr(kontrahent, field, value)
-                updated = True
+                changed.append(field)
         
-        if updated:
-            kontrahent.save()
-            logger.info(f"Updated Kontrahent {kontrahent.nazwa} with new data")
+        return changed
     
     def _create_faktura_enhanced(self, normalized_data: Dict[str, Any], firma: Firma, 
                                kontrahent: Kontrahent, ocr_result: OCRResult, engine_type: str) -> Faktura:
         """Enhanced Faktura creation with better data handling"""
+        faktura = self._build_faktura(normalized_data, firma, kontrahent, ocr_result, engine_type)
+        faktura.save(force_insert=True)
+        return faktura
+    
+    def _build_faktura(self, normalized_data: Dict[str, Any], firma: Firma, kontrahent: Kontrahent,
+                       ocr_result: OCRResult, engine_type: str, generate_number=None) -> Faktura:
+        """Build an unsaved Faktura from normalized OCR data"""
         
         # Parse dates with enhanced format support
         data_wystawienia = self._parse_date_enhanced(normalized_data.get('data_wystawienia'))
@@ -715,10 +971,10 @@ class FakturaCreator:
         # Generate invoice number if not provided or invalid
         numer_faktury = normalized_data.get('numer_faktury', '')
         if not numer_faktury or len(numer_faktury) < 3:
-            numer_faktury = self._generate_invoice_number(firma)
+            numer_faktury = (generate_number or self._generate_invoice_number)(firma)
             logger.warning(f"Generated invoice number {numer_faktury} due to missing/invalid OCR extraction")
         
-        faktura = Faktura.objects.create(
+        return Faktura(
             user=self.user,
             typ_dokumentu='FV',  # Default to VAT invoice
             numer=numer_faktury,
@@ -735,10 +991,8 @@ class FakturaCreator:
             uwagi=f"Utworzona automatycznie z OCR {engine_type} (pewność: {ocr_result.confidence_score:.1f}%)",
             auto_numer=False,  # Don't auto-generate number, use OCR extracted
         )
-        
-        return faktura
     
-    def _generate_invoice_number(self, firma: Firma) -> str:
+    def _generate_invoice_number(self, firma: Firma, offset: int = 0) -> str:
         """Generate invoice number when OCR extraction fails"""
         from datetime import datetime
         current_date = datetime.now()
@@ -752,32 +1006,44 @@ class FakturaCreator:
             numer__startswith=base_number
         ).count()
         
-        return f"{base_number}/{existing_count + 1:03d}"
+        return f"{base_number}/{existing_count + offset + 1:03d}"
     
     def _create_positions_enhanced(self, faktura: Faktura, pozycje_data: list, engine_type: str):
         """Enhanced position creation with better error handling"""
+        PozycjaFaktury.objects.bulk_create(self._build_positions(faktura, pozycje_data))
+        self._touch_faktury([faktura])
+    
+    def _touch_faktury(self, faktury: List[Faktura]):
+        """Bump updated_at of faktury whose positions were bulk created, which skips touch_faktura_on_item_change"""
+        now = timezone.now()
+        Faktura.objects.filter(pk__in=[faktura.pk for faktura in faktury]).update(updated_at=now)
+        for faktura in faktury:
+            faktura.updated_at = now
+    
+    def _build_positions(self, faktura: Faktura, pozycje_data: list) -> List[PozycjaFaktury]:
+        """Build unsaved positions, with fallback positions for unparseable line items"""
         if not pozycje_data:
             # Create a default position if none provided
-            PozycjaFaktury.objects.create(
+            logger.warning(f"Created default position for Faktura {faktura.numer} due to missing OCR data")
+            return [PozycjaFaktury(
                 faktura=faktura,
                 nazwa="Pozycja z OCR (brak szczegółów)",
                 ilosc=Decimal('1'),
                 jednostka='szt',
                 cena_netto=Decimal('0.00'),
-                vat='23%'
-            )
-            logger.warning(f"Created default position for Faktura {faktura.numer} due to missing OCR data")
-            return
+                vat='23'
+            )]
         
+        positions = []
         for i, pozycja_data in enumerate(pozycje_data):
             try:
                 # Enhanced data parsing with fallbacks
                 nazwa = pozycja_data.get('nazwa', f'Pozycja {i+1}')
                 ilosc = self._parse_decimal(pozycja_data.get('ilosc', '1'))
                 cena_netto = self._parse_decimal(pozycja_data.get('cena_netto', '0'))
-                vat = str(pozycja_data.get('vat', '23%'))
+                vat = self._normalize_vat(pozycja_data.get('vat'))
                 
-                PozycjaFaktury.objects.create(
+                positions.append(PozycjaFaktury(
                     faktura=faktura,
                     nazwa=nazwa,
                     ilosc=ilosc,
@@ -786,18 +1052,40 @@ class FakturaCreator:
                     vat=vat,
                     rabat=self._parse_decimal(pozycja_data.get('rabat')) if pozycja_data.get('rabat') else None,
                     rabat_typ=pozycja_data.get('rabat_typ', 'procent') if pozycja_data.get('rabat') else None
-                )
+                ))
             except Exception as e:
                 logger.error(f"Failed to create position {i+1} for Faktura {faktura.numer}: {e}")
                 # Create fallback position
-                PozycjaFaktury.objects.create(
+                positions.append(PozycjaFaktury(
                     faktura=faktura,
                     nazwa=f"Pozycja {i+1} (błąd OCR)",
                     ilosc=Decimal('1'),
                     jednostka='szt',
                     cena_netto=Decimal('0.00'),
-                    vat='23%'
-                )
+                    vat='23'
+                ))
+        
+        return positions
+    
+    def _normalize_vat(self, value) -> str:
+        """
+        Map an OCR VAT rate ('23%', '8 %', 'ZW', 5) to a PozycjaFaktury VAT choice
+        
+        Rates without VAT ('np', 'oo') map to 'zw'. Missing and unknown rates
+        fall back to the standard 23% rate.
+        """
+        rate = str(value if value is not None else '').strip().lower().rstrip('%').strip().replace(',', '.')
+        if rate in ('zw', 'np', 'oo'):
+            return 'zw'
+        try:
+            rate = format(Decimal(rate).normalize(), 'f')
+        except InvalidOperation:
+            pass
+        if rate in dict(PozycjaFaktury._meta.get_field('vat').choices):
+            return rate
+        if value not in (None, ''):
+            logger.warning(f"Unknown VAT rate {value!r} in OCR data, using 23%")
+        return '23'
     
     def _parse_decimal(self, value) -> Decimal:
         """Parse decimal value with Polish format support"""
@@ -842,7 +1130,12 @@ class FakturaCreator:
     
     def _update_faktura_ocr_metadata(self, faktura: Faktura, ocr_result: OCRResult, engine_type: str):
         """Update Faktura with enhanced OCR metadata"""
-        faktura.source_document = ocr_result.document
+        self._apply_ocr_metadata(faktura, ocr_result, engine_type)
+        faktura.save()
+    
+    def _apply_ocr_metadata(self, faktura: Faktura, ocr_result: OCRResult, engine_type: str):
+        """Set OCR metadata fields on a Faktura without saving it"""
+        faktura.source_document_id = ocr_result.document_id
         faktura.ocr_confidence = ocr_result.confidence_score
         faktura.ocr_processing_time = ocr_result.processing_time
         faktura.ocr_extracted_at = timezone.now()
@@ -852,8 +1145,6 @@ class FakturaCreator:
         if engine_type not in (faktura.uwagi or ''):
             current_uwagi = faktura.uwagi or ''
             faktura.uwagi = f"{current_uwagi}\nSilnik OCR: {engine_type}".strip()
-        
-        faktura.save()
     
     def _handle_creation_error(self, ocr_result: OCRResult, error: Exception):
         """Enhanced error handling with retry logic"""
@@ -959,7 +1250,7 @@ class FakturaCreator:
                 ilosc=Decimal(str(pozycja_data['ilosc'])),
                 jednostka=pozycja_data.get('jednostka', 'szt'),
                 cena_netto=Decimal(str(pozycja_data['cena_netto'])),
-                vat=str(pozycja_data['vat']),
+                vat=self._normalize_vat(pozycja_data['vat']),
                 rabat=pozycja_data.get('rabat'),
                 rabat_typ=pozycja_data.get('rabat_typ', 'procent') if pozycja_data.get('rabat') else None
             )
@@ -1468,8 +1759,10 @@ class OCRIntegrationService:
     def __init__(self, user: User = None, processing_strategy: str = 'standard'):
         self.user = user
         self.processing_strategy = processing_strategy
-        self.ocr_service = get_ocr_service()  # Get OCR service from factory
-        self.fallback_handler = OCRFallbackHandler()  # Initialize fallback handler
+        # OCR engines and the fallback handler pull in cv2/numpy/ML models, so they are
+        # created on first use instead of in every web request that touches this service
+        self._ocr_service = None
+        self._fallback_handler = None
         
         # Security services
         self.encryption_service = get_file_encryption_service()
@@ -1480,6 +1773,29 @@ class OCRIntegrationService:
         
         logger.info(f"Initialized OCRIntegrationService with {processing_strategy} strategy and security enhancements")
     
+    @property
+    def ocr_service(self):
+        """OCR service resolved lazily through the service factory"""
+        if self._ocr_service is None:
+            self._ocr_service = get_ocr_service()
+        return self._ocr_service
+    
+    @ocr_service.setter
+    def ocr_service(self, service):
+        self._ocr_service = service
+    
+    @property
+    def fallback_handler(self):
+        """Fallback handler, imported lazily (it loads the image preprocessing stack)"""
+        if self._fallback_handler is None:
+            from .ocr_fallback_handler import OCRFallbackHandler
+            self._fallback_handler = OCRFallbackHandler()
+        return self._fallback_handler
+    
+    @fallback_handler.setter
+    def fallback_handler(self, handler):
+        self._fallback_handler = handler
+    
     def create_faktura_from_ocr_result(self, ocr_result: OCRResult, 
                                      override_strategy: str = None) -> Faktura:
         """
@@ -1846,6 +2162,7 @@ class OCRIntegrationService:
         Returns:
             List of documents pending manual review
         """
+        from .ocr_fallback_handler import ManualReviewQueue
         return ManualReviewQueue.get_pending_reviews(user=self.user, limit=limit)
     
     def complete_manual_review(self, document_id: int, corrected_data: Dict[str, Any], 
@@ -1867,6 +2184,7 @@ class OCRIntegrationService:
                 'error': 'User required for manual review completion'
             }
         
+        from .ocr_fallback_handler import ManualReviewQueue
         return ManualReviewQueue.complete_manual_review(
             document_id, self.user, corrected_data, approved
         )
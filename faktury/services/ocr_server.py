@@ -330,18 +330,18 @@ async def process_with_tesseract(temp_file: Path, language: str, preprocessing:
     else:
         image = Image.open(temp_file)
     
-    # Extract text with confidence
+    from .tesseract_ocr_engine import build_page_from_tesseract_data
+    
+    # Single recognition pass: text and confidences come from the same word data
     data = pytesseract.image_to_data(image, lang=language, output_type=pytesseract.Output.DICT)
+    page = build_page_from_tesseract_data(data)
     
     # Calculate confidence
-    confidences = [int(conf) for conf in data['conf'] if int(conf) > 0]
+    confidences = page['word_confidences']
     avg_confidence = sum(confidences) / len(confidences) if confidences else 0
     
-    # Extract text
-    text = pytesseract.image_to_string(image, lang=language)
-    
     return {
-        'text': text.strip(),
+        'text': page['text'].strip(),
         'confidence': avg_confidence / 100.0,  # Convert to 0-1 scale
         'engine': 'tesseract'
     }
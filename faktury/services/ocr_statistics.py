@@ -0,0 +1,371 @@
+"""
+Shared OCR statistics queries for the dashboard and the ocr_stats command
+
+Every section is computed with conditional aggregation in one query per
+model: status counts and confidence bands are ``Count(filter=Q(...))``
+columns of the same aggregate and daily series are grouped by ``TruncDate``.
+Closed days can be read from ``OCRStatisticsRollup`` rows written by
+``rollup_ocr_statistics`` instead of scanning their raw rows again; days
+without a rollup, and the partial first and last day of a period, always
+come from the raw tables.
+"""
+
+import datetime
+import logging
+from collections import defaultdict
+from functools import cached_property, reduce
+from operator import or_
+from typing import Dict, List, Optional
+
+from django.db import transaction
+from django.db.models import Avg, Count, Max, Min, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from faktury.models import DocumentUpload, OCRProcessingLog, OCRResult, OCRStatisticsRollup, OCRValidation
+
+logger = logging.getLogger(__name__)
+
+# (label, lower bound inclusive, upper bound exclusive)
+CONFIDENCE_BANDS = (
+    ('95-100%', 95, None),
+    ('80-94%', 80, 95),
+    ('60-79%', 60, 80),
+    ('<60%', None, 60),
+)
+
+DOCUMENT_STATUSES = ('completed', 'failed', 'processing', 'uploaded')
+ERROR_LEVELS = ('ERROR', 'CRITICAL')
+
+
+def day_start(day: datetime.date) -> datetime.datetime:
+    """Aware start of a day in the current time zone"""
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def band_filter(low: Optional[float], high: Optional[float]) -> Q:
+    """Confidence score condition of a band"""
+    condition = Q()
+    if low is not None:
+        condition &= Q(confidence_score__gte=low)
+    if high is not None:
+        condition &= Q(confidence_score__lt=high)
+    return condition
+
+
+def document_aggregates() -> Dict:
+    """Upload count and one conditional count per processing status"""
+    return {
+        'uploads': Count('id'),
+        **{status: Count('id', filter=Q(processing_status=status)) for status in DOCUMENT_STATUSES},
+    }
+
+
+def result_aggregates() -> Dict:
+    """Counts, sums, extremes and confidence band counts of OCR results"""
+    return {
+        'results': Count('id'),
+        'with_invoice': Count('id', filter=Q(faktura__isnull=False)),
+        'confidence_sum': Sum('confidence_score'),
+        'min_confidence': Min('confidence_score'),
+        'max_confidence': Max('confidence_score'),
+        'processing_time_sum': Sum('processing_time'),
+        'min_processing_time': Min('processing_time'),
+        'max_processing_time': Max('processing_time'),
+        **{f'band_{i}': Count('id', filter=band_filter(low, high)) for i, (_, low, high) in enumerate(CONFIDENCE_BANDS)},
+    }
+
+
+def _result_totals(row: Dict) -> Dict:
+    """Result totals from a ``result_aggregates`` row"""
+    return {
+        'results': row['results'],
+        'with_invoice': row['with_invoice'],
+        'confidence_sum': row['confidence_sum'] or 0.0,
+        'min_confidence': row['min_confidence'],
+        'max_confidence': row['max_confidence'],
+        'processing_time_sum': row['processing_time_sum'] or 0.0,
+        'min_processing_time': row['min_processing_time'],
+        'max_processing_time': row['max_processing_time'],
+        'bands': {label: row[f'band_{i}'] for i, (label, _, _) in enumerate(CONFIDENCE_BANDS)},
+    }
+
+
+def _rollup_result_totals(rollup: OCRStatisticsRollup) -> Dict:
+    """Result totals stored in a rollup row"""
+    return {
+        'results': rollup.results,
+        'with_invoice': rollup.with_invoice,
+        'confidence_sum': rollup.confidence_sum,
+        'min_confidence': rollup.min_confidence,
+        'max_confidence': rollup.max_confidence,
+        'processing_time_sum': rollup.processing_time_sum,
+        'min_processing_time': rollup.min_processing_time,
+        'max_processing_time': rollup.max_processing_time,
+        'bands': {label: rollup.confidence_bands.get(label, 0) for label, _, _ in CONFIDENCE_BANDS},
+    }
+
+
+def _merge_extreme(func, values):
+    values = [value for value in values if value is not None]
+    return func(values) if values else None
+
+
+def merge_result_totals(parts: List[Dict]) -> Dict:
+    """Combine result totals of disjoint sets of OCR results"""
+    return {
+        'results': sum(part['results'] for part in parts),
+        'with_invoice': sum(part['with_invoice'] for part in parts),
+        'confidence_sum': sum(part['confidence_sum'] for part in parts),
+        'min_confidence': _merge_extreme(min, [part['min_confidence'] for part in parts]),
+        'max_confidence': _merge_extreme(max, [part['max_confidence'] for part in parts]),
+        'processing_time_sum': sum(part['processing_time_sum'] for part in parts),
+        'min_processing_time': _merge_extreme(min, [part['min_processing_time'] for part in parts]),
+        'max_processing_time': _merge_extreme(max, [part['max_processing_time'] for part in parts]),
+        'bands': {label: sum(part['bands'][label] for part in parts) for label, _, _ in CONFIDENCE_BANDS},
+    }
+
+
+class OCRStatistics:
+    """
+    OCR statistics of a period, for one user or for all users
+
+    Args:
+        start: Start of the period (inclusive)
+        end: End of the period (exclusive), defaults to now
+        user: Limit statistics to the documents of this user
+        use_rollup: Read closed days from OCRStatisticsRollup where available
+    """
+
+    def __init__(self, start: datetime.datetime, end: Optional[datetime.datetime] = None,
+                 user=None, use_rollup: bool = True):
+        self.start = start
+        self.end = end or timezone.now()
+        self.user = user
+        self.use_rollup = use_rollup
+
+    @classmethod
+    def last_days(cls, days: int, **kwargs) -> 'OCRStatistics':
+        """Statistics of the last ``days`` days up to now"""
+        end = timezone.now()
+        return cls(end - datetime.timedelta(days=days), end, **kwargs)
+
+    @cached_property
+    def rollups(self) -> Dict[datetime.date, Optional[OCRStatisticsRollup]]:
+        """
+        Rollups of the closed days fully inside the period, in one query
+
+        Days are keyed by date; a day rolled up without activity of the
+        user maps to None.
+        """
+        if not self.use_rollup:
+            return {}
+
+        first = timezone.localdate(self.start)
+        if day_start(first) < self.start:
+            first += datetime.timedelta(days=1)
+        last = min(timezone.localdate(self.end), timezone.localdate()) - datetime.timedelta(days=1)
+        if first > last:
+            return {}
+
+        scope = Q(user__isnull=True)
+        if self.user is not None:
+            scope |= Q(user=self.user)
+
+        covered, rows = set(), {}
+        for rollup in OCRStatisticsRollup.objects.filter(scope, day__range=(first, last)):
+            if rollup.user_id is None:
+                covered.add(rollup.day)
+            if rollup.user_id == getattr(self.user, 'pk', None):
+                rows[rollup.day] = rollup
+        return {day: rows.get(day) for day in sorted(covered)}
+
+    def _covered_ranges(self):
+        """(start, end) datetimes of runs of consecutive rolled up days"""
+        ranges = []
+        for day in self.rollups:
+            if ranges and ranges[-1][1] == day:
+                ranges[-1][1] = day + datetime.timedelta(days=1)
+            else:
+                ranges.append([day, day + datetime.timedelta(days=1)])
+        return [(day_start(first), day_start(end)) for first, end in ranges]
+
+    def _raw(self, queryset, field: str, user_field: str):
+        """Raw rows of the period not covered by rollups"""
+        queryset = queryset.filter(**{f'{field}__gte': self.start, f'{field}__lt': self.end})
+        if self.user is not None:
+            queryset = queryset.filter(**{user_field: self.user})
+        covered = self._covered_ranges()
+        if covered:
+            queryset = queryset.exclude(reduce(or_, (
+                Q(**{f'{field}__gte': first, f'{field}__lt': end}) for first, end in covered
+            )))
+        return queryset
+
+    @cached_property
+    def documents(self) -> Dict:
+        """Document totals per processing status and the daily upload series"""
+        rows = (
+            self._raw(DocumentUpload.objects.all(), 'upload_timestamp', 'user')
+            .annotate(day=TruncDate('upload_timestamp'))
+            .values('day')
+            .annotate(**document_aggregates())
+            .order_by('day')
+        )
+        daily = {row['day']: row for row in rows}
+        for day, rollup in self.rollups.items():
+            if rollup is not None and rollup.uploads:
+                daily[day] = {
+                    'day': day,
+                    'uploads': rollup.uploads,
+                    **{status: getattr(rollup, status) for status in DOCUMENT_STATUSES},
+                }
+
+        series = [daily[day] for day in sorted(daily)]
+        return {
+            'total': sum(row['uploads'] for row in series),
+            **{status: sum(row[status] for row in series) for status in DOCUMENT_STATUSES},
+            'daily': series,
+        }
+
+    @cached_property
+    def results(self) -> Dict:
+        """OCR result counts, confidence and processing time statistics and confidence bands"""
+        raw = self._raw(OCRResult.objects.all(), 'created_at', 'document__user').aggregate(**result_aggregates())
+        totals = merge_result_totals(
+            [_result_totals(raw)] + [_rollup_result_totals(r) for r in self.rollups.values() if r is not None]
+        )
+
+        count = totals['results']
+        return {
+            'total': count,
+            'with_invoice': totals['with_invoice'],
+            'avg_confidence': totals['confidence_sum'] / count if count else 0,
+            'min_confidence': totals['min_confidence'] or 0,
+            'max_confidence': totals['max_confidence'] or 0,
+            'avg_processing_time': totals['processing_time_sum'] / count if count else 0,
+            'min_processing_time': totals['min_processing_time'] or 0,
+            'max_processing_time': totals['max_processing_time'] or 0,
+            'confidence_bands': totals['bands'],
+        }
+
+    @cached_property
+    def validations(self) -> Dict:
+        """Human validation totals, validations of the user when limited to one"""
+        queryset = OCRValidation.objects.filter(validation_timestamp__gte=self.start, validation_timestamp__lt=self.end)
+        if self.user is not None:
+            queryset = queryset.filter(validated_by=self.user)
+
+        stats = queryset.aggregate(
+            total=Count('id'),
+            avg_accuracy=Avg('accuracy_rating'),
+            min_accuracy=Min('accuracy_rating'),
+            max_accuracy=Max('accuracy_rating'),
+            avg_time_spent=Avg('time_spent_minutes'),
+            total_corrections=Count('id', filter=Q(corrections_made__isnull=False)),
+        )
+        if not stats['total']:
+            stats.update(avg_accuracy=0, min_accuracy=0, max_accuracy=0, avg_time_spent=0)
+        return stats
+
+    def top_users(self, limit: int = 10) -> List[Dict]:
+        """Users with most uploaded documents and their completed count"""
+        raw = (
+            self._raw(DocumentUpload.objects.all(), 'upload_timestamp', 'user')
+            .values('user__username')
+            .annotate(document_count=Count('id'), completed_count=Count('id', filter=Q(processing_status='completed')))
+            .order_by('-document_count', 'user__username')
+        )
+        if not self.rollups:
+            return list(raw[:limit])
+
+        users = defaultdict(lambda: {'document_count': 0, 'completed_count': 0})
+        rolled_up = (
+            OCRStatisticsRollup.objects
+            .filter(day__in=list(self.rollups), user__isnull=False)
+            .filter(**({'user': self.user} if self.user is not None else {}))
+            .values('user__username')
+            .annotate(document_count=Sum('uploads'), completed_count=Sum('completed'))
+        )
+        for row in list(rolled_up) + list(raw):
+            users[row['user__username']]['document_count'] += row['document_count']
+            users[row['user__username']]['completed_count'] += row['completed_count']
+
+        ranked = sorted(users.items(), key=lambda item: (-item[1]['document_count'], item[0]))
+        return [{'user__username': username, **counts} for username, counts in ranked[:limit] if counts['document_count']]
+
+    def errors(self, limit: int = 5) -> Dict:
+        """Error and warning log counts and the most common error messages"""
+        queryset = OCRProcessingLog.objects.filter(timestamp__gte=self.start, timestamp__lt=self.end)
+        if self.user is not None:
+            queryset = queryset.filter(document__user=self.user)
+
+        levels = queryset.aggregate(
+            total_errors=Count('id', filter=Q(level__in=ERROR_LEVELS)),
+            critical=Count('id', filter=Q(level='CRITICAL')),
+            warnings=Count('id', filter=Q(level='WARNING')),
+        )
+        error_types = []
+        if levels['total_errors']:
+            error_types = list(
+                queryset.filter(level__in=ERROR_LEVELS)
+                .values('message')
+                .annotate(count=Count('id'))
+                .order_by('-count')[:limit]
+            )
+        return {**levels, 'error_types': error_types}
+
+
+def rollup_ocr_statistics(day: datetime.date) -> int:
+    """
+    Write the rollup rows of a closed day, replacing existing ones
+
+    Args:
+        day: Day to roll up, before today
+
+    Returns:
+        int: Rollup rows written, one per active user plus the all-users row
+    """
+    if day >= timezone.localdate():
+        raise ValueError(f"Cannot roll up {day}, only closed days can be rolled up")
+
+    start, end = day_start(day), day_start(day + datetime.timedelta(days=1))
+    documents = {
+        row.pop('user_id'): row
+        for row in DocumentUpload.objects.filter(upload_timestamp__gte=start, upload_timestamp__lt=end)
+        .values('user_id').annotate(**document_aggregates()).order_by()
+    }
+    results = {
+        row.pop('document__user_id'): _result_totals(row)
+        for row in OCRResult.objects.filter(created_at__gte=start, created_at__lt=end)
+        .values('document__user_id').annotate(**result_aggregates()).order_by()
+    }
+
+    empty_documents = {'uploads': 0, **{status: 0 for status in DOCUMENT_STATUSES}}
+    empty_results = merge_result_totals([])
+
+    def build(user_id, document_counts, result_totals):
+        return OCRStatisticsRollup(
+            day=day,
+            user_id=user_id,
+            **document_counts,
+            confidence_bands=result_totals.pop('bands'),
+            **result_totals,
+        )
+
+    rollups = [
+        build(user_id, documents.get(user_id, empty_documents), dict(results.get(user_id, empty_results)))
+        for user_id in set(documents) | set(results)
+    ]
+    rollups.append(build(
+        None,
+        {key: sum(counts[key] for counts in documents.values()) for key in empty_documents},
+        merge_result_totals(list(results.values())),
+    ))
+
+    with transaction.atomic():
+        OCRStatisticsRollup.objects.filter(day=day).delete()
+        OCRStatisticsRollup.objects.bulk_create(rollups)
+
+    logger.info(f"Rolled up OCR statistics of {day}: {len(rollups) - 1} users")
+    return len(rollups)
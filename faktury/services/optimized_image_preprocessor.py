@@ -19,8 +19,12 @@ from pdf2image import convert_from_bytes
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import threading
 from functools import lru_cache
-import pickle
+import json
+import mmap
 import os
+import shutil
+import sqlite3
+import tempfile
 import time
 from dataclasses import dataclass
 
@@ -165,7 +169,21 @@ class DocumentTypeClassifier:
 
 
 class PreprocessingCache:
-    """Intelligent caching system for preprocessed images"""
+    """
+    Content-addressed on-disk cache for preprocessed page images
+
+    Every page is stored once as its own file named after the SHA-256 of its
+    bytes (``pages/ab/abcd...``), written to a temporary file and atomically
+    renamed into place. A small SQLite index (WAL mode, one connection per
+    thread) maps document keys to page digests and keeps size and LRU
+    accounting, so lookups never take a process-wide lock and bookkeeping
+    does not walk the cache directory.
+    """
+    
+    INDEX_FILENAME = 'index.sqlite3'
+    PAGES_DIRNAME = 'pages'
+    # Minimum age (seconds) of the recorded access time before a hit rewrites it
+    ACCESS_UPDATE_INTERVAL = 30.0
     
     def __init__(self, cache_dir: str = None, max_cache_size_mb: int = 500):
         """
@@ -183,15 +201,49 @@ class PreprocessingCache:
             'size_mb': 0
         }
         
-        # Create cache directory
-        os.makedirs(self.cache_dir, exist_ok=True)
+        self.pages_dir = os.path.join(self.cache_dir, self.PAGES_DIRNAME)
+        self.index_path = os.path.join(self.cache_dir, self.INDEX_FILENAME)
+        os.makedirs(self.pages_dir, exist_ok=True)
         
-        # Thread lock for cache operations
-        self._lock = threading.Lock()
+        # Per-thread SQLite connections to the shared index
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
         
-        # Initialize cache size
+        self._initialize_index()
         self._update_cache_size()
     
+    def _connection(self) -> sqlite3.Connection:
+        """Get the SQLite index connection of the current thread"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.index_path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+    
+    def _initialize_index(self):
+        """Create index tables if they do not exist"""
+        connection = self._connection()
+        connection.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                cache_key TEXT PRIMARY KEY,
+                pages TEXT NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access);
+            CREATE TABLE IF NOT EXISTS pages (
+                digest TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                refcount INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO meta (name, value) VALUES ('total_size', 0);
+        """)
+    
     def _generate_cache_key(self, file_content: bytes, profile: PreprocessingProfile) -> str:
         """Generate cache key based on file content and preprocessing profile"""
         # Create hash from file content and profile parameters
@@ -199,95 +251,257 @@ class PreprocessingCache:
         profile_hash = hashlib.md5(str(profile.__dict__).encode()).hexdigest()
         return f"{content_hash}_{profile_hash}"
     
-    def get(self, file_content: bytes, profile: PreprocessingProfile) -> Optional[List[bytes]]:
-        """Get preprocessed images from cache"""
-        cache_key = self._generate_cache_key(file_content, profile)
-        cache_file = os.path.join(self.cache_dir, f"{cache_key}.pkl")
+    def _page_path(self, digest: str) -> str:
+        """Path of the page file for a content digest"""
+        return os.path.join(self.pages_dir, digest[:2], digest)
+    
+    def _record(self, stat: str):
+        with self._stats_lock:
+            self.cache_stats[stat] += 1
+    
+    def get(self, file_content: bytes, profile: PreprocessingProfile,
+            as_memoryview: bool = False) -> Optional[List[bytes]]:
+        """
+        Get preprocessed images from cache
         
+        Args:
+            file_content: Original document content
+            profile: Preprocessing profile used for the document
+            as_memoryview: Return memory-mapped page views instead of bytes copies
+        """
+        return self._get_entry(self._generate_cache_key(file_content, profile), as_memoryview)
+    
+    def get_page(self, document_digest: str, page_number: int) -> Optional[bytes]:
+        """
+        Get one preprocessed page of a document from cache
+        
+        Args:
+            document_digest: SHA-256 of the document content
+            page_number: 1-based page number
+        """
+        images = self._get_entry(self._page_cache_key(document_digest, page_number), False)
+        return images[0] if images else None
+    
+    @staticmethod
+    def _page_cache_key(document_digest: str, page_number: int) -> str:
+        # The profile is classified from the page itself, so document and page number determine it
+        return f"{document_digest}_page{page_number}"
+    
+    def _get_entry(self, cache_key: str, as_memoryview: bool) -> Optional[List[bytes]]:
+        """Pages of a cache entry, None on a miss"""
         try:
-            with self._lock:
-                if os.path.exists(cache_file):
-                    with open(cache_file, 'rb') as f:
-                        cached_data = pickle.load(f)
-                    
-                    # Update access time
-                    os.utime(cache_file)
-                    
-                    self.cache_stats['hits'] += 1
-                    logger.debug(f"Cache hit for key: {cache_key}")
-                    return cached_data['images']
-                else:
-                    self.cache_stats['misses'] += 1
-                    return None
-                    
+            connection = self._connection()
+            row = connection.execute(
+                'SELECT pages, last_access FROM entries WHERE cache_key = ?', (cache_key,)
+            ).fetchone()
+            if row is None:
+                self._record('misses')
+                return None
+            
+            digests = json.loads(row[0])
+            images = [self._read_page(digest, as_memoryview) for digest in digests]
+            if any(image is None for image in images):
+                # Page file vanished underneath the index - drop the entry
+                self._remove_entries(connection, [cache_key])
+                self._record('misses')
+                return None
+            
+            now = time.time()
+            if now - row[1] > self.ACCESS_UPDATE_INTERVAL:
+                connection.execute(
+                    'UPDATE entries SET last_access = ? WHERE cache_key = ?', (now, cache_key)
+                )
+            
+            self._record('hits')
+            logger.debug(f"Cache hit for key: {cache_key}")
+            return images
+            
         except Exception as e:
             logger.warning(f"Cache retrieval failed for key {cache_key}: {e}")
-            self.cache_stats['misses'] += 1
+            self._record('misses')
             return None
     
+    def _read_page(self, digest: str, as_memoryview: bool):
+        """Read one page file, memory-mapped when a view is requested"""
+        try:
+            with open(self._page_path(digest), 'rb') as f:
+                if as_memoryview:
+                    return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+                return f.read()
+        except (FileNotFoundError, ValueError):
+            return None
+    
+    def _write_page(self, digest: str, data: bytes) -> None:
+        """Write a page file atomically unless identical content is already stored"""
+        path = self._page_path(digest)
+        if os.path.exists(path):
+            return
+        
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+    
     def put(self, file_content: bytes, profile: PreprocessingProfile, images: List[bytes]):
         """Store preprocessed images in cache"""
-        cache_key = self._generate_cache_key(file_content, profile)
-        cache_file = os.path.join(self.cache_dir, f"{cache_key}.pkl")
-        
+        self._put_entry(self._generate_cache_key(file_content, profile), images)
+    
+    def put_page(self, document_digest: str, page_number: int, image: bytes):
+        """Store one preprocessed page of a document in cache"""
+        self._put_entry(self._page_cache_key(document_digest, page_number), [image])
+    
+    def _put_entry(self, cache_key: str, images: List[bytes]):
+        """Store the pages of a cache entry, replacing an existing one"""
         try:
-            with self._lock:
-                # Check cache size before adding
-                if self._should_evict_cache():
-                    self._evict_old_entries()
-                
-                cached_data = {
-                    'images': images,
-                    'profile': profile,
-                    'timestamp': time.time()
-                }
-                
-                with open(cache_file, 'wb') as f:
-                    pickle.dump(cached_data, f)
-                
-                self._update_cache_size()
-                logger.debug(f"Cached preprocessed images for key: {cache_key}")
-                
+            pages = []
+            for image in images:
+                digest = hashlib.sha256(image).hexdigest()
+                self._write_page(digest, image)
+                pages.append((digest, len(image)))
+            
+            connection = self._connection()
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                orphaned = self._release_entries(connection, [cache_key])
+                added_size = 0
+                for digest, size in pages:
+                    updated = connection.execute(
+                        'UPDATE pages SET refcount = refcount + 1 WHERE digest = ?', (digest,)
+                    ).rowcount
+                    if not updated:
+                        connection.execute(
+                            'INSERT INTO pages (digest, size, refcount) VALUES (?, ?, 1)',
+                            (digest, size)
+                        )
+                        added_size += size
+                    orphaned.discard(digest)
+                connection.execute(
+                    'INSERT INTO entries (cache_key, pages, last_access) VALUES (?, ?, ?)',
+                    (cache_key, json.dumps([digest for digest, _ in pages]), time.time())
+                )
+                self._add_total_size(connection, added_size)
+                connection.execute('COMMIT')
+            except Exception:
+                connection.execute('ROLLBACK')
+                raise
+            
+            self._delete_page_files(orphaned)
+            self._update_cache_size()
+            
+            if self._should_evict_cache():
+                self._evict_to_size(self.max_cache_size_mb * 0.9)
+            
+            logger.debug(f"Cached preprocessed images for key: {cache_key}")
+            
         except Exception as e:
             logger.warning(f"Cache storage failed for key {cache_key}: {e}")
     
+    def _release_entries(self, connection: sqlite3.Connection, cache_keys: List[str]) -> set:
+        """
+        Delete index entries inside the current transaction
+        
+        Returns:
+            Digests of pages no longer referenced by any entry
+        """
+        orphaned = set()
+        freed_size = 0
+        for cache_key in cache_keys:
+            row = connection.execute(
+                'SELECT pages FROM entries WHERE cache_key = ?', (cache_key,)
+            ).fetchone()
+            if row is None:
+                continue
+            connection.execute('DELETE FROM entries WHERE cache_key = ?', (cache_key,))
+            for digest in json.loads(row[0]):
+                connection.execute(
+                    'UPDATE pages SET refcount = refcount - 1 WHERE digest = ?', (digest,)
+                )
+                page = connection.execute(
+                    'SELECT size FROM pages WHERE digest = ? AND refcount <= 0', (digest,)
+                ).fetchone()
+                if page is not None:
+                    connection.execute('DELETE FROM pages WHERE digest = ?', (digest,))
+                    freed_size += page[0]
+                    orphaned.add(digest)
+        self._add_total_size(connection, -freed_size)
+        return orphaned
+    
+    def _remove_entries(self, connection: sqlite3.Connection, cache_keys: List[str]):
+        """Delete index entries and the page files only they referenced"""
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            orphaned = self._release_entries(connection, cache_keys)
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        self._delete_page_files(orphaned)
+        self._update_cache_size()
+    
+    def _add_total_size(self, connection: sqlite3.Connection, delta: int):
+        if delta:
+            connection.execute(
+                "UPDATE meta SET value = value + ? WHERE name = 'total_size'", (delta,)
+            )
+    
+    def _delete_page_files(self, digests):
+        for digest in digests:
+            try:
+                os.remove(self._page_path(digest))
+                logger.debug(f"Evicted cache page: {digest}")
+            except FileNotFoundError:
+                pass
+    
     def _should_evict_cache(self) -> bool:
         """Check if cache should be evicted"""
         return self.cache_stats['size_mb'] > self.max_cache_size_mb
     
     def _evict_old_entries(self):
-        """Evict oldest cache entries"""
+        """Evict least recently used 25% of cache entries"""
         try:
-            cache_files = []
-            for filename in os.listdir(self.cache_dir):
-                if filename.endswith('.pkl'):
-                    filepath = os.path.join(self.cache_dir, filename)
-                    mtime = os.path.getmtime(filepath)
-                    cache_files.append((filepath, mtime))
-            
-            # Sort by modification time (oldest first)
-            cache_files.sort(key=lambda x: x[1])
-            
-            # Remove oldest 25% of files
-            files_to_remove = len(cache_files) // 4
-            for filepath, _ in cache_files[:files_to_remove]:
-                os.remove(filepath)
-                logger.debug(f"Evicted cache file: {filepath}")
+            connection = self._connection()
+            total_entries = connection.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+            keys = [row[0] for row in connection.execute(
+                'SELECT cache_key FROM entries ORDER BY last_access LIMIT ?',
+                (total_entries // 4,)
+            )]
+            if keys:
+                self._remove_entries(connection, keys)
             
-            self._update_cache_size()
+        except Exception as e:
+            logger.error(f"Cache eviction failed: {e}")
+    
+    def _evict_to_size(self, target_size_mb: float, batch_size: int = 32):
+        """Evict least recently used entries until the cache fits the target size"""
+        try:
+            connection = self._connection()
+            while self.cache_stats['size_mb'] > target_size_mb:
+                keys = [row[0] for row in connection.execute(
+                    'SELECT cache_key FROM entries ORDER BY last_access LIMIT ?', (batch_size,)
+                )]
+                if not keys:
+                    break
+                for cache_key in keys:
+                    self._remove_entries(connection, [cache_key])
+                    if self.cache_stats['size_mb'] <= target_size_mb:
+                        break
             
         except Exception as e:
             logger.error(f"Cache eviction failed: {e}")
     
     def _update_cache_size(self):
-        """Update cache size statistics"""
+        """Update cache size statistics from the index counter"""
         try:
-            total_size = 0
-            for filename in os.listdir(self.cache_dir):
-                if filename.endswith('.pkl'):
-                    filepath = os.path.join(self.cache_dir, filename)
-                    total_size += os.path.getsize(filepath)
-            
+            total_size = self._connection().execute(
+                "SELECT value FROM meta WHERE name = 'total_size'"
+            ).fetchone()[0]
             self.cache_stats['size_mb'] = total_size / 1024 / 1024
             
         except Exception as e:
@@ -309,14 +523,29 @@ class PreprocessingCache:
     def clear(self):
         """Clear all cache entries"""
         try:
-            with self._lock:
-                for filename in os.listdir(self.cache_dir):
-                    if filename.endswith('.pkl'):
-                        os.remove(os.path.join(self.cache_dir, filename))
-                
+            connection = self._connection()
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                connection.execute('DELETE FROM entries')
+                connection.execute('DELETE FROM pages')
+                connection.execute("UPDATE meta SET value = 0 WHERE name = 'total_size'")
+                connection.execute('COMMIT')
+            except Exception:
+                connection.execute('ROLLBACK')
+                raise
+            
+            shutil.rmtree(self.pages_dir, ignore_errors=True)
+            os.makedirs(self.pages_dir, exist_ok=True)
+            
+            # Remove pickled entries written by earlier cache versions
+            for filename in os.listdir(self.cache_dir):
+                if filename.endswith('.pkl'):
+                    os.remove(os.path.join(self.cache_dir, filename))
+            
+            with self._stats_lock:
                 self.cache_stats = {'hits': 0, 'misses': 0, 'size_mb': 0}
-                logger.info("Cache cleared")
-                
+            logger.info("Cache cleared")
+            
         except Exception as e:
             logger.error(f"Failed to clear cache: {e}")
 
@@ -463,6 +692,31 @@ class OptimizedImagePreprocessor:
             logger.error(f"Optimized preprocessing failed: {str(e)}")
             raise
     
+    def preprocess_page(self, image: Image.Image, profile: Optional[PreprocessingProfile] = None) -> bytes:
+        """
+        Preprocess a single rendered page
+        
+        Args:
+            image: Rendered page image
+            profile: Preprocessing profile (classified from the page when omitted)
+            
+        Returns:
+            Preprocessed image bytes (minimal fallback preprocessing on failure)
+        """
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        if profile is None:
+            profile = self.classifier.classify_document(image)
+        
+        try:
+            return self._apply_preprocessing_pipeline(image, profile)
+        except Exception as e:
+            logger.error(f"Page preprocessing failed, using fallback: {e}")
+            fallback_image = self._apply_fallback_preprocessing(image)
+            if fallback_image is None:
+                raise
+            return fallback_image
+    
     def _process_pdf(self, file_content: bytes) -> List[Image.Image]:
         """Convert PDF to images with optimization"""
         try:
@@ -10,12 +10,16 @@ import time
 import threading
 import queue
 from typing import Dict, Any, Optional, List, Callable, NamedTuple
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from datetime import datetime, timedelta
-from concurrent.futures import ThreadPoolExecutor, Future, as_completed
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed, TimeoutError as FutureTimeoutError
 from contextlib import contextmanager
 import weakref
 
+from .ocr_execution_sandbox import OCRExecutionSandbox, SandboxConfig
+from .paddle_ocr_exceptions import PaddleOCRTimeoutError
+from .paddle_ocr_timeout_handler import DegradationLevel
+
 logger = logging.getLogger(__name__)
 
 
@@ -54,6 +58,10 @@ class ResourcePool:
     max_queue_size: int = 10
     worker_timeout: float = 30.0
     cleanup_interval: float = 60.0
+    # Run picklable processors in pre-forked child processes with hard timeouts
+    use_process_sandbox: bool = True
+    # Retry timed out or crashed sandbox calls with DegradationLevel settings
+    degrade_on_retry: bool = True
 
 
 class WorkerThread:
@@ -171,21 +179,48 @@ class WorkerThread:
             )
     
     def _execute_with_timeout(self, processor: Callable, request: ProcessingRequest) -> Any:
-        """Execute processor with timeout"""
-        import signal
-        
-        def timeout_handler(signum, frame):
-            raise TimeoutError(f"Processing timeout after {request.timeout}s")
+        """
+        Execute processor with timeout
         
-        # Set up timeout
-        old_handler = signal.signal(signal.SIGALRM, timeout_handler)
-        signal.alarm(int(request.timeout))
+        Uses the process sandbox when available, which kills the call after the
+        timeout. Otherwise the call runs in a helper thread and the worker stops
+        waiting for it after the timeout (``signal.alarm`` is not usable here,
+        since workers never run on the main thread).
+        """
+        sandbox = self.resource_manager.sandbox
+        if sandbox is not None and sandbox.can_execute(processor):
+            if self.resource_manager.resource_pool.degrade_on_retry:
+                outcome = sandbox.execute_with_degradation(
+                    processor, request, timeout=request.timeout, degrade=_degrade_request
+                )
+                # One timeout per call, however many degraded attempts timed out
+                if outcome.timeout_occurred:
+                    self.resource_manager.stats['timeout_errors'] += 1
+                if not outcome.success:
+                    raise outcome.error
+                return outcome.result
+            try:
+                return sandbox.execute(processor, request, timeout=request.timeout)
+            except PaddleOCRTimeoutError:
+                self.resource_manager.stats['timeout_errors'] += 1
+                raise
         
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"PaddleOCR-Call-{self.worker_id}")
         try:
-            return processor(request)
+            future = executor.submit(processor, request)
+            try:
+                return future.result(timeout=request.timeout)
+            except FutureTimeoutError:
+                self.resource_manager.stats['timeout_errors'] += 1
+                raise TimeoutError(f"Processing timeout after {request.timeout}s")
         finally:
-            signal.alarm(0)
-            signal.signal(signal.SIGALRM, old_handler)
+            executor.shutdown(wait=False)
+
+
+def _degrade_request(args: tuple, kwargs: dict, level: DegradationLevel):
+    """Pass the degradation level to processors through request metadata"""
+    request = replace(args[0], metadata=dict(args[0].metadata, degradation_level=level.value))
+    return (request,) + tuple(args[1:]), kwargs
 
 
 class PaddleOCRResourceManager:
@@ -225,6 +260,15 @@ class PaddleOCRResourceManager:
         # Processing functions registry
         self.processors: Dict[str, Callable] = {}
         
+        # Crash-isolated execution of processors (module-level functions only)
+        self.sandbox: Optional[OCRExecutionSandbox] = None
+        if self.resource_pool.use_process_sandbox:
+            self.sandbox = OCRExecutionSandbox(SandboxConfig(
+                workers=self.resource_pool.max_workers,
+                timeout=self.resource_pool.worker_timeout,
+                memory_limit_mb=self.resource_pool.max_memory_mb
+            ))
+        
         # Statistics
         self.stats = {
             'total_requests': 0,
@@ -528,6 +572,9 @@ class PaddleOCRResourceManager:
         # Stop workers
         self._stop_workers()
         
+        if self.sandbox is not None:
+            self.sandbox.shutdown()
+        
         logger.info("PaddleOCR Resource Manager shutdown complete")
     
     @contextmanager
@@ -12,7 +12,7 @@ import threading
 from typing import Dict, Any, Optional, Callable, Union, List
 from dataclasses import dataclass
 from enum import Enum
-from contextlib import contextmanager
+from contextlib import contextmanager, nullcontext
 from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 
 from .paddle_ocr_exceptions import PaddleOCRTimeoutError
@@ -187,7 +187,9 @@ class PaddleOCRTimeoutHandler:
                                      start_time: float) -> TimeoutResult:
         """Internal timeout execution"""
         try:
-            with ThreadPoolExecutor(max_workers=1) as executor:
+            # Not a context manager: leaving it would wait for a timed out operation
+            executor = ThreadPoolExecutor(max_workers=1)
+            try:
                 future = executor.submit(operation)
                 
                 try:
@@ -231,6 +233,8 @@ class PaddleOCRTimeoutHandler:
                         strategy_used=self.strategy,
                         error=timeout_error
                     )
+            finally:
+                executor.shutdown(wait=False)
                     
         except Exception as error:
             elapsed = time.time() - start_time
@@ -384,7 +388,17 @@ class PaddleOCRTimeoutHandler:
         return degraded_operation
     
     def _create_timeout_context(self, timeout: float):
-        """Create timeout context using signal (Unix-like systems)"""
+        """
+        Create timeout context using signal (Unix-like systems)
+        
+        ``signal.alarm`` only works on the main thread. Elsewhere (Celery threads,
+        executor workers) the context does not interrupt the block and the
+        timeout is detected from the elapsed time in ``timeout_context``; use
+        ``OCRExecutionSandbox`` for a hard, interrupting timeout.
+        """
+        if not hasattr(signal, 'SIGALRM') or threading.current_thread() is not threading.main_thread():
+            return nullcontext()
+        
         class TimeoutContext:
             def __init__(self, timeout_seconds):
                 self.timeout_seconds = timeout_seconds
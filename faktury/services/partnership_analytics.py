@@ -0,0 +1,143 @@
+"""
+Database-side analytics of invoices between partner companies
+
+Invoices of one direction of a partnership (seller company to the buyer
+company's linked kontrahenci) are grouped by month and invoice type in one
+query, with gross values summed over their items by
+``pozycja_brutto_expression``, so no invoice or item is loaded. Monthly
+rows of both directions are merged into counts, totals and net balances.
+
+The all-time rollup of a partnership is cached under the data versions of
+both companies. Every change to an invoice, or its items, bumps the version
+of the selling company once the transaction commits, which invalidates the
+rollups of all its partnerships.
+"""
+
+import time
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, ExpressionWrapper, Q, Sum, Value, When
+from django.db.models.functions import Coalesce, TruncMonth
+
+from faktury.models import AMOUNT_FIELD, Faktura, Partnerstwo, pozycja_brutto_expression
+
+PARTNERSHIP_VERSION_KEY = 'partnership_version:{firma_id}'
+ROLLUP_KEY = 'partnership_rollup:{partnership_id}:{version1}:{version2}'
+ROLLUP_TIMEOUT = 24 * 3600
+
+ZERO = Decimal('0.00')
+
+
+def get_partnership_version(firma_id) -> int:
+    """Current invoice data version of a company"""
+    key = PARTNERSHIP_VERSION_KEY.format(firma_id=firma_id)
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock so rollups cached before an eviction are never read again
+        version = time.time_ns()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_partnership_version(firma_id):
+    """Invalidate the partnership rollups of a company once the current transaction commits"""
+    if firma_id is None:
+        return
+
+    def bump():
+        key = PARTNERSHIP_VERSION_KEY.format(firma_id=firma_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+
+    transaction.on_commit(bump)
+
+
+def direction_months(seller_id, buyer_id, date_from=None, date_to=None) -> List[Dict]:
+    """
+    Monthly rows of the invoices one company issued to another
+
+    One grouped query. Each row has the month (first day), the invoice type,
+    the number of invoices, of paid invoices and their gross total, negative
+    for cost invoices as Faktura.suma_brutto.
+    """
+    faktury = Faktura.objects.filter(sprzedawca_id=seller_id, nabywca__firma_id=buyer_id)
+    if date_from:
+        faktury = faktury.filter(data_wystawienia__gte=date_from)
+    if date_to:
+        faktury = faktury.filter(data_wystawienia__lte=date_to)
+    total = Coalesce(Sum(pozycja_brutto_expression('pozycjafaktury__')), Value(ZERO), output_field=AMOUNT_FIELD)
+    # Signed like suma_brutto, typ_faktury is a grouping column
+    sign = Case(When(typ_faktury='koszt', then=Value(Decimal('-1'))), default=Value(Decimal('1')),
+                output_field=AMOUNT_FIELD)
+    rows = list(
+        faktury.annotate(month=TruncMonth('data_wystawienia'))
+        .order_by()
+        .values('month', 'typ_faktury')
+        .annotate(
+            # Items multiply the invoice rows of the join, so invoices are counted distinct
+            count=Count('pk', distinct=True),
+            paid_count=Count('pk', distinct=True, filter=Q(status='oplacona')),
+            total_value=ExpressionWrapper(total * sign, output_field=AMOUNT_FIELD),
+        )
+        .order_by('month', 'typ_faktury')
+    )
+    for row in rows:
+        row['total_value'] = row['total_value'].quantize(ZERO)
+    return rows
+
+
+def summarize(rows: List[Dict], typ_faktury: Optional[str] = None) -> Dict:
+    """Invoice counts and gross total of monthly rows, optionally of one invoice type"""
+    rows = [row for row in rows if typ_faktury is None or row['typ_faktury'] == typ_faktury]
+    count = sum(row['count'] for row in rows)
+    paid_count = sum(row['paid_count'] for row in rows)
+    return {
+        'count': count,
+        'paid_count': paid_count,
+        'unpaid_count': count - paid_count,
+        'total_value': sum((row['total_value'] for row in rows), ZERO),
+    }
+
+
+def monthly_breakdown(rows1: List[Dict], rows2: List[Dict]) -> List[Dict]:
+    """Per month gross totals and invoice counts of both directions and their net balance"""
+    months = {}
+    for rows, total, count in ((rows1, 'company1_to_company2', 'count1'), (rows2, 'company2_to_company1', 'count2')):
+        for row in rows:
+            month_key = row['month'].strftime('%Y-%m')
+            month = months.setdefault(month_key, {
+                'month': month_key,
+                'company1_to_company2': ZERO,
+                'company2_to_company1': ZERO,
+                'count1': 0,
+                'count2': 0,
+            })
+            month[total] += row['total_value']
+            month[count] += row['count']
+
+    for month in months.values():
+        month['net_balance'] = month['company1_to_company2'] - month['company2_to_company1']
+    return sorted(months.values(), key=lambda month: month['month'])
+
+
+def partnership_rollup(partnership: Partnerstwo) -> Dict[str, List[Dict]]:
+    """All-time monthly rows of both directions of a partnership, cached until either company's invoices change"""
+    key = ROLLUP_KEY.format(
+        partnership_id=partnership.pk,
+        version1=get_partnership_version(partnership.firma1_id),
+        version2=get_partnership_version(partnership.firma2_id),
+    )
+    rollup = cache.get(key)
+    if rollup is None:
+        rollup = {
+            'company1_to_company2': direction_months(partnership.firma1_id, partnership.firma2_id),
+            'company2_to_company1': direction_months(partnership.firma2_id, partnership.firma1_id),
+        }
+        cache.set(key, rollup, ROLLUP_TIMEOUT)
+    return rollup
@@ -11,6 +11,7 @@ from django.utils import timezone
 from datetime import datetime, timedelta, date
 
 from ..models import Firma, Kontrahent, Partnerstwo, Faktura, PozycjaFaktury
+from .partnership_analytics import direction_months, monthly_breakdown, partnership_rollup, summarize
 
 logger = logging.getLogger(__name__)
 
@@ -128,37 +129,41 @@ class PartnershipManager:
     def get_partnership_details(self, partnership: Partnerstwo) -> Dict[str, Any]:
         """
         Get detailed information about a partnership
+        
+        Totals come from the cached partnership rollup; only the recent
+        transactions are loaded.
         """
         try:
             # Get transaction statistics
-            company1_sales = Faktura.objects.filter(
-                sprzedawca=partnership.firma1,
-                nabywca__firma=partnership.firma2,
-                typ_faktury='sprzedaz'
-            )
-            
-            company2_sales = Faktura.objects.filter(
-                sprzedawca=partnership.firma2,
-                nabywca__firma=partnership.firma1,
-                typ_faktury='sprzedaz'
-            )
-            
-            # Calculate totals
-            company1_total = sum(invoice.suma_brutto for invoice in company1_sales)
-            company2_total = sum(invoice.suma_brutto for invoice in company2_sales)
+            rollup = partnership_rollup(partnership)
+            company1_sales = summarize(rollup['company1_to_company2'], 'sprzedaz')
+            company2_sales = summarize(rollup['company2_to_company1'], 'sprzedaz')
+            company1_total = company1_sales['total_value']
+            company2_total = company2_sales['total_value']
             
             # Get recent transactions
-            recent_transactions = list(company1_sales.order_by('-data_wystawienia')[:5]) + \
-                                list(company2_sales.order_by('-data_wystawienia')[:5])
+            recent_transactions = list(
+                Faktura.objects.filter(
+                    sprzedawca=partnership.firma1,
+                    nabywca__firma=partnership.firma2,
+                    typ_faktury='sprzedaz'
+                ).order_by('-data_wystawienia')[:5]
+            ) + list(
+                Faktura.objects.filter(
+                    sprzedawca=partnership.firma2,
+                    nabywca__firma=partnership.firma1,
+                    typ_faktury='sprzedaz'
+                ).order_by('-data_wystawienia')[:5]
+            )
             recent_transactions.sort(key=lambda x: x.data_wystawienia, reverse=True)
             
             return {
                 'partnership': partnership,
-                'company1_sales_count': company1_sales.count(),
-                'company2_sales_count': company2_sales.count(),
+                'company1_sales_count': company1_sales['count'],
+                'company2_sales_count': company2_sales['count'],
                 'company1_total_value': company1_total,
                 'company2_total_value': company2_total,
-                'total_transactions': company1_sales.count() + company2_sales.count(),
+                'total_transactions': company1_sales['count'] + company2_sales['count'],
                 'total_value': company1_total + company2_total,
                 'recent_transactions': recent_transactions[:10],
                 'balance': company1_total - company2_total,
@@ -185,22 +190,13 @@ class PartnershipManager:
         try:
             duration_months = max(1, self._calculate_partnership_duration(partnership) / 30)
             
-            total_value = Decimal('0.00')
-            
-            # Get all transactions between partners
-            transactions = Faktura.objects.filter(
-                models.Q(
-                    sprzedawca=partnership.firma1,
-                    nabywca__firma=partnership.firma2
-                ) | models.Q(
-                    sprzedawca=partnership.firma2,
-                    nabywca__firma=partnership.firma1
-                )
+            # All transactions between partners, from the cached rollup
+            rollup = partnership_rollup(partnership)
+            total_value = (
+                summarize(rollup['company1_to_company2'])['total_value'] +
+                summarize(rollup['company2_to_company1'])['total_value']
             )
             
-            for transaction in transactions:
-                total_value += transaction.suma_brutto
-            
             return total_value / Decimal(str(duration_months))
             
         except Exception as e:
@@ -247,18 +243,9 @@ class PartnershipManager:
             if not date_to:
                 date_to = date.today()
             
-            # Get transactions in both directions
-            company1_to_company2 = Faktura.objects.filter(
-                sprzedawca=partnership.firma1,
-                nabywca__firma=partnership.firma2,
-                data_wystawienia__range=[date_from, date_to]
-            ).order_by('-data_wystawienia')
-            
-            company2_to_company1 = Faktura.objects.filter(
-                sprzedawca=partnership.firma2,
-                nabywca__firma=partnership.firma1,
-                data_wystawienia__range=[date_from, date_to]
-            ).order_by('-data_wystawienia')
+            # Monthly totals in both directions, one grouped query each
+            months1 = direction_months(partnership.firma1_id, partnership.firma2_id, date_from, date_to)
+            months2 = direction_months(partnership.firma2_id, partnership.firma1_id, date_from, date_to)
             
             # Calculate statistics
             stats = {
@@ -267,18 +254,21 @@ class PartnershipManager:
                     'to': date_to
                 },
                 'company1_to_company2': {
-                    'count': company1_to_company2.count(),
-                    'total_value': sum(inv.suma_brutto for inv in company1_to_company2),
-                    'paid_count': company1_to_company2.filter(status='oplacona').count(),
-                    'unpaid_count': company1_to_company2.exclude(status='oplacona').count(),
-                    'transactions': list(company1_to_company2)
+                    **summarize(months1),
+                    # Loaded only when iterated
+                    'transactions': Faktura.objects.filter(
+                        sprzedawca=partnership.firma1,
+                        nabywca__firma=partnership.firma2,
+                        data_wystawienia__range=[date_from, date_to]
+                    ).order_by('-data_wystawienia')
                 },
                 'company2_to_company1': {
-                    'count': company2_to_company1.count(),
-                    'total_value': sum(inv.suma_brutto for inv in company2_to_company1),
-                    'paid_count': company2_to_company1.filter(status='oplacona').count(),
-                    'unpaid_count': company2_to_company1.exclude(status='oplacona').count(),
-                    'transactions': list(company2_to_company1)
+                    **summarize(months2),
+                    'transactions': Faktura.objects.filter(
+                        sprzedawca=partnership.firma2,
+                        nabywca__firma=partnership.firma1,
+                        data_wystawienia__range=[date_from, date_to]
+                    ).order_by('-data_wystawienia')
                 }
             }
             
@@ -290,9 +280,7 @@ class PartnershipManager:
             }
             
             # Monthly breakdown
-            stats['monthly_breakdown'] = self._get_monthly_breakdown(
-                company1_to_company2, company2_to_company1, date_from, date_to
-            )
+            stats['monthly_breakdown'] = monthly_breakdown(months1, months2)
             
             return stats
             
@@ -300,46 +288,6 @@ class PartnershipManager:
             self.logger.error(f"Error tracking partner transactions: {str(e)}")
             return {}
     
-    def _get_monthly_breakdown(self, transactions1, transactions2, date_from: date, date_to: date) -> List[Dict[str, Any]]:
-        """
-        Get monthly breakdown of transactions
-        """
-        monthly_data = {}
-        
-        # Process transactions from company1 to company2
-        for transaction in transactions1:
-            month_key = transaction.data_wystawienia.strftime('%Y-%m')
-            if month_key not in monthly_data:
-                monthly_data[month_key] = {
-                    'month': month_key,
-                    'company1_to_company2': Decimal('0.00'),
-                    'company2_to_company1': Decimal('0.00'),
-                    'count1': 0,
-                    'count2': 0
-                }
-            monthly_data[month_key]['company1_to_company2'] += transaction.suma_brutto
-            monthly_data[month_key]['count1'] += 1
-        
-        # Process transactions from company2 to company1
-        for transaction in transactions2:
-            month_key = transaction.data_wystawienia.strftime('%Y-%m')
-            if month_key not in monthly_data:
-                monthly_data[month_key] = {
-                    'month': month_key,
-                    'company1_to_company2': Decimal('0.00'),
-                    'company2_to_company1': Decimal('0.00'),
-                    'count1': 0,
-                    'count2': 0
-                }
-            monthly_data[month_key]['company2_to_company1'] += transaction.suma_brutto
-            monthly_data[month_key]['count2'] += 1
-        
-        # Calculate net balance for each month
-        for month_data in monthly_data.values():
-            month_data['net_balance'] = month_data['company1_to_company2'] - month_data['company2_to_company1']
-        
-        return sorted(monthly_data.values(), key=lambda x: x['month'])
-    
     def generate_partnership_report(self, partnership: Partnerstwo) -> Dict[str, Any]:
         """
         Generate comprehensive partnership report
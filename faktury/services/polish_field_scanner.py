@@ -0,0 +1,530 @@
+"""
+Polish Field Scanner
+
+Precompiled pattern scanning for Polish invoice fields. The pattern tables of
+the field extractors are compiled once at import, and ``FieldScanner`` runs
+them over a text once, returning every candidate match with its span grouped
+by field family. Extractors consume the candidate lists instead of rescanning
+the text with raw pattern strings for every field.
+
+Before any pattern runs, the text is case-folded once and checked for the
+literal keywords a pattern cannot match without (``zł`` for amounts in złoty,
+month names for written dates). Patterns whose keywords are all absent are
+skipped. Keywords are only declared for literals every match of the pattern
+contains, so the prefilter never drops a candidate.
+
+Candidates keep the order of separate ``finditer`` loops over the patterns of
+a family, so consumers produce exactly the fields they produced before. (The
+patterns of a family overlap, so they cannot be merged into one alternation:
+``re`` would report at most one of the overlapping matches.)
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Pattern, Sequence, Tuple, Union
+
+POLISH_MONTHS = (
+    'stycznia', 'lutego', 'marca', 'kwietnia', 'maja', 'czerwca',
+    'lipca', 'sierpnia', 'września', 'października', 'listopada', 'grudnia'
+)
+
+# Pattern tables: family -> [pattern | (pattern, keywords)]
+
+INVOICE_FIELD_PATTERNS = {
+    'invoice_numbers': [
+        r'(?:Faktura|FV|F|Nr|Numer)[-:\s]*([A-Z]*\d+[/\-]\d+[/\-]\d+)',
+        (r'(?:Faktura\s+VAT\s+Nr|FAKTURA\s+VAT\s+Nr)[-:\s]*([A-Z0-9/\-]+)', ('faktura',)),
+        r'(?:Faktura|FV|F|Nr|Numer)[-:\s]*([A-Z]*\d+)',
+        r'([A-Z]*\d+[/\-]\d+[/\-]\d+)',
+        (r'(?:Faktura\s+VAT|FV)[-:\s]*([A-Z0-9/\-]+)', ('faktura', 'fv')),
+        (r'(?:Nr\s+faktury|Numer\s+faktury)[-:\s]*([A-Z0-9/\-]+)', ('faktury',)),
+        r'([A-Z]{2,4}[/\-]\d+[/\-]\d{2,4})',
+    ],
+    'dates': [
+        r'(\d{2})[.-/](\d{2})[.-/](\d{4})',
+        r'(\d{4})[.-/](\d{2})[.-/](\d{2})',
+        (r'(\d{1,2})\s+(stycznia|lutego|marca|kwietnia|maja|czerwca|lipca|sierpnia|września|października|listopada|grudnia)\s+(\d{4})', POLISH_MONTHS),
+        r'(?:dnia\s+)?(\d{1,2})[.-/](\d{1,2})[.-/](\d{4})',
+        r'(\d{2})\.(\d{2})\.(\d{2})',
+        (r'(?:Data\s+wystawienia|Data\s+sprzedaży|Termin\s+płatności)[-:\s]*(\d{1,2}[.-/]\d{1,2}[.-/]\d{2,4})', ('data', 'termin')),
+    ],
+    'amounts': [
+        (r'(\d+(?:\s?\d{3})*[,.]?\d*)\s*zł', ('zł',)),
+        (r'(\d+(?:\s?\d{3})*[,.]?\d*)\s*PLN', ('pln',)),
+        (r'PLN\s*(\d+(?:\s?\d{3})*[,.]?\d*)', ('pln',)),
+        (r'(\d+(?:\s?\d{3})*[,.]?\d*)\s*złotych?', ('złoty',)),
+        (r'(?:Suma|Razem|Łącznie|Do\s+zapłaty)[-:\s]*(\d+(?:\s?\d{3})*[,.]?\d*)\s*(?:zł|PLN)', ('zł', 'pln')),
+        (r'(\d+(?:\s?\d{3})*[,.]?\d*)\s*gr', ('gr',)),
+    ],
+    'nip_numbers': [
+        (r'(?:NIP|VAT)[-:\s]*(\d{3}[-\s]?\d{3}[-\s]?\d{2}[-\s]?\d{2})', ('nip', 'vat')),
+        (r'PL\s*(\d{10})', ('pl',)),
+        (r'(?:Identyfikator\s+podatkowy|Nr\s+VAT)[-:\s]*(\d{10})', ('identyfikator', 'vat')),
+        r'(\d{3}[-\s]*\d{3}[-\s]*\d{2}[-\s]*\d{2})',
+    ],
+    'company_names': [
+        r'([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s\-&.,"()0-9]+?)\s*(Sp(?:ółka)?\.?\s*z\s*o\.?o\.?)',
+        r'([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s\-&.,"()0-9]+?)\s*(S\.?A\.?)',
+        (r'([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s\-&.,"()0-9]+?)\s*(Spółka\s*Akcyjna)', ('spółka',)),
+        r'([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s\-&.,"()0-9]+?)\s*(P\.?P\.?H\.?U?\.?)',
+        (r'(?:Sprzedawca|Nabywca|Firma)[-:\s]*([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s\-&.,"()0-9]{3,50})', ('sprzedawca', 'nabywca', 'firma')),
+    ],
+    'addresses': [
+        r'(\d{2}-\d{3})\s+([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s]+)',
+        (r'ul\.\s*([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s]+)\s*(\d+[a-zA-Z]?(?:/\d+)?)', ('ul.',)),
+        (r'(?:al\.|aleja)\s*([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s]+)\s*(\d+[a-zA-Z]?)', ('al.', 'aleja')),
+        (r'(?:pl\.|plac)\s*([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s]+)\s*(\d+[a-zA-Z]?)', ('pl.', 'plac')),
+    ],
+    'vat_rates': [
+        (r'(\d+)%\s*VAT', ('%',)),
+        (r'VAT\s*(\d+)%', ('%',)),
+        (r'(\d+)\s*proc\.?\s*VAT', ('proc',)),
+        (r'stawka\s*VAT\s*(\d+)%', ('stawka',)),
+        (r'(\d+),(\d+)%\s*VAT', ('%',)),
+        (r'zwolnione\s*z\s*VAT', ('zwolnione',)),
+        (r'0%\s*VAT', ('%',)),
+    ],
+    'bank_accounts': [
+        (r'PL\s*(\d{2}\s*\d{4}\s*\d{4}\s*\d{4}\s*\d{4}\s*\d{4}\s*\d{4})', ('pl',)),
+        (r'(?:Nr\s+konta|Numer\s+konta|Konto)[-:\s]*PL\s*(\d{26})', ('kont',)),
+        r'(\d{2}\s*\d{4}\s*\d{4}\s*\d{4}\s*\d{4}\s*\d{4}\s*\d{4})',
+    ],
+}
+
+POLISH_PATTERNS = {
+    'nip': [
+        r'\b\d{3}[\-\s]?\d{3}[\-\s]?\d{2}[\-\s]?\d{2}[\-\s]?\d{3}\b',
+        (r'NIP\s*[:]?\s*(\d{3}[\-\s]?\d{3}[\-\s]?\d{2}[\-\s]?\d{2}[\-\s]?\d{3})', ('nip',)),
+        r'(\d{3}[\-\s]?\d{3}[\-\s]?\d{2}[\-\s]?\d{2}[\-\s]?\d{3})'
+    ],
+    'regon': [
+        r'\b\d{9}\b',  # 9-digit REGON
+        r'\b\d{14}\b',  # 14-digit REGON
+        (r'REGON\s*[:]?\s*(\d{9}|\d{14})', ('regon',)),
+        r'(\d{9}|\d{14})'
+    ],
+    'krs': [
+        (r'\bKRS\s*[:]?\s*(\d{10})\b', ('krs',)),
+        r'(\d{10})'
+    ],
+    'date': [
+        r'\b\d{1,2}[\.\-]\d{1,2}[\.\-]\d{2,4}\b',
+        r'\b\d{4}[\.\-]\d{1,2}[\.\-]\d{1,2}\b',
+        (r'data\s*[:]?\s*(\d{1,2}[\.\-]\d{1,2}[\.\-]\d{2,4})', ('data',)),
+        (r'wystawiono\s*[:]?\s*(\d{1,2}[\.\-]\d{1,2}[\.\-]\d{2,4})', ('wystawiono',))
+    ],
+    'invoice': [
+        (r'faktur[ay]?\s*[nr]?[o]?[r]?[.]?\s*[:]?\s*([a-zA-Z0-9\/\-_]+)', ('faktur',)),
+        (r'invoice\s*[nr]?[o]?[r]?[.]?\s*[:]?\s*([a-zA-Z0-9\/\-_]+)', ('invoice',)),
+        (r'FV[/\-]?(\d+[/\-]\d+)', ('fv',)),
+        r'(\d{2,4}[/\-]\d{2,4}[/\-]\d{2,4})',
+        (r'Nr\s*faktury\s*[:]?\s*([a-zA-Z0-9\/\-_]+)', ('faktury',))
+    ],
+    'currency': [
+        r'([\d\s,]+)\s*[zł|PLN]',
+        r'([\d\s,]+)\s*[złoty|złotych]',
+        r'([\d\s,]+)\s*[EUR|€]',
+        r'([\d\s,]+)\s*[USD|\$]',
+        r'([\d\s,]+)\s*[GBP|£]'
+    ],
+    'vat': [
+        (r'(\d{1,2}[,\.]\d{1,2})\s*%?\s*VAT', ('vat',)),
+        (r'VAT\s*(\d{1,2}[,\.]\d{1,2})\s*%?', ('vat',)),
+        (r'(\d{1,2}[,\.]\d{1,2})\s*%?\s*podatku', ('podatku',)),
+        (r'podatek\s*(\d{1,2}[,\.]\d{1,2})\s*%?', ('podatek',))
+    ],
+    'company': [
+        (r'(Sp\.\s*z\s*o\.\s*o\.)', ('sp.',)),
+        r'(S\.\s*A\.)',
+        (r'(Spółka\s+Akcyjna)', ('spółka',)),
+        (r'(Spółka\s+z\s+ograniczoną\s+odpowiedzialnością)', ('spółka',)),
+        (r'(Spółka\s+Jawna)', ('spółka',)),
+        (r'(Spółka\s+Komandytowa)', ('spółka',)),
+        (r'(Spółka\s+Komandytowo-Akcyjna)', ('spółka',)),
+        (r'(Przedsiębiorstwo\s+Państwowe)', ('przedsiębiorstwo',)),
+        (r'(Zakład\s+Pracy\s+Chronionej)', ('zakład',))
+    ],
+    'payment': [
+        (r'(przelew\s+bankowy)', ('przelew',)),
+        (r'(gotówka)', ('gotówka',)),
+        (r'(karta\s+płatnicza)', ('karta',)),
+        (r'(czek)', ('czek',)),
+        (r'(weksel)', ('weksel',)),
+        (r'(kredyt\s+kupiecki)', ('kredyt',)),
+        (r'(leasing)', ('leasing',)),
+        (r'(faktoring)', ('faktoring',))
+    ],
+    'terms': [
+        (r'(\d+)\s*dni', ('dni',)),
+        (r'(\d+)\s*dni\s*od\s*wystawienia', ('wystawienia',)),
+        (r'(\d+)\s*dni\s*od\s*dostawy', ('dostawy',)),
+        (r'(\d+)\s*dni\s*od\s*odbioru', ('odbioru',)),
+        (r'(\d+)\s*dni\s*od\s*daty\s*faktury', ('faktury',)),
+        (r'(\d+)\s*dni\s*od\s*daty\s*wystawienia', ('wystawienia',))
+    ],
+    'bank_account': [
+        r'(\d{2}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4})',
+        r'(\d{2}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4})',
+        (r'IBAN\s*[:]?\s*([A-Z]{2}\d{2}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4})', ('iban',)),
+        (r'konto\s*[:]?\s*(\d{2}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4})', ('konto',))
+    ],
+    'email': [
+        (r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', ('@',)),
+        (r'email\s*[:]?\s*([A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,})', ('email',)),
+        (r'e-mail\s*[:]?\s*([A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,})', ('e-mail',))
+    ],
+    'phone': [
+        (r'(\+\d{2}\s+\d{3}\s+\d{3}\s+\d{3})', ('+',)),
+        r'(\d{3}\s+\d{3}\s+\d{3})',
+        r'(\d{3}[\-\s]\d{3}[\-\s]\d{3})',
+        (r'telefon\s*[:]?\s*(\+\d{2}\s+\d{3}\s+\d{3}\s+\d{3})', ('telefon',)),
+        (r'tel\.\s*[:]?\s*(\+\d{2}\s+\d{3}\s+\d{3}\s+\d{3})', ('tel.',))
+    ],
+    'address': [
+        (r'(ul\.\s+[A-ZĄĆĘŁŃÓŚŹŻ][a-ząćęłńóśźż\s]+)', ('ul.',)),
+        (r'(al\.\s+[A-ZĄĆĘŁŃÓŚŹŻ][a-ząćęłńóśźż\s]+)', ('al.',)),
+        (r'(os\.\s+[A-ZĄĆĘŁŃÓŚŹŻ][a-ząćęłńóśźż\s]+)', ('os.',)),
+        r'(\d{2}-\d{3}\s+[A-ZĄĆĘŁŃÓŚŹŻ][a-ząćęłńóśźż\s]+)',
+        r'(\d{2}\s+\d{3}\s+[A-ZĄĆĘŁŃÓŚŹŻ][a-ząćęłńóśźż\s]+)'
+    ],
+}
+
+POLISH_PROCESSOR_PATTERNS = {
+    'vat_patterns': [
+        (r'VAT[-\s]*(\d{10})', ('vat',)),
+        (r'NIP[-\s]*(\d{3}[-\s]*\d{3}[-\s]*\d{2}[-\s]*\d{2})', ('nip',)),
+        (r'NIP[-\s]*(\d{10})', ('nip',)),
+        r'(\d{3}[-\s]*\d{3}[-\s]*\d{2}[-\s]*\d{2})',
+        (r'(?:NIP|VAT|Numer\s+VAT)[-:\s]*(\d{3}[-\s]?\d{3}[-\s]?\d{2}[-\s]?\d{2})', ('nip', 'vat')),
+        (r'(?:Identyfikator\s+podatkowy|Nr\s+VAT)[-:\s]*(\d{10})', ('identyfikator', 'vat')),
+        (r'PL\s*(\d{10})', ('pl',)),
+    ],
+    'date_patterns': INVOICE_FIELD_PATTERNS['dates'],
+    'currency_patterns': [
+        (r'(\d+(?:\s?\d{3})*[,.]?\d*)\s*zł', ('zł',)),
+        (r'(\d+(?:\s?\d{3})*[,.]?\d*)\s*PLN', ('pln',)),
+        (r'PLN\s*(\d+(?:\s?\d{3})*[,.]?\d*)', ('pln',)),
+        (r'(\d+(?:\s?\d{3})*[,.]?\d*)\s*złotych?', ('złoty',)),
+        (r'(\d+(?:\s?\d{3})*[,.]?\d*)\s*zł(?:otych)?', ('zł',)),
+        (r'(?:Suma|Razem|Łącznie|Do\s+zapłaty)[-:\s]*(\d+(?:\s?\d{3})*[,.]?\d*)\s*(?:zł|PLN)', ('zł', 'pln')),
+        (r'(\d+(?:\s?\d{3})*[,.]?\d*)\s*gr', ('gr',)),
+    ],
+    'company_patterns': [
+        r'([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s\-&.,"()0-9]+?)\s*(Sp(?:ółka)?\.?\s*z\s*o\.?o\.?)',
+        r'([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s\-&.,"()0-9]+?)\s*(S\.?A\.?)',
+        (r'([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s\-&.,"()0-9]+?)\s*(Spółka\s*Akcyjna)', ('spółka',)),
+        (r'([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s\-&.,"()0-9]+?)\s*(Sp\.?\s*j\.?)', ('sp',)),
+        (r'([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s\-&.,"()0-9]+?)\s*(Sp\.?\s*k\.?)', ('sp',)),
+        (r'([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s\-&.,"()0-9]+?)\s*(Sp\.?\s*p\.?)', ('sp',)),
+        r'([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s\-&.,"()0-9]+?)\s*(P\.?P\.?H\.?U?\.?)',
+        (r'([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s\-&.,"()0-9]+?)\s*(Firma\s+(?:Handlowa|Usługowa))', ('firma',)),
+        (r'([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s\-&.,"()0-9]+?)\s*(Przedsiębiorstwo)', ('przedsiębiorstwo',)),
+    ],
+    'invoice_number_patterns': [
+        r'(?:Faktura|FV|F|Nr|Numer)[-:\s]*([A-Z]*\d+[/\-]\d+[/\-]\d+)',
+        r'(?:Faktura|FV|F|Nr|Numer)[-:\s]*([A-Z]*\d+)',
+        r'([A-Z]*\d+[/\-]\d+[/\-]\d+)',
+        (r'(?:Faktura\s+VAT|FV)[-:\s]*([A-Z0-9/\-]+)', ('faktura', 'fv')),
+        (r'(?:Nr\s+faktury|Numer\s+faktury)[-:\s]*([A-Z0-9/\-]+)', ('faktury',)),
+        r'([A-Z]{2,4}[/\-]\d+[/\-]\d{2,4})',
+    ],
+    'vat_rate_patterns': [
+        (r'(\d+)%\s*VAT', ('%',)),
+        (r'VAT\s*(\d+)%', ('%',)),
+        (r'(\d+)\s*proc\.?\s*VAT', ('proc',)),
+        (r'stawka\s*VAT\s*(\d+)%', ('stawka',)),
+        (r'(\d+)%\s*podatku', ('%',)),
+        (r'zwolnione\s*z\s*VAT', ('zwolnione',)),
+        (r'0%\s*VAT', ('%',)),
+        (r'(\d+),(\d+)%\s*VAT', ('%',)),
+    ],
+    'address_patterns': [
+        r'(\d{2}-\d{3})\s+([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s]+)',
+        (r'ul\.\s*([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s]+)\s*(\d+[a-zA-Z]?(?:/\d+)?)', ('ul.',)),
+        r'([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s]+)\s*(\d+[a-zA-Z]?(?:/\d+)?)',
+        (r'(?:al\.|aleja)\s*([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s]+)\s*(\d+[a-zA-Z]?)', ('al.', 'aleja')),
+        (r'(?:pl\.|plac)\s*([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s]+)\s*(\d+[a-zA-Z]?)', ('pl.', 'plac')),
+    ],
+    'bank_account_patterns': INVOICE_FIELD_PATTERNS['bank_accounts'],
+    'regon_patterns': [
+        (r'REGON[-:\s]*(\d{9})', ('regon',)),
+        (r'REGON[-:\s]*(\d{14})', ('regon',)),
+        (r'(?:Nr\s+REGON|Numer\s+REGON)[-:\s]*(\d{9,14})', ('regon',)),
+    ],
+    'krs_patterns': [
+        (r'KRS[-:\s]*(\d{10})', ('krs',)),
+        (r'(?:Nr\s+KRS|Numer\s+KRS)[-:\s]*(\d{10})', ('krs',)),
+    ],
+}
+
+POLISH_ENTITY_PATTERNS = {
+    'COMPANY_NAME': [
+        (r'([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s\-&.,"()0-9]{5,50})\s*(?:Sp\.|S\.A\.|Firma|Przedsiębiorstwo)',
+         ('sp.', 's.a.', 'firma', 'przedsiębiorstwo')),
+        (r'(?:Sprzedawca|Nabywca|Firma)[-:\s]*([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s\-&.,"()0-9]{3,50})', ('sprzedawca', 'nabywca', 'firma')),
+    ],
+    'NIP_NUMBER': [
+        (r'(?:NIP|VAT)[-:\s]*(\d{3}[-\s]?\d{3}[-\s]?\d{2}[-\s]?\d{2})', ('nip', 'vat')),
+        (r'PL\s*(\d{10})', ('pl',)),
+    ],
+    'INVOICE_NUMBER': [
+        (r'(?:Faktura|FV|Nr)[-:\s]*([A-Z0-9/\-]{3,20})', ('faktura', 'fv', 'nr')),
+        r'([A-Z]{2,4}[/\-]\d+[/\-]\d{2,4})',
+    ],
+    'AMOUNT': [
+        (r'(\d+(?:\s?\d{3})*[,.]?\d*)\s*(?:zł|PLN)', ('zł', 'pln')),
+        (r'(?:Suma|Razem|Do zapłaty)[-:\s]*(\d+(?:\s?\d{3})*[,.]?\d*)', ('suma', 'razem', 'do zapłaty')),
+    ],
+    'DATE': [
+        r'(\d{1,2}[.-/]\d{1,2}[.-/]\d{2,4})',
+        (r'(\d{1,2}\s+(?:stycznia|lutego|marca|kwietnia|maja|czerwca|lipca|sierpnia|września|października|listopada|grudnia)\s+\d{4})', POLISH_MONTHS),
+    ],
+}
+
+ADVANCED_POLISH_PATTERNS = {
+    # NIP and REGON candidates are digits only and scanned case-sensitively before
+    'nip': [
+        r'\b\d{3}[\-\s]?\d{3}[\-\s]?\d{2}[\-\s]?\d{2}\b',
+    ],
+    'regon': [
+        r'\b\d{9}\b|\b\d{14}\b',
+    ],
+    'dates': [
+        r'\b(\d{1,2})[.\-/](\d{1,2})[.\-/](\d{4})\b',
+        r'\b(\d{4})[.\-/](\d{1,2})[.\-/](\d{1,2})\b',
+        (r'\b(\d{1,2})\s+(stycznia|lutego|marca|kwietnia|maja|czerwca|lipca|sierpnia|września|października|listopada|grudnia)\s+(\d{4})\b', POLISH_MONTHS),
+        (r'(?:Data\s+wystawienia|Data\s+sprzedaży|Termin\s+płatności|Data\s+odbioru)[-:\s]*(\d{1,2}[.\-/]\d{1,2}[.\-/]\d{2,4})', ('data', 'termin')),
+        (r'(?:Wystawiono|Sprzedano|Płatność|Odbioru)[-:\s]*(\d{1,2}[.\-/]\d{1,2}[.\-/]\d{2,4})', ('wystawiono', 'sprzedano', 'płatność', 'odbioru')),
+        r'\b(\d{1,2})[.\-/](\d{1,2})[.\-/](\d{2})\b',
+        r'\b(\d{2})[.\-/](\d{1,2})[.\-/](\d{4})\b',
+    ],
+    'vat_rates': [
+        (r'(\d{1,2}[,\.]\d{1,2})\s*%?\s*VAT', ('vat',)),
+        (r'VAT\s*(\d{1,2}[,\.]\d{1,2})\s*%?', ('vat',)),
+        (r'(\d{1,2}[,\.]\d{1,2})\s*%?\s*podatku', ('podatku',)),
+        (r'podatek\s*(\d{1,2}[,\.]\d{1,2})\s*%?', ('podatek',)),
+        (r'stawka\s*(\d{1,2}[,\.]\d{1,2})\s*%?', ('stawka',)),
+        (r'(\d{1,2}[,\.]\d{1,2})\s*%?\s*stawka', ('stawka',)),
+        (r'(zw|ZW)\s*[-–]\s*zwolniony', ('zwolniony',)),
+        (r'(np|NP)\s*[-–]\s*nie\s+podlega', ('podlega',)),
+        (r'(oo|OO)\s*[-–]\s*odwrotne\s+obciążenie', ('odwrotne',)),
+        (r'zwolniony\s+z\s+VAT', ('zwolniony',)),
+        (r'nie\s+podlega\s+VAT', ('podlega',)),
+        (r'odwrotne\s+obciążenie', ('odwrotne',)),
+    ],
+    'currency': [
+        (r'([\d\s,]+)\s*(?:zł|PLN|złoty|złotych)', ('zł', 'pln')),
+        (r'(?:suma|kwota|netto|brutto|VAT|razem|do\s+zapłaty)[:\s]*([\d\s,]+)\s*(?:zł|PLN)?',
+         ('suma', 'kwota', 'netto', 'brutto', 'vat', 'razem', 'zapłaty')),
+        (r'([\d\s,]+)\s*(?:EUR|€|euro)', ('eur', '€')),
+        (r'([\d\s,]+)\s*(?:USD|\$|dolar)', ('usd', '$', 'dolar')),
+        (r'([\d\s,]+)\s*(?:GBP|£|funt)', ('gbp', '£', 'funt')),
+        (r'([\d\s,]+)\s*(?:CHF|frank)', ('chf', 'frank')),
+    ],
+    'invoice_numbers': [
+        (r'(?:faktur[ay]?|invoice)\s*(?:nr|nr\.|numer|number)?[.:\s]*([a-zA-Z0-9\/\-_]+)', ('faktur', 'invoice')),
+        (r'FV[/\-]?(\d+[/\-]\d+)', ('fv',)),
+        r'(\d{2,4}[/\-]\d{2,4}[/\-]\d{2,4})',
+        (r'Nr\s*(?:faktury|invoice)[.:\s]*([a-zA-Z0-9\/\-_]+)', ('faktury', 'invoice')),
+        (r'(?:Numer|Number)\s*(?:faktury|invoice)[.:\s]*([a-zA-Z0-9\/\-_]+)', ('faktury', 'invoice')),
+        (r'FAK\s*(\d+)', ('fak',)),
+        (r'INV\s*(\d+)', ('inv',)),
+        r'(\d{4}\/\d{2}\/\d+)',
+        r'(\d{2}\/\d{4}\/\d+)',
+    ],
+}
+
+# Scanned with re.IGNORECASE | re.MULTILINE (the standalone REGON patterns anchor on line ends)
+ENHANCED_POLISH_PATTERNS = {
+    'nip': [
+        (r'NIP[:\s]*(\d{3}[-\s]?\d{3}[-\s]?\d{2}[-\s]?\d{2})', ('nip',)),
+        (r'NIP[:\s]*(\d{10})', ('nip',)),
+    ],
+    'regon': [
+        (r'REGON[:\s]*(\d{9})', ('regon',)),
+        (r'REGON[:\s]*(\d{14})', ('regon',)),
+        r'(?:^|\s)(\d{9})(?:\s|$)',
+        r'(?:^|\s)(\d{14})(?:\s|$)',
+    ],
+    'krs': [
+        (r'KRS[:\s]*(\d{10})', ('krs',)),
+        (r'(?:Sąd|Sadu|Rejestru)[^0-9]*(\d{10})', ('sąd', 'sadu', 'rejestru')),
+    ],
+    'dates': [
+        r'\b(\d{1,2})[.\-/](\d{1,2})[.\-/](\d{4})\b',
+        r'\b(\d{4})[.\-/](\d{1,2})[.\-/](\d{1,2})\b',
+        (r'\b(\d{1,2})\s+(stycznia|lutego|marca|kwietnia|maja|czerwca|lipca|sierpnia|września|października|listopada|grudnia)\s+(\d{4})\b', POLISH_MONTHS),
+    ],
+    'vat_rates': [
+        (r'(\d{1,2})%\s*VAT', ('%',)),
+        (r'VAT\s*(\d{1,2})%', ('%',)),
+        (r'(\d{1,2})\s*%', ('%',)),
+    ],
+    'currency': [
+        (r'(\d+(?:[,\.]\d{2})?)\s*(?:zł|PLN|złotych)', ('zł', 'pln')),
+        (r'(?:suma|kwota|netto|brutto|VAT)[:\s]*(\d+[,\.]\d{2})', ('suma', 'kwota', 'netto', 'brutto', 'vat')),
+    ],
+    'invoice_numbers': [
+        (r'(?:Faktura|FV|F)\s*(?:nr\.?|numer|#)\s*([A-Z0-9/\-\.]+)', ('nr', 'numer', '#')),
+        r'(?:Faktura|FV|F)[:\s]+([A-Z0-9/\-\.]+)',
+        (r'Nr\s*faktury[:\s]+([A-Z0-9/\-\.]+)', ('faktury',)),
+        (r'Nr[:\s]+([A-Z0-9/\-\.]+)', ('nr',)),
+    ],
+}
+
+PatternSpec = Union[str, Tuple[str, Sequence[str]]]
+
+
+def fold(text: str) -> str:
+    """Case-fold text the way ``re.IGNORECASE`` compares characters"""
+    # re.IGNORECASE matches dotless i and dotted capital I (folded to i + U+0307) to a plain i
+    return text.casefold().replace('ı', 'i').replace('i\u0307', 'i')
+
+
+@dataclass(frozen=True)
+class ScanPattern:
+    """Compiled pattern of a field family"""
+    family: str
+    pattern: str
+    regex: Pattern
+    keywords: Tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class FieldCandidate:
+    """Candidate field match found by the scanner"""
+    family: str
+    index: int  # position of the pattern in its family
+    pattern: str
+    match: re.Match
+
+    @property
+    def span(self) -> Tuple[int, int]:
+        return self.match.span()
+
+    @property
+    def value(self) -> str:
+        """First group, or the whole match for patterns without groups"""
+        return self.match.group(1) if self.match.groups() else self.match.group(0)
+
+
+class FieldScanner:
+    """Scans texts with a precompiled pattern table, caching recent results"""
+
+    def __init__(self, families: Dict[str, List[PatternSpec]], flags: int = re.IGNORECASE,
+                 cache_size: int = 32):
+        """
+        Initialize scanner
+
+        Args:
+            families: Field family to patterns; a pattern may be given as
+                (pattern, keywords) where every match contains one of the keywords
+            flags: Regex flags of all patterns
+            cache_size: Number of recently scanned texts whose candidates are kept
+        """
+        self.families: Dict[str, List[ScanPattern]] = {}
+        for family, specs in families.items():
+            self.families[family] = []
+            for spec in specs:
+                pattern, keywords = (spec, ()) if isinstance(spec, str) else spec
+                self.families[family].append(ScanPattern(
+                    family=family,
+                    pattern=pattern,
+                    regex=re.compile(pattern, flags),
+                    keywords=tuple(fold(keyword) for keyword in keywords)
+                ))
+
+        self.cache_size = cache_size
+        self._cache: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def pattern_strings(self) -> Dict[str, List[str]]:
+        """Raw pattern strings per family"""
+        return {family: [p.pattern for p in patterns] for family, patterns in self.families.items()}
+
+    def patterns(self, family: str, text: Optional[str] = None) -> List[ScanPattern]:
+        """Compiled patterns of a family, skipping those that cannot match the text"""
+        if text is None:
+            return self.families[family]
+        folded = fold(text)
+        return [p for p in self.families[family] if self._may_match(p, folded)]
+
+    @staticmethod
+    def _may_match(pattern: ScanPattern, folded: str) -> bool:
+        return not pattern.keywords or any(keyword in folded for keyword in pattern.keywords)
+
+    def candidates(self, text: str, family: str) -> List[FieldCandidate]:
+        """Candidates of one family, in pattern order and then match order"""
+        return [
+            FieldCandidate(family, index, pattern, match)
+            for index, (pattern, matches) in enumerate(self.matches(text, family))
+            for match in matches
+        ]
+
+    def matches(self, text: str, family: str) -> List[Tuple[str, List[re.Match]]]:
+        """(pattern, matches) pairs of a family, like ``re.finditer`` per pattern"""
+        found = self.scan(text, (family,))[family]
+        return [(p.pattern, matches) for p, matches in zip(self.families[family], found)]
+
+    def findall(self, text: str, family: str) -> List[Tuple[str, List]]:
+        """(pattern, values) pairs of a family, like ``re.findall`` per pattern"""
+        folded = fold(text)
+        return [
+            (p.pattern, p.regex.findall(text) if self._may_match(p, folded) else [])
+            for p in self.families[family]
+        ]
+
+    def scan(self, text: str, families: Optional[Iterable[str]] = None) -> Dict[str, List[List[re.Match]]]:
+        """
+        Scan a text for candidate fields
+
+        Args:
+            text: Text to scan
+            families: Families to scan (default: all)
+
+        Returns:
+            Family to the matches of every pattern of the family (empty for
+            patterns skipped by the keyword prefilter)
+        """
+        families = list(self.families if families is None else families)
+
+        with self._lock:
+            entry = self._cache.get(text)
+            if entry is not None:
+                self._cache.move_to_end(text)
+
+        if entry is None:
+            entry = {'folded': fold(text), 'families': {}}
+
+        scanned = entry['families']
+        for family in families:
+            if family not in scanned:
+                scanned[family] = [
+                    list(p.regex.finditer(text)) if self._may_match(p, entry['folded']) else []
+                    for p in self.families[family]
+                ]
+
+        if self.cache_size:
+            with self._lock:
+                self._cache[text] = entry
+                self._cache.move_to_end(text)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return {family: scanned[family] for family in families}
+
+    def clear_cache(self):
+        """Drop cached scan results"""
+        with self._lock:
+            self._cache.clear()
+
+
+# Global scanners, compiled once at import
+invoice_field_scanner = FieldScanner(INVOICE_FIELD_PATTERNS)
+polish_pattern_scanner = FieldScanner(POLISH_PATTERNS)
+polish_processor_scanner = FieldScanner(POLISH_PROCESSOR_PATTERNS)
+polish_entity_scanner = FieldScanner(POLISH_ENTITY_PATTERNS)
+advanced_polish_scanner = FieldScanner(ADVANCED_POLISH_PATTERNS)
+enhanced_polish_scanner = FieldScanner(ENHANCED_POLISH_PATTERNS, flags=re.IGNORECASE | re.MULTILINE)
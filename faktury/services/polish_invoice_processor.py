@@ -19,6 +19,8 @@ except ImportError:
     DJANGO_AVAILABLE = False
     settings = None
 
+from .polish_field_scanner import polish_entity_scanner, polish_processor_scanner
+
 logger = logging.getLogger(__name__)
 
 
@@ -49,104 +51,10 @@ class PolishInvoiceProcessor:
     """
     
     def __init__(self):
-        # Enhanced Polish patterns with more comprehensive coverage
-        self.polish_patterns = {
-            # Enhanced Polish VAT patterns
-            'vat_patterns': [
-                r'VAT[-\s]*(\d{10})',  # VAT-1234567890
-                r'NIP[-\s]*(\d{3}[-\s]*\d{3}[-\s]*\d{2}[-\s]*\d{2})',  # NIP 123-456-78-90
-                r'NIP[-\s]*(\d{10})',  # NIP 1234567890
-                r'(\d{3}[-\s]*\d{3}[-\s]*\d{2}[-\s]*\d{2})',  # 123-456-78-90
-                r'(?:NIP|VAT|Numer\s+VAT)[-:\s]*(\d{3}[-\s]?\d{3}[-\s]?\d{2}[-\s]?\d{2})',  # Various prefixes
-                r'(?:Identyfikator\s+podatkowy|Nr\s+VAT)[-:\s]*(\d{10})',  # Full descriptions
-                r'PL\s*(\d{10})',  # EU VAT format PL1234567890
-            ],
-            
-            # Enhanced Polish date patterns
-            'date_patterns': [
-                r'(\d{2})[.-/](\d{2})[.-/](\d{4})',  # DD.MM.YYYY, DD-MM-YYYY, DD/MM/YYYY
-                r'(\d{4})[.-/](\d{2})[.-/](\d{2})',  # YYYY-MM-DD, YYYY.MM.DD, YYYY/MM/DD
-                r'(\d{1,2})\s+(stycznia|lutego|marca|kwietnia|maja|czerwca|lipca|sierpnia|września|października|listopada|grudnia)\s+(\d{4})',  # Polish month names
-                r'(?:dnia\s+)?(\d{1,2})[.-/](\d{1,2})[.-/](\d{4})',  # "dnia DD.MM.YYYY"
-                r'(\d{2})\.(\d{2})\.(\d{2})',  # DD.MM.YY
-                r'(?:Data\s+wystawienia|Data\s+sprzedaży|Termin\s+płatności)[-:\s]*(\d{1,2}[.-/]\d{1,2}[.-/]\d{2,4})',  # Labeled dates
-            ],
-            
-            # Enhanced Polish currency patterns
-            'currency_patterns': [
-                r'(\d+(?:\s?\d{3})*[,.]?\d*)\s*zł',  # 1 234,45 zł (with thousands separator)
-                r'(\d+(?:\s?\d{3})*[,.]?\d*)\s*PLN',  # 1 234,45 PLN
-                r'PLN\s*(\d+(?:\s?\d{3})*[,.]?\d*)',  # PLN 1 234,45
-                r'(\d+(?:\s?\d{3})*[,.]?\d*)\s*złotych?',  # złoty/złotych
-                r'(\d+(?:\s?\d{3})*[,.]?\d*)\s*zł(?:otych)?',  # Various złoty forms
-                r'(?:Suma|Razem|Łącznie|Do\s+zapłaty)[-:\s]*(\d+(?:\s?\d{3})*[,.]?\d*)\s*(?:zł|PLN)',  # Labeled amounts
-                r'(\d+(?:\s?\d{3})*[,.]?\d*)\s*gr',  # grosze
-            ],
-            
-            # Enhanced Polish company identifiers
-            'company_patterns': [
-                r'([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s\-&.,"()0-9]+?)\s*(Sp(?:ółka)?\.?\s*z\s*o\.?o\.?)',  # Sp. z o.o. variations
-                r'([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s\-&.,"()0-9]+?)\s*(S\.?A\.?)',  # S.A. variations
-                r'([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s\-&.,"()0-9]+?)\s*(Spółka\s*Akcyjna)',  # Full form
-                r'([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s\-&.,"()0-9]+?)\s*(Sp\.?\s*j\.?)',  # Sp. j.
-                r'([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s\-&.,"()0-9]+?)\s*(Sp\.?\s*k\.?)',  # Sp. k.
-                r'([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s\-&.,"()0-9]+?)\s*(Sp\.?\s*p\.?)',  # Sp. p.
-                r'([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s\-&.,"()0-9]+?)\s*(P\.?P\.?H\.?U?\.?)',  # PPHU
-                r'([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s\-&.,"()0-9]+?)\s*(Firma\s+(?:Handlowa|Usługowa))',  # Firma types
-                r'([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s\-&.,"()0-9]+?)\s*(Przedsiębiorstwo)',  # Przedsiębiorstwo
-            ],
-            
-            # Enhanced Polish invoice numbers
-            'invoice_number_patterns': [
-                r'(?:Faktura|FV|F|Nr|Numer)[-:\s]*([A-Z]*\d+[/\-]\d+[/\-]\d+)',  # FV/123/2024, FV-123-2024
-                r'(?:Faktura|FV|F|Nr|Numer)[-:\s]*([A-Z]*\d+)',  # F 123, FV123
-                r'([A-Z]*\d+[/\-]\d+[/\-]\d+)',  # 123/01/2024
-                r'(?:Faktura\s+VAT|FV)[-:\s]*([A-Z0-9/\-]+)',  # Faktura VAT FV/123/2024
-                r'(?:Nr\s+faktury|Numer\s+faktury)[-:\s]*([A-Z0-9/\-]+)',  # Nr faktury: 123/2024
-                r'([A-Z]{2,4}[/\-]\d+[/\-]\d{2,4})',  # ABC/123/2024
-            ],
-            
-            # Enhanced Polish VAT rates
-            'vat_rate_patterns': [
-                r'(\d+)%\s*VAT',
-                r'VAT\s*(\d+)%',
-                r'(\d+)\s*proc\.?\s*VAT',
-                r'stawka\s*VAT\s*(\d+)%',
-                r'(\d+)%\s*podatku',
-                r'zwolnione\s*z\s*VAT',  # VAT exempt
-                r'0%\s*VAT',  # 0% VAT
-                r'(\d+),(\d+)%\s*VAT',  # Decimal VAT rates like 23,00%
-            ],
-            
-            # Polish address patterns
-            'address_patterns': [
-                r'(\d{2}-\d{3})\s+([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s]+)',  # 00-000 City
-                r'ul\.\s*([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s]+)\s*(\d+[a-zA-Z]?(?:/\d+)?)',  # ul. Street 123
-                r'([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s]+)\s*(\d+[a-zA-Z]?(?:/\d+)?)',  # Street 123
-                r'(?:al\.|aleja)\s*([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s]+)\s*(\d+[a-zA-Z]?)',  # Aleja
-                r'(?:pl\.|plac)\s*([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s]+)\s*(\d+[a-zA-Z]?)',  # Plac
-            ],
-            
-            # Polish bank account patterns (IBAN)
-            'bank_account_patterns': [
-                r'PL\s*(\d{2}\s*\d{4}\s*\d{4}\s*\d{4}\s*\d{4}\s*\d{4}\s*\d{4})',  # Polish IBAN
-                r'(?:Nr\s+konta|Numer\s+konta|Konto)[-:\s]*PL\s*(\d{26})',  # Account number
-                r'(\d{2}\s*\d{4}\s*\d{4}\s*\d{4}\s*\d{4}\s*\d{4}\s*\d{4})',  # IBAN without PL
-            ],
-            
-            # Polish REGON patterns
-            'regon_patterns': [
-                r'REGON[-:\s]*(\d{9})',  # 9-digit REGON
-                r'REGON[-:\s]*(\d{14})',  # 14-digit REGON
-                r'(?:Nr\s+REGON|Numer\s+REGON)[-:\s]*(\d{9,14})',
-            ],
-            
-            # Polish KRS patterns
-            'krs_patterns': [
-                r'KRS[-:\s]*(\d{10})',  # KRS number
-                r'(?:Nr\s+KRS|Numer\s+KRS)[-:\s]*(\d{10})',
-            ]
-        }
+        # Polish patterns, compiled once by the shared scanners
+        self.scanner = polish_processor_scanner
+        self.entity_scanner = polish_entity_scanner
+        self.polish_patterns = self.scanner.pattern_strings()
         
         self.polish_months = {
             'stycznia': '01', 'lutego': '02', 'marca': '03', 'kwietnia': '04',
@@ -220,28 +128,7 @@ class PolishInvoiceProcessor:
         }
         
         # ML-based entity recognition patterns
-        self.entity_patterns = {
-            'COMPANY_NAME': [
-                r'([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s\-&.,"()0-9]{5,50})\s*(?:Sp\.|S\.A\.|Firma|Przedsiębiorstwo)',
-                r'(?:Sprzedawca|Nabywca|Firma)[-:\s]*([A-ZĄĆĘŁŃÓŚŻŹ][a-ząćęłńóśżź\s\-&.,"()0-9]{3,50})'
-            ],
-            'NIP_NUMBER': [
-                r'(?:NIP|VAT)[-:\s]*(\d{3}[-\s]?\d{3}[-\s]?\d{2}[-\s]?\d{2})',
-                r'PL\s*(\d{10})'
-            ],
-            'INVOICE_NUMBER': [
-                r'(?:Faktura|FV|Nr)[-:\s]*([A-Z0-9/\-]{3,20})',
-                r'([A-Z]{2,4}[/\-]\d+[/\-]\d{2,4})'
-            ],
-            'AMOUNT': [
-                r'(\d+(?:\s?\d{3})*[,.]?\d*)\s*(?:zł|PLN)',
-                r'(?:Suma|Razem|Do zapłaty)[-:\s]*(\d+(?:\s?\d{3})*[,.]?\d*)'
-            ],
-            'DATE': [
-                r'(\d{1,2}[.-/]\d{1,2}[.-/]\d{2,4})',
-                r'(\d{1,2}\s+(?:stycznia|lutego|marca|kwietnia|maja|czerwca|lipca|sierpnia|września|października|listopada|grudnia)\s+\d{4})'
-            ]
-        }
+        self.entity_patterns = self.entity_scanner.pattern_strings()
 
     def enhance_extraction(self, raw_text: str, base_extraction: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -330,9 +217,8 @@ class PolishInvoiceProcessor:
         """ML-based entity recognition for Polish invoice elements"""
         entities = []
         
-        for entity_type, patterns in self.entity_patterns.items():
-            for pattern in patterns:
-                matches = re.finditer(pattern, text, re.IGNORECASE)
+        for entity_type in self.entity_patterns:
+            for pattern, matches in self.entity_scanner.matches(text, entity_type):
                 for match in matches:
                     # Calculate confidence based on pattern specificity and context
                     confidence = self._calculate_entity_confidence(
@@ -421,8 +307,7 @@ class PolishInvoiceProcessor:
         vat_data = {}
         found_nips = []
         
-        for pattern in self.polish_patterns['vat_patterns']:
-            matches = re.findall(pattern, text, re.IGNORECASE)
+        for pattern, matches in self.scanner.findall(text, 'vat_patterns'):
             for match in matches:
                 clean_nip = re.sub(r'[^\d]', '', match)
                 if len(clean_nip) == 10 and self._validate_nip_enhanced(clean_nip):
@@ -455,8 +340,7 @@ class PolishInvoiceProcessor:
         """Extract VAT numbers using Polish patterns"""
         vat_data = {}
         
-        for pattern in self.polish_patterns['vat_patterns']:
-            matches = re.findall(pattern, text, re.IGNORECASE)
+        for pattern, matches in self.scanner.findall(text, 'vat_patterns'):
             if matches:
                 # Clean and validate VAT numbers
                 clean_vats = []
@@ -480,8 +364,7 @@ class PolishInvoiceProcessor:
         date_data = {}
         found_dates = []
         
-        for pattern in self.polish_patterns['date_patterns']:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
+        for pattern, matches in self.scanner.matches(text, 'date_patterns'):
             
             for match in matches:
                 try:
@@ -592,8 +475,7 @@ class PolishInvoiceProcessor:
         """Extract dates using Polish patterns"""
         date_data = {}
         
-        for pattern in self.polish_patterns['date_patterns']:
-            matches = re.findall(pattern, text, re.IGNORECASE)
+        for pattern, matches in self.scanner.findall(text, 'date_patterns'):
             
             if pattern.count('stycznia|lutego') > 0:  # Polish month names pattern
                 for match in matches:
@@ -633,8 +515,7 @@ class PolishInvoiceProcessor:
         # Split text into sections for better company identification
         sections = self._identify_text_sections(text)
         
-        for pattern in self.polish_patterns['company_patterns']:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
+        for pattern, matches in self.scanner.matches(text, 'company_patterns'):
             for match in matches:
                 if isinstance(match.groups(), tuple) and len(match.groups()) >= 2:
                     company_name = f"{match.group(1).strip()} {match.group(2).strip()}"
@@ -752,8 +633,7 @@ class PolishInvoiceProcessor:
         """Extract company names using Polish patterns"""
         company_data = {}
         
-        for pattern in self.polish_patterns['company_patterns']:
-            matches = re.findall(pattern, text, re.IGNORECASE)
+        for pattern, matches in self.scanner.findall(text, 'company_patterns'):
             for match in matches:
                 if isinstance(match, tuple):
                     company_name = f"{match[0].strip()} {match[1].strip()}"
@@ -772,8 +652,7 @@ class PolishInvoiceProcessor:
         amount_data = {}
         found_amounts = []
         
-        for pattern in self.polish_patterns['currency_patterns']:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
+        for pattern, matches in self.scanner.matches(text, 'currency_patterns'):
             for match in matches:
                 try:
                     amount_str = match.group(1) if match.groups() else match.group(0)
@@ -909,8 +788,7 @@ class PolishInvoiceProcessor:
         
         # Extract REGON numbers
         regon_numbers = []
-        for pattern in self.polish_patterns['regon_patterns']:
-            matches = re.findall(pattern, text, re.IGNORECASE)
+        for pattern, matches in self.scanner.findall(text, 'regon_patterns'):
             regon_numbers.extend(matches)
         
         if regon_numbers:
@@ -919,8 +797,7 @@ class PolishInvoiceProcessor:
         
         # Extract KRS numbers
         krs_numbers = []
-        for pattern in self.polish_patterns['krs_patterns']:
-            matches = re.findall(pattern, text, re.IGNORECASE)
+        for pattern, matches in self.scanner.findall(text, 'krs_patterns'):
             krs_numbers.extend(matches)
         
         if krs_numbers:
@@ -929,8 +806,7 @@ class PolishInvoiceProcessor:
         
         # Extract bank account numbers
         bank_accounts = []
-        for pattern in self.polish_patterns['bank_account_patterns']:
-            matches = re.findall(pattern, text, re.IGNORECASE)
+        for pattern, matches in self.scanner.findall(text, 'bank_account_patterns'):
             for match in matches:
                 clean_account = re.sub(r'[^\d]', '', match)
                 if len(clean_account) == 26:  # Polish IBAN length
@@ -942,8 +818,7 @@ class PolishInvoiceProcessor:
         
         # Extract addresses
         addresses = []
-        for pattern in self.polish_patterns['address_patterns']:
-            matches = re.findall(pattern, text, re.IGNORECASE)
+        for pattern, matches in self.scanner.findall(text, 'address_patterns'):
             addresses.extend([' '.join(match) if isinstance(match, tuple) else match for match in matches])
         
         if addresses:
@@ -956,8 +831,7 @@ class PolishInvoiceProcessor:
         amount_data = {}
         amounts = []
         
-        for pattern in self.polish_patterns['currency_patterns']:
-            matches = re.findall(pattern, text, re.IGNORECASE)
+        for pattern, matches in self.scanner.findall(text, 'currency_patterns'):
             for match in matches:
                 try:
                     # Convert Polish decimal notation (comma) to dot
@@ -995,10 +869,7 @@ class PolishInvoiceProcessor:
         found_numbers = []
         
         # Use layout-specific patterns if available
-        patterns = self.polish_patterns['invoice_number_patterns']
-        
-        for pattern in patterns:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
+        for pattern, matches in self.scanner.matches(text, 'invoice_number_patterns'):
             for match in matches:
                 invoice_number = match.group(1) if match.groups() else match.group(0)
                 
@@ -1110,8 +981,7 @@ class PolishInvoiceProcessor:
         """Extract invoice numbers using Polish patterns"""
         invoice_data = {}
         
-        for pattern in self.polish_patterns['invoice_number_patterns']:
-            matches = re.findall(pattern, text, re.IGNORECASE)
+        for pattern, matches in self.scanner.findall(text, 'invoice_number_patterns'):
             if matches:
                 # Take the first match as invoice number
                 invoice_data['invoice_number'] = matches[0]
@@ -1184,8 +1054,8 @@ class PolishInvoiceProcessor:
         # Check each pattern category
         for category, patterns in self.polish_patterns.items():
             category_matches = 0
-            for pattern in patterns:
-                if re.search(pattern, text, re.IGNORECASE):
+            for pattern, matches in self.scanner.matches(text, category):
+                if matches:
                     category_matches += 1
             
             if patterns:
@@ -1352,8 +1222,8 @@ class PolishInvoiceProcessor:
         
         for category, patterns in self.polish_patterns.items():
             total_patterns += len(patterns)
-            for pattern in patterns:
-                if re.search(pattern, text, re.IGNORECASE):
+            for pattern, matches in self.scanner.matches(text, category):
+                if matches:
                     pattern_matches += 1
         
         if total_patterns > 0:
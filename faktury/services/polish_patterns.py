@@ -9,6 +9,8 @@ import logging
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 
+from .polish_field_scanner import polish_pattern_scanner
+
 logger = logging.getLogger(__name__)
 
 class PolishPatterns:
@@ -18,137 +20,30 @@ class PolishPatterns:
     """
     
     def __init__(self):
-        """Initialize Polish patterns with comprehensive regex expressions"""
-        
-        # NIP patterns (Polish Tax Identification Number)
-        self.nip_patterns = [
-            r'\b\d{3}[\-\s]?\d{3}[\-\s]?\d{2}[\-\s]?\d{2}[\-\s]?\d{3}\b',
-            r'NIP\s*[:]?\s*(\d{3}[\-\s]?\d{3}[\-\s]?\d{2}[\-\s]?\d{2}[\-\s]?\d{3})',
-            r'(\d{3}[\-\s]?\d{3}[\-\s]?\d{2}[\-\s]?\d{2}[\-\s]?\d{3})'
-        ]
-        
-        # REGON patterns (Business Registry Number)
-        self.regon_patterns = [
-            r'\b\d{9}\b',  # 9-digit REGON
-            r'\b\d{14}\b',  # 14-digit REGON
-            r'REGON\s*[:]?\s*(\d{9}|\d{14})',
-            r'(\d{9}|\d{14})'
-        ]
-        
-        # KRS patterns (National Court Register)
-        self.krs_patterns = [
-            r'\bKRS\s*[:]?\s*(\d{10})\b',
-            r'(\d{10})'
-        ]
-        
-        # Polish date patterns
-        self.date_patterns = [
-            r'\b\d{1,2}[\.\-]\d{1,2}[\.\-]\d{2,4}\b',
-            r'\b\d{4}[\.\-]\d{1,2}[\.\-]\d{1,2}\b',
-            r'data\s*[:]?\s*(\d{1,2}[\.\-]\d{1,2}[\.\-]\d{2,4})',
-            r'wystawiono\s*[:]?\s*(\d{1,2}[\.\-]\d{1,2}[\.\-]\d{2,4})'
-        ]
-        
-        # Invoice number patterns
-        self.invoice_patterns = [
-            r'faktur[ay]?\s*[nr]?[o]?[r]?[.]?\s*[:]?\s*([a-zA-Z0-9\/\-_]+)',
-            r'invoice\s*[nr]?[o]?[r]?[.]?\s*[:]?\s*([a-zA-Z0-9\/\-_]+)',
-            r'FV[/\-]?(\d+[/\-]\d+)',
-            r'(\d{2,4}[/\-]\d{2,4}[/\-]\d{2,4})',
-            r'Nr\s*faktury\s*[:]?\s*([a-zA-Z0-9\/\-_]+)'
-        ]
-        
-        # Currency amount patterns (Polish format with comma as decimal separator)
-        self.currency_patterns = [
-            r'([\d\s,]+)\s*[zł|PLN]',
-            r'([\d\s,]+)\s*[złoty|złotych]',
-            r'([\d\s,]+)\s*[EUR|€]',
-            r'([\d\s,]+)\s*[USD|\$]',
-            r'([\d\s,]+)\s*[GBP|£]'
-        ]
-        
-        # VAT rate patterns
-        self.vat_patterns = [
-            r'(\d{1,2}[,\.]\d{1,2})\s*%?\s*VAT',
-            r'VAT\s*(\d{1,2}[,\.]\d{1,2})\s*%?',
-            r'(\d{1,2}[,\.]\d{1,2})\s*%?\s*podatku',
-            r'podatek\s*(\d{1,2}[,\.]\d{1,2})\s*%?'
-        ]
-        
-        # Company name patterns
-        self.company_patterns = [
-            r'(Sp\.\s*z\s*o\.\s*o\.)',
-            r'(S\.\s*A\.)',
-            r'(Spółka\s+Akcyjna)',
-            r'(Spółka\s+z\s+ograniczoną\s+odpowiedzialnością)',
-            r'(Spółka\s+Jawna)',
-            r'(Spółka\s+Komandytowa)',
-            r'(Spółka\s+Komandytowo-Akcyjna)',
-            r'(Przedsiębiorstwo\s+Państwowe)',
-            r'(Zakład\s+Pracy\s+Chronionej)'
-        ]
-        
-        # Payment method patterns
-        self.payment_patterns = [
-            r'(przelew\s+bankowy)',
-            r'(gotówka)',
-            r'(karta\s+płatnicza)',
-            r'(czek)',
-            r'(weksel)',
-            r'(kredyt\s+kupiecki)',
-            r'(leasing)',
-            r'(faktoring)'
-        ]
-        
-        # Payment terms patterns
-        self.terms_patterns = [
-            r'(\d+)\s*dni',
-            r'(\d+)\s*dni\s*od\s*wystawienia',
-            r'(\d+)\s*dni\s*od\s*dostawy',
-            r'(\d+)\s*dni\s*od\s*odbioru',
-            r'(\d+)\s*dni\s*od\s*daty\s*faktury',
-            r'(\d+)\s*dni\s*od\s*daty\s*wystawienia'
-        ]
-        
-        # Bank account patterns
-        self.bank_account_patterns = [
-            r'(\d{2}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4})',
-            r'(\d{2}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4})',
-            r'IBAN\s*[:]?\s*([A-Z]{2}\d{2}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4})',
-            r'konto\s*[:]?\s*(\d{2}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4})'
-        ]
-        
-        # Email patterns
-        self.email_patterns = [
-            r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
-            r'email\s*[:]?\s*([A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,})',
-            r'e-mail\s*[:]?\s*([A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,})'
-        ]
-        
-        # Phone patterns
-        self.phone_patterns = [
-            r'(\+\d{2}\s+\d{3}\s+\d{3}\s+\d{3})',
-            r'(\d{3}\s+\d{3}\s+\d{3})',
-            r'(\d{3}[\-\s]\d{3}[\-\s]\d{3})',
-            r'telefon\s*[:]?\s*(\+\d{2}\s+\d{3}\s+\d{3}\s+\d{3})',
-            r'tel\.\s*[:]?\s*(\+\d{2}\s+\d{3}\s+\d{3}\s+\d{3})'
-        ]
-        
-        # Address patterns
-        self.address_patterns = [
-            r'(ul\.\s+[A-ZĄĆĘŁŃÓŚŹŻ][a-ząćęłńóśźż\s]+)',
-            r'(al\.\s+[A-ZĄĆĘŁŃÓŚŹŻ][a-ząćęłńóśźż\s]+)',
-            r'(os\.\s+[A-ZĄĆĘŁŃÓŚŹŻ][a-ząćęłńóśźż\s]+)',
-            r'(\d{2}-\d{3}\s+[A-ZĄĆĘŁŃÓŚŹŻ][a-ząćęłńóśźż\s]+)',
-            r'(\d{2}\s+\d{3}\s+[A-ZĄĆĘŁŃÓŚŹŻ][a-ząćęłńóśźż\s]+)'
-        ]
+        """Initialize Polish patterns (compiled once by the shared scanner)"""
+        self.scanner = polish_pattern_scanner
+        patterns = self.scanner.pattern_strings()
+        
+        self.nip_patterns = patterns['nip']  # Polish Tax Identification Number
+        self.regon_patterns = patterns['regon']  # Business Registry Number
+        self.krs_patterns = patterns['krs']  # National Court Register
+        self.date_patterns = patterns['date']
+        self.invoice_patterns = patterns['invoice']
+        self.currency_patterns = patterns['currency']
+        self.vat_patterns = patterns['vat']
+        self.company_patterns = patterns['company']
+        self.payment_patterns = patterns['payment']
+        self.terms_patterns = patterns['terms']
+        self.bank_account_patterns = patterns['bank_account']
+        self.email_patterns = patterns['email']
+        self.phone_patterns = patterns['phone']
+        self.address_patterns = patterns['address']
     
     def extract_nip_numbers(self, text: str) -> List[str]:
         """Extract NIP numbers from text"""
         nip_numbers = []
         
-        for pattern in self.nip_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
+        for pattern, matches in self.scanner.findall(text, 'nip'):
             for match in matches:
                 # Clean up the NIP number
                 nip_clean = re.sub(r'[^\d]', '', match)
@@ -161,8 +56,7 @@ class PolishPatterns:
         """Extract REGON numbers from text"""
         regon_numbers = []
         
-        for pattern in self.regon_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
+        for pattern, matches in self.scanner.findall(text, 'regon'):
             for match in matches:
                 regon_clean = re.sub(r'[^\d]', '', match)
                 if len(regon_clean) in [9, 14]:
@@ -174,8 +68,7 @@ class PolishPatterns:
         """Extract KRS numbers from text"""
         krs_numbers = []
         
-        for pattern in self.krs_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
+        for pattern, matches in self.scanner.findall(text, 'krs'):
             for match in matches:
                 krs_clean = re.sub(r'[^\d]', '', match)
                 if len(krs_clean) == 10:
@@ -187,8 +80,7 @@ class PolishPatterns:
         """Extract VAT rates from text"""
         vat_rates = []
         
-        for pattern in self.vat_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
+        for pattern, matches in self.scanner.findall(text, 'vat'):
             for match in matches:
                 # Standardize VAT rate format
                 vat_rate = match.replace(',', '.')
@@ -205,8 +97,7 @@ class PolishPatterns:
         """Extract Polish date formats from text"""
         dates = []
         
-        for pattern in self.date_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
+        for pattern, matches in self.scanner.findall(text, 'date'):
             for match in matches:
                 # Try to parse and validate the date
                 try:
@@ -247,8 +138,7 @@ class PolishPatterns:
         """Extract currency amounts from text"""
         amounts = []
         
-        for pattern in self.currency_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
+        for pattern, matches in self.scanner.findall(text, 'currency'):
             for match in matches:
                 # Clean up amount
                 amount_clean = re.sub(r'[^\d,\s]', '', match).strip()
@@ -261,8 +151,7 @@ class PolishPatterns:
         """Extract invoice numbers from text"""
         invoice_numbers = []
         
-        for pattern in self.invoice_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
+        for pattern, matches in self.scanner.findall(text, 'invoice'):
             for match in matches:
                 if match and len(match.strip()) > 0:
                     invoice_numbers.append(match.strip())
@@ -273,8 +162,7 @@ class PolishPatterns:
         """Extract company names and types from text"""
         company_names = []
         
-        for pattern in self.company_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
+        for pattern, matches in self.scanner.findall(text, 'company'):
             for match in matches:
                 if match and len(match.strip()) > 0:
                     company_names.append(match.strip())
@@ -285,8 +173,7 @@ class PolishPatterns:
         """Extract payment methods from text"""
         payment_methods = []
         
-        for pattern in self.payment_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
+        for pattern, matches in self.scanner.findall(text, 'payment'):
             for match in matches:
                 if match and len(match.strip()) > 0:
                     payment_methods.append(match.strip())
@@ -297,8 +184,7 @@ class PolishPatterns:
         """Extract payment terms from text"""
         payment_terms = []
         
-        for pattern in self.terms_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
+        for pattern, matches in self.scanner.findall(text, 'terms'):
             for match in matches:
                 try:
                     days = int(match)
@@ -313,8 +199,7 @@ class PolishPatterns:
         """Extract bank account numbers from text"""
         bank_accounts = []
         
-        for pattern in self.bank_account_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
+        for pattern, matches in self.scanner.findall(text, 'bank_account'):
             for match in matches:
                 account_clean = re.sub(r'[^\d]', '', match)
                 if len(account_clean) == 26:  # Polish IBAN length
@@ -326,8 +211,7 @@ class PolishPatterns:
         """Extract email addresses from text"""
         emails = []
         
-        for pattern in self.email_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
+        for pattern, matches in self.scanner.findall(text, 'email'):
             for match in matches:
                 if match and '@' in match:
                     emails.append(match.strip())
@@ -338,8 +222,7 @@ class PolishPatterns:
         """Extract phone numbers from text"""
         phones = []
         
-        for pattern in self.phone_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
+        for pattern, matches in self.scanner.findall(text, 'phone'):
             for match in matches:
                 if match and len(re.sub(r'[^\d]', '', match)) >= 9:
                     phones.append(match.strip())
@@ -350,8 +233,7 @@ class PolishPatterns:
         """Extract addresses from text"""
         addresses = []
         
-        for pattern in self.address_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
+        for pattern, matches in self.scanner.findall(text, 'address'):
             for match in matches:
                 if match and len(match.strip()) > 5:
                     addresses.append(match.strip())
@@ -0,0 +1,337 @@
+"""
+Cached company registry lookups by NIP and REGON
+
+Lookups go through a pluggable backend (``REGISTRY_LOOKUP_CONFIG['backend']``)
+and their results are kept in the RegistryLookup table: found companies for
+the TTL, numbers the registry does not know for the shorter negative TTL.
+Transient registry failures (``RegistryError``) are not cached.
+
+Completing company records (``enrich_companies``) is off unless
+``REGISTRY_LOOKUP_CONFIG['enabled']`` is set, since it needs a backend
+that answers NIP lookups with real registry data.
+
+Concurrent lookups of the same number in this process share one backend
+request. ``lookup_many`` dedupes its input, answers what it can from the
+table with one query per chunk and asks the backend for the rest with
+bounded concurrency, writing all results back with one upsert.
+
+``SQLiteRegistryBackend`` is a local registry in a SQLite file, for
+development, tests and benchmarks without access to GUS.
+"""
+
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from faktury.models import RegistryLookup
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG = {
+    'enabled': False,
+    'backend': 'faktury.services.registry_lookup.GUSBackend',
+    'ttl': 30 * 24 * 3600,
+    'negative_ttl': 24 * 3600,
+    'workers': 8,
+    'stub_path': None,
+}
+
+NIP = 'nip'
+REGON = 'regon'
+
+# Company fields a registry result fills in, in Kontrahent field names
+COMPANY_FIELDS = (
+    'nazwa', 'regon', 'ulica', 'numer_domu', 'numer_mieszkania', 'kod_pocztowy', 'miejscowosc', 'kraj',
+)
+# Without these a company record is completed from the registry
+REQUIRED_FIELDS = ('nazwa', 'ulica', 'numer_domu', 'kod_pocztowy', 'miejscowosc')
+
+
+def get_config() -> Dict:
+    return {**DEFAULT_CONFIG, **getattr(settings, 'REGISTRY_LOOKUP_CONFIG', {})}
+
+
+def enrichment_enabled() -> bool:
+    return bool(get_config()['enabled'])
+
+
+class RegistryError(Exception):
+    """The registry could not answer, the lookup may succeed later"""
+
+
+def normalize(kind: str, number) -> str:
+    """Digits of a NIP or REGON, raising ValueError when they cannot be one"""
+    if kind not in (NIP, REGON):
+        raise ValueError(f"Unknown number kind: {kind}")
+    digits = re.sub(r'[\s-]', '', str(number or ''))
+    if kind == NIP and digits[:2].upper() == 'PL':
+        digits = digits[2:]
+    if not digits.isdigit() or len(digits) not in ((10,) if kind == NIP else (9, 14)):
+        raise ValueError(f"Invalid {kind}: {number!r}")
+    return digits
+
+
+class RegistryBackend:
+    """A company registry answering lookups by NIP or REGON"""
+
+    def lookup(self, kind: str, number: str) -> Optional[Dict]:
+        """
+        Company data of a normalized number in Kontrahent field names
+
+        Returns None when the registry does not know the number and raises
+        RegistryError when it cannot answer right now.
+        """
+        raise NotImplementedError
+
+
+class GUSBackend(RegistryBackend):
+    """
+    Lookups through GUSService
+
+    Only REGON lookups reach GUS. GUSService.search_by_nip answers from mock
+    data, so NIP lookups fail as unavailable instead of caching invented
+    companies.
+    """
+
+    NOT_FOUND = ('not found', 'invalid')
+
+    def __init__(self, service=None):
+        if service is None:
+            from faktury.services.gus_service import gus_service as service
+        self.service = service
+
+    def lookup(self, kind, number):
+        if kind == NIP:
+            raise RegistryError("GUSService has no live NIP search")
+        result = self.service.search_by_regon(number)
+        if 'error' in result:
+            if any(reason in result['error'].lower() for reason in self.NOT_FOUND):
+                return None
+            raise RegistryError(result['error'])
+        data = result['data']
+        # Placeholder GUSService returns for numbers it has no data for, neither found nor unknown
+        if data.get('status') == 'NIEZNANY':
+            raise RegistryError(f"No registry data for {kind} {number}")
+        return data
+
+
+class SQLiteRegistryBackend(RegistryBackend):
+    """
+    Local registry in a SQLite file
+
+    Without a path the registry lives in memory for the lifetime of the
+    backend. ``delay`` adds seconds to every lookup, like a remote registry.
+    """
+
+    def __init__(self, path: Optional[str] = None, delay: float = 0.0):
+        path = path or get_config()['stub_path']
+        if path:
+            self.database, self.uri = path, False
+        else:
+            self.database, self.uri = f'file:registry-stub-{id(self)}?mode=memory&cache=shared', True
+        self.delay = delay
+        self._local = threading.local()
+        # Keeps an in-memory registry alive while threads open and close theirs
+        self._keeper = self._connect()
+        self._keeper.execute(
+            'CREATE TABLE IF NOT EXISTS companies (kind TEXT, number TEXT, data TEXT, PRIMARY KEY (kind, number))'
+        )
+
+    def _connect(self):
+        return sqlite3.connect(self.database, uri=self.uri, check_same_thread=False, isolation_level=None)
+
+    def _connection(self):
+        if not hasattr(self._local, 'connection'):
+            self._local.connection = self._connect()
+        return self._local.connection
+
+    def load(self, companies: Iterable[Dict], kind: str = NIP):
+        """Add or replace companies, keyed by their ``kind`` field"""
+        self._keeper.executemany(
+            'INSERT OR REPLACE INTO companies VALUES (?, ?, ?)',
+            [(kind, company[kind], json.dumps(company)) for company in companies],
+        )
+
+    def lookup(self, kind, number):
+        if self.delay:
+            time.sleep(self.delay)
+        row = self._connection().execute(
+            'SELECT data FROM companies WHERE kind = ? AND number = ?', (kind, number)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+def get_backend() -> RegistryBackend:
+    return import_string(get_config()['backend'])()
+
+
+_inflight: Dict = {}
+_inflight_lock = threading.Lock()
+
+
+def _fetch(backend: RegistryBackend, kind: str, number: str) -> Optional[Dict]:
+    """Ask the backend, sharing one request among concurrent lookups of the same number"""
+    key = (kind, number)
+    with _inflight_lock:
+        future = _inflight.get(key)
+        owner = future is None
+        if owner:
+            future = _inflight[key] = Future()
+    if not owner:
+        return future.result()
+
+    try:
+        result = backend.lookup(kind, number)
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        with _inflight_lock:
+            del _inflight[key]
+
+
+def _cached(kind: str, numbers: List[str]) -> Dict[str, Optional[Dict]]:
+    """Unexpired results of the numbers, None for numbers cached as unknown"""
+    step = connection.features.max_query_params or 999
+    now = timezone.now()
+    cached = {}
+    for start in range(0, len(numbers), step):
+        rows = RegistryLookup.objects.filter(
+            kind=kind, number__in=numbers[start:start + step], expires_at__gt=now
+        ).values_list('number', 'found', 'data')
+        for number, found, data in rows:
+            cached[number] = data if found else None
+    return cached
+
+
+def _store(kind: str, results: Dict[str, Optional[Dict]], config: Dict):
+    now = timezone.now()
+    ttl, negative_ttl = timedelta(seconds=config['ttl']), timedelta(seconds=config['negative_ttl'])
+    RegistryLookup.objects.bulk_create(
+        [
+            RegistryLookup(
+                kind=kind, number=number, found=data is not None, data=data or {},
+                fetched_at=now, expires_at=now + (ttl if data is not None else negative_ttl),
+            )
+            for number, data in results.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['kind', 'number'],
+        update_fields=['found', 'data', 'fetched_at', 'expires_at'],
+    )
+
+
+def lookup(kind: str, number, backend: Optional[RegistryBackend] = None) -> Optional[Dict]:
+    """
+    Company data of a NIP or REGON, None when the registry does not know it
+
+    Raises ValueError for malformed numbers and RegistryError when the
+    registry cannot answer.
+    """
+    number = normalize(kind, number)
+    cached = _cached(kind, [number])
+    if number in cached:
+        return cached[number]
+
+    data = _fetch(backend or get_backend(), kind, number)
+    _store(kind, {number: data}, get_config())
+    return data
+
+
+def lookup_many(kind: str, numbers: Iterable, backend: Optional[RegistryBackend] = None) -> Dict[str, Optional[Dict]]:
+    """
+    Company data of many numbers, keyed by normalized number
+
+    Malformed numbers and numbers the registry failed to answer are left
+    out; numbers the registry does not know map to None.
+    """
+    config = get_config()
+    unique = set()
+    for number in numbers:
+        try:
+            unique.add(normalize(kind, number))
+        except ValueError:
+            continue
+    if not unique:
+        return {}
+
+    results = _cached(kind, sorted(unique))
+    misses = sorted(unique - results.keys())
+    if not misses:
+        return results
+
+    backend = backend or get_backend()
+    fetched = {}
+
+    def fetch(number):
+        try:
+            fetched[number] = _fetch(backend, kind, number)
+        except RegistryError as e:
+            logger.warning(f"Registry lookup of {kind} {number} failed: {e}")
+
+    workers = max(1, min(config['workers'], len(misses)))
+    if workers == 1:
+        for number in misses:
+            fetch(number)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(fetch, misses))
+
+    if fetched:
+        _store(kind, fetched, config)
+    results.update(fetched)
+    return results
+
+
+def enrich_companies(records: List[Dict], backend: Optional[RegistryBackend] = None) -> int:
+    """
+    Fill empty fields of company records with registry data by NIP
+
+    Only records missing a required field are looked up, in one batch;
+    values already present are kept. The registry is best effort: when it
+    fails or enrichment is disabled the records stay as they are. Returns
+    the number of records completed.
+    """
+    if not enrichment_enabled():
+        return 0
+
+    incomplete = [
+        record for record in records
+        if record.get('nip') and any(not record.get(name) for name in REQUIRED_FIELDS)
+    ]
+    if not incomplete:
+        return 0
+
+    try:
+        companies = lookup_many(NIP, [record['nip'] for record in incomplete], backend)
+    except Exception as e:
+        logger.warning(f"Registry enrichment failed: {e}")
+        return 0
+
+    enriched = 0
+    for record in incomplete:
+        try:
+            data = companies.get(normalize(NIP, record['nip']))
+        except ValueError:
+            continue
+        if not data:
+            continue
+        for name in COMPANY_FIELDS:
+            if not record.get(name) and data.get(name):
+                record[name] = data[name]
+        enriched += 1
+    return enriched
@@ -0,0 +1,270 @@
+"""
+Batched retention cleanup
+
+Each policy names a model, the date field that ages its rows and the rows
+it keeps. Expired rows are deleted in primary key batches, one short
+transaction per batch, with a pause between batches, so writers inserting
+into the same tables wait at most for one batch instead of the whole
+cleanup. Every batch commits together with its RetentionCheckpoint, and an
+interrupted run resumes after the last deleted key.
+
+Batches are deleted with raw ``DELETE ... WHERE id IN (...)`` statements,
+children first: CASCADE relations are followed by primary key and SET_NULL
+relations are cleared with one UPDATE, so no objects are loaded. Policies
+whose rows need their delete signals (``send_signals``) and models with
+relations raw deletes cannot honour (PROTECT, SET_DEFAULT, delete signal
+receivers on related models) go through the ORM collector instead, still
+one batch at a time.
+
+Storage files of deleted rows are removed after the batch commits, by a
+thread pool, so the transaction never waits for storage.
+"""
+
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connection, models, transaction
+from django.db.models import F, signals
+from django.utils import timezone
+
+from faktury.models import DocumentUpload, OCRResult, RetentionCheckpoint, SystemHealthMetric
+from faktury.notifications.models import Notification
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG = {
+    'batch_size': 2000,
+    'sleep': 0.05,
+    'file_workers': 4,
+    'days': {},
+}
+
+
+def get_config() -> Dict:
+    return {**DEFAULT_CONFIG, **getattr(settings, 'RETENTION_CONFIG', {})}
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """Rows of a model deleted once their date field is older than the retention period"""
+    name: str
+    model: type
+    date_field: str
+    days: Optional[int] = None  # None: the days_to_keep of the run
+    filters: Dict = field(default_factory=dict)
+    file_field: Optional[str] = None  # storage path of a file to delete with the row
+    size_field: Optional[str] = None  # bytes freed by deleting the file
+    send_signals: bool = False
+
+    def expired(self, cutoff):
+        return self.model._base_manager.filter(**{f'{self.date_field}__lt': cutoff}, **self.filters)
+
+
+def default_policies() -> List[RetentionPolicy]:
+    return [
+        # Only low-confidence results, good ones feed training and statistics
+        RetentionPolicy('ocr_results', OCRResult, 'created_at', filters={'confidence_score__lt': 0.3}),
+        RetentionPolicy('health_records', SystemHealthMetric, 'timestamp', days=30),
+        # Read notifications only, so the unread counter signals have nothing to adjust
+        RetentionPolicy('notifications', Notification, 'created_at', days=30, filters={'is_read': True}),
+        RetentionPolicy(
+            'orphaned_uploads', DocumentUpload, 'upload_timestamp', filters={'processing_status': 'failed'},
+            file_field='file_path', size_field='file_size',
+        ),
+    ]
+
+
+def _chunks(values: Sequence, size: int) -> Iterator[Sequence]:
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _delete_relations(model) -> List:
+    """Reverse relations whose rows a delete of the model affects, as in the ORM collector"""
+    return [
+        relation for relation in model._meta.get_fields(include_hidden=True)
+        if relation.auto_created and not relation.concrete and (relation.one_to_one or relation.one_to_many)
+    ]
+
+
+def _has_delete_receivers(model) -> bool:
+    return signals.pre_delete.has_listeners(model) or signals.post_delete.has_listeners(model)
+
+
+def can_raw_delete(model, seen=None) -> bool:
+    """Check whether rows of a model and their dependents can be deleted without the collector"""
+    seen = seen or set()
+    if model in seen:
+        return True
+    seen.add(model)
+    for relation in _delete_relations(model):
+        on_delete = relation.on_delete
+        if on_delete is models.CASCADE:
+            if _has_delete_receivers(relation.related_model) or not can_raw_delete(relation.related_model, seen):
+                return False
+        elif on_delete not in (models.SET_NULL, models.DO_NOTHING):
+            return False
+    return True
+
+
+def raw_delete(model, pks: Sequence[int]) -> int:
+    """
+    Delete rows by primary key with raw SQL, dependents first
+
+    Must run inside a transaction; see ``can_raw_delete`` for the models it
+    supports. Returns the number of rows of ``model`` deleted.
+    """
+    step = connection.features.max_query_params or 999
+    for relation in _delete_relations(model):
+        related = relation.related_model._base_manager
+        name = relation.field.name
+        for chunk in _chunks(pks, step):
+            if relation.on_delete is models.CASCADE:
+                children = list(related.filter(**{f'{name}__in': chunk}).values_list('pk', flat=True))
+                if children:
+                    raw_delete(relation.related_model, children)
+            elif relation.on_delete is models.SET_NULL:
+                related.filter(**{f'{name}__in': chunk}).update(**{name: None})
+
+    quote = connection.ops.quote_name
+    deleted = 0
+    with connection.cursor() as cursor:
+        for chunk in _chunks(pks, step):
+            cursor.execute(
+                f"DELETE FROM {quote(model._meta.db_table)} WHERE {quote(model._meta.pk.column)} "
+                f"IN ({', '.join(['%s'] * len(chunk))})",
+                list(chunk),
+            )
+            deleted += cursor.rowcount
+    return deleted
+
+
+def delete_stored_file(path: str):
+    """Remove an uploaded file, stored under an absolute path or in default storage"""
+    try:
+        if os.path.isabs(path):
+            if os.path.exists(path):
+                os.remove(path)
+        elif default_storage.exists(path):
+            default_storage.delete(path)
+    except Exception as e:
+        logger.warning(f"Failed to delete file {path}: {e}")
+
+
+def _checkpoint(policy: RetentionPolicy) -> RetentionCheckpoint:
+    """Checkpoint of an interrupted or failed run of the policy, or a fresh one"""
+    checkpoint, created = RetentionCheckpoint.objects.get_or_create(policy=policy.name)
+    if checkpoint.status == 'failed':
+        RetentionCheckpoint.objects.filter(pk=checkpoint.pk).update(status='running', error_message='')
+    elif not created and checkpoint.status == 'completed':
+        checkpoint.status = 'running'
+        checkpoint.last_pk = checkpoint.deleted = checkpoint.batches = 0
+        checkpoint.error_message = ''
+        checkpoint.started_at = timezone.now()
+        checkpoint.completed_at = None
+        checkpoint.save()
+    return checkpoint
+
+
+def run_policy(policy: RetentionPolicy, cutoff, file_pool: ThreadPoolExecutor,
+               config: Optional[Dict] = None) -> Dict:
+    """
+    Delete the expired rows of a policy in batches
+
+    Args:
+        cutoff: Rows with the date field before it are deleted
+        file_pool: Pool removing storage files after each batch commits
+
+    Returns:
+        Rows deleted and bytes of files scheduled for removal by this run
+    """
+    config = config or get_config()
+    batch_size = max(config['batch_size'], 1)
+    raw = not policy.send_signals and can_raw_delete(policy.model)
+    columns = ['pk'] + [name for name in (policy.file_field, policy.size_field) if name]
+
+    checkpoint = _checkpoint(policy)
+    expired = policy.expired(cutoff).order_by('pk')
+    result = {'deleted': 0, 'freed_space': 0}
+    try:
+        while True:
+            with transaction.atomic():
+                # Writing first takes the write lock up front: a SQLite transaction
+                # that has already read cannot wait for a busy writer and fails
+                RetentionCheckpoint.objects.filter(pk=checkpoint.pk).update(
+                    batches=F('batches') + 1, updated_at=timezone.now()
+                )
+                rows = list(expired.filter(pk__gt=checkpoint.last_pk).values(*columns)[:batch_size])
+                if not rows:
+                    transaction.set_rollback(True)
+                    break
+                pks = [row['pk'] for row in rows]
+                if raw:
+                    deleted = raw_delete(policy.model, pks)
+                else:
+                    deleted = policy.model._base_manager.filter(pk__in=pks).delete()[1].get(policy.model._meta.label, 0)
+
+                checkpoint.last_pk = pks[-1]
+                RetentionCheckpoint.objects.filter(pk=checkpoint.pk).update(
+                    last_pk=checkpoint.last_pk, deleted=F('deleted') + deleted
+                )
+
+                if policy.file_field:
+                    paths = [row[policy.file_field] for row in rows if row[policy.file_field]]
+                    transaction.on_commit(lambda paths=paths: [file_pool.submit(delete_stored_file, p) for p in paths])
+                if policy.size_field:
+                    result['freed_space'] += sum(row[policy.size_field] or 0 for row in rows)
+            result['deleted'] += deleted
+
+            if len(rows) < batch_size:
+                break
+            # Let writers waiting for the tables in between batches
+            time.sleep(config['sleep'])
+    except Exception as e:
+        RetentionCheckpoint.objects.filter(pk=checkpoint.pk).update(
+            status='failed', error_message=str(e), updated_at=timezone.now()
+        )
+        raise
+
+    RetentionCheckpoint.objects.filter(pk=checkpoint.pk).update(
+        status='completed', completed_at=timezone.now(), updated_at=timezone.now()
+    )
+    return result
+
+
+def run_retention(days_to_keep: int = 90, policies: Optional[List[RetentionPolicy]] = None) -> Dict:
+    """
+    Run retention policies one after another
+
+    ``RETENTION_CONFIG['days']`` overrides the retention period of a policy
+    by name. A failing policy is recorded and the others still run. Files
+    are removed by the time it returns. Returns the deleted rows per policy
+    name, bytes of files removed and errors.
+    """
+    if connection.in_atomic_block:
+        # Batches would not commit, the outer transaction would hold every lock until the end
+        raise RuntimeError("Retention cleanup cannot run inside a transaction")
+    config = get_config()
+    now = timezone.now()
+    results = {'cleaned_items': {}, 'freed_space': 0, 'errors': []}
+
+    with ThreadPoolExecutor(max_workers=config['file_workers']) as file_pool:
+        for policy in policies if policies is not None else default_policies():
+            days = config['days'].get(policy.name, policy.days if policy.days is not None else days_to_keep)
+            try:
+                result = run_policy(policy, now - timedelta(days=days), file_pool, config)
+            except Exception as e:
+                results['errors'].append(f"Retention policy {policy.name} failed: {e}")
+                logger.error(f"Retention policy {policy.name} failed: {e}")
+                continue
+            results['cleaned_items'][policy.name] = result['deleted']
+            results['freed_space'] += result['freed_space']
+
+    return results
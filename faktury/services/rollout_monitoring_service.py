@@ -11,7 +11,9 @@ from django.core.cache import cache
 from django.conf import settings
 from django.db.models import Avg, Count, Q
 from django.contrib.auth.models import User
-import statistics
+from django.utils import timezone
+
+from .latency_sketch import latency_recorder
 
 logger = logging.getLogger(__name__)
 
@@ -29,7 +31,7 @@ class RolloutMonitoringService:
         try:
             from faktury.models import ErrorLog
             
-            end_time = datetime.now()
+            end_time = timezone.now()
             start_time = end_time - timedelta(minutes=time_window_minutes)
             
             # Count total requests and errors in time window
@@ -55,31 +57,25 @@ class RolloutMonitoringService:
             logger.error(f"Failed to calculate error rate: {e}")
             return 0.0
     
-    def get_response_time_metrics(self, time_window_minutes: int = 5) -> Dict[str, float]:
-        """Get response time metrics (P50, P95, P99)"""
+    def get_response_time_metrics(self, time_window_minutes: int = 5, route: Optional[str] = None) -> Dict[str, float]:
+        """
+        Get response time metrics (P50, P95, P99)
+        
+        Percentiles are estimated by merging the per-minute request latency
+        sketches of the window, optionally limited to a single route.
+        """
         try:
-            from faktury.models import RequestLog
-            
-            end_time = datetime.now()
+            end_time = timezone.now()
             start_time = end_time - timedelta(minutes=time_window_minutes)
             
-            # Get response times from request logs
-            response_times = list(
-                RequestLog.objects.filter(
-                    timestamp__gte=start_time,
-                    timestamp__lte=end_time
-                ).values_list('response_time_ms', flat=True)
+            sketch = latency_recorder.window(
+                'http_request', start_time, end_time, keys=[route] if route else None
             )
             
-            if not response_times:
+            if not sketch.count:
                 return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "avg": 0.0}
             
-            metrics = {
-                "p50": statistics.median(response_times),
-                "p95": statistics.quantiles(response_times, n=20)[18] if len(response_times) > 20 else max(response_times),
-                "p99": statistics.quantiles(response_times, n=100)[98] if len(response_times) > 100 else max(response_times),
-                "avg": statistics.mean(response_times)
-            }
+            metrics = sketch.percentiles()
             
             # Cache the result
             cache_key = f"{self.CACHE_PREFIX}_response_times"
@@ -386,11 +382,7 @@ class RolloutMonitoringService:
     def _get_request_count(self, start_time: datetime, end_time: datetime) -> int:
         """Get total request count in time window"""
         try:
-            from faktury.models import RequestLog
-            return RequestLog.objects.filter(
-                timestamp__gte=start_time,
-                timestamp__lte=end_time
-            ).count()
+            return latency_recorder.window('http_request', start_time, end_time).count
         except Exception:
             # Fallback: estimate based on typical traffic
             minutes = (end_time - start_time).total_seconds() / 60
@@ -0,0 +1,209 @@
+"""
+System messages sent to every active user
+
+A broadcast is stored as one SystemBroadcast row. Recipients are fixed when
+it starts: active users other than the author with an id up to the highest
+user id at that moment. Two storage modes are supported:
+
+- fan-out: a Celery task copies the message into one Wiadomosc per
+  recipient. Recipient ids are streamed with keyset pagination and written
+  with ``bulk_create`` in fixed-size batches; each batch commits together
+  with the last recipient id as checkpoint, so a retried or continued task
+  resumes where the previous one stopped without duplicating messages.
+- receipts: nothing is written per recipient. Inboxes merge in the
+  broadcasts a user can see at read time, and reading one stores a
+  BroadcastReceipt.
+"""
+
+import logging
+import time
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Exists, Max, OuterRef
+from django.utils import timezone
+
+from faktury.models import BroadcastReceipt, SystemBroadcast, Wiadomosc
+from faktury.services.unread_counters import MESSAGES, invalidate_unread
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG = {
+    'mode': SystemBroadcast.MODE_FAN_OUT,
+    'batch_size': 1000,
+    'time_budget': 30,
+}
+
+
+def get_config() -> Dict:
+    return {**DEFAULT_CONFIG, **getattr(settings, 'SYSTEM_BROADCAST_CONFIG', {})}
+
+
+def recipients(broadcast: SystemBroadcast):
+    """Active users receiving a broadcast, in id order"""
+    queryset = User.objects.filter(is_active=True, id__lte=broadcast.max_recipient_id)
+    if broadcast.autor_id:
+        queryset = queryset.exclude(id=broadcast.autor_id)
+    return queryset.order_by('id')
+
+
+def start_broadcast(autor, temat: str, tresc: str, mode: Optional[str] = None) -> SystemBroadcast:
+    """
+    Create a broadcast and start delivering it
+
+    Fan-out broadcasts are handed to the Celery task once the current
+    transaction commits; receipts broadcasts are complete immediately.
+    """
+    mode = mode or get_config()['mode']
+    if mode not in dict(SystemBroadcast.MODE_CHOICES):
+        raise ValueError(f'Unknown broadcast mode: {mode}')
+
+    broadcast = SystemBroadcast(
+        autor=autor, temat=temat, tresc=tresc, mode=mode,
+        max_recipient_id=User.objects.aggregate(max_id=Max('id'))['max_id'] or 0,
+    )
+    broadcast.total_recipients = recipients(broadcast).count()
+    if mode == SystemBroadcast.MODE_RECEIPTS:
+        broadcast.status = 'completed'
+        broadcast.delivered = broadcast.total_recipients
+        broadcast.completed_at = timezone.now()
+    broadcast.save()
+
+    if mode == SystemBroadcast.MODE_FAN_OUT:
+        transaction.on_commit(lambda: enqueue_fan_out(broadcast.pk))
+    logger.info(f"Started {mode} system broadcast {broadcast.pk} to {broadcast.total_recipients} users")
+    return broadcast
+
+
+def enqueue_fan_out(broadcast_id: int):
+    from faktury.tasks import fan_out_system_broadcast_task
+
+    fan_out_system_broadcast_task.delay(broadcast_id)
+
+
+def fan_out_batch(broadcast_id: int, batch_size: int) -> Optional[SystemBroadcast]:
+    """
+    Write the next batch of messages of a fan-out broadcast
+
+    The broadcast row is locked for the batch, so concurrent runs of the
+    task cannot write the same recipients twice. Returns the updated
+    broadcast, or None if it is no longer running.
+    """
+    with transaction.atomic():
+        broadcast = SystemBroadcast.objects.select_for_update().get(pk=broadcast_id)
+        if broadcast.status not in ('pending', 'running'):
+            return None
+
+        recipient_ids = list(
+            recipients(broadcast).filter(id__gt=broadcast.last_recipient_id)
+            .values_list('id', flat=True)[:batch_size]
+        )
+        Wiadomosc.objects.bulk_create([
+            Wiadomosc(
+                autor_id=broadcast.autor_id, odbiorca_user_id=user_id, temat=broadcast.temat,
+                tresc=broadcast.tresc, typ_wiadomosci='system', broadcast=broadcast
+            )
+            for user_id in recipient_ids
+        ], batch_size=batch_size)
+        # bulk_create sends no signals, recount the recipients' unread messages on their next read
+        invalidate_unread(recipient_ids, MESSAGES)
+
+        broadcast.status = 'running'
+        broadcast.delivered += len(recipient_ids)
+        if recipient_ids:
+            broadcast.last_recipient_id = recipient_ids[-1]
+        if len(recipient_ids) < batch_size:
+            broadcast.status = 'completed'
+            broadcast.completed_at = timezone.now()
+            # Users deactivated after the start were counted but not delivered
+            broadcast.total_recipients = broadcast.delivered
+        broadcast.save(update_fields=[
+            'status', 'delivered', 'last_recipient_id', 'total_recipients', 'completed_at', 'updated_at'
+        ])
+        return broadcast
+
+
+def run_fan_out(broadcast_id: int, batch_size: Optional[int] = None,
+                time_budget: Optional[float] = None) -> Optional[SystemBroadcast]:
+    """
+    Write batches from the checkpoint until done or out of time
+
+    Returns the broadcast after the last batch; it is still 'running' if
+    the time budget ran out and the caller should continue later.
+    """
+    config = get_config()
+    batch_size = max(batch_size or config['batch_size'], 1)
+    time_budget = config['time_budget'] if time_budget is None else time_budget
+
+    deadline = time.monotonic() + time_budget
+    broadcast = None
+    while True:
+        current = fan_out_batch(broadcast_id, batch_size)
+        if current is None:
+            return broadcast or SystemBroadcast.objects.filter(pk=broadcast_id).first()
+        broadcast = current
+        if broadcast.status == 'completed' or time.monotonic() >= deadline:
+            return broadcast
+
+
+def mark_failed(broadcast_id: int, error: str):
+    SystemBroadcast.objects.filter(pk=broadcast_id, status__in=['pending', 'running']).update(
+        status='failed', error_message=error, updated_at=timezone.now()
+    )
+
+
+def broadcast_status(broadcast: SystemBroadcast) -> Dict:
+    """Progress of a broadcast as a JSON-serializable dict"""
+    return {
+        'id': broadcast.pk,
+        'mode': broadcast.mode,
+        'status': broadcast.status,
+        'total_recipients': broadcast.total_recipients,
+        'delivered': broadcast.delivered,
+        'progress': broadcast.progress,
+        'error': broadcast.error_message,
+        'created_at': broadcast.created_at.isoformat(),
+        'completed_at': broadcast.completed_at.isoformat() if broadcast.completed_at else None,
+    }
+
+
+def visible_broadcasts(user):
+    """Receipts-mode broadcasts shown to a user, newest first, annotated with ``przeczytana``"""
+    return SystemBroadcast.objects.filter(
+        mode=SystemBroadcast.MODE_RECEIPTS, status='completed',
+        max_recipient_id__gte=user.id,
+    ).exclude(autor=user).annotate(
+        przeczytana=Exists(BroadcastReceipt.objects.filter(broadcast=OuterRef('pk'), user=user))
+    ).order_by('-created_at', '-id')
+
+
+def mark_broadcast_read(user, broadcast: SystemBroadcast):
+    BroadcastReceipt.objects.bulk_create(
+        [BroadcastReceipt(user=user, broadcast=broadcast)], ignore_conflicts=True
+    )
+
+
+def system_messages(user, limit: Optional[int] = None) -> List[Dict]:
+    """
+    System messages of a user from both storage modes, newest first
+
+    Fan-out copies and receipts-mode broadcasts are merged into dicts with
+    the same keys; ``broadcast`` tells which detail view a row links to.
+    """
+    copies = Wiadomosc.objects.filter(
+        odbiorca_user=user, typ_wiadomosci='system'
+    ).order_by('-data_wyslania', '-id').values('id', 'temat', 'tresc', 'data_wyslania', 'przeczytana')
+    broadcasts = visible_broadcasts(user).values('id', 'temat', 'tresc', 'created_at', 'przeczytana')
+    if limit is not None:
+        copies, broadcasts = copies[:limit], broadcasts[:limit]
+
+    rows = [{**row, 'broadcast': False} for row in copies]
+    rows += [
+        {'id': row['id'], 'temat': row['temat'], 'tresc': row['tresc'], 'data_wyslania': row['created_at'],
+         'przeczytana': row['przeczytana'], 'broadcast': True}
+        for row in broadcasts
+    ]
+    rows.sort(key=lambda row: row['data_wyslania'], reverse=True)
+    return rows[:limit] if limit is not None else rows
@@ -10,6 +10,9 @@ import time
 import tempfile
 import os
 import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from typing import Dict, Any, Optional, List, Tuple
 from decimal import Decimal
 import cv2
@@ -24,6 +27,134 @@ from .polish_invoice_processor import PolishInvoiceProcessor
 logger = logging.getLogger(__name__)
 
 
+def build_page_from_tesseract_data(data: Dict[str, List[Any]],
+                                   preserve_interword_spaces: bool = False) -> Dict[str, Any]:
+    """
+    Build page text, line structure and word confidences from one
+    ``pytesseract.image_to_data`` result.
+
+    The text is reconstructed the same way ``image_to_string`` lays it out:
+    words of a line are joined with spaces, lines of a paragraph with a newline
+    and paragraphs/blocks with an empty line. With ``preserve_interword_spaces``
+    the horizontal gap between words is converted into a matching number of
+    spaces, so column layouts (position tables) survive.
+
+    Args:
+        data: ``image_to_data`` output in ``Output.DICT`` format
+        preserve_interword_spaces: Keep wide gaps between words as multiple spaces
+
+    Returns:
+        Dictionary with ``text``, ``lines``, ``word_confidences`` and ``word_data``
+    """
+    lines: List[Dict[str, Any]] = []
+    line_index: Dict[Tuple[int, int, int], Dict[str, Any]] = {}
+    word_confidences: List[int] = []
+    word_data: List[Dict[str, Any]] = []
+
+    levels = data.get('level')
+    for i in range(len(data.get('text', []))):
+        if levels is not None and int(levels[i]) != 5:
+            continue
+
+        confidence = int(float(data['conf'][i]))
+        word_text = str(data['text'][i] or '')
+        bbox = {
+            'left': int(data['left'][i]),
+            'top': int(data['top'][i]),
+            'width': int(data['width'][i]),
+            'height': int(data['height'][i])
+        }
+
+        if confidence > 0:  # Only include words with confidence > 0
+            word_confidences.append(confidence)
+            word_data.append({
+                'text': word_text,
+                'confidence': confidence,
+                'bbox': bbox,
+                'block_num': data['block_num'][i],
+                'par_num': data['par_num'][i],
+                'line_num': data['line_num'][i],
+                'word_num': data['word_num'][i]
+            })
+
+        if confidence < 0 or not word_text.strip():
+            continue
+
+        key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+        line = line_index.get(key)
+        if line is None:
+            line = {
+                'block_num': key[0],
+                'par_num': key[1],
+                'line_num': key[2],
+                'words': [],
+                'confidences': []
+            }
+            line_index[key] = line
+            lines.append(line)
+        line['words'].append((word_text, bbox))
+        line['confidences'].append(max(confidence, 0))
+
+    text_parts: List[str] = []
+    previous_paragraph = None
+    for line in lines:
+        line['text'] = _join_line_words(line.pop('words'), preserve_interword_spaces)
+        confidences = line.pop('confidences')
+        line['confidence'] = sum(confidences) / len(confidences) if confidences else 0.0
+
+        paragraph = (line['block_num'], line['par_num'])
+        if previous_paragraph is not None:
+            text_parts.append('\n\n' if paragraph != previous_paragraph else '\n')
+        text_parts.append(line['text'])
+        previous_paragraph = paragraph
+
+    return {
+        'text': ''.join(text_parts),
+        'lines': lines,
+        'word_confidences': word_confidences,
+        'word_data': word_data
+    }
+
+
+def _join_line_words(words: List[Tuple[str, Dict[str, int]]],
+                     preserve_interword_spaces: bool) -> str:
+    """Join the words of one line, optionally keeping wide gaps as spaces"""
+    if not preserve_interword_spaces:
+        return ' '.join(word for word, _ in words)
+
+    char_widths = sorted(bbox['width'] / len(word) for word, bbox in words if bbox['width'] > 0)
+    char_width = char_widths[len(char_widths) // 2] if char_widths else 0
+
+    parts = []
+    previous_right = None
+    for word, bbox in words:
+        if previous_right is not None:
+            spaces = 1
+            if char_width > 0:
+                spaces = max(1, int(round((bbox['left'] - previous_right) / char_width)))
+            parts.append(' ' * spaces)
+        parts.append(word)
+        previous_right = bbox['left'] + bbox['width']
+    return ''.join(parts)
+
+
+# Engines used by page worker processes, keyed by (languages, config, preprocessing)
+_page_worker_engines: Dict[Tuple[str, str, bool], 'TesseractOCREngine'] = {}
+
+
+def _process_page_in_worker(languages: str, config: str, preprocessing_enabled: bool,
+                            image: Image.Image) -> Dict[str, Any]:
+    """Preprocess and recognize a single page inside a page pool worker process"""
+    key = (languages, config, preprocessing_enabled)
+    engine = _page_worker_engines.get(key)
+    if engine is None:
+        engine = TesseractOCREngine(languages=languages, config=config,
+                                    preprocessing_enabled=preprocessing_enabled,
+                                    page_workers=1)
+        _page_worker_engines[key] = engine
+    return engine._process_page(image)
+
+
 class TesseractOCREngine(OCREngineService):
     """
     Tesseract OCR Engine with Polish language optimization
@@ -33,13 +164,15 @@ class TesseractOCREngine(OCREngineService):
     - Advanced image preprocessing for better accuracy
     - Confidence scoring and word-level analysis
     - PDF to image conversion
+    - Single recognition pass per page, pages spread over a process pool
     - Optimized settings for invoice processing
     """
     
     def __init__(self, 
                  languages: str = 'pol+eng',
                  config: Optional[str] = None,
-                 preprocessing_enabled: bool = True):
+                 preprocessing_enabled: bool = True,
+                 page_workers: Optional[int] = None):
         """
         Initialize Tesseract OCR Engine
         
@@ -47,12 +180,17 @@ class TesseractOCREngine(OCREngineService):
             languages: Tesseract language codes (default: 'pol+eng')
             config: Custom Tesseract configuration string
             preprocessing_enabled: Enable image preprocessing
+            page_workers: Worker processes for multi-page documents
+                (default: CPU count, 1 disables the page pool)
         """
         super().__init__("tesseract")
         
         self.languages = languages
         self.preprocessing_enabled = preprocessing_enabled
         self.polish_processor = PolishInvoiceProcessor()
+        self.page_workers = page_workers or max(1, min(4, multiprocessing.cpu_count()))
+        self.tesseract_version: Optional[str] = None
+        self._page_pool: Optional[ProcessPoolExecutor] = None
         
         # Default Tesseract configuration optimized for Polish invoices
         self.default_config = (
@@ -85,6 +223,7 @@ class TesseractOCREngine(OCREngineService):
         try:
             # Check if Tesseract is installed
             version = pytesseract.get_tesseract_version()
+            self.tesseract_version = str(version)
             logger.info(f"Tesseract version: {version}")
             
             # Check if Polish language pack is available
@@ -141,22 +280,14 @@ class TesseractOCREngine(OCREngineService):
             all_text = []
             all_confidences = []
             all_word_data = []
+            all_lines = []
             
-            for i, image in enumerate(images):
-                logger.debug(f"Processing image {i+1}/{len(images)}")
-                
-                # Preprocess image if enabled
-                if self.preprocessing_enabled:
-                    processed_image = self._preprocess_image(image)
-                else:
-                    processed_image = image
-                
-                # Extract text with detailed data
-                text_data = self._extract_text_with_confidence(processed_image)
-                
+            for page_number, text_data in enumerate(self._process_pages(images), start=1):
                 all_text.append(text_data['text'])
                 all_confidences.extend(text_data['word_confidences'])
                 all_word_data.extend(text_data['word_data'])
+                for line in text_data.get('lines', []):
+                    all_lines.append(dict(line, page=page_number))
             
             # Combine results
             combined_text = '\n'.join(all_text)
@@ -171,12 +302,13 @@ class TesseractOCREngine(OCREngineService):
                 'confidence_score': overall_confidence,
                 'word_confidences': all_confidences,
                 'word_data': all_word_data,
+                'lines': all_lines,
                 'processing_time': processing_time,
                 'engine_name': self.engine_name,
                 'languages_used': self.languages,
                 'pages_processed': len(images),
                 'metadata': {
-                    'tesseract_version': str(pytesseract.get_tesseract_version()),
+                    'tesseract_version': self.tesseract_version or str(pytesseract.get_tesseract_version()),
                     'config_used': self.config,
                     'preprocessing_enabled': self.preprocessing_enabled
                 }
@@ -211,6 +343,53 @@ class TesseractOCREngine(OCREngineService):
         """
         return result.get('confidence_score', 0.0)
     
+    def _process_pages(self, images: List[Image.Image]) -> List[Dict[str, Any]]:
+        """
+        Recognize all pages, spreading multi-page documents over the page pool
+        
+        Args:
+            images: Page images in document order
+            
+        Returns:
+            Per-page text data in document order
+        """
+        if len(images) > 1 and self.page_workers > 1 and not multiprocessing.current_process().daemon:
+            try:
+                pool = self._get_page_pool()
+                futures = [
+                    pool.submit(_process_page_in_worker, self.languages, self.config,
+                                self.preprocessing_enabled, image)
+                    for image in images
+                ]
+                return [future.result() for future in futures]
+            except (BrokenProcessPool, OSError) as e:
+                logger.warning(f"Page pool unavailable ({e}), processing pages sequentially")
+                self.shutdown_page_pool()
+        
+        results = []
+        for i, image in enumerate(images):
+            logger.debug(f"Processing image {i+1}/{len(images)}")
+            results.append(self._process_page(image))
+        return results
+    
+    def _process_page(self, image: Image.Image) -> Dict[str, Any]:
+        """Preprocess (if enabled) and recognize a single page"""
+        if self.preprocessing_enabled:
+            image = self._preprocess_image(image)
+        return self._extract_text_with_confidence(image)
+    
+    def _get_page_pool(self) -> ProcessPoolExecutor:
+        """Lazily create the process pool used for per-page recognition"""
+        if self._page_pool is None:
+            self._page_pool = ProcessPoolExecutor(max_workers=self.page_workers)
+        return self._page_pool
+    
+    def shutdown_page_pool(self):
+        """Stop page pool worker processes"""
+        if self._page_pool is not None:
+            self._page_pool.shutdown(wait=False, cancel_futures=True)
+            self._page_pool = None
+    
     def _convert_to_images(self, file_content: bytes, mime_type: str) -> List[Image.Image]:
         """
         Convert file content to PIL Images
@@ -388,7 +567,7 @@ class TesseractOCREngine(OCREngineService):
             Dictionary with text and confidence data
         """
         try:
-            # Get detailed OCR data
+            # Single recognition pass: text and layout are rebuilt from the word data
             data = pytesseract.image_to_data(
                 image, 
                 lang=self.languages, 
@@ -396,47 +575,16 @@ class TesseractOCREngine(OCREngineService):
                 output_type=pytesseract.Output.DICT
             )
             
-            # Extract text
-            text = pytesseract.image_to_string(
-                image,
-                lang=self.languages,
-                config=self.config
+            return build_page_from_tesseract_data(
+                data,
+                preserve_interword_spaces='preserve_interword_spaces=1' in self.config
             )
             
-            # Process word-level data
-            word_confidences = []
-            word_data = []
-            
-            for i in range(len(data['text'])):
-                if int(data['conf'][i]) > 0:  # Only include words with confidence > 0
-                    word_info = {
-                        'text': data['text'][i],
-                        'confidence': int(data['conf'][i]),
-                        'bbox': {
-                            'left': data['left'][i],
-                            'top': data['top'][i],
-                            'width': data['width'][i],
-                            'height': data['height'][i]
-                        },
-                        'block_num': data['block_num'][i],
-                        'par_num': data['par_num'][i],
-                        'line_num': data['line_num'][i],
-                        'word_num': data['word_num'][i]
-                    }
-                    
-                    word_confidences.append(int(data['conf'][i]))
-                    word_data.append(word_info)
-            
-            return {
-                'text': text,
-                'word_confidences': word_confidences,
-                'word_data': word_data
-            }
-            
         except Exception as e:
             logger.error(f"Text extraction failed: {e}")
             return {
                 'text': '',
+                'lines': [],
                 'word_confidences': [],
                 'word_data': []
             }
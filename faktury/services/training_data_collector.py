@@ -9,7 +9,7 @@ import json
 import logging
 import hashlib
 import tempfile
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, Iterable, List, Any, Optional, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass, asdict
 from pathlib import Path
@@ -17,6 +17,8 @@ import shutil
 import zipfile
 import csv
 
+from .training_sample_store import TrainingSampleStore
+
 # Django imports
 try:
     from django.conf import settings
@@ -44,6 +46,8 @@ class TrainingSample:
     anonymized: bool = False
     quality_score: float = 0.0
     tags: List[str] = None
+    engine: Optional[str] = None
+    document_type: Optional[str] = None
     
     def __post_init__(self):
         if self.collection_date is None:
@@ -220,6 +224,10 @@ class TrainingDataCollector:
         (self.collection_dir / "exports").mkdir(exist_ok=True)
         (self.collection_dir / "metrics").mkdir(exist_ok=True)
         
+        # Indexed sample store; samples saved as JSON files by earlier versions are imported once
+        self.store = TrainingSampleStore(self.collection_dir)
+        self.store.migrate_json_directory(self.collection_dir)
+        
         # Initialize privacy protector
         self.privacy_protector = PrivacyProtector() if privacy_enabled else None
         
@@ -346,35 +354,64 @@ class TrainingDataCollector:
                                format: str = 'document_ai',
                                include_high_confidence: bool = True,
                                include_human_validated: bool = True,
-                               output_file: str = None) -> str:
+                               output_file: str = None,
+                               engine: str = None,
+                               document_type: str = None,
+                               min_confidence: float = None,
+                               since: datetime = None,
+                               incremental: bool = False) -> str:
         """
         Export training dataset in various formats
         
+        Samples are streamed from the sample store, so the dataset is never
+        loaded into memory as a whole.
+        
         Args:
             format: Export format ('document_ai', 'paddleocr', 'easyocr', 'json', 'csv')
             include_high_confidence: Include high-confidence samples
             include_human_validated: Include human-validated samples
             output_file: Output file path (auto-generated if None)
+            engine: Only export samples produced by this OCR engine
+            document_type: Only export samples of this document type
+            min_confidence: Only export samples with at least this confidence
+            since: Only export samples collected since this date
+            incremental: Only export samples added since the last incremental
+                export in this format
             
         Returns:
             Path to exported file
         """
         try:
-            # Collect all samples
-            all_samples = []
-            
+            sample_types = []
             if include_high_confidence:
-                high_confidence_samples = self._load_training_samples('high_confidence')
-                all_samples.extend(high_confidence_samples)
-            
+                sample_types.append('high_confidence')
             if include_human_validated:
-                human_validated_samples = self._load_training_samples('human_validated')
-                all_samples.extend(human_validated_samples)
+                sample_types.append('human_validated')
             
-            if not all_samples:
+            filters = {
+                'sample_types': sample_types,
+                'engine': engine,
+                'document_type': document_type,
+                'min_confidence': min_confidence,
+                'since': since
+            }
+            checkpoint = f"export_{format}"
+            if incremental:
+                filters['after_id'] = self.store.get_checkpoint(checkpoint)
+            
+            # Fix the upper bound, so samples appended during the export are left for the next run
+            last_id = self.store.max_id(**filters)
+            total = self.store.count(through_id=last_id, **filters)
+            if not total:
                 logger.warning("No training samples found for export")
                 return None
             
+            if format == 'json':
+                # Stored payloads already are the generic JSON representation
+                samples = self.store.iter_payloads(through_id=last_id, **filters)
+            else:
+                samples = self.store.iter_samples(through_id=last_id, **filters)
+            
             # Generate output filename if not provided
             if output_file is None:
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -384,17 +421,21 @@ class TrainingDataCollector:
             
             # Export based on format
             if format == 'document_ai':
-                return self._export_document_ai_format(all_samples, output_path)
+                result = self._export_document_ai_format(samples, output_path, total)
             elif format == 'paddleocr':
-                return self._export_paddleocr_format(all_samples, output_path)
+                result = self._export_paddleocr_format(samples, output_path, total)
             elif format == 'easyocr':
-                return self._export_easyocr_format(all_samples, output_path)
+                result = self._export_easyocr_format(samples, output_path, total)
             elif format == 'json':
-                return self._export_json_format(all_samples, output_path)
+                result = self._export_json_format(samples, output_path, total)
             elif format == 'csv':
-                return self._export_csv_format(all_samples, output_path)
+                result = self._export_csv_format(samples, output_path, total)
             else:
                 raise ValueError(f"Unsupported export format: {format}")
+            
+            if incremental:
+                self.store.set_checkpoint(checkpoint, last_id)
+            return result
                 
         except Exception as e:
             logger.error(f"Error exporting training dataset: {e}")
@@ -410,19 +451,9 @@ class TrainingDataCollector:
             else:
                 collection_rate = 0.0
             
-            # Calculate average confidence and ratings
-            high_confidence_samples = self._load_training_samples('high_confidence')
-            human_validated_samples = self._load_training_samples('human_validated')
-            
-            avg_confidence = 0.0
-            if high_confidence_samples:
-                avg_confidence = sum(s.confidence_score for s in high_confidence_samples) / len(high_confidence_samples)
-            
-            avg_human_rating = 0.0
-            if human_validated_samples:
-                rated_samples = [s for s in human_validated_samples if s.human_rating is not None]
-                if rated_samples:
-                    avg_human_rating = sum(s.human_rating for s in rated_samples) / len(rated_samples)
+            # Calculate average confidence and ratings in the sample store
+            avg_confidence = self.store.aggregate(sample_types=['high_confidence'])['avg_confidence']
+            avg_human_rating = self.store.aggregate(sample_types=['human_validated'])['avg_human_rating']
             
             # Calculate privacy compliance score
             privacy_score = 1.0
@@ -430,8 +461,7 @@ class TrainingDataCollector:
                 privacy_score = max(0.0, 1.0 - (self.collection_stats['privacy_violations'] / self.collection_stats['total_collected']))
             
             # Calculate data quality score
-            quality_scores = [s.quality_score for s in high_confidence_samples + human_validated_samples]
-            data_quality_score = sum(quality_scores) / len(quality_scores) if quality_scores else 0.0
+            data_quality_score = self.store.aggregate()['avg_quality_score']
             
             return CollectionMetrics(
                 total_samples=self.collection_stats['total_collected'],
@@ -460,23 +490,7 @@ class TrainingDataCollector:
         """
         try:
             cutoff_date = timezone.now() - timedelta(days=days_to_keep) if DJANGO_AVAILABLE else datetime.now() - timedelta(days=days_to_keep)
-            removed_count = 0
-            
-            # Clean up high confidence samples
-            high_confidence_dir = self.collection_dir / "high_confidence"
-            if high_confidence_dir.exists():
-                for sample_file in high_confidence_dir.glob("*.json"):
-                    if sample_file.stat().st_mtime < cutoff_date.timestamp():
-                        sample_file.unlink()
-                        removed_count += 1
-            
-            # Clean up human validated samples
-            human_validated_dir = self.collection_dir / "human_validated"
-            if human_validated_dir.exists():
-                for sample_file in human_validated_dir.glob("*.json"):
-                    if sample_file.stat().st_mtime < cutoff_date.timestamp():
-                        sample_file.unlink()
-                        removed_count += 1
+            removed_count = self.store.delete_older_than(cutoff_date)
             
             logger.info(f"Cleaned up {removed_count} old training samples")
             return removed_count
@@ -494,7 +508,9 @@ class TrainingDataCollector:
             original_text=result.get('raw_text', ''),
             extracted_data=result.get('extracted_data', {}),
             confidence_score=result.get('confidence_score', 0.0),
-            tags=[sample_type, f"confidence_{int(result.get('confidence_score', 0))}"]
+            tags=[sample_type, f"confidence_{int(result.get('confidence_score', 0))}"],
+            engine=result.get('engine_used') or result.get('engine'),
+            document_type=result.get('document_type')
         )
     
     def _generate_sample_id(self, result: Dict[str, Any]) -> str:
@@ -507,48 +523,28 @@ class TrainingDataCollector:
         return f"sample_{timestamp}_{content_hash}"
     
     def _save_training_sample(self, sample: TrainingSample, sample_type: str):
-        """Save training sample to file"""
-        sample_dir = self.collection_dir / sample_type
-        sample_file = sample_dir / f"{sample.sample_id}.json"
-        
-        with open(sample_file, 'w', encoding='utf-8') as f:
-            json.dump(asdict(sample), f, indent=2, default=str)
+        """Append training sample to the sample store"""
+        self.store.append(sample, sample_type)
     
     def _load_training_samples(self, sample_type: str) -> List[TrainingSample]:
-        """Load training samples from files"""
-        samples = []
-        sample_dir = self.collection_dir / sample_type
-        
-        if not sample_dir.exists():
-            return samples
-        
-        for sample_file in sample_dir.glob("*.json"):
-            try:
-                with open(sample_file, 'r', encoding='utf-8') as f:
-                    sample_data = json.load(f)
-                    sample = TrainingSample(**sample_data)
-                    samples.append(sample)
-            except Exception as e:
-                logger.error(f"Error loading sample {sample_file}: {e}")
-                continue
-        
-        return samples
+        """Load training samples of a type from the sample store"""
+        return list(self.store.iter_samples(sample_types=[sample_type]))
     
-    def _export_document_ai_format(self, samples: List[TrainingSample], output_path: Path) -> str:
+    def _write_json_export(self, output_file: Path, list_key: str, items, metadata: Dict[str, Any]):
+        """Write a JSON export one sample at a time (items may be pre-serialized JSON strings)"""
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write('{\n  ' + json.dumps(list_key) + ': [')
+            for i, item in enumerate(items):
+                f.write(',\n    ' if i else '\n    ')
+                f.write(item if isinstance(item, str) else json.dumps(item, default=str))
+            f.write('\n  ],\n  "metadata": ' + json.dumps(metadata) + '\n}\n')
+    
+    def _export_document_ai_format(self, samples: Iterable[TrainingSample], output_path: Path, total: int) -> str:
         """Export in Google Document AI format"""
         output_file = output_path.with_suffix('.json')
         
-        document_ai_data = {
-            'training_data': [],
-            'metadata': {
-                'export_date': datetime.now().isoformat(),
-                'total_samples': len(samples),
-                'format': 'document_ai'
-            }
-        }
-        
-        for sample in samples:
-            doc_ai_sample = {
+        self._write_json_export(output_file, 'training_data', (
+            {
                 'id': sample.sample_id,
                 'text': sample.original_text,
                 'entities': self._convert_to_document_ai_entities(sample.extracted_data),
@@ -556,28 +552,21 @@ class TrainingDataCollector:
                 'human_rating': sample.human_rating,
                 'corrections': sample.human_corrections
             }
-            document_ai_data['training_data'].append(doc_ai_sample)
-        
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(document_ai_data, f, indent=2)
+            for sample in samples
+        ), {
+            'export_date': datetime.now().isoformat(),
+            'total_samples': total,
+            'format': 'document_ai'
+        })
         
         return str(output_file)
     
-    def _export_paddleocr_format(self, samples: List[TrainingSample], output_path: Path) -> str:
+    def _export_paddleocr_format(self, samples: Iterable[TrainingSample], output_path: Path, total: int) -> str:
         """Export in PaddleOCR format"""
         output_file = output_path.with_suffix('.json')
         
-        paddleocr_data = {
-            'training_samples': [],
-            'metadata': {
-                'export_date': datetime.now().isoformat(),
-                'total_samples': len(samples),
-                'format': 'paddleocr'
-            }
-        }
-        
-        for sample in samples:
-            paddle_sample = {
+        self._write_json_export(output_file, 'training_samples', (
+            {
                 'sample_id': sample.sample_id,
                 'text': sample.original_text,
                 'extracted_fields': sample.extracted_data,
@@ -585,28 +574,21 @@ class TrainingDataCollector:
                 'quality_score': sample.quality_score,
                 'tags': sample.tags
             }
-            paddleocr_data['training_samples'].append(paddle_sample)
-        
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(paddleocr_data, f, indent=2)
+            for sample in samples
+        ), {
+            'export_date': datetime.now().isoformat(),
+            'total_samples': total,
+            'format': 'paddleocr'
+        })
         
         return str(output_file)
     
-    def _export_easyocr_format(self, samples: List[TrainingSample], output_path: Path) -> str:
+    def _export_easyocr_format(self, samples: Iterable[TrainingSample], output_path: Path, total: int) -> str:
         """Export in EasyOCR format"""
         output_file = output_path.with_suffix('.json')
         
-        easyocr_data = {
-            'training_data': [],
-            'metadata': {
-                'export_date': datetime.now().isoformat(),
-                'total_samples': len(samples),
-                'format': 'easyocr'
-            }
-        }
-        
-        for sample in samples:
-            easy_sample = {
+        self._write_json_export(output_file, 'training_data', (
+            {
                 'id': sample.sample_id,
                 'text': sample.original_text,
                 'extracted_data': sample.extracted_data,
@@ -616,32 +598,30 @@ class TrainingDataCollector:
                     'corrections': sample.human_corrections
                 }
             }
-            easyocr_data['training_data'].append(easy_sample)
-        
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(easyocr_data, f, indent=2)
+            for sample in samples
+        ), {
+            'export_date': datetime.now().isoformat(),
+            'total_samples': total,
+            'format': 'easyocr'
+        })
         
         return str(output_file)
     
-    def _export_json_format(self, samples: List[TrainingSample], output_path: Path) -> str:
-        """Export in generic JSON format"""
+    def _export_json_format(self, samples: Iterable, output_path: Path, total: int) -> str:
+        """Export in generic JSON format (samples or their serialized JSON)"""
         output_file = output_path.with_suffix('.json')
         
-        json_data = {
-            'samples': [asdict(sample) for sample in samples],
-            'metadata': {
-                'export_date': datetime.now().isoformat(),
-                'total_samples': len(samples),
-                'format': 'json'
-            }
-        }
-        
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(json_data, f, indent=2, default=str)
+        self._write_json_export(output_file, 'samples', (
+            sample if isinstance(sample, str) else asdict(sample) for sample in samples
+        ), {
+            'export_date': datetime.now().isoformat(),
+            'total_samples': total,
+            'format': 'json'
+        })
         
         return str(output_file)
     
-    def _export_csv_format(self, samples: List[TrainingSample], output_path: Path) -> str:
+    def _export_csv_format(self, samples: Iterable[TrainingSample], output_path: Path, total: int) -> str:
         """Export in CSV format"""
         output_file = output_path.with_suffix('.csv')
         
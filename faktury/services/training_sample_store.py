@@ -0,0 +1,371 @@
+"""
+Training Sample Store
+
+Append-only SQLite store for OCR training samples. Filterable attributes
+(sample type, engine, document type, confidence, ratings and collection date)
+are kept in indexed columns; the full sample is stored as a zlib-compressed
+JSON blob. Samples are read back through streaming iterators, so exports and
+statistics never load the whole dataset into memory, and exports can resume
+from a named checkpoint to only include samples appended since the last run.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import zlib
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class TrainingSampleStore:
+    """SQLite-backed append-only store of training samples"""
+
+    DB_FILENAME = 'samples.sqlite3'
+    SAMPLE_TYPES = ('high_confidence', 'human_validated')
+
+    def __init__(self, store_dir, compression_level: int = 6):
+        """
+        Initialize sample store
+
+        Args:
+            store_dir: Directory of the SQLite database
+            compression_level: zlib level used for sample payloads
+        """
+        self.store_dir = Path(store_dir)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.store_dir / self.DB_FILENAME
+        self.compression_level = compression_level
+
+        self._local = threading.local()
+        self._initialize()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get the SQLite connection of the current thread"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def _initialize(self):
+        """Create tables and indexes"""
+        self._connection().executescript("""
+            CREATE TABLE IF NOT EXISTS samples (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                sample_id TEXT NOT NULL UNIQUE,
+                sample_type TEXT NOT NULL,
+                engine TEXT,
+                document_type TEXT,
+                confidence REAL NOT NULL,
+                human_rating INTEGER,
+                quality_score REAL NOT NULL,
+                collected_at REAL NOT NULL,
+                payload BLOB NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS samples_type_date ON samples (sample_type, collected_at);
+            CREATE INDEX IF NOT EXISTS samples_engine ON samples (engine);
+            CREATE INDEX IF NOT EXISTS samples_document_type ON samples (document_type);
+            CREATE INDEX IF NOT EXISTS samples_confidence ON samples (confidence);
+            CREATE INDEX IF NOT EXISTS samples_collected_at ON samples (collected_at);
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                name TEXT PRIMARY KEY,
+                last_id INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                name TEXT PRIMARY KEY,
+                value TEXT
+            );
+        """)
+
+    # Serialization
+
+    def _encode(self, sample) -> bytes:
+        return zlib.compress(
+            json.dumps(asdict(sample), default=_json_default).encode('utf-8'),
+            self.compression_level
+        )
+
+    @staticmethod
+    def _decode(payload: bytes):
+        from .training_data_collector import TrainingSample
+
+        data = json.loads(zlib.decompress(payload))
+        data['collection_date'] = _parse_datetime(data.get('collection_date'))
+        return TrainingSample(**data)
+
+    def _row(self, sample, sample_type: str) -> Tuple:
+        collected_at = sample.collection_date or datetime.now()
+        return (
+            sample.sample_id,
+            sample_type,
+            sample.engine,
+            sample.document_type,
+            float(sample.confidence_score or 0.0),
+            sample.human_rating,
+            float(sample.quality_score or 0.0),
+            collected_at.timestamp(),
+            self._encode(sample),
+        )
+
+    # Writing
+
+    def append(self, sample, sample_type: str) -> bool:
+        """
+        Append a sample
+
+        Returns:
+            False if a sample with the same ID is already stored
+        """
+        return self.append_many([(sample, sample_type)]) == 1
+
+    def append_many(self, samples: Iterable[Tuple[Any, str]]) -> int:
+        """
+        Append (sample, sample_type) pairs in a single transaction
+
+        Returns:
+            Number of samples added (existing sample IDs are skipped)
+        """
+        rows = [self._row(sample, sample_type) for sample, sample_type in samples]
+        if not rows:
+            return 0
+
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            before = connection.total_changes
+            connection.executemany("""
+                INSERT OR IGNORE INTO samples (
+                    sample_id, sample_type, engine, document_type, confidence,
+                    human_rating, quality_score, collected_at, payload
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+            added = connection.total_changes - before
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        return added
+
+    def delete_older_than(self, cutoff: datetime) -> int:
+        """Delete samples collected before the cutoff"""
+        cursor = self._connection().execute(
+            'DELETE FROM samples WHERE collected_at < ?', (cutoff.timestamp(),)
+        )
+        return cursor.rowcount
+
+    # Reading
+
+    def _where(self,
+               sample_types: Optional[Iterable[str]] = None,
+               engine: Optional[str] = None,
+               document_type: Optional[str] = None,
+               min_confidence: Optional[float] = None,
+               since: Optional[datetime] = None,
+               until: Optional[datetime] = None,
+               after_id: Optional[int] = None,
+               through_id: Optional[int] = None) -> Tuple[str, List[Any]]:
+        clauses, params = [], []
+        if sample_types is not None:
+            sample_types = list(sample_types)
+            if not sample_types:
+                return '0', []
+            clauses.append(f"sample_type IN ({', '.join('?' * len(sample_types))})")
+            params.extend(sample_types)
+        if engine is not None:
+            clauses.append('engine = ?')
+            params.append(engine)
+        if document_type is not None:
+            clauses.append('document_type = ?')
+            params.append(document_type)
+        if min_confidence is not None:
+            clauses.append('confidence >= ?')
+            params.append(min_confidence)
+        if since is not None:
+            clauses.append('collected_at >= ?')
+            params.append(since.timestamp())
+        if until is not None:
+            clauses.append('collected_at < ?')
+            params.append(until.timestamp())
+        if after_id is not None:
+            clauses.append('id > ?')
+            params.append(after_id)
+        if through_id is not None:
+            clauses.append('id <= ?')
+            params.append(through_id)
+        return (' AND '.join(clauses) or '1'), params
+
+    def iter_samples(self, batch_size: int = 500, **filters) -> Iterator:
+        """
+        Stream samples matching the filters in insertion order
+
+        Args:
+            batch_size: Rows fetched per query
+            **filters: sample_types, engine, document_type, min_confidence,
+                since, until, after_id, through_id
+
+        Yields:
+            TrainingSample instances
+        """
+        for _, payload in self._iter_rows(batch_size, **filters):
+            yield self._decode(payload)
+
+    def iter_payloads(self, batch_size: int = 500, **filters) -> Iterator[str]:
+        """Stream samples matching the filters as serialized JSON, without decoding them"""
+        for _, payload in self._iter_rows(batch_size, **filters):
+            yield zlib.decompress(payload).decode('utf-8')
+
+    def _iter_rows(self, batch_size: int = 500, after_id: Optional[int] = None,
+                   **filters) -> Iterator[Tuple[int, bytes]]:
+        """Stream (id, payload) rows using keyset pagination on the row id"""
+        last_id = after_id or 0
+        while True:
+            where, params = self._where(after_id=last_id, **filters)
+            rows = self._connection().execute(
+                f'SELECT id, payload FROM samples WHERE {where} ORDER BY id LIMIT ?',
+                params + [batch_size]
+            ).fetchall()
+            if not rows:
+                return
+            yield from rows
+            last_id = rows[-1][0]
+
+    def count(self, **filters) -> int:
+        """Count samples matching the filters"""
+        where, params = self._where(**filters)
+        return self._connection().execute(
+            f'SELECT COUNT(*) FROM samples WHERE {where}', params
+        ).fetchone()[0]
+
+    def max_id(self, **filters) -> int:
+        """Highest row id among samples matching the filters (0 if none)"""
+        where, params = self._where(**filters)
+        return self._connection().execute(
+            f'SELECT COALESCE(MAX(id), 0) FROM samples WHERE {where}', params
+        ).fetchone()[0]
+
+    def aggregate(self, **filters) -> Dict[str, Any]:
+        """Compute sample statistics in the database"""
+        where, params = self._where(**filters)
+        row = self._connection().execute(f"""
+            SELECT COUNT(*), AVG(confidence), AVG(human_rating), AVG(quality_score),
+                   MIN(collected_at), MAX(collected_at)
+            FROM samples WHERE {where}
+        """, params).fetchone()
+        return {
+            'count': row[0],
+            'avg_confidence': row[1] or 0.0,
+            'avg_human_rating': row[2] or 0.0,
+            'avg_quality_score': row[3] or 0.0,
+            'first_collected': datetime.fromtimestamp(row[4]) if row[4] is not None else None,
+            'last_collected': datetime.fromtimestamp(row[5]) if row[5] is not None else None,
+        }
+
+    # Export checkpoints
+
+    def get_checkpoint(self, name: str) -> int:
+        """Last row id exported under a checkpoint name"""
+        row = self._connection().execute(
+            'SELECT last_id FROM checkpoints WHERE name = ?', (name,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def set_checkpoint(self, name: str, last_id: int):
+        """Record the last exported row id"""
+        self._connection().execute(
+            'INSERT OR REPLACE INTO checkpoints (name, last_id) VALUES (?, ?)', (name, last_id)
+        )
+
+    # Migration
+
+    def migrate_json_directory(self, collection_dir, batch_size: int = 1000,
+                               force: bool = False, remove_files: bool = False) -> int:
+        """
+        Import samples from the legacy one-JSON-file-per-sample layout
+
+        Files are read from ``<collection_dir>/<sample_type>/*.json``. The
+        migration is recorded in the store and runs only once unless forced;
+        samples that are already stored are skipped.
+
+        Args:
+            collection_dir: Directory with the legacy sample folders
+            batch_size: Samples inserted per transaction
+            force: Run even if the directory was migrated before
+            remove_files: Delete JSON files once their batch is stored
+
+        Returns:
+            Number of imported samples
+        """
+        from .training_data_collector import TrainingSample
+
+        connection = self._connection()
+        if not force and connection.execute("SELECT 1 FROM meta WHERE name = 'json_migrated'").fetchone():
+            return 0
+
+        imported = 0
+        batch, batch_files = [], []
+
+        def flush():
+            added = self.append_many(batch)
+            if remove_files:
+                for path in batch_files:
+                    path.unlink(missing_ok=True)
+            batch.clear()
+            batch_files.clear()
+            return added
+
+        for sample_type in self.SAMPLE_TYPES:
+            sample_dir = Path(collection_dir) / sample_type
+            if not sample_dir.exists():
+                continue
+
+            for sample_file in sample_dir.glob('*.json'):
+                try:
+                    with open(sample_file, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                    data['collection_date'] = _parse_datetime(data.get('collection_date'))
+                    batch.append((TrainingSample(**data), sample_type))
+                    batch_files.append(sample_file)
+                except Exception as e:
+                    logger.error(f"Error migrating sample {sample_file}: {e}")
+                    continue
+
+                if len(batch) >= batch_size:
+                    imported += flush()
+
+        imported += flush()
+        connection.execute(
+            "INSERT OR REPLACE INTO meta (name, value) VALUES ('json_migrated', ?)",
+            (datetime.now().isoformat(),)
+        )
+        if imported:
+            logger.info(f"Migrated {imported} training samples from {collection_dir}")
+        return imported
+
+    def close(self):
+        """Close the connection of the current thread"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _parse_datetime(value) -> Optional[datetime]:
+    if value is None or isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
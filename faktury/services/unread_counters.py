@@ -0,0 +1,127 @@
+"""
+Per-user unread counters of messages and notifications
+
+Counters live in the shared cache (Redis in production) so count endpoints
+and polling templates read one key instead of running a COUNT. They are
+filled from the database on a miss, adjusted from model signals after the
+change commits, and dropped when rows change in bulk so the next read
+counts again. Updates racing with a refill can leave a counter off by a
+few; reconcile_unread_counters rewrites all counters from the database and
+runs periodically.
+"""
+
+import logging
+from typing import Dict, Iterable
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from faktury.models import Wiadomosc
+from faktury.notifications.models import Notification
+
+logger = logging.getLogger(__name__)
+
+UNREAD_KEY = 'unread:{kind}:{user_id}'
+
+MESSAGES = 'wiadomosci'
+NOTIFICATIONS = 'notifications'
+
+
+def unread_queryset(kind: str):
+    """Unread rows of a counter kind, filtered by user through ``user_id``"""
+    if kind == MESSAGES:
+        return Wiadomosc.objects.filter(przeczytana=False), 'odbiorca_user_id'
+    if kind == NOTIFICATIONS:
+        return Notification.objects.filter(is_read=False), 'user_id'
+    raise ValueError(f'Unknown unread counter: {kind}')
+
+
+def unread_key(kind: str, user_id) -> str:
+    return UNREAD_KEY.format(kind=kind, user_id=user_id)
+
+
+def count_unread(kind: str, user_id) -> int:
+    """Unread rows of a user, counted in the database"""
+    queryset, user_field = unread_queryset(kind)
+    return queryset.filter(**{user_field: user_id}).count()
+
+
+def get_unread_count(user_id, kind: str) -> int:
+    """Unread count of a user from the cache, counted and stored on a miss"""
+    key = unread_key(kind, user_id)
+    count = cache.get(key)
+    if count is None:
+        count = count_unread(kind, user_id)
+        cache.add(key, count, None)
+    return count
+
+
+def get_unread_counts(user_id) -> Dict[str, int]:
+    """Unread messages and notifications of a user, one cache round trip when both are stored"""
+    keys = {kind: unread_key(kind, user_id) for kind in (MESSAGES, NOTIFICATIONS)}
+    cached = cache.get_many(keys.values())
+    return {
+        kind: cached[key] if key in cached else get_unread_count(user_id, kind)
+        for kind, key in keys.items()
+    }
+
+
+def adjust_unread(user_id, kind: str, delta: int):
+    """Add ``delta`` to a stored counter once the current transaction commits"""
+    if not delta or user_id is None:
+        return
+
+    def adjust():
+        key = unread_key(kind, user_id)
+        try:
+            count = cache.incr(key, delta) if delta > 0 else cache.decr(key, -delta)
+        except ValueError:
+            return  # not stored, the next read counts
+        if count < 0:
+            cache.delete(key)
+
+    transaction.on_commit(adjust)
+
+
+def invalidate_unread(user_ids: Iterable, kind: str):
+    """Drop stored counters after bulk changes, once the current transaction commits"""
+    keys = [unread_key(kind, user_id) for user_id in user_ids if user_id is not None]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def reconcile_unread_counters(batch_size: int = 1000) -> int:
+    """
+    Rewrite every user's counters from the database
+
+    Users are read in keyset batches; each batch costs one grouped COUNT
+    per counter kind and one ``set_many``.
+
+    Returns:
+        int: Number of users reconciled
+    """
+    last_id = 0
+    reconciled = 0
+    while True:
+        user_ids = list(
+            User.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not user_ids:
+            return reconciled
+
+        values = {}
+        for kind in (MESSAGES, NOTIFICATIONS):
+            queryset, user_field = unread_queryset(kind)
+            counts = dict(
+                queryset.filter(**{f'{user_field}__in': user_ids}).order_by()
+                .values_list(user_field).annotate(count=Count('pk'))
+            )
+            values.update({unread_key(kind, user_id): counts.get(user_id, 0) for user_id in user_ids})
+        cache.set_many(values, None)
+
+        reconciled += len(user_ids)
+        if len(user_ids) < batch_size:
+            return reconciled
+        last_id = user_ids[-1]
@@ -7,11 +7,19 @@ DocumentUpload, OCRResult, and Faktura models.
 
 import logging
 from django.db import transaction
-from django.db.models.signals import post_save, pre_delete
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
 from django.utils import timezone
 
-from .models import DocumentUpload, OCRResult, Faktura
+from .models import (
+    DocumentUpload, OCRResult, Faktura, Firma, Partnerstwo, PozycjaFaktury, Wiadomosc, ZadanieUzytkownika
+)
+from .cache_utils import invalidate_user_cache
+from .notifications.models import Notification
+from .services.calendar_feed import bump_calendar_version
+from .services.company_metrics import invalidate_company_access
+from .services.partnership_analytics import bump_partnership_version
+from .services.unread_counters import MESSAGES, NOTIFICATIONS, adjust_unread, invalidate_unread
 
 logger = logging.getLogger(__name__)
 
@@ -309,6 +317,106 @@ def update_faktura_ocr_fields(sender, instance, created, **kwargs):
             logger.error(f"Error updating Faktura OCR fields for OCR result {instance.id}: {str(e)}", exc_info=True)
 
 
+
+@receiver(post_save, sender=PozycjaFaktury)
+@receiver(post_delete, sender=PozycjaFaktury)
+def touch_faktura_on_item_change(sender, instance, **kwargs):
+    """
+    Bump Faktura.updated_at when one of its items changes
+    
+    The timestamp is part of the invoice PDF cache fingerprint.
+    """
+    Faktura.objects.filter(pk=instance.faktura_id).update(updated_at=timezone.now())
+    try:
+        bump_calendar_version(instance.faktura.user_id)
+        bump_partnership_version(instance.faktura.sprzedawca_id)
+        invalidate_user_cache(instance.faktura.user_id, 'user_stats')
+    except Faktura.DoesNotExist:
+        # Items deleted together with their faktura, which bumps the version itself
+        pass
+
+
+@receiver(post_save, sender=Faktura)
+@receiver(post_delete, sender=Faktura)
+@receiver(post_save, sender=ZadanieUzytkownika)
+@receiver(post_delete, sender=ZadanieUzytkownika)
+def bump_calendar_version_on_change(sender, instance, **kwargs):
+    """Invalidate calendar feed ETags of the owner of a changed faktura or task"""
+    bump_calendar_version(instance.user_id)
+
+
+@receiver(post_save, sender=Faktura)
+@receiver(post_delete, sender=Faktura)
+def bump_partnership_version_on_change(sender, instance, **kwargs):
+    """Invalidate partnership rollups of the selling company of a changed faktura"""
+    bump_partnership_version(instance.sprzedawca_id)
+
+
+@receiver(post_save, sender=Faktura)
+@receiver(post_delete, sender=Faktura)
+def invalidate_dashboard_stats_on_change(sender, instance, **kwargs):
+    """Invalidate the cached dashboard statistics of the owner of a changed faktura"""
+    invalidate_user_cache(instance.user_id, 'user_stats')
+
+
+@receiver(post_save, sender=Firma)
+@receiver(post_delete, sender=Firma)
+def invalidate_company_access_on_firma_change(sender, instance, **kwargs):
+    """Drop the cached company access of the owner of a changed company"""
+    invalidate_company_access(instance.user_id)
+
+
+@receiver(post_save, sender=Partnerstwo)
+@receiver(post_delete, sender=Partnerstwo)
+def invalidate_company_access_on_partnership_change(sender, instance, **kwargs):
+    """Drop the cached company access of the owners of both partner companies"""
+    invalidate_company_access(*Firma.objects.filter(
+        pk__in=(instance.firma1_id, instance.firma2_id)
+    ).values_list('user_id', flat=True))
+
+
+def _adjust_unread_on_save(instance, created, kind, user_id, field):
+    """Move a user's unread counter when a row is created unread or its read state changes"""
+    is_read = instance.__dict__.get(field)
+    loaded = getattr(instance, f'_loaded_{field}', None)
+    if created:
+        if is_read is False:
+            adjust_unread(user_id, kind, 1)
+    elif is_read is None or loaded is None:
+        # Saved without a known previous state
+        invalidate_unread([user_id], kind)
+    elif loaded != is_read:
+        adjust_unread(user_id, kind, -1 if is_read else 1)
+    setattr(instance, f'_loaded_{field}', is_read)
+
+
+def _adjust_unread_on_delete(instance, kind, user_id, field):
+    is_read = instance.__dict__.get(field)
+    if is_read is None:
+        invalidate_unread([user_id], kind)
+    elif not is_read:
+        adjust_unread(user_id, kind, -1)
+
+
+@receiver(post_save, sender=Wiadomosc)
+def adjust_unread_messages_on_save(sender, instance, created, **kwargs):
+    _adjust_unread_on_save(instance, created, MESSAGES, instance.odbiorca_user_id, 'przeczytana')
+
+
+@receiver(post_delete, sender=Wiadomosc)
+def adjust_unread_messages_on_delete(sender, instance, **kwargs):
+    _adjust_unread_on_delete(instance, MESSAGES, instance.odbiorca_user_id, 'przeczytana')
+
+
+@receiver(post_save, sender=Notification)
+def adjust_unread_notifications_on_save(sender, instance, created, **kwargs):
+    _adjust_unread_on_save(instance, created, NOTIFICATIONS, instance.user_id, 'is_read')
+
+
+@receiver(post_delete, sender=Notification)
+def adjust_unread_notifications_on_delete(sender, instance, **kwargs):
+    _adjust_unread_on_delete(instance, NOTIFICATIONS, instance.user_id, 'is_read')
+
 # Signal connection helper for apps.py
 def connect_ocr_signals():
     """
@@ -28,7 +28,9 @@ def process_document_ocr_task(self, document_upload_id):
     try:
         from .models import DocumentUpload, OCRResult, OCREngine, OCRProcessingStep
         from .services.file_upload_service import FileUploadService
-        from .services.ensemble_ocr_service import EnsembleOCRService
+        from .services.ensemble_ocr_service import get_ensemble_ocr_service
+        from .services.latency_sketch import record_latency
+        from .services.deployment_monitoring_service import ocr_engine_group
         
         logger.info(f"Starting ensemble document OCR processing task for ID: {document_upload_id}")
         
@@ -50,9 +52,8 @@ def process_document_ocr_task(self, document_upload_id):
         file_service = FileUploadService()
         file_content = file_service.get_file_content(document_upload)
         
-        # Initialize ensemble OCR service
-        ensemble_config = getattr(settings, 'ENSEMBLE_OCR_CONFIG', {})
-        ensemble_service = EnsembleOCRService(**ensemble_config)
+        # Process-wide ensemble OCR service, engines run in its sandbox children
+        ensemble_service = get_ensemble_ocr_service()
         
         # Process with ensemble OCR
         start_time = time.time()
@@ -79,13 +80,14 @@ def process_document_ocr_task(self, document_upload_id):
             preprocessing_applied=extracted_data.get('preprocessing_applied', []),
             fallback_used=extracted_data.get('fallback_used', False),
             ensemble_engines_used=extracted_data.get('engine_metadata', {}).get('ensemble_engines_used', []),
-            vendor_independent=True,
-            cost_savings=cost_savings
+            vendor_independent=True
         )
         
         # Mark document as completed
         document_upload.mark_processing_completed()
         
+        record_latency('ocr_processing', ocr_engine_group(ocr_result.processor_version), total_processing_time * 1000)
+        
         logger.info(f"Ensemble document OCR processing completed for {document_upload_id}, created OCRResult {ocr_result.id}")
         
         return {
@@ -326,48 +328,69 @@ def process_ocr_result_task(self, ocr_result_id):
         }
 
 
+@shared_task
+def process_ocr_result_chunk_task(ocr_result_ids):
+    """
+    Celery task to process a chunk of OCR results dispatched from the backlog
+    
+    Each result is processed in turn. A result that fails is re-queued as
+    its own process_ocr_result_task, which owns retries and fallback
+    handling.
+    
+    Args:
+        ocr_result_ids: IDs of OCRResults to process
+        
+    Returns:
+        dict: Chunk processing results
+    """
+    processed_count = 0
+    requeued = []
+    
+    for ocr_result_id in ocr_result_ids:
+        try:
+            process_ocr_result_task(ocr_result_id)
+            processed_count += 1
+        except Exception as exc:
+            logger.warning(f"OCR result {ocr_result_id} failed in chunk, re-queuing: {str(exc)}")
+            requeued.append(ocr_result_id)
+            process_ocr_result_task.delay(ocr_result_id)
+    
+    return {
+        'status': 'completed',
+        'processed': processed_count,
+        'requeued': requeued,
+    }
+
+
 @shared_task
 def batch_process_pending_ocr_results():
     """
-    Celery task to process all pending OCR results
+    Celery task to dispatch pending OCR results
     
-    This can be run periodically to catch any OCR results that weren't
-    processed automatically due to system issues.
+    This runs periodically to catch any OCR results that weren't
+    processed automatically due to system issues. Results are dispatched
+    fairly across users, in chunks, and only up to the in-flight cap, so
+    large backlogs drain over several runs without flooding the broker.
     
     Returns:
         dict: Batch processing results
     """
     try:
-        from .models import OCRResult
+        from .services.ocr_dispatcher import OCRBacklogDispatcher
         
         logger.info("Starting batch processing of pending OCR results")
         
-        # Get all pending OCR results
-        pending_results = OCRResult.objects.filter(
-            processing_status='pending'
-        ).select_related('document', 'document__user')
-        
-        total_count = pending_results.count()
-        processed_count = 0
-        error_count = 0
-        
-        logger.info(f"Found {total_count} pending OCR results to process")
-        
-        for ocr_result in pending_results:
-            try:
-                # Trigger individual processing task
-                process_ocr_result_task.delay(ocr_result.id)
-                processed_count += 1
-                
-            except Exception as e:
-                logger.error(f"Error queuing OCR result {ocr_result.id}: {str(e)}")
-                error_count += 1
+        dispatch = OCRBacklogDispatcher().dispatch()
         
         result = {
-            'status': 'completed',
-            'total_found': total_count,
-            'queued_for_processing': processed_count,
-            'errors': error_count,
+            'status': 'throttled' if dispatch.throttled and not dispatch.queued else 'completed',
+            'total_found': dispatch.total_found,
+            'queued_for_processing': dispatch.queued,
+            'chunks': dispatch.chunks,
+            'users': dispatch.users,
+            'in_flight': dispatch.in_flight,
+            'reaped': dispatch.reaped,
+            'errors': 0,
             'timestamp': timezone.now().isoformat()
         }
         
@@ -433,6 +456,167 @@ def cleanup_failed_ocr_results(days_old=7):
         }
 
 
+@shared_task
+def flush_latency_sketches():
+    """
+    Celery task to merge latency sketch batches handed off by web and worker
+    processes into the per-minute sketch table
+    
+    Returns:
+        dict: Flush results
+    """
+    try:
+        from .services.latency_sketch import latency_recorder
+        
+        written = latency_recorder.flush_batches()
+        
+        return {
+            'status': 'completed',
+            'written_count': written,
+            'timestamp': timezone.now().isoformat()
+        }
+        
+    except Exception as exc:
+        logger.error(f"Error in latency sketch flush task: {str(exc)}", exc_info=True)
+        return {
+            'status': 'error',
+            'message': str(exc),
+            'timestamp': timezone.now().isoformat()
+        }
+
+
+@shared_task
+def cleanup_latency_sketches(days_old=7):
+    """
+    Celery task to delete per-minute latency sketches older than the retention period
+    
+    Args:
+        days_old: Number of days of sketches to keep
+        
+    Returns:
+        dict: Cleanup results
+    """
+    try:
+        from datetime import timedelta
+        from .services.latency_sketch import LatencySketchRecorder
+        
+        cutoff_date = timezone.now() - timedelta(days=days_old)
+        count = LatencySketchRecorder.purge_older_than(cutoff_date)
+        logger.info(f"Cleaned up {count} latency sketches older than {days_old} days")
+        
+        return {
+            'status': 'completed',
+            'cleaned_up_count': count,
+            'cutoff_date': cutoff_date.isoformat(),
+            'timestamp': timezone.now().isoformat()
+        }
+        
+    except Exception as exc:
+        logger.error(f"Error in latency sketch cleanup task: {str(exc)}", exc_info=True)
+        return {
+            'status': 'error',
+            'message': str(exc),
+            'timestamp': timezone.now().isoformat()
+        }
+
+
+
+@shared_task
+def rollup_ocr_statistics_task(lookback_days=30, settle_days=2):
+    """
+    Celery task to write daily OCR statistics rollups of closed days
+    
+    Days are rolled up once they are settle_days old, when documents
+    uploaded on them have finished processing. Days in the lookback window
+    without a rollup are filled in.
+    
+    Args:
+        lookback_days: Number of past days to check for missing rollups
+        settle_days: Age in days before a day is rolled up
+        
+    Returns:
+        dict: Rollup results
+    """
+    try:
+        from datetime import timedelta
+        from .models import OCRStatisticsRollup
+        from .services.ocr_statistics import rollup_ocr_statistics
+        
+        today = timezone.localdate()
+        first = today - timedelta(days=lookback_days)
+        last = today - timedelta(days=max(settle_days, 1))
+        
+        rolled_up = set(OCRStatisticsRollup.objects.filter(
+            user__isnull=True, day__range=(first, last)
+        ).values_list('day', flat=True))
+        
+        days = []
+        day = first
+        while day <= last:
+            if day not in rolled_up:
+                rollup_ocr_statistics(day)
+                days.append(day.isoformat())
+            day += timedelta(days=1)
+        
+        logger.info(f"Rolled up OCR statistics of {len(days)} days")
+        
+        return {
+            'status': 'completed',
+            'rolled_up_days': days,
+            'timestamp': timezone.now().isoformat()
+        }
+        
+    except Exception as exc:
+        logger.error(f"Error in OCR statistics rollup task: {str(exc)}", exc_info=True)
+        return {
+            'status': 'error',
+            'message': str(exc),
+            'timestamp': timezone.now().isoformat()
+        }
+
+
+@shared_task
+def rollup_company_metrics_task(lookback_months=12):
+    """
+    Celery task to write monthly company statistics rollups of closed months
+
+    Every closed month in the lookback window is rolled up again, so
+    invoices edited or issued with a past date reach the rollup by the next
+    run. Older months keep their rollup.
+
+    Args:
+        lookback_months: Number of past closed months to roll up
+
+    Returns:
+        dict: Rollup results
+    """
+    try:
+        from datetime import timedelta
+        from .services.company_metrics import month_start, rollup_company_metrics
+
+        month = month_start(timezone.localdate())
+        months = []
+        for _ in range(lookback_months):
+            month = month_start(month - timedelta(days=1))
+            rollup_company_metrics(month)
+            months.append(month.strftime('%Y-%m'))
+
+        logger.info(f"Rolled up company metrics of {len(months)} months")
+
+        return {
+            'status': 'completed',
+            'rolled_up_months': months,
+            'timestamp': timezone.now().isoformat()
+        }
+
+    except Exception as exc:
+        logger.error(f"Error in company metrics rollup task: {str(exc)}", exc_info=True)
+        return {
+            'status': 'error',
+            'message': str(exc),
+            'timestamp': timezone.now().isoformat()
+        }
+
 @shared_task
 def process_retry_queue():
     """
@@ -684,13 +868,12 @@ def monitor_ensemble_engine_performance():
     Task to monitor ensemble engine performance and health
     """
     try:
-        from .services.ensemble_ocr_service import EnsembleOCRService
+        from .services.ensemble_ocr_service import get_ensemble_ocr_service
         
         logger.info("Monitoring ensemble engine performance")
         
-        # Initialize ensemble service
-        ensemble_config = getattr(settings, 'ENSEMBLE_OCR_CONFIG', {})
-        ensemble_service = EnsembleOCRService(**ensemble_config)
+        # Process-wide ensemble service, whose performance metrics span tasks
+        ensemble_service = get_ensemble_ocr_service()
         
         # Get engine status
         engine_status = ensemble_service.get_engine_status()
@@ -774,4 +957,253 @@ def track_cost_savings():
         return {
             'status': 'error',
             'message': str(e)
-        }
\ No newline at end of file
+        }
+
+@shared_task(bind=True, max_retries=2, default_retry_delay=60)
+def generate_invoice_pdf_archive_task(self, user_id, invoice_ids, base_url=None, any_owner=False):
+    """
+    Render a large selection of invoices into a ZIP archive
+    
+    The archive is stored for download and the user is notified with a link.
+    
+    Args:
+        user_id: Owner of the invoices
+        invoice_ids: IDs of invoices to include
+        base_url: Base URL for relative links in the PDF template
+        any_owner: Include invoices of other users (admin exports)
+    """
+    try:
+        from django.urls import reverse
+        from .models import Faktura
+        from .notifications.models import Notification
+        from .services.invoice_pdf_service import get_invoice_pdf_service
+        
+        faktury = Faktura.objects.filter(id__in=invoice_ids)
+        if not any_owner:
+            faktury = faktury.filter(user_id=user_id)
+        faktury = faktury.select_related('sprzedawca', 'nabywca').prefetch_related('pozycjafaktury_set')
+        
+        name = get_invoice_pdf_service().save_zip_archive(user_id, faktury, base_url)
+        
+        Notification.objects.create(
+            user_id=user_id,
+            title='Archiwum PDF gotowe',
+            content=f'Archiwum z {len(invoice_ids)} fakturami jest gotowe do pobrania.',
+            type='SUCCESS',
+            link=reverse('pobierz_archiwum_pdf', args=[name])
+        )
+        
+        logger.info(f"Generated PDF archive {name} with {len(invoice_ids)} invoices for user {user_id}")
+        return {
+            'status': 'completed',
+            'archive': name,
+            'invoices': len(invoice_ids)
+        }
+        
+    except Exception as exc:
+        logger.error(f"Error generating PDF archive for user {user_id}: {str(exc)}", exc_info=True)
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=exc)
+        return {
+            'status': 'error',
+            'message': str(exc)
+        }
+
+
+@shared_task(bind=True, max_retries=2, default_retry_delay=60)
+def clone_invoices_task(self, user_id, invoice_ids, mode='korekta'):
+    """
+    Clone a large selection of invoices into corrections or duplicates
+    
+    The clones are created in one transaction, so a retry starts over
+    without leaving a partial selection behind. The requesting user is
+    notified when they are ready.
+    
+    Args:
+        user_id: User who requested the clones
+        invoice_ids: IDs of invoices to clone
+        mode: 'korekta' or 'duplikat'
+    """
+    try:
+        from .notifications.models import Notification
+        from .services.invoice_cloning import clone_invoices
+        
+        clones = clone_invoices(invoice_ids, mode)
+        
+        Notification.objects.create(
+            user_id=user_id,
+            title='Korekty utworzone' if mode == 'korekta' else 'Duplikaty utworzone',
+            content=f'Utworzono {len(clones)} dokumentów ({mode}).',
+            type='SUCCESS',
+        )
+        
+        logger.info(f"Cloned {len(clones)} invoices as {mode} for user {user_id}")
+        return {
+            'status': 'completed',
+            'mode': mode,
+            'invoices': len(clones)
+        }
+        
+    except Exception as exc:
+        logger.error(f"Error cloning invoices for user {user_id}: {str(exc)}", exc_info=True)
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=exc)
+        return {
+            'status': 'error',
+            'message': str(exc)
+        }
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def export_user_data_task(self, user_id, name, format='jsonl'):
+    """
+    Write a GDPR data export archive for a user
+    
+    The export is checkpointed while it is written, so a retried task
+    resumes the archive instead of starting over.
+    
+    Args:
+        user_id: User whose data to export
+        name: Archive name from ``new_export_name``
+        format: Format of tabular sections ('jsonl' or 'csv')
+    """
+    try:
+        from django.contrib.auth.models import User
+        from django.urls import reverse
+        from .notifications.models import Notification
+        from .services.gdpr_data_service import GDPRDataService, export_path
+        
+        user = User.objects.get(pk=user_id)
+        export_info = GDPRDataService().export_user_data(user, format=format, path=export_path(user_id, name))
+        
+        Notification.objects.create(
+            user_id=user_id,
+            title='Eksport danych gotowy',
+            content='Eksport Twoich danych osobowych (RODO) jest gotowy do pobrania.',
+            type='SUCCESS',
+            link=reverse('pobierz_eksport_danych', args=[name])
+        )
+        
+        logger.info(f"Generated GDPR export {name} for user {user_id}")
+        return {
+            'status': 'completed',
+            'archive': name,
+            'rows': export_info['rows']
+        }
+        
+    except Exception as exc:
+        logger.error(f"Error exporting data for user {user_id}: {str(exc)}", exc_info=True)
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=exc)
+        return {
+            'status': 'error',
+            'message': str(exc)
+        }
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def fan_out_system_broadcast_task(self, broadcast_id):
+    """
+    Write the per-user copies of a fan-out system broadcast
+    
+    Batches are written from the broadcast's checkpoint for up to the
+    configured time budget; if recipients remain, the task enqueues its own
+    continuation. Retries resume from the last committed batch.
+    
+    Args:
+        broadcast_id: SystemBroadcast to deliver
+    """
+    from .services.system_broadcast import mark_failed, run_fan_out
+    
+    try:
+        broadcast = run_fan_out(broadcast_id)
+        if broadcast is None:
+            return {'status': 'error', 'message': f'Broadcast {broadcast_id} not found'}
+        
+        if broadcast.status == 'running':
+            fan_out_system_broadcast_task.delay(broadcast_id)
+        
+        return {
+            'status': broadcast.status,
+            'broadcast_id': broadcast_id,
+            'delivered': broadcast.delivered,
+            'total_recipients': broadcast.total_recipients,
+            'timestamp': timezone.now().isoformat()
+        }
+        
+    except Exception as exc:
+        logger.error(f"Error fanning out system broadcast {broadcast_id}: {str(exc)}", exc_info=True)
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=exc)
+        mark_failed(broadcast_id, str(exc))
+        return {
+            'status': 'error',
+            'message': str(exc)
+        }
+
+
+@shared_task
+def resume_stalled_system_broadcasts(stale_minutes=10):
+    """
+    Celery task to restart fan-out broadcasts whose task was lost
+    
+    Broadcasts still pending or running without progress for stale_minutes
+    are enqueued again and continue from their checkpoint.
+    
+    Args:
+        stale_minutes: Minutes without progress before a broadcast is resumed
+        
+    Returns:
+        dict: Resumed broadcast IDs
+    """
+    from datetime import timedelta
+    from .models import SystemBroadcast
+    
+    stalled = list(SystemBroadcast.objects.filter(
+        mode=SystemBroadcast.MODE_FAN_OUT,
+        status__in=['pending', 'running'],
+        updated_at__lt=timezone.now() - timedelta(minutes=stale_minutes)
+    ).values_list('id', flat=True))
+    
+    for broadcast_id in stalled:
+        fan_out_system_broadcast_task.delay(broadcast_id)
+    
+    if stalled:
+        logger.warning(f"Resumed {len(stalled)} stalled system broadcasts: {stalled}")
+    
+    return {
+        'status': 'completed',
+        'resumed': stalled,
+        'timestamp': timezone.now().isoformat()
+    }
+
+
+@shared_task
+def reconcile_unread_counters_task(batch_size=1000):
+    """
+    Celery task to rewrite cached unread counters from the database
+    
+    Args:
+        batch_size: Users reconciled per grouped count
+        
+    Returns:
+        dict: Number of users reconciled
+    """
+    try:
+        from .services.unread_counters import reconcile_unread_counters
+        
+        users = reconcile_unread_counters(batch_size=batch_size)
+        logger.info(f"Reconciled unread counters of {users} users")
+        
+        return {
+            'status': 'completed',
+            'users': users,
+            'timestamp': timezone.now().isoformat()
+        }
+        
+    except Exception as exc:
+        logger.error(f"Error reconciling unread counters: {str(exc)}", exc_info=True)
+        return {
+            'status': 'error',
+            'message': str(exc)
+        }
@@ -0,0 +1,188 @@
+"""
+Unit tests for incremental backups in the chunk store
+
+Tests that unchanged media is neither read nor stored again, that identical
+content is stored once, that any snapshot restores its own files, that
+verification finds damaged chunks, that deleting a backup prunes only
+chunks no other backup uses, and that database snapshots come from the
+online backup API.
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from ..services.backup_store import CHUNK_DIR, ChunkStore, copy_sqlite, read_manifest
+from ..services.maintenance_service import MaintenanceService
+
+
+BACKUP_CONFIG = {'chunk_size': 1024, 'workers': 2, 'compression_level': 3}
+
+
+class IncrementalBackupTest(TestCase):
+    """Test chunked backups of media files"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.media_root = os.path.join(self.tmp, 'media')
+        self.backup_directory = os.path.join(self.tmp, 'backups')
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.media_root, BACKUP_DIRECTORY=self.backup_directory, BACKUP_CONFIG=BACKUP_CONFIG
+        )
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+        self.write('faktury/a.pdf', b'A' * 3000)
+        self.write('faktury/b.pdf', os.urandom(2500))
+        self.service = MaintenanceService()
+
+    def write(self, name, content):
+        path = os.path.join(self.media_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content)
+
+    def read(self, name):
+        with open(os.path.join(self.media_root, name), 'rb') as f:
+            return f.read()
+
+    def backup(self, name):
+        result = self.service.create_backup(name, ['media_files'])
+        self.assertEqual(result['status'], 'success', result['errors'])
+        return result
+
+    def test_unchanged_files_are_not_read_again(self):
+        """The second snapshot reuses chunk lists of files with the same size and mtime"""
+        first = self.backup('first')
+        self.assertEqual(first['total_size'], 5500)
+
+        with patch.object(ChunkStore, 'store_file', wraps=self.service._chunk_store(BACKUP_CONFIG).store_file) as store_file:
+            second = self.backup('second')
+        store_file.assert_not_called()
+        manifest = read_manifest(os.path.join(self.backup_directory, 'second'))
+        self.assertEqual(manifest['stored_size'], 0)
+        self.assertEqual(manifest['total_size'], 5500)
+        self.assertLess(second['backup_size'], first['backup_size'])
+
+    def test_identical_content_is_stored_once(self):
+        """Repeated chunks within and across files share one stored chunk"""
+        self.write('faktury/kopia.pdf', b'A' * 3000)
+        self.backup('first')
+
+        manifest = read_manifest(os.path.join(self.backup_directory, 'first'))
+        entries = {entry['path']: entry['chunks'] for entry in manifest['files']['media_files']}
+        self.assertEqual(entries['faktury/a.pdf'], entries['faktury/kopia.pdf'])
+        stored = list(ChunkStore(os.path.join(self.backup_directory, CHUNK_DIR)).digests())
+        # 'A' * 1024 and 'A' * 952 for both copies, three chunks of random data
+        self.assertEqual(len(stored), 5)
+
+    def test_restore_from_any_snapshot(self):
+        """Restoring an older snapshot brings back its files and drops newer ones"""
+        self.backup('first')
+        original = self.read('faktury/b.pdf')
+        self.write('faktury/b.pdf', b'zmieniony')
+        self.write('nowy.pdf', b'nowy')
+        self.backup('second')
+
+        result = self.service.restore_backup('first', ['media_files'])
+        self.assertEqual(result['restored_components'], ['media_files'])
+        self.assertEqual(self.read('faktury/b.pdf'), original)
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, 'nowy.pdf')))
+
+        self.service.restore_backup('second', ['media_files'])
+        self.assertEqual((self.read('faktury/b.pdf'), self.read('nowy.pdf')), (b'zmieniony', b'nowy'))
+
+    def test_verify_finds_damaged_chunks(self):
+        """A chunk whose content no longer matches its hash is reported"""
+        self.backup('first')
+        self.assertEqual(self.service.verify_backup('first')['status'], 'success')
+
+        digest, path = next(ChunkStore(os.path.join(self.backup_directory, CHUNK_DIR)).digests())
+        with open(path, 'wb') as f:
+            f.write(b'uszkodzony')
+
+        result = self.service.verify_backup('first')
+        self.assertEqual(result['status'], 'error')
+        self.assertEqual(result['corrupt_chunks'], [digest])
+
+    def test_delete_prunes_unreferenced_chunks(self):
+        """Chunks still used by another backup survive deletion"""
+        self.backup('first')
+        self.write('faktury/b.pdf', b'B' * 100)
+        self.backup('second')
+
+        result = self.service.delete_backup('first')
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(result['removed_chunks'], 3)
+        self.assertEqual(self.service.verify_backup('second')['status'], 'success')
+        self.assertEqual([backup['name'] for backup in self.service.list_backups()], ['second'])
+
+
+class DatabaseBackupTest(TransactionTestCase):
+    """Test database snapshots"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.backup_directory = os.path.join(self.tmp, 'backups')
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.settings_override = override_settings(BACKUP_DIRECTORY=self.backup_directory, BACKUP_CONFIG=BACKUP_CONFIG)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.service = MaintenanceService()
+
+    def test_database_snapshot(self):
+        """The database is copied through the online backup API into the chunk store"""
+        User.objects.create_user(username='w-kopii')
+        result = self.service.create_backup('db', ['database'])
+        self.assertEqual(result['components'], ['database'])
+
+        manifest = read_manifest(os.path.join(self.backup_directory, 'db'))
+        entry, = manifest['files']['database']
+        self.assertEqual(entry['path'], 'database.sqlite3')
+
+        restored = os.path.join(self.tmp, 'restored.sqlite3')
+        ChunkStore(os.path.join(self.backup_directory, CHUNK_DIR)).restore_file(entry['chunks'], restored)
+        copy = sqlite3.connect(restored)
+        self.addCleanup(copy.close)
+        self.assertEqual(
+            copy.execute("SELECT COUNT(*) FROM auth_user WHERE username = 'w-kopii'").fetchone(), (1,)
+        )
+
+    def test_refused_inside_transaction(self):
+        """A snapshot inside a transaction would wait for itself and is refused"""
+        with transaction.atomic():
+            result = self.service.create_backup('db', ['database'])
+        self.assertEqual(result['components'], [])
+
+
+class CopySqliteTest(TestCase):
+    """Test consistent SQLite copies"""
+
+    def test_copy_ignores_uncommitted_writes_of_other_connections(self):
+        """A copy taken during another connection's transaction holds only committed rows"""
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, True)
+        path = os.path.join(tmp, 'live.sqlite3')
+        writer = sqlite3.connect(path, isolation_level=None)
+        self.addCleanup(writer.close)
+        writer.execute('PRAGMA journal_mode=WAL')
+        writer.execute('CREATE TABLE t (x)')
+        writer.execute('INSERT INTO t VALUES (1)')
+        writer.execute('BEGIN')
+        writer.execute('INSERT INTO t VALUES (2)')
+
+        reader = sqlite3.connect(path)
+        self.addCleanup(reader.close)
+        copy_sqlite(reader, os.path.join(tmp, 'copy.sqlite3'))
+        writer.execute('COMMIT')
+
+        copy = sqlite3.connect(os.path.join(tmp, 'copy.sqlite3'))
+        self.addCleanup(copy.close)
+        self.assertEqual(copy.execute('SELECT x FROM t').fetchall(), [(1,)])
@@ -0,0 +1,328 @@
+"""
+Unit tests for namespaced cache utilities
+
+Tests that cached results are invalidated per user and per scope by a
+generation bump, that concurrent misses compute a value once and stale
+values are served while one caller recomputes them, that querysets are
+cached as field values and that hits and misses are counted. The tests run
+on the local memory cache and, when a server is reachable, on Redis. Also
+tests that waits are bounded by the expected computation time, that values
+are computed directly when the cache is unavailable and that the dashboard
+statistics are cached until the user's invoices change.
+"""
+
+import datetime
+import os
+import threading
+import time
+import uuid
+from decimal import Decimal
+from unittest import SkipTest
+from unittest.mock import Mock, patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from ..cache_utils import (
+    CachedQuerySet, GENERATION_KEY, cache_user_stats, cached, get_cache_stats, get_or_compute, invalidate_scope,
+    invalidate_user_cache, namespaced_key, reset_cache_stats
+)
+from ..models import Faktura, Firma, Kontrahent, PozycjaFaktury
+from ..views import dashboard_stats
+
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+REDIS_CACHES = {
+    'default': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': os.getenv('REDIS_URL', 'redis://localhost:6379/1'),
+        'OPTIONS': {'CLIENT_CLASS': 'django_redis.client.DefaultClient', 'SOCKET_CONNECT_TIMEOUT': 1},
+        'KEY_PREFIX': f'test-cache-utils-{uuid.uuid4().hex}',
+    }
+}
+
+FAST_LOCKS = {'timeout': 300, 'stale_timeout': 60, 'lock_timeout': 0.5, 'poll_interval': 0.01}
+
+SLOW_LOCKS = {'timeout': 300, 'stale_timeout': 60, 'lock_timeout': 10, 'poll_interval': 0.01, 'wait_factor': 2}
+
+
+class CacheUtilsTests:
+    """Tests shared by the cache backends"""
+
+    def setUp(self):
+        reset_cache_stats()
+        self.users = [User.objects.create_user(username=f'cache{i}') for i in range(2)]
+        self.calls = []
+
+        @cached('user_invoices', user='user')
+        def invoices(user, status='wystawiona'):
+            self.calls.append((user.pk, status))
+            return [user.pk, status, len(self.calls)]
+
+        @cached('user_stats', user='user')
+        def stats(user):
+            self.calls.append(('stats', user.pk))
+            return len(self.calls)
+
+        self.invoices, self.stats = invoices, stats
+
+    def test_results_cached_per_user_and_arguments(self):
+        """Equal calls are computed once, other users and arguments apart"""
+        first = self.invoices(self.users[0])
+        self.assertEqual(self.invoices(self.users[0]), first)
+        self.invoices(self.users[0], status='oplacona')
+        self.invoices(self.users[1])
+        self.invoices(user=self.users[1])
+
+        self.assertEqual(len(self.calls), 3)
+        self.assertEqual(get_cache_stats()['user_invoices'], {'hits': 2, 'stale_hits': 0, 'misses': 3})
+
+    def test_user_invalidation_is_one_generation_bump(self):
+        """Invalidating a user bumps one generation and drops all scopes of that user only"""
+        self.invoices(self.users[0])
+        self.stats(self.users[0])
+        self.invoices(self.users[1])
+        key = GENERATION_KEY.format(namespace=f'user:{self.users[0].pk}')
+        generation = cache.get(key)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_user_cache(self.users[0])
+
+        self.assertEqual(cache.get(key), generation + 1)
+        self.invoices(self.users[0])
+        self.stats(self.users[0])
+        self.invoices(self.users[1])
+        self.assertEqual(len(self.calls), 5)
+
+    def test_scope_invalidation(self):
+        """Invalidating a scope of a user keeps the other scopes, global scopes are bumped apart"""
+        self.invoices(self.users[0])
+        self.stats(self.users[0])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_user_cache(self.users[0], 'user_stats')
+        self.invoices(self.users[0])
+        self.stats(self.users[0])
+        self.assertEqual(self.calls[2:], [('stats', self.users[0].pk)])
+
+        before = namespaced_key('exchange_rates', 'eur')
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_scope('exchange_rates')
+        self.assertNotEqual(namespaced_key('exchange_rates', 'eur'), before)
+
+    def test_invalidation_waits_for_commit(self):
+        """Values cached inside the transaction stay until it commits"""
+        self.invoices(self.users[0])
+        with self.captureOnCommitCallbacks() as callbacks:
+            invalidate_user_cache(self.users[0])
+            self.invoices(self.users[0])
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(len(callbacks), 1)
+
+    @override_settings(CACHE_NAMESPACE_CONFIG=FAST_LOCKS)
+    def test_concurrent_misses_compute_once(self):
+        """Callers missing the same key wait for the one computing it"""
+        computed = []
+
+        def compute():
+            computed.append(None)
+            time.sleep(0.1)
+            return 'value'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(get_or_compute('reports', 'slow', compute)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, ['value'] * 8)
+        self.assertEqual(len(computed), 1)
+
+    @override_settings(CACHE_NAMESPACE_CONFIG=FAST_LOCKS)
+    def test_stale_value_served_while_recomputed(self):
+        """Past its timeout a value is served stale while the lock is held, then recomputed"""
+        values = iter(['old', 'new'])
+        self.assertEqual(get_or_compute('reports', 'daily', lambda: next(values), timeout=0), 'old')
+
+        lock_key = f"{namespaced_key('reports', 'daily')}:lock"
+        cache.add(lock_key, 1, 10)
+        self.assertEqual(get_or_compute('reports', 'daily', lambda: next(values), timeout=0), 'old')
+        cache.delete(lock_key)
+        self.assertEqual(get_or_compute('reports', 'daily', lambda: next(values)), 'new')
+        self.assertEqual(get_or_compute('reports', 'daily', lambda: next(values)), 'new')
+
+        self.assertEqual(get_cache_stats()['reports'], {'hits': 1, 'stale_hits': 1, 'misses': 2})
+
+    @override_settings(CACHE_NAMESPACE_CONFIG=FAST_LOCKS)
+    def test_miss_computed_after_lock_timeout(self):
+        """A lock left by a failed caller delays a miss by at most the lock timeout"""
+        cache.add(f"{namespaced_key('reports', 'orphan')}:lock", 1, 10)
+
+        self.assertEqual(get_or_compute('reports', 'orphan', lambda: 'value'), 'value')
+
+    @override_settings(CACHE_NAMESPACE_CONFIG=SLOW_LOCKS)
+    def test_wait_bounded_by_expected_compute_time(self):
+        """A miss waits about as long as the lock holder expects to compute, not the lock timeout"""
+        cache.add(f"{namespaced_key('reports', 'held')}:lock", 0.05, 10)
+
+        started = time.monotonic()
+        self.assertEqual(get_or_compute('reports', 'held', lambda: 'value'), 'value')
+        self.assertLess(time.monotonic() - started, 1)
+
+    @override_settings(CACHE_NAMESPACE_CONFIG=SLOW_LOCKS)
+    def test_released_lock_ends_wait(self):
+        """A lock released without a value, by a failed caller, ends the wait at once"""
+        lock_key = f"{namespaced_key('reports', 'failed')}:lock"
+        cache.add(lock_key, 5, 10)
+        threading.Timer(0.05, cache.delete, [lock_key]).start()
+
+        started = time.monotonic()
+        self.assertEqual(get_or_compute('reports', 'failed', lambda: 'value'), 'value')
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_cached_queryset_stores_field_values(self):
+        """Model querysets are cached as value rows and rebuilt, values() rows as they are"""
+        for i in range(3):
+            Kontrahent.objects.create(user=self.users[0], nazwa=f'Klient {i}', ulica='Główna', numer_domu='1',
+                                      kod_pocztowy='00-001', miejscowosc='Warszawa')
+        queryset = Kontrahent.objects.filter(user=self.users[0]).order_by('nazwa')
+        cached_queryset = CachedQuerySet(queryset, 'kontrahenci', user=self.users[0], scope='user_contractors')
+
+        expected = list(queryset)
+        self.assertEqual(cached_queryset.get_cached_result(), expected)
+        with self.assertNumQueries(0):
+            result = cached_queryset.get_cached_result()
+        self.assertEqual([(k.pk, k.nazwa, k.user_id) for k in result], [(k.pk, k.nazwa, k.user_id) for k in expected])
+        self.assertFalse(result[0]._state.adding)
+
+        stored, _ = cache.get(namespaced_key('user_contractors', 'kontrahenci', self.users[0].pk))
+        self.assertTrue(all(isinstance(row, tuple) for row in stored['rows']))
+
+        names = CachedQuerySet(queryset.values('pk', 'nazwa'), 'nazwy', user=self.users[0]).get_cached_result()
+        self.assertEqual(names[0], {'pk': expected[0].pk, 'nazwa': 'Klient 0'})
+
+    def test_cache_user_stats(self):
+        """The user statistics decorator caches in the user's namespace"""
+        user = self.users[0]
+
+        @cache_user_stats(user)
+        def dashboard():
+            self.calls.append('dashboard')
+            return len(self.calls)
+
+        self.assertEqual(dashboard(), dashboard())
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_user_cache(user)
+        dashboard()
+        self.assertEqual(self.calls, ['dashboard', 'dashboard'])
+
+
+def unavailable_cache():
+    """Cache behaving like django_redis with IGNORE_EXCEPTIONS while Redis is down"""
+    backend = Mock()
+    backend.get.side_effect = lambda key, default=None: default
+    backend.get_many.return_value = {}
+    backend.add.return_value = None
+    backend.set.return_value = None
+    backend.delete.return_value = None
+    return backend
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class LocMemCacheUtilsTest(CacheUtilsTests, TestCase):
+    """Test namespaced caching on the local memory cache"""
+
+    def setUp(self):
+        cache.clear()
+        super().setUp()
+
+
+@override_settings(CACHES=REDIS_CACHES)
+class RedisCacheUtilsTest(CacheUtilsTests, TestCase):
+    """Test namespaced caching on Redis"""
+
+    @classmethod
+    def setUpClass(cls):
+        try:
+            import redis
+            redis.Redis.from_url(REDIS_CACHES['default']['LOCATION'], socket_connect_timeout=1).ping()
+        except Exception as e:
+            raise SkipTest(f'Redis not available: {e}')
+        super().setUpClass()
+
+    def tearDown(self):
+        # Only the keys of this test run's prefix
+        cache.delete_pattern('*')
+        super().tearDown()
+
+
+class UnavailableCacheTest(TestCase):
+    """Test namespaced caching while the cache is unavailable"""
+
+    def setUp(self):
+        reset_cache_stats()
+
+    @override_settings(CACHE_NAMESPACE_CONFIG=SLOW_LOCKS)
+    def test_values_computed_directly(self):
+        """Every call computes its value at once instead of waiting for a lock nobody holds"""
+        calls = []
+
+        started = time.monotonic()
+        with patch('faktury.cache_utils.cache', unavailable_cache()):
+            for _ in range(3):
+                self.assertEqual(get_or_compute('reports', 'daily', lambda: calls.append(None) or 'value'), 'value')
+
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(get_cache_stats()['reports'], {'hits': 0, 'stale_hits': 0, 'misses': 3})
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class DashboardStatsCacheTest(TestCase):
+    """Test the cached statistics of the user dashboard"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='panel')
+        self.firma = Firma.objects.create(
+            user=self.user, nazwa='Firma', nip='9876543210', ulica='Główna', numer_domu='1',
+            kod_pocztowy='00-001', miejscowosc='Warszawa'
+        )
+        self.kontrahent = Kontrahent.objects.create(
+            user=self.user, nazwa='Klient', nip='1234563218', ulica='Boczna', numer_domu='2',
+            kod_pocztowy='00-002', miejscowosc='Kraków'
+        )
+        self.today = datetime.date.today()
+
+    def _add_item(self, faktura):
+        with self.captureOnCommitCallbacks(execute=True):
+            PozycjaFaktury.objects.create(faktura=faktura, nazwa='Usługa', jednostka='szt', ilosc=Decimal('1'),
+                                          cena_netto=Decimal('100.00'), vat='23')
+
+    def test_stats_cached_until_invoices_change(self):
+        """Statistics are computed once and recomputed after an item or invoice changes"""
+        with self.captureOnCommitCallbacks(execute=True):
+            faktura = Faktura.objects.create(
+                user=self.user, numer='FV/1', data_wystawienia=self.today, data_sprzedazy=self.today,
+                termin_platnosci=self.today, miejsce_wystawienia='Warszawa', sprzedawca=self.firma,
+                nabywca=self.kontrahent
+            )
+        self._add_item(faktura)
+
+        stats = dashboard_stats(self.user, self.today)
+        self.assertEqual(stats['sprzedaz']['Całkowita'], 123.0)
+        with self.assertNumQueries(0):
+            self.assertEqual(dashboard_stats(self.user, self.today), stats)
+
+        self._add_item(faktura)
+        self.assertEqual(dashboard_stats(self.user, self.today)['sprzedaz']['Całkowita'], 246.0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            faktura.delete()
+        self.assertEqual(dashboard_stats(self.user, self.today)['sprzedaz']['Całkowita'], 0.0)
@@ -0,0 +1,229 @@
+"""
+Unit tests for the windowed calendar feed
+
+Tests the database gross total against Faktura.suma_brutto, window
+filtering of invoices and tasks, conditional GET with the per-user data
+version, version bumps of bulk status updates, and query counts and latency
+on a 50k invoice fixture.
+"""
+
+import datetime
+import json
+import time
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+
+from ..models import Faktura, Firma, Kontrahent, PozycjaFaktury, ZadanieUzytkownika
+from ..admin import FakturaAdmin
+from ..services.calendar_feed import DEFAULT_WINDOW_DAYS, calendar_data, get_calendar_version, parse_window
+from ..services.partnership_analytics import get_partnership_version
+from ..views_modules.data_export_import_views import BulkOperationsView
+from ..views_modules.team_views import get_calendar_data, get_events
+
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+ITEMS = (
+    # (cena_netto, ilosc, vat, rabat, rabat_typ)
+    ('100.00', '1', '23', None, None),
+    ('19.99', '3', '8', '10', 'procent'),
+    ('0.05', '7', '5', None, None),
+    ('250.00', '2', 'zw', '12.50', 'kwota'),
+    ('33.33', '1.5', '0', '0', 'procent'),
+    ('12.35', '0.5', '23', None, None),
+)
+
+
+def create_parties(user, index=0):
+    firma = Firma.objects.create(
+        user=user, nazwa=f'Firma {index}', nip=f'98765432{index:02d}', ulica='Główna',
+        numer_domu='1', kod_pocztowy='00-001', miejscowosc='Warszawa'
+    )
+    kontrahent = Kontrahent.objects.create(
+        user=user, nazwa='Klient', nip='1234563218', ulica='Boczna', numer_domu='2',
+        kod_pocztowy='00-002', miejscowosc='Kraków'
+    )
+    return firma, kontrahent
+
+
+def invoice(user, firma, kontrahent, numer, issued, due, **kwargs):
+    return Faktura(
+        user=user, numer=numer, data_wystawienia=issued, data_sprzedazy=issued, termin_platnosci=due,
+        miejsce_wystawienia='Warszawa', sprzedawca=firma, nabywca=kontrahent, **kwargs
+    )
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CalendarFeedTest(TestCase):
+    """Test window filtering, gross totals and conditional GET"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='kalendarz')
+        self.firma, self.kontrahent = create_parties(self.user)
+        self.factory = RequestFactory()
+        self.day = datetime.date(2025, 3, 1)
+
+    def _get(self, view, **headers):
+        request = self.factory.get('/', {'start': '2025-03-01', 'end': '2025-04-01'}, **headers)
+        request.user = self.user
+        return view(request)
+
+    def test_gross_total_matches_suma_brutto(self):
+        """The annotated gross total equals the Python sum of item gross values, also for cost invoices"""
+        faktury = []
+        for i, typ in enumerate(('sprzedaz', 'koszt', 'sprzedaz')):
+            faktura = invoice(self.user, self.firma, self.kontrahent, f'FV/{i}', self.day, self.day, typ_faktury=typ)
+            faktura.save()
+            for cena, ilosc, vat, rabat, rabat_typ in ITEMS[i:]:
+                PozycjaFaktury.objects.create(faktura=faktura, nazwa='x', jednostka='szt', cena_netto=Decimal(cena),
+                                              ilosc=Decimal(ilosc), vat=vat, rabat=rabat and Decimal(rabat),
+                                              rabat_typ=rabat_typ)
+            faktury.append(faktura)
+        empty = invoice(self.user, self.firma, self.kontrahent, 'FV/empty', self.day, self.day)
+        empty.save()
+
+        totals = dict(Faktura.objects.with_gross_total().values_list('id', 'gross_total'))
+        for faktura in faktury + [empty]:
+            self.assertEqual(totals[faktura.pk], Faktura.objects.get(pk=faktura.pk).suma_brutto, faktura.numer)
+
+    def test_window_filters_invoices_and_tasks(self):
+        """Only invoices issued or due and tasks due in [start, end) are returned"""
+        inside = invoice(self.user, self.firma, self.kontrahent, 'FV/in', self.day, self.day + datetime.timedelta(days=14))
+        due_inside = invoice(self.user, self.firma, self.kontrahent, 'FV/due', datetime.date(2025, 2, 20),
+                             datetime.date(2025, 3, 6))
+        outside = invoice(self.user, self.firma, self.kontrahent, 'FV/out', datetime.date(2025, 4, 1),
+                          datetime.date(2025, 4, 15))
+        Faktura.objects.bulk_create([inside, due_inside, outside])
+        ZadanieUzytkownika.objects.create(user=self.user, tytul='a', opis='W oknie', termin_wykonania=datetime.date(2025, 3, 31))
+        ZadanieUzytkownika.objects.create(user=self.user, tytul='b', opis='Poza', termin_wykonania=datetime.date(2025, 4, 1))
+
+        with self.assertNumQueries(2):
+            response = self._get(get_events)
+        events = [(event['type'], event['title']) for event in self._json(response)]
+        self.assertEqual(events, [
+            ('termin_platnosci', 'Termin płatności - FV/due'),
+            ('faktura', 'Faktura FV/in'),
+            ('termin_platnosci', 'Termin płatności - FV/in'),
+            ('zadanie', 'W oknie'),
+        ])
+
+        data = calendar_data(self.user, *parse_window({'start': '2025-03-01T00:00:00Z', 'end': '2025-04-01T00:00:00Z'}))
+        self.assertEqual([row['numer'] for row in data['faktury']], ['FV/due', 'FV/in'])
+        self.assertEqual(data['faktury'][0]['suma_brutto'], '0.00')
+
+    def test_window_parsing(self):
+        """Missing ranges default around today and malformed or huge ranges are rejected"""
+        today = datetime.date(2025, 6, 15)
+        window = datetime.timedelta(days=DEFAULT_WINDOW_DAYS)
+        self.assertEqual(parse_window({}, today=today), (today - window, today + window))
+        for params in ({'start': '2025-01-01'}, {'start': 'jutro', 'end': '2025-02-01'},
+                       {'start': '2025-02-01', 'end': '2025-01-01'}, {'start': '2020-01-01', 'end': '2025-01-01'}):
+            with self.subTest(params=params), self.assertRaises(ValueError):
+                parse_window(params)
+        self.assertEqual(self._get_params(start='jutro', end='2025-02-01').status_code, 400)
+
+    def _get_params(self, **params):
+        request = self.factory.get('/', params)
+        request.user = self.user
+        return get_events(request)
+
+    def test_conditional_get(self):
+        """Unchanged windows answer 304 without queries until a change is committed"""
+        first = self._get(get_calendar_data)
+        etag = first['ETag']
+        self.assertIn('no-cache', first['Cache-Control'])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self._get(get_calendar_data, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ZadanieUzytkownika.objects.create(user=self.user, tytul='c', opis='Nowe', termin_wykonania=self.day)
+        changed = self._get(get_calendar_data, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], etag)
+        self.assertNotEqual(self._get(get_events)['ETag'], changed['ETag'])
+
+    def test_bulk_status_updates_bump_versions(self):
+        """Admin actions and the bulk operations API change the ETag and partnership version"""
+        faktury = [invoice(self.user, self.firma, self.kontrahent, f'FV/{i}', self.day, self.day) for i in range(2)]
+        for faktura in faktury:
+            faktura.save()
+        etag = self._get(get_calendar_data)['ETag']
+        versions = [(get_calendar_version(self.user.id), get_partnership_version(self.firma.id))]
+
+        request = self.factory.post('/')
+        request.user = self.user
+        model_admin = FakturaAdmin(Faktura, admin.site)
+        for action in (model_admin.bulk_mark_paid, model_admin.bulk_mark_sent):
+            with patch('faktury.admin.messages'), self.captureOnCommitCallbacks(execute=True):
+                action(request, Faktura.objects.filter(pk=faktury[0].pk))
+            versions.append((get_calendar_version(self.user.id), get_partnership_version(self.firma.id)))
+
+        request = self.factory.post('/', json.dumps({
+            'operation': 'update_status', 'data_type': 'invoices', 'new_status': 'oplacona',
+            'item_ids': [faktura.pk for faktura in faktury],
+        }), content_type='application/json')
+        request.user = self.user
+        with self.captureOnCommitCallbacks(execute=True):
+            result = self._json(BulkOperationsView.as_view()(request))
+        versions.append((get_calendar_version(self.user.id), get_partnership_version(self.firma.id)))
+
+        self.assertEqual(result['updated_count'], 2)
+        self.assertEqual(set(Faktura.objects.values_list('status', flat=True)), {'oplacona'})
+        for before, after in zip(versions, versions[1:]):
+            self.assertTrue(after[0] > before[0] and after[1] > before[1], versions)
+        self.assertNotEqual(self._get(get_calendar_data, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    @staticmethod
+    def _json(response):
+        return json.loads(response.content)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CalendarFeedLargeFixtureTest(TestCase):
+    """Test query counts and latency against 50k invoices"""
+
+    INVOICES = 50000
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='kalendarz-duzy')
+        firma, kontrahent = create_parties(cls.user, 1)
+        first_day = datetime.date(2016, 1, 1)
+        faktury = Faktura.objects.bulk_create([
+            invoice(cls.user, firma, kontrahent, f'FV/{i}', first_day + datetime.timedelta(days=i // 15),
+                    first_day + datetime.timedelta(days=i // 15 + 14))
+            for i in range(cls.INVOICES)
+        ], batch_size=2000)
+        PozycjaFaktury.objects.bulk_create([
+            PozycjaFaktury(faktura=faktura, nazwa='Usługa', jednostka='szt', cena_netto=Decimal('100.00'),
+                           ilosc=Decimal('2'), vat='23')
+            for faktura in faktury
+        ], batch_size=2000)
+        cls.month = {'start': '2020-06-01', 'end': '2020-07-13'}
+
+    def _get(self, view):
+        request = RequestFactory().get('/', self.month)
+        request.user = self.user
+        return view(request)
+
+    def test_month_view_queries_and_latency(self):
+        """A month view reads two windowed queries and stays fast regardless of history size"""
+        for view in (get_events, get_calendar_data):
+            with self.subTest(view=view.__name__):
+                with self.assertNumQueries(2):
+                    start = time.perf_counter()
+                    response = self._get(view)
+                    elapsed = time.perf_counter() - start
+                self.assertEqual(response.status_code, 200)
+                self.assertLess(elapsed, 1.0)
+
+        data = calendar_data(self.user, *parse_window(self.month))
+        self.assertEqual(len(data['faktury']), 42 * 15 + 14 * 15)
+        self.assertEqual({row['suma_brutto'] for row in data['faktury']}, {'246.00'})
@@ -0,0 +1,160 @@
+"""
+Unit tests for company statistics and cached company access
+
+Tests that the statistics equal the previous per-query counts and Python
+revenue sum with a fixed number of queries, that rollups of closed months
+give the same statistics, and that the cached company access of a user is
+dropped when a company or partnership of the user changes.
+"""
+
+import datetime
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ..models import CompanyMetricsRollup, Faktura, Firma, Kontrahent, Partnerstwo, PozycjaFaktury
+from ..services.company_management_service import CompanyManagementService
+from ..services.company_metrics import company_statistics, month_start, rollup_company_metrics
+from ..tasks import rollup_company_metrics_task
+
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CompanyMetricsTest(TestCase):
+    """Test company statistics, their rollups and company access"""
+
+    def setUp(self):
+        cache.clear()
+        self.firmy = []
+        for i in range(4):
+            user = User.objects.create_user(username=f'firma{i}')
+            self.firmy.append(Firma.objects.create(
+                user=user, nazwa=f'Firma {i}', nip=f'52602502{i}4', ulica='Główna',
+                numer_domu='1', kod_pocztowy='00-001', miejscowosc='Warszawa'
+            ))
+        self.firma = self.firmy[0]
+        self.kontrahent = Kontrahent.objects.create(
+            user=self.firma.user, nazwa='Klient', ulica='Główna', numer_domu='1',
+            kod_pocztowy='00-001', miejscowosc='Warszawa'
+        )
+        Partnerstwo.objects.create(firma1=self.firma, firma2=self.firmy[1])
+        Partnerstwo.objects.create(firma1=self.firmy[2], firma2=self.firma, aktywne=False)
+        self.service = CompanyManagementService()
+        self.count = 0
+
+    def _invoices(self, count, issued, typ_faktury='sprzedaz', status='oplacona'):
+        faktury = Faktura.objects.bulk_create([
+            Faktura(
+                user=self.firma.user, numer=f'FV/{self.count + i}', data_wystawienia=issued, data_sprzedazy=issued,
+                termin_platnosci=issued, miejsce_wystawienia='Warszawa', sprzedawca=self.firma,
+                nabywca=self.kontrahent, typ_faktury=typ_faktury, status=status
+            )
+            for i in range(count)
+        ])
+        self.count += count
+        PozycjaFaktury.objects.bulk_create([
+            PozycjaFaktury(faktura=faktura, nazwa='x', jednostka='szt', cena_netto=Decimal('19.99'),
+                           ilosc=Decimal(i % 3 + 1), vat=['23', '8', 'zw'][i % 3])
+            for i, faktura in enumerate(faktury)
+        ])
+
+    def _fixture(self, per_month):
+        this_month = month_start(timezone.localdate())
+        for issued in (this_month, this_month - datetime.timedelta(days=1), this_month - datetime.timedelta(days=40)):
+            self._invoices(per_month, issued)
+            self._invoices(1, issued, status='wystawiona')
+            self._invoices(1, issued, typ_faktury='koszt')
+
+    def _expected(self):
+        paid_sales = Faktura.objects.filter(sprzedawca=self.firma, typ_faktury='sprzedaz', status='oplacona')
+        return {
+            'total_invoices': Faktura.objects.filter(sprzedawca=self.firma).count(),
+            'total_sales': Faktura.objects.filter(sprzedawca=self.firma, typ_faktury='sprzedaz').count(),
+            'total_costs': Faktura.objects.filter(user=self.firma.user, typ_faktury='koszt').count(),
+            'active_partnerships': 1,
+            'total_contractors': 1,
+            'total_revenue': sum((faktura.suma_brutto for faktura in paid_sales), Decimal('0.00')),
+        }
+
+    def test_statistics_match_previous_queries(self):
+        """Statistics equal the separate counts and the Python revenue sum"""
+        self._fixture(2)
+
+        self.assertEqual(self.service.get_company_statistics(self.firma), self._expected())
+
+    def test_statistics_query_count_does_not_grow_with_invoices(self):
+        """One query per model for few and many invoices"""
+        self._fixture(1)
+        with self.assertNumQueries(4):
+            company_statistics(self.firma)
+
+        self._fixture(30)
+        with self.assertNumQueries(4):
+            company_statistics(self.firma)
+
+    def test_rollup_statistics_equal_live_statistics(self):
+        """Closed months read from rollups give the same statistics"""
+        self._fixture(3)
+        self.assertEqual(rollup_company_metrics_task(lookback_months=3)['status'], 'completed')
+        # Months without invoices get no rollup row
+        self.assertEqual(CompanyMetricsRollup.objects.filter(firma=self.firma).count(), 2)
+
+        # The current month is aggregated from the invoices
+        with self.assertNumQueries(5):
+            stats = company_statistics(self.firma, use_rollup=True)
+        self.assertEqual(stats, self._expected())
+
+        with self.assertRaises(ValueError):
+            rollup_company_metrics(timezone.localdate())
+
+    def test_access_answered_from_cache(self):
+        """Access checks read no rows once the user's companies are cached"""
+        self._fixture(1)
+        user = self.firma.user
+
+        with self.assertNumQueries(2):
+            self.assertTrue(self.service.user_has_company_access(user, self.firma.pk))
+        with self.assertNumQueries(0):
+            self.assertTrue(self.service.user_has_company_access(user, self.firmy[1].pk))
+            self.assertFalse(self.service.user_has_company_access(user, self.firmy[2].pk))
+            self.assertFalse(self.service.user_has_company_access(user, self.firmy[3].pk))
+        with self.assertNumQueries(1):
+            companies = self.service.get_user_companies(user)
+        self.assertEqual(
+            [(company['id'], company['access_type']) for company in companies],
+            [(self.firma.pk, 'owner'), (self.firmy[1].pk, 'partnership')]
+        )
+        self.assertEqual(companies[1]['partnership_type'], 'wspolpraca')
+
+    def test_access_invalidated_on_partnership_and_company_changes(self):
+        """Partnership and company changes drop the cached access of both sides"""
+        user, partner_user = self.firma.user, self.firmy[3].user
+        self.assertFalse(self.service.user_has_company_access(user, self.firmy[3].pk))
+        self.assertFalse(self.service.user_has_company_access(partner_user, self.firma.pk))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            partnerstwo = Partnerstwo.objects.create(firma1=self.firmy[3], firma2=self.firma)
+        self.assertTrue(self.service.user_has_company_access(user, self.firmy[3].pk))
+        self.assertTrue(self.service.user_has_company_access(partner_user, self.firma.pk))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            partnerstwo.aktywne = False
+            partnerstwo.save()
+        self.assertFalse(self.service.user_has_company_access(user, self.firmy[3].pk))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            partnerstwo.delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            Partnerstwo.objects.create(firma1=self.firmy[3], firma2=self.firma)
+        self.assertTrue(self.service.user_has_company_access(user, self.firmy[3].pk))
+
+        firma_id = self.firma.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            self.firma.delete()
+        self.assertFalse(self.service.user_has_company_access(user, firma_id))
+        self.assertEqual(self.service.get_user_companies(user), [])
@@ -0,0 +1,170 @@
+"""
+Unit tests for multi-page document processing
+
+Tests lazy page iteration, the ordered merge of page results with page-aware
+offsets, the bounded page worker pool and cancellation of remaining pages.
+"""
+
+import io
+import shutil
+import tempfile
+import threading
+import time
+
+from django.test import SimpleTestCase
+from PIL import Image
+
+from ..services.document_pages import count_pages, iter_document_pages, merge_page_texts, page_for_offset
+from ..services.document_processor import DocumentProcessor
+from ..services.optimized_image_preprocessor import PreprocessingCache
+
+
+HEADER_PAGE = "Faktura VAT nr FV/12/2025\nData wystawienia: 15.01.2025\nSprzedawca NIP: 123-456-32-18"
+TOTALS_PAGE = "Razem do zapłaty: 1230,00 zł"
+
+
+def make_tiff(page_count):
+    """Multi-page TIFF whose pixel values encode the page number"""
+    frames = [Image.new('RGB', (8, 8), (number, 0, 0)) for number in range(1, page_count + 1)]
+    output = io.BytesIO()
+    frames[0].save(output, format='TIFF', save_all=True, append_images=frames[1:])
+    return output.getvalue()
+
+
+class FakeEngine:
+    """OCR engine returning canned text per page and tracking concurrency"""
+
+    engine_name = 'fake'
+    is_initialized = True
+    performance_metrics = {}
+
+    def __init__(self, texts, delays=None):
+        self.texts = texts
+        self.delays = delays or {}
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def process_document(self, image_content, mime_type):
+        number = image_content[0]
+        with self._lock:
+            self.calls.append(number)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delays.get(number, 0.01))
+            return {'raw_text': self.texts[number - 1], 'confidence_score': 90.0}
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+class DocumentPagesTest(SimpleTestCase):
+    """Test page iteration and text merging helpers"""
+
+    def test_pages_are_rendered_lazily(self):
+        """Pages are yielded in order and only rasterized when rendered"""
+        content = make_tiff(3)
+
+        pages = list(iter_document_pages(content, 'image/tiff'))
+
+        self.assertEqual(count_pages(content, 'image/tiff'), 3)
+        self.assertEqual([page.number for page in pages], [1, 2, 3])
+        self.assertEqual(pages[2].render().getpixel((0, 0)), (3, 0, 0))
+        self.assertEqual(len(list(iter_document_pages(content, 'image/tiff', max_pages=2))), 2)
+
+    def test_merge_records_page_offsets(self):
+        """Merged text keeps page order and offsets map back to pages"""
+        text, offsets = merge_page_texts(['first', '', 'third'])
+
+        self.assertEqual(text, 'first\nthird')
+        self.assertEqual([(o['start'], o['end']) for o in offsets], [(0, 5), (5, 5), (6, 11)])
+        self.assertEqual(page_for_offset(offsets, 2), 1)
+        self.assertEqual(page_for_offset(offsets, 6), 3)
+        self.assertIsNone(page_for_offset(offsets, 5))
+
+
+class DocumentProcessorPagesTest(SimpleTestCase):
+    """Test page-level fan-out in DocumentProcessor"""
+
+    def _processor(self, engine, **kwargs):
+        processor = DocumentProcessor(
+            enable_performance_optimization=False, enable_caching=False, max_retries=0, **kwargs
+        )
+        processor.image_preprocessor.preprocess_page = lambda image: bytes([image.getpixel((0, 0))[0]])
+        processor.ocr_engines = [engine]
+        processor.is_initialized = True
+        return processor
+
+    def test_all_pages_merged_in_order(self):
+        """Every page is OCR'd and merged in page order even when pages finish out of order"""
+        texts = [HEADER_PAGE, 'Usługa A 1 szt', 'Usługa B 2 szt', TOTALS_PAGE]
+        engine = FakeEngine(texts, delays={1: 0.2, 2: 0.1})
+        processor = self._processor(engine, max_page_workers=4)
+
+        result = processor.process_invoice(make_tiff(4), 'image/tiff')
+
+        self.assertTrue(result.success)
+        self.assertEqual(sorted(engine.calls), [1, 2, 3, 4])
+        merged = result.raw_ocr_results[0]
+        self.assertEqual(merged['raw_text'], '\n'.join(texts))
+        self.assertEqual(merged['page_count'], 4)
+        self.assertEqual(result.extracted_data['field_pages']['numer_faktury'], 1)
+        self.assertEqual(result.extracted_data['field_pages']['total_amount'], 4)
+
+    def test_raw_text_kept_and_fields_mapped_to_pages(self):
+        """The merged text is the engine text; fields map to pages through the preprocessed text"""
+        texts = ['  ' + HEADER_PAGE.replace('\n', '\n\n   '), ' \n\n', 'Usługa   A\t 1 szt\n\n', '\n' + TOTALS_PAGE]
+        processor = self._processor(FakeEngine(texts), max_page_workers=2)
+
+        result = processor.process_invoice(make_tiff(4), 'image/tiff')
+
+        self.assertEqual(result.raw_ocr_results[0]['raw_text'], '\n'.join(texts))
+        self.assertEqual(result.extracted_data['field_pages']['numer_faktury'], 1)
+        self.assertEqual(result.extracted_data['field_pages']['total_amount'], 4)
+
+    def test_page_workers_are_bounded(self):
+        """No more than max_page_workers pages are processed at a time"""
+        engine = FakeEngine([HEADER_PAGE] + ['Pozycja'] * 10 + [TOTALS_PAGE], delays=dict.fromkeys(range(1, 13), 0.05))
+        processor = self._processor(engine, max_page_workers=3)
+
+        processor.process_invoice(make_tiff(12), 'image/tiff')
+
+        self.assertEqual(len(engine.calls), 12)
+        self.assertLessEqual(engine.max_active, 3)
+        self.assertGreater(engine.max_active, 1)
+
+    def test_remaining_pages_cancelled_when_fields_found(self):
+        """Pages after the required header and totals fields are not processed when configured"""
+        texts = [HEADER_PAGE, TOTALS_PAGE] + ['Warunki handlowe'] * 10
+        engine = FakeEngine(texts)
+        processor = self._processor(engine, max_page_workers=1, stop_when_fields_found=True)
+
+        result = processor.process_invoice(make_tiff(12), 'image/tiff')
+
+        ocr_step = result.processing_steps[2]
+        self.assertEqual(engine.calls, [1, 2])
+        self.assertTrue(ocr_step.metadata['stopped_early'])
+        self.assertEqual(ocr_step.metadata['pages_skipped'], 10)
+        self.assertIn('total_amount', result.extracted_data['extracted_fields'])
+
+    def test_preprocessed_pages_read_from_cache(self):
+        """Processing a document again reads its preprocessed pages from the preprocessing cache"""
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        engine = FakeEngine([HEADER_PAGE, TOTALS_PAGE])
+        processor = self._processor(engine, max_page_workers=2)
+        processor.image_preprocessor.cache = PreprocessingCache(cache_dir=cache_dir)
+        preprocessed = []
+        preprocess_page = processor.image_preprocessor.preprocess_page
+        processor.image_preprocessor.preprocess_page = lambda image: preprocessed.append(image) or preprocess_page(image)
+        content = make_tiff(2)
+
+        first = processor.process_invoice(content, 'image/tiff')
+        second = processor.process_invoice(content, 'image/tiff')
+
+        self.assertEqual(len(preprocessed), 2)
+        self.assertEqual(sorted(engine.calls), [1, 1, 2, 2])
+        self.assertEqual(second.raw_ocr_results[0]['raw_text'], first.raw_ocr_results[0]['raw_text'])
+        self.assertEqual(processor.image_preprocessor.cache.get_stats()['hits'], 2)
@@ -0,0 +1,213 @@
+"""
+Unit tests for batched Faktura creation from OCR results
+
+Tests that create_many_from_ocr creates the same invoices as create_from_ocr,
+shares kontrahent lookups across the batch, reports failed results and runs
+a number of queries that does not grow with the number of line items.
+"""
+
+import datetime
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from ..models import DocumentUpload, Faktura, Firma, Kontrahent, OCRResult
+from ..services.calendar_feed import calendar_etag
+from ..services.ocr_integration import FakturaCreator
+
+
+def invoice_data(number, nip='1234563218', nazwa='Dostawca Sp. z o.o.', lines=2):
+    return {
+        'numer_faktury': number,
+        'data_wystawienia': '2025-01-15',
+        'data_sprzedazy': '2025-01-15',
+        'sprzedawca_nazwa': nazwa,
+        'sprzedawca_nip': nip,
+        'sprzedawca_ulica': 'Dostawcza',
+        'sprzedawca_numer_domu': '10',
+        'sprzedawca_kod_pocztowy': '11-111',
+        'sprzedawca_miejscowosc': 'Kraków',
+        'pozycje': [
+            {'nazwa': f'Usługa {i}', 'ilosc': '2', 'jednostka': 'szt', 'cena_netto': '50,00', 'vat': '23'}
+            for i in range(1, lines + 1)
+        ],
+    }
+
+
+def statement_count(queries):
+    """Queries run, without the savepoint statements of the test case transaction"""
+    return sum(1 for query in queries.captured_queries if not query['sql'].startswith(('SAVEPOINT', 'RELEASE')))
+
+
+class FakturaCreatorBatchTest(TestCase):
+    """Test create_many_from_ocr"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='batchuser', password='testpass123')
+        self.firma = Firma.objects.create(
+            user=self.user, nazwa='Nasza Firma', nip='9876543210', ulica='Główna',
+            numer_domu='1', kod_pocztowy='00-001', miejscowosc='Warszawa'
+        )
+
+    def _ocr_results(self, payloads, confidence=95.0):
+        # bulk_create skips the upload and OCR result signals that would start processing
+        documents = DocumentUpload.objects.bulk_create([
+            DocumentUpload(user=self.user, original_filename=f'doc{i}.pdf', file_path=f'/tmp/doc{i}.pdf',
+                           file_size=1, content_type='application/pdf', processing_status='processing')
+            for i in range(len(payloads))
+        ])
+        OCRResult.objects.bulk_create([
+            OCRResult(document=document, raw_text='...', extracted_data=data, confidence_score=confidence,
+                      processing_time=1.5, processing_status='processing')
+            for document, data in zip(documents, payloads)
+        ])
+        return list(OCRResult.objects.filter(document__in=documents).order_by('pk'))
+
+    def _creator(self):
+        return FakturaCreator(User.objects.get(pk=self.user.pk))
+
+    def test_batch_creates_same_invoices_as_single_path(self):
+        """Invoices, positions, OCR links and document status match create_from_ocr"""
+        single_result, batch_result = self._ocr_results([invoice_data('FV/1/2025'), invoice_data('FV/2/2025')])
+
+        single = self._creator().create_from_ocr(single_result)
+        outcome = self._creator().create_many_from_ocr([batch_result])
+
+        self.assertEqual(outcome['failed'], [])
+        batch = Faktura.objects.get(pk=outcome['created'][0].pk)
+        single.refresh_from_db()
+        for field in ('typ_faktury', 'status', 'waluta', 'data_wystawienia', 'termin_platnosci',
+                      'sprzedawca_id', 'nabywca_id', 'ocr_confidence', 'manual_verification_required', 'uwagi'):
+            self.assertEqual(getattr(batch, field), getattr(single, field), field)
+        self.assertEqual(batch.source_document_id, batch_result.document_id)
+        self.assertEqual(
+            list(batch.pozycjafaktury_set.order_by('pk').values_list('nazwa', 'ilosc', 'cena_netto', 'vat')),
+            list(single.pozycjafaktury_set.order_by('pk').values_list('nazwa', 'ilosc', 'cena_netto', 'vat')),
+        )
+
+        batch_result.refresh_from_db()
+        self.assertEqual(batch_result.faktura_id, batch.pk)
+        self.assertTrue(batch_result.auto_created_faktura)
+        self.assertEqual(batch_result.processing_status, 'completed')
+        self.assertEqual(batch_result.document.processing_status, 'completed')
+        self.assertIsNotNone(batch_result.document.processing_completed_at)
+
+    def test_kontrahent_lookups_shared_across_batch(self):
+        """Existing kontrahenci are reused and repeated new sellers share one kontrahent"""
+        existing = Kontrahent.objects.create(
+            user=self.user, nazwa='Stary Dostawca', nip='1234563218', ulica='Stara',
+            numer_domu='5', kod_pocztowy='', miejscowosc='Łódź'
+        )
+        results = self._ocr_results([
+            invoice_data('FV/1/2025'),
+            invoice_data('FV/2/2025', nip='5260001246', nazwa='Nowy Dostawca S.A.'),
+            invoice_data('FV/3/2025', nip='526-000-12-46', nazwa='Nowy Dostawca S.A.'),
+        ])
+
+        faktury = self._creator().create_many_from_ocr(results)['created']
+
+        existing.refresh_from_db()
+        self.assertEqual(faktury[0].nabywca, existing)
+        self.assertEqual(existing.kod_pocztowy, '11-111')  # empty field filled from OCR data
+        self.assertEqual(existing.nazwa, 'Stary Dostawca')
+        self.assertEqual(faktury[1].nabywca_id, faktury[2].nabywca_id)
+        self.assertEqual(Kontrahent.objects.filter(user=self.user).count(), 2)
+
+    def test_failed_results_reported_without_blocking_batch(self):
+        """Results failing validation are marked failed and the rest of the batch is created"""
+        invalid = invoice_data('FV/2/2025')
+        del invalid['numer_faktury']
+        valid_result, invalid_result = self._ocr_results([invoice_data('FV/1/2025'), invalid])
+        invalid_result.confidence_score = 60.0  # below the standard strategy threshold
+
+        outcome = self._creator().create_many_from_ocr([valid_result, invalid_result])
+
+        self.assertEqual([faktura.numer for faktura in outcome['created']], ['FV/1/2025'])
+        self.assertEqual([entry['ocr_result_id'] for entry in outcome['failed']], [invalid_result.pk])
+        invalid_result.refresh_from_db()
+        self.assertEqual(invalid_result.processing_status, 'failed')
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_batch_changes_calendar_etag(self):
+        """Bulk-created invoices invalidate the calendar ETags of the user once committed"""
+        results = self._ocr_results([invoice_data('FV/1/2025'), invoice_data('FV/2/2025')])
+        window = (datetime.date(2025, 1, 1), datetime.date(2025, 1, 31))
+        etag = calendar_etag(self.user.pk, 'data', *window)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            outcome = self._creator().create_many_from_ocr(results)
+
+        self.assertEqual(len(outcome['created']), 2)
+        self.assertNotEqual(calendar_etag(self.user.pk, 'data', *window), etag)
+
+    def test_ocr_vat_rates_stored_as_choices(self):
+        """OCR rates like '23%' are stored as VAT choices, so gross totals agree in Python and SQL"""
+        data = invoice_data('FV/1/2025', lines=4)
+        for pozycja, vat in zip(data['pozycje'], ['23%', '8 %', '', 'ZW']):
+            pozycja['vat'] = vat
+        result = self._ocr_results([data])[0]
+
+        faktura = self._creator().create_many_from_ocr([result])['created'][0]
+
+        positions = faktura.pozycjafaktury_set.order_by('pk')
+        self.assertEqual(list(positions.values_list('vat', flat=True)), ['23', '8', '23', 'zw'])
+        gross_total = Faktura.objects.with_gross_total().get(pk=faktura.pk).gross_total
+        self.assertEqual(gross_total, faktura.suma_brutto)
+        self.assertEqual(abs(gross_total), Decimal('454.00'))
+
+    def test_batch_stamps_invoices_and_updated_sellers(self):
+        """Invoices are touched after their positions are bulk created and completed sellers get a new stamp"""
+        seller = Kontrahent.objects.create(user=self.user, nazwa='Dostawca Sp. z o.o.', nip='1234563218',
+                                           ulica='', numer_domu='', kod_pocztowy='', miejscowosc='')
+        stamp = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+        Kontrahent.objects.filter(pk=seller.pk).update(updated_at=stamp)
+        result, = self._ocr_results([invoice_data('FV/1/2025')])
+
+        with CaptureQueriesContext(connection) as queries:
+            outcome = self._creator().create_many_from_ocr([result])
+
+        statements = [query['sql'] for query in queries.captured_queries]
+        positions = next(i for i, sql in enumerate(statements) if sql.startswith('INSERT INTO "faktury_pozycjafaktury"'))
+        touch = next(i for i, sql in enumerate(statements) if sql.startswith('UPDATE "faktury_faktura" SET "updated_at"'))
+        self.assertGreater(touch, positions)
+        self.assertEqual(Faktura.objects.get(pk=outcome['created'][0].pk).updated_at, outcome['created'][0].updated_at)
+
+        seller.refresh_from_db()
+        self.assertEqual(seller.miejscowosc, 'Kraków')
+        self.assertGreater(seller.updated_at, stamp)
+
+    def test_query_count_independent_of_line_items(self):
+        """A batch runs the same queries for 1 and 60 line items, at most 9 per invoice"""
+        counts = {}
+        for lines in (1, 60):
+            results = self._ocr_results([
+                invoice_data(f'FV/{lines}/{i}/2025', nip=f'52600012{i:02d}', nazwa=f'Dostawca {lines}-{i}', lines=lines)
+                for i in range(10)
+            ])
+            creator = self._creator()
+            with CaptureQueriesContext(connection) as queries:
+                outcome = creator.create_many_from_ocr(results)
+            self.assertEqual(len(outcome['created']), 10)
+            counts[lines] = statement_count(queries)
+
+        positions = Faktura.objects.get(numer='FV/60/0/2025').pozycjafaktury_set
+        self.assertEqual(positions.count(), 60)
+        self.assertEqual(positions.first().cena_netto, Decimal('50.00'))
+        # SQLite splits the 600 position rows into several INSERTs of at most 999 parameters
+        self.assertLessEqual(counts[60] - counts[1], 8)
+        self.assertLessEqual(counts[60], 9 * 10)
+
+        single_counts = []
+        for lines in (1, 60):
+            result = self._ocr_results([invoice_data(f'FV/single/{lines}', nip=f'52600013{lines:02d}',
+                                                     nazwa=f'Jedyny {lines}', lines=lines)])[0]
+            creator = self._creator()
+            with CaptureQueriesContext(connection) as queries:
+                creator.create_many_from_ocr([result])
+            single_counts.append(statement_count(queries))
+        self.assertEqual(single_counts[0], single_counts[1])
+        # Includes the updated_at touch after the positions are bulk created
+        self.assertLessEqual(single_counts[1], 9)
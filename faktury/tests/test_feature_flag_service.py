@@ -0,0 +1,89 @@
+"""
+Unit tests for Feature Flag Service
+
+Tests in-memory flag snapshots, versioned refresh and rollout evaluation.
+"""
+
+from unittest.mock import patch
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase
+
+from ..services.feature_flag_service import FeatureFlagService
+
+
+class FeatureFlagSnapshotTest(SimpleTestCase):
+    """Test feature flag snapshot evaluation"""
+
+    def setUp(self):
+        self.cache = LocMemCache('test_feature_flags', {})
+        self.cache.clear()
+        self.service = FeatureFlagService(cache_backend=self.cache, refresh_interval=60)
+        self.service.all_flags = {
+            'FLAG_ON': {'enabled': True, 'rollout_percentage': 100},
+            'FLAG_OFF': {'enabled': False, 'rollout_percentage': 100},
+            'FLAG_HALF': {'enabled': True, 'rollout_percentage': 50},
+        }
+
+    def test_snapshot_loaded_once(self):
+        """Repeated checks reuse the snapshot without reloading"""
+        with patch.object(self.service, '_load_snapshot', wraps=self.service._load_snapshot) as load:
+            for user_id in range(20):
+                self.service.get_user_flags(user_id=user_id)
+                self.service.is_flag_enabled('FLAG_ON', user_id=user_id)
+
+        self.assertEqual(load.call_count, 1)
+
+    def test_flags_evaluated(self):
+        """Enabled, disabled and unknown flags are evaluated"""
+        self.assertTrue(self.service.is_flag_enabled('FLAG_ON', user_id=1))
+        self.assertFalse(self.service.is_flag_enabled('FLAG_OFF', user_id=1))
+        self.assertFalse(self.service.is_flag_enabled('UNKNOWN', user_id=1))
+
+    def test_rollout_matches_user_hash(self):
+        """Percentage rollout uses the same user hashing as before"""
+        for user_id in range(50):
+            self.assertEqual(
+                self.service.is_flag_enabled('FLAG_HALF', user_id=user_id),
+                self.service.is_user_in_rollout(user_id, 50)
+            )
+            self.assertEqual(
+                self.service.get_user_flags(user_id=user_id)['FLAG_HALF'],
+                self.service.is_user_in_rollout(user_id, 50)
+            )
+
+    def test_partial_rollout_without_user(self):
+        """Partial rollouts are disabled without a user"""
+        self.assertFalse(self.service.is_flag_enabled('FLAG_HALF'))
+        self.assertTrue(self.service.is_flag_enabled('FLAG_ON'))
+
+    def test_version_bump_refreshes_other_processes(self):
+        """A bumped version makes other instances reload after the interval"""
+        other = FeatureFlagService(cache_backend=self.cache, refresh_interval=0)
+        other.all_flags = self.service.all_flags
+        first = other.get_snapshot()
+
+        self.assertIs(other.get_snapshot(), first)
+
+        self.service.bump_version()
+
+        self.assertIsNot(other.get_snapshot(), first)
+
+    def test_refresh_interval_limits_version_checks(self):
+        """The version key is read at most once per interval"""
+        self.service.get_snapshot()
+        with patch.object(self.cache, 'get', wraps=self.cache.get) as cache_get:
+            for _ in range(10):
+                self.service.get_snapshot()
+
+        cache_get.assert_not_called()
+
+    def test_snapshot_is_immutable(self):
+        """Snapshot configurations cannot be modified in place"""
+        snapshot = self.service.get_snapshot()
+
+        with self.assertRaises(TypeError):
+            snapshot.flags['FLAG_ON']['enabled'] = False
+
+        self.service.get_flag_config('FLAG_ON')['enabled'] = False
+        self.assertTrue(self.service.is_flag_enabled('FLAG_ON', user_id=1))
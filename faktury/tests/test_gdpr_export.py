@@ -0,0 +1,176 @@
+"""
+Unit tests for the streaming GDPR data export
+
+Tests bounded memory use, resumption from checkpoints and the contents of
+exports written from the database.
+"""
+
+import csv
+import io
+import json
+import shutil
+import tempfile
+import tracemalloc
+import zipfile
+from pathlib import Path
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from ..models import DocumentUpload, Faktura, Firma, Kontrahent, PozycjaFaktury
+from ..services.gdpr_data_service import GDPRDataService, GDPRExportWriter, export_path
+
+
+def fake_rows(count, fail_after=None):
+    """Build a fetch callable yielding synthetic invoice rows"""
+    def fetch(last_pk):
+        for pk in range((last_pk or 0) + 1, count + 1):
+            if fail_after is not None and pk > fail_after:
+                raise ConnectionError('database connection lost')
+            yield {'id': pk, 'numer': f'FV/{pk}/2025', 'uwagi': 'x' * 200, 'extracted': {'pk': pk}}
+    return fetch
+
+
+def read_jsonl_ids(archive, section):
+    ids = []
+    for name in sorted(n for n in archive.namelist() if n.startswith(f'{section}/')):
+        with archive.open(name) as entry:
+            ids.extend(json.loads(line)['id'] for line in io.TextIOWrapper(entry, encoding='utf-8'))
+    return ids
+
+
+class GDPRExportWriterTest(SimpleTestCase):
+    """Test streaming export archive writer"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = Path(self.tmp_dir) / 'export.zip'
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _peak_memory(self, rows):
+        path = Path(self.tmp_dir) / f'export_{rows}.zip'
+        tracemalloc.start()
+        try:
+            with GDPRExportWriter(path, part_rows=5000) as writer:
+                writer.write_rows('invoices', fake_rows(rows), ['id', 'numer', 'uwagi', 'extracted'])
+                writer.finish('README')
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def test_peak_memory_is_flat(self):
+        """Peak memory does not grow with the number of exported rows"""
+        small = self._peak_memory(1000)
+        large = self._peak_memory(200000)
+
+        self.assertLess(large, small * 1.5)
+
+    def test_resume_after_interruption(self):
+        """An interrupted export resumes after its last checkpoint without duplicates"""
+        with self.assertRaises(ConnectionError):
+            with GDPRExportWriter(self.path, part_rows=100) as writer:
+                writer.write_rows('invoices', fake_rows(1000, fail_after=450), ['id'])
+
+        writer = GDPRExportWriter(self.path, part_rows=100)
+        self.assertTrue(writer.resumed)
+        self.assertEqual(writer.sections['invoices']['last_pk'], 400)
+        writer.write_rows('invoices', fake_rows(1000), ['id'])
+        writer.finish('README')
+
+        with zipfile.ZipFile(self.path) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertEqual(read_jsonl_ids(archive, 'invoices'), list(range(1, 1001)))
+        self.assertFalse(writer.checkpoint_path.exists())
+
+    def test_completed_sections_are_skipped(self):
+        """Sections finished before an interruption are not fetched again"""
+        with self.assertRaises(ConnectionError):
+            with GDPRExportWriter(self.path) as writer:
+                writer.write_rows('contractors', fake_rows(10), ['id'])
+                writer.write_rows('invoices', fake_rows(10, fail_after=5), ['id'])
+
+        with GDPRExportWriter(self.path) as writer:
+            self.assertEqual(writer.write_rows('contractors', fake_rows(0), ['id']), 10)
+            writer.write_rows('invoices', fake_rows(10), ['id'])
+            self.assertEqual(writer.finish('README'), {'contractors': 10, 'invoices': 10})
+
+    def test_csv_parts(self):
+        """CSV parts have a header row and JSON-encoded nested values"""
+        with GDPRExportWriter(self.path, part_rows=2) as writer:
+            writer.write_rows('invoices', fake_rows(3), ['id', 'numer', 'extracted'], format='csv')
+            writer.finish('README')
+
+        with zipfile.ZipFile(self.path) as archive:
+            self.assertEqual(
+                sorted(archive.namelist()),
+                ['README.txt', 'invoices/invoices_0001.csv', 'invoices/invoices_0002.csv']
+            )
+            rows = list(csv.DictReader(io.StringIO(archive.read('invoices/invoices_0002.csv').decode('utf-8'))))
+
+        self.assertEqual(rows, [{'id': '3', 'numer': 'FV/3/2025', 'extracted': '{"pk": 3}'}])
+
+    def test_export_path_rejects_foreign_names(self):
+        """Export names cannot escape the user's directory"""
+        with self.assertRaises(ValueError):
+            export_path(1, '../2/gdpr_export_x.zip')
+
+        name = 'gdpr_export_' + 'a' * 32 + '.zip'
+        self.assertEqual(export_path(1, name).parts[-2:], ('1', name))
+
+
+class GDPRDataServiceExportTest(TestCase):
+    """Test GDPR export of database records"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.user = User.objects.create_user(username='gdpruser', email='gdpr@example.com', password='testpass123')
+        firma = Firma.objects.create(
+            user=self.user, nazwa='Test Company', nip='9876543210', ulica='Test Street',
+            numer_domu='1', kod_pocztowy='00-000', miejscowosc='Test City'
+        )
+        kontrahent = Kontrahent.objects.create(
+            user=self.user, nazwa='Test Kontrahent', nip='1234567890', ulica='Other Street',
+            numer_domu='2', kod_pocztowy='11-111', miejscowosc='Other City'
+        )
+        faktura = Faktura.objects.create(
+            user=self.user, sprzedawca=firma, nabywca=kontrahent, numer='FV/1/2025',
+            data_sprzedazy=timezone.now().date(), termin_platnosci=timezone.now().date(),
+            miejsce_wystawienia='Test City'
+        )
+        PozycjaFaktury.objects.create(
+            faktura=faktura, nazwa='Usługa', ilosc=1, jednostka='szt', cena_netto='100.00', vat='23'
+        )
+
+        document = Path(self.tmp_dir) / 'scan.pdf'
+        document.write_bytes(b'%PDF-1.4 test')
+        with patch('faktury.tasks.process_document_ocr_task.delay'):
+            self.upload = DocumentUpload.objects.create(
+                user=self.user, original_filename='scan.pdf', file_path=str(document),
+                file_size=13, content_type='application/pdf'
+            )
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_export_user_data(self):
+        """All sections and uploaded documents are written to the archive"""
+        path = Path(self.tmp_dir) / 'export.zip'
+
+        export_info = GDPRDataService().export_user_data(self.user, path=path)
+
+        self.assertEqual(export_info['rows']['invoices'], 1)
+        self.assertEqual(export_info['rows']['invoice_items'], 1)
+        self.assertEqual(export_info['rows']['documents'], 1)
+        with zipfile.ZipFile(path) as archive:
+            personal = json.loads(archive.read('personal_data.json'))
+            invoice = json.loads(archive.read('invoices/invoices_0001.jsonl'))
+            document = archive.read(f'documents/{self.upload.pk}_scan.pdf')
+
+        self.assertEqual(personal['user_account']['email'], 'gdpr@example.com')
+        self.assertEqual(personal['company']['nazwa'], 'Test Company')
+        self.assertEqual(invoice['numer'], 'FV/1/2025')
+        self.assertEqual(document, b'%PDF-1.4 test')
@@ -0,0 +1,153 @@
+"""
+Unit tests for the inbox feeds and unread counters
+
+Tests that keyset pages walk a tab once with timestamp ties, that a page
+with reply counts is one query, that cached unread counters follow saves,
+deletes and bulk updates without counting, and that reconciliation
+repairs drifted counters.
+"""
+
+import json
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from ..models import Wiadomosc
+from ..notifications.models import Notification
+from ..services.inbox import inbox_page, mark_read
+from ..services.unread_counters import (
+    MESSAGES, NOTIFICATIONS, get_unread_count, get_unread_counts, reconcile_unread_counters, unread_key
+)
+from ..views_modules.notification_views import lista_wiadomosci, unread_notifications_count
+
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def messages(odbiorca, autor, count, typ='partner'):
+    """Bulk created unread messages, groups of three sharing a timestamp"""
+    rows = Wiadomosc.objects.bulk_create([
+        Wiadomosc(autor=autor, odbiorca_user=odbiorca, temat=f'Temat {i}', tresc='Treść', typ_wiadomosci=typ)
+        for i in range(count)
+    ])
+    now = timezone.now().replace(microsecond=0)
+    for i, row in enumerate(rows):
+        Wiadomosc.objects.filter(pk=row.pk).update(data_wyslania=now - timezone.timedelta(seconds=i // 3))
+    return rows
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class InboxFeedTest(TestCase):
+    """Test keyset pages of the tab feeds"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='odbiorca')
+        self.partner = User.objects.create_user(username='partner')
+        self.rows = messages(self.user, self.partner, 23)
+        messages(self.user, None, 4, typ='system')
+        messages(self.partner, self.user, 2)
+
+    def test_pages_cover_tab_once(self):
+        """Following next_cursor returns every message of the tab once, newest first"""
+        seen, cursor, pages = [], None, 0
+        while True:
+            page = inbox_page(self.user, 'partner', cursor, page_size=5)
+            seen += [wiadomosc.pk for wiadomosc in page.messages]
+            pages += 1
+            if not page.next_cursor:
+                break
+            cursor = page.next_cursor
+
+        expected = Wiadomosc.objects.filter(odbiorca_user=self.user, typ_wiadomosci='partner')
+        self.assertEqual(seen, list(expected.order_by('-data_wyslania', '-id').values_list('pk', flat=True)))
+        self.assertEqual(pages, 5)
+        self.assertEqual(len(inbox_page(self.user, 'system').messages), 4)
+        self.assertEqual(len(inbox_page(self.user, 'wyslane').messages), 2)
+
+    def test_page_with_reply_counts_is_one_query(self):
+        """Reply counts and authors come with the page instead of a query per row"""
+        parent = self.rows[0]
+        Wiadomosc.objects.bulk_create([
+            Wiadomosc(autor=self.user, odbiorca_user=self.partner, temat='Re', tresc='', wiadomosc_nadrzedna=parent)
+            for _ in range(3)
+        ])
+
+        with self.assertNumQueries(1):
+            page = inbox_page(self.user, 'partner', page_size=10)
+            counts = {wiadomosc.pk: (wiadomosc.replies_count, wiadomosc.autor.username) for wiadomosc in page.messages}
+        self.assertEqual(counts[parent.pk], (3, 'partner'))
+        self.assertEqual(counts[self.rows[1].pk], (0, 'partner'))
+
+    def test_invalid_cursor_and_tab(self):
+        """Cursors that do not decode and unknown tabs are rejected"""
+        for tab, cursor in (('partner', 'not-a-cursor'), ('archiwum', None)):
+            with self.subTest(tab=tab), self.assertRaises(ValueError):
+                inbox_page(self.user, tab, cursor)
+
+    def test_list_view_marks_only_shown_page_read(self):
+        """The list reads a bounded page and leaves older messages unread"""
+        request = RequestFactory().get('/', {'tab': 'partner'})
+        request.user = self.user
+        get_unread_count(self.user.pk, MESSAGES)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = lista_wiadomosci(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Wiadomosc.objects.filter(odbiorca_user=self.user, przeczytana=False).count(), 27 - 20)
+        self.assertEqual(get_unread_count(self.user.pk, MESSAGES), 7)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class UnreadCountersTest(TestCase):
+    """Test cached unread counters of messages and notifications"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='licznik')
+        messages(self.user, None, 3)
+
+    def test_counters_follow_changes_without_counting(self):
+        """Stored counters are read and adjusted without COUNT queries"""
+        self.assertEqual(get_unread_counts(self.user.pk), {MESSAGES: 3, NOTIFICATIONS: 0})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            wiadomosc = Wiadomosc.objects.create(odbiorca_user=self.user, temat='Nowa', tresc='', typ_wiadomosci='partner')
+            notification = Notification.objects.create(user=self.user, title='Nowe', content='')
+        with self.assertNumQueries(0):
+            self.assertEqual(get_unread_counts(self.user.pk), {MESSAGES: 4, NOTIFICATIONS: 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Wiadomosc.objects.get(pk=wiadomosc.pk).mark_as_read()
+            Notification.objects.get(pk=notification.pk).mark_as_read()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(mark_read(self.user, Wiadomosc.objects.filter(przeczytana=False).values_list('pk', flat=True)[:2]), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            Wiadomosc.objects.filter(przeczytana=False).get().delete()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_unread_counts(self.user.pk), {MESSAGES: 0, NOTIFICATIONS: 0})
+
+    def test_count_endpoint(self):
+        """The count endpoint answers from the cache"""
+        request = RequestFactory().get('/')
+        request.user = self.user
+        Notification.objects.create(user=self.user, title='a', content='')
+        unread_notifications_count(request)
+
+        with self.assertNumQueries(0):
+            response = unread_notifications_count(request)
+        self.assertEqual(json.loads(response.content), {'count': 1})
+
+    def test_reconcile_repairs_drift(self):
+        """Reconciliation rewrites wrong and missing counters"""
+        other = User.objects.create_user(username='inny')
+        cache.set(unread_key(MESSAGES, self.user.pk), 42, None)
+
+        with self.assertNumQueries(3):
+            self.assertEqual(reconcile_unread_counters(batch_size=10), 2)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_unread_counts(self.user.pk), {MESSAGES: 3, NOTIFICATIONS: 0})
+            self.assertEqual(get_unread_count(other.pk, MESSAGES), 0)
@@ -0,0 +1,198 @@
+"""
+Unit tests for bulk invoice corrections and duplicates
+
+Tests that clones copy invoices and positions with numbers continuing the
+month's sequence, that a batch costs the same number of queries however
+many invoices it holds, that auto-accounting to partners runs after
+commit, and that the admin actions hand large selections to Celery.
+"""
+
+import datetime
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.admin.sites import AdminSite
+from django.contrib.auth.models import User
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from ..admin import FakturaAdmin
+from ..models import Faktura, Firma, Kontrahent, Partnerstwo, PozycjaFaktury
+from ..services.invoice_cloning import DUPLIKAT, KOREKTA, allocate_numbers, clone_invoices
+
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def firma(user, nip):
+    return Firma.objects.create(
+        user=user, nazwa=f'Firma {nip}', nip=nip, ulica='Testowa', numer_domu='1',
+        kod_pocztowy='00-001', miejscowosc='Warszawa'
+    )
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class InvoiceCloningTest(TestCase):
+    """Test cloning invoices in bulk"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='wystawca')
+        self.firma = firma(self.user, '1111111111')
+        self.kontrahent = Kontrahent.objects.create(
+            user=self.user, nazwa='Nabywca', nip='2222222222', ulica='Inna', numer_domu='2',
+            kod_pocztowy='11-111', miejscowosc='Kraków'
+        )
+
+    def _faktury(self, count, positions=3, kontrahent=None):
+        today = datetime.date.today()
+        faktury = Faktura.objects.bulk_create([
+            Faktura(
+                user=self.user, sprzedawca=self.firma, nabywca=kontrahent or self.kontrahent,
+                numer=f'FV/{i + 1:02d}/{today.month:02d}/{today.year}', data_sprzedazy=today,
+                termin_platnosci=today, miejsce_wystawienia='Warszawa', status='oplacona', uwagi=f'Faktura {i}'
+            )
+            for i in range(count)
+        ])
+        PozycjaFaktury.objects.bulk_create([
+            PozycjaFaktury(faktura=faktura, nazwa=f'Usługa {j}', ilosc=Decimal('2'), jednostka='szt',
+                           cena_netto=Decimal('10.50'), vat='23')
+            for faktura in faktury for j in range(positions)
+        ])
+        return faktury
+
+    def test_corrections_copy_invoice_and_positions(self):
+        """Corrections point to their source and get consecutive KOR numbers"""
+        today = datetime.date.today()
+        faktury = self._faktury(3)
+        Faktura.objects.bulk_create([Faktura(
+            user=self.user, sprzedawca=self.firma, nabywca=self.kontrahent, typ_dokumentu='KOR',
+            numer=f'KOR/07/{today.month:02d}/{today.year}', data_sprzedazy=today, termin_platnosci=today,
+            miejsce_wystawienia='Warszawa'
+        )])
+
+        clones = clone_invoices([faktura.pk for faktura in faktury], KOREKTA)
+
+        self.assertEqual(
+            [korekta.numer for korekta in clones],
+            [f'KOR/{n:02d}/{today.month:02d}/{today.year}' for n in (8, 9, 10)]
+        )
+        for zrodlo, korekta in zip(faktury, clones):
+            korekta = Faktura.objects.get(pk=korekta.pk)
+            self.assertEqual(korekta.typ_dokumentu, 'KOR')
+            self.assertEqual(korekta.dokument_podstawowy_id, zrodlo.pk)
+            self.assertEqual((korekta.uwagi, korekta.status), (zrodlo.uwagi, 'wystawiona'))
+            self.assertEqual(
+                list(korekta.pozycjafaktury_set.order_by('pk').values_list('nazwa', 'ilosc', 'cena_netto')),
+                list(zrodlo.pozycjafaktury_set.order_by('pk').values_list('nazwa', 'ilosc', 'cena_netto'))
+            )
+
+    def test_duplicates_continue_sequence_across_batches(self):
+        """Duplicates keep the document type and numbers stay unique between batches"""
+        today = datetime.date.today()
+        faktury = self._faktury(5)
+
+        clones = clone_invoices(faktury, DUPLIKAT, batch_size=2)
+
+        self.assertEqual(
+            [duplikat.numer for duplikat in clones],
+            [f'FV/{n:02d}/{today.month:02d}/{today.year}' for n in range(6, 11)]
+        )
+        self.assertTrue(all(duplikat.dokument_podstawowy_id is None for duplikat in clones))
+        self.assertEqual(PozycjaFaktury.objects.filter(faktura__in=clones).count(), 15)
+
+    def test_queries_are_constant_per_batch(self):
+        """A batch costs the same queries for 2 or 20 invoices"""
+        small = self._faktury(2, positions=2)
+        large = self._faktury(20, positions=5)
+
+        # savepoint, sources, numbers, positions, invoice insert, position insert
+        with self.assertNumQueries(7):
+            clone_invoices(small, KOREKTA)
+        with self.assertNumQueries(7):
+            clone_invoices(large, KOREKTA)
+        with self.assertNumQueries(12):
+            clone_invoices(large, DUPLIKAT, batch_size=10)
+
+    def test_partner_auto_accounting_after_commit(self):
+        """Clones sold to a partner company with auto-accounting are copied to the partner"""
+        partner_user = User.objects.create_user(username='partner')
+        partner_firma = firma(partner_user, '3333333333')
+        Partnerstwo.objects.create(firma1=self.firma, firma2=partner_firma, auto_ksiegowanie=True)
+        kontrahent = Kontrahent.objects.create(
+            user=self.user, nazwa='Partner', nip='3333333333', ulica='Inna', numer_domu='3',
+            kod_pocztowy='11-111', miejscowosc='Kraków', firma=partner_firma
+        )
+        faktury = self._faktury(2, kontrahent=kontrahent) + self._faktury(1)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            clones = clone_invoices(faktury, KOREKTA)
+            self.assertFalse(Faktura.objects.filter(user=partner_user).exists())
+
+        mirrored = Faktura.objects.filter(user=partner_user, typ_faktury='koszt')
+        self.assertEqual(sorted(mirrored.values_list('numer', flat=True)), sorted(c.numer for c in clones[:2]))
+        self.assertEqual(PozycjaFaktury.objects.filter(faktura__in=mirrored).count(), 6)
+        self.assertGreaterEqual(len(callbacks), 2)
+
+    def test_allocate_numbers_skips_unparsed_numbers(self):
+        """Numbers that do not follow the pattern still count towards the sequence"""
+        today = datetime.date.today()
+        self._faktury(1)
+        Faktura.objects.filter(user=self.user).update(numer='WLASNY-1')
+        Faktura.objects.bulk_create([Faktura(
+            user=self.user, sprzedawca=self.firma, nabywca=self.kontrahent, numer='WLASNY-2',
+            data_sprzedazy=today, termin_platnosci=today, miejsce_wystawienia='Warszawa'
+        )])
+
+        numbers = allocate_numbers({(self.user.pk, 'FV'): 2}, today)
+        self.assertEqual(list(numbers[self.user.pk, 'FV']), [
+            f'FV/03/{today.month:02d}/{today.year}', f'FV/04/{today.month:02d}/{today.year}'
+        ])
+
+    def test_unknown_mode(self):
+        """Only corrections and duplicates are supported"""
+        with self.assertRaises(ValueError):
+            clone_invoices([], 'archiwum')
+
+
+@override_settings(CACHES=LOCMEM_CACHES, INVOICE_CLONING_CONFIG={'async_threshold': 2})
+class FakturaAdminCloneActionTest(TestCase):
+    """Test the correction admin action"""
+
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(username='admin', password='x')
+        self.user = User.objects.create_user(username='wlasciciel')
+        sprzedawca = firma(self.user, '4444444444')
+        kontrahent = Kontrahent.objects.create(
+            user=self.user, nazwa='Nabywca', nip='5555555555', ulica='Inna', numer_domu='2',
+            kod_pocztowy='11-111', miejscowosc='Kraków'
+        )
+        today = timezone.now().date()
+        for i in range(3):
+            Faktura.objects.create(
+                user=self.user, sprzedawca=sprzedawca, nabywca=kontrahent, numer=f'FV/{i}/X',
+                data_sprzedazy=today, termin_platnosci=today, miejsce_wystawienia='Warszawa'
+            )
+        self.admin = FakturaAdmin(Faktura, AdminSite())
+
+    def _request(self):
+        request = RequestFactory().post('/')
+        request.user = self.admin_user
+        request.session = {}
+        request._messages = FallbackStorage(request)
+        return request
+
+    def test_action_corrects_every_selected_invoice(self):
+        """Every invoice of a small selection gets a correction"""
+        self.admin.stworz_korekte(self._request(), Faktura.objects.filter(pk__in=Faktura.objects.order_by('pk')[:2]))
+        self.assertEqual(Faktura.objects.filter(typ_dokumentu='KOR').count(), 2)
+
+    def test_large_selection_goes_to_celery(self):
+        """Selections above the threshold are cloned by a task"""
+        with patch('faktury.tasks.clone_invoices_task.delay') as mock_delay:
+            self.admin.stworz_korekte(self._request(), Faktura.objects.all())
+
+        ids = sorted(Faktura.objects.values_list('pk', flat=True))
+        mock_delay.assert_called_once()
+        self.assertEqual(sorted(mock_delay.call_args[0][1]), ids)
+        self.assertFalse(Faktura.objects.filter(typ_dokumentu='KOR').exists())
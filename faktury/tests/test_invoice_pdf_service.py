@@ -0,0 +1,166 @@
+"""
+Unit tests for the invoice PDF rendering service
+
+Tests fingerprint caching, streamed ZIP archives and the hand-over of large
+selections to Celery.
+"""
+
+import io
+import zipfile
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Faktura, Firma, Kontrahent, PozycjaFaktury
+from ..services.invoice_pdf_service import InvoicePDFService, archive_path
+
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def fake_render(html_string, base_url=None):
+    return b'%PDF-' + html_string.encode('utf-8')[:32]
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+@patch('faktury.services.invoice_pdf_service.render_html_to_pdf', side_effect=fake_render)
+class InvoicePDFServiceTest(TestCase):
+    """Test invoice PDF service"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='pdfuser', password='testpass123')
+        self.firma = Firma.objects.create(
+            user=self.user,
+            nazwa='Test Company',
+            nip='9876543210',
+            ulica='Test Street',
+            numer_domu='1',
+            kod_pocztowy='00-000',
+            miejscowosc='Test City'
+        )
+        self.kontrahent = Kontrahent.objects.create(
+            user=self.user,
+            nazwa='Test Kontrahent',
+            nip='1234567890',
+            ulica='Other Street',
+            numer_domu='2',
+            kod_pocztowy='11-111',
+            miejscowosc='Other City'
+        )
+        self.faktury = [self._create_faktura(f'FV/{i}/2025') for i in range(1, 4)]
+        self.service = InvoicePDFService(workers=0, async_threshold=2)
+
+    def _create_faktura(self, numer):
+        return Faktura.objects.create(
+            user=self.user,
+            sprzedawca=self.firma,
+            nabywca=self.kontrahent,
+            numer=numer,
+            data_sprzedazy=timezone.now().date(),
+            termin_platnosci=timezone.now().date(),
+            miejsce_wystawienia='Test City'
+        )
+
+    def test_render_is_cached_by_fingerprint(self, mock_render):
+        """Unchanged invoices are rendered once"""
+        first = self.service.render(self.faktury[0])
+        second = self.service.render(self.faktury[0])
+
+        self.assertEqual(first, second)
+        self.assertEqual(mock_render.call_count, 1)
+        self.assertEqual(self.service.stats['cache_hits'], 1)
+
+    def test_fingerprint_changes_with_invoice(self, mock_render):
+        """Saving the invoice or changing its items invalidates the cached PDF"""
+        faktura = self.faktury[0]
+        before = self.service.fingerprint(faktura)
+
+        PozycjaFaktury.objects.create(
+            faktura=faktura, nazwa='Usługa', ilosc=Decimal('1'), jednostka='szt',
+            cena_netto=Decimal('100.00'), vat='23'
+        )
+        faktura.refresh_from_db()
+
+        self.assertNotEqual(self.service.fingerprint(faktura), before)
+
+    def test_fingerprint_changes_with_parties(self, mock_render):
+        """Saving the seller or the buyer invalidates the cached PDF"""
+        faktura = Faktura.objects.select_related('sprzedawca', 'nabywca').get(pk=self.faktury[0].pk)
+        fingerprints = [self.service.fingerprint(faktura)]
+
+        for party in (self.firma, self.kontrahent):
+            party.ulica = 'New Street'
+            party.save()
+            faktura = Faktura.objects.select_related('sprzedawca', 'nabywca').get(pk=faktura.pk)
+            fingerprints.append(self.service.fingerprint(faktura))
+
+        self.assertEqual(len(set(fingerprints)), 3)
+
+    def test_fingerprint_includes_template_version(self, mock_render):
+        """A new template version produces new fingerprints"""
+        before = self.service.fingerprint(self.faktury[0])
+
+        with self.settings(INVOICE_PDF_TEMPLATE_VERSION='v2'):
+            service = InvoicePDFService(workers=0)
+            self.assertNotEqual(service.fingerprint(self.faktury[0]), before)
+
+    def test_invoices_without_stamp_are_not_cached(self, mock_render):
+        """Rows created before updated_at existed are always rendered"""
+        Faktura.objects.filter(pk=self.faktury[0].pk).update(updated_at=None)
+        faktura = Faktura.objects.get(pk=self.faktury[0].pk)
+
+        self.service.render(faktura)
+        self.service.render(faktura)
+
+        self.assertEqual(mock_render.call_count, 2)
+
+    def test_iter_zip_streams_valid_archive(self, mock_render):
+        """Streamed chunks form a ZIP with one PDF per invoice"""
+        chunks = list(self.service.iter_zip(self.faktury))
+
+        self.assertGreater(len(chunks), len(self.faktury))
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(chunks)))
+        self.assertEqual(archive.namelist(), [f'faktura_FV/{i}/2025.pdf' for i in range(1, 4)])
+        self.assertTrue(archive.read('faktura_FV/2/2025.pdf').startswith(b'%PDF-'))
+
+    def test_render_many_uses_cache(self, mock_render):
+        """Only invoices missing from the cache are rendered"""
+        self.service.render(self.faktury[1])
+        mock_render.reset_mock()
+
+        results = list(self.service.render_many(self.faktury))
+
+        self.assertEqual([faktura.pk for faktura, _ in results], [f.pk for f in self.faktury])
+        self.assertEqual(mock_render.call_count, 2)
+
+    def test_async_threshold(self, mock_render):
+        """Selections above the threshold are rendered in the background"""
+        self.assertFalse(self.service.should_render_async(2))
+        self.assertTrue(self.service.should_render_async(3))
+
+    def test_archive_path_rejects_foreign_names(self, mock_render):
+        """Archive names cannot escape the user's directory"""
+        with self.assertRaises(ValueError):
+            archive_path(self.user.id, '../1/faktury_x.zip')
+
+        name = 'faktury_' + 'a' * 32 + '.zip'
+        self.assertEqual(archive_path(self.user.id, name), f'pdf_archives/{self.user.id}/{name}')
+
+    @override_settings(INVOICE_PDF_WORKERS=0, INVOICE_PDF_ASYNC_THRESHOLD=2)
+    def test_large_selection_dispatched_to_celery(self, mock_render):
+        """generuj_wiele_pdf hands large selections to the archive task"""
+        self.client.force_login(self.user)
+        with patch('faktury.views.get_invoice_pdf_service', return_value=self.service), \
+                patch('faktury.tasks.generate_invoice_pdf_archive_task.delay') as mock_delay:
+            response = self.client.post(reverse('generuj_wiele_pdf'), {
+                'selected_invoices': [faktura.pk for faktura in self.faktury]
+            })
+
+        self.assertEqual(response.status_code, 302)
+        mock_delay.assert_called_once()
+        self.assertEqual(sorted(mock_delay.call_args[0][1]), sorted(f.pk for f in self.faktury))
+        mock_render.assert_not_called()
@@ -0,0 +1,256 @@
+"""
+Unit tests for latency quantile sketches
+
+Tests sketch accuracy against exact quantiles, merging, per-minute storage
+and the monitoring metrics answered from stored sketches.
+"""
+
+import math
+import random
+import statistics
+import time
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from ..models import DocumentUpload, LatencySketchBucket, OCRResult
+from ..services.deployment_monitoring_service import DeploymentMonitoringService, ocr_engine_group
+from ..services.latency_sketch import LatencySketch, LatencySketchRecorder
+from ..tasks import flush_latency_sketches, process_document_ocr_task
+from ..services.rollout_monitoring_service import RolloutMonitoringService
+
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def exact_quantile(values, q):
+    ordered = sorted(values)
+    return ordered[round(q * (len(ordered) - 1))]
+
+
+class LatencySketchTest(SimpleTestCase):
+    """Test log-bucket quantile sketch"""
+
+    def setUp(self):
+        rng = random.Random(7)
+        self.lognormal = [rng.lognormvariate(math.log(120), 0.8) for _ in range(20000)]
+        self.uniform = [rng.uniform(0.5, 5000) for _ in range(20000)]
+
+    def test_quantiles_within_relative_accuracy(self):
+        """Estimates are within the configured relative error of exact quantiles"""
+        for values in (self.lognormal, self.uniform):
+            for accuracy in (0.01, 0.05):
+                sketch = LatencySketch(accuracy)
+                sketch.add_many(values)
+
+                for q in (0.0, 0.25, 0.5, 0.9, 0.95, 0.99, 1.0):
+                    exact = exact_quantile(values, q)
+                    self.assertLessEqual(abs(sketch.quantile(q) - exact) / exact, accuracy + 1e-9)
+
+    def test_merge_matches_single_sketch(self):
+        """Merged per-minute sketches equal a sketch over all values"""
+        whole = LatencySketch()
+        whole.add_many(self.lognormal)
+
+        merged = LatencySketch()
+        for i in range(0, len(self.lognormal), 1000):
+            part = LatencySketch()
+            part.add_many(self.lognormal[i:i + 1000])
+            merged.merge(LatencySketch.from_dict(part.to_dict()))
+
+        self.assertEqual(merged.count, whole.count)
+        self.assertEqual(merged.buckets, whole.buckets)
+        self.assertAlmostEqual(merged.mean, statistics.mean(self.lognormal), places=6)
+        self.assertEqual(merged.quantile(0.99), whole.quantile(0.99))
+
+    def test_add_matches_add_many(self):
+        """Single and bulk insertion produce the same sketch"""
+        single, bulk = LatencySketch(), LatencySketch()
+        for value in self.uniform[:500] + [0.0]:
+            single.add(value)
+        bulk.add_many(self.uniform[:500] + [0.0])
+
+        self.assertEqual(single.to_dict(), bulk.to_dict())
+
+    def test_edge_cases(self):
+        """Empty sketches, zero values and invalid input are handled"""
+        sketch = LatencySketch()
+        self.assertEqual(sketch.quantile(0.5), 0.0)
+        self.assertEqual(LatencySketch.from_dict(sketch.to_dict()).count, 0)
+
+        sketch.add_many([0.0, 0.0, 10.0])
+        self.assertEqual(sketch.quantile(0.5), 0.0)
+        self.assertEqual(sketch.quantile(1.0), 10.0)
+
+        with self.assertRaises(ValueError):
+            sketch.add(-1)
+        with self.assertRaises(ValueError):
+            sketch.merge(LatencySketch(0.05))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class LatencySketchStorageTest(TestCase):
+    """Test per-minute sketch storage and window queries"""
+
+    def setUp(self):
+        cache.clear()
+        self.recorder = LatencySketchRecorder(flush_interval=3600)
+        self.now = timezone.now()
+
+    def test_flush_merges_into_minute_rows(self):
+        """Repeated flushes merge into one row per metric, key and minute"""
+        for value in (10, 20, 30):
+            self.recorder.record('http_request', 'api/ocr/', value, timestamp=self.now)
+        self.recorder.flush()
+        self.recorder.record('http_request', 'api/ocr/', 40, timestamp=self.now)
+        self.recorder.flush()
+
+        bucket = LatencySketchBucket.objects.get()
+        self.assertEqual(bucket.count, 4)
+        self.assertEqual(LatencySketch.from_dict(bucket.sketch).max, 40)
+
+    def test_window_merges_minutes_and_keys(self):
+        """Window queries merge only the requested minutes and keys"""
+        self.recorder.record('http_request', 'a', 100, timestamp=self.now)
+        self.recorder.record('http_request', 'b', 200, timestamp=self.now - timedelta(minutes=2))
+        self.recorder.record('http_request', 'a', 300, timestamp=self.now - timedelta(minutes=30))
+
+        recent = self.recorder.window('http_request', self.now - timedelta(minutes=5), self.now)
+        only_a = self.recorder.window('http_request', self.now - timedelta(hours=1), self.now, keys=['a'])
+
+        self.assertEqual(recent.count, 2)
+        self.assertEqual(only_a.count, 2)
+        self.assertAlmostEqual(only_a.mean, 200)
+
+    def test_rollout_response_time_metrics(self):
+        """Rollout response times are answered from stored sketches"""
+        service = RolloutMonitoringService()
+        recorder = LatencySketchRecorder(flush_interval=3600)
+        for value in range(1, 1001):
+            recorder.record('http_request', 'api/ocr/', float(value))
+
+        with patch('faktury.services.rollout_monitoring_service.latency_recorder', recorder):
+            metrics = service.get_response_time_metrics(time_window_minutes=5)
+            request_count = service._get_request_count(self.now - timedelta(minutes=5), timezone.now())
+
+        self.assertAlmostEqual(metrics['p50'], 500, delta=10)
+        self.assertAlmostEqual(metrics['p99'], 990, delta=20)
+        self.assertAlmostEqual(metrics['avg'], 500.5)
+        self.assertEqual(request_count, 1000)
+
+    def test_comparison_metrics_single_query(self):
+        """Engine comparison runs one aggregate query plus one sketch merge per engine group"""
+        user = User.objects.create_user(username='sketchuser', password='testpass123')
+        documents = DocumentUpload.objects.bulk_create([
+            DocumentUpload(user=user, original_filename=f'doc{i}.pdf', file_path=f'/tmp/doc{i}.pdf',
+                           file_size=1, content_type='application/pdf')
+            for i in range(4)
+        ])
+        OCRResult.objects.bulk_create([
+            OCRResult(document=documents[0], processor_version='tesseract', processing_status='completed',
+                      confidence_score=0.9, processing_time=2.0, extracted_data={}),
+            OCRResult(document=documents[1], processor_version='easyocr', processing_status='failed',
+                      confidence_score=0.0, processing_time=1.0, extracted_data={}),
+            OCRResult(document=documents[2], processor_version='google-document-ai', processing_status='completed',
+                      confidence_score=0.85, processing_time=4.0, extracted_data={}),
+            OCRResult(document=documents[3], processor_version='google-document-ai', processing_status='completed',
+                      confidence_score=0.95, processing_time=6.0, extracted_data={}),
+        ])
+        self.recorder.record('ocr_processing', ocr_engine_group('tesseract'), 2000)
+        self.recorder.record('ocr_processing', ocr_engine_group('google-document-ai'), 4000)
+        self.recorder.record('ocr_processing', ocr_engine_group('google-document-ai'), 6000)
+        self.recorder.flush()
+
+        with patch('faktury.services.deployment_monitoring_service.latency_recorder', self.recorder), \
+                self.assertNumQueries(3):
+            metrics = DeploymentMonitoringService().collect_comparison_metrics(time_window_hours=1)
+
+        google, opensource = metrics['google_cloud'], metrics['opensource']
+        self.assertEqual((google['total'], opensource['total']), (2, 2))
+        self.assertEqual(google['success_rate'], 1.0)
+        self.assertAlmostEqual(google['avg_confidence'], 0.9)
+        self.assertAlmostEqual(google['avg_processing_time'], 5.0)
+        self.assertAlmostEqual(google['p50_processing_time'], 4.0, delta=0.04)
+        self.assertEqual(opensource['error_rate'], 0.5)
+        self.assertAlmostEqual(opensource['p50_processing_time'], 2.0, delta=0.02)
+
+    def test_task_latency_reaches_comparison(self):
+        """Latency recorded by the OCR task is read back by the engine comparison"""
+        user = User.objects.create_user(username='taskuser', password='testpass123')
+        with patch('faktury.tasks.process_document_ocr_task.delay'):
+            document = DocumentUpload.objects.create(
+                user=user, original_filename='doc.pdf', file_path='/tmp/doc.pdf',
+                file_size=1, content_type='application/pdf'
+            )
+
+        def process_invoice(file_content, content_type):
+            time.sleep(0.05)
+            return {'raw_text': 'Faktura', 'extracted_data': {}, 'confidence_score': 90.0}
+
+        with patch('faktury.services.file_upload_service.FileUploadService'), \
+                patch('faktury.services.ensemble_ocr_service.get_ensemble_ocr_service') as ensemble, \
+                patch('faktury.services.latency_sketch.latency_recorder', self.recorder):
+            ensemble.return_value.process_invoice.side_effect = process_invoice
+            result = process_document_ocr_task(document.id)
+        self.assertEqual(result['status'], 'success')
+        OCRResult.objects.filter(id=result['ocr_result_id']).update(processing_status='completed')
+
+        with patch('faktury.services.deployment_monitoring_service.latency_recorder', self.recorder):
+            metrics = DeploymentMonitoringService().collect_comparison_metrics(time_window_hours=1)
+
+        opensource = metrics['opensource']
+        self.assertEqual(opensource['total'], 1)
+        self.assertGreaterEqual(opensource['p50_processing_time'], 0.05 * 0.99)
+        self.assertAlmostEqual(opensource['p50_processing_time'], opensource['avg_processing_time'], delta=0.01)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class LatencySketchHandOffTest(TestCase):
+    """Test the hand-off of pending sketches to the periodic flush task"""
+
+    def setUp(self):
+        cache.clear()
+        self.recorder = LatencySketchRecorder(flush_interval=0, cache_backend=cache)
+        self.now = timezone.now()
+
+    def test_record_hands_off_without_database_writes(self):
+        """Recording in a request only hands batches to the cache; the task stores them"""
+        with self.assertNumQueries(0):
+            for value in (10, 20, 30):
+                self.recorder.record('http_request', 'api/ocr/', value, timestamp=self.now)
+        self.assertFalse(LatencySketchBucket.objects.exists())
+
+        with patch('faktury.services.latency_sketch.latency_recorder', self.recorder):
+            result = flush_latency_sketches()
+        self.assertEqual(result['written_count'], 1)
+
+        bucket = LatencySketchBucket.objects.get()
+        self.assertEqual(bucket.count, 3)
+        self.assertAlmostEqual(LatencySketch.from_dict(bucket.sketch).quantile(0.5), 20, delta=0.2)
+
+        # Flushed batches are not stored twice
+        self.assertEqual(self.recorder.flush_batches(), 0)
+        self.assertEqual(LatencySketchBucket.objects.get().count, 3)
+
+    def test_batch_stored_late_is_retried_once(self):
+        """A slot reserved but not yet stored is picked up on the next run"""
+        from ..services.latency_sketch import BATCH_KEY
+
+        self.recorder.record('http_request', 'a', 10, timestamp=self.now)
+        with patch.object(cache, 'set'):
+            self.recorder.record('http_request', 'a', 20, timestamp=self.now)
+        self.recorder.record('http_request', 'a', 30, timestamp=self.now)
+
+        self.assertEqual(self.recorder.flush_batches(), 1)
+        self.assertEqual(LatencySketchBucket.objects.get().count, 2)
+
+        late = LatencySketch()
+        late.add(20)
+        cache.set(BATCH_KEY.format(slot=2), [['http_request', 'a', self.now.replace(second=0, microsecond=0).isoformat(),
+                                              late.to_dict()]])
+        self.assertEqual(self.recorder.flush_batches(), 1)
+        self.assertEqual(LatencySketchBucket.objects.get().count, 3)
@@ -0,0 +1,192 @@
+"""
+Unit tests for the pending OCR backlog dispatcher
+
+Tests round-robin fairness for skewed backlogs, chunking, the in-flight cap
+on live claims and the return of stale claims to the backlog, using a fake
+broker that records enqueued groups and Celery's eager mode to run the
+dispatched chunks.
+"""
+
+from collections import deque
+from contextlib import contextmanager
+from datetime import timedelta
+from unittest.mock import patch
+
+from celery import group
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from faktulove.celery import app as celery_app
+
+from ..models import DocumentUpload, OCRResult
+from ..services.ocr_dispatcher import OCRBacklogDispatcher, round_robin
+from ..tasks import batch_process_pending_ocr_results
+
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@contextmanager
+def eager_celery():
+    """Run tasks sent through the Celery app in-process"""
+    conf = celery_app.conf
+    previous = {'task_always_eager': conf.task_always_eager, 'task_store_eager_result': conf.task_store_eager_result}
+    conf.update(task_always_eager=True, task_store_eager_result=False)
+    try:
+        yield
+    finally:
+        conf.update(previous)
+
+
+class FakeBroker:
+    """Records the chunks of every group sent instead of publishing it"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.chunks = []
+
+    def send(self, signature, *args, **kwargs):
+        if self.fail:
+            raise ConnectionError('broker unavailable')
+        self.chunks += [list(task.args[0]) for task in signature.tasks]
+
+    @property
+    def queued(self):
+        return [pk for chunk in self.chunks for pk in chunk]
+
+
+class RoundRobinTest(SimpleTestCase):
+    """Test round-robin interleaving"""
+
+    def test_interleaves_until_limit(self):
+        """Queues take turns, drained queues drop out and the limit is respected"""
+        queues = {1: deque([1, 2, 3, 4]), 2: deque([10]), 3: deque([20, 21])}
+        self.assertEqual(round_robin(queues, 10), [1, 10, 20, 2, 21, 3, 4])
+
+        queues = {1: deque([1, 2, 3]), 2: deque([10, 11])}
+        self.assertEqual(round_robin(queues, 3), [1, 10, 2])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class OCRBacklogDispatcherTest(TestCase):
+    """Test fair, capped dispatch of pending OCR results"""
+
+    def setUp(self):
+        cache.clear()
+        self.users = [User.objects.create_user(username=f'dispatch{i}') for i in range(3)]
+
+    def _backlog(self, user, count, status='pending'):
+        # bulk_create skips the upload and OCR result signals that would start processing
+        documents = DocumentUpload.objects.bulk_create([
+            DocumentUpload(user=user, original_filename=f'{user.username}-{i}.pdf',
+                           file_path=f'/tmp/{user.username}-{i}.pdf', file_size=1,
+                           content_type='application/pdf', processing_status='processing')
+            for i in range(count)
+        ])
+        OCRResult.objects.bulk_create([
+            OCRResult(document=document, raw_text='', extracted_data={}, confidence_score=95.0,
+                      processing_time=1.0, processing_status=status)
+            for document in documents
+        ])
+        return list(OCRResult.objects.filter(document__in=documents).order_by('pk').values_list('pk', flat=True))
+
+    def _dispatch(self, broker, **kwargs):
+        with patch.object(group, 'apply_async', autospec=True, side_effect=broker.send):
+            return OCRBacklogDispatcher(**kwargs).dispatch()
+
+    def test_skewed_backlog_shared_fairly(self):
+        """Small backlogs are fully dispatched beside a large one, in round-robin chunks"""
+        heavy = self._backlog(self.users[0], 300)
+        light = self._backlog(self.users[1], 5)
+        other = self._backlog(self.users[2], 5)
+        broker = FakeBroker()
+
+        result = self._dispatch(broker, chunk_size=4, max_in_flight=30, page_size=50)
+
+        self.assertEqual((result.total_found, result.queued, result.chunks, result.users), (310, 30, 8, 3))
+        self.assertEqual(result.per_user, {self.users[0].pk: 20, self.users[1].pk: 5, self.users[2].pk: 5})
+        self.assertEqual(broker.queued[:6], [heavy[0], light[0], other[0], heavy[1], light[1], other[1]])
+        self.assertEqual([len(chunk) for chunk in broker.chunks], [4] * 7 + [2])
+        self.assertEqual(broker.queued[-10:], heavy[10:20])
+        self.assertEqual(result.in_flight, 30)
+        self.assertEqual(OCRResult.objects.filter(processing_status='processing').count(), 30)
+
+    def test_in_flight_cap_and_release(self):
+        """Runs only top up to the cap and released slots are dispatched next"""
+        ids = self._backlog(self.users[0], 12)
+        broker = FakeBroker()
+
+        self.assertEqual(self._dispatch(broker, chunk_size=5, max_in_flight=8).queued, 8)
+        second = self._dispatch(broker, chunk_size=5, max_in_flight=8)
+        self.assertTrue(second.throttled)
+        self.assertEqual(second.queued, 0)
+
+        OCRResult.objects.filter(pk__in=ids[:3]).update(processing_status='completed')
+        self.assertEqual(self._dispatch(broker, chunk_size=5, max_in_flight=8).queued, 3)
+        self.assertEqual(broker.queued, ids[:11])
+
+    def test_failed_enqueue_returns_results_to_backlog(self):
+        """A broker error unclaims the results and releases their slots"""
+        self._backlog(self.users[0], 4)
+
+        with self.assertRaises(ConnectionError):
+            self._dispatch(FakeBroker(fail=True), max_in_flight=10)
+
+        self.assertEqual(OCRResult.objects.filter(processing_status='pending', dispatched_at=None).count(), 4)
+        self.assertEqual(OCRBacklogDispatcher().in_flight(), 0)
+
+    def test_lost_chunk_claims_returned_to_backlog(self):
+        """Claims of a chunk that is never acknowledged expire and are dispatched again"""
+        ids = self._backlog(self.users[0], 3)
+        other = self._backlog(self.users[1], 2)
+        # Processing started outside the dispatcher does not hold dispatch slots
+        self._backlog(self.users[2], 5, status='processing')
+        broker = FakeBroker()
+
+        self.assertEqual(self._dispatch(broker, max_in_flight=3, claim_timeout=600).queued, 3)
+        blocked = self._dispatch(broker, max_in_flight=3, claim_timeout=600)
+        self.assertEqual((blocked.queued, blocked.in_flight, blocked.reaped), (0, 3, 0))
+
+        lost = OCRResult.objects.filter(pk__in=broker.queued)
+        lost.update(dispatched_at=timezone.now() - timedelta(seconds=601))
+        result = self._dispatch(broker, max_in_flight=3, claim_timeout=600)
+
+        self.assertEqual((result.reaped, result.queued, result.in_flight), (3, 3, 3))
+        # The lost results are the oldest and are sent again first
+        self.assertEqual(broker.queued, [ids[0], other[0], ids[1]] * 2)
+        self.assertEqual(OCRResult.objects.filter(processing_status='pending').count(), 2)
+
+    def test_eager_chunks_process_and_release(self):
+        """Eagerly run chunks process every result in round-robin order and empty the counter"""
+        heavy = self._backlog(self.users[0], 6)
+        light = self._backlog(self.users[1], 2)
+        processed = []
+
+        def fake_process(ocr_result_id, *args):
+            processed.append(ocr_result_id)
+            OCRResult.objects.filter(pk=ocr_result_id).update(processing_status='completed')
+
+        with eager_celery(), patch('faktury.services.ocr_integration.process_ocr_result', side_effect=fake_process):
+            result = batch_process_pending_ocr_results()
+
+        self.assertEqual(result['queued_for_processing'], 8)
+        self.assertEqual(result['users'], 2)
+        self.assertEqual(processed, [heavy[0], light[0], heavy[1], light[1]] + heavy[2:])
+        self.assertEqual(OCRBacklogDispatcher().in_flight(), 0)
+        self.assertFalse(OCRResult.objects.exclude(processing_status='completed').exists())
+
+    def test_failed_result_requeued_individually(self):
+        """A failing result is re-queued on its own and the rest of the chunk still runs"""
+        ids = self._backlog(self.users[0], 3)
+
+        def fake_task(ocr_result_id):
+            if ocr_result_id == ids[1]:
+                raise RuntimeError('boom')
+
+        with eager_celery(), patch('faktury.tasks.process_ocr_result_task') as task:
+            task.side_effect = fake_task
+            OCRBacklogDispatcher(chunk_size=5, max_in_flight=10).dispatch()
+            self.assertEqual([call.args[0] for call in task.call_args_list], ids)
+            task.delay.assert_called_once_with(ids[1])
@@ -0,0 +1,237 @@
+"""
+Unit tests for OCR Execution Sandbox
+
+Tests hard timeouts, crash isolation, respawning and degraded retries of
+OCR calls executed in pre-forked child processes, and that the resource
+manager and the ensemble service use the sandbox by default.
+"""
+
+import os
+import threading
+import time
+
+from unittest.mock import patch
+
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+
+from ..services import ensemble_ocr_service
+from ..services.ensemble_ocr_service import EnsembleOCRService, get_ensemble_ocr_service
+from ..services.ocr_execution_sandbox import OCRExecutionSandbox, SandboxConfig
+from ..services.paddle_ocr_resource_manager import (
+    PaddleOCRResourceManager,
+    ProcessingRequest,
+    ResourcePool,
+    WorkerThread,
+)
+from ..services.paddle_ocr_exceptions import (
+    PaddleOCRMemoryError,
+    PaddleOCRProcessingError,
+    PaddleOCRTimeoutError,
+)
+from ..services.paddle_ocr_timeout_handler import DegradationLevel
+
+
+def add(a, b):
+    return a + b
+
+
+def hang(seconds):
+    time.sleep(seconds)
+    return 'finished'
+
+
+def crash():
+    os._exit(3)
+
+
+def allocate(megabytes):
+    return len(bytearray(megabytes * 1024 * 1024))
+
+
+def fail():
+    raise ValueError('bad document')
+
+
+def slow_unless_degraded(degradation_level=None):
+    if degradation_level != DegradationLevel.REDUCE_FEATURES.value:
+        time.sleep(10)
+    return degradation_level
+
+
+class HangingEngine:
+    """OCR engine whose calls never finish"""
+
+    def process_invoice(self, file_content, mime_type):
+        time.sleep(60)
+        return {'confidence_score': 1.0}
+
+
+def hang_engines(service):
+    service.engines = {'hanging': HangingEngine()}
+    service.engine_priorities = ['hanging']
+    service.engine_weights = {'hanging': 1.0}
+
+
+def oversized_unless_degraded(degradation_level=None):
+    if degradation_level is None:
+        return len(bytearray(1024 * 1024 * 1024))
+    return degradation_level
+
+
+def hang_request(request):
+    time.sleep(10)
+
+
+class FakeEngine:
+    """Engine stand-in forked into sandbox children"""
+
+    def __init__(self):
+        self.loaded_in = os.getpid()
+
+    def process_invoice(self, file_content, mime_type):
+        return {'text': file_content.decode(), 'mime_type': mime_type, 'loaded_in': self.loaded_in}
+
+
+class OCRExecutionSandboxTest(SimpleTestCase):
+    """Test OCR execution sandbox"""
+
+    def setUp(self):
+        self.engine = FakeEngine()
+        self.sandbox = OCRExecutionSandbox(
+            SandboxConfig(workers=1, timeout=5.0, memory_limit_mb=256),
+            targets={'fake': self.engine}
+        )
+
+    def tearDown(self):
+        self.sandbox.shutdown()
+
+    def test_execute_returns_result(self):
+        """Calls run in a child process and return their result"""
+        self.assertEqual(self.sandbox.execute(add, 2, 3), 5)
+
+    def test_call_named_target(self):
+        """Targets are forked into the children and stay warm"""
+        result = self.sandbox.call('fake', 'process_invoice', b'FV/1', 'application/pdf')
+
+        self.assertEqual(result['text'], 'FV/1')
+        self.assertEqual(result['loaded_in'], os.getpid())
+
+    def test_timeout_kills_child_and_respawns(self):
+        """A hanging call is killed after the timeout and the worker replaced"""
+        start = time.time()
+        with self.assertRaises(PaddleOCRTimeoutError):
+            self.sandbox.execute(hang, 30, timeout=0.5)
+
+        self.assertLess(time.time() - start, 5)
+        self.assertEqual(self.sandbox.execute(add, 1, 1), 2)
+        self.assertEqual(self.sandbox.get_statistics()['respawns'], 1)
+
+    def test_timeout_from_worker_thread(self):
+        """Timeouts also fire outside of the main thread"""
+        errors = []
+
+        def run():
+            try:
+                self.sandbox.execute(hang, 30, timeout=0.5)
+            except PaddleOCRTimeoutError as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join(timeout=10)
+
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(len(errors), 1)
+
+    def test_crash_is_isolated(self):
+        """A crashing call raises an error and the sandbox keeps working"""
+        with self.assertRaises(PaddleOCRProcessingError):
+            self.sandbox.execute(crash)
+
+        self.assertEqual(self.sandbox.execute(add, 2, 2), 4)
+        self.assertEqual(self.sandbox.get_statistics()['crashes'], 1)
+
+    def test_memory_limit(self):
+        """Allocations above the memory limit fail in the child"""
+        with self.assertRaises(PaddleOCRMemoryError):
+            self.sandbox.execute(allocate, 1024)
+
+        self.assertEqual(self.sandbox.execute(allocate, 1), 1024 * 1024)
+
+    def test_exceptions_are_propagated(self):
+        """Exceptions raised by the call reach the caller"""
+        with self.assertRaises(ValueError):
+            self.sandbox.execute(fail)
+
+    def test_unpicklable_call_rejected(self):
+        """Lambdas cannot be sent to the children"""
+        self.assertFalse(self.sandbox.can_execute(lambda: None))
+        self.assertTrue(self.sandbox.can_execute(add))
+
+    def test_degradation_applied_on_retry(self):
+        """Retries after a timeout use the next degradation levels"""
+        outcome = self.sandbox.execute_with_degradation(slow_unless_degraded, timeout=0.5)
+
+        self.assertTrue(outcome.success)
+        self.assertTrue(outcome.timeout_occurred)
+        self.assertEqual(outcome.degradation_applied, DegradationLevel.REDUCE_FEATURES)
+        self.assertEqual(outcome.result, DegradationLevel.REDUCE_FEATURES.value)
+
+    def test_degraded_retry_after_crash_is_not_a_timeout(self):
+        """Retries after a failure other than a timeout do not report a timeout"""
+        outcome = self.sandbox.execute_with_degradation(oversized_unless_degraded)
+
+        self.assertTrue(outcome.success)
+        self.assertFalse(outcome.timeout_occurred)
+        self.assertEqual(outcome.result, DegradationLevel.REDUCE_QUALITY.value)
+
+
+class SandboxedWorkerTimeoutTest(SimpleTestCase):
+    """Test timeout accounting of sandboxed resource manager workers"""
+
+    def setUp(self):
+        # Sandboxed by default
+        self.manager = PaddleOCRResourceManager(ResourcePool(max_workers=1, worker_timeout=5.0, max_memory_mb=256))
+
+    def tearDown(self):
+        self.manager.shutdown()
+
+    def test_degraded_call_timeout_counted_once(self):
+        """A call whose degraded attempts all time out counts as one timeout"""
+        worker = WorkerThread('test', self.manager)
+        request = ProcessingRequest(request_id='timeout', operation_type='hang', timeout=0.2)
+
+        with self.assertRaises(PaddleOCRTimeoutError):
+            worker._execute_with_timeout(hang_request, request)
+
+        self.assertEqual(self.manager.stats['timeout_errors'], 1)
+
+
+@override_settings(ENSEMBLE_OCR_CONFIG={**settings.ENSEMBLE_OCR_CONFIG, 'timeout_per_engine': 1, 'max_workers': 1})
+class EnsembleSandboxDefaultTest(SimpleTestCase):
+    """Test that the ensemble service of the OCR tasks kills hung engines"""
+
+    def setUp(self):
+        ensemble_ocr_service._ensemble_service = None
+        with patch.object(EnsembleOCRService, '_initialize_engines', hang_engines):
+            self.service = get_ensemble_ocr_service()
+
+    def tearDown(self):
+        self.service.shutdown()
+        ensemble_ocr_service._ensemble_service = None
+
+    def test_hung_engine_killed(self):
+        """A hung engine is killed after its timeout and the service stays usable"""
+        self.assertIsNotNone(self.service.sandbox)
+        self.assertIs(get_ensemble_ocr_service(), self.service)
+
+        result, = self.service._process_with_all_engines(b'%PDF', 'application/pdf')
+        self.assertEqual(result.error_message, 'Processing timeout')
+
+        # The engine thread returns once the sandbox kills the child
+        deadline = time.time() + 10
+        while self.service.sandbox.stats['respawns'] < 1 and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(self.service.sandbox.stats['timeouts'], 1)
+        self.assertEqual(self.service.sandbox.stats['respawns'], 1)
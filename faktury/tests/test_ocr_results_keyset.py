@@ -0,0 +1,146 @@
+"""
+Unit tests for keyset pagination and the slim projection of the OCR results list
+
+Tests that cursor pages walk every result exactly once with timestamp ties,
+that page-number responses hand over to cursors, that list rows never load
+extracted_data or raw_text, and that summary columns follow extracted_data.
+"""
+
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from ..api.views import OCRResultsListAPIView
+from ..models import DocumentUpload, OCRResult
+
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class OCRResultsKeysetPaginationTest(TestCase):
+    """Test cursor pages of the OCR results list"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='keyset')
+        self.other = User.objects.create_user(username='keyset-other')
+        self.factory = APIRequestFactory()
+        self.ids = self._results(self.user, 23)
+        self._results(self.other, 3)
+
+    def _results(self, user, count):
+        # bulk_create skips the upload and OCR result signals that would start processing
+        documents = DocumentUpload.objects.bulk_create([
+            DocumentUpload(user=user, original_filename=f'{user.username}-{i}.pdf',
+                           file_path=f'/tmp/{user.username}-{i}.pdf', file_size=1,
+                           content_type='application/pdf', processing_status='completed')
+            for i in range(count)
+        ])
+        results = [
+            OCRResult(document=document, raw_text='tekst', confidence_score=90.0, processing_time=1.0,
+                      processing_status='completed',
+                      extracted_data={'numer_faktury': f'FV/{i}', 'sprzedawca': {'nazwa': 'ACME'}, 'suma_brutto': '12,30'})
+            for i, document in enumerate(documents)
+        ]
+        for result in results:
+            result.refresh_summary()
+        OCRResult.objects.bulk_create(results)
+        # Groups of three share a timestamp, so pages split ties
+        now = timezone.now().replace(microsecond=0)
+        for i, result in enumerate(results):
+            OCRResult.objects.filter(pk=result.pk).update(created_at=now - timezone.timedelta(seconds=i // 3))
+        return [result.pk for result in results]
+
+    def _get(self, **params):
+        request = self.factory.get('/api/v1/ocr/results/', params)
+        request.user = self.user  # read by the logging mixin before authentication
+        force_authenticate(request, user=self.user)
+        return OCRResultsListAPIView.as_view()(request)
+
+    def test_cursor_pages_cover_results_once(self):
+        """Following next_cursor returns every own result once, newest first"""
+        seen, cursor, pages = [], '', 0
+        while cursor is not None:
+            data = self._get(cursor=cursor, page_size=4).data['data']
+            self.assertNotIn('count', data['pagination'])
+            seen += [row['id'] for row in data['results']]
+            cursor = data['pagination']['next_cursor']
+            pages += 1
+
+        expected = list(OCRResult.objects.filter(document__user=self.user)
+                        .order_by('-created_at', '-id').values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+        self.assertEqual(pages, 6)
+
+    def test_page_numbers_hand_over_to_cursor(self):
+        """The next_cursor of a numbered page continues with the next numbered page"""
+        first = self._get(page_size=5).data['data']
+        second = self._get(page=2, page_size=5).data['data']
+        keyset = self._get(cursor=first['pagination']['next_cursor'], page_size=5).data['data']
+
+        self.assertEqual(first['pagination']['count'], 23)
+        self.assertEqual([row['id'] for row in keyset['results']], [row['id'] for row in second['results']])
+
+    def test_invalid_cursor(self):
+        """A cursor that does not decode is rejected"""
+        self.assertEqual(self._get(cursor='not-a-cursor').status_code, 404)
+
+    def test_rows_skip_large_columns(self):
+        """List rows carry summary fields and one query loads them without the JSON and text columns"""
+        row = self._get(cursor='', page_size=3).data['data']['results'][0]
+        self.assertEqual((row['invoice_number'], row['seller_name'], row['total_amount']), ('FV/2', 'ACME', '12.30'))
+
+        request = self.factory.get('/api/v1/ocr/results/')
+        force_authenticate(request, user=self.user)
+        view = OCRResultsListAPIView()
+        view.request = Request(request)
+        with self.assertNumQueries(1):
+            ocr_result = view.get_queryset()[0]
+        self.assertEqual(ocr_result.get_deferred_fields() & {'extracted_data', 'raw_text'}, {'extracted_data', 'raw_text'})
+
+
+class OCRResultSummaryTest(TestCase):
+    """Test the list summary columns"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='summary')
+
+    def _document(self):
+        return DocumentUpload.objects.bulk_create([DocumentUpload(
+            user=self.user, original_filename='a.pdf', file_path='/tmp/a.pdf', file_size=1,
+            content_type='application/pdf', processing_status='completed',
+        )])[0]
+
+    def test_summary_follows_extracted_data(self):
+        """Summaries are read from Polish and English keys and updated with extracted_data"""
+        result = OCRResult(document=self._document(), raw_text='', confidence_score=50.0, processing_time=1.0,
+                           extracted_data={'invoice_number': 'INV-1', 'supplier_name': 'Foo', 'total_amount': 'n/a'})
+        result.refresh_summary()
+        self.assertEqual((result.summary_invoice_number, result.summary_seller_name, result.summary_total),
+                         ('INV-1', 'Foo', None))
+
+        result.extracted_data = {'numer_faktury': 'FV/9', 'sprzedawca_nazwa': 'Bar', 'suma_brutto': '1 234,5'}
+        result.refresh_summary()
+        self.assertEqual((result.summary_invoice_number, result.summary_seller_name, result.summary_total),
+                         ('FV/9', 'Bar', Decimal('1234.50')))
+
+    def test_backfill_command(self):
+        """The backfill command fills summaries of bulk created results"""
+        OCRResult.objects.bulk_create([OCRResult(
+            document=self._document(), raw_text='', confidence_score=50.0, processing_time=1.0,
+            extracted_data={'numer_faktury': 'FV/1', 'sprzedawca': 'Baz', 'suma_brutto': 99},
+        )])
+
+        call_command('backfill_ocr_summaries', batch_size=1, stdout=StringIO())
+
+        result = OCRResult.objects.get()
+        self.assertEqual((result.summary_invoice_number, result.summary_seller_name, result.summary_total),
+                         ('FV/1', 'Baz', Decimal('99.00')))
@@ -0,0 +1,173 @@
+"""
+Unit tests for the shared OCR statistics query layer
+
+Tests that status counts, confidence bands, daily series and error
+breakdowns match separate per-status counts, the number of queries per
+section, and that daily rollups give the same statistics as raw rows.
+"""
+
+import datetime
+
+from django.contrib.auth.models import User
+from django.db.models.functions import TruncDate
+from django.test import TestCase
+from django.utils import timezone
+
+from ..models import DocumentUpload, OCRProcessingLog, OCRResult, OCRStatisticsRollup, OCRValidation
+from ..services.ocr_statistics import CONFIDENCE_BANDS, OCRStatistics, day_start, rollup_ocr_statistics
+from ..tasks import rollup_ocr_statistics_task
+from ..views_modules.dashboard_views import get_ocr_chart_data, get_ocr_statistics
+
+
+STATUSES = ('completed', 'failed', 'processing', 'uploaded', 'completed', 'completed')
+CONFIDENCES = (99.0, 96.5, 95.0, 90.0, 80.0, 79.9, 65.0, 60.0, 40.0)
+
+
+class OCRStatisticsTest(TestCase):
+    """Test OCR statistics sections against per-status counts"""
+
+    def setUp(self):
+        self.users = [User.objects.create_user(username=f'stats{i}') for i in range(2)]
+        self.now = timezone.now()
+        self.today = timezone.localdate(self.now)
+        self.start = day_start(self.today - datetime.timedelta(days=6))
+        n = 0
+        for days_ago in range(8):
+            for user_index, user in enumerate(self.users):
+                for _ in range(days_ago + user_index * 2 + 1):
+                    self._document(user, days_ago, n)
+                    n += 1
+
+    def _document(self, user, days_ago, n):
+        # bulk_create skips the upload and OCR result signals that would start processing
+        timestamp = day_start(self.today - datetime.timedelta(days=days_ago)) + datetime.timedelta(minutes=7 * n % 600)
+        # Rows of today stay in the past, the statistics window ends now
+        timestamp = min(timestamp, self.now)
+        document = DocumentUpload.objects.bulk_create([DocumentUpload(
+            user=user, original_filename=f'{n}.pdf', file_path=f'/tmp/{n}.pdf', file_size=1,
+            content_type='application/pdf', processing_status=STATUSES[n % len(STATUSES)],
+        )])[0]
+        DocumentUpload.objects.filter(pk=document.pk).update(upload_timestamp=timestamp)
+        if n % 4:
+            result = OCRResult.objects.bulk_create([OCRResult(
+                document=document, raw_text='', extracted_data={}, confidence_score=CONFIDENCES[n % len(CONFIDENCES)],
+                processing_time=1.0 + n % 5, processing_status='completed',
+            )])[0]
+            OCRResult.objects.filter(pk=result.pk).update(created_at=timestamp)
+            if n % 3 == 0:
+                validation = OCRValidation.objects.create(ocr_result=result, validated_by=user, accuracy_rating=n % 10 + 1)
+                OCRValidation.objects.filter(pk=validation.pk).update(validation_timestamp=timestamp)
+        if n % 5 == 0:
+            log = OCRProcessingLog.objects.create(document=document, level=('ERROR', 'CRITICAL', 'WARNING')[n % 3],
+                                                  message=f'Błąd {n % 2}')
+            OCRProcessingLog.objects.filter(pk=log.pk).update(timestamp=timestamp)
+
+    def _expected(self, user=None):
+        documents = DocumentUpload.objects.filter(upload_timestamp__gte=self.start)
+        results = OCRResult.objects.filter(created_at__gte=self.start)
+        if user is not None:
+            documents = documents.filter(user=user)
+            results = results.filter(document__user=user)
+        return {
+            'documents': {
+                'total': documents.count(),
+                **{status: documents.filter(processing_status=status).count() for status in STATUSES[:4]},
+            },
+            'daily': [
+                (day, documents.filter(upload_timestamp__date=day).count(),
+                 documents.filter(upload_timestamp__date=day, processing_status='completed').count())
+                for day in sorted(set(documents.annotate(day=TruncDate('upload_timestamp')).values_list('day', flat=True)))
+            ],
+            'bands': {
+                label: results.filter(**({'confidence_score__gte': low} if low is not None else {}),
+                                      **({'confidence_score__lt': high} if high is not None else {})).count()
+                for label, low, high in CONFIDENCE_BANDS
+            },
+            'results': results.count(),
+        }
+
+    def _actual(self, statistics):
+        documents = statistics.documents
+        return {
+            'documents': {key: documents[key] for key in ('total',) + STATUSES[:4]},
+            'daily': [(row['day'], row['uploads'], row['completed']) for row in documents['daily']],
+            'bands': statistics.results['confidence_bands'],
+            'results': statistics.results['total'],
+        }
+
+    def test_sections_match_separate_counts(self):
+        """Status counts, daily series and bands equal per-status and per-band counts"""
+        for user in (None, self.users[0], self.users[1]):
+            with self.subTest(user=user):
+                statistics = OCRStatistics(self.start, user=user, use_rollup=False)
+                self.assertEqual(self._actual(statistics), self._expected(user))
+
+        errors = OCRStatistics(self.start, use_rollup=False).errors()
+        logs = OCRProcessingLog.objects.filter(timestamp__gte=self.start)
+        self.assertEqual(errors['total_errors'], logs.filter(level__in=['ERROR', 'CRITICAL']).count())
+        self.assertEqual(errors['warnings'], logs.filter(level='WARNING').count())
+        self.assertEqual(sum(row['count'] for row in errors['error_types']), errors['total_errors'])
+
+    def test_one_query_per_section(self):
+        """Each section runs one query per model, the dashboard three in total"""
+        statistics = OCRStatistics(self.start, use_rollup=False)
+        with self.assertNumQueries(1):
+            statistics.documents
+        with self.assertNumQueries(1):
+            statistics.results
+        with self.assertNumQueries(1):
+            statistics.validations
+        with self.assertNumQueries(1):
+            statistics.top_users()
+        with self.assertNumQueries(2):
+            statistics.errors()
+
+        with self.assertNumQueries(3):
+            statistics = OCRStatistics.last_days(30, user=self.users[0])
+            stats = get_ocr_statistics(self.users[0], statistics=statistics)
+            charts = get_ocr_chart_data(self.users[0], statistics=statistics)
+        self.assertEqual(stats['total_documents'], sum(row['uploads'] for row in charts['daily_uploads']))
+        self.assertEqual([label for label, _ in charts['confidence_distribution']], ['95-100%', '80-94%', '60-79%', '<60%'])
+
+    def test_rollups_match_raw_rows(self):
+        """Statistics read from rollups of closed days equal statistics of the raw rows"""
+        for days_ago in range(2, 6):
+            rollup_ocr_statistics(self.today - datetime.timedelta(days=days_ago))
+
+        for user in (None, self.users[0]):
+            with self.subTest(user=user):
+                raw = OCRStatistics(self.start, user=user, use_rollup=False)
+                rolled = OCRStatistics(self.start, user=user)
+                self.assertEqual(len(rolled.rollups), 4)
+                self.assertEqual(self._actual(rolled), self._actual(raw))
+                for key in ('avg_confidence', 'min_confidence', 'max_confidence', 'avg_processing_time', 'with_invoice'):
+                    self.assertAlmostEqual(rolled.results[key], raw.results[key], msg=key)
+                self.assertEqual(rolled.top_users(), raw.top_users())
+
+    def test_rollups_replace_raw_scans(self):
+        """Rolled up days are not read from raw rows again"""
+        day = self.today - datetime.timedelta(days=3)
+        rollup_ocr_statistics(day)
+        before = OCRStatistics(self.start).documents['total']
+
+        DocumentUpload.objects.filter(upload_timestamp__date=day).delete()
+
+        self.assertEqual(OCRStatistics(self.start).documents['total'], before)
+        self.assertLess(OCRStatistics(self.start, use_rollup=False).documents['total'], before)
+        with self.assertNumQueries(2):
+            OCRStatistics(self.start).documents
+
+    def test_rollup_only_closed_days(self):
+        """Today cannot be rolled up and the task fills in missing settled days"""
+        with self.assertRaises(ValueError):
+            rollup_ocr_statistics(self.today)
+
+        rollup_ocr_statistics(self.today - datetime.timedelta(days=4))
+        result = rollup_ocr_statistics_task(lookback_days=5, settle_days=2)
+
+        self.assertEqual(result['status'], 'completed')
+        self.assertEqual(len(result['rolled_up_days']), 3)
+        self.assertEqual(OCRStatisticsRollup.objects.filter(user__isnull=True).count(), 4)
+        global_row = OCRStatisticsRollup.objects.get(user__isnull=True, day=self.today - datetime.timedelta(days=2))
+        user_rows = OCRStatisticsRollup.objects.filter(user__isnull=False, day=global_row.day)
+        self.assertEqual(global_row.uploads, sum(user_rows.values_list('uploads', flat=True)))
@@ -0,0 +1,160 @@
+"""
+Unit tests for database-side partnership analytics
+
+Tests that partnership totals, counts and monthly net balances match the
+Python sums of Faktura.suma_brutto, that the number of queries does not
+depend on the number of invoices, and that the cached rollup is
+invalidated when an invoice or one of its items changes.
+"""
+
+import datetime
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from ..models import Faktura, Firma, Kontrahent, Partnerstwo, PozycjaFaktury
+from ..services.partnership_manager import PartnershipManager
+
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+ITEMS = (
+    # (cena_netto, ilosc, vat, rabat, rabat_typ)
+    ('100.00', '1', '23', None, None),
+    ('19.99', '3', '8', '10', 'procent'),
+    ('250.00', '2', 'zw', '12.50', 'kwota'),
+    ('12.35', '0.5', '23', None, None),
+)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class PartnershipAnalyticsTest(TestCase):
+    """Test partnership details and transaction tracking"""
+
+    def setUp(self):
+        cache.clear()
+        self.firmy, self.nabywcy = [], []
+        for i in range(2):
+            user = User.objects.create_user(username=f'partner{i}')
+            self.firmy.append(Firma.objects.create(
+                user=user, nazwa=f'Partner {i}', nip=f'52602502{i}4', ulica='Główna',
+                numer_domu='1', kod_pocztowy='00-001', miejscowosc='Warszawa'
+            ))
+        for i in range(2):
+            # Kontrahent of each company linked to the other company
+            other = self.firmy[1 - i]
+            self.nabywcy.append(Kontrahent.objects.create(
+                user=self.firmy[i].user, nazwa=other.nazwa, nip=other.nip, ulica='Główna', numer_domu='1',
+                kod_pocztowy='00-001', miejscowosc='Warszawa', firma=other
+            ))
+        self.partnership = Partnerstwo.objects.create(
+            firma1=self.firmy[0], firma2=self.firmy[1], data_rozpoczecia=datetime.date(2025, 1, 1)
+        )
+        self.manager = PartnershipManager()
+        self.count = 0
+
+    def _invoices(self, seller, count, issued, typ_faktury='sprzedaz', status='wystawiona'):
+        """Invoices of one partner to the other with a share of ITEMS each, without signals"""
+        faktury = Faktura.objects.bulk_create([
+            Faktura(
+                user=self.firmy[seller].user, numer=f'FV/{self.count + i}', data_wystawienia=issued,
+                data_sprzedazy=issued, termin_platnosci=issued, miejsce_wystawienia='Warszawa',
+                sprzedawca=self.firmy[seller], nabywca=self.nabywcy[seller], typ_faktury=typ_faktury, status=status
+            )
+            for i in range(count)
+        ])
+        self.count += count
+        PozycjaFaktury.objects.bulk_create([
+            PozycjaFaktury(faktura=faktura, nazwa='x', jednostka='szt', cena_netto=Decimal(cena),
+                           ilosc=Decimal(ilosc), vat=vat, rabat=rabat and Decimal(rabat), rabat_typ=rabat_typ)
+            for i, faktura in enumerate(faktury)
+            for cena, ilosc, vat, rabat, rabat_typ in ITEMS[i % len(ITEMS):]
+        ])
+        return faktury
+
+    def _python_total(self, seller, **filters):
+        return sum((faktura.suma_brutto for faktura in Faktura.objects.filter(sprzedawca=self.firmy[seller], **filters)),
+                   Decimal('0.00'))
+
+    def _fixture(self, per_month):
+        today = datetime.date.today()
+        for months_ago in range(3):
+            issued = today - datetime.timedelta(days=31 * months_ago)
+            self._invoices(0, per_month, issued, status='oplacona')
+            self._invoices(1, per_month, issued)
+        self._invoices(0, 1, today, typ_faktury='koszt')
+
+    def test_details_match_python_sums(self):
+        """Sales totals, counts and balance equal the sums of suma_brutto"""
+        self._fixture(3)
+
+        details = self.manager.get_partnership_details(self.partnership)
+
+        company1_total = self._python_total(0, typ_faktury='sprzedaz')
+        company2_total = self._python_total(1, typ_faktury='sprzedaz')
+        self.assertEqual(details['company1_total_value'], company1_total)
+        self.assertEqual(details['company2_total_value'], company2_total)
+        self.assertEqual(details['balance'], company1_total - company2_total)
+        self.assertEqual((details['company1_sales_count'], details['company2_sales_count']), (9, 9))
+        self.assertEqual(len(details['recent_transactions']), 10)
+
+    def test_tracking_monthly_net_balances(self):
+        """Monthly rows of both directions carry their gross sums and net balance"""
+        self._fixture(2)
+
+        stats = self.manager.track_partner_transactions(self.partnership)
+
+        self.assertEqual(stats['company1_to_company2']['count'], 7)
+        self.assertEqual(stats['company1_to_company2']['paid_count'], 6)
+        self.assertEqual(stats['company2_to_company1']['unpaid_count'], 6)
+        self.assertEqual(stats['company1_to_company2']['total_value'], self._python_total(0))
+        self.assertEqual(len(stats['company2_to_company1']['transactions']), 6)
+        for month in stats['monthly_breakdown']:
+            faktury = Faktura.objects.filter(
+                data_wystawienia__year=int(month['month'][:4]), data_wystawienia__month=int(month['month'][5:])
+            )
+            expected = [sum((f.suma_brutto for f in faktury.filter(sprzedawca=firma)), Decimal('0.00'))
+                        for firma in self.firmy]
+            self.assertEqual((month['company1_to_company2'], month['company2_to_company1']), tuple(expected))
+            self.assertEqual(month['net_balance'], expected[0] - expected[1])
+        self.assertEqual(sum(month['count1'] + month['count2'] for month in stats['monthly_breakdown']), 13)
+
+    def test_query_count_does_not_grow_with_invoices(self):
+        """Details and tracking run the same queries for few and many invoices"""
+        self._fixture(1)
+        with self.assertNumQueries(4):
+            self.manager.get_partnership_details(self.partnership)
+        with self.assertNumQueries(2):
+            self.manager.track_partner_transactions(self.partnership)
+
+        self._fixture(20)
+        cache.clear()
+        with self.assertNumQueries(4):
+            self.manager.get_partnership_details(self.partnership)
+        # The rollup is cached, only the recent transactions are read
+        with self.assertNumQueries(2):
+            self.manager.get_partnership_details(self.partnership)
+        with self.assertNumQueries(2):
+            self.manager.track_partner_transactions(self.partnership)
+
+    def test_rollup_invalidated_on_invoice_and_item_changes(self):
+        """Saving an invoice or an item of either partner refreshes the cached totals"""
+        self._fixture(1)
+        before = self.manager.get_partnership_details(self.partnership)['company2_total_value']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            faktura = Faktura.objects.create(
+                user=self.firmy[1].user, numer='FV/nowa', data_wystawienia=datetime.date.today(),
+                data_sprzedazy=datetime.date.today(), termin_platnosci=datetime.date.today(),
+                miejsce_wystawienia='Warszawa', sprzedawca=self.firmy[1], nabywca=self.nabywcy[1]
+            )
+        details = self.manager.get_partnership_details(self.partnership)
+        self.assertEqual((details['company2_sales_count'], details['company2_total_value']), (4, before))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            PozycjaFaktury.objects.create(faktura=faktura, nazwa='x', jednostka='szt', cena_netto=Decimal('10.00'),
+                                          ilosc=Decimal('1'), vat='23')
+        details = self.manager.get_partnership_details(self.partnership)
+        self.assertEqual(details['company2_total_value'], before + Decimal('12.30'))
@@ -0,0 +1,198 @@
+"""
+Unit tests for the precompiled Polish field scanner
+
+Tests that scanner candidates, and the fields extracted from them, are
+identical to scanning every raw pattern string with ``re`` separately, and
+the keyword prefilter and scan result cache.
+"""
+
+import re
+
+from django.test import SimpleTestCase
+
+from ..services.advanced_polish_processor import AdvancedPolishInvoiceProcessor
+from ..services.enhanced_polish_processor import EnhancedPolishProcessor
+from ..services.invoice_field_extractor import InvoiceFieldExtractor
+from ..services.polish_field_scanner import (
+    ADVANCED_POLISH_PATTERNS, ENHANCED_POLISH_PATTERNS, INVOICE_FIELD_PATTERNS, POLISH_ENTITY_PATTERNS,
+    POLISH_PATTERNS, POLISH_PROCESSOR_PATTERNS, FieldScanner, fold
+)
+from ..services.polish_invoice_processor import PolishInvoiceProcessor
+from ..services.polish_patterns import PolishPatterns
+
+
+INVOICE_TEXT = """FAKTURA VAT Nr FV/2024/01/123
+Data wystawienia: 15.01.2024
+Data sprzedaży: 14 stycznia 2024
+Termin płatności: 14 dni od daty wystawienia, przelew bankowy
+
+Sprzedawca:
+ABC Spółka z o.o.
+ul. Testowa 123
+00-001 Warszawa
+NIP: 123-456-32-18
+tel. +48 123 456 789, e-mail: biuro@abc.pl
+
+Nabywca:
+XYZ S.A.
+al. Jerozolimskie 45
+02-222 Kraków
+NIP: 526-000-12-46
+
+1. Usługa programistyczna 10 szt 100,00 zł 23% VAT
+2. Licencja 1 szt 1 500,00 PLN 8% VAT
+
+Razem do zapłaty: 2 730,00 zł
+Konto: PL 61 1090 1014 0000 0712 1981 2874
+"""
+
+TEXTS = [
+    INVOICE_TEXT,
+    INVOICE_TEXT.upper(),
+    INVOICE_TEXT.replace('zł', 'PLN'),
+    'Rachunek 12/2024 wystawiony 2024-03-01, kwota 99,90',  # no prefilter keywords
+    'FAKTURA NR 7/2024 İDENTYFİKATOR PODATKOWY 1234563218 stawka VAT 23%',
+    'Fırma: Alfa SPÓŁKA AKCYJNA, zwolnione z VAT, 0% VAT, 12 proc. VAT, 5,5% VAT',
+    'Sąd Rejonowy KRS 0000123456 REGON 123456785\n012345678\nKowalski Sp. j., Firma Handlowa, '
+    'np - nie podlega, 12,50 EUR, 3 USD, FAK 12, INV 9, 2024/01/77',
+    '',
+]
+
+
+ALL_PATTERNS = [
+    INVOICE_FIELD_PATTERNS, POLISH_PATTERNS, POLISH_PROCESSOR_PATTERNS, POLISH_ENTITY_PATTERNS,
+    ADVANCED_POLISH_PATTERNS, ENHANCED_POLISH_PATTERNS,
+]
+
+
+class NaiveScanner(FieldScanner):
+    """Scanner running every raw pattern string with ``re``, without prefilter or cache"""
+
+    def patterns(self, family, text=None):
+        return self.families[family]
+
+    def matches(self, text, family):
+        return [(p.pattern, list(re.finditer(p.pattern, text, p.regex.flags))) for p in self.families[family]]
+
+    def findall(self, text, family):
+        return [(p.pattern, re.findall(p.pattern, text, p.regex.flags)) for p in self.families[family]]
+
+
+def match_keys(matches):
+    return [(pattern, [(m.span(), m.groups()) for m in found]) for pattern, found in matches]
+
+
+class FieldScannerTest(SimpleTestCase):
+    """Test scanner candidates against separate per-pattern scans"""
+
+    def setUp(self):
+        self.scanner = FieldScanner(INVOICE_FIELD_PATTERNS)
+        self.naive = NaiveScanner(INVOICE_FIELD_PATTERNS)
+
+    def test_matches_equal_per_pattern_scans(self):
+        """Every family yields the same matches, in the same order, as separate finditer loops"""
+        for families in ALL_PATTERNS:
+            scanner, naive = FieldScanner(families), NaiveScanner(families)
+            for text in TEXTS:
+                for family in families:
+                    with self.subTest(text=text[:30], family=family):
+                        self.assertEqual(
+                            match_keys(scanner.matches(text, family)),
+                            match_keys(naive.matches(text, family))
+                        )
+
+    def test_prefilter_skips_patterns_without_keywords(self):
+        """Patterns whose keywords are absent are skipped; unguarded patterns always run"""
+        text = 'Rachunek 12/2024 kwota 99,90'
+        amounts = self.scanner.patterns('amounts', text)
+        numbers = self.scanner.patterns('invoice_numbers', text)
+
+        self.assertEqual(amounts, [])
+        self.assertTrue(all(not p.keywords for p in numbers))
+        self.assertEqual(len(self.scanner.patterns('amounts', 'RAZEM 10 ZŁ')), 2)
+
+    def test_fold_matches_ignorecase(self):
+        """Case folding finds keywords wherever re.IGNORECASE would match them"""
+        self.assertIn('faktura', fold('FAKTURA'))
+        self.assertIn('firma', fold('Fırma'))
+        self.assertIn('identyfikator', fold('İDENTYFİKATOR'))
+        self.assertIn('spółka', fold('SPÓŁKA'))
+
+    def test_scan_results_are_cached(self):
+        """Repeated scans of a text reuse candidates and the cache is bounded"""
+        scanner = FieldScanner(INVOICE_FIELD_PATTERNS, cache_size=2)
+
+        first = scanner.scan(INVOICE_TEXT, ['amounts'])['amounts']
+        self.assertIs(scanner.scan(INVOICE_TEXT, ['amounts'])['amounts'], first)
+        self.assertEqual([c.value for c in scanner.candidates(INVOICE_TEXT, 'amounts')][:2], ['100,00', '2 730,00'])
+
+        scanner.scan('a')
+        scanner.scan('b')
+        self.assertNotIn(INVOICE_TEXT, scanner._cache)
+        self.assertEqual(list(scanner._cache), ['a', 'b'])
+
+        scanner.clear_cache()
+        self.assertEqual(len(scanner._cache), 0)
+
+
+class ScannerConsumersTest(SimpleTestCase):
+    """Test extractors built on the scanner against per-pattern scans"""
+
+    def test_invoice_field_extractor_unchanged(self):
+        """InvoiceFieldExtractor extracts identical fields with the scanner"""
+        naive = InvoiceFieldExtractor()
+        naive.scanner = NaiveScanner(INVOICE_FIELD_PATTERNS)
+
+        for text in TEXTS:
+            with self.subTest(text=text[:30]):
+                self.assertEqual(InvoiceFieldExtractor().extract_fields(text), naive.extract_fields(text))
+
+    def test_polish_patterns_unchanged(self):
+        """PolishPatterns extracts identical values with the scanner"""
+        patterns = PolishPatterns()
+        naive = PolishPatterns()
+        naive.scanner = NaiveScanner(POLISH_PATTERNS)
+
+        for text in TEXTS:
+            with self.subTest(text=text[:30]):
+                expected = {name: sorted(values) for name, values in naive.extract_all_patterns(text).items()}
+                actual = {name: sorted(values) for name, values in patterns.extract_all_patterns(text).items()}
+                self.assertEqual(actual, expected)
+
+    def test_polish_invoice_processor_unchanged(self):
+        """PolishInvoiceProcessor extracts identical fields with the scanners"""
+        processor = PolishInvoiceProcessor()
+        naive = PolishInvoiceProcessor()
+        naive.scanner = NaiveScanner(POLISH_PROCESSOR_PATTERNS)
+        naive.entity_scanner = NaiveScanner(POLISH_ENTITY_PATTERNS)
+
+        for text in TEXTS:
+            with self.subTest(text=text[:30]):
+                self.assertEqual(
+                    processor.enhance_extraction(text, {'confidence_score': 50.0}),
+                    naive.enhance_extraction(text, {'confidence_score': 50.0})
+                )
+                for extract in ('_extract_polish_vat_numbers', '_extract_polish_dates', '_extract_polish_companies',
+                                '_extract_polish_amounts', '_extract_polish_invoice_numbers'):
+                    self.assertEqual(getattr(processor, extract)(text), getattr(naive, extract)(text))
+
+    def test_advanced_polish_processor_unchanged(self):
+        """AdvancedPolishInvoiceProcessor extracts identical patterns with the scanner"""
+        processor = AdvancedPolishInvoiceProcessor()
+        naive = AdvancedPolishInvoiceProcessor()
+        naive.scanner = NaiveScanner(ADVANCED_POLISH_PATTERNS)
+
+        for text in TEXTS:
+            with self.subTest(text=text[:30]):
+                self.assertEqual(processor.extract_all_advanced_patterns(text), naive.extract_all_advanced_patterns(text))
+
+    def test_enhanced_polish_processor_unchanged(self):
+        """EnhancedPolishProcessor extracts identical fields with the scanner"""
+        processor = EnhancedPolishProcessor()
+        naive = EnhancedPolishProcessor()
+        naive.scanner = NaiveScanner(ENHANCED_POLISH_PATTERNS, flags=re.IGNORECASE | re.MULTILINE)
+
+        for text in TEXTS:
+            with self.subTest(text=text[:30]):
+                self.assertEqual(processor.extract_polish_invoice_fields(text), naive.extract_polish_invoice_fields(text))
+                self.assertEqual(processor.extract_invoice_number(text), naive.extract_invoice_number(text))
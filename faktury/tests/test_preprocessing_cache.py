@@ -0,0 +1,117 @@
+"""
+Unit tests for the preprocessing page cache
+
+Tests the content-addressed page store and its SQLite index used by
+OptimizedImagePreprocessor.
+"""
+
+import os
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase
+
+from ..services.optimized_image_preprocessor import PreprocessingCache, PreprocessingProfile
+
+
+class PreprocessingCacheTest(SimpleTestCase):
+    """Test content-addressed preprocessing cache"""
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = PreprocessingCache(cache_dir=self.cache_dir, max_cache_size_mb=1)
+        self.profile = PreprocessingProfile(
+            name='standard',
+            target_dpi=300,
+            noise_reduction_strength=3,
+            contrast_enhancement=1.2,
+            sharpness_enhancement=1.1,
+            skew_correction=True,
+            morphological_operations=True,
+            bilateral_filter_params=(9, 75, 75)
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def _page_files(self):
+        return [
+            name for _, _, files in os.walk(self.cache.pages_dir)
+            for name in files if not name.startswith('.tmp-')
+        ]
+
+    def test_put_and_get_roundtrip(self):
+        """Stored pages are returned in order"""
+        self.cache.put(b'document', self.profile, [b'page-1', b'page-2'])
+
+        self.assertEqual(self.cache.get(b'document', self.profile), [b'page-1', b'page-2'])
+        self.assertEqual(self.cache.get_stats()['hits'], 1)
+
+    def test_pages_cached_by_document_digest_and_number(self):
+        """Single pages are stored apart per document digest and page number"""
+        self.cache.put_page('digest', 1, b'page-1')
+        self.cache.put_page('digest', 2, b'page-2')
+
+        self.assertEqual(self.cache.get_page('digest', 2), b'page-2')
+        self.assertIsNone(self.cache.get_page('digest', 3))
+        self.assertIsNone(self.cache.get_page('other', 1))
+        self.assertEqual(self.cache.get_stats()['hits'], 1)
+        self.assertEqual(self.cache.get_stats()['misses'], 2)
+
+    def test_miss_for_unknown_document(self):
+        """Unknown documents are counted as misses"""
+        self.assertIsNone(self.cache.get(b'unknown', self.profile))
+        self.assertEqual(self.cache.get_stats()['misses'], 1)
+
+    def test_identical_pages_stored_once(self):
+        """Pages are content-addressed and shared between documents"""
+        self.cache.put(b'document-a', self.profile, [b'shared-page'])
+        self.cache.put(b'document-b', self.profile, [b'shared-page', b'other-page'])
+
+        self.assertEqual(len(self._page_files()), 2)
+        self.assertEqual(self.cache.get(b'document-a', self.profile), [b'shared-page'])
+
+    def test_replacing_entry_keeps_shared_pages(self):
+        """Re-storing a document does not delete pages it still uses"""
+        self.cache.put(b'document', self.profile, [b'page-1'])
+        self.cache.put(b'document', self.profile, [b'page-1'])
+
+        self.assertEqual(self.cache.get(b'document', self.profile), [b'page-1'])
+        self.assertEqual(self.cache.get_stats()['size_mb'], len(b'page-1') / 1024 / 1024)
+
+    def test_memoryview_access(self):
+        """Pages can be read as memory-mapped views"""
+        self.cache.put(b'document', self.profile, [b'page-1'])
+
+        pages = self.cache.get(b'document', self.profile, as_memoryview=True)
+
+        self.assertIsInstance(pages[0], memoryview)
+        self.assertEqual(bytes(pages[0]), b'page-1')
+
+    def test_lru_eviction_over_size_limit(self):
+        """Least recently used documents are evicted when the cache is full"""
+        page = b'x' * (400 * 1024)
+        self.cache.put(b'old', self.profile, [page + b'1'])
+        self.cache.put(b'new', self.profile, [page + b'2'])
+        self.cache.put(b'newest', self.profile, [page + b'3'])
+
+        self.assertIsNone(self.cache.get(b'old', self.profile))
+        self.assertIsNotNone(self.cache.get(b'newest', self.profile))
+        self.assertLessEqual(self.cache.get_stats()['size_mb'], 1)
+
+    def test_missing_page_file_is_a_miss(self):
+        """Entries whose page files disappeared are dropped"""
+        self.cache.put(b'document', self.profile, [b'page-1'])
+        shutil.rmtree(self.cache.pages_dir)
+
+        self.assertIsNone(self.cache.get(b'document', self.profile))
+        self.assertEqual(self.cache.get_stats()['size_mb'], 0)
+
+    def test_clear(self):
+        """Clearing removes entries and page files"""
+        self.cache.put(b'document', self.profile, [b'page-1'])
+
+        self.cache.clear()
+
+        self.assertIsNone(self.cache.get(b'document', self.profile))
+        self.assertEqual(self._page_files(), [])
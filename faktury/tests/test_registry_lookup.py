@@ -0,0 +1,266 @@
+"""
+Unit tests for cached company registry lookups
+
+Tests that found and unknown numbers are cached for their TTLs and registry
+failures are not, that concurrent lookups of one number share one request,
+that batches are deduplicated and fetched with bounded concurrency, and that
+company imports and OCR sellers are completed from the registry, outside the
+invoice transaction and only when enrichment is enabled.
+"""
+
+import datetime
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ..models import DocumentUpload, Firma, Kontrahent, OCRResult, RegistryLookup
+from ..services import registry_lookup
+from ..services.data_export_import_service import DataExportImportService
+from ..services.ocr_integration import FakturaCreator
+from ..services.registry_lookup import (
+    NIP, REGON, GUSBackend, RegistryError, SQLiteRegistryBackend, enrich_companies, lookup, lookup_many
+)
+
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+COMPANY = {
+    'nip': '5260250274', 'nazwa': 'Rejestrowa Sp. z o.o.', 'regon': '012345678', 'ulica': 'Rejestrowa',
+    'numer_domu': '5', 'numer_mieszkania': '', 'kod_pocztowy': '02-222', 'miejscowosc': 'Warszawa',
+    'kraj': 'Polska',
+}
+
+
+class CountingBackend(SQLiteRegistryBackend):
+    """Stub registry recording its lookups and how many ran at once"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lock = threading.Lock()
+        self.calls = []
+        self.running = self.max_running = 0
+
+    def lookup(self, kind, number):
+        with self.lock:
+            self.calls.append(number)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            return super().lookup(kind, number)
+        finally:
+            with self.lock:
+                self.running -= 1
+
+
+@override_settings(CACHES=LOCMEM_CACHES, REGISTRY_LOOKUP_CONFIG={
+    'enabled': True, 'workers': 2, 'ttl': 3600, 'negative_ttl': 60,
+})
+class RegistryLookupTest(TestCase):
+    """Test lookups through the cache table"""
+
+    def setUp(self):
+        self.backend = CountingBackend()
+        self.backend.load([COMPANY, {**COMPANY, 'nip': '1111111111', 'nazwa': 'Druga'}])
+
+    def test_found_company_is_cached(self):
+        """The second lookup of a number, in any format, is answered from the table"""
+        self.assertEqual(lookup(NIP, '526-025-02-74', self.backend)['nazwa'], COMPANY['nazwa'])
+        self.assertEqual(lookup(NIP, 'PL5260250274', self.backend)['nazwa'], COMPANY['nazwa'])
+
+        self.assertEqual(self.backend.calls, ['5260250274'])
+        entry = RegistryLookup.objects.get(kind=NIP, number='5260250274')
+        self.assertTrue(entry.found)
+        self.assertAlmostEqual((entry.expires_at - entry.fetched_at).total_seconds(), 3600)
+
+    def test_unknown_number_is_cached_until_negative_ttl(self):
+        """Unknown numbers are not asked for again until their shorter TTL passes"""
+        self.assertIsNone(lookup(NIP, '9999999999', self.backend))
+        self.assertIsNone(lookup(NIP, '9999999999', self.backend))
+        self.assertEqual(self.backend.calls, ['9999999999'])
+        entry = RegistryLookup.objects.get(number='9999999999')
+        self.assertFalse(entry.found)
+        self.assertAlmostEqual((entry.expires_at - entry.fetched_at).total_seconds(), 60)
+
+        RegistryLookup.objects.filter(pk=entry.pk).update(expires_at=timezone.now() - datetime.timedelta(seconds=1))
+        lookup(NIP, '9999999999', self.backend)
+        self.assertEqual(self.backend.calls, ['9999999999', '9999999999'])
+
+    def test_registry_errors_are_not_cached(self):
+        """A failing registry raises for single lookups, is skipped in batches and leaves no entry"""
+        with patch.object(self.backend, 'lookup', side_effect=RegistryError('niedostępny')):
+            with self.assertRaises(RegistryError):
+                lookup(NIP, COMPANY['nip'], self.backend)
+            self.assertEqual(lookup_many(NIP, [COMPANY['nip']], self.backend), {})
+        self.assertFalse(RegistryLookup.objects.exists())
+
+    def test_invalid_numbers(self):
+        """Malformed numbers raise for single lookups and are left out of batches"""
+        with self.assertRaises(ValueError):
+            lookup(NIP, '123', self.backend)
+        self.assertEqual(lookup_many(NIP, ['123', 'abcdefghij', ''], self.backend), {})
+        self.assertEqual(self.backend.calls, [])
+
+    def test_concurrent_lookups_share_one_request(self):
+        """Threads asking for the same number at once wait for one backend request"""
+        self.backend.delay = 0.2
+        results = []
+
+        def fetch():
+            results.append(registry_lookup._fetch(self.backend, NIP, COMPANY['nip'])['nazwa'])
+
+        threads = [threading.Thread(target=fetch) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=5)
+
+        self.assertEqual(results, [COMPANY['nazwa']] * 5)
+        self.assertEqual(self.backend.calls, [COMPANY['nip']])
+        self.assertEqual(registry_lookup._inflight, {})
+
+    def test_batch_dedupes_and_bounds_concurrency(self):
+        """Each missing number is fetched once, cached ones not at all, at most two at a time"""
+        lookup(NIP, '1111111111', self.backend)
+        self.backend.calls.clear()
+        self.backend.delay = 0.05
+        numbers = ['5260250274', '526-025-02-74', '1111111111', '2222222222', '3333333333', '3333333333', 'zły']
+
+        with self.assertNumQueries(2):
+            results = lookup_many(NIP, numbers, self.backend)
+
+        self.assertEqual(sorted(self.backend.calls), ['2222222222', '3333333333', '5260250274'])
+        self.assertLessEqual(self.backend.max_running, 2)
+        self.assertEqual(results['5260250274']['nazwa'], COMPANY['nazwa'])
+        self.assertEqual(results['1111111111']['nazwa'], 'Druga')
+        self.assertIsNone(results['2222222222'])
+        self.assertEqual(RegistryLookup.objects.count(), 4)
+
+    def test_enrich_keeps_existing_values(self):
+        """Only incomplete records are looked up and only their empty fields are filled"""
+        incomplete = {'nip': COMPANY['nip'], 'nazwa': 'Nazwa z faktury'}
+        complete = {**COMPANY, 'nip': '1111111111', 'miejscowosc': 'Gdańsk'}
+
+        self.assertEqual(enrich_companies([incomplete, complete], self.backend), 1)
+
+        self.assertEqual(self.backend.calls, [COMPANY['nip']])
+        self.assertEqual(incomplete['nazwa'], 'Nazwa z faktury')
+        self.assertEqual((incomplete['ulica'], incomplete['miejscowosc']), ('Rejestrowa', 'Warszawa'))
+        self.assertEqual(complete['miejscowosc'], 'Gdańsk')
+
+    def test_enrichment_disabled(self):
+        """With enrichment disabled records are left as they are without asking the registry"""
+        incomplete = {'nip': COMPANY['nip'], 'nazwa': 'Nazwa z faktury'}
+
+        with override_settings(REGISTRY_LOOKUP_CONFIG={}):
+            self.assertEqual(enrich_companies([incomplete], self.backend), 0)
+
+        self.assertEqual(self.backend.calls, [])
+        self.assertNotIn('ulica', incomplete)
+
+    def test_gus_placeholders_not_cached(self):
+        """Mock NIP data and placeholder companies of GUSService are neither stored nor cached as unknown"""
+        backend = GUSBackend()
+
+        self.assertEqual(lookup_many(NIP, ['1234567890', COMPANY['nip']], backend), {})
+        self.assertEqual(enrich_companies([{'nip': '1234567890'}], backend), 0)
+
+        class PlaceholderService:
+            def search_by_regon(self, regon):
+                return {'success': True, 'data': {'nazwa': f'Firma {regon}', 'status': 'NIEZNANY'}}
+
+        with self.assertRaises(RegistryError):
+            lookup(REGON, COMPANY['regon'], GUSBackend(PlaceholderService()))
+        self.assertFalse(RegistryLookup.objects.exists())
+
+
+class RegistryEnrichmentTest(TestCase):
+    """Test contractor creation completed from the stub registry"""
+
+    def setUp(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, True)
+        path = os.path.join(tmp, 'registry.sqlite3')
+        SQLiteRegistryBackend(path).load([COMPANY, {**COMPANY, 'nip': '1111111111', 'miejscowosc': 'Gdańsk'}])
+        self.settings_override = override_settings(CACHES=LOCMEM_CACHES, REGISTRY_LOOKUP_CONFIG={
+            'enabled': True, 'backend': 'faktury.services.registry_lookup.SQLiteRegistryBackend', 'stub_path': path,
+        })
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.user = User.objects.create_user(username='rejestr')
+
+    def test_company_import_completes_rows(self):
+        """Rows with only a NIP pass validation and are imported with registry data"""
+        data = json.dumps({'companies': [{'nip': '526-025-02-74', 'email': 'biuro@rejestrowa.pl'}]})
+
+        result = DataExportImportService().import_data(self.user, io.BytesIO(data.encode()), 'companies', 'json')
+
+        self.assertTrue(result['success'], result.get('errors'))
+        kontrahent = Kontrahent.objects.get(user=self.user)
+        self.assertEqual(
+            (kontrahent.nazwa, kontrahent.regon, kontrahent.miejscowosc, kontrahent.email),
+            (COMPANY['nazwa'], COMPANY['regon'], 'Warszawa', 'biuro@rejestrowa.pl')
+        )
+
+    def test_ocr_seller_completed(self):
+        """New OCR sellers with a NIP but no address get the registry address in both paths"""
+        creator = FakturaCreator(self.user)
+        data = [{'sprzedawca_nazwa': 'REJESTROWA', 'sprzedawca_nip': COMPANY['nip']}]
+        kontrahent, = creator._resolve_kontrahenci(data, creator._registry_completions(data))
+
+        kontrahent.refresh_from_db()
+        self.assertEqual(kontrahent.nazwa, 'REJESTROWA')
+        self.assertEqual((kontrahent.ulica, kontrahent.kod_pocztowy), ('Rejestrowa', '02-222'))
+
+        data = {'sprzedawca_nip': '1111111111'}
+        completion, = creator._registry_completions([data])
+        single = creator._get_or_create_kontrahent_enhanced(data, 'opensource', completion)
+        self.assertEqual((single.nazwa, single.miejscowosc), (COMPANY['nazwa'], 'Gdańsk'))
+
+    def test_ocr_registry_requests_outside_transaction(self):
+        """Both creation paths ask the registry before opening the invoice transaction"""
+        Firma.objects.create(
+            user=self.user, nazwa='Nasza Firma', nip='9876543210', ulica='Główna',
+            numer_domu='1', kod_pocztowy='00-001', miejscowosc='Warszawa'
+        )
+        documents = DocumentUpload.objects.bulk_create([
+            DocumentUpload(user=self.user, original_filename=f'doc{i}.pdf', file_path=f'/tmp/doc{i}.pdf',
+                           file_size=1, content_type='application/pdf', processing_status='processing')
+            for i in range(2)
+        ])
+        OCRResult.objects.bulk_create([
+            OCRResult(document=document, raw_text='...', confidence_score=95.0, processing_time=1.5,
+                      processing_status='processing', extracted_data={
+                          'numer_faktury': f'FV/{i}/2025', 'data_wystawienia': '2025-01-15',
+                          'sprzedawca_nazwa': f'Sprzedawca {i}', 'sprzedawca_nip': nip,
+                          'pozycje': [{'nazwa': 'Usługa', 'ilosc': '1', 'cena_netto': '100,00', 'vat': '23'}],
+                      })
+            for i, (document, nip) in enumerate(zip(documents, [COMPANY['nip'], '1111111111']))
+        ])
+        batch_result, single_result = OCRResult.objects.filter(document__in=documents).order_by('pk')
+
+        depth = len(connection.atomic_blocks)
+        depths = []
+        lookup_stub = SQLiteRegistryBackend.lookup
+
+        def recording_lookup(backend, kind, number):
+            depths.append(len(connection.atomic_blocks))
+            return lookup_stub(backend, kind, number)
+
+        with patch.object(SQLiteRegistryBackend, 'lookup', recording_lookup):
+            outcome = FakturaCreator(self.user).create_many_from_ocr([batch_result])
+            single = FakturaCreator(self.user).create_from_ocr(single_result)
+
+        self.assertEqual(outcome['failed'], [])
+        self.assertEqual(depths, [depth, depth])
+        self.assertEqual(outcome['created'][0].nabywca.ulica, 'Rejestrowa')
+        self.assertEqual(single.nabywca.miejscowosc, 'Gdańsk')
@@ -0,0 +1,188 @@
+"""
+Unit tests for batched retention cleanup
+
+Tests that expired rows are deleted in primary key batches with their
+dependents, that files of deleted uploads are removed after commit, that
+an interrupted run resumes from its checkpoint, and that writers can
+insert into the cleaned tables between batches.
+"""
+
+import datetime
+import os
+import tempfile
+import threading
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+
+from ..models import (
+    DocumentUpload, Faktura, Firma, Kontrahent, OCRResult, OCRValidation, RetentionCheckpoint, SystemHealthMetric
+)
+from ..services import retention
+from ..services.maintenance_service import MaintenanceService
+from ..services.retention import RetentionPolicy, run_retention
+
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+RETENTION_CONFIG = {'batch_size': 2, 'sleep': 0, 'file_workers': 2, 'days': {}}
+
+
+def health_policy():
+    return RetentionPolicy('health_records', SystemHealthMetric, 'timestamp', days=30)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, RETENTION_CONFIG=RETENTION_CONFIG)
+class RetentionTest(TransactionTestCase):
+    """Test retention policies"""
+
+    def setUp(self):
+        self.old = timezone.now() - datetime.timedelta(days=100)
+        self.user = User.objects.create_user(username='retencja')
+
+    def _health(self, count, timestamp):
+        return SystemHealthMetric.objects.bulk_create([
+            SystemHealthMetric(component='ocr', status='healthy', response_time=0.1, timestamp=timestamp)
+            for _ in range(count)
+        ])
+
+    def _upload(self, status='failed', file_path=''):
+        upload = DocumentUpload.objects.bulk_create([DocumentUpload(
+            user=self.user, original_filename='skan.pdf', file_path=file_path, file_size=1024,
+            content_type='application/pdf', processing_status=status
+        )])[0]
+        DocumentUpload.objects.filter(pk=upload.pk).update(upload_timestamp=self.old)
+        return upload
+
+    def test_expired_rows_are_deleted_in_batches(self):
+        """Only expired rows go, two per batch, and the checkpoint records the run"""
+        self._health(5, self.old)
+        recent = self._health(1, timezone.now())
+
+        results = run_retention(policies=[health_policy()])
+
+        self.assertEqual(results['cleaned_items'], {'health_records': 5})
+        self.assertEqual(list(SystemHealthMetric.objects.values_list('pk', flat=True)), [recent[0].pk])
+        checkpoint = RetentionCheckpoint.objects.get(policy='health_records')
+        self.assertEqual((checkpoint.status, checkpoint.deleted, checkpoint.batches), ('completed', 5, 3))
+
+    def test_raw_delete_follows_relations(self):
+        """Dependents of deleted uploads are deleted or unlinked without loading objects"""
+        upload = self._upload()
+        kept = self._upload(status='completed')
+        result = OCRResult.objects.bulk_create([
+            OCRResult(document=upload, raw_text='', extracted_data={}, confidence_score=10.0, processing_time=1.0)
+        ])[0]
+        OCRValidation.objects.create(ocr_result=result, validated_by=self.user, accuracy_rating=5)
+        firma = Firma.objects.create(
+            user=self.user, nazwa='Firma', nip='1111111111', ulica='Testowa', numer_domu='1',
+            kod_pocztowy='00-001', miejscowosc='Warszawa'
+        )
+        kontrahent = Kontrahent.objects.create(
+            user=self.user, nazwa='Nabywca', nip='2222222222', ulica='Inna', numer_domu='2',
+            kod_pocztowy='11-111', miejscowosc='Kraków'
+        )
+        today = datetime.date.today()
+        faktura = Faktura.objects.bulk_create([Faktura(
+            user=self.user, sprzedawca=firma, nabywca=kontrahent, numer='FV/01', data_sprzedazy=today,
+            termin_platnosci=today, miejsce_wystawienia='Warszawa', source_document=upload
+        )])[0]
+
+        with patch('django.db.models.deletion.Collector.collect') as collect:
+            results = run_retention(90, [p for p in retention.default_policies() if p.name == 'orphaned_uploads'])
+        collect.assert_not_called()
+
+        self.assertEqual(results['cleaned_items'], {'orphaned_uploads': 1})
+        self.assertEqual(results['freed_space'], 1024)
+        self.assertEqual(list(DocumentUpload.objects.values_list('pk', flat=True)), [kept.pk])
+        self.assertFalse(OCRResult.objects.exists())
+        self.assertFalse(OCRValidation.objects.exists())
+        self.assertIsNone(Faktura.objects.get(pk=faktura.pk).source_document_id)
+
+    def test_files_are_removed_after_commit(self):
+        """Files of deleted uploads are gone when the run returns"""
+        tmp = tempfile.mkdtemp()
+        paths = [os.path.join(tmp, f'{i}.pdf') for i in range(3)]
+        for path in paths:
+            with open(path, 'wb') as f:
+                f.write(b'%PDF')
+            self._upload(file_path=path)
+
+        run_retention(90, [p for p in retention.default_policies() if p.name == 'orphaned_uploads'])
+
+        self.assertEqual([path for path in paths if os.path.exists(path)], [])
+        os.rmdir(tmp)
+
+    def test_interrupted_run_resumes_from_checkpoint(self):
+        """A failed run keeps its committed batches and the next run continues after them"""
+        rows = self._health(5, self.old)
+        original = retention.raw_delete
+        calls = []
+
+        def failing(model, pks):
+            calls.append(pks)
+            if len(calls) == 2:
+                raise RuntimeError('przerwano')
+            return original(model, pks)
+
+        with patch.object(retention, 'raw_delete', side_effect=failing):
+            results = run_retention(policies=[health_policy()])
+        self.assertEqual(len(results['errors']), 1)
+        checkpoint = RetentionCheckpoint.objects.get(policy='health_records')
+        self.assertEqual((checkpoint.status, checkpoint.last_pk, checkpoint.deleted), ('failed', rows[1].pk, 2))
+
+        with patch.object(retention, 'raw_delete', wraps=original) as resumed:
+            results = run_retention(policies=[health_policy()])
+        self.assertEqual(resumed.call_args_list[0].args[1], [rows[2].pk, rows[3].pk])
+        self.assertEqual(results['cleaned_items'], {'health_records': 3})
+        checkpoint.refresh_from_db()
+        self.assertEqual((checkpoint.status, checkpoint.deleted), ('completed', 5))
+        self.assertFalse(SystemHealthMetric.objects.exists())
+
+    def test_concurrent_inserts_are_not_blocked(self):
+        """Another connection inserts into the table between batches without waiting"""
+        self._health(6, self.old)
+        inserted = []
+
+        def insert():
+            try:
+                self._health(1, timezone.now())
+                inserted.append(True)
+            except Exception as e:
+                inserted.append(e)
+            finally:
+                connection.close()
+
+        def between_batches(seconds):
+            self.assertFalse(connection.in_atomic_block)
+            writer = threading.Thread(target=insert)
+            writer.start()
+            writer.join(timeout=5)
+            self.assertFalse(writer.is_alive())
+
+        with patch.object(retention.time, 'sleep', side_effect=between_batches) as sleep:
+            results = run_retention(policies=[health_policy()])
+
+        self.assertEqual(sleep.call_count, 3)
+        self.assertEqual(inserted, [True, True, True])
+        self.assertEqual(results['cleaned_items'], {'health_records': 6})
+        self.assertEqual(SystemHealthMetric.objects.count(), 3)
+
+    def test_refused_inside_transaction(self):
+        """Inside a transaction no batch would commit, so the run is refused"""
+        with transaction.atomic():
+            with self.assertRaises(RuntimeError):
+                run_retention()
+
+    def test_cleanup_old_data_reports_policies(self):
+        """The maintenance service reports deleted rows per policy"""
+        self._health(2, self.old)
+
+        results = MaintenanceService().cleanup_old_data(90)
+
+        self.assertEqual(results['status'], 'success', results['errors'])
+        self.assertEqual(results['cleaned_items'], {
+            'ocr_results': 0, 'health_records': 2, 'notifications': 0, 'orphaned_uploads': 0
+        })
@@ -0,0 +1,134 @@
+"""
+Unit tests for system broadcasts
+
+Tests batched fan-out with resume from the checkpoint, the read-time merge
+of receipts-mode broadcasts, and the send and progress views.
+"""
+
+import json
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import RequestFactory, TestCase, override_settings
+
+from ..models import BroadcastReceipt, SystemBroadcast, Wiadomosc
+from ..services.system_broadcast import (
+    fan_out_batch, mark_broadcast_read, run_fan_out, start_broadcast, system_messages
+)
+from ..tasks import fan_out_system_broadcast_task
+from ..views_modules.notification_views import status_rozgloszenia, wyslij_systemowa
+
+
+class SystemBroadcastFanOutTest(TestCase):
+    """Test batched, resumable fan-out"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin', is_staff=True)
+        User.objects.bulk_create([User(username=f'odbiorca-{i}') for i in range(25)])
+        User.objects.create_user(username='nieaktywny', is_active=False)
+        self.recipient_ids = list(
+            User.objects.filter(is_active=True).exclude(pk=self.admin.pk).order_by('id').values_list('id', flat=True)
+        )
+
+    def _start(self, mode=SystemBroadcast.MODE_FAN_OUT):
+        with patch('faktury.services.system_broadcast.enqueue_fan_out') as enqueue:
+            with self.captureOnCommitCallbacks(execute=True):
+                broadcast = start_broadcast(self.admin, 'Przerwa techniczna', 'W nocy', mode)
+        return broadcast, enqueue
+
+    def test_batches_write_each_recipient_once(self):
+        """Batches insert one message per active recipient with a single query each"""
+        broadcast, enqueue = self._start()
+        enqueue.assert_called_once_with(broadcast.pk)
+        self.assertEqual(broadcast.total_recipients, 25)
+
+        # Lock and read the broadcast, read recipient ids, insert, save the checkpoint
+        with self.assertNumQueries(6):
+            fan_out_batch(broadcast.pk, 10)
+        broadcast = run_fan_out(broadcast.pk, batch_size=10, time_budget=60)
+
+        self.assertEqual(broadcast.status, 'completed')
+        self.assertEqual((broadcast.delivered, broadcast.progress), (25, 100.0))
+        received = Wiadomosc.objects.filter(broadcast=broadcast).order_by('odbiorca_user_id')
+        self.assertEqual(list(received.values_list('odbiorca_user_id', flat=True)), self.recipient_ids)
+        self.assertEqual(set(received.values_list('typ_wiadomosci', flat=True)), {'system'})
+
+    def test_resume_from_checkpoint(self):
+        """A run stopped by its time budget continues after the last written recipient"""
+        broadcast, _ = self._start()
+
+        broadcast = run_fan_out(broadcast.pk, batch_size=10, time_budget=0)
+        self.assertEqual((broadcast.status, broadcast.delivered), ('running', 10))
+        self.assertEqual(broadcast.last_recipient_id, self.recipient_ids[9])
+
+        # Users created after the start are not recipients
+        User.objects.create_user(username='spozniony')
+        with patch.object(fan_out_system_broadcast_task, 'delay') as delay:
+            result = fan_out_system_broadcast_task.apply(args=[broadcast.pk]).get()
+        delay.assert_not_called()
+
+        self.assertEqual((result['status'], result['delivered']), ('completed', 25))
+        self.assertEqual(Wiadomosc.objects.filter(broadcast=broadcast).count(), 25)
+        self.assertIsNone(fan_out_batch(broadcast.pk, 10))
+
+    def test_receipts_mode_merges_at_read_time(self):
+        """Receipts broadcasts write no messages and appear in inboxes until read"""
+        broadcast, enqueue = self._start(SystemBroadcast.MODE_RECEIPTS)
+        enqueue.assert_not_called()
+        self.assertEqual((broadcast.status, broadcast.delivered), ('completed', 25))
+        self.assertFalse(Wiadomosc.objects.exists())
+
+        user = User.objects.get(pk=self.recipient_ids[0])
+        Wiadomosc.objects.create(odbiorca_user=user, temat='Nowsza', tresc='', typ_wiadomosci='system')
+        with self.assertNumQueries(2):
+            rows = system_messages(user)
+        self.assertEqual([(row['temat'], row['broadcast'], row['przeczytana']) for row in rows],
+                         [('Nowsza', False, False), ('Przerwa techniczna', True, False)])
+
+        mark_broadcast_read(user, broadcast)
+        mark_broadcast_read(user, broadcast)
+        self.assertEqual(BroadcastReceipt.objects.count(), 1)
+        self.assertTrue(system_messages(user)[1]['przeczytana'])
+        self.assertEqual(system_messages(self.admin), [])
+        self.assertEqual(system_messages(User.objects.create_user(username='nowy')), [])
+
+
+class SystemBroadcastViewTest(TestCase):
+    """Test the send and progress views"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.admin = User.objects.create_user(username='admin', is_staff=True)
+        self.user = User.objects.create_user(username='uzytkownik')
+
+    def _post(self, user, **headers):
+        request = self.factory.post('/', {'temat': 'Nowość', 'tresc': 'Treść', 'mode': 'fan_out'}, **headers)
+        request.user = user
+        request.session = {}
+        request._messages = []
+        with patch('faktury.services.system_broadcast.enqueue_fan_out'):
+            return wyslij_systemowa(request)
+
+    @override_settings(ROOT_URLCONF='faktury.urls')
+    def test_send_returns_broadcast_id(self):
+        """Staff get a broadcast ID and progress URL without waiting for delivery"""
+        response = self._post(self.admin, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.status_code, 202)
+        data = json.loads(response.content)
+        self.assertEqual((data['status'], data['total_recipients'], data['delivered']), ('pending', 1, 0))
+        self.assertFalse(Wiadomosc.objects.exists())
+
+        request = self.factory.get(data['status_url'])
+        request.user = self.admin
+        status = json.loads(status_rozgloszenia(request, data['id']).content)
+        self.assertEqual((status['id'], status['progress']), (data['id'], 0.0))
+
+        request.user = self.user
+        self.assertEqual(status_rozgloszenia(request, data['id']).status_code, 403)
+
+    def test_non_staff_cannot_send(self):
+        """Regular users are redirected without creating a broadcast"""
+        with patch('faktury.views_modules.notification_views.messages'):
+            response = self._post(self.user)
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(SystemBroadcast.objects.exists())
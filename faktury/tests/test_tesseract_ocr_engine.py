@@ -0,0 +1,120 @@
+"""
+Unit tests for Tesseract OCR Engine
+
+Tests single-pass text reconstruction from image_to_data output and
+page-level processing of multi-page documents.
+"""
+
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from PIL import Image
+
+from ..services.tesseract_ocr_engine import TesseractOCREngine, build_page_from_tesseract_data
+
+
+def make_tesseract_data(words):
+    """Build image_to_data DICT output from (block, par, line, text, conf, left, width) tuples"""
+    data = {key: [] for key in (
+        'level', 'page_num', 'block_num', 'par_num', 'line_num', 'word_num',
+        'left', 'top', 'width', 'height', 'conf', 'text'
+    )}
+    for word_num, (block, par, line, text, conf, left, width) in enumerate(words, start=1):
+        data['level'].append(5)
+        data['page_num'].append(1)
+        data['block_num'].append(block)
+        data['par_num'].append(par)
+        data['line_num'].append(line)
+        data['word_num'].append(word_num)
+        data['left'].append(left)
+        data['top'].append(line * 40)
+        data['width'].append(width)
+        data['height'].append(30)
+        data['conf'].append(conf)
+        data['text'].append(text)
+    return data
+
+
+class BuildPageFromTesseractDataTest(SimpleTestCase):
+    """Test text reconstruction from a single image_to_data pass"""
+
+    def setUp(self):
+        self.data = make_tesseract_data([
+            (1, 1, 1, 'Faktura', 96, 10, 70),
+            (1, 1, 1, 'VAT', 91, 100, 30),
+            (1, 1, 2, 'FV/1/2025', 88, 10, 90),
+            (2, 1, 1, 'Razem:', 75, 10, 60),
+            (2, 1, 1, '123,00', '0', 300, 60),
+            (2, 1, 1, '', '-1', 0, 0),
+        ])
+
+    def test_text_follows_tesseract_layout(self):
+        """Lines are split by newlines and blocks by an empty line"""
+        page = build_page_from_tesseract_data(self.data)
+
+        self.assertEqual(page['text'], 'Faktura VAT\nFV/1/2025\n\nRazem: 123,00')
+
+    def test_word_confidences_skip_non_positive(self):
+        """Only words with positive confidence are reported"""
+        page = build_page_from_tesseract_data(self.data)
+
+        self.assertEqual(page['word_confidences'], [96, 91, 88, 75])
+        self.assertEqual([word['text'] for word in page['word_data']],
+                         ['Faktura', 'VAT', 'FV/1/2025', 'Razem:'])
+
+    def test_line_structure(self):
+        """Line entries carry their position and average confidence"""
+        page = build_page_from_tesseract_data(self.data)
+
+        self.assertEqual(len(page['lines']), 3)
+        self.assertEqual(page['lines'][0]['text'], 'Faktura VAT')
+        self.assertEqual(page['lines'][0]['confidence'], 93.5)
+        self.assertEqual(page['lines'][2]['block_num'], 2)
+
+    def test_preserve_interword_spaces(self):
+        """Wide gaps between words become multiple spaces"""
+        page = build_page_from_tesseract_data(self.data, preserve_interword_spaces=True)
+
+        self.assertEqual(page['lines'][0]['text'], 'Faktura  VAT')
+        self.assertTrue(page['lines'][2]['text'].startswith('Razem:' + ' ' * 20))
+
+    def test_empty_data(self):
+        """Empty recognition result produces empty page"""
+        page = build_page_from_tesseract_data(make_tesseract_data([]))
+
+        self.assertEqual(page['text'], '')
+        self.assertEqual(page['lines'], [])
+
+
+class TesseractOCREngineSinglePassTest(SimpleTestCase):
+    """Test that the engine runs Tesseract recognition once per page"""
+
+    def setUp(self):
+        self.engine = TesseractOCREngine(preprocessing_enabled=False, page_workers=1)
+        self.image = Image.new('RGB', (100, 50), color='white')
+        self.data = make_tesseract_data([(1, 1, 1, 'Faktura', 96, 10, 70)])
+
+    @patch('faktury.services.tesseract_ocr_engine.pytesseract.image_to_string')
+    @patch('faktury.services.tesseract_ocr_engine.pytesseract.image_to_data')
+    def test_extract_uses_single_recognition_pass(self, mock_image_to_data, mock_image_to_string):
+        """Text and confidences come from one image_to_data call"""
+        mock_image_to_data.return_value = self.data
+
+        result = self.engine._extract_text_with_confidence(self.image)
+
+        self.assertEqual(mock_image_to_data.call_count, 1)
+        mock_image_to_string.assert_not_called()
+        self.assertEqual(result['text'], 'Faktura')
+        self.assertEqual(result['word_confidences'], [96])
+
+    @patch('faktury.services.tesseract_ocr_engine.pytesseract.image_to_data')
+    def test_pages_processed_in_order(self, mock_image_to_data):
+        """Sequential page processing keeps document order"""
+        mock_image_to_data.side_effect = [
+            make_tesseract_data([(1, 1, 1, 'Strona1', 90, 10, 70)]),
+            make_tesseract_data([(1, 1, 1, 'Strona2', 80, 10, 70)]),
+        ]
+
+        pages = self.engine._process_pages([self.image, self.image])
+
+        self.assertEqual([page['text'] for page in pages], ['Strona1', 'Strona2'])
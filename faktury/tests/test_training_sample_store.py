@@ -0,0 +1,173 @@
+"""
+Unit tests for the training sample store
+
+Tests indexed storage, filtered streaming, incremental exports and the
+migration of JSON sample files used by TrainingDataCollector.
+"""
+
+import csv
+import json
+import shutil
+import tempfile
+from dataclasses import asdict
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from django.test import SimpleTestCase
+
+from ..services.training_data_collector import TrainingDataCollector, TrainingSample
+from ..services.training_sample_store import TrainingSampleStore
+
+
+def make_sample(index, confidence=96.0, engine='paddleocr', document_type='faktura_vat', days_ago=0):
+    return TrainingSample(
+        sample_id=f'sample_{index}',
+        original_text=f'FAKTURA VAT FV/{index}/2025',
+        extracted_data={'numer_faktury': f'FV/{index}/2025'},
+        confidence_score=confidence,
+        collection_date=datetime(2025, 6, 1) - timedelta(days=days_ago),
+        quality_score=0.5,
+        tags=['high_confidence'],
+        engine=engine,
+        document_type=document_type
+    )
+
+
+class TrainingSampleStoreTest(SimpleTestCase):
+    """Test SQLite training sample store"""
+
+    def setUp(self):
+        self.store_dir = tempfile.mkdtemp()
+        self.store = TrainingSampleStore(self.store_dir)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.store_dir, ignore_errors=True)
+
+    def test_append_and_iterate(self):
+        """Samples round-trip through the store in insertion order"""
+        self.store.append_many([(make_sample(i), 'high_confidence') for i in range(3)])
+
+        samples = list(self.store.iter_samples(batch_size=2))
+
+        self.assertEqual([s.sample_id for s in samples], ['sample_0', 'sample_1', 'sample_2'])
+        self.assertEqual(samples[0].extracted_data, {'numer_faktury': 'FV/0/2025'})
+        self.assertEqual(samples[0].collection_date, datetime(2025, 6, 1))
+
+    def test_duplicate_sample_ids_skipped(self):
+        """Appending is idempotent per sample ID"""
+        self.assertTrue(self.store.append(make_sample(1), 'high_confidence'))
+        self.assertFalse(self.store.append(make_sample(1), 'high_confidence'))
+        self.assertEqual(self.store.count(), 1)
+
+    def test_filters(self):
+        """Samples are filtered by indexed columns"""
+        self.store.append_many([
+            (make_sample(1, confidence=99.0), 'high_confidence'),
+            (make_sample(2, confidence=90.0), 'high_confidence'),
+            (make_sample(3, engine='tesseract'), 'human_validated'),
+            (make_sample(4, document_type='korekta', days_ago=30), 'high_confidence'),
+        ])
+
+        def ids(**filters):
+            return [s.sample_id for s in self.store.iter_samples(**filters)]
+
+        self.assertEqual(ids(min_confidence=95.0, engine='paddleocr', document_type='faktura_vat'), ['sample_1'])
+        self.assertEqual(ids(sample_types=['human_validated']), ['sample_3'])
+        self.assertEqual(ids(since=datetime(2025, 5, 15)), ['sample_1', 'sample_2', 'sample_3'])
+        self.assertEqual(self.store.count(sample_types=[]), 0)
+
+    def test_aggregate(self):
+        """Statistics are computed in the database"""
+        self.store.append_many([
+            (make_sample(1, confidence=90.0), 'high_confidence'),
+            (make_sample(2, confidence=100.0), 'high_confidence'),
+        ])
+
+        stats = self.store.aggregate()
+
+        self.assertEqual(stats['count'], 2)
+        self.assertEqual(stats['avg_confidence'], 95.0)
+
+    def test_delete_older_than(self):
+        """Old samples are removed by collection date"""
+        self.store.append_many([
+            (make_sample(1), 'high_confidence'),
+            (make_sample(2, days_ago=100), 'high_confidence'),
+        ])
+
+        self.assertEqual(self.store.delete_older_than(datetime(2025, 5, 1)), 1)
+        self.assertEqual([s.sample_id for s in self.store.iter_samples()], ['sample_1'])
+
+    def test_migrate_json_directory(self):
+        """Legacy JSON sample files are imported once"""
+        legacy_dir = Path(self.store_dir) / 'human_validated'
+        legacy_dir.mkdir()
+        for i in range(3):
+            with open(legacy_dir / f'sample_{i}.json', 'w', encoding='utf-8') as f:
+                json.dump(asdict(make_sample(i)), f, indent=2, default=str)
+        (legacy_dir / 'broken.json').write_text('{')
+
+        self.assertEqual(self.store.migrate_json_directory(self.store_dir, batch_size=2), 3)
+        self.assertEqual(self.store.migrate_json_directory(self.store_dir), 0)
+        self.assertEqual(self.store.count(sample_types=['human_validated']), 3)
+        self.assertEqual(next(self.store.iter_samples()).collection_date, datetime(2025, 6, 1))
+
+
+class TrainingDataCollectorExportTest(SimpleTestCase):
+    """Test streamed exports of the training data collector"""
+
+    def setUp(self):
+        self.collection_dir = tempfile.mkdtemp()
+        self.collector = TrainingDataCollector(collection_dir=self.collection_dir, privacy_enabled=False)
+        self.collector.store.append_many([
+            (make_sample(1), 'high_confidence'),
+            (make_sample(2, engine='tesseract'), 'high_confidence'),
+        ])
+
+    def tearDown(self):
+        shutil.rmtree(self.collection_dir, ignore_errors=True)
+
+    def test_json_formats_are_valid(self):
+        """Streamed JSON exports keep the previous document structure"""
+        for export_format, list_key in (('document_ai', 'training_data'), ('paddleocr', 'training_samples'),
+                                        ('easyocr', 'training_data'), ('json', 'samples')):
+            with open(self.collector.export_training_dataset(format=export_format), encoding='utf-8') as f:
+                data = json.load(f)
+
+            self.assertEqual(len(data[list_key]), 2)
+            self.assertEqual(data['metadata']['total_samples'], 2)
+            self.assertEqual(data['metadata']['format'], export_format)
+
+    def test_csv_export(self):
+        """CSV export writes one row per sample"""
+        path = self.collector.export_training_dataset(format='csv', engine='tesseract')
+
+        with open(path, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+
+        self.assertEqual([row['sample_id'] for row in rows], ['sample_2'])
+
+    def test_incremental_export(self):
+        """Incremental exports only contain samples added since the last run"""
+        first = self.collector.export_training_dataset(format='json', output_file='first', incremental=True)
+        self.collector.store.append(make_sample(3), 'human_validated')
+        second = self.collector.export_training_dataset(format='json', output_file='second', incremental=True)
+        third = self.collector.export_training_dataset(format='json', output_file='third', incremental=True)
+
+        with open(first, encoding='utf-8') as f:
+            self.assertEqual(len(json.load(f)['samples']), 2)
+        with open(second, encoding='utf-8') as f:
+            self.assertEqual([s['sample_id'] for s in json.load(f)['samples']], ['sample_3'])
+        self.assertIsNone(third)
+
+    def test_collected_samples_are_stored(self):
+        """Collected results are appended to the store with their engine"""
+        self.collector.collect_high_confidence_results([{
+            'raw_text': 'Faktura', 'extracted_data': {}, 'confidence_score': 99.0,
+            'engine_used': 'easyocr', 'document_type': 'paragon'
+        }])
+
+        samples = list(self.collector.store.iter_samples(engine='easyocr'))
+        self.assertEqual(len(samples), 1)
+        self.assertEqual(samples[0].document_type, 'paragon')
@@ -0,0 +1,39 @@
+"""
+Tests for the web tier import boundary
+
+Checks that Django startup and URL loading do not import OCR engines,
+image processing or PDF rendering libraries.
+"""
+
+import json
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+
+class WebImportBoundaryTest(SimpleTestCase):
+    """Test that web workers start without heavy libraries"""
+
+    def test_startup_does_not_import_heavy_modules(self):
+        """django.setup() plus URL loading keeps ML/PDF libraries unloaded"""
+        out = StringIO()
+        call_command('benchmark_import_time', runs=1, format='json', stdout=out)
+
+        report = json.loads(out.getvalue())
+
+        self.assertEqual(report['heavy_modules'], [])
+        self.assertGreater(report['total_seconds'], 0)
+
+    @patch('faktury.services.ocr_integration.get_ocr_service')
+    def test_ocr_integration_service_defers_engines(self, mock_get_ocr_service):
+        """OCR engine is resolved on first use, not on construction"""
+        from ..services.ocr_integration import OCRIntegrationService
+
+        service = OCRIntegrationService()
+        mock_get_ocr_service.assert_not_called()
+
+        self.assertIs(service.ocr_service, mock_get_ocr_service.return_value)
+        self.assertIs(service.ocr_service, mock_get_ocr_service.return_value)
+        mock_get_ocr_service.assert_called_once()
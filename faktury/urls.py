@@ -33,6 +33,7 @@ path('api/get-company-data/', views.pobierz_dane_z_gus, name='pobierz_dane_z_gus
     path('email.html', views.email_inbox, name='email_html'),
     path('email/', views.email_inbox, name='email_inbox'),
     path('notifications/', views.notifications_list, name='notifications_list'),
+    path('notifications/unread-count/', views.unread_notifications_count, name='unread_notifications_count'),
     path('firma/', views.edytuj_firme, name='firma'),
     path('dodaj_produkt/', views.dodaj_produkt, name='dodaj_produkt'),
     path('edytuj_produkt/<int:pk>/', views.edytuj_produkt, name='edytuj_produkt'),
@@ -46,6 +47,8 @@ path('api/get-company-data/', views.pobierz_dane_z_gus, name='pobierz_dane_z_gus
     path('kontrahenci/', views.kontrahenci, name='kontrahenci'),
     path('produkty/', views.produkty, name='produkty'),
     path('generuj_wiele_pdf/', views.generuj_wiele_pdf, name='generuj_wiele_pdf'),
+    path('archiwum_pdf/<str:nazwa>/', views.pobierz_archiwum_pdf, name='pobierz_archiwum_pdf'),
+    path('eksport_danych/<str:nazwa>/', views.pobierz_eksport_danych, name='pobierz_eksport_danych'),
     path('dodaj_fakture/', views.dodaj_fakture_sprzedaz, name='dodaj_fakture'),
     path('dodaj_fakture/koszt/', views.dodaj_fakture_koszt, name='dodaj_fakture_koszt'),
     path('sprzedaz/', views.faktury_sprzedaz, name='faktury_sprzedaz'),
@@ -133,8 +136,11 @@ path('api/get-company-data/', views.pobierz_dane_z_gus, name='pobierz_dane_z_gus
     path('api/validation-rules/', views_modules.validation_api_views.validation_rules, name='api_validation_rules'),
     path('api/validate-business-number/', views_modules.validation_api_views.validate_business_number, name='api_validate_business_number'),
     path('wiadomosci/', views.lista_wiadomosci, name='lista_wiadomosci'),
+    path('wiadomosci/nieprzeczytane/', views.unread_messages_count, name='unread_messages_count'),
     path('wiadomosci/wyslij/', views.wyslij_wiadomosc, name='wyslij_wiadomosc'),
     path('wiadomosci/systemowa/', views.wyslij_systemowa, name='wyslij_systemowa'),
+    path('wiadomosci/systemowa/<int:pk>/status/', views.status_rozgloszenia, name='status_rozgloszenia'),
+    path('wiadomosci/systemowa/<int:pk>/', views.szczegoly_rozgloszenia, name='szczegoly_rozgloszenia'),
     path('wiadomosci/<int:pk>/', views.szczegoly_wiadomosci, name='szczegoly_wiadomosci'),
     path('wiadomosci/odp/<int:pk>/', views.odp_wiadomosc, name='odp_wiadomosc'),
     path('dodaj/produkt/ajax/', views.dodaj_produkt_ajax, name='dodaj_produkt_ajax'),
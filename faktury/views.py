@@ -7,7 +7,7 @@ from django.utils.timezone import now
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.admin.views.decorators import staff_member_required
-from django.http import HttpResponse, JsonResponse
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.contrib import messages
 from django.db.models import Q, Sum, F, FloatField, DecimalField, Case, When
 from django.core.paginator import Paginator
@@ -17,12 +17,19 @@ from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
 from import_export.formats import base_formats
 from .resources import KontrahentResource, ProduktResource, FakturaResource
-import tempfile
 from django.core.mail import EmailMessage
 from django.urls import reverse
 from django.contrib.auth.hashers import make_password
 from django.core.mail import send_mail  
 from .faktury_ksiegowosc import auto_ksieguj_fakture
+from .cache_utils import cached
+from .services.invoice_pdf_service import archive_path, get_invoice_pdf_service
+from .services.gdpr_data_service import export_path as gdpr_export_path
+from .views_modules.team_views import get_calendar_data, get_events
+from .views_modules.notification_views import (
+    lista_wiadomosci, mark_all_notifications_read, szczegoly_rozgloszenia, status_rozgloszenia,
+    unread_messages_count, unread_notifications_count, wyslij_systemowa
+)
 import secrets 
 import string 
 import calendar
@@ -47,7 +54,6 @@ from .faktury_ksiegowosc import auto_ksieguj_fakture
 import datetime
 import json
 from decimal import Decimal
-from io import BytesIO
 
 
 @login_required
@@ -163,7 +169,6 @@ def notifications_list(request):
     return MissingPageHandler.create_notifications_page(request)
 import zipfile
 import requests
-from weasyprint import HTML
 from django.core.files.storage import default_storage
 from dateutil.relativedelta import relativedelta
 from requests import Session
@@ -622,37 +627,17 @@ def compare_periods(queryset, typ_faktury, current_start, current_end, previous_
         change = None
     return change
 
-##############################################
-# Widok główny
-##############################################
-
-@login_required
-def panel_uzytkownika(request):
-    # Pobieramy faktury aktualnego użytkownika
-    faktury = Faktura.objects.filter(user=request.user)
-
-    # Sortowanie faktur
-    sort_by = request.GET.get('sort', '-data_wystawienia')
-    valid_sort_fields = [
-        'typ_dokumentu', 'numer', 'data_sprzedazy', 'data_wystawienia',
-        'termin_platnosci', 'nabywca__nazwa', 'suma_netto', 'suma_brutto',
-        'status', 'typ_faktury'
-    ]
-    if sort_by.replace('-', '') in valid_sort_fields:
-        faktury = faktury.order_by(sort_by)
-    elif sort_by.replace('-', '') == 'produkt_usluga':
-        faktury = faktury.annotate(first_product_name=F('pozycjafaktury__nazwa'))
-        faktury = faktury.order_by(('-' if sort_by.startswith('-') else '') + 'first_product_name')
-    else:
-        faktury = faktury.order_by('-data_wystawienia')
+@cached('user_stats', user='user')
+def dashboard_stats(user, today):
+    """
+    Sumy, porównania okresów i dane wykresów panelu użytkownika
 
-    try:
-        firma = Firma.objects.get(user=request.user)
-    except Firma.DoesNotExist:
-        firma = None
+    Wynik jest cache'owany w przestrzeni 'user_stats' użytkownika i
+    unieważniany przy każdej zmianie jego faktur lub pozycji.
+    """
+    faktury = Faktura.objects.filter(user=user)
 
     # Ustalenie zakresów czasowych
-    today = timezone.now().date()
     # Tydzień: od poniedziałku do niedzieli
     week_start = today - datetime.timedelta(days=today.weekday())
     week_end = week_start + datetime.timedelta(days=7)
@@ -751,14 +736,7 @@ def panel_uzytkownika(request):
     costs_yearly_labels, costs_yearly_series = get_time_series(faktury, 'koszt', year_start, year_end)
     costs_total_labels, costs_total_series = get_time_series(faktury, 'koszt', total_start, total_end)
 
-    ##############################################
-    # Przygotowanie kontekstu
-    ##############################################
-
-    context = {
-        'faktury': faktury,
-        'firma': firma,
-        'sort_by': sort_by,
+    return {
         'sprzedaz': {
             'Tygodniowa': sprzedaz_tygodniowa,
             'Miesięczna': sprzedaz_miesieczna,
@@ -787,29 +765,76 @@ def panel_uzytkownika(request):
                 'Roczny': koszty_yearly_change,
             }
         },
-        # Dane do wykresów – konwertowane do JSON
-        'sales_weekly_labels': json.dumps(sales_weekly_labels),
-        'sales_weekly_series': json.dumps(sales_weekly_series),
-        'sales_monthly_labels': json.dumps(sales_monthly_labels),
-        'sales_monthly_series': json.dumps(sales_monthly_series),
-        'sales_quarterly_labels': json.dumps(sales_quarterly_labels),
-        'sales_quarterly_series': json.dumps(sales_quarterly_series),
-        'sales_yearly_labels': json.dumps(sales_yearly_labels),
-        'sales_yearly_series': json.dumps(sales_yearly_series),
-        'sales_total_labels': json.dumps(sales_total_labels),
-        'sales_total_series': json.dumps(sales_total_series),
-
-        'costs_weekly_labels': json.dumps(costs_weekly_labels),
-        'costs_weekly_series': json.dumps(costs_weekly_series),
-        'costs_monthly_labels': json.dumps(costs_monthly_labels),
-        'costs_monthly_series': json.dumps(costs_monthly_series),
-        'costs_quarterly_labels': json.dumps(costs_quarterly_labels),
-        'costs_quarterly_series': json.dumps(costs_quarterly_series),
-        'costs_yearly_labels': json.dumps(costs_yearly_labels),
-        'costs_yearly_series': json.dumps(costs_yearly_series),
-        'costs_total_labels': json.dumps(costs_total_labels),
-        'costs_total_series': json.dumps(costs_total_series),
+        'charts': {
+            'sales_weekly_labels': sales_weekly_labels,
+            'sales_weekly_series': sales_weekly_series,
+            'sales_monthly_labels': sales_monthly_labels,
+            'sales_monthly_series': sales_monthly_series,
+            'sales_quarterly_labels': sales_quarterly_labels,
+            'sales_quarterly_series': sales_quarterly_series,
+            'sales_yearly_labels': sales_yearly_labels,
+            'sales_yearly_series': sales_yearly_series,
+            'sales_total_labels': sales_total_labels,
+            'sales_total_series': sales_total_series,
+
+            'costs_weekly_labels': costs_weekly_labels,
+            'costs_weekly_series': costs_weekly_series,
+            'costs_monthly_labels': costs_monthly_labels,
+            'costs_monthly_series': costs_monthly_series,
+            'costs_quarterly_labels': costs_quarterly_labels,
+            'costs_quarterly_series': costs_quarterly_series,
+            'costs_yearly_labels': costs_yearly_labels,
+            'costs_yearly_series': costs_yearly_series,
+            'costs_total_labels': costs_total_labels,
+            'costs_total_series': costs_total_series,
+        },
+    }
+
+##############################################
+# Widok główny
+##############################################
+
+@login_required
+def panel_uzytkownika(request):
+    # Pobieramy faktury aktualnego użytkownika
+    faktury = Faktura.objects.filter(user=request.user)
+
+    # Sortowanie faktur
+    sort_by = request.GET.get('sort', '-data_wystawienia')
+    valid_sort_fields = [
+        'typ_dokumentu', 'numer', 'data_sprzedazy', 'data_wystawienia',
+        'termin_platnosci', 'nabywca__nazwa', 'suma_netto', 'suma_brutto',
+        'status', 'typ_faktury'
+    ]
+    if sort_by.replace('-', '') in valid_sort_fields:
+        faktury = faktury.order_by(sort_by)
+    elif sort_by.replace('-', '') == 'produkt_usluga':
+        faktury = faktury.annotate(first_product_name=F('pozycjafaktury__nazwa'))
+        faktury = faktury.order_by(('-' if sort_by.startswith('-') else '') + 'first_product_name')
+    else:
+        faktury = faktury.order_by('-data_wystawienia')
+
+    try:
+        firma = Firma.objects.get(user=request.user)
+    except Firma.DoesNotExist:
+        firma = None
+
+    stats = dashboard_stats(request.user, timezone.now().date())
+
+    ##############################################
+    # Przygotowanie kontekstu
+    ##############################################
+
+    context = {
+        'faktury': faktury,
+        'firma': firma,
+        'sort_by': sort_by,
+        'sprzedaz': stats['sprzedaz'],
+        'koszty': stats['koszty'],
+        'comparisons': stats['comparisons'],
     }
+    # Dane do wykresów – konwertowane do JSON
+    context.update({name: json.dumps(data) for name, data in stats['charts'].items()})
     return render(request, 'faktury/panel_uzytkownika.html', context)
 
 @login_required
@@ -1084,15 +1109,12 @@ def wyslij_fakture_mailem(request, pk):
             email.content_subtype = "html"
 
 
-            # Generowanie PDF (tak jak poprzednio, ale do BytesIO)
-            html_string = render_to_string('faktury/faktura_pdf.html', {'faktura': faktura})
-            html = HTML(string=html_string, base_url=request.build_absolute_uri())
-            pdf_file = BytesIO()  # Zapisuj do BytesIO
-            html.write_pdf(pdf_file)
+            # Generowanie PDF (z pamięci podręcznej, jeśli faktura się nie zmieniła)
+            pdf_content = get_invoice_pdf_service().render(faktura, base_url=request.build_absolute_uri())
 
 
             # Dodaj załącznik
-            email.attach(f'faktura_{faktura.numer}.pdf', pdf_file.getvalue(), 'application/pdf')
+            email.attach(f'faktura_{faktura.numer}.pdf', pdf_content, 'application/pdf')
 
 
             try:
@@ -1441,25 +1463,9 @@ def pobierz_dane_z_gus(request):
         return JsonResponse({'error': 'Wystąpił nieoczekiwany błąd. Spróbuj ponownie.'}, status=500)
 def generuj_pdf(request, pk):
     faktura = get_object_or_404(Faktura, pk=pk, user=request.user)
-    # Renderuj szablon HTML do stringa
-    html_string = render_to_string('faktury/faktura_pdf.html', {'faktura': faktura})
-
-    # Utwórz obiekt HTML z WeasyPrint
-    html = HTML(string=html_string, base_url=request.build_absolute_uri())
-
-    # Wygeneruj PDF
-    # Zapisz PDF do tymczasowego pliku
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as output:
-        html.write_pdf(output)
-        pdf_file_path = output.name
-
-    # Pobierz zawartość pliku
-    with open(pdf_file_path, 'rb') as f:
-        pdf_content = f.read()
+    # Renderuj PDF (w procesach roboczych, z pamięci podręcznej jeśli faktura się nie zmieniła)
+    pdf_content = get_invoice_pdf_service().render(faktura, base_url=request.build_absolute_uri())
 
-    # Usuń tymczasowy plik
-    import os
-    os.remove(pdf_file_path)
     # Zwróć PDF jako odpowiedź HTTP
     response = HttpResponse(pdf_content, content_type='application/pdf')
     response['Content-Disposition'] = f'attachment; filename="faktura_{faktura.numer}.pdf"'
@@ -1475,34 +1481,27 @@ def generuj_wiele_pdf(request):
             return redirect('panel_uzytkownika')
 
         # Pobierz obiekty Faktura dla wybranych ID
-        faktury = Faktura.objects.filter(pk__in=selected_invoice_ids, user=request.user)
-
-        # Generuj PDF dla każdej faktury i łącz je w jeden plik (lub zwracaj jako archiwum ZIP)
-        pdf_files = []
-        for faktura in faktury:
-            html_string = render_to_string('faktury/faktura_pdf.html', {'faktura': faktura})
-            html = HTML(string=html_string, base_url=request.build_absolute_uri())
-            pdf_file = BytesIO()  # Zapisuj PDF do pamięci, a nie do pliku
-            html.write_pdf(pdf_file)
-            pdf_files.append((f'faktura_{faktura.numer}.pdf', pdf_file.getvalue())) #nazwa pliku i jego zawartosc
-
-        # Opcja 1: Połącz PDF-y w jeden (używając np. PyPDF2)
-        # merged_pdf = BytesIO() #pamiec podreczna
-        # merger = PyPDF2.PdfMerger()
-        # for filename, file_content in pdf_files:
-        #      merger.append(BytesIO(file_content))
-        # merger.write(merged_pdf)
-        # response = HttpResponse(merged_pdf.getvalue(), content_type='application/pdf')
-        # response['Content-Disposition'] = 'attachment; filename="faktury.pdf"'
-        # return response
-
-        # Opcja 2: Zwróć ZIP (prostsza i często lepsza opcja)
-        zip_buffer = BytesIO()
-        with zipfile.ZipFile(zip_buffer, "a", zipfile.ZIP_DEFLATED, False) as zip_file:
-            for filename, file_content in pdf_files:
-                zip_file.writestr(filename, file_content)
-
-        response = HttpResponse(zip_buffer.getvalue(), content_type='application/zip')
+        faktury = Faktura.objects.filter(
+            pk__in=selected_invoice_ids, user=request.user
+        ).select_related('sprzedawca', 'nabywca').prefetch_related('pozycjafaktury_set')
+
+        pdf_service = get_invoice_pdf_service()
+        base_url = request.build_absolute_uri()
+
+        # Duże paczki generuje Celery - użytkownik dostaje powiadomienie z linkiem do archiwum
+        invoice_ids = list(faktury.values_list('pk', flat=True))
+        if pdf_service.should_render_async(len(invoice_ids)):
+            from .tasks import generate_invoice_pdf_archive_task
+            generate_invoice_pdf_archive_task.delay(request.user.id, invoice_ids, base_url)
+            messages.info(
+                request,
+                f"Generowanie {len(invoice_ids)} faktur PDF zostało zlecone. "
+                "Otrzymasz powiadomienie, gdy archiwum będzie gotowe."
+            )
+            return redirect('panel_uzytkownika')
+
+        # Archiwum ZIP jest strumieniowane - każdy PDF wysyłany od razu po wyrenderowaniu
+        response = StreamingHttpResponse(pdf_service.iter_zip(faktury, base_url), content_type='application/zip')
         response['Content-Disposition'] = 'attachment; filename="faktury.zip"'
         return response
 
@@ -1511,6 +1510,34 @@ def generuj_wiele_pdf(request):
         return redirect('panel_uzytkownika')
 
 
+@login_required
+def pobierz_archiwum_pdf(request, nazwa):
+    """Pobiera archiwum PDF wygenerowane w tle przez generate_invoice_pdf_archive_task."""
+    try:
+        path = archive_path(request.user.id, nazwa)
+    except ValueError:
+        raise Http404("Nie znaleziono archiwum.")
+
+    if not default_storage.exists(path):
+        raise Http404("Nie znaleziono archiwum.")
+
+    return FileResponse(default_storage.open(path, 'rb'), as_attachment=True, filename='faktury.zip')
+
+
+@login_required
+def pobierz_eksport_danych(request, nazwa):
+    """Pobiera eksport danych RODO wygenerowany w tle przez export_user_data_task."""
+    try:
+        path = gdpr_export_path(request.user.id, nazwa)
+    except ValueError:
+        raise Http404("Nie znaleziono eksportu.")
+
+    if not path.exists() or path.with_name(path.name + '.checkpoint').exists():
+        raise Http404("Nie znaleziono eksportu.")
+
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename='eksport_danych.zip')
+
+
 
 
 
@@ -1736,11 +1763,8 @@ def wyslij_przypomnienie(request, pk):
 
 
      # Wygeneruj PDF i dołącz
-    html_string = render_to_string('faktury/faktura_pdf.html', {'faktura': faktura})
-    html = HTML(string=html_string, base_url=request.build_absolute_uri())
-    pdf_file = BytesIO() # Zapisz do BytesIO
-    html.write_pdf(pdf_file)
-    email.attach(f'faktura_{faktura.numer}.pdf', pdf_file.getvalue(), 'application/pdf')
+    pdf_content = get_invoice_pdf_service().render(faktura, base_url=request.build_absolute_uri())
+    email.attach(f'faktura_{faktura.numer}.pdf', pdf_content, 'application/pdf')
 
 
     try:
@@ -1752,79 +1776,6 @@ def wyslij_przypomnienie(request, pk):
     return redirect('szczegoly_faktury', pk=pk)
 
 
-def get_events(request):
-    """Zwraca wydarzenia (faktury i zadania) dla kalendarza w formacie JSON."""
-
-    # Pobierz faktury użytkownika
-    faktury = Faktura.objects.filter(user=request.user)
-    wydarzenia = []
-
-    for faktura in faktury:
-        if faktura.typ_faktury == 'sprzedaz':
-            color = 'var(--warning-600)'
-            title = f"Termin płatności: {faktura.numer} (Sprzedaż)"
-        else:
-            color = 'var(--danger-600)'
-            title = f"Termin płatności: {faktura.numer} (Koszt)"
-
-        wydarzenia.append({
-            'title': title,
-            'start': faktura.termin_platnosci.isoformat(),
-            'end': faktura.termin_platnosci.isoformat(),
-            'color': color,
-            'url': reverse('szczegoly_faktury', args=[faktura.pk]),
-            'allDay': True,  # <-- dzięki temu widać je także w widoku tygodnia/dnia
-        })
-
-    # Zadania użytkownika
-    zadania = ZadanieUzytkownika.objects.filter(user=request.user)
-    for zadanie in zadania:
-        wydarzenia.append({
-            'title': zadanie.tytul,
-            'start': zadanie.termin_wykonania.isoformat(),
-            'end': zadanie.termin_wykonania.isoformat(),
-            'color': 'var(--success-600)',
-            'allDay': True,  # <-- również całodniowe
-        })
-
-    return JsonResponse(wydarzenia, safe=False)
-
-@login_required
-def get_calendar_data(request):
-    """Zwraca dane dla kalendarza w formacie JSON."""
-
-    faktury = Faktura.objects.filter(user=request.user)
-    zadania = ZadanieUzytkownika.objects.filter(user=request.user)
-
-    events = []
-
-    for faktura in faktury:
-        events.append({
-            'id': f'faktura-{faktura.pk}',
-            'title': f"{'Sprzedaż' if faktura.typ_faktury == 'sprzedaz' else 'Koszt'}: {faktura.numer}",
-            'start': faktura.termin_platnosci.isoformat(),
-            'end': faktura.termin_platnosci.isoformat(),
-            'allDay': True,
-            'url': reverse('szczegoly_faktury', args=[faktura.pk]),
-            'backgroundColor': 'blue' if faktura.typ_faktury == 'sprzedaz' else 'red',
-            'classNames': ['faktura-event'],  # Dodatkowa klasa CSS
-        })
-
-    for zadanie in zadania:
-        events.append({
-            'id': f'zadanie-{zadanie.pk}',
-            'title': zadanie.tytul,
-            'start': zadanie.termin_wykonania.isoformat(),
-            'end': zadanie.termin_wykonania.isoformat(),
-            'allDay': True,
-            'url': reverse('szczegoly_zadania_uzytkownika', args=[zadanie.pk]),
-             'backgroundColor': 'green',
-             'classNames': ['zadanie-event'],
-
-        })
-
-    return JsonResponse(events, safe=False)  # safe=False jest *konieczne* gdy zwracamy listę
-
 @login_required
 def wyslij_wiadomosc(request, zespol_id):
     zespol = get_object_or_404(Zespol, pk=zespol_id)
@@ -2063,11 +2014,6 @@ def delete_notification(request, notification_id):
         notification.delete()
     return redirect(reverse("notifications_list"))
 
-@login_required
-def mark_all_notifications_read(request):
-    Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
-    return JsonResponse({'status': 'ok'})
-
 # Removed duplicate function - using the one from notifications app
 
 def notifications_json(request):
@@ -2081,11 +2027,6 @@ def notifications_json(request):
     } for n in notifications]
     return JsonResponse(data, safe=False)
 
-@login_required
-def mark_all_notifications_read(request):
-    Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
-    return JsonResponse({'status': 'ok'})
-
 def mark_as_read(request, notification_id):
     notification = get_object_or_404(Notification, id=notification_id, user=request.user)
     notification.is_read = True
@@ -2148,11 +2089,6 @@ def odp_wiadomosc(request, pk):
         
     return render(request, 'faktury/odp_wiadomosc.html', {'form': form, 'parent_msg': parent_msg})
 
-@login_required
-def unread_notifications_count(request):
-    count = Notification.objects.filter(user=request.user, is_read=False).count()
-    return JsonResponse({'count': count})
-
 @login_required
 def export_kontrahenci(request):
     resource = KontrahentResource()
@@ -2472,6 +2408,7 @@ def generate_kp(request, pk):
 
             # Generate PDF
             html = render_to_string('faktury/kp_pdf.html', {'faktura': kp})
+            from weasyprint import HTML  # Imported lazily: loads Pango/Cairo
             pdf = HTML(string=html).write_pdf()
 
             # Save PDF to response
@@ -2496,29 +2433,6 @@ def szczegoly_kp(request, pk):
     kp = get_object_or_404(Faktura, pk=pk, user=request.user)
     return render(request, 'faktury/szczegoly_kp.html', {'kp': kp})
 
-@login_required
-def lista_wiadomosci(request):
-    # Wiadomości od partnerów
-    partner_wiadomosci = Wiadomosc.objects.filter(
-        odbiorca_user=request.user, 
-        typ_wiadomosci='partner'
-    ).order_by('-data_wyslania')
-    
-    # Wiadomości systemowe
-    system_wiadomosci = Wiadomosc.objects.filter(
-        odbiorca_user=request.user,
-        typ_wiadomosci='system'
-    ).order_by('-data_wyslania')
-
-    # Oznacz nieprzeczytane jako przeczytane przy pierwszym otwarciu
-    if not request.GET.get('page'):
-        partner_wiadomosci.filter(przeczytana=False).update(przeczytana=True)
-
-    return render(request, 'wiadomosci/lista.html', {
-        'partner_wiadomosci': partner_wiadomosci,
-        'system_wiadomosci': system_wiadomosci
-    })
-
 @login_required
 def wyslij_wiadomosc(request):
     partnerstwa = Partnerstwo.objects.filter(
@@ -2549,27 +2463,6 @@ def wyslij_wiadomosc(request):
 
     return render(request, 'wiadomosci/wyslij.html', {'form': form})
 
-@login_required
-@staff_member_required
-def wyslij_systemowa(request):
-    if request.method == 'POST':
-        form = SystemowaWiadomoscForm(request.POST)
-        if form.is_valid():
-            users = User.objects.all()
-            for user in users:
-                Wiadomosc.objects.create(
-                    temat=form.cleaned_data['temat'],
-                    tresc=form.cleaned_data['tresc'],
-                    odbiorca_user=user,
-                    typ_wiadomosci='system'
-                )
-            messages.success(request, "Wiadomość systemowa wysłana do wszystkich użytkowników")
-            return redirect('lista_wiadomosci')
-    else:
-        form = SystemowaWiadomoscForm()
-    
-    return render(request, 'wiadomosci/wyslij_systemowa.html', {'form': form})
-
 @login_required
 def pobierz_dane_z_gus(request):
     """
@@ -2830,37 +2723,6 @@ def twoje_sprawy(request):
     }
     return render(request, 'faktury/twoje_sprawy.html', context)
 
-@login_required
-def get_events(request):
-    """
-    API endpoint for calendar events
-    """
-    events = []
-    
-    # Get user's tasks as events
-    zadania = ZadanieUzytkownika.objects.filter(user=request.user)
-    for zadanie in zadania:
-        events.append({
-            'id': f'task_{zadanie.id}',
-            'title': zadanie.opis,
-            'start': zadanie.data_utworzenia.isoformat(),
-            'color': '#007bff' if not zadanie.wykonane else '#28a745',
-            'url': f'/zadania_uzytkownika/{zadanie.id}/'
-        })
-    
-    # Get invoices as events
-    faktury = Faktura.objects.filter(user=request.user)
-    for faktura in faktury:
-        events.append({
-            'id': f'invoice_{faktura.id}',
-            'title': f'Faktura {faktura.numer}',
-            'start': faktura.data_wystawienia.isoformat(),
-            'color': '#dc3545' if faktura.status == 'nieoplacona' else '#28a745',
-            'url': f'/faktura/{faktura.id}/'
-        })
-    
-    return JsonResponse(events, safe=False)
-
 @login_required
 def moje_zadania(request):
     """
@@ -2882,20 +2744,6 @@ def szczegoly_zadania_uzytkownika(request, pk):
     
     return render(request, 'faktury/szczegoly_zadania_uzytkownika.html', {'zadanie': zadanie})
 
-@login_required
-def lista_wiadomosci(request):
-    """
-    Display list of messages
-    """
-    wiadomosci = Wiadomosc.objects.filter(
-        Q(nadawca_user=request.user) | Q(odbiorca_user=request.user)
-    ).order_by('-data_wyslania')
-    
-    context = {
-        'wiadomosci': wiadomosci,
-    }
-    return render(request, 'wiadomosci/lista.html', context)
-
 @login_required
 def szczegoly_wiadomosci(request, pk):
     """
@@ -12,6 +12,7 @@ from django.utils import timezone
 from dateutil.relativedelta import relativedelta
 
 from ..models import Faktura, Firma, DocumentUpload, OCRResult, OCRValidation
+from ..services.ocr_statistics import OCRStatistics
 
 
 def get_total(queryset, typ_faktury, start_date, end_date):
@@ -275,111 +276,47 @@ def faktury_koszt(request):
 # OCR DASHBOARD FUNCTIONS
 # ============================================================================
 
-def get_ocr_statistics(user, days=30):
+def get_ocr_statistics(user, days=30, statistics=None):
     """Get OCR statistics for dashboard"""
-    from django.db.models import Count, Avg
-    from django.conf import settings
+    statistics = statistics or OCRStatistics.last_days(days, user=user)
+    documents = statistics.documents
+    results = statistics.results
+    bands = results['confidence_bands']
     
-    # Calculate date range
-    end_date = timezone.now()
-    start_date = end_date - datetime.timedelta(days=days)
+    total_documents = documents['total']
+    total_results = results['total']
     
-    # Base querysets for user
-    documents = DocumentUpload.objects.filter(
-        user=user,
-        upload_timestamp__gte=start_date
-    )
-    
-    ocr_results = OCRResult.objects.filter(
-        document__user=user,
-        created_at__gte=start_date
-    )
-    
-    # Document statistics
-    total_documents = documents.count()
-    completed_docs = documents.filter(processing_status='completed').count()
-    failed_docs = documents.filter(processing_status='failed').count()
-    processing_docs = documents.filter(processing_status='processing').count()
-    
-    # OCR accuracy statistics
-    if ocr_results.exists():
-        confidence_stats = ocr_results.aggregate(
-            avg_confidence=Avg('confidence_score'),
-            high_confidence=Count('id', filter=Q(confidence_score__gte=95)),
-            medium_confidence=Count('id', filter=Q(confidence_score__gte=80, confidence_score__lt=95)),
-            low_confidence=Count('id', filter=Q(confidence_score__lt=80)),
-            auto_created=Count('id', filter=Q(faktura__isnull=False)),
-        )
-        
-        processing_stats = ocr_results.aggregate(
-            avg_processing_time=Avg('processing_time')
-        )
-    else:
-        confidence_stats = {
-            'avg_confidence': 0,
-            'high_confidence': 0,
-            'medium_confidence': 0,
-            'low_confidence': 0,
-            'auto_created': 0,
-        }
-        processing_stats = {'avg_processing_time': 0}
-    
-    # Calculate success rate
-    success_rate = (completed_docs / total_documents * 100) if total_documents > 0 else 0
-    
-    # Calculate auto-creation rate
-    auto_creation_rate = (confidence_stats['auto_created'] / ocr_results.count() * 100) if ocr_results.count() > 0 else 0
+    # Calculate success and auto-creation rates
+    success_rate = (documents['completed'] / total_documents * 100) if total_documents > 0 else 0
+    auto_creation_rate = (results['with_invoice'] / total_results * 100) if total_results > 0 else 0
     
     return {
         'total_documents': total_documents,
-        'completed_documents': completed_docs,
-        'failed_documents': failed_docs,
-        'processing_documents': processing_docs,
+        'completed_documents': documents['completed'],
+        'failed_documents': documents['failed'],
+        'processing_documents': documents['processing'],
         'success_rate': round(success_rate, 1),
-        'avg_confidence': round(confidence_stats['avg_confidence'] or 0, 1),
-        'high_confidence_count': confidence_stats['high_confidence'],
-        'medium_confidence_count': confidence_stats['medium_confidence'],
-        'low_confidence_count': confidence_stats['low_confidence'],
-        'auto_created_invoices': confidence_stats['auto_created'],
+        'avg_confidence': round(results['avg_confidence'], 1),
+        'high_confidence_count': bands['95-100%'],
+        'medium_confidence_count': bands['80-94%'],
+        'low_confidence_count': bands['60-79%'] + bands['<60%'],
+        'auto_created_invoices': results['with_invoice'],
         'auto_creation_rate': round(auto_creation_rate, 1),
-        'avg_processing_time': round(processing_stats['avg_processing_time'] or 0, 1),
-        'total_ocr_results': ocr_results.count(),
+        'avg_processing_time': round(results['avg_processing_time'], 1),
+        'total_ocr_results': total_results,
     }
 
 
-def get_ocr_chart_data(user, days=30):
+def get_ocr_chart_data(user, days=30, statistics=None):
     """Get OCR data for charts"""
-    end_date = timezone.now()
-    start_date = end_date - datetime.timedelta(days=days)
-    
-    # Daily upload trend
-    daily_uploads = DocumentUpload.objects.filter(
-        user=user,
-        upload_timestamp__gte=start_date
-    ).extra(
-        select={'day': 'date(upload_timestamp)'}
-    ).values('day').annotate(
-        uploads=Count('id'),
-        completed=Count('id', filter=Q(processing_status='completed')),
-        failed=Count('id', filter=Q(processing_status='failed'))
-    ).order_by('day')
-    
-    # Confidence distribution
-    ocr_results = OCRResult.objects.filter(
-        document__user=user,
-        created_at__gte=start_date
-    )
-    
-    confidence_ranges = [
-        ('95-100%', ocr_results.filter(confidence_score__gte=95).count()),
-        ('80-94%', ocr_results.filter(confidence_score__gte=80, confidence_score__lt=95).count()),
-        ('60-79%', ocr_results.filter(confidence_score__gte=60, confidence_score__lt=80).count()),
-        ('<60%', ocr_results.filter(confidence_score__lt=60).count()),
-    ]
+    statistics = statistics or OCRStatistics.last_days(days, user=user)
     
     return {
-        'daily_uploads': list(daily_uploads),
-        'confidence_distribution': confidence_ranges,
+        'daily_uploads': [
+            {'day': row['day'], 'uploads': row['uploads'], 'completed': row['completed'], 'failed': row['failed']}
+            for row in statistics.documents['daily']
+        ],
+        'confidence_distribution': list(statistics.results['confidence_bands'].items()),
     }
 
 
@@ -424,8 +361,9 @@ def get_recent_ocr_activity(user, limit=5):
 
 def get_ocr_dashboard_context(user):
     """Get complete OCR context for dashboard"""
-    stats = get_ocr_statistics(user)
-    charts = get_ocr_chart_data(user)
+    statistics = OCRStatistics.last_days(30, user=user)
+    stats = get_ocr_statistics(user, statistics=statistics)
+    charts = get_ocr_chart_data(user, statistics=statistics)
     recent = get_recent_ocr_activity(user)
     
     return {
@@ -521,7 +521,7 @@ class BulkOperationsView(View):
                 from faktury.models import Faktura
                 updated_count = Faktura.objects.filter(
                     user=user, id__in=item_ids
-                ).update(status=new_status)
+                ).update_status(new_status)
                 
                 return {
                     'success': True,
@@ -25,19 +25,15 @@ Invoice management views
 import datetime
 import logging
 from decimal import Decimal
-from io import BytesIO
-from zipfile import ZipFile
 
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.core.mail import send_mail, EmailMessage
-from django.template.loader import render_to_string
 from django.conf import settings
 from django.db import transaction
 from django.utils import timezone
-from weasyprint import HTML, CSS
 
 from ..models import Faktura, Firma, Kontrahent, Produkt, PozycjaFaktury
 from ..forms import (
@@ -45,6 +41,7 @@ from ..forms import (
     FakturaProformaForm, KorektaFakturyForm, ParagonForm, KpForm
 )
 from ..utils import generuj_numer
+from ..services.invoice_pdf_service import get_invoice_pdf_service
 from ..constants import JEDNOSTKI
 
 logger = logging.getLogger(__name__)
@@ -348,14 +345,8 @@ def generuj_pdf(request, pk):
     """Generate PDF for invoice"""
     faktura = get_object_or_404(Faktura, pk=pk, user=request.user)
     
-    # Render HTML template to string
-    html_string = render_to_string('faktury/faktura_pdf.html', {'faktura': faktura})
-
-    # Create HTML object with WeasyPrint
-    html = HTML(string=html_string)
-    
-    # Generate PDF
-    pdf = html.write_pdf()
+    # Rendered by the PDF worker pool, cached until the invoice changes
+    pdf = get_invoice_pdf_service().render(faktura)
 
     # Create HTTP response with PDF
     response = HttpResponse(pdf, content_type='application/pdf')
@@ -374,24 +365,22 @@ def generuj_wiele_pdf(request):
             messages.error(request, 'Nie wybrano żadnej faktury.')
             return redirect('panel_uzytkownika')
 
-        faktury = Faktura.objects.filter(id__in=selected_invoice_ids, user=request.user)
+        faktury = Faktura.objects.filter(
+            id__in=selected_invoice_ids, user=request.user
+        ).select_related('sprzedawca', 'nabywca').prefetch_related('pozycjafaktury_set')
 
-        # Create ZIP file in memory
-        zip_buffer = BytesIO()
-        with ZipFile(zip_buffer, 'w') as zip_file:
-            for faktura in faktury:
-                # Generate PDF for each invoice
-                html_string = render_to_string('faktury/faktura_pdf.html', {'faktura': faktura})
-                html = HTML(string=html_string)
-                pdf = html.write_pdf()
-                
-                # Add PDF to ZIP
-                zip_file.writestr(f"faktura_{faktura.numer}.pdf", pdf)
+        pdf_service = get_invoice_pdf_service()
 
-        zip_buffer.seek(0)
+        # Large selections are rendered by Celery, the user is notified when ready
+        invoice_ids = list(faktury.values_list('id', flat=True))
+        if pdf_service.should_render_async(len(invoice_ids)):
+            from ..tasks import generate_invoice_pdf_archive_task
+            generate_invoice_pdf_archive_task.delay(request.user.id, invoice_ids)
+            messages.info(request, 'Archiwum PDF jest generowane. Otrzymasz powiadomienie, gdy będzie gotowe.')
+            return redirect('panel_uzytkownika')
 
-        # Create HTTP response with ZIP
-        response = HttpResponse(zip_buffer.getvalue(), content_type='application/zip')
+        # Stream ZIP file, each PDF is sent as soon as it is rendered
+        response = StreamingHttpResponse(pdf_service.iter_zip(faktury), content_type='application/zip')
         response['Content-Disposition'] = 'attachment; filename="faktury.zip"'
         
         return response
@@ -411,9 +400,7 @@ def wyslij_fakture_mailem(request, pk):
 
     try:
         # Generate PDF
-        html_string = render_to_string('faktury/faktura_pdf.html', {'faktura': faktura})
-        html = HTML(string=html_string)
-        pdf = html.write_pdf()
+        pdf = get_invoice_pdf_service().render(faktura)
 
         # Prepare email
         subject = f'Faktura {faktura.numer}'
@@ -5,13 +5,18 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.contrib.auth.models import User
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
 from django.urls import reverse
 from django.contrib.humanize.templatetags.humanize import naturaltime
 
-from ..models import Wiadomosc, Partnerstwo
+from ..models import Wiadomosc, Partnerstwo, SystemBroadcast
 from ..notifications.models import Notification
 from ..forms import SystemowaWiadomoscForm
+from ..services.inbox import DEFAULT_PAGE_SIZE as INBOX_PAGE_SIZE, TABS as INBOX_TABS, inbox_page, mark_read
+from ..services.system_broadcast import (
+    broadcast_status, get_config as get_broadcast_config, mark_broadcast_read, start_broadcast, visible_broadcasts
+)
+from ..services.unread_counters import MESSAGES, NOTIFICATIONS, adjust_unread, get_unread_count
 
 
 @login_required
@@ -78,10 +83,11 @@ def mark_notification_read(request, pk):
 @login_required
 def mark_all_notifications_read(request):
     """Mark all notifications as read for user"""
-    Notification.objects.filter(
+    updated = Notification.objects.filter(
         user=request.user, 
         is_read=False
     ).update(is_read=True)
+    adjust_unread(request.user.pk, NOTIFICATIONS, -updated)
     return JsonResponse({'status': 'ok'})
 
 
@@ -98,11 +104,13 @@ def delete_notification(request, notification_id):
 @login_required
 def unread_notifications_count(request):
     """Get count of unread notifications"""
-    count = Notification.objects.filter(
-        user=request.user, 
-        is_read=False
-    ).count()
-    return JsonResponse({'count': count})
+    return JsonResponse({'count': get_unread_count(request.user.pk, NOTIFICATIONS)})
+
+
+@login_required
+def unread_messages_count(request):
+    """Get count of unread messages"""
+    return JsonResponse({'count': get_unread_count(request.user.pk, MESSAGES)})
 
 
 # Message Management Views
@@ -171,49 +179,50 @@ def odp_wiadomosc(request, pk):
 
 @login_required
 def lista_wiadomosci(request):
-    """List messages for user"""
-    # Messages from partners
-    partner_wiadomosci = Wiadomosc.objects.filter(
-        odbiorca_user=request.user, 
-        typ_wiadomosci='partner'
-    ).select_related('autor').order_by('-data_wyslania')
-    
-    # Team messages
-    zespol_wiadomosci = Wiadomosc.objects.filter(
-        odbiorca_user=request.user,
-        typ_wiadomosci='zespol'
-    ).select_related('autor', 'zespol').order_by('-data_wyslania')
+    """
+    List one inbox tab, a page at a time
     
-    # System messages
-    systemowe_wiadomosci = Wiadomosc.objects.filter(
-        odbiorca_user=request.user,
-        typ_wiadomosci='systemowa'
-    ).select_related('autor').order_by('-data_wyslania')
+    Unread messages shown on the page are marked read; the rest of the
+    inbox keeps its state.
+    """
+    tab = request.GET.get('tab', 'partner')
+    if tab not in INBOX_TABS:
+        tab = 'partner'
+    try:
+        page = inbox_page(request.user, tab, request.GET.get('cursor'))
+    except ValueError:
+        raise Http404("Nieprawidłowy kursor")
     
-    # Sent messages
-    wyslane_wiadomosci = Wiadomosc.objects.filter(
-        autor=request.user
-    ).select_related('odbiorca_user').order_by('-data_wyslania')
+    # Receipts-mode broadcasts are few, list them above the first page of system messages
+    rozgloszenia = []
+    if tab == 'system' and not request.GET.get('cursor'):
+        rozgloszenia = list(visible_broadcasts(request.user)[:INBOX_PAGE_SIZE])
     
-    # Mark messages as read when viewing the list
-    Wiadomosc.objects.filter(
-        odbiorca_user=request.user,
-        przeczytana=False
-    ).update(przeczytana=True)
+    mark_read(request.user, [
+        wiadomosc.pk for wiadomosc in page.messages
+        if not wiadomosc.przeczytana and wiadomosc.odbiorca_user_id == request.user.pk
+    ])
     
     context = {
-        'partner_wiadomosci': partner_wiadomosci,
-        'zespol_wiadomosci': zespol_wiadomosci,
-        'systemowe_wiadomosci': systemowe_wiadomosci,
-        'wyslane_wiadomosci': wyslane_wiadomosci,
+        'tab': tab,
+        'tabs': [(name, label) for name, (label, _) in INBOX_TABS.items()],
+        'wiadomosci': page.messages,
+        'next_cursor': page.next_cursor,
+        'rozgloszenia': rozgloszenia,
+        'unread_wiadomosci_count': get_unread_count(request.user.pk, MESSAGES),
     }
     
-    return render(request, 'faktury/lista_wiadomosci.html', context)
+    return render(request, 'wiadomosci/lista.html', context)
 
 
 @login_required
 def wyslij_systemowa(request):
-    """Send system message to all users (admin only)"""
+    """
+    Send system message to all users (admin only)
+    
+    Delivery runs in the background; the response carries the broadcast ID
+    whose progress is served by status_rozgloszenia.
+    """
     if not request.user.is_staff:
         messages.error(request, "Nie masz uprawnień do wysyłania wiadomości systemowych.")
         return redirect('panel_uzytkownika')
@@ -221,33 +230,45 @@ def wyslij_systemowa(request):
     if request.method == 'POST':
         form = SystemowaWiadomoscForm(request.POST)
         if form.is_valid():
-            temat = form.cleaned_data['temat']
-            tresc = form.cleaned_data['tresc']
-            
-            # Send to all active users
-            users = User.objects.filter(is_active=True)
-            created_count = 0
+            broadcast = start_broadcast(
+                request.user, form.cleaned_data['temat'], form.cleaned_data['tresc'], form.cleaned_data['mode']
+            )
             
-            for user in users:
-                if user != request.user:  # Don't send to self
-                    Wiadomosc.objects.create(
-                        autor=request.user,
-                        odbiorca_user=user,
-                        temat=temat,
-                        tresc=tresc,
-                        typ_wiadomosci='systemowa'
-                    )
-                    created_count += 1
+            if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+                return JsonResponse({
+                    **broadcast_status(broadcast),
+                    'status_url': reverse('status_rozgloszenia', args=[broadcast.pk]),
+                }, status=202)
             
             messages.success(
-                request, 
-                f'Wiadomość systemowa została wysłana do {created_count} użytkowników.'
+                request,
+                f'Wiadomość systemowa #{broadcast.pk} jest wysyłana do {broadcast.total_recipients} użytkowników.'
             )
-            return redirect('panel_uzytkownika')
+            return redirect('lista_wiadomosci')
     else:
-        form = SystemowaWiadomoscForm()
+        form = SystemowaWiadomoscForm(initial={'mode': get_broadcast_config()['mode']})
+    
+    return render(request, 'wiadomosci/wyslij_systemowa.html', {'form': form})
+
+
+@login_required
+def status_rozgloszenia(request, pk):
+    """Delivery progress of a system broadcast (admin only)"""
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Brak uprawnień'}, status=403)
+    
+    broadcast = get_object_or_404(SystemBroadcast, pk=pk)
+    return JsonResponse(broadcast_status(broadcast))
+
+
+@login_required
+def szczegoly_rozgloszenia(request, pk):
+    """Display a receipts-mode system broadcast and record that it was read"""
+    broadcast = get_object_or_404(visible_broadcasts(request.user), pk=pk)
+    if not broadcast.przeczytana:
+        mark_broadcast_read(request.user, broadcast)
     
-    return render(request, 'faktury/wyslij_systemowa.html', {'form': form})
+    return render(request, 'wiadomosci/rozgloszenie.html', {'rozgloszenie': broadcast})
 
 
 @login_required
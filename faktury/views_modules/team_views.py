@@ -13,6 +13,8 @@ from django.http import JsonResponse
 from django.conf import settings
 from django.utils import timezone
 from django.db.models import Q
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 
 from ..models import (
     Firma, Zespol, CzlonekZespolu, Zadanie, ZadanieUzytkownika, 
@@ -22,6 +24,7 @@ from ..forms import (
     ZespolForm, CzlonekZespoluFormSet, WiadomoscForm, ZadanieForm,
     ZadanieUzytkownikaForm
 )
+from ..services.calendar_feed import calendar_data, calendar_etag, calendar_events, parse_window
 
 
 def generate_password(length=12):
@@ -475,78 +478,38 @@ def szczegoly_zadania_uzytkownika(request, pk):
 
 # Calendar and Events API
 
+def _calendar_etag(feed):
+    """ETag function for a calendar feed, None when the window is invalid"""
+    def etag(request):
+        try:
+            start, end = parse_window(request.GET)
+        except ValueError:
+            return None
+        return calendar_etag(request.user.pk, feed, start, end)
+    return etag
+
+
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_calendar_etag('events'))
 def get_events(request):
-    """Return events (invoices and tasks) for calendar in JSON format"""
-    events = []
-    
-    # Get user invoices
-    faktury = Faktura.objects.for_user(request.user).with_related()
-    
-    for faktura in faktury:
-        # Add invoice issue date
-        events.append({
-            'title': f'Faktura {faktura.numer}',
-            'start': faktura.data_wystawienia.isoformat(),
-            'url': f'/szczegoly_faktury/{faktura.pk}/',
-            'color': '#3788d8',
-            'type': 'faktura'
-        })
-        
-        # Add payment deadline
-        if faktura.termin_platnosci:
-            events.append({
-                'title': f'Termin płatności - {faktura.numer}',
-                'start': faktura.termin_platnosci.isoformat(),
-                'url': f'/szczegoly_faktury/{faktura.pk}/',
-                'color': '#f39c12' if faktura.status != 'oplacona' else '#27ae60',
-                'type': 'termin_platnosci'
-            })
-    
-    # Get user tasks
-    zadania = ZadanieUzytkownika.objects.filter(user=request.user)
-    
-    for zadanie in zadania:
-        events.append({
-            'title': zadanie.opis,
-            'start': zadanie.termin_wykonania.isoformat(),
-            'color': '#e74c3c' if not zadanie.wykonane else '#27ae60',
-            'type': 'zadanie'
-        })
+    """Return events (invoices and tasks) between FullCalendar's start and end in JSON format"""
+    try:
+        start, end = parse_window(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
     
-    return JsonResponse(events, safe=False)
+    return JsonResponse(calendar_events(request.user, start, end), safe=False)
 
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_calendar_etag('data'))
 def get_calendar_data(request):
-    """Return calendar data in JSON format"""
-    faktury = Faktura.objects.for_user(request.user)
-    zadania = ZadanieUzytkownika.objects.filter(user=request.user)
-    
-    calendar_data = {
-        'faktury': [],
-        'zadania': [],
-        'events': []
-    }
+    """Return invoices and tasks between start and end in JSON format"""
+    try:
+        start, end = parse_window(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
     
-    # Process invoices
-    for faktura in faktury:
-        calendar_data['faktury'].append({
-            'id': faktura.pk,
-            'numer': faktura.numer,
-            'data_wystawienia': faktura.data_wystawienia.isoformat(),
-            'termin_platnosci': faktura.termin_platnosci.isoformat() if faktura.termin_platnosci else None,
-            'status': faktura.status,
-            'suma_brutto': str(faktura.suma_brutto),
-        })
-    
-    # Process tasks
-    for zadanie in zadania:
-        calendar_data['zadania'].append({
-            'id': zadanie.pk,
-            'opis': zadanie.opis,
-            'termin_wykonania': zadanie.termin_wykonania.isoformat(),
-            'wykonane': zadanie.wykonane,
-        })
-    
-    return JsonResponse(calendar_data, safe=False)
+    return JsonResponse(calendar_data(request.user, start, end), safe=False)